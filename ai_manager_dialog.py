@@ -10,6 +10,7 @@ AI Manager Dialogs - 独立弹窗用于管理 AI 服务商配置
 
 import copy
 import logging
+import threading
 import uuid
 import re
 from PyQt5.QtWidgets import (
@@ -31,6 +32,7 @@ from .config import (
     build_configured_ai_entries,
 )
 from .models.base import AIProvider, DEFAULT_MODELS
+from .model_catalog import STATUS_UPDATED
 from .i18n import get_translation
 from .widgets import apply_button_style
 from .ui_constants import (
@@ -373,6 +375,8 @@ class ManageAIDialog(QDialog):
     """管理 AI 弹窗 - 编辑、删除、设为默认"""
     
     config_changed = pyqtSignal()
+    # 后台刷新所有模型列表完成（{config_id: (ok, models 或错误信息, status)}）
+    model_lists_refreshed = pyqtSignal(dict)
     
     def __init__(self, parent=None, i18n=None):
         super().__init__(parent)
@@ -386,6 +390,7 @@ class ManageAIDialog(QDialog):
         
         self.current_config_id = None
         self.model_widget = None
+        self.model_lists_refreshed.connect(self._on_model_lists_refreshed)
         
         self.setup_ui()
         self.load_configured_list()
@@ -484,6 +489,18 @@ class ManageAIDialog(QDialog):
         
         # ========== 底部按钮 ==========
         bottom_layout = QHBoxLayout()
+        
+        # 并行刷新所有已配置 AI 的模型列表
+        self.refresh_all_button = QPushButton(self.i18n.get('refresh_all_model_lists', 'Refresh All Model Lists'))
+        self.refresh_all_button.setToolTip(self.i18n.get('refresh_all_model_lists_tooltip',
+            'Check every configured AI for model list changes at once'))
+        self.refresh_all_button.clicked.connect(self.on_refresh_all_clicked)
+        bottom_layout.addWidget(self.refresh_all_button)
+        
+        # 健康状态面板：并行探测所有已配置的 AI
+        self.health_button = QPushButton(self.i18n.get('health_button', 'AI Health…'))
+        self.health_button.clicked.connect(self.on_health_clicked)
+        bottom_layout.addWidget(self.health_button)
         bottom_layout.addStretch()
         
         close_button = QPushButton(self.i18n.get('close_button', 'Close'))
@@ -519,6 +536,12 @@ class ManageAIDialog(QDialog):
             self.save_button.setText(self.i18n.get('save_ai_config', 'Save'))
         if hasattr(self, 'delete_button'):
             self.delete_button.setText(self.i18n.get('delete_ai', 'Delete'))
+        if hasattr(self, 'health_button'):
+            self.health_button.setText(self.i18n.get('health_button', 'AI Health…'))
+        if hasattr(self, 'refresh_all_button'):
+            self.refresh_all_button.setText(self.i18n.get('refresh_all_model_lists', 'Refresh All Model Lists'))
+            self.refresh_all_button.setToolTip(self.i18n.get('refresh_all_model_lists_tooltip',
+                'Check every configured AI for model list changes at once'))
         
         # 更新空态提示
         for widget in self.findChildren(QWidget):
@@ -600,6 +623,73 @@ class ManageAIDialog(QDialog):
             hint_item.setFlags(hint_item.flags() & ~Qt.ItemIsSelectable)
             self.config_list.addItem(hint_item)
     
+    def on_health_clicked(self):
+        """打开 AI 健康状态面板"""
+        from .health_dialog import HealthDashboardDialog
+        HealthDashboardDialog(self, self.i18n).exec_()
+    
+    def on_refresh_all_clicked(self):
+        """在后台并行刷新所有已配置 AI 的模型列表"""
+        prefs = get_prefs()
+        configs = {}
+        for config_id, config in prefs.get('models', {}).items():
+            provider_id = extract_provider_id(config_id, config)
+            # Perplexity 的模型列表是硬编码的
+            if provider_id == 'perplexity' or not is_ai_config_complete(provider_id, config):
+                continue
+            configs[config_id] = (provider_id, copy.deepcopy(config))
+        if not configs:
+            return
+        
+        self.refresh_all_button.setEnabled(False)
+        self.refresh_all_button.setText(self.i18n.get('refreshing_model_lists', 'Refreshing...'))
+        
+        def run():
+            from .api import APIClient
+            try:
+                results = APIClient(i18n=self.i18n).refresh_model_lists(configs, force=True)
+            except Exception as e:
+                logger.error(f"刷新模型列表失败: {str(e)}")
+                results = {config_id: (False, str(e), None) for config_id in configs}
+            try:
+                self.model_lists_refreshed.emit(results)
+            except RuntimeError:
+                # 弹窗已关闭
+                pass
+        
+        threading.Thread(target=run, name='AskAIModelListRefresh', daemon=True).start()
+    
+    def _on_model_lists_refreshed(self, results):
+        self.refresh_all_button.setEnabled(True)
+        self.refresh_all_button.setText(self.i18n.get('refresh_all_model_lists', 'Refresh All Model Lists'))
+        
+        models_config = get_prefs().get('models', {})
+        updated, unchanged, failed = [], [], []
+        for config_id, (ok, payload, status) in results.items():
+            name = build_ai_display_text(config_id, models_config.get(config_id, {}), i18n=self.i18n).split(' - ', 1)[0]
+            if not ok:
+                failed.append(f"{name}: {str(payload).splitlines()[0] if payload else ''}")
+            elif status == STATUS_UPDATED:
+                updated.append(f"{name} ({len(payload)})")
+            else:
+                unchanged.append(name)
+        
+        lines = []
+        if updated:
+            lines.append(self.i18n.get('model_lists_updated', 'Updated: {names}').format(names=', '.join(updated)))
+        if unchanged:
+            lines.append(self.i18n.get('model_lists_unchanged', 'Unchanged: {names}').format(names=', '.join(unchanged)))
+        if failed:
+            lines.append(self.i18n.get('model_lists_failed', 'Failed:') + '\n' + '\n'.join(failed))
+        
+        # 当前打开的配置直接更新下拉框（保留未保存的修改）
+        current = results.get(self.current_config_id)
+        if self.model_widget is not None and current and current[0] and current[2] == STATUS_UPDATED:
+            self.model_widget.models_refreshed.emit(current[1])
+        
+        box = QMessageBox.warning if failed else QMessageBox.information
+        box(self, self.i18n.get('refresh_all_model_lists', 'Refresh All Model Lists'), '\n\n'.join(lines))
+    
     def on_config_selected(self, current, previous):
         """选中配置时显示编辑面板"""
         if current is None:
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import json
+import time
 from typing import Optional, Dict, Any, Tuple, Union, List
 import logging
 
@@ -12,6 +13,13 @@ from .i18n import get_translation
 from .models import AIModelFactory, BaseAIModel
 from .models.base import AIProvider, DEFAULT_MODELS, DEFAULT_PROVIDER
 from .utils import mask_api_key, mask_api_key_in_text, safe_log_config
+from .resilience import CircuitOpenError, CombinedEvent, call_with_retry, classify_error, get_circuit_breaker
+from .rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, get_limiter, limiter_key
+from .http_pool import get_session
+from .hedging import get_first_token_stats, hedge_delay, run_hedged
+from .model_catalog import catalog_key, get_model_catalog
+from .health import get_health_registry, probe_all, probe_url
+from .profiling import get_profiler, profiled_request
 
 # 添加一个 logger
 logger = logging.getLogger(__name__)
@@ -32,6 +40,63 @@ class AIAPIError(Exception):
 # 为了向后兼容，保留原有的错误类名
 GrokAPIError = AIAPIError
 
+
+def create_model(ai_id: str) -> Optional[BaseAIModel]:
+    """按 AI 配置 ID 创建模型实例（每次新建，可在任意线程使用）
+    
+    Returns:
+        模型实例；配置不存在或无效时返回 None
+    """
+    from .plugin_prefs import get_prefs
+    prefs = get_prefs()
+    config = dict((prefs.get('models', {}) or {}).get(ai_id) or {})
+    if not config:
+        return None
+    config.setdefault('language', prefs.get('language', 'en'))
+    provider_id = config.get('provider_id') or ai_id.split('_')[0]
+    try:
+        return AIModelFactory.create_model(provider_id, config)
+    except Exception as e:
+        logger.warning(f"创建模型 {ai_id} 失败: {str(e)}")
+        return None
+
+def probe_ai_health(ai_ids, on_result=None):
+    """并行探测多个 AI 的健康状态（阻塞，在后台线程中调用），结果同时写入共享的健康记录
+    
+    Returns:
+        Dict[str, ProbeResult]: 按 AI 配置 ID 返回
+    """
+    from urllib.request import getproxies
+    
+    def make_probe(ai_id):
+        def probe():
+            model = create_model(ai_id)
+            if model is None:
+                raise ValueError(f'AI {ai_id} is not configured')
+            # 经由代理时测得的是到代理的连接耗时，不显示
+            measure_connect_time = not (model.HTTP_TRUST_ENV and getproxies())
+            return probe_url(get_session(model.HTTP_TRUST_ENV), model.get_health_probe(),
+                             measure_connect_time=measure_connect_time)
+        return probe
+    
+    return probe_all({ai_id: make_probe(ai_id) for ai_id in dict.fromkeys(ai_ids) if ai_id},
+                     registry=get_health_registry(), on_result=on_result)
+
+# 请求数据中承载消息文本的字段（OpenAI/Anthropic 的 messages 和 system，Gemini 的 contents 和 parts）
+_MESSAGE_KEYS = ('system', 'messages', 'contents', 'parts', 'content', 'text')
+
+def _message_texts(data):
+    """依次取出请求数据中的消息文本，忽略模型名、温度等其他字段"""
+    if isinstance(data, str):
+        yield data
+    elif isinstance(data, list):
+        for item in data:
+            yield from _message_texts(item)
+    elif isinstance(data, dict):
+        for key in _MESSAGE_KEYS:
+            if key in data:
+                yield from _message_texts(data[key])
+
 class APIClient:
     """AI 模型 API 客户端，支持多种 AI 模型"""
     
@@ -51,26 +116,35 @@ class APIClient:
     }
     
     def __init__(self, i18n: Dict[str, str] = None, 
-                 max_retries: int = 3, timeout: float = None):
+                 max_retries: int = None, timeout: float = None, priority: int = PRIORITY_INTERACTIVE):
         """初始化 AI 模型 API 客户端
         
         Args:
             i18n: 国际化文本字典
-            max_retries: 最大重试次数
+            max_retries: 每次提问的最大尝试次数（可恢复错误按 resilience 策略重试），如果为None则从配置中读取
             timeout: 请求超时时间（秒），如果为None则从配置中读取
+            priority: 限流排队优先级，面板使用 PRIORITY_INTERACTIVE，后台任务使用 PRIORITY_BACKGROUND
         """
+        from .plugin_prefs import get_prefs
+        prefs = get_prefs()
         # 如果没有指定timeout，从配置中读取
         if timeout is None:
-            from .config import get_prefs
-            prefs = get_prefs()
             timeout = prefs.get('request_timeout', 120)
         
         self._timeout = timeout
+        if max_retries is None:
+            max_retries = prefs.get('request_max_attempts', 3)
+        self._max_retries = max(1, int(max_retries))
+        self._breaker_threshold = prefs.get('circuit_breaker_threshold', 5)
+        self._breaker_reset = prefs.get('circuit_breaker_reset_seconds', 30)
         self._ai_model = None  # 当前使用的 AI 模型实例
         self._model_name = None  # 当前使用的模型名称
+        self._priority = priority
+        self._queue_status = None  # 限流排队状态（排队时由请求线程更新）
+        self._last_usage = None  # 最近一次回答的用量（usage.make_usage 格式）
         
-        # 初始化连接池
-        self._session = self._create_session(max_retries, timeout)
+        # 共享连接池（所有模型请求复用同一组 keep-alive 连接）
+        self._session = get_session()
         
         # 初始化 i18n
         self.i18n = i18n or get_translation('en')
@@ -78,31 +152,156 @@ class APIClient:
         # 加载当前选择的模型
         self._load_current_model()
         
-    def _create_session(self, max_retries: int, timeout: float) -> requests.Session:
-        """创建带有连接池的 Session 对象"""
-        session = requests.Session()
+    def _call_model(self, prompt: str, cancel_event=None, **kwargs) -> str:
+        """调用当前模型的 ask，可恢复的错误自动重试，连续失败的提供商被熔断
+        
+        流式请求一旦已有片段交给回调就不再重放，避免回答重复。
+        流式请求首个片段的耗时计入该 AI 的首 token 统计，供对冲阈值使用；非流式请求（摘要、
+        随机问题等）的耗时是完整回答的时间，不计入，以免抬高阈值。
+        
+        面板请求（PRIORITY_INTERACTIVE）的重试总耗时不超过 request_timeout：面板在这个时间后
+        已经放弃等待，之后的重试结果只会被丢弃。
         
-        # 配置连接池
-        adapter = requests.adapters.HTTPAdapter(
-            pool_connections=10,      # 连接池数量
-            pool_maxsize=10,         # 最大连接数
-            max_retries=max_retries, # 最大重试次数
-            pool_block=False         # 非阻塞模式
+        Args:
+            cancel_event: 可选，设置后不再排队和重试（面板已停止或超时、对冲请求中另一方已胜出）
+        
+        Raises:
+            AIAPIError: 熔断期间直接抛出（error_type 为 circuit_open）
+        """
+        # 固定本次调用的模型：对冲请求在后台线程中运行时，ask() 可能已经恢复了原模型
+        model = self._ai_model
+        model_name = self._model_name
+        breaker = get_circuit_breaker(
+            model_name or 'default',
+            failure_threshold=self._breaker_threshold,
+            reset_timeout=self._breaker_reset,
         )
+        started = time.monotonic()
+        delivered = []
+        stream_callback = kwargs.get('stream_callback')
+        if stream_callback:
+            def tracking_callback(chunk):
+                if not delivered:
+                    get_first_token_stats().record(model_name, time.monotonic() - started)
+                delivered.append(True)
+                stream_callback(chunk)
+            kwargs['stream_callback'] = tracking_callback
+        
+        def on_retry(attempt, delay, error):
+            logger.warning(f"[{model_name}] 第 {attempt} 次重试，{delay:.1f} 秒后重新请求: {str(error)[:200]}")
         
-        # 为 http 和 https 都添加适配器
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
+        def is_replay_safe():
+            return not delivered and not (cancel_event is not None and cancel_event.is_set())
         
-        return session
+        limiter = self._limiter_for(model, model_name)
+        request_text = self._request_text(model, prompt, kwargs)
+        tokens = self._estimate_request_tokens(model, request_text, kwargs)
+        # 各提供商的请求和流式循环（含流式回调）计入同一个阶段
+        stage_name = f"provider.{(model.config.get('provider_id') if model else None) or model_name}"
         
-    def __del__(self):
-        """析构函数，确保会话被正确关闭"""
-        if hasattr(self, '_session'):
+        def attempt():
+            # 每次尝试（包括重试）都要经过限流器排队
+            try:
+                permit = limiter.acquire(tokens, priority=self._priority, cancel_event=cancel_event,
+                                         on_wait=self._set_queue_status)
+            finally:
+                # 排队被取消或等待超时也要清除，否则面板会一直显示排队状态
+                self._queue_status = None
             try:
-                self._session.close()
-            except Exception:
-                pass
+                with get_profiler().stage(stage_name):
+                    return model.ask(prompt, **kwargs)
+            except Exception as e:
+                _, retry_after, status = classify_error(e)
+                if status == 429:
+                    limiter.pause(retry_after)
+                raise
+            finally:
+                permit.release()
+        
+        try:
+            response = call_with_retry(
+                attempt,
+                breaker=breaker,
+                max_attempts=self._max_retries,
+                is_replay_safe=is_replay_safe,
+                on_retry=on_retry,
+                sleep=cancel_event.wait if cancel_event is not None else time.sleep,
+                max_elapsed=self._timeout if self._priority == PRIORITY_INTERACTIVE else None,
+            )
+            # 流式请求没有产生片段（回答为空）时，以完成时间作为首 token 耗时
+            if stream_callback and not delivered:
+                get_first_token_stats().record(model_name, time.monotonic() - started)
+            # 对冲请求中落后的一方被取消，用量不完整，不覆盖胜出方的用量，也不用来校准
+            if cancel_event is None or not cancel_event.is_set():
+                self._last_usage = model.last_usage
+                self._record_calibration(model, request_text, model.last_usage)
+            return response
+        except CircuitOpenError as e:
+            provider_name = model.get_provider_name() if model else model_name
+            error_msg = self.i18n.get(
+                'circuit_open_error',
+                '{provider} failed {failures} times in a row, so requests to it are paused. '
+                'It will be tried again automatically in {seconds} seconds.'
+            ).format(provider=provider_name, failures=e.failures, seconds=max(1, int(e.retry_in + 0.5)))
+            raise AIAPIError(error_msg, error_type="circuit_open") from e
+    
+    @staticmethod
+    def _limiter_for(model: BaseAIModel, model_name: str):
+        """按提供商和 API Key 获取限流器，限额来自模型配置（空表示不限制）"""
+        config = model.config if model else {}
+        provider_id = config.get('provider_id') or (model_name or 'default').split('_')[0]
+        credential = config.get('api_key') or config.get('auth_token') or config.get('api_base_url')
+        return get_limiter(
+            limiter_key(provider_id, credential),
+            rpm=config.get('rate_limit_rpm'),
+            tpm=config.get('rate_limit_tpm'),
+            max_concurrent=config.get('max_concurrent_requests'),
+        )
+    
+    @staticmethod
+    def _request_text(model: BaseAIModel, prompt: str, kwargs: Dict[str, Any]) -> str:
+        """模型实际发送的全部消息文本（系统消息、对话上下文和提示词）"""
+        try:
+            return ''.join(_message_texts(model.prepare_request_data(prompt, **kwargs)))
+        except Exception as e:
+            logger.debug(f"无法构建请求数据，按提示词和对话上下文估算: {e}")
+            return prompt + ''.join(str(message.get('content', '')) for message in kwargs.get('history') or [])
+    
+    @staticmethod
+    def _estimate_request_tokens(model: BaseAIModel, text: str, kwargs: Dict[str, Any]) -> int:
+        """估算一次请求占用的 token 额度：请求消息和输出上限"""
+        from .token_estimator import estimate_tokens, tokenizer_family
+        config = model.config if model else {}
+        family = tokenizer_family(config.get('provider_id'), config.get('model'))
+        return estimate_tokens(text, family) + int(kwargs.get('max_tokens') or 0)
+    
+    @staticmethod
+    def _record_calibration(model: BaseAIModel, text: str, usage) -> None:
+        """用提供商报告的输入 token 数校准该模型的 token 估算"""
+        if not usage or not getattr(model, 'REPORTS_FULL_INPUT_TOKENS', True):
+            return
+        try:
+            from .token_estimator import estimate_tokens_raw, tokenizer_family
+            from .usage import get_token_calibration
+            config = model.config
+            family = tokenizer_family(config.get('provider_id'), config.get('model'))
+            get_token_calibration().record(config.get('model'), estimate_tokens_raw(text, family),
+                                           usage.get('input', 0), chars=len(text))
+        except Exception as e:
+            logger.debug(f"记录 token 校准数据失败: {e}")
+    
+    @property
+    def last_usage(self) -> Optional[Dict[str, int]]:
+        """最近一次回答的用量；提供商没有报告时为 None"""
+        return self._last_usage
+    
+    def _set_queue_status(self, status):
+        self._queue_status = status
+    
+    @property
+    def queue_status(self) -> Optional[Dict[str, Any]]:
+        """当前请求在限流器中的排队状态；未排队时为 None"""
+        return self._queue_status
     
     def _prepare_request(self, prompt: str) -> Tuple[Dict[str, str], Dict[str, Any]]:
         """准备 API 请求的共同部分
@@ -147,7 +346,9 @@ class APIClient:
                 
             raise AIAPIError(error_msg, error_type=error_type) from e
     
-    def ask(self, prompt: str, lang_code: str = 'en', return_dict: bool = False, stream: bool = False, stream_callback=None, model_id: str = None, use_library_chat: bool = False) -> str:
+    @profiled_request('api.ask')
+    def ask(self, prompt: str, lang_code: str = 'en', return_dict: bool = False, stream: bool = False, stream_callback=None, model_id: str = None, use_library_chat: bool = False, history=None,
+            fallback_ai: str = None, on_answered_by=None, cancel_event=None) -> str:
         """向 AI 模型发送问题并获取回答，支持流式请求
         
         Args:
@@ -158,6 +359,10 @@ class APIClient:
             stream_callback: 流式响应回调函数，用于处理流式响应的每个片段
             model_id: 可选，指定使用的模型ID。如果为None，使用当前选中的模型
             use_library_chat: 是否使用Library Chat功能（仅在未选择书籍时使用）
+            history: 可选，之前的对话消息 [{'role', 'content'}]，以原生 messages 形式发送
+            fallback_ai: 可选，备用 AI ID。首个 token 超过对冲阈值仍未到达时，同一问题发给备用 AI，先产出内容的一方胜出
+            on_answered_by: 可选，回调 (ai_id)，在确定由哪个 AI 回答时调用（可能在后台线程中）
+            cancel_event: 可选，threading.Event；调用方放弃等待（停止、超时）时设置，不再排队和重试
             
         Returns:
             str 或 dict: 如果 return_dict 为 False，返回回答文本；否则返回完整的响应字典
@@ -167,6 +372,7 @@ class APIClient:
         """
         # 更新 i18n 以确保使用正确的语言
         self.i18n = get_translation(lang_code)
+        self._last_usage = None
         
         # 如果指定了model_id，临时切换模型
         original_model = None
@@ -190,19 +396,21 @@ class APIClient:
             # Library Chat支持：检查是否需要注入图书馆元数据
             if use_library_chat:
                 from .utils import is_library_chat_enabled, build_library_prompt
-                from .config import get_prefs
+                from .plugin_prefs import get_prefs
                 from .prompt_limits import validate_prompt_length, count_books_in_library_metadata
                 
                 prefs = get_prefs()
                 if is_library_chat_enabled(prefs):
                     # 使用build_library_prompt包装用户查询，传入i18n支持多语言
-                    prompt = build_library_prompt(prompt, prefs, self.i18n)
+                    # 按当前模型的上下文窗口计算 token 预算
+                    target_models = [(self._model_name, self._ai_model.config)]
+                    prompt = build_library_prompt(prompt, prefs, self.i18n, models=target_models)
                     logger.info("Library Chat enabled, injected library metadata into prompt")
 
                     book_count = count_books_in_library_metadata(prefs)
                     length_error = validate_prompt_length(
                         prompt, True, prefs, self.i18n, book_count,
-                        is_library_search=True,
+                        is_library_search=True, models=target_models,
                     )
                     if length_error:
                         raise AIAPIError(length_error, error_type="prompt_too_long")
@@ -229,6 +437,10 @@ class APIClient:
                         f"忽略无法解析的 max_tokens 配置: {configured_max_tokens}"
                     )
             
+            # 多轮对话：之前的轮次作为原生消息发送
+            if history:
+                kwargs['history'] = history
+            
             # 检查模型是否支持流式传输以及是否在配置中启用了流式传输
             model_supports_streaming = hasattr(self._ai_model, 'supports_streaming') and self._ai_model.supports_streaming()
             streaming_enabled = self._ai_model.config.get('enable_streaming', True)  # 默认启用
@@ -251,7 +463,13 @@ class APIClient:
                     logger.debug(f"使用流式传输请求 {self._model_name} 模型")
             
             # 使用模型实例发送请求
-            response = self._ai_model.ask(prompt, **kwargs)
+            if fallback_ai and fallback_ai != self._model_name:
+                response = self._call_hedged(prompt, kwargs, fallback_ai, lang_code, stream, stream_callback,
+                                             on_answered_by, cancel_event)
+            else:
+                response = self._call_model(prompt, cancel_event=cancel_event, **kwargs)
+                if on_answered_by:
+                    on_answered_by(self._model_name)
             
             # 如果响应为空，抛出错误
             if not response.strip():
@@ -292,6 +510,43 @@ class APIClient:
                 self._ai_model = original_model
                 self._model_name = original_model_name
     
+    def _call_hedged(self, prompt: str, kwargs: Dict[str, Any], fallback_ai: str, lang_code: str,
+                     stream: bool, stream_callback, on_answered_by, cancel_event=None) -> str:
+        """对冲请求：主 AI 在阈值内没有首个 token（或提前失败）时把同一问题发给备用 AI
+        
+        阈值取设置中的 hedge_delay_seconds，未设置时按主 AI 最近首 token 耗时的 p90 自适应。
+        只有胜出一方的片段交给 stream_callback，落后一方在下一个片段到达时中止。
+        """
+        from .plugin_prefs import get_prefs
+        primary_ai = self._model_name
+        delay = hedge_delay(primary_ai, configured=get_prefs().get('hedge_delay_seconds', ''))
+        primary_streams = 'stream_callback' in kwargs
+        
+        def call_primary(chunk_callback, hedge_cancel):
+            call_kwargs = dict(kwargs)
+            if primary_streams:
+                call_kwargs['stream_callback'] = lambda chunk: chunk and chunk_callback(chunk)
+            return self._call_model(prompt, cancel_event=CombinedEvent(hedge_cancel, cancel_event), **call_kwargs)
+        
+        def call_fallback(chunk_callback, hedge_cancel):
+            client = APIClient(i18n=self.i18n, timeout=self._timeout, priority=self._priority)
+            response = client.ask(
+                prompt, lang_code=lang_code, stream=stream,
+                stream_callback=(lambda chunk: chunk and chunk_callback(chunk)) if stream_callback else None,
+                model_id=fallback_ai, history=kwargs.get('history'),
+                cancel_event=CombinedEvent(hedge_cancel, cancel_event),
+            )
+            if not hedge_cancel.is_set():
+                self._last_usage = client.last_usage
+            return response
+        
+        logger.info(f"[Hedge] {primary_ai} 首 token 阈值 {delay:.1f} 秒，备用 AI: {fallback_ai}")
+        _, response = run_hedged(
+            (primary_ai, call_primary), (fallback_ai, call_fallback), delay,
+            stream_callback=stream_callback, on_winner=on_answered_by,
+        )
+        return response
+    
     def _get_provider_from_model_name(self, model_name: str) -> AIProvider:
         """根据模型名称获取对应的AIProvider枚举值
         
@@ -466,7 +721,7 @@ class APIClient:
         try:
             # 明确指定 stream=False，禁用流式传输
             logger.debug(f"{model_name}: 开始请求随机问题，禁用流式传输")
-            response = self._ai_model.ask(prompt, stream=False, is_random_question=True)
+            response = self._call_model(prompt, stream=False, is_random_question=True)
             
             logger.debug(f"{model_name}: 成功获取响应，长度: {len(response) if response else 0}")
             
@@ -636,6 +891,51 @@ class APIClient:
         
         return self._model_name.capitalize()
     
+    def _create_listing_model(self, model_name, config):
+        """
+        校验配置并创建用于获取模型列表的临时模型实例
+        
+        Returns:
+            Tuple[Optional[BaseAIModel], Optional[str]]: (模型实例, None) 或 (None, 错误消息)
+        """
+        # 1. 验证参数
+        if not model_name or not config:
+            error_msg = self.i18n.get('invalid_params', 'Invalid parameters')
+            logger.error(f"{model_name}: {error_msg}")
+            return None, error_msg
+        
+        # 2. 验证 API Key（Ollama 不需要）
+        # 先确定 API Key 字段名称
+        api_key_field = 'auth_token' if model_name == 'grok' else 'api_key'
+        
+        if model_name != 'ollama':
+            api_key = config.get(api_key_field, '').strip()
+            logger.info(f"[{model_name}] API 客户端接收到的 API Key 状态: {'存在' if api_key else '为空'}, 长度: {len(api_key) if api_key else 0}")
+            if not api_key:
+                error_msg = self.i18n.get('api_key_required', 'API Key is required')
+                logger.warning(f"{model_name}: {error_msg}")
+                return None, error_msg
+        else:
+            logger.info(f"[{model_name}] Ollama 是本地服务，跳过 API Key 验证")
+        
+        # 3. 创建临时模型实例（添加语言设置）
+        logger.debug(f"Creating temporary model instance for {model_name}")
+        # 确保配置中包含语言设置，用于错误信息国际化
+        if 'language' not in config:
+            from .plugin_prefs import get_prefs
+            prefs = get_prefs()
+            config['language'] = prefs.get('language', 'en')
+            logger.debug(f"Added language to config: {config['language']}")
+        
+        if model_name != 'ollama':
+            logger.info(f"[{model_name}] 创建模型实例前的配置 - API Key: {'存在' if config.get(api_key_field) else '为空'}")
+        temp_model = AIModelFactory.create_model(model_name, config)
+        if model_name != 'ollama':
+            logger.info(f"[{model_name}] 模型实例创建成功，config 中的 API Key: {'存在' if temp_model.config.get(api_key_field) else '为空'}")
+        else:
+            logger.info(f"[{model_name}] 模型实例创建成功")
+        return temp_model, None
+    
     def fetch_available_models(self, model_name, config, skip_verification=False): 
         """
         从 AI 提供商获取可用模型列表
@@ -651,46 +951,14 @@ class APIClient:
                 - (False, str): 失败，返回错误消息
         """
         try:
-            # 1. 验证参数
-            if not model_name or not config:
-                error_msg = self.i18n.get('invalid_params', 'Invalid parameters')
-                logger.error(f"fetch_available_models: {error_msg}")
+            temp_model, error_msg = self._create_listing_model(model_name, config)
+            if temp_model is None:
                 return False, error_msg
             
-            # 2. 验证 API Key（Ollama 不需要）
-            # 先确定 API Key 字段名称
-            api_key_field = 'auth_token' if model_name == 'grok' else 'api_key'
-            
-            if model_name != 'ollama':
-                api_key = config.get(api_key_field, '').strip()
-                logger.info(f"[{model_name}] API 客户端接收到的 API Key 状态: {'存在' if api_key else '为空'}, 长度: {len(api_key) if api_key else 0}")
-                if not api_key:
-                    error_msg = self.i18n.get('api_key_required', 'API Key is required')
-                    logger.warning(f"fetch_available_models: {error_msg}")
-                    return False, error_msg
-            else:
-                logger.info(f"[{model_name}] Ollama 是本地服务，跳过 API Key 验证")
-            
-            # 3. 创建临时模型实例（添加语言设置）
-            logger.debug(f"Creating temporary model instance for {model_name}")
-            # 确保配置中包含语言设置，用于错误信息国际化
-            if 'language' not in config:
-                from .config import get_prefs
-                prefs = get_prefs()
-                config['language'] = prefs.get('language', 'en')
-                logger.debug(f"Added language to config: {config['language']}")
-            
-            if model_name != 'ollama':
-                logger.info(f"[{model_name}] 创建模型实例前的配置 - API Key: {'存在' if config.get(api_key_field) else '为空'}")
-            temp_model = AIModelFactory.create_model(model_name, config)
-            if model_name != 'ollama':
-                logger.info(f"[{model_name}] 模型实例创建成功，config 中的 API Key: {'存在' if temp_model.config.get(api_key_field) else '为空'}")
-            else:
-                logger.info(f"[{model_name}] 模型实例创建成功")
-            
             # 4. 调用模型的 fetch_available_models 方法
             logger.info(f"Fetching available models for {model_name}, skip_verification={skip_verification}")
-            models = temp_model.fetch_available_models(skip_verification=skip_verification)
+            with self._limiter_for(temp_model, model_name).acquire(priority=PRIORITY_BACKGROUND):
+                models = temp_model.fetch_available_models(skip_verification=skip_verification)
             
             # 5. 返回成功结果
             logger.info(f"Successfully fetched {len(models)} models for {model_name}")
@@ -713,6 +981,82 @@ class APIClient:
             logger.error(f"Unexpected error while fetching models for {model_name}: {error_msg}")
             return False, error_msg
     
+    def _model_list_fetcher(self, model_name, config):
+        """
+        Returns:
+            Tuple[str, Callable]: (模型列表缓存键, fetch_fn(etag, last_modified) -> FetchResult)
+        Raises:
+            ValueError: 配置不完整（错误消息已本地化）
+        """
+        temp_model, error_msg = self._create_listing_model(model_name, config)
+        if temp_model is None:
+            raise ValueError(error_msg)
+        
+        credential = config.get('auth_token' if model_name == 'grok' else 'api_key', '')
+        key = catalog_key(model_name, config.get('api_base_url', ''), credential)
+        
+        def fetch(etag, last_modified):
+            logger.info(f"Refreshing model list for {model_name} (conditional: {bool(etag or last_modified)})")
+            try:
+                with self._limiter_for(temp_model, model_name).acquire(priority=PRIORITY_BACKGROUND):
+                    return temp_model.fetch_models_if_changed(etag, last_modified, skip_verification=True)
+            except NotImplementedError:
+                raise ValueError(self.i18n.get('model_list_not_supported',
+                                               'This provider does not support automatic model list fetching'))
+        
+        return key, fetch
+    
+    def refresh_model_list(self, model_name, config, force=False):
+        """
+        通过模型列表缓存获取可用模型：缓存未过期时直接返回，否则发送条件请求刷新
+        
+        Args:
+            model_name: 模型提供商名称
+            config: 模型配置字典
+            force: 忽略缓存有效期（仍带 If-None-Match，未变化时服务端返回 304）
+            
+        Returns:
+            Tuple[bool, Union[List[str], str], Optional[str]]:
+                - (True, List[str], status): status 为 fresh / not_modified / updated
+                - (False, str, None): 失败，返回错误消息
+        """
+        try:
+            key, fetch = self._model_list_fetcher(model_name, config)
+            models, status = get_model_catalog().refresh(key, fetch, force=force)
+            logger.info(f"Model list for {model_name}: {len(models)} models ({status})")
+            return True, models, status
+        except Exception as e:
+            # 异常信息已经在 models/base.py 中格式化好（用户友好描述 + 技术细节）
+            error_msg = str(e)
+            logger.error(f"Failed to refresh model list for {model_name}: {error_msg}")
+            return False, error_msg, None
+    
+    def refresh_model_lists(self, configs, force=True):
+        """
+        并行刷新多个 AI 的模型列表（相同提供商和 Key 只请求一次）
+        
+        Args:
+            configs: {config_id: (model_name, config)}
+            
+        Returns:
+            Dict[str, Tuple[bool, Union[List[str], str], Optional[str]]]: 按 config_id 返回结果
+        """
+        results = {}
+        fetchers = {}
+        keys = {}
+        for config_id, (model_name, config) in configs.items():
+            try:
+                key, fetch = self._model_list_fetcher(model_name, dict(config))
+            except Exception as e:
+                results[config_id] = (False, str(e), None)
+                continue
+            keys[config_id] = key
+            fetchers.setdefault(key, fetch)
+        by_key = get_model_catalog().refresh_many(fetchers, force=force)
+        for config_id, key in keys.items():
+            results[config_id] = by_key[key]
+        return results
+    
     def test_model(self, model_name, config, test_model_name=None):
         """
         测试指定的模型是否可用
@@ -733,7 +1077,7 @@ class APIClient:
         try:
             # 确保配置中包含语言设置
             if 'language' not in config:
-                from .config import get_prefs
+                from .plugin_prefs import get_prefs
                 prefs = get_prefs()
                 config['language'] = prefs.get('language', 'en')
             
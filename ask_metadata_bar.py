@@ -10,7 +10,9 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 
 from calibre_plugins.ask_ai_plugin.ui_constants import (
+    FONT_SIZE_SMALL,
     SPACING_TINY,
+    TEXT_COLOR_SECONDARY,
     get_ask_metadata_collapsed_style,
     get_ask_metadata_toggle_style,
 )
@@ -48,12 +50,23 @@ class AskMetadataBar(QWidget):
 
         root.addLayout(header_row)
 
+        # 后台任务状态（例如提取书籍正文的进度），为空时隐藏
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet(f"color: {TEXT_COLOR_SECONDARY}; font-size: {FONT_SIZE_SMALL};")
+        self.status_label.setVisible(False)
+        root.addWidget(self.status_label)
+
         self.detail_list = QListWidget()
         self.detail_list.setFrameShape(QListWidget.NoFrame)
         self.detail_list.setVisible(False)
         self.detail_list.setMaximumHeight(120)
         root.addWidget(self.detail_list)
 
+    def set_status(self, text):
+        """显示或清除状态行"""
+        self.status_label.setText(text or '')
+        self.status_label.setVisible(bool(text))
+
     def _toggle_expanded(self):
         if self.detail_list.count() == 0:
             return
@@ -90,7 +103,7 @@ class AskMetadataBar(QWidget):
 
     def _ai_search_summary(self):
         try:
-            from calibre_plugins.ask_ai_plugin.config import get_prefs
+            from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
             import json
             prefs = get_prefs()
             library_metadata = prefs.get('library_cached_metadata', '')
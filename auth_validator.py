@@ -29,7 +29,7 @@ def validate_models_auth(model_ids: List[str], show_dialog_callback=None) -> Tup
             - (True, None): 所有模型都通过验证
             - (False, error_msg): 验证失败，返回错误消息
     """
-    from calibre_plugins.ask_ai_plugin.config import get_prefs
+    from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
     from calibre_plugins.ask_ai_plugin.models import AIModelFactory
     
     if not model_ids:
@@ -121,7 +121,7 @@ def get_models_to_validate(response_panels=None, default_model_id: Optional[str]
     Returns:
         List[str]: 需要验证的模型ID列表
     """
-    from calibre_plugins.ask_ai_plugin.config import get_prefs
+    from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
     
     models_to_check = []
     
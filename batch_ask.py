@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+""""Ask each book" batches: one question run separately against every selected book."""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    from .json_store import atomic_write_json
+except ImportError:
+    from json_store import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+BATCH_DIR_NAME = 'ask_ai_plugin_batches'
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_PROVIDER_CONCURRENCY = 2
+# 同一提供商两次请求开始之间的最小间隔（秒）
+DEFAULT_PROVIDER_INTERVAL = 0.5
+# 批次文件最多每隔多少秒写一次（结束时总会写入）
+SAVE_INTERVAL = 2.0
+# 只保留最近的批次文件
+MAX_SAVED_BATCHES = 20
+
+
+def provider_of(ai_id):
+    return (ai_id or '').split('_')[0]
+
+
+class ProviderLimiter:
+    """按提供商限制并发请求数，并让请求开始时间至少间隔 min_interval 秒"""
+
+    def __init__(self, max_concurrent=DEFAULT_PROVIDER_CONCURRENCY, min_interval=DEFAULT_PROVIDER_INTERVAL):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.min_interval = max(0.0, float(min_interval))
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def _semaphore(self, provider):
+        with self._lock:
+            if provider not in self._semaphores:
+                self._semaphores[provider] = threading.BoundedSemaphore(self.max_concurrent)
+            return self._semaphores[provider]
+
+    def _reserve_start(self, provider):
+        """预约下一个开始时间，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(provider, 0.0))
+            self._next_start[provider] = start + self.min_interval
+            return start - now
+
+    @contextmanager
+    def slot(self, provider, cancel_event=None):
+        semaphore = self._semaphore(provider)
+        semaphore.acquire()
+        try:
+            delay = self._reserve_start(provider)
+            if delay > 0:
+                if cancel_event is not None:
+                    cancel_event.wait(delay)
+                else:
+                    time.sleep(delay)
+            yield
+        finally:
+            semaphore.release()
+
+
+class BatchJob:
+    """一次逐书提问：问题、AI 和每本书的结果"""
+
+    def __init__(self, question, ai_id, books, template='', batch_id=None, created=None, items=None, path=None):
+        """
+        :param books: [(book_id, title)]，保持选中顺序
+        """
+        self.batch_id = batch_id or datetime.now().strftime('%Y%m%d%H%M%S_') + uuid.uuid4().hex[:6]
+        self.question = question
+        self.ai_id = ai_id
+        self.template = template
+        self.created = created or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.path = path
+        self._lock = threading.Lock()
+        if items is None:
+            items = {}
+            for book_id, title in books:
+                items[str(book_id)] = {
+                    'book_id': book_id, 'title': title, 'status': STATUS_PENDING,
+                    'latency': None, 'answer': '', 'error': '',
+                }
+        self.items = items
+
+    # ----- 状态 -----
+
+    def item(self, book_id):
+        return self.items[str(book_id)]
+
+    def update_item(self, book_id, **changes):
+        with self._lock:
+            item = self.items[str(book_id)]
+            item.update(changes)
+            return dict(item)
+
+    def pending_ids(self):
+        """尚未成功完成的书（中断时正在运行的书也会重新提问）"""
+        return [item['book_id'] for item in self.items.values() if item['status'] != STATUS_DONE]
+
+    def counts(self):
+        counts = {STATUS_PENDING: 0, STATUS_RUNNING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for item in self.items.values():
+            counts[item['status']] = counts.get(item['status'], 0) + 1
+        return counts
+
+    @property
+    def is_finished(self):
+        return all(item['status'] == STATUS_DONE for item in self.items.values())
+
+    # ----- 持久化 -----
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'batch_id': self.batch_id,
+                'question': self.question,
+                'ai_id': self.ai_id,
+                'template': self.template,
+                'created': self.created,
+                'items': {key: dict(item) for key, item in self.items.items()},
+            }
+
+    def save(self):
+        if not self.path:
+            return
+        atomic_write_json(self.path, self.to_dict())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            data['question'], data['ai_id'], [], template=data.get('template', ''),
+            batch_id=data['batch_id'], created=data.get('created'), items=data['items'], path=path,
+        )
+
+
+class BatchStore:
+    """批次文件目录"""
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+
+    def create(self, question, ai_id, books, template=''):
+        job = BatchJob(question, ai_id, books, template=template)
+        job.path = os.path.join(self.base_dir, f'{job.batch_id}.json')
+        job.save()
+        self._prune()
+        return job
+
+    def _paths(self):
+        if not os.path.isdir(self.base_dir):
+            return []
+        names = sorted(name for name in os.listdir(self.base_dir) if name.endswith('.json'))
+        return [os.path.join(self.base_dir, name) for name in names]
+
+    def _prune(self):
+        for path in self._paths()[:-MAX_SAVED_BATCHES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def latest_unfinished(self, book_ids=None):
+        """最近一个未完成的批次；指定 book_ids 时要求书籍集合一致"""
+        wanted = {str(book_id) for book_id in book_ids} if book_ids is not None else None
+        for path in reversed(self._paths()):
+            try:
+                job = BatchJob.load(path)
+            except Exception as e:
+                logger.warning(f"读取批次文件失败 {path}: {str(e)}")
+                continue
+            if job.is_finished:
+                continue
+            if wanted is None or set(job.items) == wanted:
+                return job
+        return None
+
+
+class BatchRunner:
+    """在后台线程池中执行批次"""
+
+    def __init__(self, job, ask_fn, build_prompt_fn, max_workers=DEFAULT_MAX_WORKERS,
+                 limiter=None, on_update=None, on_answer=None, on_finished=None):
+        """
+        :param ask_fn: (prompt, ai_id) -> 回答文本；在工作线程中调用
+        :param build_prompt_fn: book_id -> 提示词
+        :param on_update: (book_id, item) 每本书状态变化时调用（工作线程）
+        :param on_answer: (book_id, prompt, answer) 每本书成功后调用（工作线程）
+        :param on_finished: (cancelled) 批次结束时调用
+        """
+        self.job = job
+        self.ask_fn = ask_fn
+        self.build_prompt_fn = build_prompt_fn
+        self.max_workers = max(1, int(max_workers))
+        self.limiter = limiter or ProviderLimiter()
+        self.on_update = on_update
+        self.on_answer = on_answer
+        self.on_finished = on_finished
+        self._cancel_event = threading.Event()
+        self._save_lock = threading.Lock()
+        self._last_save = 0.0
+        self._thread = None
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='AskAIBatch', daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        book_ids = self.job.pending_ids()
+        logger.info(f"逐书提问开始: batch={self.job.batch_id}, 待处理 {len(book_ids)} 本, 并发 {self.max_workers}")
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='AskAIBatchWorker') as pool:
+                for future in [pool.submit(self._run_one, book_id) for book_id in book_ids]:
+                    future.result()
+        finally:
+            self._save(force=True)
+            logger.info(f"逐书提问结束: batch={self.job.batch_id}, {self.job.counts()}, cancelled={self.cancelled}")
+            if self.on_finished:
+                self.on_finished(self.cancelled)
+
+    def _notify(self, book_id, item):
+        if self.on_update:
+            try:
+                self.on_update(book_id, item)
+            except Exception as e:
+                logger.warning(f"批次进度回调失败: {str(e)}")
+
+    def _run_one(self, book_id):
+        if self.cancelled:
+            return
+        with self.limiter.slot(provider_of(self.job.ai_id), self._cancel_event):
+            if self.cancelled:
+                return
+            self._notify(book_id, self.job.update_item(book_id, status=STATUS_RUNNING, error=''))
+            start = time.monotonic()
+            try:
+                prompt = self.build_prompt_fn(book_id)
+                answer = self.ask_fn(prompt, self.job.ai_id)
+            except Exception as e:
+                latency = time.monotonic() - start
+                logger.warning(f"逐书提问失败 (book_id={book_id}): {str(e)}")
+                item = self.job.update_item(book_id, status=STATUS_FAILED, error=str(e), latency=round(latency, 2))
+                self._notify(book_id, item)
+                self._save()
+                return
+            latency = time.monotonic() - start
+        item = self.job.update_item(book_id, status=STATUS_DONE, answer=answer, latency=round(latency, 2))
+        if self.on_answer:
+            try:
+                self.on_answer(book_id, prompt, answer)
+            except Exception as e:
+                logger.warning(f"保存逐书回答失败 (book_id={book_id}): {str(e)}")
+        self._notify(book_id, item)
+        self._save()
+
+    def _save(self, force=False):
+        with self._save_lock:
+            now = time.monotonic()
+            if not force and now - self._last_save < SAVE_INTERVAL:
+                return
+            self._last_save = now
+            try:
+                self.job.save()
+            except Exception as e:
+                logger.error(f"保存批次状态失败: {str(e)}")
+
+
+_store = None
+
+
+def get_batch_store(base_dir=None):
+    global _store
+    if _store is None:
+        if base_dir is None:
+            from calibre.utils.config import config_dir
+            base_dir = os.path.join(config_dir, 'plugins', BATCH_DIR_NAME)
+        _store = BatchStore(base_dir)
+    return _store
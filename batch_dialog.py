@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+""""Ask each book" dialog with per-book status, latency and answers."""
+
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QComboBox,
+                             QSpinBox, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QProgressBar, QAbstractItemView, QMessageBox)
+
+from .plugin_prefs import get_prefs, build_configured_ai_entries
+from .i18n import get_translation
+from .batch_ask import (BatchRunner, ProviderLimiter, get_batch_store,
+                        STATUS_PENDING, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED,
+                        DEFAULT_MAX_WORKERS, DEFAULT_PROVIDER_CONCURRENCY)
+from .widgets import apply_button_style
+from .ui_constants import SPACING_SMALL, SPACING_MEDIUM, MARGIN_MEDIUM
+
+logger = logging.getLogger(__name__)
+
+COL_BOOK, COL_STATUS, COL_LATENCY, COL_ANSWER = range(4)
+# 表格中回答列显示的最大字符数（完整回答在提示框和历史记录中）
+ANSWER_PREVIEW_CHARS = 300
+
+
+class BatchAskDialog(QDialog):
+    """逐书提问对话框"""
+
+    # 后台线程 -> 主线程
+    item_updated = pyqtSignal(object, object)  # (book_id, item)
+    answer_ready = pyqtSignal(object, str, str)  # (book_id, prompt, answer)
+    batch_finished = pyqtSignal(bool)  # cancelled
+
+    def __init__(self, gui, books_info, language_name_fn=None):
+        super().__init__(gui)
+        self.gui = gui
+        self.prefs = get_prefs()
+        self.i18n = get_translation(self.prefs.get('language', 'en'))
+        self.books = {book.id: book for book in books_info}
+        self.book_order = [book.id for book in books_info]
+        self.language_name_fn = language_name_fn
+        self.job = None
+        self.runner = None
+        self._rows = {}
+        self._local = threading.local()
+
+        self.item_updated.connect(self._on_item_updated)
+        self.answer_ready.connect(self._on_answer_ready)
+        self.batch_finished.connect(self._on_batch_finished)
+
+        self.setWindowTitle(self.i18n.get('batch_ask_title', 'Ask Each Book'))
+        self.setMinimumSize(760, 480)
+        self._setup_ui()
+        self._load_unfinished_job()
+
+    # ----- 界面 -----
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(SPACING_MEDIUM)
+        layout.setContentsMargins(MARGIN_MEDIUM, MARGIN_MEDIUM, MARGIN_MEDIUM, MARGIN_MEDIUM)
+
+        self.question_edit = QLineEdit(self)
+        self.question_edit.setPlaceholderText(self.i18n.get('batch_ask_question_placeholder',
+                                                            'Question to ask about each selected book'))
+        layout.addWidget(self.question_edit)
+
+        options = QHBoxLayout()
+        options.setSpacing(SPACING_SMALL)
+        options.addWidget(QLabel(self.i18n.get('batch_ask_ai', 'AI:'), self))
+        self.ai_combo = QComboBox(self)
+        configured_ais = build_configured_ai_entries(
+            self.prefs.get('models', {}), selected_model=self.prefs.get('selected_model', ''), i18n=self.i18n,
+        )
+        for ai_id, display_text, _, is_default in configured_ais:
+            self.ai_combo.addItem(display_text, ai_id)
+            if is_default:
+                self.ai_combo.setCurrentIndex(self.ai_combo.count() - 1)
+        options.addWidget(self.ai_combo, 1)
+        options.addWidget(QLabel(self.i18n.get('batch_ask_concurrency', 'Parallel requests:'), self))
+        self.concurrency_spin = QSpinBox(self)
+        self.concurrency_spin.setRange(1, 16)
+        self.concurrency_spin.setValue(int(self.prefs.get('batch_max_concurrency', DEFAULT_MAX_WORKERS)))
+        options.addWidget(self.concurrency_spin)
+        layout.addLayout(options)
+
+        self.table = QTableWidget(0, 4, self)
+        self.table.setHorizontalHeaderLabels([
+            self.i18n.get('batch_ask_col_book', 'Book'),
+            self.i18n.get('batch_ask_col_status', 'Status'),
+            self.i18n.get('batch_ask_col_latency', 'Latency'),
+            self.i18n.get('batch_ask_col_answer', 'Answer'),
+        ])
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(COL_BOOK, QHeaderView.Interactive)
+        header.setSectionResizeMode(COL_STATUS, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(COL_LATENCY, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(COL_ANSWER, QHeaderView.Stretch)
+        self.table.setColumnWidth(COL_BOOK, 200)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table, 1)
+
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setFormat('%v / %m')
+        layout.addWidget(self.progress_bar)
+
+        buttons = QHBoxLayout()
+        self.summary_label = QLabel('', self)
+        buttons.addWidget(self.summary_label, 1)
+        self.start_button = QPushButton(self.i18n.get('batch_ask_start', 'Start'), self)
+        self.start_button.clicked.connect(self.start_batch)
+        self.resume_button = QPushButton(self.i18n.get('batch_ask_resume', 'Resume'), self)
+        self.resume_button.clicked.connect(self.resume_batch)
+        self.resume_button.setVisible(False)
+        self.stop_button = QPushButton(self.i18n.get('stop_button', 'Stop'), self)
+        self.stop_button.clicked.connect(self.stop_batch)
+        self.stop_button.setEnabled(False)
+        for button in (self.start_button, self.resume_button, self.stop_button):
+            apply_button_style(button, min_width=90)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+        self._fill_table(None)
+
+    def _fill_table(self, job):
+        self.table.setRowCount(len(self.book_order))
+        self._rows = {}
+        for row, book_id in enumerate(self.book_order):
+            self._rows[book_id] = row
+            self.table.setItem(row, COL_BOOK, QTableWidgetItem(self.books[book_id].title))
+            item = job.item(book_id) if job is not None else {'status': STATUS_PENDING}
+            self._show_item(book_id, item)
+        self._update_progress()
+
+    def _status_text(self, status):
+        return {
+            STATUS_PENDING: self.i18n.get('batch_ask_status_pending', 'Pending'),
+            STATUS_RUNNING: self.i18n.get('batch_ask_status_running', 'Running…'),
+            STATUS_DONE: self.i18n.get('batch_ask_status_done', 'Done'),
+            STATUS_FAILED: self.i18n.get('batch_ask_status_failed', 'Failed'),
+        }.get(status, status)
+
+    def _show_item(self, book_id, item):
+        row = self._rows.get(book_id)
+        if row is None:
+            return
+        self.table.setItem(row, COL_STATUS, QTableWidgetItem(self._status_text(item['status'])))
+        latency = item.get('latency')
+        self.table.setItem(row, COL_LATENCY, QTableWidgetItem(f'{latency:.1f}s' if latency is not None else ''))
+        text = item.get('answer') or item.get('error') or ''
+        preview = ' '.join(text.split())
+        if len(preview) > ANSWER_PREVIEW_CHARS:
+            preview = preview[:ANSWER_PREVIEW_CHARS] + '…'
+        answer_item = QTableWidgetItem(preview)
+        answer_item.setToolTip(text[:4000])
+        self.table.setItem(row, COL_ANSWER, answer_item)
+
+    def _update_progress(self):
+        total = len(self.book_order)
+        counts = self.job.counts() if self.job is not None else {}
+        finished = counts.get(STATUS_DONE, 0) + counts.get(STATUS_FAILED, 0)
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(finished)
+        if self.job is None:
+            self.summary_label.setText('')
+            return
+        self.summary_label.setText(self.i18n.get(
+            'batch_ask_summary', '{done} done, {failed} failed, {pending} remaining'
+        ).format(done=counts.get(STATUS_DONE, 0), failed=counts.get(STATUS_FAILED, 0),
+                 pending=counts.get(STATUS_PENDING, 0) + counts.get(STATUS_RUNNING, 0)))
+
+    def _set_running(self, running):
+        self.start_button.setEnabled(not running)
+        self.resume_button.setEnabled(not running)
+        self.stop_button.setEnabled(running)
+        self.question_edit.setEnabled(not running)
+        self.ai_combo.setEnabled(not running)
+        self.concurrency_spin.setEnabled(not running)
+
+    # ----- 批次 -----
+
+    def _load_unfinished_job(self):
+        """同一批书有未完成的批次时，显示其进度并允许继续"""
+        try:
+            job = get_batch_store().latest_unfinished(self.book_order)
+        except Exception as e:
+            logger.warning(f"读取未完成批次失败: {str(e)}")
+            return
+        if job is None:
+            return
+        self.job = job
+        self.question_edit.setText(job.question)
+        index = self.ai_combo.findData(job.ai_id)
+        if index >= 0:
+            self.ai_combo.setCurrentIndex(index)
+        self.resume_button.setVisible(True)
+        self._fill_table(job)
+
+    def start_batch(self):
+        question = self.question_edit.text().strip()
+        ai_id = self.ai_combo.currentData()
+        if not question or not ai_id:
+            return
+        books = [(book_id, self.books[book_id].title) for book_id in self.book_order]
+        self.job = get_batch_store().create(question, ai_id, books, template=self.prefs.get('template', ''))
+        self.resume_button.setVisible(False)
+        self._fill_table(self.job)
+        self._run()
+
+    def resume_batch(self):
+        if self.job is None:
+            return
+        self.resume_button.setVisible(False)
+        self._run()
+
+    def _run(self):
+        self.prefs['batch_max_concurrency'] = self.concurrency_spin.value()
+        limiter = ProviderLimiter(self.prefs.get('batch_provider_concurrency', DEFAULT_PROVIDER_CONCURRENCY))
+        self.runner = BatchRunner(
+            self.job, self._ask, self._build_prompt,
+            max_workers=self.concurrency_spin.value(), limiter=limiter,
+            on_update=self.item_updated.emit, on_answer=self.answer_ready.emit,
+            on_finished=self.batch_finished.emit,
+        )
+        self._set_running(True)
+        self.runner.start()
+
+    def stop_batch(self):
+        if self.runner is not None:
+            self.runner.cancel()
+            self.stop_button.setEnabled(False)
+
+    # ----- 工作线程 -----
+
+    def _build_prompt(self, book_id):
+        from .utils import build_single_book_prompt
+        from .prompts_widget import apply_prompt_enhancements
+        from .book_passages import template_uses_passages
+        book = self.books[book_id]
+        passages = ''
+        if template_uses_passages(self.job.template):
+            passages = self._select_passages(book_id)
+        prompt = build_single_book_prompt(
+            book, self.job.question, self.job.template, self.i18n,
+            language_name_fn=self.language_name_fn, passages=passages,
+        )
+        return apply_prompt_enhancements(prompt)
+
+    def _select_passages(self, book_id):
+        from .book_passages import find_book_format, get_passage_store
+        fmt, path = find_book_format(self.gui.current_db, book_id)
+        if not fmt:
+            return self.i18n.get('book_passages_unavailable',
+                '(No readable book text is available; EPUB, AZW3 or TXT format is required.)')
+        index = get_passage_store().build(book_id, path, fmt, cancel_event=self.runner._cancel_event)
+        indices = index.select_passages(self.job.question, self.prefs.get('book_passages_max_chars'))
+        return index.format_passages(indices)
+
+    def _ask(self, prompt, ai_id):
+        # APIClient 在切换模型时会修改自身状态，每个工作线程使用独立实例
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            from .api import APIClient
+            from .rate_limiter import PRIORITY_BACKGROUND
+            api = APIClient(i18n=self.i18n, priority=PRIORITY_BACKGROUND)
+            self._local.api = api
+        return api.ask(prompt, lang_code=self.prefs.get('language', 'en'), model_id=ai_id)
+
+    # ----- 主线程回调 -----
+
+    def _on_item_updated(self, book_id, item):
+        self._show_item(book_id, item)
+        self._update_progress()
+
+    def _on_answer_ready(self, book_id, prompt, answer):
+        """每本书的回答保存为一条单书历史记录，可在该书的 Ask 对话框中查看和追问"""
+        from .history_manager import HistoryManager
+        book = self.books[book_id]
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        uid_hash = hashlib.md5(f'{timestamp}_{book_id}_{self.job.batch_id}'.encode()).hexdigest()[:12]
+        pubdate = book.get('pubdate', '')
+        if hasattr(pubdate, 'strftime'):
+            pubdate = pubdate.strftime('%Y-%m-%d')
+        books_metadata = [{
+            'id': book_id,
+            'title': book.get('title', ''),
+            'authors': book.get('authors', []),
+            'publisher': book.get('publisher', ''),
+            'pubdate': pubdate or '',
+            'languages': book.get('languages', []),
+            'series': book.get('series', ''),
+            'deleted': False,
+        }]
+        config = (self.prefs.get('models', {}) or {}).get(self.job.ai_id, {})
+        model_info = {
+            'provider_name': config.get('display_name', self.job.ai_id),
+            'model': config.get('model', ''),
+            'api_base': config.get('api_base_url', ''),
+        }
+        try:
+            HistoryManager().save_history(
+                f'{timestamp}_{uid_hash}', 'single', books_metadata, self.job.question, answer,
+                ai_id=self.job.ai_id, model_info=model_info, prompt=prompt,
+            )
+            from .statistics_widget import increment_ai_reply_count
+            increment_ai_reply_count(self.prefs, ai_id=self.job.ai_id, mode='single', book_ids=[book_id])
+        except Exception as e:
+            logger.warning(f"保存逐书回答历史失败 (book_id={book_id}): {str(e)}")
+
+    def _on_batch_finished(self, cancelled):
+        self._set_running(False)
+        self._update_progress()
+        if self.job is not None and not self.job.is_finished:
+            self.resume_button.setVisible(True)
+        self.runner = None
+
+    def _confirm_stop(self):
+        """关闭对话框前确认并停止正在运行的批处理；用户选择不停止时返回 False"""
+        if self.runner is None:
+            return True
+        reply = QMessageBox.question(
+            self,
+            self.i18n.get('batch_ask_title', 'Ask Each Book'),
+            self.i18n.get('batch_ask_confirm_close',
+                          'The batch is still running. Stop it? You can resume it later.'),
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return False
+        self.runner.cancel()
+        return True
+
+    def reject(self):
+        # Esc 键和关闭窗口都经过 reject()（QDialog.closeEvent 会调用它，对话框仍可见时忽略关闭）
+        if self._confirm_stop():
+            super().reject()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Bulk loader for the book metadata used by prompts and the metadata bar."""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 提示词模板 / 元数据栏需要的字段（对应 calibre 字段名）
+BOOK_FIELDS = ('title', 'authors', 'publisher', 'pubdate', 'series', 'series_index', 'languages')
+# 按需读取的字段（语义索引用），默认不加载
+EXTRA_FIELDS = ('tags', 'comments')
+ALL_FIELDS = BOOK_FIELDS + EXTRA_FIELDS
+
+
+class BookRecord:
+    """轻量书籍元数据记录，接口与 calibre Metadata 的常用部分兼容（属性访问 + get）"""
+
+    __slots__ = ('id',) + ALL_FIELDS
+
+    def __init__(self, book_id, title='', authors=(), publisher='', pubdate=None,
+                 series='', series_index=None, languages=(), tags=(), comments=''):
+        self.id = book_id
+        self.title = title or ''
+        self.authors = list(authors or [])
+        self.publisher = publisher or ''
+        self.pubdate = pubdate
+        self.series = series or ''
+        self.series_index = series_index
+        self.languages = list(languages or [])
+        self.tags = list(tags or [])
+        self.comments = comments or ''
+
+    @property
+    def language(self):
+        """主语言（与 Metadata.language 相同语义）"""
+        return self.languages[0] if self.languages else None
+
+    def get(self, field, default=None):
+        if field == 'id' or field in ALL_FIELDS:
+            value = getattr(self, field)
+            return default if value is None else value
+        return default
+
+    def __repr__(self):
+        return f'BookRecord(id={self.id!r}, title={self.title!r})'
+
+
+def _new_api(db):
+    """返回 new_api（Cache）；没有时返回 None"""
+    api = getattr(db, 'new_api', None)
+    if api is not None and hasattr(api, 'all_field_for'):
+        return api
+    return None
+
+
+def book_exists(db, book_id):
+    """检查书籍是否仍存在于数据库（不构造 Metadata）"""
+    api = _new_api(db)
+    if api is not None:
+        try:
+            return bool(api.has_id(book_id))
+        except Exception:
+            return False
+    try:
+        db.get_metadata(book_id, index_is_id=True)
+        return True
+    except Exception:
+        return False
+
+
+def load_books(db, book_ids, fields=BOOK_FIELDS):
+    """批量加载书籍元数据
+
+    :param db: calibre 数据库对象（gui.current_db）
+    :param book_ids: 书籍 ID 列表（保持顺序）
+    :param fields: 需要读取的字段，未读取的字段使用默认值
+    :return: (BookRecord 列表, 读取失败/已删除的书籍 ID 列表)
+    """
+    book_ids = list(book_ids)
+    api = _new_api(db)
+    if api is None:
+        return _load_books_legacy(db, book_ids, fields)
+
+    existing = []
+    failed = []
+    for book_id in book_ids:
+        try:
+            (existing if api.has_id(book_id) else failed).append(book_id)
+        except Exception:
+            failed.append(book_id)
+    if not existing:
+        return [], failed
+
+    values = {}
+    for field in fields:
+        try:
+            values[field] = api.all_field_for(field, existing, default_value=None)
+        except Exception as e:
+            # 单个字段失败不影响其他字段
+            logger.warning(f"批量读取字段 {field} 失败: {str(e)}")
+            values[field] = {}
+
+    records = [
+        BookRecord(book_id, **{field: values[field].get(book_id) for field in fields})
+        for book_id in existing
+    ]
+    return records, failed
+
+
+def _load_books_legacy(db, book_ids, fields):
+    """没有 new_api 时逐本读取（旧版 calibre）"""
+    records = []
+    failed = []
+    for book_id in book_ids:
+        try:
+            mi = db.get_metadata(book_id, index_is_id=True)
+        except Exception as e:
+            logger.error(f"Failed to read book metadata (book_id={book_id}): {str(e)}")
+            failed.append(book_id)
+            continue
+        records.append(BookRecord(book_id, **{field: getattr(mi, field, None) for field in fields}))
+    return records, failed
@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Full-text passage retrieval (BM25) for single-book questions."""
+
+import codecs
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from collections import Counter, OrderedDict
+from html.parser import HTMLParser
+from posixpath import dirname as posix_dirname, join as posix_join, normpath as posix_normpath
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = 'ask_ai_plugin_passages'
+_INDEX_VERSION = 1
+
+# 按优先级排列的可提取格式
+SUPPORTED_FORMATS = ('EPUB', 'KEPUB', 'AZW3', 'TXT')
+
+CHUNK_CHARS = 1200
+CHUNK_OVERLAP = 200
+DEFAULT_MAX_PASSAGE_CHARS = 8000
+# 嵌入重排时从词法结果中取的候选倍数
+RERANK_CANDIDATES = 4
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# 内存中保留的已加载索引数
+_MEMORY_CACHE_SIZE = 4
+
+_CJK_RANGES = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_TOKEN_RE = re.compile('[' + _CJK_RANGES + r']+|[^\W_]+')
+_CJK_RE = re.compile('[' + _CJK_RANGES + ']')
+_SPACE_RE = re.compile(r'[ \t\r\f\v]+')
+_STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have he her his i in is it its me my of on or '
+    's she that the their them they this to was were what when where which who why will with '
+    'you your about does do did how can'.split()
+)
+
+
+class ExtractionCancelled(Exception):
+    """提取或建索引被取消"""
+
+
+def tokenize(text):
+    """词法切分：拉丁文按词（去停用词），中日韩文字按二元组"""
+    tokens = []
+    for match in _TOKEN_RE.findall(text.lower()):
+        if _CJK_RE.match(match):
+            if len(match) == 1:
+                tokens.append(match)
+            else:
+                tokens.extend(match[i:i + 2] for i in range(len(match) - 1))
+        elif match not in _STOPWORDS:
+            tokens.append(match)
+    return tokens
+
+
+# ----- 文本提取 -----
+
+class _HTMLTextExtractor(HTMLParser):
+    """把 XHTML 转为纯文本，块级元素之间换行，忽略 head/script/style"""
+
+    _SKIP = {'head', 'script', 'style', 'svg', 'math'}
+    _BLOCK = {'p', 'div', 'br', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'tr',
+              'blockquote', 'section', 'article', 'pre', 'hr', 'dd', 'dt'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip_depth += 1
+        elif tag in self._BLOCK:
+            self._parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self._BLOCK:
+            self._parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def text(self):
+        lines = (_SPACE_RE.sub(' ', line).strip() for line in ''.join(self._parts).split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+
+def html_to_text(markup):
+    if isinstance(markup, bytes):
+        markup = markup.decode('utf-8', 'replace')
+    parser = _HTMLTextExtractor()
+    parser.feed(markup)
+    parser.close()
+    return parser.text()
+
+
+def _iter_epub_text(path):
+    """按 spine 顺序逐章读取 EPUB 正文（直接读 zip，不解包）"""
+    with zipfile.ZipFile(path) as zf:
+        container = zf.read('META-INF/container.xml').decode('utf-8', 'replace')
+        match = re.search(r'full-path\s*=\s*["\']([^"\']+)["\']', container)
+        if not match:
+            raise ValueError('EPUB container.xml has no rootfile')
+        opf_name = match.group(1)
+        opf = zf.read(opf_name).decode('utf-8', 'replace')
+        opf_dir = posix_dirname(opf_name)
+
+        manifest = {}
+        for item in re.finditer(r'<(?:\w+:)?item\b([^>]*)>', opf):
+            attrs = dict(re.findall(r'([\w:-]+)\s*=\s*["\']([^"\']*)["\']', item.group(1)))
+            if 'id' in attrs and 'href' in attrs:
+                manifest[attrs['id']] = posix_normpath(posix_join(opf_dir, unquote(attrs['href'])))
+        spine = re.findall(r'<(?:\w+:)?itemref\b[^>]*idref\s*=\s*["\']([^"\']+)["\']', opf)
+
+        names = set(zf.namelist())
+        for idref in spine:
+            name = manifest.get(idref)
+            if name in names:
+                text = html_to_text(zf.read(name))
+                if text:
+                    yield text
+
+
+def _iter_container_text(path):
+    """通过 calibre 的电子书容器读取 AZW3 等格式（内部会先转换为 OEB）"""
+    from calibre.ebooks.oeb.polish.container import get_container
+    # 转换结果放在临时目录中，读完（或生成器被关闭）后删除
+    with tempfile.TemporaryDirectory(prefix='ask_ai_passages_') as tdir:
+        container = get_container(path, tdir=tdir, tweak_mode=True)
+        for name, _linear in container.spine_names:
+            text = html_to_text(container.raw_data(name, decode=True))
+            if text:
+                yield text
+
+
+def _iter_txt_text(path, block_size=256 * 1024):
+    with open(path, 'rb') as f:
+        head = f.read(4)
+        f.seek(0)
+        encoding = 'utf-16' if head[:2] in (b'\xff\xfe', b'\xfe\xff') else 'utf-8-sig'
+        decoder = codecs.getincrementaldecoder(encoding)('replace')
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield decoder.decode(block)
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+def iter_book_text(path, fmt):
+    """按格式流式产出书籍正文片段"""
+    fmt = fmt.upper()
+    if fmt in ('EPUB', 'KEPUB'):
+        return _iter_epub_text(path)
+    if fmt == 'TXT':
+        return _iter_txt_text(path)
+    return _iter_container_text(path)
+
+
+def chunk_text(segments, chunk_chars=CHUNK_CHARS, overlap=CHUNK_OVERLAP, cancel_event=None):
+    """
+    把流式文本切分为相互重叠的块
+
+    尽量在段落或句子边界处切分；相邻块重叠 overlap 个字符，避免答案被切断。
+    """
+    buffer = ''
+    for segment in segments:
+        if cancel_event is not None and cancel_event.is_set():
+            raise ExtractionCancelled()
+        buffer = f'{buffer}\n{segment}' if buffer else segment
+        while len(buffer) >= chunk_chars + overlap:
+            end = _break_point(buffer, chunk_chars)
+            yield buffer[:end].strip()
+            buffer = buffer[max(end - overlap, 1):]
+    while len(buffer) > chunk_chars:
+        end = _break_point(buffer, chunk_chars)
+        yield buffer[:end].strip()
+        buffer = buffer[max(end - overlap, 1):]
+    buffer = buffer.strip()
+    if buffer:
+        yield buffer
+
+
+def _break_point(text, limit):
+    """在 limit 附近寻找段落/句子/空白边界"""
+    floor = limit // 2
+    for sep in ('\n', '. ', '。', ' '):
+        pos = text.rfind(sep, floor, limit)
+        if pos != -1:
+            return pos + len(sep)
+    return limit
+
+
+# ----- 索引 -----
+
+class PassageIndex:
+    """单本书的段落块和 BM25 倒排索引"""
+
+    def __init__(self, chunks, postings=None, lengths=None, source=None):
+        self.chunks = chunks
+        self.source = source or {}
+        if postings is None:
+            postings, lengths = self._build(chunks)
+        self.postings = postings
+        self.lengths = lengths
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @staticmethod
+    def _build(chunks):
+        postings = {}
+        lengths = []
+        for idx, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).extend((idx, tf))
+        return postings, lengths
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query, k=8, embed_fn=None):
+        """
+        检索与问题最相关的段落块
+
+        :param embed_fn: 可选嵌入函数；提供时对词法候选做向量重排
+        :return: [(chunk_index, score)]，按得分降序
+        """
+        if not self.chunks:
+            return []
+        scores = self._bm25(query)
+        if not scores:
+            return self._spread(k)
+        candidates = sorted(scores.items(), key=lambda item: -item[1])
+        if embed_fn is None:
+            return candidates[:k]
+        candidates = candidates[:k * RERANK_CANDIDATES]
+        try:
+            return self._rerank(query, candidates, k, embed_fn)
+        except Exception as e:
+            logger.warning(f"段落向量重排失败，使用词法结果: {str(e)}")
+            return candidates[:k]
+
+    def _bm25(self, query):
+        total = len(self.chunks)
+        avg = self.avg_length or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting) // 2
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for i in range(0, len(posting), 2):
+                idx, tf = posting[i], posting[i + 1]
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[idx] / avg)
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        return scores
+
+    def _rerank(self, query, candidates, k, embed_fn):
+        vectors = embed_fn([query] + [self.chunks[idx] for idx, _ in candidates])
+        query_vector = vectors[0]
+        query_norm = math.sqrt(sum(x * x for x in query_vector)) or 1.0
+        reranked = []
+        for (idx, _), vector in zip(candidates, vectors[1:]):
+            norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+            reranked.append((idx, sum(a * b for a, b in zip(query_vector, vector)) / (norm * query_norm)))
+        reranked.sort(key=lambda item: -item[1])
+        return reranked[:k]
+
+    def _spread(self, k):
+        """问题与正文没有词汇重合时（例如“这本书讲什么”），均匀取样全书"""
+        total = len(self.chunks)
+        if total <= k:
+            return [(idx, 0.0) for idx in range(total)]
+        step = total / k
+        return [(int(i * step), 0.0) for i in range(k)]
+
+    def select_passages(self, query, max_chars=DEFAULT_MAX_PASSAGE_CHARS, embed_fn=None):
+        """按相关度挑选段落直到字符上限，再按书中顺序输出"""
+        k = max(1, max_chars // max(1, CHUNK_CHARS - CHUNK_OVERLAP))
+        selected = []
+        used = 0
+        for idx, _score in self.search(query, k=k + 2, embed_fn=embed_fn):
+            size = len(self.chunks[idx])
+            if selected and used + size > max_chars:
+                continue
+            selected.append(idx)
+            used += size
+            if used >= max_chars:
+                break
+        return sorted(selected)
+
+    def format_passages(self, indices):
+        total = len(self.chunks)
+        parts = []
+        for idx in indices:
+            position = int(100 * idx / total) if total else 0
+            parts.append(f'[Passage {idx + 1}/{total}, ~{position}%]\n{self.chunks[idx]}')
+        return '\n\n'.join(parts)
+
+    # ----- 持久化 -----
+
+    def to_dict(self):
+        return {
+            'version': _INDEX_VERSION,
+            'source': self.source,
+            'chunk_chars': CHUNK_CHARS,
+            'overlap': CHUNK_OVERLAP,
+            'chunks': self.chunks,
+            'postings': self.postings,
+            'lengths': self.lengths,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['chunks'], data['postings'], data['lengths'], source=data.get('source'))
+
+
+class PassageStore:
+    """按书籍缓存段落索引；缓存以格式文件路径、大小和修改时间为键"""
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_path(self, book_id):
+        return os.path.join(self.base_dir, f'{book_id}.json.gz')
+
+    @staticmethod
+    def source_key(path, fmt):
+        stat = os.stat(path)
+        return {'path': path, 'format': fmt.upper(), 'mtime': stat.st_mtime, 'size': stat.st_size}
+
+    def _remember(self, book_id, index):
+        with self._lock:
+            self._memory[book_id] = index
+            self._memory.move_to_end(book_id)
+            while len(self._memory) > _MEMORY_CACHE_SIZE:
+                self._memory.popitem(last=False)
+
+    def get_cached(self, book_id, path, fmt):
+        """返回仍然有效的缓存索引；书籍文件改动过或没有缓存时返回 None"""
+        source = self.source_key(path, fmt)
+        with self._lock:
+            index = self._memory.get(book_id)
+        if index is not None and index.source == source:
+            return index
+        cache_path = self._cache_path(book_id)
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with gzip.open(cache_path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取段落索引缓存失败: {str(e)}")
+            return None
+        if (data.get('version') != _INDEX_VERSION or data.get('source') != source or
+                data.get('chunk_chars') != CHUNK_CHARS or data.get('overlap') != CHUNK_OVERLAP):
+            return None
+        index = PassageIndex.from_dict(data)
+        self._remember(book_id, index)
+        return index
+
+    def build(self, book_id, path, fmt, cancel_event=None, progress=None):
+        """
+        提取正文并建立索引（命中缓存时直接返回）
+
+        :param progress: 可选回调 progress(已处理字节比例 0-100)
+        :raises ExtractionCancelled: cancel_event 被设置时
+        """
+        index = self.get_cached(book_id, path, fmt)
+        if index is not None:
+            return index
+        source = self.source_key(path, fmt)
+        text = iter_book_text(path, fmt)
+        segments = text if progress is None else _report_progress(text, source['size'], fmt, progress)
+        try:
+            chunks = list(chunk_text(segments, cancel_event=cancel_event))
+        finally:
+            # 取消时也立即关闭读取生成器，删除格式转换用的临时目录
+            text.close()
+        if cancel_event is not None and cancel_event.is_set():
+            raise ExtractionCancelled()
+        index = PassageIndex(chunks, source=source)
+        self._save(book_id, index)
+        self._remember(book_id, index)
+        logger.info(f"段落索引已建立: book_id={book_id}, format={fmt}, chunks={len(chunks)}")
+        return index
+
+    def _save(self, book_id, index):
+        os.makedirs(self.base_dir, exist_ok=True)
+        cache_path = self._cache_path(book_id)
+        tmp_path = cache_path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(index.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+
+
+def _report_progress(segments, total_bytes, fmt, progress):
+    """按已产出的文本量估算进度（TXT 接近字节数；压缩格式按约 2.5 倍估算）"""
+    expected = max(1, total_bytes * (1 if fmt.upper() == 'TXT' else 2.5))
+    done = 0
+    last = -1
+    for segment in segments:
+        done += len(segment)
+        percent = min(99, int(100 * done / expected))
+        if percent != last:
+            progress(percent)
+            last = percent
+        yield segment
+    progress(100)
+
+
+# ----- 插件集成 -----
+
+_store = None
+
+
+def get_passage_store(base_dir=None):
+    global _store
+    if _store is None:
+        if base_dir is None:
+            from calibre.utils.config import config_dir
+            base_dir = os.path.join(config_dir, 'plugins', CACHE_DIR_NAME)
+        _store = PassageStore(base_dir)
+    return _store
+
+
+def find_book_format(db, book_id):
+    """返回第一个可提取的格式 (format, path)；没有时返回 (None, None)"""
+    api = getattr(db, 'new_api', db)
+    try:
+        formats = {fmt.upper() for fmt in (api.formats(book_id) or ())}
+    except Exception as e:
+        logger.warning(f"读取书籍格式失败 (book_id={book_id}): {str(e)}")
+        return None, None
+    for fmt in SUPPORTED_FORMATS:
+        if fmt in formats:
+            path = api.format_abspath(book_id, fmt)
+            if path and os.path.exists(path):
+                return fmt, path
+    return None, None
+
+
+def template_uses_passages(template):
+    return '{passages}' in (template or '')
@@ -4,12 +4,13 @@
 import copy
 import logging
 import re
+import threading
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, 
                             QLineEdit, QTextEdit, QPlainTextEdit, QComboBox, 
                             QPushButton, QHBoxLayout, QFormLayout, QGroupBox, QScrollArea, QSizePolicy,
                             QFrame, QCheckBox, QMessageBox, QApplication)
 from PyQt5.QtCore import pyqtSignal, QTimer, Qt, QEvent
-from PyQt5.QtGui import QFontMetrics
+from PyQt5.QtGui import QFontMetrics, QIntValidator
 from .models.grok import GrokModel
 from .models.gemini import GeminiModel
 from .models.deepseek import DeepseekModel
@@ -28,6 +29,7 @@ from .i18n import get_default_template, get_translation, get_suggestion_template
 from .models.base import AIProvider, ModelConfig, DEFAULT_MODELS, AIModelFactory, BaseAIModel
 from .utils import mask_api_key, mask_api_key_in_text, safe_log_config
 from .prompt_limits import DEFAULT_CUSTOM_LIMIT
+from .model_catalog import STATUS_UPDATED, catalog_key, get_model_catalog
 from .widgets import NoScrollComboBox, apply_button_style
 from .ui_constants import (
     SPACING_TINY, SPACING_SMALL, SPACING_MEDIUM, SPACING_LARGE,
@@ -42,511 +44,20 @@ from .ui_constants import (
 logger = logging.getLogger(__name__)
 
 
-# 创建配置对象
-prefs = JSONConfig('plugins/ask_ai_plugin')
-
-# 从i18n模块获取支持的语言列表
-# 将字典转换为列表格式 [(code, name), ...]
-_languages_dict = get_all_languages()
-SUPPORTED_LANGUAGES = [(code, name) for code, name in _languages_dict.items()]
-# 确保英语作为默认语言排在第一位
-SUPPORTED_LANGUAGES.sort(key=lambda x: 0 if x[0] == 'en' else 1)
-
-# 获取AI服务商配置的函数
-def get_current_model_config(provider: AIProvider) -> ModelConfig:
-    """获取指定AI服务商的模型配置"""
-    return DEFAULT_MODELS.get(provider)
-
-# 获取AI服务商配置
-GROK_CONFIG = get_current_model_config(AIProvider.AI_GROK)
-GEMINI_CONFIG = get_current_model_config(AIProvider.AI_GEMINI)
-DEEPSEEK_CONFIG = get_current_model_config(AIProvider.AI_DEEPSEEK)
-CUSTOM_CONFIG = get_current_model_config(AIProvider.AI_CUSTOM)
-OPENAI_CONFIG = get_current_model_config(AIProvider.AI_OPENAI)
-ANTHROPIC_CONFIG = get_current_model_config(AIProvider.AI_ANTHROPIC)
-NVIDIA_CONFIG = get_current_model_config(AIProvider.AI_NVIDIA)
-NVIDIA_FREE_CONFIG = get_current_model_config(AIProvider.AI_NVIDIA_FREE)
-OPENROUTER_CONFIG = get_current_model_config(AIProvider.AI_OPENROUTER)
-PERPLEXITY_CONFIG = get_current_model_config(AIProvider.AI_PERPLEXITY)
-OLLAMA_CONFIG = get_current_model_config(AIProvider.AI_OLLAMA)
-
-AI_PROVIDER_ORDER = [
-    'openai', 'anthropic', 'gemini', 'grok', 'deepseek',
-    'nvidia', 'nvidia_free', 'perplexity', 'openrouter', 'ollama', 'custom',
-]
-
-
-def extract_provider_id(config_id, config):
-    """从配置中提取 provider_id（兼容旧数据）。"""
-    provider_id = (config or {}).get('provider_id')
-    if provider_id:
-        return provider_id
-    if '_' in config_id:
-        return config_id.split('_', 1)[0]
-    return config_id
-
-
-def is_ai_config_complete(provider_id, model_config):
-    """统一判断 AI 配置是否完整。"""
-    provider_id = (provider_id or '').strip()
-    config = model_config or {}
-
-    if provider_id in ['ollama', 'custom', 'nvidia_free']:
-        has_auth = True
-    else:
-        api_key_field = 'auth_token' if provider_id == 'grok' else 'api_key'
-        has_auth = bool((config.get(api_key_field) or '').strip())
-
-    has_model = bool((config.get('model') or '').strip())
-    return has_auth and has_model
-
-
-def get_provider_display_name(provider_id, config, i18n=None):
-    """获取服务商显示名，确保不为空。"""
-    if provider_id == 'nvidia_free':
-        free_text = (i18n or {}).get('free', 'Free')
-        return f"Nvidia AI ({free_text})"
-
-    provider_name = (config or {}).get('display_name')
-    if provider_name and str(provider_name).strip():
-        return str(provider_name).strip()
-
-    fallback = provider_id.replace('_', ' ').strip().title() if provider_id else ''
-    return fallback or 'AI'
-
-
-def build_ai_display_text(config_id, config, i18n=None, include_model_placeholder=False):
-    """构建 AI 显示文本，避免空白项。"""
-    provider_id = extract_provider_id(config_id, config or {})
-    provider_name = get_provider_display_name(provider_id, config or {}, i18n=i18n)
-    model_name = ((config or {}).get('model') or '').strip()
-
-    if model_name:
-        return f"{provider_name} - {model_name}"
-    if include_model_placeholder:
-        unspecified_text = (i18n or {}).get('unspecified_model', 'Unspecified model')
-        return f"{provider_name} - {unspecified_text}"
-    return provider_name
-
-
-def _stable_number_duplicate_labels(configured_items):
-    """为重复显示名添加稳定序号，输出顺序稳定。"""
-    grouped = {}
-    for item in configured_items:
-        grouped.setdefault(item['base_text'], []).append(item)
-
-    normalized = []
-    for base_text, items in grouped.items():
-        if len(items) == 1:
-            normalized.append((items[0]['config_id'], base_text, items[0]['sort_key'], items[0]['is_default']))
-            continue
-
-        items_sorted = sorted(items, key=lambda x: x['config_id'])
-        for idx, entry in enumerate(items_sorted, start=1):
-            normalized.append((
-                entry['config_id'],
-                f"{base_text} ({idx})",
-                entry['sort_key'],
-                entry['is_default'],
-            ))
-
-    normalized.sort(key=lambda x: (x[2], x[1].lower(), x[0]))
-    return normalized
-
-
-def build_configured_ai_entries(models_config, selected_model='', i18n=None, include_model_placeholder=False):
-    """构建已配置 AI 条目：统一过滤、显示与排序。"""
-    configured_items = []
-    for config_id, config in (models_config or {}).items():
-        provider_id = extract_provider_id(config_id, config or {})
-        if not is_ai_config_complete(provider_id, config or {}):
-            continue
-
-        base_text = build_ai_display_text(
-            config_id,
-            config or {},
-            i18n=i18n,
-            include_model_placeholder=include_model_placeholder,
-        )
-        sort_key = AI_PROVIDER_ORDER.index(provider_id) if provider_id in AI_PROVIDER_ORDER else 999
-        configured_items.append({
-            'config_id': config_id,
-            'base_text': base_text.strip() or 'AI',
-            'sort_key': sort_key,
-            'is_default': (config_id == selected_model),
-        })
-
-    configured_items.sort(key=lambda x: (x['sort_key'], x['base_text'].lower(), x['config_id']))
-    return _stable_number_duplicate_labels(configured_items)
-
-# 默认配置
-prefs.defaults['selected_model'] = 'nvidia_free'  # 当前选中的模型（默认使用免费通道）
-prefs.defaults['force_default_ai_on_next_open'] = False  # 配置页改默认AI后，下次打开 Ask 强制应用一次
-prefs.defaults['models'] = {
-    'grok': {
-        'auth_token': '',
-        'api_base_url': GROK_CONFIG.default_api_base_url,
-        'model': GROK_CONFIG.default_model_name,
-        'display_name': GROK_CONFIG.display_name,
-        'enabled': True
-    },
-    'gemini': {
-        'api_key': '',
-        'api_base_url': GEMINI_CONFIG.default_api_base_url,
-        'model': GEMINI_CONFIG.default_model_name,
-        'display_name': GEMINI_CONFIG.display_name,
-        'enabled': False  # 默认不启用，需要用户配置
-    },
-    'deepseek': {
-        'api_key': '',
-        'api_base_url': DEEPSEEK_CONFIG.default_api_base_url,
-        'model': DEEPSEEK_CONFIG.default_model_name,
-        'display_name': DEEPSEEK_CONFIG.display_name,        
-        'enabled': False  # 默认不启用，需要用户配置
-    },
-    'custom': {
-        'api_key': '',
-        'api_base_url': CUSTOM_CONFIG.default_api_base_url,
-        'model': CUSTOM_CONFIG.default_model_name,
-        'display_name': CUSTOM_CONFIG.display_name,
-        'enable_streaming': True,
-        'enabled': False  # 默认不启用，需要用户配置
-    },
-    'openai': {
-        'api_key': '',
-        'api_base_url': OPENAI_CONFIG.default_api_base_url,
-        'model': OPENAI_CONFIG.default_model_name,
-        'display_name': OPENAI_CONFIG.display_name,
-        'enable_streaming': True,
-        'enabled': False  # 默认不启用，需要用户配置
-    },
-    'anthropic': {
-        'api_key': '',
-        'api_base_url': ANTHROPIC_CONFIG.default_api_base_url,
-        'model': ANTHROPIC_CONFIG.default_model_name,
-        'display_name': ANTHROPIC_CONFIG.display_name,
-        'enable_streaming': True,
-        'enabled': False  # 默认不启用，需要用户配置
-    },
-    'nvidia': {
-        'api_key': '',
-        'api_base_url': NVIDIA_CONFIG.default_api_base_url,
-        'model': NVIDIA_CONFIG.default_model_name,
-        'display_name': NVIDIA_CONFIG.display_name,
-        'enable_streaming': True,
-        'enabled': False  # 默认不启用，需要用户配置
-    },
-    'openrouter': {
-        'api_key': '',
-        'api_base_url': OPENROUTER_CONFIG.default_api_base_url,
-        'model': OPENROUTER_CONFIG.default_model_name,
-        'display_name': OPENROUTER_CONFIG.display_name,
-        'enable_streaming': True,
-        'http_referer': '',  # Optional: for ranking on OpenRouter
-        'x_title': 'Ask AI Plugin',  # Optional: app name
-        'enabled': False  # 默认不启用，需要用户配置
-    },
-    'perplexity': {
-        'api_key': '',
-        'api_base_url': PERPLEXITY_CONFIG.default_api_base_url,
-        'model': PERPLEXITY_CONFIG.default_model_name,
-        'display_name': PERPLEXITY_CONFIG.display_name,
-        'enable_streaming': True,
-        'enabled': False  # 默认不启用，需要用户配置
-    },
-    'ollama': {
-        'api_key': '',  # Optional for Ollama (local service)
-        'api_base_url': OLLAMA_CONFIG.default_api_base_url,
-        'model': OLLAMA_CONFIG.default_model_name,
-        'display_name': OLLAMA_CONFIG.display_name,
-        'enable_streaming': True,
-        'enabled': False  # 默认不启用，需要用户配置
-    },
-    'nvidia_free': {
-        'api_key': 'free-tier',  # 免费通道不需要真实 API Key
-        'proxy_url': EnvironmentConfig.get_nvidia_free_proxy_url(),
-        'api_base_url': EnvironmentConfig.get_nvidia_free_proxy_url(),
-        'model': NVIDIA_FREE_CONFIG.default_model_name,
-        'display_name': NVIDIA_FREE_CONFIG.display_name,
-        'enable_streaming': True,
-        'enabled': True,  # 默认启用免费通道
-        'provider_id': 'nvidia_free'
-    }
-}
-prefs.defaults['template'] = get_default_template('en')
-prefs.defaults['multi_book_template'] = get_multi_book_template('en')
-prefs.defaults['language'] = 'en'
-prefs.defaults['language_user_set'] = False
-prefs.defaults['ask_dialog_width'] = 800
-prefs.defaults['ask_dialog_height'] = 600
-prefs.defaults['random_questions'] = ''  # v1.3.9: Changed from dict to string (prompt template)
-prefs.defaults['request_timeout'] = 120  # Default timeout in seconds
-prefs.defaults['parallel_ai_count'] = 1  # Number of parallel AI requests (1-4)
-prefs.defaults['cached_models'] = {}  # Cached model lists for each AI provider
-prefs.defaults['nvidia_free_first_use_shown'] = False  # Track if first use reminder has been shown
-
-# Export settings
-prefs.defaults['enable_default_export_folder'] = False  # Whether to export to default folder
-prefs.defaults['default_export_folder'] = ''  # Default export folder path
-prefs.defaults['copy_mode'] = 'response'  # Copy mode: 'response' or 'qa'
-prefs.defaults['export_mode'] = 'current'  # Export mode: 'current' or 'history'
-
-# Persona settings
-prefs.defaults['use_persona'] = True  # Whether to use persona in prompts
-prefs.defaults['persona'] = 'As a researcher, I want to research through book data.'  # User's persona text
-
-# Language preference settings (v1.3.9)
-prefs.defaults['use_interface_language'] = False  # Whether to ask AI to respond in interface language
-
-# Library Chat settings (v1.4.2 MVP)
-prefs.defaults['library_chat_enabled'] = False  # Enable library chat feature
-prefs.defaults['library_cached_metadata'] = ''  # Cached library metadata (JSON string)
-prefs.defaults['library_last_update'] = ''  # Last update timestamp (ISO format)
-prefs.defaults['ai_search_first_time'] = True  # Show welcome dialog only on first use
-prefs.defaults['ai_search_last_history_uid'] = None  # Last AI Search conversation UID for history persistence
-
-# Prompt length settings
-prefs.defaults['enable_custom_prompt_limit'] = False
-prefs.defaults['max_prompt_length'] = DEFAULT_CUSTOM_LIMIT  # Used when enable_custom_prompt_limit is True
-
-def get_prefs(force_reload=False):
-    """获取配置
-    
-    Args:
-        force_reload: 是否强制重新加载配置文件
-    """
-    # 如果需要强制重新加载
-    if force_reload and isinstance(prefs, JSONConfig):
-        prefs.refresh()
-    
-    # 确保语言键存在，如果不存在则使用默认值 'en'
-    if 'language' not in prefs:
-        prefs['language'] = 'en'
-
-    # 如果用户没有在插件内明确选择过语言，则默认跟随 calibre 的界面语言（若插件支持）
-    # calibre 语言来自 Preferences -> Look & Feel -> Choose language
-    try:
-        if not prefs.get('language_user_set', False):
-            from calibre.utils.localization import get_lang
-
-            calibre_lang = (get_lang() or 'en').replace('-', '_')
-            base = calibre_lang.split('_')[0].lower()
-
-            # Map calibre language codes to plugin language codes
-            # 支持的语言映射表
-            lang_mapping = {
-                'zh': 'zh',      # Chinese Simplified
-                'en': 'en',      # English
-                'ja': 'ja',      # Japanese
-                'fr': 'fr',      # French
-                'de': 'de',      # German
-                'es': 'es',      # Spanish
-                'ru': 'ru',      # Russian
-                'pt': 'pt',      # Portuguese
-                'nl': 'nl',      # Dutch
-                'sv': 'sv',      # Swedish
-                'no': 'no',      # Norwegian
-                'fi': 'fi',      # Finnish
-                'da': 'da',      # Danish
-                'yue': 'yue',    # Cantonese
-            }
-            
-            plugin_lang = lang_mapping.get(base)
-            
-            # Special handling for Chinese variants
-            if base == 'zh':
-                upper = calibre_lang.upper()
-                if '_TW' in upper or '_HK' in upper or '_MO' in upper:
-                    plugin_lang = 'zht'  # Traditional Chinese
-                else:
-                    plugin_lang = 'zh'   # Simplified Chinese
-
-            supported = {code for code, _ in SUPPORTED_LANGUAGES}
-            if plugin_lang and plugin_lang in supported and prefs.get('language', 'en') != plugin_lang:
-                prefs['language'] = plugin_lang
-                # 同时更新模板为对应语言的默认模板
-                prefs['template'] = get_default_template(plugin_lang)
-                prefs['multi_book_template'] = get_multi_book_template(plugin_lang)
-                prefs.commit()
-    except Exception as e:
-        logger.warning(f"Failed to inherit Calibre language: {e}")
-    
-    # 确保模板不为空，如果为空则使用当前语言的默认模板
-    # 注意：这个检查必须在语言确定之后执行
-    if not prefs['template']:
-        prefs['template'] = get_default_template(prefs.get('language', 'en'))
-    
-    # 确保多书模板不为空
-    if not prefs.get('multi_book_template'):
-        prefs['multi_book_template'] = get_multi_book_template(prefs.get('language', 'en'))
-    
-    # 确保 models 键存在
-    if 'models' not in prefs:
-        prefs['models'] = {}
-    
-    # 确保 nvidia_free 配置存在（首次安装时的默认 AI）
-    if 'nvidia_free' not in prefs['models']:
-        prefs['models']['nvidia_free'] = {
-            'api_key': 'free-tier',
-            'proxy_url': EnvironmentConfig.get_nvidia_free_proxy_url(),
-            'api_base_url': EnvironmentConfig.get_nvidia_free_proxy_url(),
-            'model': NVIDIA_FREE_CONFIG.default_model_name,
-            'display_name': NVIDIA_FREE_CONFIG.display_name,
-            'enable_streaming': True,
-            'enabled': True,
-            'provider_id': 'nvidia_free',
-            'is_configured': True  # Nvidia Free 默认已配置
-        }
-    
-    # 确保 selected_model 键存在（默认使用 nvidia_free）
-    if 'selected_model' not in prefs:
-        prefs['selected_model'] = 'nvidia_free'
-    
-    # 确保 request_timeout 键存在
-    if 'request_timeout' not in prefs:
-        prefs['request_timeout'] = 120
-    
-    # 确保 parallel_ai_count 键存在
-    if 'parallel_ai_count' not in prefs:
-        prefs['parallel_ai_count'] = 1
-
-    # 确保提示词长度限制键存在
-    if 'enable_custom_prompt_limit' not in prefs:
-        prefs['enable_custom_prompt_limit'] = False
-    if 'max_prompt_length' not in prefs:
-        prefs['max_prompt_length'] = DEFAULT_CUSTOM_LIMIT
-    
-    # 配置迁移：强制更新 nvidia_free 的 proxy_url 为当前环境配置
-    # 这确保环境切换后配置能正确更新
-    if 'nvidia_free' in prefs['models']:
-        current_env_url = EnvironmentConfig.get_nvidia_free_proxy_url()
-        if prefs['models']['nvidia_free'].get('proxy_url') != current_env_url:
-            prefs['models']['nvidia_free']['proxy_url'] = current_env_url
-            prefs['models']['nvidia_free']['api_base_url'] = current_env_url
-            prefs.commit()
-        # 将仍为旧默认模型的免费通道升级到当前默认（用户若从未改过模型）
-        nf = prefs['models']['nvidia_free']
-        if nf.get('model') == 'meta/llama-3.3-70b-instruct':
-            nf['model'] = NVIDIA_FREE_CONFIG.default_model_name
-            prefs.commit()
-    
-    # 付费 Nvidia：仍为旧默认模型时升级到当前默认
-    if 'nvidia' in prefs['models']:
-        nv = prefs['models']['nvidia']
-        if isinstance(nv, dict) and nv.get('model') == 'meta/llama-3.3-70b-instruct':
-            nv['model'] = NVIDIA_CONFIG.default_model_name
-            prefs.commit()
-    
-    # 配置迁移：删除已废弃的 openrouter_free 配置（旧版本遗留数据）
-    # 同时删除任何包含 'openrouter' 且 model 为 ':free' 或包含 'free' 的旧配置
-    models_to_remove = []
-    for config_id, config in prefs['models'].items():
-        if not isinstance(config, dict):
-            continue
-        # 检查是否是废弃的 openrouter free 配置
-        if 'openrouter_free' in config_id:
-            models_to_remove.append(config_id)
-        elif config_id.startswith('openrouter') and config.get('model', '').lower().endswith(':free'):
-            models_to_remove.append(config_id)
-        elif config.get('provider_id') == 'openrouter_free':
-            models_to_remove.append(config_id)
-    
-    for config_id in models_to_remove:
-        del prefs['models'][config_id]
-        # 如果当前选中的是被删除的模型，切换到 nvidia_free
-        if prefs.get('selected_model') == config_id:
-            prefs['selected_model'] = 'nvidia_free'
-    
-    if models_to_remove:
-        prefs.commit()
-    
-    # 确保默认模型配置存在
-    if 'grok' not in prefs['models']:
-        prefs['models']['grok'] = {
-            'auth_token': '',
-            'api_base_url': GROK_CONFIG.default_api_base_url,
-            'model': GROK_CONFIG.default_model_name,
-            'display_name': GROK_CONFIG.display_name  # 设置固定的显示名称
-        }
-
-    # 清理历史配置中误保存的占位符模型名称（例如“-- 切换Model --”）
-    # 目的：避免占位符被当作真实 model 写入配置，进而在 UI 中被复制到自定义模型输入框。
-    try:
-        # 收集所有语言下的 select_model / request_model_list 文本，用于识别占位符
-        placeholder_texts = set()
-        for code, _name in SUPPORTED_LANGUAGES:
-            try:
-                t = get_translation(code)
-                placeholder_texts.add(t.get('select_model', ''))
-                placeholder_texts.add(t.get('request_model_list', ''))
-            except Exception:
-                pass
-
-        changed = False
-        for _model_id, cfg in (prefs.get('models') or {}).items():
-            if not isinstance(cfg, dict):
-                continue
-
-            # 默认情况下不启用“Use custom model name”
-            if 'use_custom_model_name' not in cfg:
-                cfg['use_custom_model_name'] = False
-                changed = True
-
-            model_val = (cfg.get('model') or '').strip()
-            if model_val and model_val in placeholder_texts:
-                logger.warning(
-                    f"[prefs_sanitize] Detected placeholder model stored in prefs. model_id={_model_id}, model='{model_val}'. Clearing it and disabling use_custom_model_name."
-                )
-                cfg['model'] = ''
-                cfg['use_custom_model_name'] = False
-                changed = True
-            elif not model_val and cfg.get('use_custom_model_name'):
-                # 没有有效 model 时，确保不处于自定义模式
-                logger.warning(
-                    f"[prefs_sanitize] use_custom_model_name=True but model is empty. model_id={_model_id}. Forcing use_custom_model_name=False."
-                )
-                cfg['use_custom_model_name'] = False
-                changed = True
-
-        if changed:
-            prefs.commit()
-    except Exception:
-        pass
-    
-    # 不再强制更新模型名称，保留用户的自定义设置
-    # 只有当模型名称不存在时，才使用默认值
-    
-    # 自动判断并设置 is_configured 字段（用于已有配置的兼容性）
-    for model_id, model_config in prefs['models'].items():
-        if 'is_configured' not in model_config:
-            provider_id = extract_provider_id(model_id, model_config)
-            model_config['is_configured'] = is_ai_config_complete(provider_id, model_config)
-    
-    # ========== v1.3.9 兼容性迁移 ==========
-    
-    # 1. 迁移 random_questions (dict -> string)
-    # v1.3.8 使用 dict 格式: {"en": [...], "zh": [...]}
-    # v1.3.9 使用 string 格式: 提示词模板
-    random_questions = prefs.get('random_questions', '')
-    if isinstance(random_questions, dict):
-        # 旧版本格式，重置为空字符串（将使用默认模板）
-        prefs['random_questions'] = ''
-        logger.info("[Migration v1.3.9] random_questions: dict -> string (reset to default template)")
-        prefs.commit()
-    
-    # 2. 确保 use_interface_language 存在
-    if 'use_interface_language' not in prefs:
-        prefs['use_interface_language'] = False
-        logger.info("[Migration v1.3.9] Added use_interface_language = False")
-    
-    # ========== 迁移结束 ==========
-    
-    return prefs
+from .plugin_prefs import (  # noqa: F401  重新导出，兼容已有的导入
+    prefs, get_prefs, SUPPORTED_LANGUAGES, get_current_model_config,
+    GROK_CONFIG, GEMINI_CONFIG, DEEPSEEK_CONFIG, CUSTOM_CONFIG, OPENAI_CONFIG, ANTHROPIC_CONFIG,
+    NVIDIA_CONFIG, NVIDIA_FREE_CONFIG, OPENROUTER_CONFIG, PERPLEXITY_CONFIG, OLLAMA_CONFIG,
+    AI_PROVIDER_ORDER, extract_provider_id, is_ai_config_complete, get_provider_display_name,
+    build_ai_display_text, build_configured_ai_entries,
+)
 
 
 class ModelConfigWidget(QWidget):
     """单个模型配置控件"""
     config_changed = pyqtSignal()
+    # 后台刷新模型列表完成（模型列表）
+    models_refreshed = pyqtSignal(list)
     
     def __init__(self, model_id, config, i18n, parent=None):
         super().__init__(parent)
@@ -565,6 +76,55 @@ class ModelConfigWidget(QWidget):
         self._is_initializing = True
         self.setup_ui()
         self._is_initializing = False
+        
+        self.models_refreshed.connect(self._on_models_refreshed)
+        self._refresh_stale_models_in_background()
+    
+    def _catalog_key(self, config=None):
+        config = self.config if config is None else config
+        credential = config.get('auth_token' if self.model_id == 'grok' else 'api_key', '')
+        return catalog_key(self.model_id, config.get('api_base_url', ''), credential)
+    
+    def _refresh_stale_models_in_background(self):
+        """缓存的模型列表过期时在后台发送条件请求刷新，不阻塞设置界面"""
+        if self.model_id == 'perplexity' or not is_ai_config_complete(self.model_id, self.config):
+            return
+        key = self._catalog_key()
+        catalog = get_model_catalog()
+        if catalog.models(key) is None or catalog.is_fresh(key):
+            return
+        config = copy.deepcopy(self.config)
+        
+        def run():
+            from .api import APIClient
+            success, result, status = APIClient(i18n=self.i18n).refresh_model_list(self.model_id, config)
+            if success and status == STATUS_UPDATED:
+                try:
+                    self.models_refreshed.emit(result)
+                except RuntimeError:
+                    # 控件已关闭
+                    pass
+        
+        threading.Thread(target=run, name=f'AskAIModelList-{self.model_id}', daemon=True).start()
+    
+    def _on_models_refreshed(self, models):
+        """后台刷新得到新的模型列表：更新下拉框并保持当前选择"""
+        if not models or not hasattr(self, 'model_combo'):
+            return
+        current = self.model_combo.currentText()
+        placeholder_text = self.i18n.get('select_model', '-- No Model --')
+        self.model_combo.blockSignals(True)
+        try:
+            self.model_combo.clear()
+            self.model_combo.addItem(placeholder_text)
+            self.model_combo.setItemData(0, 'select_model')
+            self.model_combo.addItems(models)
+            index = self.model_combo.findText(current)
+            self.model_combo.setCurrentIndex(index if index > 0 else 0)
+        finally:
+            self.model_combo.blockSignals(False)
+        self._models_loaded = True
+        logger.info(f"[{self.model_id}] 模型列表已在后台更新，共 {len(models)} 个模型")
     
     def setup_ui(self):
         # 创建主布局（直接使用 VBoxLayout，更灵活）
@@ -701,9 +261,13 @@ class ModelConfigWidget(QWidget):
             # 标记占位符，便于语言切换时更新文本
             self.model_combo.setItemData(0, 'select_model')
             
-            # 从缓存加载模型列表
+            # 从缓存加载模型列表（模型列表缓存优先，旧版 cached_models 作为回退）
             prefs = get_prefs()
-            cached_models = prefs.get('cached_models', {})
+            cached_models = dict(prefs.get('cached_models', {}))
+            if self.model_id != 'perplexity':
+                catalog_models = get_model_catalog().models(self._catalog_key())
+                if catalog_models:
+                    cached_models[self.model_id] = catalog_models
             if self.model_id == 'perplexity':
                 # Perplexity: hardcoded models (no reliable public model list endpoint)
                 hardcoded_models = [
@@ -843,6 +407,65 @@ class ModelConfigWidget(QWidget):
             streaming_desc.setWordWrap(True)
             main_layout.addWidget(streaming_desc)
             
+            # 客户端限流（空表示不限制）
+            rate_limit_label = QLabel(self.i18n.get('rate_limit_label', 'Client-side rate limits'))
+            rate_limit_label.setObjectName(f'label_rate_limit_{self.model_id}')
+            main_layout.addWidget(rate_limit_label)
+            rate_limit_layout = QHBoxLayout()
+            self.rate_limit_edits = {}
+            for key, placeholder_key, placeholder in (
+                ('rate_limit_rpm', 'rate_limit_rpm_placeholder', 'Requests/min'),
+                ('rate_limit_tpm', 'rate_limit_tpm_placeholder', 'Tokens/min'),
+                ('max_concurrent_requests', 'rate_limit_concurrent_placeholder', 'Max concurrent'),
+            ):
+                edit = QLineEdit(self)
+                edit.setMinimumHeight(25)
+                edit.setValidator(QIntValidator(0, 100000000, edit))
+                edit.setPlaceholderText(self.i18n.get(placeholder_key, placeholder))
+                edit.setToolTip(self.i18n.get(placeholder_key, placeholder))
+                edit.setText(str(self.config.get(key, '') or ''))
+                edit.textChanged.connect(self.on_config_changed)
+                rate_limit_layout.addWidget(edit)
+                self.rate_limit_edits[key] = edit
+            main_layout.addLayout(rate_limit_layout)
+            rate_limit_desc = QLabel(self.i18n.get('rate_limit_desc',
+                'Requests beyond these limits wait in a queue instead of failing with rate-limit errors. '
+                'Ask panels go ahead of background jobs. Leave empty for no limit.'))
+            rate_limit_desc.setObjectName(f'label_rate_limit_desc_{self.model_id}')
+            rate_limit_desc.setStyleSheet(f"color: {TEXT_COLOR_SECONDARY_STRONG}; font-style: italic; padding: 2px 0;")
+            rate_limit_desc.setWordWrap(True)
+            main_layout.addWidget(rate_limit_desc)
+            
+            # Ollama 本地推理参数
+            if self.model_id == 'ollama':
+                num_ctx_label = QLabel(self.i18n.get('ollama_num_ctx_label', 'Context window (num_ctx)'))
+                num_ctx_label.setObjectName('label_ollama_num_ctx')
+                main_layout.addWidget(num_ctx_label)
+                self.num_ctx_edit = QLineEdit(self)
+                self.num_ctx_edit.setMinimumHeight(25)
+                self.num_ctx_edit.setPlaceholderText(self.i18n.get('ollama_num_ctx_placeholder', 'Auto (sized to each prompt)'))
+                self.num_ctx_edit.setText(str(self.config.get('num_ctx', '') or ''))
+                self.num_ctx_edit.textChanged.connect(self.on_config_changed)
+                main_layout.addWidget(self.num_ctx_edit)
+                
+                keep_alive_label = QLabel(self.i18n.get('ollama_keep_alive_label', 'Keep model loaded for'))
+                keep_alive_label.setObjectName('label_ollama_keep_alive')
+                main_layout.addWidget(keep_alive_label)
+                self.keep_alive_edit = QLineEdit(self)
+                self.keep_alive_edit.setMinimumHeight(25)
+                self.keep_alive_edit.setPlaceholderText('30m')
+                self.keep_alive_edit.setText(str(self.config.get('keep_alive', '30m') or ''))
+                self.keep_alive_edit.textChanged.connect(self.on_config_changed)
+                main_layout.addWidget(self.keep_alive_edit)
+                
+                ollama_desc = QLabel(self.i18n.get('ollama_tuning_desc',
+                    'Leave the context window empty to size it from each prompt (up to the model maximum). '
+                    'Keep-alive accepts values such as 30m or 2h; -1 keeps the model loaded.'))
+                ollama_desc.setObjectName('label_ollama_tuning_desc')
+                ollama_desc.setStyleSheet(f"color: {TEXT_COLOR_SECONDARY_STRONG}; font-style: italic; padding: 2px 0;")
+                ollama_desc.setWordWrap(True)
+                main_layout.addWidget(ollama_desc)
+            
             # 服务商特定提示（放在底部）
             if self.model_id == 'nvidia':
                 notice_label = QLabel(self.i18n.get('nvidia_free_credits_notice', 
@@ -961,6 +584,10 @@ class ModelConfigWidget(QWidget):
             # Ollama 不需要 API Key
             config['api_key'] = self.api_key_edit.toPlainText().strip() if (hasattr(self, 'api_key_edit') and self.api_key_edit) else ''
             config['display_name'] = 'Ollama (Local)'  # 设置固定的显示名称
+            if hasattr(self, 'num_ctx_edit'):
+                config['num_ctx'] = self.num_ctx_edit.text().strip()
+            if hasattr(self, 'keep_alive_edit'):
+                config['keep_alive'] = self.keep_alive_edit.text().strip() or '30m'
         elif self.model_id == 'nvidia_free':
             provider = AIProvider.AI_NVIDIA_FREE
             # Nvidia 免费通道不需要用户提供 API Key
@@ -1001,6 +628,10 @@ class ModelConfigWidget(QWidget):
             else:
                 config['model'] = ''
         
+        # 客户端限流（空表示不限制）
+        for key, edit in getattr(self, 'rate_limit_edits', {}).items():
+            config[key] = edit.text().strip()
+        
         # 流式传输选项（如果存在）
         if hasattr(self, 'enable_streaming_checkbox'):
             config['enable_streaming'] = self.enable_streaming_checkbox.isChecked()
@@ -1222,8 +853,8 @@ class ModelConfigWidget(QWidget):
         
         # 使用 QTimer 异步执行，避免阻塞 UI
         def fetch_models():
-            # 第一步：加载模型列表（跳过验证）
-            success, result = api_client.fetch_available_models(self.model_id, config, skip_verification=True)
+            # 第一步：加载模型列表（跳过验证；忽略缓存有效期，列表未变化时服务端返回 304）
+            success, result, _status = api_client.refresh_model_list(self.model_id, config, force=True)
             
             # 停止加载动画
             self.refresh_models_animation.stop()
@@ -1827,6 +1458,7 @@ class ModelConfigWidget(QWidget):
                 del cached_models[self.model_id]
                 prefs['cached_models'] = cached_models
                 logger.info(f"已清除 {self.model_id} 的模型缓存")
+            get_model_catalog().invalidate_provider(self.model_id)
             
             # 8. 更新配置文件中的 is_configured 状态
             if 'models' in prefs and self.model_id in prefs['models']:
@@ -3584,12 +3216,10 @@ class ConfigDialog(QWidget):
                     os.remove(config_file)
                     logger.info(f"已删除配置文件: {config_file}")
                 
-                # 2. 删除历史记录文件
-                # 删除v2版本的历史记录JSON文件
-                history_v2_path = os.path.join(plugins_dir, 'ask_ai_plugin_history_v2.json')
-                if os.path.exists(history_v2_path):
-                    os.remove(history_v2_path)
-                    logger.info(f"已删除历史记录文件(v2): {history_v2_path}")
+                # 2. 删除历史记录（索引 + 正文目录、v2 文件及其 .migrated 备份，并清空进程内共享的索引）
+                from .history_manager import HistoryManager
+                if not HistoryManager(plugins_dir).clear_history():
+                    raise RuntimeError('failed to clear history')
                 
                 # 删除旧版本的历史记录数据库（如果存在）
                 history_db_path = os.path.join(plugins_dir, 'ask_ai_plugin_history.db')
@@ -3766,6 +3396,27 @@ class LibraryWidget(QWidget):
         apply_button_style(self.update_button)
         data_section.addWidget(self.update_button)
         
+        self.dictionary_format_checkbox = QCheckBox(self.i18n.get('library_dictionary_format',
+            'Compress the book list with author/series codes'))
+        self.dictionary_format_checkbox.setObjectName('checkbox_library_dictionary_format')
+        self.dictionary_format_checkbox.setToolTip(self.i18n.get('library_dictionary_format_tooltip',
+            'Lists each repeated author and series once and refers to it by a short code, '
+            'so more of a large library fits in every AI Search request'))
+        self.dictionary_format_checkbox.setChecked(
+            self.prefs.get('library_prompt_format', 'tsv') == 'dictionary')
+        self.dictionary_format_checkbox.toggled.connect(self.on_dictionary_format_toggled)
+        data_section.addWidget(self.dictionary_format_checkbox)
+        
+        self.semantic_search_checkbox = QCheckBox(self.i18n.get('library_semantic_search',
+            'Semantic search with local embeddings (Ollama)'))
+        self.semantic_search_checkbox.setObjectName('checkbox_library_semantic_search')
+        self.semantic_search_checkbox.setToolTip(self.i18n.get('library_semantic_search_tooltip',
+            'Embeds title, authors, tags and description of every book with your local Ollama server '
+            'and sends only the most relevant books to the AI. The index is updated with "Update Library Data".'))
+        self.semantic_search_checkbox.setChecked(self.prefs.get('ai_search_semantic_enabled', False))
+        self.semantic_search_checkbox.toggled.connect(self.on_semantic_search_toggled)
+        data_section.addWidget(self.semantic_search_checkbox)
+        
         self.status_label = QLabel()
         self.status_label.setObjectName('label_library_status')
         self.status_label.setWordWrap(True)
@@ -3829,9 +3480,34 @@ class LibraryWidget(QWidget):
             self.update_button.setToolTip(self.i18n.get('library_update_tooltip', 
                 'Extract titles and authors for all books in your library (no 100-book limit)'))
         
+        if hasattr(self, 'dictionary_format_checkbox'):
+            self.dictionary_format_checkbox.setText(self.i18n.get('library_dictionary_format',
+                'Compress the book list with author/series codes'))
+            self.dictionary_format_checkbox.setToolTip(self.i18n.get('library_dictionary_format_tooltip',
+                'Lists each repeated author and series once and refers to it by a short code, '
+                'so more of a large library fits in every AI Search request'))
+        
+        if hasattr(self, 'semantic_search_checkbox'):
+            self.semantic_search_checkbox.setText(self.i18n.get('library_semantic_search',
+                'Semantic search with local embeddings (Ollama)'))
+            self.semantic_search_checkbox.setToolTip(self.i18n.get('library_semantic_search_tooltip',
+                'Embeds title, authors, tags and description of every book with your local Ollama server '
+                'and sends only the most relevant books to the AI. The index is updated with "Update Library Data".'))
+        
         # 更新状态显示
         self.update_status_display()
     
+    def on_dictionary_format_toggled(self, checked):
+        """切换紧凑书目格式（AI Search 和大规模选书共用）"""
+        self.prefs['library_prompt_format'] = 'dictionary' if checked else 'tsv'
+    
+    def on_semantic_search_toggled(self, checked):
+        """开关语义 AI 搜索；开启时立即在后台构建索引"""
+        self.prefs['ai_search_semantic_enabled'] = checked
+        if checked and self.gui is not None:
+            from .semantic_index import start_index_update
+            start_index_update(self.gui.current_db, self.prefs)
+    
     def update_status_display(self):
         """更新状态显示"""
         from .utils import get_library_metadata, get_library_last_update
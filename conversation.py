@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Multi-turn conversation context for follow-up questions."""
+
+import logging
+
+try:
+    from .token_estimator import FAMILY_GENERIC, estimate_tokens
+except ImportError:
+    from token_estimator import FAMILY_GENERIC, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_TOKENS = 8000
+# 最多回溯的轮次数
+MAX_CHAIN_TURNS = 50
+# 最近几轮的回答保持完整，更早的回答截断到 OLD_ANSWER_CHARS
+KEEP_RECENT_TURNS = 2
+OLD_ANSWER_CHARS = 1500
+# 超出预算时一次丢弃的轮次数；按块丢弃使前缀在多次追问之间保持稳定
+COMPACT_BLOCK_TURNS = 4
+SUMMARY_MAX_CHARS = 2000
+
+TRUNCATED_MARKER = '\n[…]'
+SUMMARY_HEADER = 'Summary of the earlier conversation:'
+SUMMARY_ACK = 'Understood, I will take that earlier conversation into account.'
+SUMMARY_PROMPT = (
+    'Summarize the following conversation between a user and an assistant about books in at most '
+    '{max_words} words. Keep facts, book titles, names and any conclusions the user may refer back to.\n\n'
+    '{conversation}'
+)
+
+# (被摘要的 UID 元组, ai_id) -> 摘要文本；摘要结果固定后前缀保持稳定
+_summary_cache = {}
+
+
+def load_turns(history_manager, parent_uid, max_turns=MAX_CHAIN_TURNS):
+    """
+    沿 parent_uid 链接读取之前的对话轮次
+
+    :return: 轮次列表（从最早到最近），每项 {'uid', 'question', 'prompt', 'answers'}
+    """
+    turns = []
+    seen = set()
+    uid = parent_uid
+    while uid and uid not in seen and len(turns) < max_turns:
+        seen.add(uid)
+        record = history_manager.get_history_by_uid(uid)
+        if record is None:
+            break
+        answers = {}
+        for ai_id, answer_data in (record.get('answers') or {}).items():
+            answer = answer_data.get('answer', '') if isinstance(answer_data, dict) else answer_data
+            if answer:
+                answers[ai_id] = answer
+        turns.append({
+            'uid': uid,
+            'question': record.get('question', '') or '',
+            'prompt': record.get('prompt') or '',
+            'answers': answers,
+        })
+        uid = record.get('parent_uid')
+    turns.reverse()
+    return turns
+
+
+def _turn_answer(turn, ai_id):
+    """同一轮有多个 AI 回答时，优先使用当前 AI 自己的回答"""
+    answers = turn['answers']
+    if ai_id in answers:
+        return answers[ai_id]
+    if 'default' in answers:
+        return answers['default']
+    return next(iter(answers.values()), '')
+
+
+def _clip(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + TRUNCATED_MARKER
+
+
+def _pair(turn, ai_id, clip_answer):
+    answer = _turn_answer(turn, ai_id)
+    if clip_answer:
+        answer = _clip(answer, OLD_ANSWER_CHARS)
+    return [
+        {'role': 'user', 'content': turn['prompt'] or turn['question']},
+        {'role': 'assistant', 'content': answer},
+    ]
+
+
+def _messages_tokens(messages, family):
+    return sum(estimate_tokens(message['content'], family) + 4 for message in messages)
+
+
+def _summarize(turns, ai_id, summarize_fn):
+    key = (tuple(turn['uid'] for turn in turns), ai_id)
+    if key in _summary_cache:
+        return _summary_cache[key]
+    conversation = '\n\n'.join(
+        f"User: {turn['question']}\nAssistant: {_clip(_turn_answer(turn, ai_id), OLD_ANSWER_CHARS)}"
+        for turn in turns
+    )
+    try:
+        summary = summarize_fn(SUMMARY_PROMPT.format(max_words=SUMMARY_MAX_CHARS // 6, conversation=conversation))
+    except Exception as e:
+        logger.warning(f"对话摘要失败，直接丢弃较早轮次: {str(e)}")
+        return None
+    summary = _clip((summary or '').strip(), SUMMARY_MAX_CHARS)
+    if summary:
+        _summary_cache[key] = summary
+    return summary or None
+
+
+def build_history_messages(turns, ai_id=None, budget_tokens=DEFAULT_CONTEXT_TOKENS,
+                           family=FAMILY_GENERIC, summarize_fn=None):
+    """
+    把之前的轮次压缩为 user/assistant 交替的消息列表
+
+    :param turns: load_turns 的结果
+    :param ai_id: 当前 AI（选择该 AI 自己的回答）
+    :param budget_tokens: 历史消息的 token 预算
+    :param summarize_fn: 可选，prompt -> 摘要文本；提供时被丢弃的轮次会被摘要
+    :return: [{'role': 'user'|'assistant', 'content': str}]
+    """
+    turns = [turn for turn in turns if turn['answers']]
+    if not turns:
+        return []
+
+    root, rest = turns[0], turns[1:]
+    recent_start = len(rest) - KEEP_RECENT_TURNS
+    root_messages = _pair(root, ai_id, clip_answer=bool(rest))
+    rest_messages = [_pair(turn, ai_id, clip_answer=index < recent_start) for index, turn in enumerate(rest)]
+
+    fixed_tokens = _messages_tokens(root_messages, family)
+    rest_tokens = [_messages_tokens(pair, family) for pair in rest_messages]
+    dropped = 0
+    while dropped < len(rest) and fixed_tokens + sum(rest_tokens[dropped:]) > budget_tokens:
+        dropped = min(len(rest), dropped + COMPACT_BLOCK_TURNS)
+
+    messages = list(root_messages)
+    if dropped:
+        logger.info(f"对话上下文压缩: 丢弃 {dropped} 个较早轮次（共 {len(turns)} 轮）")
+        summary = _summarize(rest[:dropped], ai_id, summarize_fn) if summarize_fn else None
+        if summary:
+            messages.append({'role': 'user', 'content': f'{SUMMARY_HEADER}\n{summary}'})
+            messages.append({'role': 'assistant', 'content': SUMMARY_ACK})
+    for pair in rest_messages[dropped:]:
+        messages.extend(pair)
+
+    # 只剩首轮仍超预算时，截断首轮回答（首轮提示词包含书籍信息，必须保留）
+    if _messages_tokens(messages, family) > budget_tokens:
+        messages[1] = {'role': 'assistant', 'content': _clip(_turn_answer(root, ai_id), OLD_ANSWER_CHARS)}
+    return messages
+
+
+def follow_up_prompt(question, passages=None):
+    """追问只发送新问题；模板使用 {passages} 时附上针对新问题检索的段落"""
+    if not passages:
+        return question
+    return f'Relevant passages from the book:\n{passages}\n\nQuestion: {question}'
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Concurrent provider health probes: connect time, time to first byte and last error."""
+
+import logging
+import socket
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+HEALTH_OK = 'ok'
+HEALTH_SLOW = 'slow'
+HEALTH_DOWN = 'down'
+HEALTH_UNKNOWN = 'unknown'
+
+# 首字节超过此时间视为慢
+SLOW_TTFB = 5.0
+PROBE_TIMEOUT = 10.0
+MAX_PROBE_WORKERS = 8
+# 超过此时间的探测结果不再用于自动选择 AI
+RESULT_MAX_AGE = 30 * 60
+
+# 自动分配 AI 时的优先级（越小越优先）
+_STATUS_ORDER = {HEALTH_OK: 0, HEALTH_UNKNOWN: 1, HEALTH_SLOW: 2, HEALTH_DOWN: 3}
+
+# 探测请求：reachability_only 为 True 时除认证失败外，收到任何 HTTP 响应都算可用（没有可靠轻量端点的提供商）
+HealthProbe = namedtuple('HealthProbe', ['url', 'headers', 'verify', 'reachability_only'])
+HealthProbe.__new__.__defaults__ = (None, True, False)
+
+ProbeResult = namedtuple('ProbeResult', ['status', 'http_status', 'connect_time', 'ttfb', 'error', 'checked_at'])
+
+
+def measure_connect(url, timeout=PROBE_TIMEOUT):
+    """到 URL 主机的 TCP 连接耗时（秒）；无法解析或连接失败时返回 None"""
+    parts = urlsplit(url or '')
+    if not parts.hostname:
+        return None
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    started = time.monotonic()
+    try:
+        with socket.create_connection((parts.hostname, port), timeout=timeout):
+            return time.monotonic() - started
+    except OSError:
+        return None
+
+
+def _short_error(exc):
+    text = str(exc).strip().splitlines()[0] if str(exc).strip() else ''
+    name = type(exc).__name__
+    return f'{name}: {text[:160]}' if text else name
+
+
+def classify_response(http_status, ttfb, slow_threshold=SLOW_TTFB, reachability_only=False):
+    """
+    :return: (status, error)；429 表示可以连接但正在限流，按慢处理
+    """
+    if http_status in (401, 403):
+        return HEALTH_DOWN, f'HTTP {http_status}'
+    if reachability_only or 200 <= http_status < 400:
+        if ttfb is not None and ttfb >= slow_threshold:
+            return HEALTH_SLOW, None
+        return HEALTH_OK, None
+    if http_status == 429:
+        return HEALTH_SLOW, f'HTTP {http_status}'
+    return HEALTH_DOWN, f'HTTP {http_status}'
+
+
+def probe_url(session, probe, timeout=PROBE_TIMEOUT, slow_threshold=SLOW_TTFB,
+              measure_connect_time=True, clock=time.time):
+    """
+    发送一次探测请求（只读取响应头）
+
+    :param session: requests.Session
+    :param probe: HealthProbe
+    :param measure_connect_time: 经由代理时连接耗时没有意义，传 False 跳过
+    :return: ProbeResult
+    """
+    connect_time = measure_connect(probe.url, timeout) if measure_connect_time else None
+    started = time.monotonic()
+    try:
+        response = session.get(probe.url, headers=probe.headers or {}, timeout=timeout,
+                               verify=probe.verify, stream=True)
+    except Exception as e:
+        return ProbeResult(HEALTH_DOWN, None, connect_time, None, _short_error(e), clock())
+    ttfb = time.monotonic() - started
+    try:
+        http_status = response.status_code
+    finally:
+        response.close()
+    status, error = classify_response(http_status, ttfb, slow_threshold, probe.reachability_only)
+    return ProbeResult(status, http_status, connect_time, ttfb, error, clock())
+
+
+class HealthRegistry:
+    """每个 AI 最近一次的探测结果（线程安全）"""
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._results = {}
+        self._last_errors = {}
+
+    def record(self, ai_id, result):
+        with self._lock:
+            self._results[ai_id] = result
+            if result.error:
+                self._last_errors[ai_id] = (result.error, result.checked_at)
+
+    def get(self, ai_id):
+        with self._lock:
+            return self._results.get(ai_id)
+
+    def last_error(self, ai_id):
+        """最近一次失败的 (错误, 时间)，即使之后的探测已经成功"""
+        with self._lock:
+            return self._last_errors.get(ai_id)
+
+    def status_of(self, ai_id, max_age=RESULT_MAX_AGE):
+        result = self.get(ai_id)
+        if result is None or self._clock() - result.checked_at > max_age:
+            return HEALTH_UNKNOWN
+        return result.status
+
+    def rank(self, ai_ids, max_age=RESULT_MAX_AGE):
+        """按健康状态排序（同一状态内保持原顺序）"""
+        return sorted(ai_ids, key=lambda ai_id: _STATUS_ORDER[self.status_of(ai_id, max_age)])
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._results)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._last_errors.clear()
+
+
+def probe_all(probes, registry=None, max_workers=MAX_PROBE_WORKERS, on_result=None, clock=time.time):
+    """
+    并行执行探测
+
+    :param probes: {ai_id: fn() -> ProbeResult}
+    :param on_result: (ai_id, ProbeResult) 每个探测完成时调用（在工作线程中）
+    :return: {ai_id: ProbeResult}
+    """
+    results = {}
+
+    def run(ai_id, fn):
+        try:
+            result = fn()
+        except Exception as e:
+            logger.warning(f"[健康检查] {ai_id} 探测失败: {str(e)[:200]}")
+            result = ProbeResult(HEALTH_DOWN, None, None, None, _short_error(e), clock())
+        results[ai_id] = result
+        if registry is not None:
+            registry.record(ai_id, result)
+        if on_result is not None:
+            on_result(ai_id, result)
+
+    if not probes:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(probes))),
+                            thread_name_prefix='AskAIHealth') as executor:
+        for ai_id, fn in probes.items():
+            executor.submit(run, ai_id, fn)
+    return results
+
+
+class HealthMonitor:
+    """按固定间隔在后台重新探测（守护线程，可随时停止或修改间隔）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = None
+        self.interval = 0
+
+    @property
+    def running(self):
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval, run_once):
+        """
+        :param interval: 间隔秒数；不大于 0 时停止
+        :param run_once: 每轮调用一次的探测函数
+        """
+        self.stop()
+        if not interval or interval <= 0:
+            return
+        stop_event = threading.Event()
+
+        def loop():
+            while not stop_event.wait(interval):
+                try:
+                    run_once()
+                except Exception as e:
+                    logger.warning(f"[健康检查] 后台探测失败: {str(e)[:200]}")
+
+        with self._lock:
+            self.interval = interval
+            self._stop_event = stop_event
+            self._thread = threading.Thread(target=loop, name='AskAIHealthMonitor', daemon=True)
+            self._thread.start()
+        logger.info(f"[健康检查] 每 {interval:.0f} 秒在后台重新探测")
+
+    def stop(self):
+        with self._lock:
+            if self._stop_event is not None:
+                self._stop_event.set()
+            self._thread = self._stop_event = None
+            self.interval = 0
+
+
+_registry = HealthRegistry()
+_monitor = HealthMonitor()
+
+
+def get_health_registry():
+    return _registry
+
+
+def get_health_monitor():
+    return _monitor
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Provider health dashboard and request queue status."""
+
+import logging
+import threading
+import time
+
+from PyQt5.QtCore import QTimer, pyqtSignal
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+
+from .plugin_prefs import get_prefs, build_configured_ai_entries
+from .i18n import get_translation
+from .health import (HEALTH_OK, HEALTH_SLOW, HEALTH_DOWN, HEALTH_UNKNOWN,
+                     get_health_monitor, get_health_registry)
+from .rate_limiter import limiter_snapshots
+from .widgets import apply_button_style
+from .ui_constants import SPACING_SMALL, SPACING_MEDIUM, MARGIN_MEDIUM
+
+logger = logging.getLogger(__name__)
+
+# 后台重新探测间隔可选项（分钟，0 表示关闭）
+PROBE_INTERVAL_CHOICES = (0, 5, 15, 60)
+
+# 请求队列状态的刷新间隔（毫秒）
+QUEUE_REFRESH_MS = 1000
+
+_STATUS_COLORS = {
+    HEALTH_OK: '#2e7d32',
+    HEALTH_SLOW: '#ef6c00',
+    HEALTH_DOWN: '#c62828',
+}
+
+
+def configured_ai_ids():
+    prefs = get_prefs()
+    return [ai_id for ai_id, _, _, _ in build_configured_ai_entries(
+        prefs.get('models', {}), selected_model=prefs.get('selected_model', ''))]
+
+
+def probe_configured_ais(on_result=None):
+    """探测所有已配置的 AI（阻塞）"""
+    from .api import probe_ai_health
+    return probe_ai_health(configured_ai_ids(), on_result=on_result)
+
+
+def apply_health_monitor_setting():
+    """按设置启动或停止后台定期探测（已在以相同间隔运行时不做任何事）"""
+    monitor = get_health_monitor()
+    interval = max(0, int(get_prefs().get('health_probe_interval_minutes', 0) or 0)) * 60
+    if interval and monitor.running and monitor.interval == interval:
+        return
+    if interval:
+        monitor.start(interval, probe_configured_ais)
+    else:
+        monitor.stop()
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return '—'
+    return f'{seconds * 1000:.0f} ms' if seconds < 1 else f'{seconds:.2f} s'
+
+
+def format_queue_status(snapshots, i18n):
+    """限流器状态 -> 每个提供商一行的文字（限流器 key 中的 API Key 哈希不显示）"""
+    lines = []
+    for key, snapshot in sorted(snapshots.items()):
+        line = i18n.get('health_queue_line',
+                        '{provider}: {in_flight} running, {queued} waiting, average wait {wait}').format(
+            provider=key.split(':')[0], in_flight=snapshot['in_flight'], queued=snapshot['queued'],
+            wait=_format_seconds(snapshot['avg_wait']))
+        if snapshot['paused_for'] > 0:
+            line += ' · ' + i18n.get('health_queue_paused', 'paused for {seconds} s after HTTP 429').format(
+                seconds=max(1, int(snapshot['paused_for'] + 0.5)))
+        lines.append(line)
+    return '\n'.join(lines) or i18n.get('health_queue_empty', 'No requests yet.')
+
+
+class HealthDashboardDialog(QDialog):
+    """AI 健康状态：并行探测所有已配置的 AI"""
+
+    COLUMNS = ('ai', 'status', 'connect', 'ttfb', 'http', 'error', 'checked')
+
+    # (ai_id, ProbeResult)
+    probe_finished = pyqtSignal(str, object)
+    all_finished = pyqtSignal()
+
+    def __init__(self, parent=None, i18n=None):
+        super().__init__(parent)
+        prefs = get_prefs()
+        self.i18n = i18n or get_translation(prefs.get('language', 'en'))
+        self.registry = get_health_registry()
+        self.setWindowTitle(self.i18n.get('health_title', 'AI Health'))
+        self.setMinimumSize(760, 360)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(SPACING_MEDIUM)
+        layout.setContentsMargins(MARGIN_MEDIUM, MARGIN_MEDIUM, MARGIN_MEDIUM, MARGIN_MEDIUM)
+
+        description = QLabel(self.i18n.get('health_desc',
+            'Checks every configured AI at the same time with the cheapest request it supports (no tokens are used). '
+            'New panels avoid AIs that are down or slow.'), self)
+        description.setWordWrap(True)
+        layout.addWidget(description)
+
+        self.table = QTableWidget(0, len(self.COLUMNS), self)
+        self.table.setHorizontalHeaderLabels([
+            self.i18n.get('health_col_ai', 'AI'),
+            self.i18n.get('batch_ask_col_status', 'Status'),
+            self.i18n.get('health_col_connect', 'Connect'),
+            self.i18n.get('health_col_ttfb', 'First byte'),
+            self.i18n.get('health_col_http', 'HTTP'),
+            self.i18n.get('health_col_error', 'Last error'),
+            self.i18n.get('health_col_checked', 'Checked'),
+        ])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(5, QHeaderView.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table, 1)
+
+        layout.addWidget(QLabel(self.i18n.get('health_queue_title', 'Request queues (rate limits):'), self))
+        self.queue_label = QLabel(self)
+        self.queue_label.setWordWrap(True)
+        layout.addWidget(self.queue_label)
+        self._queue_timer = QTimer(self)
+        self._queue_timer.timeout.connect(self._refresh_queues)
+        self._queue_timer.start(QUEUE_REFRESH_MS)
+        self._refresh_queues()
+
+        buttons = QHBoxLayout()
+        buttons.setSpacing(SPACING_SMALL)
+        self.probe_button = QPushButton(self.i18n.get('health_probe_all', 'Check All'), self)
+        self.probe_button.clicked.connect(self.probe_all)
+        apply_button_style(self.probe_button, min_width=80)
+        buttons.addWidget(self.probe_button)
+        buttons.addStretch(1)
+
+        buttons.addWidget(QLabel(self.i18n.get('health_interval', 'Re-check in background:'), self))
+        self.interval_combo = QComboBox(self)
+        for minutes in PROBE_INTERVAL_CHOICES:
+            label = (self.i18n.get('health_interval_off', 'Off') if minutes == 0 else
+                     self.i18n.get('health_interval_minutes', 'Every {minutes} min').format(minutes=minutes))
+            self.interval_combo.addItem(label, minutes)
+        current = int(prefs.get('health_probe_interval_minutes', 0) or 0)
+        index = self.interval_combo.findData(current)
+        self.interval_combo.setCurrentIndex(index if index >= 0 else 0)
+        self.interval_combo.currentIndexChanged.connect(self._on_interval_changed)
+        buttons.addWidget(self.interval_combo)
+
+        close_button = QPushButton(self.i18n.get('close_button', 'Close'), self)
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        self.probe_finished.connect(self._update_row)
+        self.all_finished.connect(self._on_all_finished)
+
+        self._rows = {}
+        self._populate()
+        self.probe_all()
+
+    def _populate(self):
+        prefs = get_prefs()
+        entries = build_configured_ai_entries(prefs.get('models', {}),
+                                              selected_model=prefs.get('selected_model', ''), i18n=self.i18n)
+        self.table.setRowCount(len(entries))
+        for row, (ai_id, display_text, _, _) in enumerate(entries):
+            self._rows[ai_id] = row
+            self.table.setItem(row, 0, QTableWidgetItem(display_text))
+            self._update_row(ai_id, self.registry.get(ai_id))
+
+    def _set(self, row, column, text, color=None):
+        item = QTableWidgetItem(text)
+        if color:
+            item.setForeground(QColor(color))
+        self.table.setItem(row, column, item)
+
+    def _update_row(self, ai_id, result):
+        row = self._rows.get(ai_id)
+        if row is None:
+            return
+        status = result.status if result is not None else HEALTH_UNKNOWN
+        self._set(row, 1, self.i18n.get(f'health_status_{status}', status.title()), _STATUS_COLORS.get(status))
+        self._set(row, 2, _format_seconds(result.connect_time if result else None))
+        self._set(row, 3, _format_seconds(result.ttfb if result else None))
+        self._set(row, 4, str(result.http_status) if result and result.http_status else '—')
+        last_error = self.registry.last_error(ai_id)
+        error_text = ''
+        if last_error:
+            error, at = last_error
+            error_text = error if result is not None and result.error else \
+                f"{error} ({time.strftime('%H:%M', time.localtime(at))})"
+        self._set(row, 5, error_text)
+        self.table.item(row, 5).setToolTip(error_text)
+        self._set(row, 6, time.strftime('%H:%M:%S', time.localtime(result.checked_at)) if result else '—')
+
+    def probe_all(self):
+        ai_ids = list(self._rows)
+        if not ai_ids:
+            return
+        self.probe_button.setEnabled(False)
+        self.probe_button.setText(self.i18n.get('health_probing', 'Checking…'))
+        for ai_id in ai_ids:
+            self._set(self._rows[ai_id], 1, self.i18n.get('health_probing', 'Checking…'))
+
+        def run():
+            from .api import probe_ai_health
+
+            def on_result(ai_id, result):
+                try:
+                    self.probe_finished.emit(ai_id, result)
+                except RuntimeError:
+                    # 弹窗已关闭
+                    pass
+
+            try:
+                probe_ai_health(ai_ids, on_result=on_result)
+            finally:
+                try:
+                    self.all_finished.emit()
+                except RuntimeError:
+                    pass
+
+        threading.Thread(target=run, name='AskAIHealthProbe', daemon=True).start()
+
+    def _refresh_queues(self):
+        self.queue_label.setText(format_queue_status(limiter_snapshots(), self.i18n))
+
+    def _on_all_finished(self):
+        self.probe_button.setEnabled(True)
+        self.probe_button.setText(self.i18n.get('health_probe_all', 'Check All'))
+
+    def _on_interval_changed(self):
+        prefs = get_prefs()
+        prefs['health_probe_interval_minutes'] = self.interval_combo.currentData() or 0
+        apply_health_monitor_setting()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Hedged requests: fail over to a fallback AI when the first token is slow."""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# 没有足够样本时的默认阈值（秒）
+DEFAULT_HEDGE_DELAY = 10.0
+MIN_HEDGE_DELAY = 2.0
+MAX_HEDGE_DELAY = 60.0
+# 自适应阈值需要的最少样本数和保留的样本数
+MIN_SAMPLES = 5
+SAMPLE_WINDOW = 50
+
+
+class HedgeCancelled(Exception):
+    """另一方已经胜出，中止落后的请求"""
+
+
+class FirstTokenStats:
+    """按 AI 记录最近的首个 token 耗时（线程安全）"""
+
+    def __init__(self, window=SAMPLE_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        if not key or seconds is None or seconds < 0:
+            return
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(float(seconds))
+
+    def count(self, key):
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def percentile(self, key, q=0.9, min_samples=MIN_SAMPLES):
+        """最近样本的 q 分位数；样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, max(0, int(round(q * (len(samples) - 1)))))
+        return samples[index]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+_first_token_stats = FirstTokenStats()
+
+
+def get_first_token_stats():
+    return _first_token_stats
+
+
+def hedge_delay(key, configured=None, stats=None, default=DEFAULT_HEDGE_DELAY,
+                minimum=MIN_HEDGE_DELAY, maximum=MAX_HEDGE_DELAY):
+    """
+    计算备用 AI 的启动阈值（秒）
+
+    :param configured: 用户设置的固定阈值；为空或不大于 0 时按 p90 自适应
+    :return: 固定阈值，或 p90 限制在 [minimum, maximum] 内；样本不足时返回 default
+    """
+    try:
+        configured = float(configured) if configured not in (None, '') else None
+    except (TypeError, ValueError):
+        configured = None
+    if configured is not None and configured > 0:
+        return configured
+    p90 = (stats or _first_token_stats).percentile(key)
+    if p90 is None:
+        return default
+    return min(maximum, max(minimum, p90))
+
+
+def run_hedged(primary, fallback, delay, stream_callback=None, on_winner=None, wait=None):
+    """
+    先发主请求，超过 delay 秒仍没有内容（或主请求提前失败）时再发备用请求
+
+    :param primary: (key, fn)；fn(chunk_callback, cancel_event) 返回完整回答。流式请求把片段交给
+                    chunk_callback，非流式请求以返回结果作为“首个内容”
+    :param fallback: (key, fn)，同上
+    :param stream_callback: 只接收胜出一方的片段
+    :param on_winner: (key) 在胜出方确定时调用（首个片段到达之前）
+    :return: (胜出方 key, 回答)
+    :raises: 胜出方的异常；双方都在产出内容前失败时抛出主请求的异常
+    """
+    cond = threading.Condition()
+    state = {'winner': None, 'results': {}, 'errors': {}, 'started': []}
+    cancel_events = {}
+
+    def claim(key):
+        # 调用方持有 cond
+        if state['winner'] is None:
+            state['winner'] = key
+            for other, event in cancel_events.items():
+                if other != key:
+                    event.set()
+            cond.notify_all()
+            if on_winner is not None:
+                try:
+                    on_winner(key)
+                except Exception as e:
+                    logger.warning(f"[Hedge] on_winner 回调失败: {str(e)}")
+        return state['winner'] == key
+
+    def make_chunk_callback(key):
+        def chunk_callback(chunk):
+            with cond:
+                won = claim(key)
+            if not won:
+                raise HedgeCancelled(key)
+            if stream_callback is not None:
+                stream_callback(chunk)
+        return chunk_callback
+
+    def run(key, fn):
+        try:
+            result = fn(make_chunk_callback(key), cancel_events[key])
+        except Exception as e:
+            with cond:
+                state['errors'][key] = e
+                cond.notify_all()
+            return
+        with cond:
+            claim(key)
+            state['results'][key] = result
+            cond.notify_all()
+
+    def start(key, fn):
+        cancel_events[key] = threading.Event()
+        state['started'].append(key)
+        threading.Thread(target=run, args=(key, fn), name=f'AskAIHedge-{key}', daemon=True).start()
+
+    def settled():
+        winner = state['winner']
+        if winner is not None:
+            return winner in state['results'] or winner in state['errors']
+        return all(key in state['errors'] for key in state['started'])
+
+    primary_key, primary_fn = primary
+    fallback_key, fallback_fn = fallback
+    started_at = time.monotonic()
+    with cond:
+        start(primary_key, primary_fn)
+        while state['winner'] is None and primary_key not in state['errors']:
+            remaining = delay - (time.monotonic() - started_at)
+            if remaining <= 0:
+                break
+            cond.wait(remaining if wait is None else min(remaining, wait))
+        if state['winner'] is None:
+            reason = '主请求失败' if primary_key in state['errors'] else f'{delay:.1f} 秒内没有首个 token'
+            logger.info(f"[Hedge] {primary_key} {reason}，启动备用 AI {fallback_key}")
+            start(fallback_key, fallback_fn)
+        while not settled():
+            cond.wait(wait)
+
+        winner = state['winner']
+        if winner is None:
+            raise state['errors'][primary_key]
+        if winner in state['errors']:
+            raise state['errors'][winner]
+        if winner != primary_key:
+            logger.info(f"[Hedge] 备用 AI {winner} 先返回内容，{primary_key} 的请求已放弃")
+        return winner, state['results'][winner]
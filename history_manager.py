@@ -2,59 +2,410 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
 import json
 import logging
 import hashlib
-from datetime import datetime
-from calibre.utils.config import config_dir
+import zlib
+from datetime import datetime, timedelta
+
+try:
+    from .json_store import atomic_write_json
+    from .profiling import profiled
+except ImportError:
+    from json_store import atomic_write_json
+    from profiling import profiled
 
 logger = logging.getLogger(__name__)
 
+# 索引中问题预览的最大长度（完整问题保存在正文文件中）
+QUESTION_PREVIEW_CHARS = 200
+
+# 归档段文件大小上限，超过后滚动到新段
+ARCHIVE_SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+# 单次维护最多归档的记录数，避免一次性处理大量历史阻塞界面
+ARCHIVE_BATCH_SIZE = 200
+# 归档段中失效数据占比超过该值时重写压缩
+ARCHIVE_COMPACT_RATIO = 0.5
+
+# 同一进程内共享的索引缓存：{索引文件路径: (mtime, 索引字典)}
+# 每个面板的 ResponseHandler 都会创建 HistoryManager，共享索引避免重复解析，
+# 也避免多个实例各自持有旧副本、保存时互相覆盖
+_INDEX_CACHE = {}
+
+
 class HistoryManager:
-    def __init__(self):
-        # 使用新的历史记录文件（v2版本）
-        self.history_file = os.path.join(config_dir, 'plugins', 'ask_ai_plugin_history_v2.json')
-        self.histories = self._load_histories()
-        
-        # 保留旧版本文件路径用于迁移
-        self.old_history_file = os.path.join(config_dir, 'plugins', 'ask_ai_plugin_latest_history.json')
-    
-    def _load_histories(self):
-        """加载历史记录文件（新版本格式）"""
-        if not os.path.exists(self.history_file):
-            return {}
-        
+    """问询历史记录管理（两级存储）
+
+    - 索引文件 index.json：uid、时间戳、模式、书籍、问题预览、AI 列表，打开对话框时加载
+    - 正文文件 bodies/<uid>.json：完整问题与各 AI 的回答，仅在打开/导出某条历史时读取
+    - 归档段 archive/segment-NNNN.seg：较旧记录的正文以 zlib 压缩后追加写入，
+      索引条目中记录 (段名, 偏移, 长度)，打开时按需解压
+    """
+
+    def __init__(self, base_dir=None):
+        if base_dir is None:
+            from calibre.utils.config import config_dir
+            base_dir = os.path.join(config_dir, 'plugins')
+
+        # v3：索引 + 正文分离存储
+        self.history_dir = os.path.join(base_dir, 'ask_ai_plugin_history')
+        self.index_file = os.path.join(self.history_dir, 'index.json')
+        self.bodies_dir = os.path.join(self.history_dir, 'bodies')
+        self.archive_dir = os.path.join(self.history_dir, 'archive')
+
+        # 旧版本文件路径（用于迁移）
+        self.history_file = os.path.join(base_dir, 'ask_ai_plugin_history_v2.json')
+        self.old_history_file = os.path.join(base_dir, 'ask_ai_plugin_latest_history.json')
+
+        self.histories = self._load_index()
+
+    # ----- 索引 -----
+
+    def _load_index(self):
+        """加载历史索引（同一进程内共享，文件被外部修改时重新加载）"""
+        if not os.path.exists(self.index_file) and os.path.exists(self.history_file):
+            self._migrate_from_v2()
+
         try:
-            with open(self.history_file, 'r', encoding='utf-8') as f:
+            mtime = os.path.getmtime(self.index_file)
+        except OSError:
+            mtime = None
+
+        cached = _INDEX_CACHE.get(self.index_file)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        index = {}
+        if mtime is not None:
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except Exception as e:
+                logger.error(f"加载历史索引失败: {str(e)}")
+                self._backup_corrupted(self.index_file)
+                index = {}
+
+        _INDEX_CACHE[self.index_file] = (mtime, index)
+        return index
+
+    @profiled('history.save_index')
+    def _save_index(self):
+        """保存历史索引"""
+        try:
+            os.makedirs(self.history_dir, exist_ok=True)
+            self._atomic_write_json(self.index_file, self.histories)
+            _INDEX_CACHE[self.index_file] = (os.path.getmtime(self.index_file), self.histories)
+        except Exception as e:
+            logger.error(f"保存历史索引失败: {str(e)}")
+
+    # 兼容旧调用：过去 _save_histories 负责整体写回
+    _save_histories = _save_index
+
+    @staticmethod
+    def _make_index_entry(record):
+        """由完整记录生成索引条目（bytes 为问题与回答的 UTF-8 字节数，供保留策略使用）"""
+        question = record.get('question', '') or ''
+        size = len(question.encode('utf-8'))
+        for answer_data in (record.get('answers') or {}).values():
+            answer = answer_data.get('answer', '') if isinstance(answer_data, dict) else answer_data
+            size += len((answer or '').encode('utf-8'))
+        return {
+            'uid': record['uid'],
+            'timestamp': record.get('timestamp', ''),
+            'mode': record.get('mode', 'single'),
+            'books': record.get('books', []),
+            'question': question[:QUESTION_PREVIEW_CHARS],
+            'ai_ids': list((record.get('answers') or {}).keys()),
+            'bytes': size,
+        }
+
+    # ----- 正文 -----
+
+    def _body_path(self, uid):
+        uid = str(uid)
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', uid)
+        if safe_name != uid:
+            safe_name += '_' + hashlib.md5(uid.encode('utf-8')).hexdigest()[:8]
+        return os.path.join(self.bodies_dir, f'{safe_name}.json')
+
+    def _load_body(self, uid):
+        """读取正文（完整问题 + 回答），不存在时返回 None"""
+        entry = self.histories.get(uid) or {}
+        if entry.get('archive'):
+            return self._read_archived_body(entry['archive'])
+        path = self._body_path(uid)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
                 return json.load(f)
+        except Exception as e:
+            logger.error(f"加载历史正文失败: {uid}, {str(e)}")
+            return None
+
+    @profiled('history.save_body')
+    def _save_body(self, uid, body):
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self._atomic_write_json(self._body_path(uid), body)
+
+    def _delete_body(self, uid):
+        path = self._body_path(uid)
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"删除历史正文失败: {uid}, {str(e)}")
+
+    # ----- 工具方法 -----
+
+    _atomic_write_json = staticmethod(atomic_write_json)
+
+    @staticmethod
+    def _backup_corrupted(path):
+        try:
+            import shutil
+            backup_file = f"{path}.bak"
+            shutil.copy2(path, backup_file)
+            logger.warning(f"历史记录文件已损坏，已备份到: {backup_file}")
+        except Exception as backup_error:
+            logger.error(f"备份历史记录文件失败: {str(backup_error)}")
+
+    def _migrate_from_v2(self):
+        """一次性迁移 v2 单文件格式到索引 + 正文格式，原文件保留为 .migrated 备份"""
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                old_histories = json.load(f)
         except Exception as e:
             logger.error(f"加载历史记录失败: {str(e)}")
-            # 备份损坏的文件
+            self._backup_corrupted(self.history_file)
+            return
+
+        index = {}
+        for uid, record in old_histories.items():
+            if not isinstance(record, dict):
+                continue
+            record.setdefault('uid', uid)
+            self._normalize_answers(record)
             try:
-                import shutil
-                backup_file = f"{self.history_file}.bak"
-                shutil.copy2(self.history_file, backup_file)
-                logger.warning(f"历史记录文件已损坏，已备份到: {backup_file}")
-            except Exception as backup_error:
-                logger.error(f"备份历史记录文件失败: {str(backup_error)}")
-            return {}
-    
-    def _save_histories(self):
-        """保存历史记录到文件"""
+                self._save_body(uid, {
+                    'uid': uid,
+                    'question': record.get('question', ''),
+                    'answers': record.get('answers', {}),
+                })
+            except Exception as e:
+                logger.error(f"迁移历史正文失败: {uid}, {str(e)}")
+                return
+            index[uid] = self._make_index_entry(record)
+
         try:
-            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.histories, f, ensure_ascii=False, indent=2)
+            os.makedirs(self.history_dir, exist_ok=True)
+            self._atomic_write_json(self.index_file, index)
+            os.replace(self.history_file, f"{self.history_file}.migrated")
+            logger.info(f"历史记录已迁移到索引格式: {len(index)} 条")
         except Exception as e:
-            logger.error(f"保存历史记录失败: {str(e)}")
-    
+            logger.error(f"迁移历史索引失败: {str(e)}")
+
+    @staticmethod
+    def _normalize_answers(record):
+        """确保 answers 键存在（兼容旧格式：answer 字段迁移到 answers['default']）"""
+        if 'answers' in record:
+            return
+        if 'answer' in record:
+            old_answer = record.pop('answer')
+            record['answers'] = {
+                'default': {
+                    'answer': old_answer,
+                    'timestamp': record.get('timestamp', '')
+                }
+            }
+        else:
+            record['answers'] = {}
+
+    # ----- 归档层 -----
+
+    def _segment_path(self, name):
+        return os.path.join(self.archive_dir, name)
+
+    def _read_archived_body(self, location):
+        try:
+            with open(self._segment_path(location['segment']), 'rb') as f:
+                f.seek(location['offset'])
+                data = f.read(location['length'])
+            return json.loads(zlib.decompress(data).decode('utf-8'))
+        except Exception as e:
+            logger.error(f"读取归档历史失败: {location}, {str(e)}")
+            return None
+
+    def _current_segment(self):
+        """返回可追加写入的段文件名（超过大小上限时新建）"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        segments = sorted(n for n in os.listdir(self.archive_dir) if n.endswith('.seg'))
+        if segments:
+            last = segments[-1]
+            if os.path.getsize(self._segment_path(last)) < ARCHIVE_SEGMENT_MAX_BYTES:
+                return last
+            number = int(last[len('segment-'):-len('.seg')]) + 1
+        else:
+            number = 1
+        return f'segment-{number:04d}.seg'
+
+    def archive_old_histories(self, max_age_days, batch_size=ARCHIVE_BATCH_SIZE, now=None):
+        """将早于 max_age_days 天的记录正文压缩写入归档段
+
+        Returns:
+            int: 本次归档的记录数
+        """
+        if not max_age_days or max_age_days <= 0:
+            return 0
+        cutoff = ((now or datetime.now()) - timedelta(days=max_age_days)).strftime('%Y-%m-%d %H:%M:%S')
+        candidates = sorted(
+            (entry for entry in self.histories.values()
+             if not entry.get('archive') and entry.get('timestamp', '') < cutoff),
+            key=lambda x: x['timestamp'],
+        )[:batch_size]
+        if not candidates:
+            return 0
+
+        archived = []
+        segment = self._current_segment()
+        try:
+            with open(self._segment_path(segment), 'ab') as f:
+                for entry in candidates:
+                    body = self._load_body(entry['uid'])
+                    if body is None:
+                        continue
+                    data = zlib.compress(json.dumps(body, ensure_ascii=False).encode('utf-8'), 6)
+                    offset = f.tell()
+                    f.write(data)
+                    archived.append((entry, {'segment': segment, 'offset': offset, 'length': len(data)}))
+                    if offset + len(data) >= ARCHIVE_SEGMENT_MAX_BYTES:
+                        break
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            logger.error(f"归档历史记录失败: {str(e)}")
+            return 0
+
+        # 段文件落盘后再更新索引，索引落盘后再删除原正文文件，保证任何时刻都能读到正文
+        for entry, location in archived:
+            entry['archive'] = location
+        self._save_index()
+        for entry, _ in archived:
+            self._delete_body(entry['uid'])
+        logger.info(f"已归档 {len(archived)} 条历史记录到 {segment}")
+        return len(archived)
+
+    def compact_archive(self, force=False):
+        """重写归档段，清除已删除/已重新保存记录留下的失效数据
+
+        Returns:
+            bool: 是否执行了重写
+        """
+        if not os.path.isdir(self.archive_dir):
+            return False
+        segments = sorted(n for n in os.listdir(self.archive_dir) if n.endswith('.seg'))
+        total_bytes = sum(os.path.getsize(self._segment_path(n)) for n in segments)
+        live = [entry for entry in self.histories.values() if entry.get('archive')]
+        live_bytes = sum(entry['archive']['length'] for entry in live)
+        if not total_bytes or (not force and live_bytes >= total_bytes * (1 - ARCHIVE_COMPACT_RATIO)):
+            return False
+
+        # 读出全部有效数据写入新段，索引更新后再删除旧段
+        new_locations = {}
+        number = int(segments[-1][len('segment-'):-len('.seg')]) + 1 if segments else 1
+        out = None
+        try:
+            for entry in sorted(live, key=lambda x: x['timestamp']):
+                location = entry['archive']
+                with open(self._segment_path(location['segment']), 'rb') as f:
+                    f.seek(location['offset'])
+                    data = f.read(location['length'])
+                if out is None or out.tell() >= ARCHIVE_SEGMENT_MAX_BYTES:
+                    if out is not None:
+                        out.close()
+                    segment = f'segment-{number:04d}.seg'
+                    number += 1
+                    out = open(self._segment_path(segment), 'wb')
+                new_locations[entry['uid']] = {'segment': segment, 'offset': out.tell(), 'length': len(data)}
+                out.write(data)
+        except Exception as e:
+            logger.error(f"压缩归档失败: {str(e)}")
+            return False
+        finally:
+            if out is not None:
+                out.close()
+
+        for uid, location in new_locations.items():
+            self.histories[uid]['archive'] = location
+        self._save_index()
+        for name in segments:
+            try:
+                os.remove(self._segment_path(name))
+            except OSError as e:
+                logger.warning(f"删除旧归档段失败: {name}, {str(e)}")
+        logger.info(f"归档已压缩: {total_bytes} -> {live_bytes} 字节")
+        return True
+
+    def apply_retention(self, max_records=0, max_bytes_per_book=0):
+        """按保留策略删除最旧的记录
+
+        Args:
+            max_records: 最多保留的记录数（0 表示不限制）
+            max_bytes_per_book: 每本书关联记录的最大总字节数（UTF-8，0 表示不限制）
+
+        Returns:
+            int: 删除的记录数
+        """
+        to_delete = set()
+        newest_first = sorted(self.histories.values(), key=lambda x: x['timestamp'], reverse=True)
+
+        if max_records and max_records > 0:
+            to_delete.update(entry['uid'] for entry in newest_first[max_records:])
+
+        if max_bytes_per_book and max_bytes_per_book > 0:
+            used = {}
+            for entry in newest_first:
+                if entry['uid'] in to_delete:
+                    continue
+                size = entry['bytes']
+                for book in entry.get('books', []):
+                    book_id = book.get('id')
+                    if used.get(book_id, 0) + size > max_bytes_per_book:
+                        to_delete.add(entry['uid'])
+                        break
+                else:
+                    for book in entry.get('books', []):
+                        used[book.get('id')] = used.get(book.get('id'), 0) + size
+
+        if not to_delete:
+            return 0
+        for uid in to_delete:
+            self.histories.pop(uid, None)
+            self._delete_body(uid)
+        self._save_index()
+        logger.info(f"按保留策略删除了 {len(to_delete)} 条历史记录")
+        return len(to_delete)
+
+    def run_maintenance(self, prefs):
+        """执行保留策略、归档与压缩（由对话框关闭时调用）"""
+        try:
+            self.apply_retention(
+                max_records=int(prefs.get('history_max_records', 0) or 0),
+                max_bytes_per_book=int(prefs.get('history_max_bytes_per_book', 0) or 0),
+            )
+            self.archive_old_histories(int(prefs.get('history_archive_after_days', 0) or 0))
+            self.compact_archive()
+        except Exception as e:
+            logger.error(f"历史记录维护失败: {str(e)}")
+
     def generate_uid(self, book_ids):
         """
         生成唯一 UID
-        
+
         Args:
             book_ids: 书籍ID列表
-            
+
         Returns:
             str: UID格式 {timestamp}_{book_ids_hash}
         """
@@ -62,13 +413,14 @@ class HistoryManager:
         book_ids_sorted = sorted([str(bid) for bid in book_ids])
         book_ids_str = ','.join(book_ids_sorted)
         hash_suffix = hashlib.md5(book_ids_str.encode()).hexdigest()[:12]
-        
+
         return f"{timestamp}_{hash_suffix}"
-    
-    def save_history(self, uid, mode, books_metadata, question, answer, ai_id=None, model_info=None):
+
+    def save_history(self, uid, mode, books_metadata, question, answer, ai_id=None, model_info=None,
+                     parent_uid=None, prompt=None):
         """
         保存历史记录（支持多AI响应）
-        
+
         Args:
             uid: 唯一标识符
             mode: 'single' 或 'multi'
@@ -77,12 +429,17 @@ class HistoryManager:
             answer: AI回答（单个AI）或字典（多个AI）
             ai_id: AI标识符（可选，用于多AI场景）
             model_info: 模型信息字典（可选），包含provider_name, model, api_base等
+            parent_uid: 追问时上一轮对话的 UID（可选），用于多轮上下文
+            prompt: 实际发送的提示词（可选），与问题不同时保存，作为多轮对话的稳定前缀
         """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
         # 如果历史记录不存在，创建新的
-        if uid not in self.histories:
-            self.histories[uid] = {
+        record = self.get_history_by_uid(uid)
+        if record is None:
+            record = {
                 'uid': uid,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'timestamp': now,
                 'mode': mode,
                 'books': books_metadata,
                 'question': question,
@@ -90,109 +447,133 @@ class HistoryManager:
             }
         else:
             # 历史记录已存在，更新问题（以防用户修改了问题）
-            self.histories[uid]['question'] = question
+            record['question'] = question
             # 更新时间戳为最新的响应时间
-            self.histories[uid]['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
+            record['timestamp'] = now
+
+        # 多轮对话链接（首次保存时确定，之后不变）
+        if parent_uid and not record.get('parent_uid'):
+            record['parent_uid'] = parent_uid
+        if prompt and prompt != question and not record.get('prompt'):
+            record['prompt'] = prompt
+
         # 确保answers键存在（兼容旧格式）
-        if 'answers' not in self.histories[uid]:
-            # 旧格式转换：如果有answer字段，迁移到answers['default']
-            if 'answer' in self.histories[uid]:
-                old_answer = self.histories[uid].pop('answer')
-                self.histories[uid]['answers'] = {
-                    'default': {
-                        'answer': old_answer,
-                        'timestamp': self.histories[uid]['timestamp']
-                    }
-                }
-            else:
-                self.histories[uid]['answers'] = {}
-        
-        # 更新或添加AI的响应
+        self._normalize_answers(record)
+
+        # 更新或添加AI的响应（单AI场景向后兼容：使用'default'作为key）
+        answer_data = {
+            'answer': answer,
+            'timestamp': now
+        }
+        # 如果提供了模型信息，保存它
+        if model_info:
+            answer_data['model_info'] = model_info
+        record['answers'][ai_id or 'default'] = answer_data
         if ai_id:
-            # 多AI场景：保存特定AI的响应
-            answer_data = {
-                'answer': answer,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            # 如果提供了模型信息，保存它
-            if model_info:
-                answer_data['model_info'] = model_info
-            self.histories[uid]['answers'][ai_id] = answer_data
             logger.info(f"历史记录已保存: UID={uid}, AI={ai_id}, 模式={mode}, 问题长度={len(question)}, 答案长度={len(answer)}")
         else:
-            # 单AI场景（向后兼容）：使用'default'作为key
-            answer_data = {
-                'answer': answer,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            # 如果提供了模型信息，保存它
-            if model_info:
-                answer_data['model_info'] = model_info
-            self.histories[uid]['answers']['default'] = answer_data
             logger.info(f"历史记录已保存: UID={uid}, 模式={mode}, 书籍数={len(books_metadata)}, 问题长度={len(question)}, 答案长度={len(answer)}")
-        
-        self._save_histories()
-    
+
+        body = {
+            'uid': uid,
+            'question': record['question'],
+            'answers': record['answers'],
+        }
+        for key in ('parent_uid', 'prompt'):
+            if record.get(key):
+                body[key] = record[key]
+        try:
+            self._save_body(uid, body)
+        except Exception as e:
+            logger.error(f"保存历史正文失败: {str(e)}")
+            return
+
+        self.histories[uid] = self._make_index_entry(record)
+        self._save_index()
+
     def get_related_histories(self, book_ids):
         """
-        获取包含指定书籍的所有历史记录
-        
+        获取包含指定书籍的所有历史记录（仅索引条目，不含回答正文）
+
         Args:
             book_ids: 书籍ID列表
-            
+
         Returns:
-            历史记录列表，按时间倒序
+            历史记录索引列表，按时间倒序；需要回答内容时使用 get_history_by_uid
         """
         related = []
-        
+        book_ids = set(book_ids)
+
         for uid, history in self.histories.items():
             # 检查是否包含任意一本书
-            history_book_ids = [book['id'] for book in history['books']]
-            if any(book_id in history_book_ids for book_id in book_ids):
+            if any(book['id'] in book_ids for book in history['books']):
                 related.append(history)
-        
+
         # 按时间倒序排序
         related.sort(key=lambda x: x['timestamp'], reverse=True)
-        
+
         return related
-    
+
+    def has_history(self, uid):
+        """是否存在指定 UID 的历史记录（只查索引）"""
+        return uid in self.histories
+
     def get_history_by_uid(self, uid):
-        """根据 UID 获取历史记录"""
-        return self.histories.get(uid)
-    
+        """根据 UID 获取完整历史记录（按需读取回答正文）"""
+        entry = self.histories.get(uid)
+        if entry is None:
+            return None
+        body = self._load_body(uid) or {}
+        record = {key: value for key, value in entry.items() if key not in ('ai_ids', 'bytes', 'archive')}
+        record['question'] = body.get('question', entry.get('question', ''))
+        record['answers'] = body.get('answers', {})
+        for key in ('parent_uid', 'prompt'):
+            if body.get(key):
+                record[key] = body[key]
+        return record
+
+    def get_full_histories(self, histories):
+        """将索引条目列表展开为完整记录（用于导出）"""
+        full = []
+        for entry in histories:
+            record = self.get_history_by_uid(entry['uid'])
+            if record is not None:
+                full.append(record)
+        return full
+
     def get_ai_search_histories(self):
         """获取所有 AI Search 模式的历史记录（books 为空或包含 AI Search 标记）
-        
+
         Returns:
             历史记录列表，按时间倒序
         """
         ai_search_histories = []
-        
+
         for uid, history in self.histories.items():
             books = history.get('books', [])
             # AI Search 模式：books 为空列表，或包含特殊的 AI Search 标记
             if not books or (len(books) == 1 and books[0].get('id') == 'ai_search'):
                 ai_search_histories.append(history)
-        
+
         # 按时间倒序排序
         ai_search_histories.sort(key=lambda x: x['timestamp'], reverse=True)
-        
+
         return ai_search_histories
-    
+
     def delete_history(self, uid):
         """删除指定UID的历史记录
-        
+
         Args:
             uid: 历史记录的唯一标识符
-            
+
         Returns:
             bool: 删除成功返回True，失败返回False
         """
         try:
             if uid in self.histories:
                 del self.histories[uid]
-                self._save_histories()
+                self._save_index()
+                self._delete_body(uid)
                 logger.info(f"已删除历史记录: {uid}")
                 return True
             else:
@@ -201,27 +582,33 @@ class HistoryManager:
         except Exception as e:
             logger.error(f"删除历史记录失败: {str(e)}")
             return False
-    
+
     def clear_history(self):
-        """清空所有历史记录"""
+        """清空所有历史记录（包括旧版本文件和迁移留下的 .migrated 备份）"""
         try:
-            self.histories = {}
-            if os.path.exists(self.history_file):
-                os.remove(self.history_file)
+            # 共享索引原地清空：其他实例之后保存时不会把旧记录写回
+            self.histories.clear()
+            if os.path.exists(self.history_dir):
+                import shutil
+                shutil.rmtree(self.history_dir)
+            _INDEX_CACHE.pop(self.index_file, None)
+            for path in (self.history_file, f"{self.history_file}.migrated", self.old_history_file):
+                if os.path.exists(path):
+                    os.remove(path)
             logger.info("所有历史记录已清空")
             return True
         except Exception as e:
             logger.error(f"清空历史记录失败: {str(e)}")
             return False
-    
+
     # 保留旧版本兼容方法
     def get_history(self, metadata):
         """
         获取指定书籍的历史记录（旧版本兼容）
-        
+
         Args:
             metadata: 书籍元数据字典
-            
+
         Returns:
             dict: 历史记录，如果没有则返回None
         """
@@ -231,5 +618,5 @@ class HistoryManager:
             histories = self.get_related_histories([book_id])
             if histories:
                 # 返回最新的一条记录
-                return histories[0]
+                return self.get_history_by_uid(histories[0]['uid'])
         return None
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Bounded LRU cache of sanitised response HTML."""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    from .json_store import atomic_write_json, load_versioned_json
+except ImportError:
+    from json_store import atomic_write_json, load_versioned_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 200
+# 按字符数限制总占用，避免超长回答把缓存撑爆
+DEFAULT_MAX_CHARS = 8_000_000
+# 单条 HTML 超过该长度不缓存
+MAX_ENTRY_CHARS = 2_000_000
+
+_CACHE_FORMAT_VERSION = 1
+
+
+def content_hash(text):
+    """回答文本的内容哈希"""
+    return hashlib.sha1((text or '').encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def renderer_fingerprint(*parts):
+    """根据渲染配置（库版本、extras、白名单等）生成渲染器版本号
+
+    渲染配置一变，旧缓存自动失效。
+    """
+    payload = json.dumps(parts, sort_keys=True, default=repr, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+class RenderedHTMLCache:
+    """线程安全的渲染结果 LRU 缓存（MarkdownWorker 在后台线程写入）"""
+
+    def __init__(self, renderer_version, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_chars=DEFAULT_MAX_CHARS, cache_file=None):
+        self.renderer_version = renderer_version
+        self.max_entries = max(1, int(max_entries))
+        self.max_chars = max(1, int(max_chars))
+        self.cache_file = cache_file
+        self._entries = OrderedDict()
+        self._total_chars = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if cache_file:
+            self.load()
+
+    def _key(self, text, theme):
+        return '{}:{}:{}'.format(content_hash(text), self.renderer_version, theme or 'default')
+
+    def get(self, text, theme=None):
+        """返回缓存的 HTML，未命中返回 None"""
+        key = self._key(text, theme)
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, text, html, theme=None):
+        if not html or len(html) > MAX_ENTRY_CHARS:
+            return
+        key = self._key(text, theme)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_chars -= len(old)
+            self._entries[key] = html
+            self._total_chars += len(html)
+            self._evict()
+            self._dirty = True
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self._total_chars > self.max_chars):
+            _, html = self._entries.popitem(last=False)
+            self._total_chars -= len(html)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_chars = 0
+            self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'chars': self._total_chars,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    # ----- 持久化 -----
+
+    def load(self):
+        """从磁盘加载缓存；渲染器版本不一致的条目直接丢弃"""
+        data = load_versioned_json(self.cache_file, _CACHE_FORMAT_VERSION)
+        if data is None:
+            return
+        suffix = ':{}:'.format(self.renderer_version)
+        with self._lock:
+            for key, html in data.get('entries', []):
+                if suffix in key and isinstance(html, str):
+                    self._entries[key] = html
+                    self._total_chars += len(html)
+            self._evict()
+            self._dirty = False
+
+    def save(self):
+        """有改动时写回磁盘（先写临时文件再替换，避免写一半损坏）"""
+        if not self.cache_file or not self._dirty:
+            return
+        with self._lock:
+            payload = {
+                'version': _CACHE_FORMAT_VERSION,
+                'entries': list(self._entries.items()),
+            }
+            self._dirty = False
+        try:
+            atomic_write_json(self.cache_file, payload)
+        except Exception as e:
+            logger.warning(f"保存渲染缓存失败: {str(e)}")
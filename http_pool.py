@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Shared HTTP connection pool and connection pre-warming for AI providers."""
+
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
+except ImportError:
+    # 测试环境：直接使用 vendor 目录中的 requests
+    import requests
+
+logger = logging.getLogger(__name__)
+
+POOL_HOSTS = 16
+POOL_SIZE = 16
+PREWARM_CONNECT_TIMEOUT = 5.0
+PREWARM_READ_TIMEOUT = 5.0
+# 同一主机在此时间内预热过则跳过（连接池中的连接仍然可用）
+PREWARM_INTERVAL = 60.0
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_warmed = {}
+_warmed_lock = threading.Lock()
+
+
+def _create_session(trust_env):
+    session = requests.Session()
+    session.trust_env = trust_env
+    # 重试由 resilience 层统一处理，适配器本身不重试
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE, max_retries=0, pool_block=False,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(trust_env=True):
+    """
+    获取共享的 Session（线程安全，连接在所有请求之间复用）
+
+    :param trust_env: False 时不读取环境变量中的代理设置（本地服务使用）
+    """
+    with _sessions_lock:
+        session = _sessions.get(trust_env)
+        if session is None:
+            session = _create_session(trust_env)
+            _sessions[trust_env] = session
+        return session
+
+
+def close_sessions():
+    """关闭所有共享连接（插件卸载或测试清理时调用）"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    with _warmed_lock:
+        _warmed.clear()
+    for session in sessions:
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+def origin_of(url):
+    """scheme://host[:port]；无法解析时返回 None"""
+    parts = urlsplit(url or '')
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def prewarm_connection(url, session=None, now=None, interval=PREWARM_INTERVAL):
+    """
+    对 url 所在主机建立 keep-alive 连接并放回连接池
+
+    HEAD 请求的状态码无关紧要（404/405 也说明连接已建立），不带认证信息。
+    :return: 建立了连接返回 True；跳过或失败返回 False
+    """
+    origin = origin_of(url)
+    if origin is None:
+        return False
+    session = session or get_session()
+    now = time.time() if now is None else now
+    key = (id(session), origin)
+    with _warmed_lock:
+        if now - _warmed.get(key, float('-inf')) < interval:
+            return False
+        _warmed[key] = now
+    started = time.time()
+    try:
+        response = session.head(origin + '/', allow_redirects=False,
+                                timeout=(PREWARM_CONNECT_TIMEOUT, PREWARM_READ_TIMEOUT))
+        response.close()
+    except Exception as e:
+        with _warmed_lock:
+            _warmed.pop(key, None)
+        logger.info(f"预热连接 {origin} 失败: {str(e)}")
+        return False
+    logger.info(f"已预热连接 {origin}，耗时 {(time.time() - started) * 1000:.0f} ms")
+    return True
+
+
+class Prewarmer:
+    """在守护线程中并行执行预热任务；cancel() 之后任务应在下一个检查点退出"""
+
+    def __init__(self, name='AskAIPrewarm'):
+        self.name = name
+        self._cancel_event = threading.Event()
+        self._threads = []
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def start(self, tasks):
+        """
+        :param tasks: 可调用对象列表，每个在独立线程中调用 task(cancel_event)；异常只记录日志
+        """
+        for index, task in enumerate(tasks):
+            thread = threading.Thread(target=self._run, args=(task,), name=f'{self.name}-{index}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _run(self, task):
+        if self._cancel_event.is_set():
+            return
+        try:
+            task(self._cancel_event)
+        except Exception as e:
+            logger.warning(f"预热失败: {str(e)}")
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def wait(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
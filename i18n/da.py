@@ -68,7 +68,7 @@ class DanishTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Brug {books_metadata} for boginformation, {query} for brugerens spørgsmål',
             'dynamic_fields_title': 'Dynamiske felter reference',
             'dynamic_fields_subtitle': 'Tilgængelige felter og eksempelværdier fra "Frankenstein" af Mary Shelley',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Engelsk<br><b>{series}</b> → (ingen)<br><b>{query}</b> → Din spørgsmålstekst',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Engelsk<br><b>{series}</b> → (ingen)<br><b>{passages}</b> → Passager fra bogen, der vedrører spørgsmålet<br><b>{query}</b> → Din spørgsmålstekst',
             'reset_prompts': 'Nulstil prompts til standard',
             'reset_prompts_confirm': 'Er du sikker på, at du vil nulstille alle prompt-skabeloner til deres standardværdier? Denne handling kan ikke fortrydes.',
             'unsaved_changes_title': 'Ugemte ændringer',
@@ -291,6 +291,9 @@ class DanishTranslation(BaseTranslation):
                 'sænk grænsen under Plugin-konfiguration → General, eller reducer valgte bøger / '
                 'brug en mere specifik forespørgsel.'
             ),
+            'question_too_long_detail_tokens': 'Prompten er for lang (ca. {current} tokens, grænse {limit} tokens for {model}, {over} for meget). Du har valgt {book_count} bog/bøger.',
+            'question_too_long_detail_library_tokens': 'Prompten er for lang (ca. {current} tokens, grænse {limit} tokens for {model}, {over} for meget). Dit biblioteksindeks indeholder {book_count} bog/bøger.',
+            'question_too_long_hint_model': 'Grænsen er beregnet ud fra kontekstvinduet for {model} ({window} tokens). Vælg en model med et større kontekstvindue, eller stil et mere specifikt spørgsmål.',
             'large_selection_dialog_title': 'Mange bøger valgt',
             'large_selection_dialog_message': (
                 'Du har valgt {count} bøger. Til biblioteksomfattende spørgsmål fungerer AI Search bedre '
@@ -356,8 +359,6 @@ class DanishTranslation(BaseTranslation):
 
             # Stream response handling
             'stream_response_code': 'Stream-svar statuskode: {code}',
-            'stream_continue_prompt': 'Fortsæt venligst dit forrige svar uden at gentage indhold, der allerede er leveret.',
-            'stream_continue_code_blocks': 'Dit forrige svar havde uafsluttede kodeblokke. Fortsæt venligst og færdiggør disse kodeblokke.',
             'stream_continue_parentheses': 'Dit forrige svar havde uafsluttede parenteser. Fortsæt venligst og sørg for, at alle parenteser er korrekt lukket.',
             'stream_continue_interrupted': 'Dit forrige svar ser ud til at være blevet afbrudt. Fortsæt venligst med at færdiggøre din sidste tanke eller forklaring.',
             'stream_timeout_error': 'Stream-transmission har ikke modtaget nyt indhold i 60 sekunder, muligvis et forbindelsesproblem.',
@@ -555,6 +556,108 @@ class DanishTranslation(BaseTranslation):
             'library_enable_tooltip': 'Når aktiveret, kan du søge i dit bibliotek ved hjælp af AI, når ingen bøger er valgt',
             'library_update': 'Opdater biblioteksdata',
             'library_update_tooltip': 'Udtræk bogtitler og forfattere fra dit bibliotek',
+            'library_dictionary_format': 'Komprimér boglisten med forfatter-/seriekoder',
+            'library_dictionary_format_tooltip': 'Gentagne forfattere og serier vises én gang og henvises til med en kort kode, så mere af et stort bibliotek kan være i hver AI-søgning',
+            'library_semantic_search': 'Semantisk søgning med lokale embeddings (Ollama)',
+            'library_semantic_search_tooltip': 'Embeds title, authors, tags and description of every book with your local Ollama server and sends only the most relevant books to the AI. The index is updated with "Update Library Data".',
+            'book_passages_indexing': 'Læser bogens tekst… {percent}%',
+            'book_passages_unavailable': '(No readable book text is available; EPUB, AZW3 or TXT format is required.)',
+            'batch_ask_menu': 'Spørg hver bog',
+            'batch_ask_title': 'Spørg hver bog',
+            'batch_ask_question_placeholder': 'Spørgsmål til hver valgt bog',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Parallelle forespørgsler:',
+            'batch_ask_col_book': 'Bog',
+            'batch_ask_col_status': 'Status',
+            'batch_ask_col_latency': 'Tid',
+            'batch_ask_col_answer': 'Svar',
+            'batch_ask_start': 'Start',
+            'batch_ask_resume': 'Genoptag',
+            'batch_ask_status_pending': 'Venter',
+            'batch_ask_status_running': 'Kører…',
+            'batch_ask_status_done': 'Færdig',
+            'batch_ask_status_failed': 'Mislykkedes',
+            'batch_ask_summary': '{done} færdige, {failed} mislykkedes, {pending} tilbage',
+            'batch_ask_no_selection': 'Vælg først de bøger, du vil spørge om.',
+            'batch_ask_confirm_close': 'Batchen kører stadig. Stop den? Du kan genoptage den senere.',
+            'jobs_menu': 'Baggrundsjob',
+            'jobs_title': 'Baggrundsjob',
+            'jobs_new': 'Nyt job…',
+            'jobs_new_title': 'Nyt baggrundsjob',
+            'jobs_name': 'Navn:',
+            'jobs_column': 'Skriv til kolonne:',
+            'jobs_scope': 'Bøger:',
+            'jobs_scope_selected': 'Valgte bøger ({count})',
+            'jobs_scope_library': 'Hele biblioteket ({count})',
+            'jobs_question_placeholder': 'e.g. "List up to three genres for this book, separated by commas. Reply with the genres only."',
+            'jobs_no_columns': 'Create a text or comments custom column in calibre first (Preferences → Add your own columns).',
+            'jobs_pause': 'Pause',
+            'jobs_retry_failed': 'Prøv mislykkede igen',
+            'jobs_delete': 'Slet',
+            'jobs_delete_confirm': 'Delete this job? Values already written to the column are kept.',
+            'jobs_col_name': 'Job',
+            'jobs_col_column': 'Kolonne',
+            'jobs_col_progress': 'Fremskridt',
+            'jobs_col_throughput': 'Bøger/min',
+            'jobs_col_eta': 'Resterende',
+            'jobs_failed_count': '({count} mislykkedes)',
+            'jobs_status_paused': 'Sat på pause',
+            'jobs_status_cancelled': 'Annulleret',
+            'jobs_use_batch': 'Brug udbyderens batch-API',
+            'jobs_use_batch_tooltip': 'Submit all requests as one offline batch. Usually half the price and no rate-limit pressure, but results can take up to 24 hours.',
+            'circuit_open_error': '{provider} fejlede {failures} gange i træk, så forespørgsler er sat på pause. Der prøves automatisk igen om {seconds} sekunder.',
+            'ollama_num_ctx_label': 'Kontekstvindue (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Automatisk (tilpasset hver forespørgsel)',
+            'ollama_keep_alive_label': 'Hold modellen indlæst i',
+            'ollama_tuning_desc': 'Leave the context window empty to size it from each prompt (up to the model maximum). Keep-alive accepts values such as 30m or 2h; -1 keeps the model loaded.',
+            'fallback_ai_menu': 'Reserve-AI ved langsomt svar',
+            'fallback_ai_tooltip': 'If the first words of an answer take too long, the same question is sent to this AI and whichever answers first is shown.',
+            'fallback_ai_none': 'Ingen',
+            'answered_by_fallback': 'Besvaret af {ai} (reserve)',
+            'rate_limit_label': 'Hastighedsgrænser på klientsiden',
+            'rate_limit_rpm_placeholder': 'Forespørgsler/min',
+            'rate_limit_tpm_placeholder': 'Tokens/min',
+            'rate_limit_concurrent_placeholder': 'Maks. samtidige',
+            'rate_limit_desc': 'Requests beyond these limits wait in a queue instead of failing with rate-limit errors. Ask panels go ahead of background jobs. Leave empty for no limit.',
+            'rate_limit_queued': 'Waiting for {provider} rate limit ({ahead} ahead, {seconds}s)',
+            'refresh_all_model_lists': 'Refresh All Model Lists',
+            'refresh_all_model_lists_tooltip': 'Check every configured AI for model list changes at once',
+            'refreshing_model_lists': 'Refreshing...',
+            'model_lists_updated': 'Updated: {names}',
+            'model_lists_unchanged': 'Unchanged: {names}',
+            'model_lists_failed': 'Failed:',
+            'health_button': 'AI Health…',
+            'health_title': 'AI Health',
+            'health_desc': 'Checks every configured AI at the same time with the cheapest request it supports (no tokens are used). New panels avoid AIs that are down or slow.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Connect',
+            'health_col_ttfb': 'First byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Last error',
+            'health_col_checked': 'Checked',
+            'health_probe_all': 'Check All',
+            'health_probing': 'Checking…',
+            'health_interval': 'Re-check in background:',
+            'health_interval_off': 'Off',
+            'health_interval_minutes': 'Every {minutes} min',
+            'health_queue_title': 'Request queues (rate limits):',
+            'health_queue_line': '{provider}: {in_flight} running, {queued} waiting, average wait {wait}',
+            'health_queue_paused': 'paused for {seconds} s after HTTP 429',
+            'health_queue_empty': 'No requests yet.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Slow',
+            'health_status_down': 'Down',
+            'health_status_unknown': 'Not checked',
+            'avoid_known_questions': ' Ask something different from these questions: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} in ({cached} cached) · {output} out ({reasoning} reasoning) · {answers} answers',
+            'stat_usage_cost': 'Estimated cost: {cost}',
+            'stat_usage_none': 'No token usage reported this month',
+            'stat_model_prices': 'Model Prices…',
+            'stat_model_prices_title': 'Model Prices',
+            'stat_model_prices_prompt': 'One model per line: "model: input, cached input, output" in price per 1M tokens. Cached input is optional. A name also matches models that start with it.',
+            'stat_model_prices_invalid': 'These lines could not be read and were ignored: {lines}',
+            'copy_performance_report': 'Copy Performance Report',
             'library_updating': 'Opdaterer...',
             'library_status': 'Status: {count} bøger, sidste opdatering: {time}',
             'library_status_empty': 'Status: Ingen data. Klik på "Opdater biblioteksdata" for at starte.',
@@ -619,6 +722,12 @@ class DanishTranslation(BaseTranslation):
             'stat_no_data_week': 'Ingen data denne uge',
             'stat_no_data_month': 'Ingen data denne måned',
             'stat_data_not_enough': 'Ikke nok data',
+            'stat_breakdown': 'Fordeling',
+            'stat_breakdown_subtitle': 'Flest AI-spørgsmål denne måned',
+            'stat_breakdown_ai': 'AI',
+            'stat_breakdown_provider': 'Udbyder',
+            'stat_breakdown_mode': 'Tilstand',
+            'stat_breakdown_book': 'Bøger',
             
             # Statistik brugertitler (baseret på antal forespørgsler)
             'stat_title_curious': 'Bladrer',
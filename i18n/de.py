@@ -68,7 +68,7 @@ class GermanTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Verwenden Sie {books_metadata} für Buchinformationen, {query} für Benutzerfrage',
             'dynamic_fields_title': 'Dynamische Felder-Referenz',
             'dynamic_fields_subtitle': 'Verfügbare Felder und Beispielwerte aus "Frankenstein" von Mary Shelley',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (keine)<br><b>{query}</b> → Ihr Fragetext',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (keine)<br><b>{passages}</b> → Zur Frage passende Textstellen aus dem Buch<br><b>{query}</b> → Ihr Fragetext',
             'reset_prompts': 'Prompts auf Standard zurücksetzen',
             'reset_prompts_confirm': 'Möchten Sie wirklich alle Prompt-Vorlagen auf ihre Standardwerte zurücksetzen? Diese Aktion kann nicht rückgängig gemacht werden.',
             'unsaved_changes_title': 'Nicht gespeicherte Änderungen',
@@ -279,6 +279,9 @@ class GermanTranslation(BaseTranslation):
                 'Sie das Limit unter Plugin-Konfiguration → General, wählen weniger Bücher '
                 'aus oder stellen eine spezifischere Frage.'
             ),
+            'question_too_long_detail_tokens': 'Prompt ist zu lang (ca. {current} Tokens, Limit {limit} Tokens für {model}, um {over} zu lang). Sie haben {book_count} Buch/Bücher ausgewählt.',
+            'question_too_long_detail_library_tokens': 'Prompt ist zu lang (ca. {current} Tokens, Limit {limit} Tokens für {model}, um {over} zu lang). Ihr Bibliotheksindex enthält {book_count} Buch/Bücher.',
+            'question_too_long_hint_model': 'Das Limit ergibt sich aus dem Kontextfenster von {model} ({window} Tokens). Wählen Sie ein Modell mit größerem Kontextfenster oder stellen Sie eine spezifischere Frage.',
             'large_selection_dialog_title': 'Viele Bücher ausgewählt',
             'large_selection_dialog_message': (
                 'Sie haben {count} Bücher ausgewählt. Für bibliotheksweite Fragen eignet sich '
@@ -352,8 +355,6 @@ class GermanTranslation(BaseTranslation):
             
             # Streaming-Antwortverarbeitung
             'stream_response_code': 'Streaming-Antwort-Statuscode: {code}',
-            'stream_continue_prompt': 'Bitte setzen Sie Ihre vorherige Antwort fort, ohne bereits bereitgestellte Inhalte zu wiederholen.',
-            'stream_continue_code_blocks': 'Ihre vorherige Antwort hatte ungeschlossene Code-Blöcke. Bitte fahren Sie fort und vervollständigen Sie diese Code-Blöcke.',
             'stream_continue_parentheses': 'Ihre vorherige Antwort hatte ungeschlossene Klammern. Bitte fahren Sie fort und stellen Sie sicher, dass alle Klammern ordnungsgemäß geschlossen sind.',
             'stream_continue_interrupted': 'Ihre vorherige Antwort scheint unterbrochen worden zu sein. Bitte fahren Sie fort und vervollständigen Sie Ihren letzten Gedanken oder Ihre Erklärung.',
             'stream_timeout_error': 'Die Streaming-Übertragung hat 60 Sekunden lang keine neuen Inhalte erhalten, möglicherweise ein Verbindungsproblem.',
@@ -562,6 +563,108 @@ class GermanTranslation(BaseTranslation):
             'library_enable_tooltip': 'Wenn aktiviert, können Sie Ihre Bibliothek mithilfe von KI durchsuchen, wenn keine Bücher ausgewählt sind',
             'library_update': 'Bibliotheksdaten aktualisieren',
             'library_update_tooltip': 'Buchtitel und Autoren aus Ihrer Bibliothek extrahieren',
+            'library_dictionary_format': 'Bücherliste mit Autoren-/Reihencodes komprimieren',
+            'library_dictionary_format_tooltip': 'Wiederholte Autoren und Reihen werden einmal aufgeführt und per Kurzcode referenziert, damit mehr von einer großen Bibliothek in jede KI-Suche passt',
+            'library_semantic_search': 'Semantische Suche mit lokalen Embeddings (Ollama)',
+            'library_semantic_search_tooltip': 'Erstellt mit Ihrem lokalen Ollama-Server Embeddings für Titel, Autoren, Schlagwörter und Beschreibung jedes Buchs und sendet nur die relevantesten Bücher an die KI. Der Index wird mit „Bibliotheksdaten aktualisieren“ aktualisiert.',
+            'book_passages_indexing': 'Buchtext wird gelesen… {percent}%',
+            'book_passages_unavailable': '(Kein lesbarer Buchtext verfügbar; EPUB-, AZW3- oder TXT-Format erforderlich.)',
+            'batch_ask_menu': 'Jedes Buch fragen',
+            'batch_ask_title': 'Jedes Buch fragen',
+            'batch_ask_question_placeholder': 'Frage, die zu jedem ausgewählten Buch gestellt wird',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Parallele Anfragen:',
+            'batch_ask_col_book': 'Buch',
+            'batch_ask_col_status': 'Status',
+            'batch_ask_col_latency': 'Dauer',
+            'batch_ask_col_answer': 'Antwort',
+            'batch_ask_start': 'Start',
+            'batch_ask_resume': 'Fortsetzen',
+            'batch_ask_status_pending': 'Ausstehend',
+            'batch_ask_status_running': 'Läuft…',
+            'batch_ask_status_done': 'Fertig',
+            'batch_ask_status_failed': 'Fehlgeschlagen',
+            'batch_ask_summary': '{done} fertig, {failed} fehlgeschlagen, {pending} offen',
+            'batch_ask_no_selection': 'Wählen Sie zuerst die Bücher aus, zu denen Sie fragen möchten.',
+            'batch_ask_confirm_close': 'Der Stapel läuft noch. Anhalten? Sie können ihn später fortsetzen.',
+            'jobs_menu': 'Hintergrundaufträge',
+            'jobs_title': 'Hintergrundaufträge',
+            'jobs_new': 'Neuer Auftrag…',
+            'jobs_new_title': 'Neuer Hintergrundauftrag',
+            'jobs_name': 'Name:',
+            'jobs_column': 'In Spalte schreiben:',
+            'jobs_scope': 'Bücher:',
+            'jobs_scope_selected': 'Ausgewählte Bücher ({count})',
+            'jobs_scope_library': 'Gesamte Bibliothek ({count})',
+            'jobs_question_placeholder': 'z. B. „Nenne bis zu drei Genres dieses Buchs, durch Kommas getrennt. Antworte nur mit den Genres.“',
+            'jobs_no_columns': 'Legen Sie zuerst in calibre eine benutzerdefinierte Text- oder Kommentarspalte an (Einstellungen → Eigene Spalten hinzufügen).',
+            'jobs_pause': 'Anhalten',
+            'jobs_retry_failed': 'Fehlgeschlagene wiederholen',
+            'jobs_delete': 'Löschen',
+            'jobs_delete_confirm': 'Diesen Auftrag löschen? Bereits in die Spalte geschriebene Werte bleiben erhalten.',
+            'jobs_col_name': 'Auftrag',
+            'jobs_col_column': 'Spalte',
+            'jobs_col_progress': 'Fortschritt',
+            'jobs_col_throughput': 'Bücher/min',
+            'jobs_col_eta': 'Restzeit',
+            'jobs_failed_count': '({count} fehlgeschlagen)',
+            'jobs_status_paused': 'Angehalten',
+            'jobs_status_cancelled': 'Abgebrochen',
+            'jobs_use_batch': 'Batch-API des Anbieters verwenden',
+            'jobs_use_batch_tooltip': 'Alle Anfragen als einen Offline-Stapel senden. Meist zum halben Preis und ohne Ratenlimit-Druck, Ergebnisse können aber bis zu 24 Stunden dauern.',
+            'circuit_open_error': '{provider} ist {failures}-mal hintereinander fehlgeschlagen, Anfragen werden daher pausiert. In {seconds} Sekunden wird es automatisch erneut versucht.',
+            'ollama_num_ctx_label': 'Kontextfenster (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Automatisch (an jede Eingabe angepasst)',
+            'ollama_keep_alive_label': 'Modell geladen halten für',
+            'ollama_tuning_desc': 'Kontextfenster leer lassen, um es an jede Eingabe anzupassen (bis zum Modellmaximum). Keep-alive akzeptiert Werte wie 30m oder 2h; -1 hält das Modell dauerhaft geladen.',
+            'fallback_ai_menu': 'Ersatz-KI bei langsamer Antwort',
+            'fallback_ai_tooltip': 'Wenn die ersten Wörter einer Antwort zu lange dauern, wird dieselbe Frage an diese KI gesendet und die zuerst antwortende wird angezeigt.',
+            'fallback_ai_none': 'Keine',
+            'answered_by_fallback': 'Beantwortet von {ai} (Ersatz)',
+            'rate_limit_label': 'Clientseitige Ratenlimits',
+            'rate_limit_rpm_placeholder': 'Anfragen/Min.',
+            'rate_limit_tpm_placeholder': 'Tokens/Min.',
+            'rate_limit_concurrent_placeholder': 'Max. gleichzeitig',
+            'rate_limit_desc': 'Anfragen über diesen Grenzen warten in einer Warteschlange, statt mit Ratenlimit-Fehlern zu scheitern. Frage-Bereiche haben Vorrang vor Hintergrundaufträgen. Leer lassen für kein Limit.',
+            'rate_limit_queued': 'Warte auf {provider}-Ratenlimit ({ahead} davor, {seconds} s)',
+            'refresh_all_model_lists': 'Alle Modelllisten aktualisieren',
+            'refresh_all_model_lists_tooltip': 'Alle konfigurierten KIs gleichzeitig auf geänderte Modelllisten prüfen',
+            'refreshing_model_lists': 'Wird aktualisiert...',
+            'model_lists_updated': 'Aktualisiert: {names}',
+            'model_lists_unchanged': 'Unverändert: {names}',
+            'model_lists_failed': 'Fehlgeschlagen:',
+            'health_button': 'KI-Status…',
+            'health_title': 'KI-Status',
+            'health_desc': 'Prüft alle konfigurierten KIs gleichzeitig mit der günstigsten unterstützten Anfrage (keine Tokens). Neue Panels meiden ausgefallene oder langsame KIs.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Verbindung',
+            'health_col_ttfb': 'Erstes Byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Letzter Fehler',
+            'health_col_checked': 'Geprüft',
+            'health_probe_all': 'Alle prüfen',
+            'health_probing': 'Wird geprüft…',
+            'health_interval': 'Im Hintergrund erneut prüfen:',
+            'health_interval_off': 'Aus',
+            'health_interval_minutes': 'Alle {minutes} Min.',
+            'health_queue_title': 'Anfragewarteschlangen (Ratenlimits):',
+            'health_queue_line': '{provider}: {in_flight} laufend, {queued} wartend, durchschnittliche Wartezeit {wait}',
+            'health_queue_paused': '{seconds} s pausiert nach HTTP 429',
+            'health_queue_empty': 'Noch keine Anfragen.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Langsam',
+            'health_status_down': 'Ausgefallen',
+            'health_status_unknown': 'Nicht geprüft',
+            'avoid_known_questions': ' Stelle eine andere Frage als diese: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} Eingabe ({cached} aus Cache) · {output} Ausgabe ({reasoning} Reasoning) · {answers} Antworten',
+            'stat_usage_cost': 'Geschätzte Kosten: {cost}',
+            'stat_usage_none': 'In diesem Monat wurde kein Token-Verbrauch gemeldet',
+            'stat_model_prices': 'Modellpreise…',
+            'stat_model_prices_title': 'Modellpreise',
+            'stat_model_prices_prompt': 'Ein Modell pro Zeile: "Modell: Eingabe, Eingabe aus Cache, Ausgabe" als Preis pro 1 Mio. Tokens. Eingabe aus Cache ist optional. Ein Name passt auch auf Modelle, die damit beginnen.',
+            'stat_model_prices_invalid': 'Diese Zeilen konnten nicht gelesen werden und wurden ignoriert: {lines}',
+            'copy_performance_report': 'Leistungsbericht kopieren',
             'library_updating': 'Aktualisierung...',
             'library_status': 'Status: {count} Bücher, letzte Aktualisierung: {time}',
             'library_status_empty': 'Status: Keine Daten. Klicken Sie auf "Bibliotheksdaten aktualisieren", um zu beginnen.',
@@ -630,6 +733,12 @@ class GermanTranslation(BaseTranslation):
             'stat_no_data_week': 'Keine Daten diese Woche',
             'stat_no_data_month': 'Keine Daten diesen Monat',
             'stat_data_not_enough': 'Nicht genügend Daten',
+            'stat_breakdown': 'Aufschlüsselung',
+            'stat_breakdown_subtitle': 'Top-KI-Anfragen in diesem Monat',
+            'stat_breakdown_ai': 'KI',
+            'stat_breakdown_provider': 'Anbieter',
+            'stat_breakdown_mode': 'Modus',
+            'stat_breakdown_book': 'Bücher',
             
             # Statistik Benutzertitel (basierend auf Anfragezahl)
             'stat_title_curious': 'Blätterer',
@@ -68,7 +68,7 @@ class EnglishTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Use {books_metadata} for book information, {query} for user question',
             'dynamic_fields_title': 'Dynamic Fields Reference',
             'dynamic_fields_subtitle': 'Available fields and example values from "Frankenstein" by Mary Shelley',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (none)<br><b>{query}</b> → Your question text',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (none)<br><b>{passages}</b> → Book passages relevant to the question<br><b>{query}</b> → Your question text',
             'reset_prompts': 'Reset Prompts to Default',
             'reset_prompts_confirm': 'Are you sure you want to reset all prompt templates to their default values? This action cannot be undone.',
             'unsaved_changes_title': 'Unsaved Changes',
@@ -294,6 +294,9 @@ class EnglishTranslation(BaseTranslation):
                 'You enabled a custom prompt limit. If requests time out, lower the limit in '
                 'Plugin Configuration → General, or reduce selected books / use a more specific query.'
             ),
+            'question_too_long_detail_tokens': 'Prompt is too long (about {current} tokens, limit {limit} tokens for {model}, over by {over}). You selected {book_count} book(s).',
+            'question_too_long_detail_library_tokens': 'Prompt is too long (about {current} tokens, limit {limit} tokens for {model}, over by {over}). Your library index contains {book_count} book(s).',
+            'question_too_long_hint_model': 'The limit is derived from the context window of {model} ({window} tokens). Choose a model with a larger context window, or ask a more specific question.',
             'large_selection_dialog_title': 'Many Books Selected',
             'large_selection_dialog_message': (
                 'You selected {count} books. For library-wide questions, AI Search works better '
@@ -361,8 +364,6 @@ class EnglishTranslation(BaseTranslation):
             
             # Stream response handling
             'stream_response_code': 'Stream response status code: {code}',
-            'stream_continue_prompt': 'Please continue your previous answer without repeating content already provided.',
-            'stream_continue_code_blocks': 'Your previous answer had unclosed code blocks. Please continue and complete these code blocks.',
             'stream_continue_parentheses': 'Your previous answer had unclosed parentheses. Please continue and ensure all parentheses are properly closed.',
             'stream_continue_interrupted': 'Your previous answer seems to have been interrupted. Please continue completing your last thought or explanation.',
             'stream_timeout_error': 'Stream transmission has not received new content for 60 seconds, possibly a connection issue.',
@@ -563,6 +564,108 @@ class EnglishTranslation(BaseTranslation):
             'library_enable_tooltip': 'When enabled, you can search your library using AI when no books are selected',
             'library_update': 'Update Library Data',
             'library_update_tooltip': 'Index titles and authors for all books in your library (full library, compact format)',
+            'library_dictionary_format': 'Compress the book list with author/series codes',
+            'library_dictionary_format_tooltip': 'Lists each repeated author and series once and refers to it by a short code, so more of a large library fits in every AI Search request',
+            'library_semantic_search': 'Semantic search with local embeddings (Ollama)',
+            'library_semantic_search_tooltip': 'Embeds title, authors, tags and description of every book with your local Ollama server and sends only the most relevant books to the AI. The index is updated with "Update Library Data".',
+            'book_passages_indexing': 'Reading book text… {percent}%',
+            'book_passages_unavailable': '(No readable book text is available; EPUB, AZW3 or TXT format is required.)',
+            'batch_ask_menu': 'Ask Each Book',
+            'batch_ask_title': 'Ask Each Book',
+            'batch_ask_question_placeholder': 'Question to ask about each selected book',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Parallel requests:',
+            'batch_ask_col_book': 'Book',
+            'batch_ask_col_status': 'Status',
+            'batch_ask_col_latency': 'Latency',
+            'batch_ask_col_answer': 'Answer',
+            'batch_ask_start': 'Start',
+            'batch_ask_resume': 'Resume',
+            'batch_ask_status_pending': 'Pending',
+            'batch_ask_status_running': 'Running…',
+            'batch_ask_status_done': 'Done',
+            'batch_ask_status_failed': 'Failed',
+            'batch_ask_summary': '{done} done, {failed} failed, {pending} remaining',
+            'batch_ask_no_selection': 'Select the books you want to ask about first.',
+            'batch_ask_confirm_close': 'The batch is still running. Stop it? You can resume it later.',
+            'jobs_menu': 'Background Jobs',
+            'jobs_title': 'Background Jobs',
+            'jobs_new': 'New Job…',
+            'jobs_new_title': 'New Background Job',
+            'jobs_name': 'Name:',
+            'jobs_column': 'Write to column:',
+            'jobs_scope': 'Books:',
+            'jobs_scope_selected': 'Selected books ({count})',
+            'jobs_scope_library': 'Whole library ({count})',
+            'jobs_question_placeholder': 'e.g. "List up to three genres for this book, separated by commas. Reply with the genres only."',
+            'jobs_no_columns': 'Create a text or comments custom column in calibre first (Preferences → Add your own columns).',
+            'jobs_pause': 'Pause',
+            'jobs_retry_failed': 'Retry Failed',
+            'jobs_delete': 'Delete',
+            'jobs_delete_confirm': 'Delete this job? Values already written to the column are kept.',
+            'jobs_col_name': 'Job',
+            'jobs_col_column': 'Column',
+            'jobs_col_progress': 'Progress',
+            'jobs_col_throughput': 'Books/min',
+            'jobs_col_eta': 'ETA',
+            'jobs_failed_count': '({count} failed)',
+            'jobs_status_paused': 'Paused',
+            'jobs_status_cancelled': 'Cancelled',
+            'jobs_use_batch': 'Use the provider batch API',
+            'jobs_use_batch_tooltip': 'Submit all requests as one offline batch. Usually half the price and no rate-limit pressure, but results can take up to 24 hours.',
+            'circuit_open_error': '{provider} failed {failures} times in a row, so requests to it are paused. It will be tried again automatically in {seconds} seconds.',
+            'ollama_num_ctx_label': 'Context window (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Auto (sized to each prompt)',
+            'ollama_keep_alive_label': 'Keep model loaded for',
+            'ollama_tuning_desc': 'Leave the context window empty to size it from each prompt (up to the model maximum). Keep-alive accepts values such as 30m or 2h; -1 keeps the model loaded.',
+            'fallback_ai_menu': 'Fallback AI on Slow Response',
+            'fallback_ai_tooltip': 'If the first words of an answer take too long, the same question is sent to this AI and whichever answers first is shown.',
+            'fallback_ai_none': 'None',
+            'answered_by_fallback': 'Answered by {ai} (fallback)',
+            'rate_limit_label': 'Client-side rate limits',
+            'rate_limit_rpm_placeholder': 'Requests/min',
+            'rate_limit_tpm_placeholder': 'Tokens/min',
+            'rate_limit_concurrent_placeholder': 'Max concurrent',
+            'rate_limit_desc': 'Requests beyond these limits wait in a queue instead of failing with rate-limit errors. Ask panels go ahead of background jobs. Leave empty for no limit.',
+            'rate_limit_queued': 'Waiting for {provider} rate limit ({ahead} ahead, {seconds}s)',
+            'refresh_all_model_lists': 'Refresh All Model Lists',
+            'refresh_all_model_lists_tooltip': 'Check every configured AI for model list changes at once',
+            'refreshing_model_lists': 'Refreshing...',
+            'model_lists_updated': 'Updated: {names}',
+            'model_lists_unchanged': 'Unchanged: {names}',
+            'model_lists_failed': 'Failed:',
+            'health_button': 'AI Health…',
+            'health_title': 'AI Health',
+            'health_desc': 'Checks every configured AI at the same time with the cheapest request it supports (no tokens are used). New panels avoid AIs that are down or slow.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Connect',
+            'health_col_ttfb': 'First byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Last error',
+            'health_col_checked': 'Checked',
+            'health_probe_all': 'Check All',
+            'health_probing': 'Checking…',
+            'health_interval': 'Re-check in background:',
+            'health_interval_off': 'Off',
+            'health_interval_minutes': 'Every {minutes} min',
+            'health_queue_title': 'Request queues (rate limits):',
+            'health_queue_line': '{provider}: {in_flight} running, {queued} waiting, average wait {wait}',
+            'health_queue_paused': 'paused for {seconds} s after HTTP 429',
+            'health_queue_empty': 'No requests yet.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Slow',
+            'health_status_down': 'Down',
+            'health_status_unknown': 'Not checked',
+            'avoid_known_questions': ' Ask something different from these questions: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} in ({cached} cached) · {output} out ({reasoning} reasoning) · {answers} answers',
+            'stat_usage_cost': 'Estimated cost: {cost}',
+            'stat_usage_none': 'No token usage reported this month',
+            'stat_model_prices': 'Model Prices…',
+            'stat_model_prices_title': 'Model Prices',
+            'stat_model_prices_prompt': 'One model per line: "model: input, cached input, output" in price per 1M tokens. Cached input is optional. A name also matches models that start with it.',
+            'stat_model_prices_invalid': 'These lines could not be read and were ignored: {lines}',
+            'copy_performance_report': 'Copy Performance Report',
             'library_updating': 'Updating...',
             'library_status': 'Status: {count} books, last update: {time}',
             'library_status_empty': 'Status: No data. Click "Update Library Data" to start.',
@@ -626,6 +729,12 @@ class EnglishTranslation(BaseTranslation):
             'stat_no_data_week': 'No data this week',
             'stat_no_data_month': 'No data this month',
             'stat_data_not_enough': 'Data is not enough',
+            'stat_breakdown': 'Breakdown',
+            'stat_breakdown_subtitle': 'Top AI inquiries this month',
+            'stat_breakdown_ai': 'AI',
+            'stat_breakdown_provider': 'Provider',
+            'stat_breakdown_mode': 'Mode',
+            'stat_breakdown_book': 'Books',
             
             # Statistics user titles (based on inquiry count)
             'stat_title_curious': 'Page Turner',
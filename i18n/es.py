@@ -68,7 +68,7 @@ class SpanishTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Usa {books_metadata} para la información del libro, {query} para la pregunta del usuario',
             'dynamic_fields_title': 'Referencia de campos dinámicos',
             'dynamic_fields_subtitle': 'Campos disponibles y valores de ejemplo de "Frankenstein" de Mary Shelley',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Inglés<br><b>{series}</b> → (ninguno)<br><b>{query}</b> → Tu texto de pregunta',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Inglés<br><b>{series}</b> → (ninguno)<br><b>{passages}</b> → Pasajes del libro relacionados con la pregunta<br><b>{query}</b> → Tu texto de pregunta',
             'reset_prompts': 'Restablecer prompts a los valores predeterminados',
             'reset_prompts_confirm': '¿Estás seguro de que quieres restablecer todas las plantillas de prompts a sus valores predeterminados? Esta acción no se puede deshacer.',
             'unsaved_changes_title': 'Cambios sin guardar',
@@ -294,6 +294,9 @@ class SpanishTranslation(BaseTranslation):
                 'reduzca el límite en Configuración del plugin → General, o reduzca los libros seleccionados / '
                 'use una consulta más específica.'
             ),
+            'question_too_long_detail_tokens': 'El prompt es demasiado largo (unos {current} tokens, límite {limit} tokens para {model}, exceso de {over}). Ha seleccionado {book_count} libro(s).',
+            'question_too_long_detail_library_tokens': 'El prompt es demasiado largo (unos {current} tokens, límite {limit} tokens para {model}, exceso de {over}). El índice de su biblioteca contiene {book_count} libro(s).',
+            'question_too_long_hint_model': 'El límite se calcula a partir de la ventana de contexto de {model} ({window} tokens). Elija un modelo con una ventana de contexto mayor o haga una pregunta más específica.',
             'large_selection_dialog_title': 'Muchos libros seleccionados',
             'large_selection_dialog_message': (
                 'Ha seleccionado {count} libros. Para preguntas sobre toda la biblioteca, AI Search funciona mejor '
@@ -360,8 +363,6 @@ class SpanishTranslation(BaseTranslation):
             
             # Stream response handling
             'stream_response_code': 'Código de estado de la respuesta del stream: {code}',
-            'stream_continue_prompt': 'Por favor, continúa tu respuesta anterior sin repetir el contenido ya proporcionado.',
-            'stream_continue_code_blocks': 'Tu respuesta anterior tenía bloques de código sin cerrar. Por favor, continúa y completa estos bloques de código.',
             'stream_continue_parentheses': 'Tu respuesta anterior tenía paréntesis sin cerrar. Por favor, continúa y asegúrate de que todos los paréntesis estén correctamente cerrados.',
             'stream_continue_interrupted': 'Tu respuesta anterior parece haber sido interrumpida. Por favor, continúa completando tu última idea o explicación.',
             'stream_timeout_error': 'La transmisión en stream no ha recibido contenido nuevo durante 60 segundos, posiblemente un problema de conexión.',
@@ -559,6 +560,108 @@ class SpanishTranslation(BaseTranslation):
             'library_enable_tooltip': 'Cuando está habilitado, puede buscar en su biblioteca usando IA cuando no hay libros seleccionados',
             'library_update': 'Actualizar datos de la biblioteca',
             'library_update_tooltip': 'Extraer títulos y autores de libros de su biblioteca',
+            'library_dictionary_format': 'Comprimir la lista de libros con códigos de autor/serie',
+            'library_dictionary_format_tooltip': 'Enumera una sola vez cada autor y serie repetidos y los referencia con un código corto, para que quepa más de una biblioteca grande en cada búsqueda con IA',
+            'library_semantic_search': 'Búsqueda semántica con embeddings locales (Ollama)',
+            'library_semantic_search_tooltip': 'Genera con tu servidor Ollama local embeddings del título, autores, etiquetas y descripción de cada libro y envía a la IA solo los libros más relevantes. El índice se actualiza con "Actualizar datos de la biblioteca".',
+            'book_passages_indexing': 'Leyendo el texto del libro… {percent}%',
+            'book_passages_unavailable': '(No hay texto legible del libro; se requiere formato EPUB, AZW3 o TXT.)',
+            'batch_ask_menu': 'Preguntar a cada libro',
+            'batch_ask_title': 'Preguntar a cada libro',
+            'batch_ask_question_placeholder': 'Pregunta para cada libro seleccionado',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Solicitudes en paralelo:',
+            'batch_ask_col_book': 'Libro',
+            'batch_ask_col_status': 'Estado',
+            'batch_ask_col_latency': 'Latencia',
+            'batch_ask_col_answer': 'Respuesta',
+            'batch_ask_start': 'Iniciar',
+            'batch_ask_resume': 'Reanudar',
+            'batch_ask_status_pending': 'Pendiente',
+            'batch_ask_status_running': 'En curso…',
+            'batch_ask_status_done': 'Hecho',
+            'batch_ask_status_failed': 'Error',
+            'batch_ask_summary': '{done} hechos, {failed} con error, {pending} pendientes',
+            'batch_ask_no_selection': 'Seleccione primero los libros sobre los que quiere preguntar.',
+            'batch_ask_confirm_close': 'El lote sigue en curso. ¿Detenerlo? Podrá reanudarlo más tarde.',
+            'jobs_menu': 'Tareas en segundo plano',
+            'jobs_title': 'Tareas en segundo plano',
+            'jobs_new': 'Nueva tarea…',
+            'jobs_new_title': 'Nueva tarea en segundo plano',
+            'jobs_name': 'Nombre:',
+            'jobs_column': 'Escribir en la columna:',
+            'jobs_scope': 'Libros:',
+            'jobs_scope_selected': 'Libros seleccionados ({count})',
+            'jobs_scope_library': 'Toda la biblioteca ({count})',
+            'jobs_question_placeholder': 'p. ej. «Indica hasta tres géneros de este libro, separados por comas. Responde solo con los géneros.»',
+            'jobs_no_columns': 'Cree primero una columna personalizada de texto o comentarios en calibre (Preferencias → Añadir columnas propias).',
+            'jobs_pause': 'Pausar',
+            'jobs_retry_failed': 'Reintentar fallidos',
+            'jobs_delete': 'Eliminar',
+            'jobs_delete_confirm': '¿Eliminar esta tarea? Los valores ya escritos en la columna se conservan.',
+            'jobs_col_name': 'Tarea',
+            'jobs_col_column': 'Columna',
+            'jobs_col_progress': 'Progreso',
+            'jobs_col_throughput': 'Libros/min',
+            'jobs_col_eta': 'Tiempo restante',
+            'jobs_failed_count': '({count} fallidos)',
+            'jobs_status_paused': 'En pausa',
+            'jobs_status_cancelled': 'Cancelada',
+            'jobs_use_batch': 'Usar la API por lotes del proveedor',
+            'jobs_use_batch_tooltip': 'Enviar todas las solicitudes como un lote sin conexión. Suele costar la mitad y no consume límite de velocidad, pero los resultados pueden tardar hasta 24 horas.',
+            'circuit_open_error': '{provider} falló {failures} veces seguidas, así que las solicitudes están en pausa. Se volverá a intentar automáticamente en {seconds} segundos.',
+            'ollama_num_ctx_label': 'Ventana de contexto (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Automático (según cada consulta)',
+            'ollama_keep_alive_label': 'Mantener el modelo cargado durante',
+            'ollama_tuning_desc': 'Deja la ventana de contexto vacía para ajustarla a cada consulta (hasta el máximo del modelo). Keep-alive acepta valores como 30m o 2h; -1 mantiene el modelo cargado.',
+            'fallback_ai_menu': 'IA de respaldo si la respuesta tarda',
+            'fallback_ai_tooltip': 'Si las primeras palabras de una respuesta tardan demasiado, la misma pregunta se envía a esta IA y se muestra la que responda primero.',
+            'fallback_ai_none': 'Ninguna',
+            'answered_by_fallback': 'Respondido por {ai} (respaldo)',
+            'rate_limit_label': 'Límites de frecuencia del cliente',
+            'rate_limit_rpm_placeholder': 'Solicitudes/min',
+            'rate_limit_tpm_placeholder': 'Tokens/min',
+            'rate_limit_concurrent_placeholder': 'Máx. simultáneas',
+            'rate_limit_desc': 'Las solicitudes que superen estos límites esperan en cola en lugar de fallar. Los paneles de preguntas tienen prioridad sobre las tareas en segundo plano. Déjelo vacío para no limitar.',
+            'rate_limit_queued': 'Esperando el límite de {provider} ({ahead} delante, {seconds} s)',
+            'refresh_all_model_lists': 'Actualizar todas las listas de modelos',
+            'refresh_all_model_lists_tooltip': 'Comprobar a la vez si cambió la lista de modelos de cada IA configurada',
+            'refreshing_model_lists': 'Actualizando...',
+            'model_lists_updated': 'Actualizadas: {names}',
+            'model_lists_unchanged': 'Sin cambios: {names}',
+            'model_lists_failed': 'Fallidas:',
+            'health_button': 'Estado de las IA…',
+            'health_title': 'Estado de las IA',
+            'health_desc': 'Comprueba a la vez todas las IA configuradas con la petición más ligera que admiten (sin consumir tokens). Los paneles nuevos evitan las IA caídas o lentas.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Conexión',
+            'health_col_ttfb': 'Primer byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Último error',
+            'health_col_checked': 'Comprobado',
+            'health_probe_all': 'Comprobar todo',
+            'health_probing': 'Comprobando…',
+            'health_interval': 'Volver a comprobar en segundo plano:',
+            'health_interval_off': 'Desactivado',
+            'health_interval_minutes': 'Cada {minutes} min',
+            'health_queue_title': 'Colas de solicitudes (límites de tasa):',
+            'health_queue_line': '{provider}: {in_flight} en curso, {queued} en espera, espera media {wait}',
+            'health_queue_paused': 'en pausa {seconds} s tras HTTP 429',
+            'health_queue_empty': 'Aún no hay solicitudes.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Lenta',
+            'health_status_down': 'Caída',
+            'health_status_unknown': 'Sin comprobar',
+            'avoid_known_questions': ' Haz una pregunta distinta de estas: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} de entrada ({cached} en caché) · {output} de salida ({reasoning} de razonamiento) · {answers} respuestas',
+            'stat_usage_cost': 'Coste estimado: {cost}',
+            'stat_usage_none': 'No se ha informado de uso de tokens este mes',
+            'stat_model_prices': 'Precios de modelos…',
+            'stat_model_prices_title': 'Precios de modelos',
+            'stat_model_prices_prompt': 'Un modelo por línea: "modelo: entrada, entrada en caché, salida" en precio por millón de tokens. La entrada en caché es opcional. Un nombre también coincide con los modelos que empiezan por él.',
+            'stat_model_prices_invalid': 'Estas líneas no se pudieron leer y se ignoraron: {lines}',
+            'copy_performance_report': 'Copiar informe de rendimiento',
             'library_updating': 'Actualizando...',
             'library_status': 'Estado: {count} libros, última actualización: {time}',
             'library_status_empty': 'Estado: Sin datos. Haga clic en "Actualizar datos de la biblioteca" para comenzar.',
@@ -623,6 +726,12 @@ class SpanishTranslation(BaseTranslation):
             'stat_no_data_week': 'Sin datos esta semana',
             'stat_no_data_month': 'Sin datos este mes',
             'stat_data_not_enough': 'Datos insuficientes',
+            'stat_breakdown': 'Desglose',
+            'stat_breakdown_subtitle': 'Principales consultas de IA este mes',
+            'stat_breakdown_ai': 'IA',
+            'stat_breakdown_provider': 'Proveedor',
+            'stat_breakdown_mode': 'Modo',
+            'stat_breakdown_book': 'Libros',
             
             # Títulos de usuario estadísticos (basados en número de consultas)
             'stat_title_curious': 'Hojeador',
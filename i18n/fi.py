@@ -68,7 +68,7 @@ class FinnishTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Käytä {books_metadata} kirjan tiedoille, {query} käyttäjän kysymykselle',
             'dynamic_fields_title': 'Dynaamisten kenttien viite',
             'dynamic_fields_subtitle': 'Saatavilla olevat kentät ja esimerkkisarvot Mary Shelleyn "Frankensteinista"',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Englanti<br><b>{series}</b> → (ei mikään)<br><b>{query}</b> → Kysymystekstisi',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Englanti<br><b>{series}</b> → (ei mikään)<br><b>{passages}</b> → Kysymykseen liittyvät kohdat kirjasta<br><b>{query}</b> → Kysymystekstisi',
             'reset_prompts': 'Palauta kehotteet oletusarvoihin',
             'reset_prompts_confirm': 'Oletko varma, että haluat palauttaa kaikki kehotemallit oletusarvoihin? Tätä toimintoa ei voi kumota.',
             'unsaved_changes_title': 'Tallentamattomia muutoksia',
@@ -294,6 +294,9 @@ class FinnishTranslation(BaseTranslation):
                 'laske rajaa kohdassa Lisäosan asetukset → General tai vähennä valittuja kirjoja / '
                 'käytä tarkempaa kyselyä.'
             ),
+            'question_too_long_detail_tokens': 'Kehote on liian pitkä (noin {current} tokenia, raja {limit} tokenia mallille {model}, ylitys {over}). Valitsit {book_count} kirjaa.',
+            'question_too_long_detail_library_tokens': 'Kehote on liian pitkä (noin {current} tokenia, raja {limit} tokenia mallille {model}, ylitys {over}). Kirjastohakemistossasi on {book_count} kirjaa.',
+            'question_too_long_hint_model': 'Raja perustuu mallin {model} kontekstiikkunaan ({window} tokenia). Valitse malli, jolla on suurempi kontekstiikkuna, tai kysy tarkempi kysymys.',
             'large_selection_dialog_title': 'Monta kirjaa valittu',
             'large_selection_dialog_message': (
                 'Olet valinnut {count} kirjaa. Kirjastonlaajuisiin kysymyksiin AI Search sopii paremmin '
@@ -360,8 +363,6 @@ class FinnishTranslation(BaseTranslation):
             
             # Stream response handling
             'stream_response_code': 'Striimivastauksen tilakoodi: {code}',
-            'stream_continue_prompt': 'Jatka edellistä vastaustasi toistamatta jo annettua sisältöä.',
-            'stream_continue_code_blocks': 'Edellisessä vastauksessasi oli sulkemattomia koodilohkoja. Jatka ja täydennä nämä koodilohkot.',
             'stream_continue_parentheses': 'Edellisessä vastauksessasi oli sulkemattomia sulkeita. Jatka ja varmista, että kaikki sulkeet ovat oikein suljettuina.',
             'stream_continue_interrupted': 'Edellinen vastauksesi näyttää keskeytyneen. Jatka viimeisen ajatuksesi tai selityksesi täydentämistä.',
             'stream_timeout_error': 'Striimiyhteys ei ole vastaanottanut uutta sisältöä 60 sekuntiin, mahdollisesti yhteysongelma.',
@@ -559,6 +560,108 @@ class FinnishTranslation(BaseTranslation):
             'library_enable_tooltip': 'Kun käytössä, voit hakea kirjastostasi tekoälyllä, kun kirjoja ei ole valittuna',
             'library_update': 'Päivitä kirjaston tiedot',
             'library_update_tooltip': 'Hae kirjojen nimet ja kirjailijat kirjastostasi',
+            'library_dictionary_format': 'Tiivistä kirjaluettelo kirjailija-/sarjakoodeilla',
+            'library_dictionary_format_tooltip': 'Toistuvat kirjailijat ja sarjat luetellaan kerran ja niihin viitataan lyhyellä koodilla, jotta suuresta kirjastosta mahtuu enemmän jokaiseen AI-hakuun',
+            'library_semantic_search': 'Semanttinen haku paikallisilla upotuksilla (Ollama)',
+            'library_semantic_search_tooltip': 'Embeds title, authors, tags and description of every book with your local Ollama server and sends only the most relevant books to the AI. The index is updated with "Update Library Data".',
+            'book_passages_indexing': 'Luetaan kirjan tekstiä… {percent}%',
+            'book_passages_unavailable': '(No readable book text is available; EPUB, AZW3 or TXT format is required.)',
+            'batch_ask_menu': 'Kysy jokaisesta kirjasta',
+            'batch_ask_title': 'Kysy jokaisesta kirjasta',
+            'batch_ask_question_placeholder': 'Kysymys jokaisesta valitusta kirjasta',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Rinnakkaisia pyyntöjä:',
+            'batch_ask_col_book': 'Kirja',
+            'batch_ask_col_status': 'Tila',
+            'batch_ask_col_latency': 'Kesto',
+            'batch_ask_col_answer': 'Vastaus',
+            'batch_ask_start': 'Aloita',
+            'batch_ask_resume': 'Jatka',
+            'batch_ask_status_pending': 'Odottaa',
+            'batch_ask_status_running': 'Käynnissä…',
+            'batch_ask_status_done': 'Valmis',
+            'batch_ask_status_failed': 'Epäonnistui',
+            'batch_ask_summary': '{done} valmis, {failed} epäonnistui, {pending} jäljellä',
+            'batch_ask_no_selection': 'Valitse ensin kirjat, joista haluat kysyä.',
+            'batch_ask_confirm_close': 'Erä on yhä käynnissä. Pysäytetäänkö? Voit jatkaa myöhemmin.',
+            'jobs_menu': 'Taustatyöt',
+            'jobs_title': 'Taustatyöt',
+            'jobs_new': 'Uusi työ…',
+            'jobs_new_title': 'Uusi taustatyö',
+            'jobs_name': 'Nimi:',
+            'jobs_column': 'Kirjoita sarakkeeseen:',
+            'jobs_scope': 'Kirjat:',
+            'jobs_scope_selected': 'Valitut kirjat ({count})',
+            'jobs_scope_library': 'Koko kirjasto ({count})',
+            'jobs_question_placeholder': 'e.g. "List up to three genres for this book, separated by commas. Reply with the genres only."',
+            'jobs_no_columns': 'Create a text or comments custom column in calibre first (Preferences → Add your own columns).',
+            'jobs_pause': 'Keskeytä',
+            'jobs_retry_failed': 'Yritä epäonnistuneita uudelleen',
+            'jobs_delete': 'Poista',
+            'jobs_delete_confirm': 'Delete this job? Values already written to the column are kept.',
+            'jobs_col_name': 'Työ',
+            'jobs_col_column': 'Sarake',
+            'jobs_col_progress': 'Edistyminen',
+            'jobs_col_throughput': 'Kirjaa/min',
+            'jobs_col_eta': 'Jäljellä',
+            'jobs_failed_count': '({count} epäonnistui)',
+            'jobs_status_paused': 'Keskeytetty',
+            'jobs_status_cancelled': 'Peruttu',
+            'jobs_use_batch': 'Käytä palveluntarjoajan eräajo-APIa',
+            'jobs_use_batch_tooltip': 'Submit all requests as one offline batch. Usually half the price and no rate-limit pressure, but results can take up to 24 hours.',
+            'circuit_open_error': '{provider} epäonnistui {failures} kertaa peräkkäin, joten pyynnöt on keskeytetty. Uusi yritys tehdään automaattisesti {seconds} sekunnin kuluttua.',
+            'ollama_num_ctx_label': 'Konteksti-ikkuna (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Automaattinen (kehotteen mukaan)',
+            'ollama_keep_alive_label': 'Pidä malli ladattuna',
+            'ollama_tuning_desc': 'Leave the context window empty to size it from each prompt (up to the model maximum). Keep-alive accepts values such as 30m or 2h; -1 keeps the model loaded.',
+            'fallback_ai_menu': 'Varatekoäly hitaissa vastauksissa',
+            'fallback_ai_tooltip': 'If the first words of an answer take too long, the same question is sent to this AI and whichever answers first is shown.',
+            'fallback_ai_none': 'Ei mitään',
+            'answered_by_fallback': 'Vastaaja: {ai} (vara)',
+            'rate_limit_label': 'Asiakaspuolen nopeusrajoitukset',
+            'rate_limit_rpm_placeholder': 'Pyyntöä/min',
+            'rate_limit_tpm_placeholder': 'Tokenia/min',
+            'rate_limit_concurrent_placeholder': 'Enint. samanaikaisia',
+            'rate_limit_desc': 'Requests beyond these limits wait in a queue instead of failing with rate-limit errors. Ask panels go ahead of background jobs. Leave empty for no limit.',
+            'rate_limit_queued': 'Waiting for {provider} rate limit ({ahead} ahead, {seconds}s)',
+            'refresh_all_model_lists': 'Refresh All Model Lists',
+            'refresh_all_model_lists_tooltip': 'Check every configured AI for model list changes at once',
+            'refreshing_model_lists': 'Refreshing...',
+            'model_lists_updated': 'Updated: {names}',
+            'model_lists_unchanged': 'Unchanged: {names}',
+            'model_lists_failed': 'Failed:',
+            'health_button': 'AI Health…',
+            'health_title': 'AI Health',
+            'health_desc': 'Checks every configured AI at the same time with the cheapest request it supports (no tokens are used). New panels avoid AIs that are down or slow.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Connect',
+            'health_col_ttfb': 'First byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Last error',
+            'health_col_checked': 'Checked',
+            'health_probe_all': 'Check All',
+            'health_probing': 'Checking…',
+            'health_interval': 'Re-check in background:',
+            'health_interval_off': 'Off',
+            'health_interval_minutes': 'Every {minutes} min',
+            'health_queue_title': 'Request queues (rate limits):',
+            'health_queue_line': '{provider}: {in_flight} running, {queued} waiting, average wait {wait}',
+            'health_queue_paused': 'paused for {seconds} s after HTTP 429',
+            'health_queue_empty': 'No requests yet.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Slow',
+            'health_status_down': 'Down',
+            'health_status_unknown': 'Not checked',
+            'avoid_known_questions': ' Ask something different from these questions: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} in ({cached} cached) · {output} out ({reasoning} reasoning) · {answers} answers',
+            'stat_usage_cost': 'Estimated cost: {cost}',
+            'stat_usage_none': 'No token usage reported this month',
+            'stat_model_prices': 'Model Prices…',
+            'stat_model_prices_title': 'Model Prices',
+            'stat_model_prices_prompt': 'One model per line: "model: input, cached input, output" in price per 1M tokens. Cached input is optional. A name also matches models that start with it.',
+            'stat_model_prices_invalid': 'These lines could not be read and were ignored: {lines}',
+            'copy_performance_report': 'Copy Performance Report',
             'library_updating': 'Päivitetään...',
             'library_status': 'Tila: {count} kirjaa, viimeisin päivitys: {time}',
             'library_status_empty': 'Tila: Ei tietoja. Aloita klikkaamalla "Päivitä kirjaston tiedot".',
@@ -623,6 +726,12 @@ class FinnishTranslation(BaseTranslation):
             'stat_no_data_week': 'Ei dataa tällä viikolla',
             'stat_no_data_month': 'Ei dataa tässä kuussa',
             'stat_data_not_enough': 'Ei tarpeeksi dataa',
+            'stat_breakdown': 'Erittely',
+            'stat_breakdown_subtitle': 'Eniten AI-kysymyksiä tässä kuussa',
+            'stat_breakdown_ai': 'AI',
+            'stat_breakdown_provider': 'Palveluntarjoaja',
+            'stat_breakdown_mode': 'Tila',
+            'stat_breakdown_book': 'Kirjat',
             
             # Tilastot käyttäjänimikkeet (perustuu kyselyjen määrään)
             'stat_title_curious': 'Selailija',
@@ -68,7 +68,7 @@ class FrenchTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Utilisez {books_metadata} pour les informations du livre, {query} pour la question de l\'utilisateur',
             'dynamic_fields_title': 'Référence des Champs Dynamiques',
             'dynamic_fields_subtitle': 'Champs disponibles et exemples de valeurs tirés de "Frankenstein" de Mary Shelley',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (aucune)<br><b>{query}</b> → Votre texte de question',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (aucune)<br><b>{passages}</b> → Passages du livre liés à la question<br><b>{query}</b> → Votre texte de question',
             'reset_prompts': 'Réinitialiser les Prompts par défaut',
             'reset_prompts_confirm': 'Êtes-vous sûr de vouloir réinitialiser tous les modèles de prompts à leurs valeurs par défaut ? Cette action ne peut pas être annulée.',
             'unsaved_changes_title': 'Modifications non enregistrées',
@@ -278,6 +278,9 @@ class FrenchTranslation(BaseTranslation):
                 'diminuez la limite dans Configuration du plugin → General, réduisez la '
                 'sélection ou posez une question plus précise.'
             ),
+            'question_too_long_detail_tokens': 'Le prompt est trop long (environ {current} jetons, limite {limit} jetons pour {model}, dépassement de {over}). Vous avez sélectionné {book_count} livre(s).',
+            'question_too_long_detail_library_tokens': 'Le prompt est trop long (environ {current} jetons, limite {limit} jetons pour {model}, dépassement de {over}). L’index de votre bibliothèque contient {book_count} livre(s).',
+            'question_too_long_hint_model': 'La limite est calculée à partir de la fenêtre de contexte de {model} ({window} jetons). Choisissez un modèle avec une fenêtre plus grande ou posez une question plus précise.',
             'large_selection_dialog_title': 'Nombreux livres sélectionnés',
             'large_selection_dialog_message': (
                 'Vous avez sélectionné {count} livres. Pour les questions à l\'échelle de la '
@@ -389,8 +392,6 @@ class FrenchTranslation(BaseTranslation):
 
             # Gestion des réponses en streaming
             'stream_response_code': 'Code d\'état de la réponse en streaming: {code}',
-            'stream_continue_prompt': 'Veuillez continuer votre réponse précédente sans répéter le contenu déjà fourni.',
-            'stream_continue_code_blocks': 'Votre réponse précédente contenait des blocs de code non fermés. Veuillez continuer et compléter ces blocs de code.',
             'stream_continue_parentheses': 'Votre réponse précédente contenait des parenthèses non fermées. Veuillez continuer et vous assurer que toutes les parenthèses sont correctement fermées.',
             'stream_continue_interrupted': 'Votre réponse précédente semble avoir été interrompue. Veuillez continuer en complétant votre dernière pensée ou explication.',
             'stream_timeout_error': 'La connexion de streaming n\'a pas reçu de nouveau contenu depuis 60 secondes, il s\'agit probablement d\'un problème de connexion.',
@@ -567,6 +568,108 @@ class FrenchTranslation(BaseTranslation):
             'library_enable_tooltip': 'Une fois activée, vous pouvez effectuer des recherches dans votre bibliothèque à l\'aide de l\'IA quand aucun livre n\'est sélectionné',
             'library_update': 'Mettre à jour les données',
             'library_update_tooltip': 'Extraire les titres et auteurs de votre bibliothèque',
+            'library_dictionary_format': 'Compresser la liste des livres avec des codes auteur/série',
+            'library_dictionary_format_tooltip': 'Liste une seule fois chaque auteur et série répétés et y fait référence par un code court, pour inclure davantage d’une grande bibliothèque dans chaque recherche IA',
+            'library_semantic_search': 'Recherche sémantique avec des embeddings locaux (Ollama)',
+            'library_semantic_search_tooltip': "Calcule avec votre serveur Ollama local les embeddings du titre, des auteurs, des étiquettes et de la description de chaque livre, et n'envoie à l'IA que les livres les plus pertinents. L'index est mis à jour avec « Mettre à jour les données de la bibliothèque ».",
+            'book_passages_indexing': 'Lecture du texte du livre… {percent} %',
+            'book_passages_unavailable': '(Aucun texte lisible disponible ; format EPUB, AZW3 ou TXT requis.)',
+            'batch_ask_menu': 'Interroger chaque livre',
+            'batch_ask_title': 'Interroger chaque livre',
+            'batch_ask_question_placeholder': 'Question à poser sur chaque livre sélectionné',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Requêtes parallèles :',
+            'batch_ask_col_book': 'Livre',
+            'batch_ask_col_status': 'Statut',
+            'batch_ask_col_latency': 'Durée',
+            'batch_ask_col_answer': 'Réponse',
+            'batch_ask_start': 'Démarrer',
+            'batch_ask_resume': 'Reprendre',
+            'batch_ask_status_pending': 'En attente',
+            'batch_ask_status_running': 'En cours…',
+            'batch_ask_status_done': 'Terminé',
+            'batch_ask_status_failed': 'Échec',
+            'batch_ask_summary': '{done} terminés, {failed} en échec, {pending} restants',
+            'batch_ask_no_selection': "Sélectionnez d'abord les livres à interroger.",
+            'batch_ask_confirm_close': "Le lot est toujours en cours. L'arrêter ? Vous pourrez le reprendre plus tard.",
+            'jobs_menu': 'Tâches en arrière-plan',
+            'jobs_title': 'Tâches en arrière-plan',
+            'jobs_new': 'Nouvelle tâche…',
+            'jobs_new_title': 'Nouvelle tâche en arrière-plan',
+            'jobs_name': 'Nom :',
+            'jobs_column': 'Écrire dans la colonne :',
+            'jobs_scope': 'Livres :',
+            'jobs_scope_selected': 'Livres sélectionnés ({count})',
+            'jobs_scope_library': 'Toute la bibliothèque ({count})',
+            'jobs_question_placeholder': "ex. « Indique jusqu'à trois genres pour ce livre, séparés par des virgules. Réponds uniquement avec les genres. »",
+            'jobs_no_columns': "Créez d'abord une colonne personnalisée de type texte ou commentaires dans calibre (Préférences → Ajouter vos propres colonnes).",
+            'jobs_pause': 'Suspendre',
+            'jobs_retry_failed': 'Relancer les échecs',
+            'jobs_delete': 'Supprimer',
+            'jobs_delete_confirm': 'Supprimer cette tâche ? Les valeurs déjà écrites dans la colonne sont conservées.',
+            'jobs_col_name': 'Tâche',
+            'jobs_col_column': 'Colonne',
+            'jobs_col_progress': 'Progression',
+            'jobs_col_throughput': 'Livres/min',
+            'jobs_col_eta': 'Temps restant',
+            'jobs_failed_count': '({count} en échec)',
+            'jobs_status_paused': 'Suspendue',
+            'jobs_status_cancelled': 'Annulée',
+            'jobs_use_batch': "Utiliser l'API batch du fournisseur",
+            'jobs_use_batch_tooltip': "Envoyer toutes les requêtes en un seul lot hors ligne. Généralement moitié prix et sans pression sur les limites de débit, mais les résultats peuvent prendre jusqu'à 24 heures.",
+            'circuit_open_error': '{provider} a échoué {failures} fois de suite, les requêtes sont donc suspendues. Nouvelle tentative automatique dans {seconds} secondes.',
+            'ollama_num_ctx_label': 'Fenêtre de contexte (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Automatique (adapté à chaque requête)',
+            'ollama_keep_alive_label': 'Garder le modèle chargé pendant',
+            'ollama_tuning_desc': "Laissez la fenêtre de contexte vide pour l'adapter à chaque requête (jusqu'au maximum du modèle). Keep-alive accepte des valeurs comme 30m ou 2h ; -1 garde le modèle chargé.",
+            'fallback_ai_menu': 'IA de secours si la réponse tarde',
+            'fallback_ai_tooltip': "Si les premiers mots d'une réponse tardent trop, la même question est envoyée à cette IA et la première qui répond est affichée.",
+            'fallback_ai_none': 'Aucune',
+            'answered_by_fallback': 'Réponse de {ai} (secours)',
+            'rate_limit_label': 'Limites de débit côté client',
+            'rate_limit_rpm_placeholder': 'Requêtes/min',
+            'rate_limit_tpm_placeholder': 'Jetons/min',
+            'rate_limit_concurrent_placeholder': 'Simultanées max.',
+            'rate_limit_desc': "Les requêtes au-delà de ces limites attendent dans une file au lieu d'échouer. Les panneaux de question passent avant les tâches en arrière-plan. Laisser vide pour aucune limite.",
+            'rate_limit_queued': 'En attente de la limite {provider} ({ahead} avant, {seconds} s)',
+            'refresh_all_model_lists': 'Actualiser toutes les listes de modèles',
+            'refresh_all_model_lists_tooltip': 'Vérifier en une fois les changements de liste de modèles de toutes les IA configurées',
+            'refreshing_model_lists': 'Actualisation...',
+            'model_lists_updated': 'Mises à jour : {names}',
+            'model_lists_unchanged': 'Inchangées : {names}',
+            'model_lists_failed': 'Échecs :',
+            'health_button': 'État des IA…',
+            'health_title': 'État des IA',
+            'health_desc': 'Vérifie toutes les IA configurées en même temps avec la requête la plus légère possible (aucun jeton utilisé). Les nouveaux panneaux évitent les IA hors service ou lentes.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Connexion',
+            'health_col_ttfb': 'Premier octet',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Dernière erreur',
+            'health_col_checked': 'Vérifié',
+            'health_probe_all': 'Tout vérifier',
+            'health_probing': 'Vérification…',
+            'health_interval': 'Revérifier en arrière-plan :',
+            'health_interval_off': 'Désactivé',
+            'health_interval_minutes': 'Toutes les {minutes} min',
+            'health_queue_title': 'Files de requêtes (limites de débit) :',
+            'health_queue_line': '{provider} : {in_flight} en cours, {queued} en attente, attente moyenne {wait}',
+            'health_queue_paused': 'en pause {seconds} s après HTTP 429',
+            'health_queue_empty': 'Aucune requête pour le moment.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Lente',
+            'health_status_down': 'Hors service',
+            'health_status_unknown': 'Non vérifiée',
+            'avoid_known_questions': ' Posez une question différente de celles-ci : {questions}',
+            'stat_usage_title': 'Jetons',
+            'stat_usage_summary': '{input} en entrée ({cached} en cache) · {output} en sortie ({reasoning} de raisonnement) · {answers} réponses',
+            'stat_usage_cost': 'Coût estimé : {cost}',
+            'stat_usage_none': 'Aucune consommation de jetons signalée ce mois-ci',
+            'stat_model_prices': 'Prix des modèles…',
+            'stat_model_prices_title': 'Prix des modèles',
+            'stat_model_prices_prompt': 'Un modèle par ligne : "modèle: entrée, entrée en cache, sortie" en prix par million de jetons. L\'entrée en cache est facultative. Un nom correspond aussi aux modèles qui commencent par lui.',
+            'stat_model_prices_invalid': "Ces lignes n'ont pas pu être lues et ont été ignorées : {lines}",
+            'copy_performance_report': 'Copier le rapport de performances',
             'library_updating': 'Mise à jour...',
             'library_status': 'Statut : {count} livres, dernière mise à jour : {time}',
             'library_status_empty': 'Statut : Aucune donnée. Cliquez sur "Mettre à jour les données" pour commencer.',
@@ -636,6 +739,12 @@ class FrenchTranslation(BaseTranslation):
             'stat_no_data_week': 'Pas de données cette semaine',
             'stat_no_data_month': 'Pas de données ce mois',
             'stat_data_not_enough': 'Données insuffisantes',
+            'stat_breakdown': 'Répartition',
+            'stat_breakdown_subtitle': 'Principales questions IA ce mois-ci',
+            'stat_breakdown_ai': 'IA',
+            'stat_breakdown_provider': 'Fournisseur',
+            'stat_breakdown_mode': 'Mode',
+            'stat_breakdown_book': 'Livres',
             
             # Titres utilisateur statistiques (basés sur le nombre de requêtes)
             'stat_title_curious': 'Feuilleteur',
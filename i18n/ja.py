@@ -68,7 +68,7 @@ class JapaneseTranslation(BaseTranslation):
             'multi_book_placeholder_hint': '書籍情報には{books_metadata}を、ユーザーの質問には{query}を使用',
             'dynamic_fields_title': '動的フィールドリファレンス',
             'dynamic_fields_subtitle': 'メアリー・シェリーの「フランケンシュタイン」から利用可能なフィールドと例の値',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (なし)<br><b>{query}</b> → あなたの質問テキスト',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (なし)<br><b>{passages}</b> → 質問に関連する本文の抜粋<br><b>{query}</b> → あなたの質問テキスト',
             'reset_prompts': 'プロンプトをデフォルトにリセット',
             'reset_prompts_confirm': 'すべてのプロンプトテンプレートをデフォルト値にリセットしてもよろしいですか？この操作は元に戻せません。',
             'unsaved_changes_title': '未保存の変更',
@@ -274,6 +274,9 @@ class JapaneseTranslation(BaseTranslation):
                 'プラグイン設定 → General で制限を下げるか、選択書籍を減らすか、'
                 'より具体的な質問にしてください。'
             ),
+            'question_too_long_detail_tokens': 'プロンプトが長すぎます（約 {current} トークン、{model} の制限 {limit} トークン、{over} トークン超過）。選択した書籍数：{book_count} 冊。',
+            'question_too_long_detail_library_tokens': 'プロンプトが長すぎます（約 {current} トークン、{model} の制限 {limit} トークン、{over} トークン超過）。ライブラリ索引には {book_count} 冊の書籍があります。',
+            'question_too_long_hint_model': 'この制限は {model} のコンテキストウィンドウ（{window} トークン）から算出されています。より大きなコンテキストウィンドウのモデルを選ぶか、より具体的な質問をしてください。',
             'large_selection_dialog_title': '多数の書籍が選択されています',
             'large_selection_dialog_message': (
                 '{count} 冊の書籍が選択されています。ライブラリ全体に関する質問には '
@@ -381,8 +384,6 @@ class JapaneseTranslation(BaseTranslation):
             
             # ストリーミング応答処理
             'stream_response_code': 'ストリーミング応答ステータスコード: {code}',
-            'stream_continue_prompt': 'すでに提供されたコンテンツを繰り返さずに、前の応答を続けてください。',
-            'stream_continue_code_blocks': '前の応答には閉じられていないコードブロックがありました。続けてこれらのコードブロックを完成させてください。',
             'stream_continue_parentheses': '前の応答には閉じられていない括弧がありました。続けて、すべての括弧が適切に閉じられていることを確認してください。',
             'stream_continue_interrupted': '前の応答が中断されたようです。続けて、最後の考えや説明を完了させてください。',
             'stream_timeout_error': 'ストリーミング送信が60秒間新しいコンテンツを受信していません。接続の問題の可能性があります。',
@@ -486,6 +487,108 @@ class JapaneseTranslation(BaseTranslation):
             'library_enable_tooltip': '有効にすると、本が選択されていない場合にAIを使用してライブラリを検索できます',
             'library_update': 'ライブラリデータを更新',
             'library_update_tooltip': 'ライブラリから書籍のタイトルと著者を抽出します',
+            'library_dictionary_format': '著者/シリーズのコードで書籍リストを圧縮',
+            'library_dictionary_format_tooltip': '繰り返し登場する著者とシリーズを一度だけ列挙して短いコードで参照し、大きなライブラリでも各 AI 検索リクエストにより多くの書籍を含めます',
+            'library_semantic_search': 'ローカル埋め込みによるセマンティック検索（Ollama）',
+            'library_semantic_search_tooltip': 'ローカルの Ollama サーバーで各書籍のタイトル・著者・タグ・紹介文を埋め込み、最も関連性の高い書籍だけを AI に送信します。インデックスは「ライブラリデータを更新」で更新されます。',
+            'book_passages_indexing': '本文を読み込み中… {percent}%',
+            'book_passages_unavailable': '（読み取れる本文がありません。EPUB、AZW3、TXT のいずれかの形式が必要です。）',
+            'batch_ask_menu': '各書籍に質問',
+            'batch_ask_title': '各書籍に質問',
+            'batch_ask_question_placeholder': '選択した各書籍への質問',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': '並列リクエスト数：',
+            'batch_ask_col_book': '書籍',
+            'batch_ask_col_status': '状態',
+            'batch_ask_col_latency': '所要時間',
+            'batch_ask_col_answer': '回答',
+            'batch_ask_start': '開始',
+            'batch_ask_resume': '再開',
+            'batch_ask_status_pending': '待機中',
+            'batch_ask_status_running': '実行中…',
+            'batch_ask_status_done': '完了',
+            'batch_ask_status_failed': '失敗',
+            'batch_ask_summary': '完了 {done}、失敗 {failed}、残り {pending}',
+            'batch_ask_no_selection': '先に質問する書籍を選択してください。',
+            'batch_ask_confirm_close': '一括質問はまだ実行中です。停止しますか？後で再開できます。',
+            'jobs_menu': 'バックグラウンドジョブ',
+            'jobs_title': 'バックグラウンドジョブ',
+            'jobs_new': '新規ジョブ…',
+            'jobs_new_title': '新規バックグラウンドジョブ',
+            'jobs_name': '名前：',
+            'jobs_column': '書き込む列：',
+            'jobs_scope': '書籍：',
+            'jobs_scope_selected': '選択した書籍（{count}）',
+            'jobs_scope_library': 'ライブラリ全体（{count}）',
+            'jobs_question_placeholder': '例：「この本のジャンルを最大3つ、カンマ区切りで挙げてください。ジャンルのみを回答してください。」',
+            'jobs_no_columns': 'まず calibre でテキストまたはコメント型のカスタム列を作成してください（設定 → 独自の列を追加）。',
+            'jobs_pause': '一時停止',
+            'jobs_retry_failed': '失敗分を再試行',
+            'jobs_delete': '削除',
+            'jobs_delete_confirm': 'このジョブを削除しますか？列に書き込み済みの値は残ります。',
+            'jobs_col_name': 'ジョブ',
+            'jobs_col_column': '列',
+            'jobs_col_progress': '進捗',
+            'jobs_col_throughput': '冊/分',
+            'jobs_col_eta': '残り時間',
+            'jobs_failed_count': '（失敗 {count}）',
+            'jobs_status_paused': '一時停止中',
+            'jobs_status_cancelled': 'キャンセル済み',
+            'jobs_use_batch': 'プロバイダーのバッチ API を使用',
+            'jobs_use_batch_tooltip': 'すべてのリクエストを 1 つのオフラインバッチとして送信します。通常は半額でレート制限の負担もありませんが、結果まで最大 24 時間かかることがあります。',
+            'circuit_open_error': '{provider} が {failures} 回連続で失敗したため、リクエストを一時停止しています。{seconds} 秒後に自動的に再試行します。',
+            'ollama_num_ctx_label': 'コンテキストウィンドウ (num_ctx)',
+            'ollama_num_ctx_placeholder': '自動（プロンプトに合わせて調整）',
+            'ollama_keep_alive_label': 'モデルを保持する時間',
+            'ollama_tuning_desc': 'コンテキストウィンドウを空欄にすると、プロンプトごとに自動調整します（モデルの上限まで）。保持時間は 30m や 2h などを指定でき、-1 で常に保持します。',
+            'fallback_ai_menu': '応答が遅いときの予備 AI',
+            'fallback_ai_tooltip': '回答の最初の言葉がなかなか届かない場合、同じ質問をこの AI にも送り、先に回答し始めた方を表示します。',
+            'fallback_ai_none': 'なし',
+            'answered_by_fallback': '{ai} が回答（予備）',
+            'rate_limit_label': 'クライアント側のレート制限',
+            'rate_limit_rpm_placeholder': 'リクエスト/分',
+            'rate_limit_tpm_placeholder': 'トークン/分',
+            'rate_limit_concurrent_placeholder': '最大同時実行数',
+            'rate_limit_desc': '制限を超えたリクエストはエラーにならず、キューで待機します。質問パネルはバックグラウンドジョブより優先されます。空欄の場合は制限しません。',
+            'rate_limit_queued': '{provider} のレート制限待ち（前に {ahead} 件、{seconds} 秒）',
+            'refresh_all_model_lists': 'すべてのモデル一覧を更新',
+            'refresh_all_model_lists_tooltip': '設定済みのすべての AI のモデル一覧の変更を一度に確認します',
+            'refreshing_model_lists': '更新中...',
+            'model_lists_updated': '更新あり：{names}',
+            'model_lists_unchanged': '変更なし：{names}',
+            'model_lists_failed': '失敗：',
+            'health_button': 'AI の状態…',
+            'health_title': 'AI の状態',
+            'health_desc': '設定済みのすべての AI を、それぞれ最も軽いリクエストで同時にチェックします（トークンは消費しません）。新しいパネルは停止中や応答の遅い AI を避けます。',
+            'health_col_ai': 'AI',
+            'health_col_connect': '接続',
+            'health_col_ttfb': '最初のバイト',
+            'health_col_http': 'HTTP',
+            'health_col_error': '最後のエラー',
+            'health_col_checked': '確認時刻',
+            'health_probe_all': 'すべてチェック',
+            'health_probing': '確認中…',
+            'health_interval': 'バックグラウンドで再確認：',
+            'health_interval_off': 'オフ',
+            'health_interval_minutes': '{minutes} 分ごと',
+            'health_queue_title': 'リクエストキュー（レート制限）:',
+            'health_queue_line': '{provider}: 実行中 {in_flight}、待機中 {queued}、平均待ち時間 {wait}',
+            'health_queue_paused': 'HTTP 429 のため {seconds} 秒一時停止中',
+            'health_queue_empty': 'まだリクエストはありません。',
+            'health_status_ok': '正常',
+            'health_status_slow': '遅い',
+            'health_status_down': '停止中',
+            'health_status_unknown': '未確認',
+            'avoid_known_questions': ' 次の質問とは異なる質問にしてください：{questions}',
+            'stat_usage_title': 'トークン',
+            'stat_usage_summary': '入力 {input}（キャッシュ {cached}）· 出力 {output}（推論 {reasoning}）· 回答 {answers} 件',
+            'stat_usage_cost': '推定コスト：{cost}',
+            'stat_usage_none': '今月はトークン使用量の報告がありません',
+            'stat_model_prices': 'モデル価格…',
+            'stat_model_prices_title': 'モデル価格',
+            'stat_model_prices_prompt': '1 行に 1 モデル：「モデル: 入力, キャッシュ入力, 出力」（100 万トークンあたりの価格）。キャッシュ入力は省略できます。名前はその名前で始まるモデルにも一致します。',
+            'stat_model_prices_invalid': '次の行は読み取れなかったため無視しました：{lines}',
+            'copy_performance_report': 'パフォーマンスレポートをコピー',
             'library_updating': '更新中...',
             'library_status': 'ステータス：{count}冊、最終更新：{time}',
             'library_status_empty': 'ステータス：データなし。「ライブラリデータを更新」をクリックして開始してください。',
@@ -666,6 +769,12 @@ class JapaneseTranslation(BaseTranslation):
             'stat_no_data_week': '今週のデータはありません',
             'stat_no_data_month': '今月のデータはありません',
             'stat_data_not_enough': 'データが不足しています',
+            'stat_breakdown': '内訳',
+            'stat_breakdown_subtitle': '今月の AI 質問ランキング',
+            'stat_breakdown_ai': 'AI',
+            'stat_breakdown_provider': 'プロバイダー',
+            'stat_breakdown_mode': 'モード',
+            'stat_breakdown_book': '書籍',
             
             # 統計ユーザー称号（問い合わせ回数に基づく）
             'stat_title_curious': '本めくり',
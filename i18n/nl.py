@@ -68,7 +68,7 @@ class DutchTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Gebruik {books_metadata} voor boekinformatie, {query} voor de gebruikersvraag',
             'dynamic_fields_title': 'Referentie dynamische velden',
             'dynamic_fields_subtitle': 'Beschikbare velden en voorbeeldwaarden van "Frankenstein" door Mary Shelley',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Engels<br><b>{series}</b> → (geen)<br><b>{query}</b> → Uw vraagtekst',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Engels<br><b>{series}</b> → (geen)<br><b>{passages}</b> → Passages uit het boek die bij de vraag passen<br><b>{query}</b> → Uw vraagtekst',
             'reset_prompts': 'Herstel prompts naar standaard',
             'reset_prompts_confirm': 'Weet u zeker dat u alle prompt-sjablonen wilt herstellen naar hun standaardwaarden? Deze actie kan niet ongedaan worden gemaakt.',
             'unsaved_changes_title': 'Niet-opgeslagen wijzigingen',
@@ -292,6 +292,9 @@ class DutchTranslation(BaseTranslation):
                 'U heeft een aangepaste promptlimiet ingeschakeld. Als verzoeken time-out krijgen, verlaag de limiet '
                 'onder Plugin-configuratie → General, of verminder geselecteerde boeken / gebruik een specifiekere query.'
             ),
+            'question_too_long_detail_tokens': 'Prompt is te lang (ongeveer {current} tokens, limiet {limit} tokens voor {model}, {over} te veel). U hebt {book_count} boek(en) geselecteerd.',
+            'question_too_long_detail_library_tokens': 'Prompt is te lang (ongeveer {current} tokens, limiet {limit} tokens voor {model}, {over} te veel). Uw bibliotheekindex bevat {book_count} boek(en).',
+            'question_too_long_hint_model': 'De limiet is afgeleid van het contextvenster van {model} ({window} tokens). Kies een model met een groter contextvenster of stel een specifiekere vraag.',
             'large_selection_dialog_title': 'Veel boeken geselecteerd',
             'large_selection_dialog_message': (
                 'U heeft {count} boeken geselecteerd. Voor bibliotheekbrede vragen werkt AI Search beter '
@@ -358,8 +361,6 @@ class DutchTranslation(BaseTranslation):
 
             # Stream response handling
             'stream_response_code': 'Stream-antwoordstatuscode: {code}',
-            'stream_continue_prompt': 'Vervolg alstublieft uw vorige antwoord zonder reeds verstrekte inhoud te herhalen.',
-            'stream_continue_code_blocks': 'Uw vorige antwoord bevatte ongesloten codeblokken. Ga alstublieft verder en voltooi deze codeblokken.',
             'stream_continue_parentheses': 'Uw vorige antwoord bevatte ongesloten haakjes. Ga alstublieft verder en zorg ervoor dat alle haakjes correct zijn gesloten.',
             'stream_continue_interrupted': 'Uw vorige antwoord lijkt te zijn onderbroken. Ga alstublieft verder met het voltooien van uw laatste gedachte of uitleg.',
             'stream_timeout_error': 'Stream-overdracht heeft 60 seconden lang geen nieuwe inhoud ontvangen, mogelijk een verbindingsprobleem.',
@@ -557,6 +558,108 @@ class DutchTranslation(BaseTranslation):
             'library_enable_tooltip': 'Indien ingeschakeld, kunt u uw bibliotheek doorzoeken met AI wanneer er geen boeken zijn geselecteerd',
             'library_update': 'Bibliotheekgegevens bijwerken',
             'library_update_tooltip': 'Boekitels en auteurs uit uw bibliotheek extraheren',
+            'library_dictionary_format': 'Boekenlijst comprimeren met auteur-/reekscodes',
+            'library_dictionary_format_tooltip': 'Herhaalde auteurs en reeksen worden één keer vermeld en met een korte code aangeduid, zodat meer van een grote bibliotheek in elke AI-zoekopdracht past',
+            'library_semantic_search': 'Semantisch zoeken met lokale embeddings (Ollama)',
+            'library_semantic_search_tooltip': 'Embeds title, authors, tags and description of every book with your local Ollama server and sends only the most relevant books to the AI. The index is updated with "Update Library Data".',
+            'book_passages_indexing': 'Boektekst lezen… {percent}%',
+            'book_passages_unavailable': '(No readable book text is available; EPUB, AZW3 or TXT format is required.)',
+            'batch_ask_menu': 'Elk boek vragen',
+            'batch_ask_title': 'Elk boek vragen',
+            'batch_ask_question_placeholder': 'Vraag voor elk geselecteerd boek',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Parallelle verzoeken:',
+            'batch_ask_col_book': 'Boek',
+            'batch_ask_col_status': 'Status',
+            'batch_ask_col_latency': 'Duur',
+            'batch_ask_col_answer': 'Antwoord',
+            'batch_ask_start': 'Starten',
+            'batch_ask_resume': 'Hervatten',
+            'batch_ask_status_pending': 'Wachtend',
+            'batch_ask_status_running': 'Bezig…',
+            'batch_ask_status_done': 'Klaar',
+            'batch_ask_status_failed': 'Mislukt',
+            'batch_ask_summary': '{done} klaar, {failed} mislukt, {pending} resterend',
+            'batch_ask_no_selection': 'Selecteer eerst de boeken waarover u iets wilt vragen.',
+            'batch_ask_confirm_close': 'De batch loopt nog. Stoppen? U kunt later hervatten.',
+            'jobs_menu': 'Achtergrondtaken',
+            'jobs_title': 'Achtergrondtaken',
+            'jobs_new': 'Nieuwe taak…',
+            'jobs_new_title': 'Nieuwe achtergrondtaak',
+            'jobs_name': 'Naam:',
+            'jobs_column': 'Schrijven naar kolom:',
+            'jobs_scope': 'Boeken:',
+            'jobs_scope_selected': 'Geselecteerde boeken ({count})',
+            'jobs_scope_library': 'Hele bibliotheek ({count})',
+            'jobs_question_placeholder': 'bijv. "Noem maximaal drie genres voor dit boek, gescheiden door komma\'s. Antwoord alleen met de genres."',
+            'jobs_no_columns': 'Create a text or comments custom column in calibre first (Preferences → Add your own columns).',
+            'jobs_pause': 'Pauzeren',
+            'jobs_retry_failed': 'Mislukte opnieuw',
+            'jobs_delete': 'Verwijderen',
+            'jobs_delete_confirm': 'Delete this job? Values already written to the column are kept.',
+            'jobs_col_name': 'Taak',
+            'jobs_col_column': 'Kolom',
+            'jobs_col_progress': 'Voortgang',
+            'jobs_col_throughput': 'Boeken/min',
+            'jobs_col_eta': 'Resterend',
+            'jobs_failed_count': '({count} mislukt)',
+            'jobs_status_paused': 'Gepauzeerd',
+            'jobs_status_cancelled': 'Geannuleerd',
+            'jobs_use_batch': 'Batch-API van de aanbieder gebruiken',
+            'jobs_use_batch_tooltip': 'Submit all requests as one offline batch. Usually half the price and no rate-limit pressure, but results can take up to 24 hours.',
+            'circuit_open_error': '{provider} is {failures} keer achter elkaar mislukt, daarom zijn verzoeken gepauzeerd. Over {seconds} seconden wordt het automatisch opnieuw geprobeerd.',
+            'ollama_num_ctx_label': 'Contextvenster (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Automatisch (afgestemd op elke prompt)',
+            'ollama_keep_alive_label': 'Model geladen houden gedurende',
+            'ollama_tuning_desc': 'Leave the context window empty to size it from each prompt (up to the model maximum). Keep-alive accepts values such as 30m or 2h; -1 keeps the model loaded.',
+            'fallback_ai_menu': 'Reserve-AI bij trage reactie',
+            'fallback_ai_tooltip': 'If the first words of an answer take too long, the same question is sent to this AI and whichever answers first is shown.',
+            'fallback_ai_none': 'Geen',
+            'answered_by_fallback': 'Beantwoord door {ai} (reserve)',
+            'rate_limit_label': 'Limieten aan clientzijde',
+            'rate_limit_rpm_placeholder': 'Verzoeken/min',
+            'rate_limit_tpm_placeholder': 'Tokens/min',
+            'rate_limit_concurrent_placeholder': 'Max. gelijktijdig',
+            'rate_limit_desc': 'Requests beyond these limits wait in a queue instead of failing with rate-limit errors. Ask panels go ahead of background jobs. Leave empty for no limit.',
+            'rate_limit_queued': 'Waiting for {provider} rate limit ({ahead} ahead, {seconds}s)',
+            'refresh_all_model_lists': 'Refresh All Model Lists',
+            'refresh_all_model_lists_tooltip': 'Check every configured AI for model list changes at once',
+            'refreshing_model_lists': 'Refreshing...',
+            'model_lists_updated': 'Updated: {names}',
+            'model_lists_unchanged': 'Unchanged: {names}',
+            'model_lists_failed': 'Failed:',
+            'health_button': 'AI Health…',
+            'health_title': 'AI Health',
+            'health_desc': 'Checks every configured AI at the same time with the cheapest request it supports (no tokens are used). New panels avoid AIs that are down or slow.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Connect',
+            'health_col_ttfb': 'First byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Last error',
+            'health_col_checked': 'Checked',
+            'health_probe_all': 'Check All',
+            'health_probing': 'Checking…',
+            'health_interval': 'Re-check in background:',
+            'health_interval_off': 'Off',
+            'health_interval_minutes': 'Every {minutes} min',
+            'health_queue_title': 'Request queues (rate limits):',
+            'health_queue_line': '{provider}: {in_flight} running, {queued} waiting, average wait {wait}',
+            'health_queue_paused': 'paused for {seconds} s after HTTP 429',
+            'health_queue_empty': 'No requests yet.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Slow',
+            'health_status_down': 'Down',
+            'health_status_unknown': 'Not checked',
+            'avoid_known_questions': ' Ask something different from these questions: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} in ({cached} cached) · {output} out ({reasoning} reasoning) · {answers} answers',
+            'stat_usage_cost': 'Estimated cost: {cost}',
+            'stat_usage_none': 'No token usage reported this month',
+            'stat_model_prices': 'Model Prices…',
+            'stat_model_prices_title': 'Model Prices',
+            'stat_model_prices_prompt': 'One model per line: "model: input, cached input, output" in price per 1M tokens. Cached input is optional. A name also matches models that start with it.',
+            'stat_model_prices_invalid': 'These lines could not be read and were ignored: {lines}',
+            'copy_performance_report': 'Copy Performance Report',
             'library_updating': 'Bijwerken...',
             'library_status': 'Status: {count} boeken, laatste update: {time}',
             'library_status_empty': 'Status: Geen gegevens. Klik op "Bibliotheekgegevens bijwerken" om te beginnen.',
@@ -621,6 +724,12 @@ class DutchTranslation(BaseTranslation):
             'stat_no_data_week': 'Geen data deze week',
             'stat_no_data_month': 'Geen data deze maand',
             'stat_data_not_enough': 'Niet genoeg data',
+            'stat_breakdown': 'Uitsplitsing',
+            'stat_breakdown_subtitle': 'Meeste AI-vragen deze maand',
+            'stat_breakdown_ai': 'AI',
+            'stat_breakdown_provider': 'Aanbieder',
+            'stat_breakdown_mode': 'Modus',
+            'stat_breakdown_book': 'Boeken',
             
             # Statistiek gebruikerstitels (gebaseerd op aantal verzoeken)
             'stat_title_curious': 'Bladeren',
@@ -68,7 +68,7 @@ class NorwegianTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Bruk {books_metadata} for bokinformasjon, {query} for brukerens spørsmål',
             'dynamic_fields_title': 'Referanse for dynamiske felt',
             'dynamic_fields_subtitle': 'Tilgjengelige felt og eksempelverdier fra "Frankenstein" av Mary Shelley',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Engelsk<br><b>{series}</b> → (ingen)<br><b>{query}</b> → Din spørsmålstekst',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Engelsk<br><b>{series}</b> → (ingen)<br><b>{passages}</b> → Utdrag fra boken som gjelder spørsmålet<br><b>{query}</b> → Din spørsmålstekst',
             'reset_prompts': 'Tilbakestill prompts til standard',
             'reset_prompts_confirm': 'Er du sikker på at du vil tilbakestille alle prompt-maler til standardverdiene? Denne handlingen kan ikke angres.',
             'unsaved_changes_title': 'Ulagrede endringer',
@@ -291,6 +291,9 @@ class NorwegianTranslation(BaseTranslation):
                 'Du har aktivert en tilpasset promptgrense. Hvis forespørsler får tidsavbrudd, senk grensen '
                 'under Plugin-konfigurasjon → General, eller reduser valgte bøker / bruk en mer spesifikk forespørsel.'
             ),
+            'question_too_long_detail_tokens': 'Prompten er for lang (ca. {current} tokens, grense {limit} tokens for {model}, {over} for mye). Du har valgt {book_count} bok/bøker.',
+            'question_too_long_detail_library_tokens': 'Prompten er for lang (ca. {current} tokens, grense {limit} tokens for {model}, {over} for mye). Bibliotekindeksen din inneholder {book_count} bok/bøker.',
+            'question_too_long_hint_model': 'Grensen er beregnet ut fra kontekstvinduet til {model} ({window} tokens). Velg en modell med større kontekstvindu, eller still et mer spesifikt spørsmål.',
             'large_selection_dialog_title': 'Mange bøker valgt',
             'large_selection_dialog_message': (
                 'Du har valgt {count} bøker. For bibliotekomfattende spørsmål fungerer AI Search bedre '
@@ -357,8 +360,6 @@ class NorwegianTranslation(BaseTranslation):
 
             # Stream response handling
             'stream_response_code': 'Strømmingssvar statuskode: {code}',
-            'stream_continue_prompt': 'Vennligst fortsett ditt forrige svar uten å gjenta innhold som allerede er gitt.',
-            'stream_continue_code_blocks': 'Ditt forrige svar hadde uavsluttede kodeblokker. Vennligst fortsett og fullfør disse kodeblokkene.',
             'stream_continue_parentheses': 'Ditt forrige svar hadde uavsluttede parenteser. Vennligst fortsett og sørg for at alle parenteser er riktig lukket.',
             'stream_continue_interrupted': 'Ditt forrige svar ser ut til å ha blitt avbrutt. Vennligst fortsett med å fullføre din siste tanke eller forklaring.',
             'stream_timeout_error': 'Strømmeoverføringen har ikke mottatt nytt innhold på 60 sekunder, muligens et tilkoblingsproblem.',
@@ -556,6 +557,108 @@ class NorwegianTranslation(BaseTranslation):
             'library_enable_tooltip': 'Når aktivert, kan du søke i biblioteket ditt med AI når ingen bøker er valgt',
             'library_update': 'Oppdater bibliotekdata',
             'library_update_tooltip': 'Hent ut boktitler og forfattere fra biblioteket ditt',
+            'library_dictionary_format': 'Komprimer boklisten med forfatter-/seriekoder',
+            'library_dictionary_format_tooltip': 'Gjentatte forfattere og serier listes én gang og refereres med en kort kode, slik at mer av et stort bibliotek får plass i hvert AI-søk',
+            'library_semantic_search': 'Semantisk søk med lokale embeddinger (Ollama)',
+            'library_semantic_search_tooltip': 'Embeds title, authors, tags and description of every book with your local Ollama server and sends only the most relevant books to the AI. The index is updated with "Update Library Data".',
+            'book_passages_indexing': 'Leser bokteksten… {percent}%',
+            'book_passages_unavailable': '(No readable book text is available; EPUB, AZW3 or TXT format is required.)',
+            'batch_ask_menu': 'Spør hver bok',
+            'batch_ask_title': 'Spør hver bok',
+            'batch_ask_question_placeholder': 'Spørsmål om hver valgte bok',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Parallelle forespørsler:',
+            'batch_ask_col_book': 'Bok',
+            'batch_ask_col_status': 'Status',
+            'batch_ask_col_latency': 'Tid',
+            'batch_ask_col_answer': 'Svar',
+            'batch_ask_start': 'Start',
+            'batch_ask_resume': 'Fortsett',
+            'batch_ask_status_pending': 'Venter',
+            'batch_ask_status_running': 'Kjører…',
+            'batch_ask_status_done': 'Ferdig',
+            'batch_ask_status_failed': 'Mislyktes',
+            'batch_ask_summary': '{done} ferdige, {failed} mislyktes, {pending} gjenstår',
+            'batch_ask_no_selection': 'Velg først bøkene du vil spørre om.',
+            'batch_ask_confirm_close': 'Batchen kjører fortsatt. Stoppe den? Du kan fortsette senere.',
+            'jobs_menu': 'Bakgrunnsjobber',
+            'jobs_title': 'Bakgrunnsjobber',
+            'jobs_new': 'Ny jobb…',
+            'jobs_new_title': 'Ny bakgrunnsjobb',
+            'jobs_name': 'Navn:',
+            'jobs_column': 'Skriv til kolonne:',
+            'jobs_scope': 'Bøker:',
+            'jobs_scope_selected': 'Valgte bøker ({count})',
+            'jobs_scope_library': 'Hele biblioteket ({count})',
+            'jobs_question_placeholder': 'e.g. "List up to three genres for this book, separated by commas. Reply with the genres only."',
+            'jobs_no_columns': 'Create a text or comments custom column in calibre first (Preferences → Add your own columns).',
+            'jobs_pause': 'Pause',
+            'jobs_retry_failed': 'Prøv mislykkede på nytt',
+            'jobs_delete': 'Slett',
+            'jobs_delete_confirm': 'Delete this job? Values already written to the column are kept.',
+            'jobs_col_name': 'Jobb',
+            'jobs_col_column': 'Kolonne',
+            'jobs_col_progress': 'Fremdrift',
+            'jobs_col_throughput': 'Bøker/min',
+            'jobs_col_eta': 'Gjenstår',
+            'jobs_failed_count': '({count} mislyktes)',
+            'jobs_status_paused': 'Satt på pause',
+            'jobs_status_cancelled': 'Avbrutt',
+            'jobs_use_batch': 'Bruk leverandørens batch-API',
+            'jobs_use_batch_tooltip': 'Submit all requests as one offline batch. Usually half the price and no rate-limit pressure, but results can take up to 24 hours.',
+            'circuit_open_error': '{provider} feilet {failures} ganger på rad, så forespørsler er satt på pause. Nytt forsøk gjøres automatisk om {seconds} sekunder.',
+            'ollama_num_ctx_label': 'Kontekstvindu (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Automatisk (tilpasset hver forespørsel)',
+            'ollama_keep_alive_label': 'Hold modellen lastet i',
+            'ollama_tuning_desc': 'Leave the context window empty to size it from each prompt (up to the model maximum). Keep-alive accepts values such as 30m or 2h; -1 keeps the model loaded.',
+            'fallback_ai_menu': 'Reserve-AI ved tregt svar',
+            'fallback_ai_tooltip': 'If the first words of an answer take too long, the same question is sent to this AI and whichever answers first is shown.',
+            'fallback_ai_none': 'Ingen',
+            'answered_by_fallback': 'Besvart av {ai} (reserve)',
+            'rate_limit_label': 'Hastighetsgrenser på klientsiden',
+            'rate_limit_rpm_placeholder': 'Forespørsler/min',
+            'rate_limit_tpm_placeholder': 'Tokens/min',
+            'rate_limit_concurrent_placeholder': 'Maks. samtidige',
+            'rate_limit_desc': 'Requests beyond these limits wait in a queue instead of failing with rate-limit errors. Ask panels go ahead of background jobs. Leave empty for no limit.',
+            'rate_limit_queued': 'Waiting for {provider} rate limit ({ahead} ahead, {seconds}s)',
+            'refresh_all_model_lists': 'Refresh All Model Lists',
+            'refresh_all_model_lists_tooltip': 'Check every configured AI for model list changes at once',
+            'refreshing_model_lists': 'Refreshing...',
+            'model_lists_updated': 'Updated: {names}',
+            'model_lists_unchanged': 'Unchanged: {names}',
+            'model_lists_failed': 'Failed:',
+            'health_button': 'AI Health…',
+            'health_title': 'AI Health',
+            'health_desc': 'Checks every configured AI at the same time with the cheapest request it supports (no tokens are used). New panels avoid AIs that are down or slow.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Connect',
+            'health_col_ttfb': 'First byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Last error',
+            'health_col_checked': 'Checked',
+            'health_probe_all': 'Check All',
+            'health_probing': 'Checking…',
+            'health_interval': 'Re-check in background:',
+            'health_interval_off': 'Off',
+            'health_interval_minutes': 'Every {minutes} min',
+            'health_queue_title': 'Request queues (rate limits):',
+            'health_queue_line': '{provider}: {in_flight} running, {queued} waiting, average wait {wait}',
+            'health_queue_paused': 'paused for {seconds} s after HTTP 429',
+            'health_queue_empty': 'No requests yet.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Slow',
+            'health_status_down': 'Down',
+            'health_status_unknown': 'Not checked',
+            'avoid_known_questions': ' Ask something different from these questions: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} in ({cached} cached) · {output} out ({reasoning} reasoning) · {answers} answers',
+            'stat_usage_cost': 'Estimated cost: {cost}',
+            'stat_usage_none': 'No token usage reported this month',
+            'stat_model_prices': 'Model Prices…',
+            'stat_model_prices_title': 'Model Prices',
+            'stat_model_prices_prompt': 'One model per line: "model: input, cached input, output" in price per 1M tokens. Cached input is optional. A name also matches models that start with it.',
+            'stat_model_prices_invalid': 'These lines could not be read and were ignored: {lines}',
+            'copy_performance_report': 'Copy Performance Report',
             'library_updating': 'Oppdaterer...',
             'library_status': 'Status: {count} bøker, siste oppdatering: {time}',
             'library_status_empty': 'Status: Ingen data. Klikk "Oppdater bibliotekdata" for å starte.',
@@ -620,6 +723,12 @@ class NorwegianTranslation(BaseTranslation):
             'stat_no_data_week': 'Ingen data denne uken',
             'stat_no_data_month': 'Ingen data denne måneden',
             'stat_data_not_enough': 'Ikke nok data',
+            'stat_breakdown': 'Fordeling',
+            'stat_breakdown_subtitle': 'Flest AI-spørsmål denne måneden',
+            'stat_breakdown_ai': 'AI',
+            'stat_breakdown_provider': 'Leverandør',
+            'stat_breakdown_mode': 'Modus',
+            'stat_breakdown_book': 'Bøker',
             
             # Statistikk brukertitler (basert på antall forespørsler)
             'stat_title_curious': 'Bladrer',
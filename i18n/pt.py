@@ -68,7 +68,7 @@ class PortugueseTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Use {books_metadata} para informações do livro, {query} para a pergunta do usuário',
             'dynamic_fields_title': 'Referência de Campos Dinâmicos',
             'dynamic_fields_subtitle': 'Campos disponíveis e valores de exemplo de "Frankenstein" de Mary Shelley',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Inglês<br><b>{series}</b> → (nenhum)<br><b>{query}</b> → Seu texto de pergunta',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Inglês<br><b>{series}</b> → (nenhum)<br><b>{passages}</b> → Trechos do livro relacionados à pergunta<br><b>{query}</b> → Seu texto de pergunta',
             'reset_prompts': 'Redefinir Prompts para Padrão',
             'reset_prompts_confirm': 'Tem certeza de que deseja redefinir todos os modelos de prompt para seus valores padrão? Esta ação não pode ser desfeita.',
             'unsaved_changes_title': 'Alterações Não Salvas',
@@ -295,6 +295,9 @@ class PortugueseTranslation(BaseTranslation):
                 'reduza o limite em Configuração do plugin → General, selecione menos livros '
                 'ou faça uma pergunta mais específica.'
             ),
+            'question_too_long_detail_tokens': 'O prompt é longo demais (cerca de {current} tokens, limite {limit} tokens para {model}, excesso de {over}). Você selecionou {book_count} livro(s).',
+            'question_too_long_detail_library_tokens': 'O prompt é longo demais (cerca de {current} tokens, limite {limit} tokens para {model}, excesso de {over}). O índice da sua biblioteca contém {book_count} livro(s).',
+            'question_too_long_hint_model': 'O limite é calculado a partir da janela de contexto de {model} ({window} tokens). Escolha um modelo com uma janela de contexto maior ou faça uma pergunta mais específica.',
             'large_selection_dialog_title': 'Muitos livros selecionados',
             'large_selection_dialog_message': (
                 'Você selecionou {count} livros. Para perguntas em toda a biblioteca, AI Search '
@@ -362,8 +365,6 @@ class PortugueseTranslation(BaseTranslation):
 
             # Stream response handling
             'stream_response_code': 'Código de status da resposta do stream: {code}',
-            'stream_continue_prompt': 'Por favor, continue sua resposta anterior sem repetir o conteúdo já fornecido.',
-            'stream_continue_code_blocks': 'Sua resposta anterior tinha blocos de código não fechados. Por favor, continue e complete esses blocos de código.',
             'stream_continue_parentheses': 'Sua resposta anterior tinha parênteses não fechados. Por favor, continue e certifique-se de que todos os parênteses estejam corretamente fechados.',
             'stream_continue_interrupted': 'Sua resposta anterior parece ter sido interrompida. Por favor, continue completando seu último pensamento ou explicação.',
             'stream_timeout_error': 'A transmissão do stream não recebeu conteúdo novo por 60 segundos, possivelmente um problema de conexão.',
@@ -562,6 +563,108 @@ class PortugueseTranslation(BaseTranslation):
             'library_enable_tooltip': 'Quando ativado, você pode pesquisar sua biblioteca usando IA quando nenhum livro está selecionado',
             'library_update': 'Atualizar dados da biblioteca',
             'library_update_tooltip': 'Extrair títulos e autores de livros da sua biblioteca',
+            'library_dictionary_format': 'Comprimir a lista de livros com códigos de autor/série',
+            'library_dictionary_format_tooltip': 'Lista uma única vez cada autor e série repetidos e os referencia com um código curto, para caber mais de uma biblioteca grande em cada pesquisa com IA',
+            'library_semantic_search': 'Pesquisa semântica com embeddings locais (Ollama)',
+            'library_semantic_search_tooltip': 'Embeds title, authors, tags and description of every book with your local Ollama server and sends only the most relevant books to the AI. The index is updated with "Update Library Data".',
+            'book_passages_indexing': 'Lendo o texto do livro… {percent}%',
+            'book_passages_unavailable': '(Nenhum texto legível disponível; é necessário o formato EPUB, AZW3 ou TXT.)',
+            'batch_ask_menu': 'Perguntar a cada livro',
+            'batch_ask_title': 'Perguntar a cada livro',
+            'batch_ask_question_placeholder': 'Pergunta para cada livro selecionado',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Pedidos paralelos:',
+            'batch_ask_col_book': 'Livro',
+            'batch_ask_col_status': 'Estado',
+            'batch_ask_col_latency': 'Latência',
+            'batch_ask_col_answer': 'Resposta',
+            'batch_ask_start': 'Iniciar',
+            'batch_ask_resume': 'Retomar',
+            'batch_ask_status_pending': 'Pendente',
+            'batch_ask_status_running': 'Em curso…',
+            'batch_ask_status_done': 'Concluído',
+            'batch_ask_status_failed': 'Falhou',
+            'batch_ask_summary': '{done} concluídos, {failed} falharam, {pending} restantes',
+            'batch_ask_no_selection': 'Selecione primeiro os livros sobre os quais quer perguntar.',
+            'batch_ask_confirm_close': 'O lote ainda está em curso. Pará-lo? Pode retomá-lo mais tarde.',
+            'jobs_menu': 'Tarefas em segundo plano',
+            'jobs_title': 'Tarefas em segundo plano',
+            'jobs_new': 'Nova tarefa…',
+            'jobs_new_title': 'Nova tarefa em segundo plano',
+            'jobs_name': 'Nome:',
+            'jobs_column': 'Escrever na coluna:',
+            'jobs_scope': 'Livros:',
+            'jobs_scope_selected': 'Livros selecionados ({count})',
+            'jobs_scope_library': 'Toda a biblioteca ({count})',
+            'jobs_question_placeholder': 'ex.: «Indica até três géneros deste livro, separados por vírgulas. Responde apenas com os géneros.»',
+            'jobs_no_columns': 'Create a text or comments custom column in calibre first (Preferences → Add your own columns).',
+            'jobs_pause': 'Pausar',
+            'jobs_retry_failed': 'Repetir falhados',
+            'jobs_delete': 'Eliminar',
+            'jobs_delete_confirm': 'Delete this job? Values already written to the column are kept.',
+            'jobs_col_name': 'Tarefa',
+            'jobs_col_column': 'Coluna',
+            'jobs_col_progress': 'Progresso',
+            'jobs_col_throughput': 'Livros/min',
+            'jobs_col_eta': 'Tempo restante',
+            'jobs_failed_count': '({count} falharam)',
+            'jobs_status_paused': 'Em pausa',
+            'jobs_status_cancelled': 'Cancelada',
+            'jobs_use_batch': 'Usar a API de lotes do fornecedor',
+            'jobs_use_batch_tooltip': 'Submit all requests as one offline batch. Usually half the price and no rate-limit pressure, but results can take up to 24 hours.',
+            'circuit_open_error': '{provider} falhou {failures} vezes seguidas, por isso os pedidos estão em pausa. Nova tentativa automática dentro de {seconds} segundos.',
+            'ollama_num_ctx_label': 'Janela de contexto (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Automático (ajustado a cada pedido)',
+            'ollama_keep_alive_label': 'Manter o modelo carregado durante',
+            'ollama_tuning_desc': 'Leave the context window empty to size it from each prompt (up to the model maximum). Keep-alive accepts values such as 30m or 2h; -1 keeps the model loaded.',
+            'fallback_ai_menu': 'IA de reserva quando a resposta demora',
+            'fallback_ai_tooltip': 'If the first words of an answer take too long, the same question is sent to this AI and whichever answers first is shown.',
+            'fallback_ai_none': 'Nenhuma',
+            'answered_by_fallback': 'Respondido por {ai} (reserva)',
+            'rate_limit_label': 'Limites de taxa no cliente',
+            'rate_limit_rpm_placeholder': 'Pedidos/min',
+            'rate_limit_tpm_placeholder': 'Tokens/min',
+            'rate_limit_concurrent_placeholder': 'Máx. simultâneos',
+            'rate_limit_desc': 'Requests beyond these limits wait in a queue instead of failing with rate-limit errors. Ask panels go ahead of background jobs. Leave empty for no limit.',
+            'rate_limit_queued': 'Waiting for {provider} rate limit ({ahead} ahead, {seconds}s)',
+            'refresh_all_model_lists': 'Refresh All Model Lists',
+            'refresh_all_model_lists_tooltip': 'Check every configured AI for model list changes at once',
+            'refreshing_model_lists': 'Refreshing...',
+            'model_lists_updated': 'Updated: {names}',
+            'model_lists_unchanged': 'Unchanged: {names}',
+            'model_lists_failed': 'Failed:',
+            'health_button': 'AI Health…',
+            'health_title': 'AI Health',
+            'health_desc': 'Checks every configured AI at the same time with the cheapest request it supports (no tokens are used). New panels avoid AIs that are down or slow.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Connect',
+            'health_col_ttfb': 'First byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Last error',
+            'health_col_checked': 'Checked',
+            'health_probe_all': 'Check All',
+            'health_probing': 'Checking…',
+            'health_interval': 'Re-check in background:',
+            'health_interval_off': 'Off',
+            'health_interval_minutes': 'Every {minutes} min',
+            'health_queue_title': 'Request queues (rate limits):',
+            'health_queue_line': '{provider}: {in_flight} running, {queued} waiting, average wait {wait}',
+            'health_queue_paused': 'paused for {seconds} s after HTTP 429',
+            'health_queue_empty': 'No requests yet.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Slow',
+            'health_status_down': 'Down',
+            'health_status_unknown': 'Not checked',
+            'avoid_known_questions': ' Ask something different from these questions: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} in ({cached} cached) · {output} out ({reasoning} reasoning) · {answers} answers',
+            'stat_usage_cost': 'Estimated cost: {cost}',
+            'stat_usage_none': 'No token usage reported this month',
+            'stat_model_prices': 'Model Prices…',
+            'stat_model_prices_title': 'Model Prices',
+            'stat_model_prices_prompt': 'One model per line: "model: input, cached input, output" in price per 1M tokens. Cached input is optional. A name also matches models that start with it.',
+            'stat_model_prices_invalid': 'These lines could not be read and were ignored: {lines}',
+            'copy_performance_report': 'Copy Performance Report',
             'library_updating': 'Atualizando...',
             'library_status': 'Status: {count} livros, última atualização: {time}',
             'library_status_empty': 'Status: Sem dados. Clique em "Atualizar dados da biblioteca" para começar.',
@@ -629,6 +732,12 @@ class PortugueseTranslation(BaseTranslation):
             'stat_no_data_week': 'Sem dados esta semana',
             'stat_no_data_month': 'Sem dados este mês',
             'stat_data_not_enough': 'Dados insuficientes',
+            'stat_breakdown': 'Detalhamento',
+            'stat_breakdown_subtitle': 'Principais consultas de IA este mês',
+            'stat_breakdown_ai': 'IA',
+            'stat_breakdown_provider': 'Provedor',
+            'stat_breakdown_mode': 'Modo',
+            'stat_breakdown_book': 'Livros',
             
             # Títulos de usuário estatísticos (baseados no número de consultas)
             'stat_title_curious': 'Folheador',
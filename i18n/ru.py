@@ -68,7 +68,7 @@ class RussianTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Используйте {books_metadata} для информации о книге, {query} для вопроса пользователя',
             'dynamic_fields_title': 'Справочник динамических полей',
             'dynamic_fields_subtitle': 'Доступные поля и примеры значений из "Франкенштейна" Мэри Шелли',
-            'dynamic_fields_examples': '<b>{title}</b> → Франкенштейн<br><b>{author}</b> → Мэри Шелли<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Английский<br><b>{series}</b> → (нет)<br><b>{query}</b> → Ваш текст вопроса',
+            'dynamic_fields_examples': '<b>{title}</b> → Франкенштейн<br><b>{author}</b> → Мэри Шелли<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Английский<br><b>{series}</b> → (нет)<br><b>{passages}</b> → Фрагменты книги, относящиеся к вопросу<br><b>{query}</b> → Ваш текст вопроса',
             'reset_prompts': 'Сбросить промпты до значений по умолчанию',
             'reset_prompts_confirm': 'Вы уверены, что хотите сбросить все шаблоны промптов до их значений по умолчанию? Это действие нельзя отменить.',
             'unsaved_changes_title': 'Несохраненные изменения',
@@ -292,6 +292,9 @@ class RussianTranslation(BaseTranslation):
                 'Вы включили пользовательский лимит подсказки. Если запросы завершаются по таймауту, '
                 'уменьшите лимит в Настройках плагина → General или сократите выбор книг / уточните запрос.'
             ),
+            'question_too_long_detail_tokens': 'Запрос слишком длинный (около {current} токенов, лимит {limit} токенов для {model}, превышение на {over}). Выбрано книг: {book_count}.',
+            'question_too_long_detail_library_tokens': 'Запрос слишком длинный (около {current} токенов, лимит {limit} токенов для {model}, превышение на {over}). Индекс библиотеки содержит {book_count} книг.',
+            'question_too_long_hint_model': 'Лимит рассчитан по контекстному окну {model} ({window} токенов). Выберите модель с большим контекстным окном или задайте более конкретный вопрос.',
             'large_selection_dialog_title': 'Выбрано много книг',
             'large_selection_dialog_message': (
                 'Вы выбрали {count} книг. Для вопросов по всей библиотеке лучше подходит AI Search — '
@@ -358,8 +361,6 @@ class RussianTranslation(BaseTranslation):
 
             # Stream response handling
             'stream_response_code': 'Код состояния ответа потока: {code}',
-            'stream_continue_prompt': 'Пожалуйста, продолжайте свой предыдущий ответ, не повторяя уже предоставленное содержание.',
-            'stream_continue_code_blocks': 'В вашем предыдущем ответе были незакрытые блоки кода. Пожалуйста, продолжайте и завершите эти блоки кода.',
             'stream_continue_parentheses': 'В вашем предыдущем ответе были незакрытые скобки. Пожалуйста, продолжайте и убедитесь, что все скобки правильно закрыты.',
             'stream_continue_interrupted': 'Ваш предыдущий ответ, похоже, был прерван. Пожалуйста, продолжайте завершать свою последнюю мысль или объяснение.',
             'stream_timeout_error': 'Передача потока не получала новый контент в течение 60 секунд, возможно, проблема с соединением.',
@@ -557,6 +558,108 @@ class RussianTranslation(BaseTranslation):
             'library_enable_tooltip': 'При включении вы можете искать в библиотеке с помощью ИИ, когда книги не выбраны',
             'library_update': 'Обновить данные библиотеки',
             'library_update_tooltip': 'Извлечь названия и авторов книг из вашей библиотеки',
+            'library_dictionary_format': 'Сжимать список книг кодами авторов/серий',
+            'library_dictionary_format_tooltip': 'Повторяющиеся авторы и серии перечисляются один раз и обозначаются коротким кодом, чтобы в каждый запрос ИИ-поиска помещалось больше книг большой библиотеки',
+            'library_semantic_search': 'Семантический поиск с локальными эмбеддингами (Ollama)',
+            'library_semantic_search_tooltip': 'Embeds title, authors, tags and description of every book with your local Ollama server and sends only the most relevant books to the AI. The index is updated with "Update Library Data".',
+            'book_passages_indexing': 'Чтение текста книги… {percent}%',
+            'book_passages_unavailable': '(Текст книги недоступен; требуется формат EPUB, AZW3 или TXT.)',
+            'batch_ask_menu': 'Спросить о каждой книге',
+            'batch_ask_title': 'Спросить о каждой книге',
+            'batch_ask_question_placeholder': 'Вопрос к каждой выбранной книге',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Параллельных запросов:',
+            'batch_ask_col_book': 'Книга',
+            'batch_ask_col_status': 'Статус',
+            'batch_ask_col_latency': 'Время',
+            'batch_ask_col_answer': 'Ответ',
+            'batch_ask_start': 'Начать',
+            'batch_ask_resume': 'Продолжить',
+            'batch_ask_status_pending': 'Ожидает',
+            'batch_ask_status_running': 'Выполняется…',
+            'batch_ask_status_done': 'Готово',
+            'batch_ask_status_failed': 'Ошибка',
+            'batch_ask_summary': 'Готово: {done}, ошибок: {failed}, осталось: {pending}',
+            'batch_ask_no_selection': 'Сначала выберите книги, о которых хотите спросить.',
+            'batch_ask_confirm_close': 'Пакет ещё выполняется. Остановить? Его можно будет продолжить позже.',
+            'jobs_menu': 'Фоновые задания',
+            'jobs_title': 'Фоновые задания',
+            'jobs_new': 'Новое задание…',
+            'jobs_new_title': 'Новое фоновое задание',
+            'jobs_name': 'Название:',
+            'jobs_column': 'Записать в столбец:',
+            'jobs_scope': 'Книги:',
+            'jobs_scope_selected': 'Выбранные книги ({count})',
+            'jobs_scope_library': 'Вся библиотека ({count})',
+            'jobs_question_placeholder': 'Например: «Назови до трёх жанров этой книги через запятую. Ответь только жанрами.»',
+            'jobs_no_columns': 'Сначала создайте в calibre пользовательский столбец типа «текст» или «комментарии» (Настройки → Добавить свои столбцы).',
+            'jobs_pause': 'Пауза',
+            'jobs_retry_failed': 'Повторить неудачные',
+            'jobs_delete': 'Удалить',
+            'jobs_delete_confirm': 'Удалить задание? Уже записанные в столбец значения сохранятся.',
+            'jobs_col_name': 'Задание',
+            'jobs_col_column': 'Столбец',
+            'jobs_col_progress': 'Прогресс',
+            'jobs_col_throughput': 'Книг/мин',
+            'jobs_col_eta': 'Осталось',
+            'jobs_failed_count': '(ошибок: {count})',
+            'jobs_status_paused': 'Приостановлено',
+            'jobs_status_cancelled': 'Отменено',
+            'jobs_use_batch': 'Использовать пакетный API провайдера',
+            'jobs_use_batch_tooltip': 'Отправить все запросы одним офлайн-пакетом. Обычно вдвое дешевле и без нагрузки на лимиты, но результаты могут прийти через 24 часа.',
+            'circuit_open_error': '{provider} {failures} раз подряд завершился ошибкой, поэтому запросы к нему приостановлены. Повторная попытка будет автоматически через {seconds} с.',
+            'ollama_num_ctx_label': 'Окно контекста (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Авто (по размеру запроса)',
+            'ollama_keep_alive_label': 'Держать модель загруженной',
+            'ollama_tuning_desc': 'Оставьте окно контекста пустым, чтобы подбирать его по каждому запросу (до максимума модели). Keep-alive принимает значения вроде 30m или 2h; -1 держит модель загруженной.',
+            'fallback_ai_menu': 'Резервный ИИ при медленном ответе',
+            'fallback_ai_tooltip': 'Если начало ответа задерживается, тот же вопрос отправляется этому ИИ, и показывается ответ того, кто начнёт первым.',
+            'fallback_ai_none': 'Нет',
+            'answered_by_fallback': 'Ответил {ai} (резерв)',
+            'rate_limit_label': 'Ограничения частоты на стороне клиента',
+            'rate_limit_rpm_placeholder': 'Запросов/мин',
+            'rate_limit_tpm_placeholder': 'Токенов/мин',
+            'rate_limit_concurrent_placeholder': 'Макс. одновременно',
+            'rate_limit_desc': 'Запросы сверх этих лимитов ждут в очереди, а не завершаются ошибкой. Панели вопросов обслуживаются раньше фоновых задач. Оставьте пустым, чтобы не ограничивать.',
+            'rate_limit_queued': 'Ожидание лимита {provider} (впереди {ahead}, {seconds} с)',
+            'refresh_all_model_lists': 'Обновить все списки моделей',
+            'refresh_all_model_lists_tooltip': 'Проверить изменения списков моделей у всех настроенных ИИ одновременно',
+            'refreshing_model_lists': 'Обновление...',
+            'model_lists_updated': 'Обновлено: {names}',
+            'model_lists_unchanged': 'Без изменений: {names}',
+            'model_lists_failed': 'Ошибки:',
+            'health_button': 'Состояние ИИ…',
+            'health_title': 'Состояние ИИ',
+            'health_desc': 'Одновременно проверяет все настроенные ИИ самым лёгким запросом (токены не расходуются). Новые панели избегают недоступных и медленных ИИ.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Соединение',
+            'health_col_ttfb': 'Первый байт',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Последняя ошибка',
+            'health_col_checked': 'Проверено',
+            'health_probe_all': 'Проверить все',
+            'health_probing': 'Проверка…',
+            'health_interval': 'Фоновая проверка:',
+            'health_interval_off': 'Выкл.',
+            'health_interval_minutes': 'Каждые {minutes} мин',
+            'health_queue_title': 'Очереди запросов (лимиты):',
+            'health_queue_line': '{provider}: выполняется {in_flight}, ожидает {queued}, среднее ожидание {wait}',
+            'health_queue_paused': 'пауза {seconds} с после HTTP 429',
+            'health_queue_empty': 'Запросов пока не было.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Медленно',
+            'health_status_down': 'Недоступен',
+            'health_status_unknown': 'Не проверено',
+            'avoid_known_questions': ' Задайте вопрос, отличающийся от этих: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} in ({cached} cached) · {output} out ({reasoning} reasoning) · {answers} answers',
+            'stat_usage_cost': 'Estimated cost: {cost}',
+            'stat_usage_none': 'No token usage reported this month',
+            'stat_model_prices': 'Model Prices…',
+            'stat_model_prices_title': 'Model Prices',
+            'stat_model_prices_prompt': 'One model per line: "model: input, cached input, output" in price per 1M tokens. Cached input is optional. A name also matches models that start with it.',
+            'stat_model_prices_invalid': 'These lines could not be read and were ignored: {lines}',
+            'copy_performance_report': 'Copy Performance Report',
             'library_updating': 'Обновление...',
             'library_status': 'Статус: {count} книг, последнее обновление: {time}',
             'library_status_empty': 'Статус: Нет данных. Нажмите "Обновить данные библиотеки" для начала.',
@@ -621,6 +724,12 @@ class RussianTranslation(BaseTranslation):
             'stat_no_data_week': 'Нет данных за эту неделю',
             'stat_no_data_month': 'Нет данных за этот месяц',
             'stat_data_not_enough': 'Недостаточно данных',
+            'stat_breakdown': 'Разбивка',
+            'stat_breakdown_subtitle': 'Топ запросов к ИИ за этот месяц',
+            'stat_breakdown_ai': 'ИИ',
+            'stat_breakdown_provider': 'Провайдер',
+            'stat_breakdown_mode': 'Режим',
+            'stat_breakdown_book': 'Книги',
             
             # Статистические титулы пользователя (на основе количества запросов)
             'stat_title_curious': 'Листатель',
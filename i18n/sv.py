@@ -68,7 +68,7 @@ class SwedishTranslation(BaseTranslation):
             'multi_book_placeholder_hint': 'Använd {books_metadata} för bokinformation, {query} för användarens fråga',
             'dynamic_fields_title': 'Referens för dynamiska fält',
             'dynamic_fields_subtitle': 'Tillgängliga fält och exempelvärden från "Frankenstein" av Mary Shelley',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Engelska<br><b>{series}</b> → (ingen)<br><b>{query}</b> → Din frågetext',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → Engelska<br><b>{series}</b> → (ingen)<br><b>{passages}</b> → Bokavsnitt som rör frågan<br><b>{query}</b> → Din frågetext',
             'reset_prompts': 'Återställ prompter till standard',
             'reset_prompts_confirm': 'Är du säker på att du vill återställa alla promptmallar till deras standardvärden? Denna åtgärd kan inte ångras.',
             'unsaved_changes_title': 'Osparade ändringar',
@@ -293,6 +293,9 @@ class SwedishTranslation(BaseTranslation):
                 'Du har aktiverat en anpassad promptgräns. Om förfrågningar får timeout, sänk gränsen '
                 'under Plugin-konfiguration → General, eller minska valda böcker / använd en mer specifik fråga.'
             ),
+            'question_too_long_detail_tokens': 'Prompten är för lång (cirka {current} token, gräns {limit} token för {model}, {over} för mycket). Du har valt {book_count} bok/böcker.',
+            'question_too_long_detail_library_tokens': 'Prompten är för lång (cirka {current} token, gräns {limit} token för {model}, {over} för mycket). Ditt biblioteksindex innehåller {book_count} bok/böcker.',
+            'question_too_long_hint_model': 'Gränsen beräknas från kontextfönstret för {model} ({window} token). Välj en modell med större kontextfönster eller ställ en mer specifik fråga.',
             'large_selection_dialog_title': 'Många böcker valda',
             'large_selection_dialog_message': (
                 'Du har valt {count} böcker. För biblioteksomfattande frågor fungerar AI Search bättre '
@@ -359,8 +362,6 @@ class SwedishTranslation(BaseTranslation):
 
             # Stream response handling
             'stream_response_code': 'Stream-svar statuskod: {code}',
-            'stream_continue_prompt': 'Vänligen fortsätt ditt tidigare svar utan att upprepa innehåll som redan har tillhandahållits.',
-            'stream_continue_code_blocks': 'Ditt tidigare svar hade oavslutade kodblock. Vänligen fortsätt och slutför dessa kodblock.',
             'stream_continue_parentheses': 'Ditt tidigare svar hade oavslutade parenteser. Vänligen fortsätt och se till att alla parenteser är korrekt stängda.',
             'stream_continue_interrupted': 'Ditt tidigare svar verkar ha blivit avbrutet. Vänligen fortsätt att slutföra din sista tanke eller förklaring.',
             'stream_timeout_error': 'Stream-överföringen har inte mottagit nytt innehåll på 60 sekunder, troligen ett anslutningsproblem.',
@@ -558,6 +559,108 @@ class SwedishTranslation(BaseTranslation):
             'library_enable_tooltip': 'När aktiverad kan du söka i ditt bibliotek med AI när inga böcker är markerade',
             'library_update': 'Uppdatera biblioteksdata',
             'library_update_tooltip': 'Extrahera boktitlar och författare från ditt bibliotek',
+            'library_dictionary_format': 'Komprimera boklistan med författar-/seriekoder',
+            'library_dictionary_format_tooltip': 'Upprepade författare och serier listas en gång och refereras med en kort kod, så att mer av ett stort bibliotek ryms i varje AI-sökning',
+            'library_semantic_search': 'Semantisk sökning med lokala inbäddningar (Ollama)',
+            'library_semantic_search_tooltip': 'Embeds title, authors, tags and description of every book with your local Ollama server and sends only the most relevant books to the AI. The index is updated with "Update Library Data".',
+            'book_passages_indexing': 'Läser bokens text… {percent}%',
+            'book_passages_unavailable': '(No readable book text is available; EPUB, AZW3 or TXT format is required.)',
+            'batch_ask_menu': 'Fråga varje bok',
+            'batch_ask_title': 'Fråga varje bok',
+            'batch_ask_question_placeholder': 'Fråga att ställa om varje vald bok',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': 'Parallella förfrågningar:',
+            'batch_ask_col_book': 'Bok',
+            'batch_ask_col_status': 'Status',
+            'batch_ask_col_latency': 'Tid',
+            'batch_ask_col_answer': 'Svar',
+            'batch_ask_start': 'Starta',
+            'batch_ask_resume': 'Återuppta',
+            'batch_ask_status_pending': 'Väntar',
+            'batch_ask_status_running': 'Pågår…',
+            'batch_ask_status_done': 'Klar',
+            'batch_ask_status_failed': 'Misslyckades',
+            'batch_ask_summary': '{done} klara, {failed} misslyckades, {pending} återstår',
+            'batch_ask_no_selection': 'Välj först de böcker du vill fråga om.',
+            'batch_ask_confirm_close': 'Batchen körs fortfarande. Stoppa den? Du kan återuppta den senare.',
+            'jobs_menu': 'Bakgrundsjobb',
+            'jobs_title': 'Bakgrundsjobb',
+            'jobs_new': 'Nytt jobb…',
+            'jobs_new_title': 'Nytt bakgrundsjobb',
+            'jobs_name': 'Namn:',
+            'jobs_column': 'Skriv till kolumn:',
+            'jobs_scope': 'Böcker:',
+            'jobs_scope_selected': 'Valda böcker ({count})',
+            'jobs_scope_library': 'Hela biblioteket ({count})',
+            'jobs_question_placeholder': 'e.g. "List up to three genres for this book, separated by commas. Reply with the genres only."',
+            'jobs_no_columns': 'Create a text or comments custom column in calibre first (Preferences → Add your own columns).',
+            'jobs_pause': 'Pausa',
+            'jobs_retry_failed': 'Försök igen med misslyckade',
+            'jobs_delete': 'Ta bort',
+            'jobs_delete_confirm': 'Delete this job? Values already written to the column are kept.',
+            'jobs_col_name': 'Jobb',
+            'jobs_col_column': 'Kolumn',
+            'jobs_col_progress': 'Förlopp',
+            'jobs_col_throughput': 'Böcker/min',
+            'jobs_col_eta': 'Återstår',
+            'jobs_failed_count': '({count} misslyckades)',
+            'jobs_status_paused': 'Pausad',
+            'jobs_status_cancelled': 'Avbruten',
+            'jobs_use_batch': 'Använd leverantörens batch-API',
+            'jobs_use_batch_tooltip': 'Submit all requests as one offline batch. Usually half the price and no rate-limit pressure, but results can take up to 24 hours.',
+            'circuit_open_error': '{provider} misslyckades {failures} gånger i rad, så förfrågningar är pausade. Ett nytt försök görs automatiskt om {seconds} sekunder.',
+            'ollama_num_ctx_label': 'Kontextfönster (num_ctx)',
+            'ollama_num_ctx_placeholder': 'Automatiskt (anpassas efter varje fråga)',
+            'ollama_keep_alive_label': 'Håll modellen laddad i',
+            'ollama_tuning_desc': 'Leave the context window empty to size it from each prompt (up to the model maximum). Keep-alive accepts values such as 30m or 2h; -1 keeps the model loaded.',
+            'fallback_ai_menu': 'Reserv-AI vid långsamt svar',
+            'fallback_ai_tooltip': 'If the first words of an answer take too long, the same question is sent to this AI and whichever answers first is shown.',
+            'fallback_ai_none': 'Ingen',
+            'answered_by_fallback': 'Besvarad av {ai} (reserv)',
+            'rate_limit_label': 'Hastighetsgränser på klientsidan',
+            'rate_limit_rpm_placeholder': 'Förfrågningar/min',
+            'rate_limit_tpm_placeholder': 'Tokens/min',
+            'rate_limit_concurrent_placeholder': 'Max samtidiga',
+            'rate_limit_desc': 'Requests beyond these limits wait in a queue instead of failing with rate-limit errors. Ask panels go ahead of background jobs. Leave empty for no limit.',
+            'rate_limit_queued': 'Waiting for {provider} rate limit ({ahead} ahead, {seconds}s)',
+            'refresh_all_model_lists': 'Refresh All Model Lists',
+            'refresh_all_model_lists_tooltip': 'Check every configured AI for model list changes at once',
+            'refreshing_model_lists': 'Refreshing...',
+            'model_lists_updated': 'Updated: {names}',
+            'model_lists_unchanged': 'Unchanged: {names}',
+            'model_lists_failed': 'Failed:',
+            'health_button': 'AI Health…',
+            'health_title': 'AI Health',
+            'health_desc': 'Checks every configured AI at the same time with the cheapest request it supports (no tokens are used). New panels avoid AIs that are down or slow.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Connect',
+            'health_col_ttfb': 'First byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Last error',
+            'health_col_checked': 'Checked',
+            'health_probe_all': 'Check All',
+            'health_probing': 'Checking…',
+            'health_interval': 'Re-check in background:',
+            'health_interval_off': 'Off',
+            'health_interval_minutes': 'Every {minutes} min',
+            'health_queue_title': 'Request queues (rate limits):',
+            'health_queue_line': '{provider}: {in_flight} running, {queued} waiting, average wait {wait}',
+            'health_queue_paused': 'paused for {seconds} s after HTTP 429',
+            'health_queue_empty': 'No requests yet.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Slow',
+            'health_status_down': 'Down',
+            'health_status_unknown': 'Not checked',
+            'avoid_known_questions': ' Ask something different from these questions: {questions}',
+            'stat_usage_title': 'Tokens',
+            'stat_usage_summary': '{input} in ({cached} cached) · {output} out ({reasoning} reasoning) · {answers} answers',
+            'stat_usage_cost': 'Estimated cost: {cost}',
+            'stat_usage_none': 'No token usage reported this month',
+            'stat_model_prices': 'Model Prices…',
+            'stat_model_prices_title': 'Model Prices',
+            'stat_model_prices_prompt': 'One model per line: "model: input, cached input, output" in price per 1M tokens. Cached input is optional. A name also matches models that start with it.',
+            'stat_model_prices_invalid': 'These lines could not be read and were ignored: {lines}',
+            'copy_performance_report': 'Copy Performance Report',
             'library_updating': 'Uppdaterar...',
             'library_status': 'Status: {count} böcker, senaste uppdatering: {time}',
             'library_status_empty': 'Status: Ingen data. Klicka på "Uppdatera biblioteksdata" för att starta.',
@@ -622,6 +725,12 @@ class SwedishTranslation(BaseTranslation):
             'stat_no_data_week': 'Ingen data denna vecka',
             'stat_no_data_month': 'Ingen data denna månad',
             'stat_data_not_enough': 'Inte tillräckligt med data',
+            'stat_breakdown': 'Fördelning',
+            'stat_breakdown_subtitle': 'Flest AI-frågor denna månad',
+            'stat_breakdown_ai': 'AI',
+            'stat_breakdown_provider': 'Leverantör',
+            'stat_breakdown_mode': 'Läge',
+            'stat_breakdown_book': 'Böcker',
             
             # Statistik användartitlar (baserat på antal förfrågningar)
             'stat_title_curious': 'Bläddrar',
@@ -68,7 +68,7 @@ class CantoneseTranslation(BaseTranslation):
             'multi_book_placeholder_hint': '用 {books_metadata} 代表書籍資料，{query} 代表用戶問題', # Use {books_metadata} for book information, {query} for user question
             'dynamic_fields_title': '動態字段參考', # Dynamic Fields Reference
             'dynamic_fields_subtitle': '可用字段同埋瑪麗·雪萊「科學怪人」嘅例子值', # Available fields and example values from "Frankenstein" by Mary Shelley
-            'dynamic_fields_examples': '<b>{title}</b> → 科學怪人<br><b>{author}</b> → 瑪麗·雪萊<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → 英文<br><b>{series}</b> → (無)<br><b>{query}</b> → 你嘅問題內容', # Example values from "Frankenstein" by Mary Shelley
+            'dynamic_fields_examples': '<b>{title}</b> → 科學怪人<br><b>{author}</b> → 瑪麗·雪萊<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → 英文<br><b>{series}</b> → (無)<br><b>{passages}</b> → 同問題有關嘅書籍段落<br><b>{query}</b> → 你嘅問題內容', # Example values from "Frankenstein" by Mary Shelley
             'reset_prompts': '將提示詞重設為預設值', # Reset Prompts to Default
             'reset_prompts_confirm': '你確定要將所有提示詞範本重設為預設值咩？呢個動作唔可以還原㗎。', # Are you sure you want to reset all prompt templates to their default values? This action cannot be undone.
             'unsaved_changes_title': '未儲存嘅更改', # Unsaved Changes
@@ -275,6 +275,9 @@ class CantoneseTranslation(BaseTranslation):
                 '進階用戶可以喺「插件配置 → General」啟用自訂提示詞長度限制。'
             ),
             'question_too_long_hint_custom': '你已啟用自訂提示詞長度限制。如果請求超時，請喺「插件配置 → General」調低限制，或者減少揀嘅書 / 問得具體啲。',
+            'question_too_long_detail_tokens': '提示詞太長（大約 {current} 個 token，{model} 嘅上限係 {limit} 個 token，超出 {over} 個）。你揀咗 {book_count} 本書。',
+            'question_too_long_detail_library_tokens': '提示詞太長（大約 {current} 個 token，{model} 嘅上限係 {limit} 個 token，超出 {over} 個）。你嘅書庫索引有 {book_count} 本書。',
+            'question_too_long_hint_model': '呢個上限係根據 {model} 嘅上下文窗口（{window} 個 token）計出嚟。請揀上下文窗口更大嘅模型，或者問更具體嘅問題。',
             'large_selection_dialog_title': '揀咗太多書',
             'large_selection_dialog_message': (
                 '你揀咗 {count} 本書。書庫級問題用 AI Search 更啱，'
@@ -336,8 +339,6 @@ class CantoneseTranslation(BaseTranslation):
 
             # 流式響應處理
             'stream_response_code': '串流回應狀態碼：{code}', # Stream response status code: {code}
-            'stream_continue_prompt': '請繼續你上一個答案，唔好重複已經講過嘅內容。', # Please continue your previous answer without repeating content already provided.
-            'stream_continue_code_blocks': '你上一個答案有啲未關閉嘅程式碼區塊。請繼續並完成呢啲程式碼區塊。', # Your previous answer had unclosed code blocks. Please continue and complete these code blocks.
             'stream_continue_parentheses': '你上一個答案有啲未關閉嘅括號。請繼續並確保所有括號都正確關閉。', # Your previous answer had unclosed parentheses. Please continue and ensure all parentheses are properly closed.
             'stream_continue_interrupted': '你上一個答案好似俾人打斷咗。請繼續完成你最後一個諗法或者解釋。', # Your previous answer seems to have been interrupted. Please continue completing your last thought or explanation.
             'stream_timeout_error': '串流傳輸 60 秒都無收到新內容，可能係連線問題。', # Stream transmission has not received new content for 60 seconds, possibly a connection issue.
@@ -524,6 +525,108 @@ class CantoneseTranslation(BaseTranslation):
             'library_enable_tooltip': '開咗之後，喺冇揀書嘅情況下可以用 AI 搜尋書庫',
             'library_update': '更新書庫資料',
             'library_update_tooltip': '喺書庫度提取書名同作者',
+            'library_dictionary_format': '用作者/系列代碼壓縮書目',
+            'library_dictionary_format_tooltip': '重複嘅作者同系列只列一次，再用短代碼引用，等大型書庫有更多書可以放入每次 AI 搜尋請求',
+            'library_semantic_search': '用本機嵌入做語義搜尋（Ollama）',
+            'library_semantic_search_tooltip': '用本機 Ollama 服務為每本書嘅書名、作者、標籤同簡介生成嵌入向量，淨係將最相關嘅書傳俾 AI。撳「更新圖書館資料」嗰陣會更新索引。',
+            'book_passages_indexing': '讀緊書嘅內文… {percent}%',
+            'book_passages_unavailable': '（冇可以讀取嘅書籍內文，需要 EPUB、AZW3 或者 TXT 格式。）',
+            'batch_ask_menu': '逐本書問',
+            'batch_ask_title': '逐本書問',
+            'batch_ask_question_placeholder': '要對每本揀咗嘅書問嘅問題',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': '並行請求數：',
+            'batch_ask_col_book': '書',
+            'batch_ask_col_status': '狀態',
+            'batch_ask_col_latency': '用時',
+            'batch_ask_col_answer': '回答',
+            'batch_ask_start': '開始',
+            'batch_ask_resume': '繼續',
+            'batch_ask_status_pending': '等緊',
+            'batch_ask_status_running': '進行緊…',
+            'batch_ask_status_done': '完成',
+            'batch_ask_status_failed': '失敗',
+            'batch_ask_summary': '完成 {done}，失敗 {failed}，仲有 {pending}',
+            'batch_ask_no_selection': '請先揀要問嘅書。',
+            'batch_ask_confirm_close': '批量提問仲做緊。要停咗佢嗎？之後可以繼續。',
+            'jobs_menu': '後台任務',
+            'jobs_title': '後台任務',
+            'jobs_new': '新任務…',
+            'jobs_new_title': '新後台任務',
+            'jobs_name': '名稱：',
+            'jobs_column': '寫入欄：',
+            'jobs_scope': '書：',
+            'jobs_scope_selected': '揀咗嘅書（{count}）',
+            'jobs_scope_library': '成個書庫（{count}）',
+            'jobs_question_placeholder': '例如：「列出呢本書最多三個類型，用逗號分隔，淨係答類型。」',
+            'jobs_no_columns': '請先喺 calibre 建立文字或者註解類型嘅自訂欄（偏好設定 → 加自訂欄）。',
+            'jobs_pause': '暫停',
+            'jobs_retry_failed': '重試失敗項',
+            'jobs_delete': '刪除',
+            'jobs_delete_confirm': '刪除呢個任務？已經寫入欄嘅值會保留。',
+            'jobs_col_name': '任務',
+            'jobs_col_column': '欄',
+            'jobs_col_progress': '進度',
+            'jobs_col_throughput': '本/分鐘',
+            'jobs_col_eta': '預計剩餘',
+            'jobs_failed_count': '（失敗 {count}）',
+            'jobs_status_paused': '暫停咗',
+            'jobs_status_cancelled': '取消咗',
+            'jobs_use_batch': '用供應商嘅批量介面',
+            'jobs_use_batch_tooltip': '將所有請求當一個離線批量提交。通常平一半又唔佔速率限制，不過結果可能要成 24 個鐘。',
+            'circuit_open_error': '{provider} 連續失敗咗 {failures} 次，暫停咗向佢發送請求。{seconds} 秒後會自動再試。',
+            'ollama_num_ctx_label': '上下文視窗 (num_ctx)',
+            'ollama_num_ctx_placeholder': '自動（按提示詞長度調整）',
+            'ollama_keep_alive_label': '模型常駐時間',
+            'ollama_tuning_desc': '上下文視窗留空就按每次提示詞嘅長度自動調整（唔超過模型上限）。常駐時間可以填 30m、2h 等；-1 即係一直常駐。',
+            'fallback_ai_menu': '回應慢嗰陣嘅後備 AI',
+            'fallback_ai_tooltip': '如果回答遲遲未開始，同一條問題會發畀呢個 AI，邊個先開始答就顯示邊個。',
+            'fallback_ai_none': '無',
+            'answered_by_fallback': '由 {ai} 回答（後備）',
+            'rate_limit_label': '客戶端限流',
+            'rate_limit_rpm_placeholder': '每分鐘請求數',
+            'rate_limit_tpm_placeholder': '每分鐘 token 數',
+            'rate_limit_concurrent_placeholder': '最大並發數',
+            'rate_limit_desc': '超出限額嘅請求會排隊等，而唔係因為限流錯誤而失敗。提問面板優先過背景任務。留空即係唔限制。',
+            'rate_limit_queued': '等緊 {provider} 限流（前面 {ahead} 個，已等 {seconds} 秒）',
+            'refresh_all_model_lists': 'Refresh All Model Lists',
+            'refresh_all_model_lists_tooltip': 'Check every configured AI for model list changes at once',
+            'refreshing_model_lists': 'Refreshing...',
+            'model_lists_updated': 'Updated: {names}',
+            'model_lists_unchanged': 'Unchanged: {names}',
+            'model_lists_failed': 'Failed:',
+            'health_button': 'AI Health…',
+            'health_title': 'AI Health',
+            'health_desc': 'Checks every configured AI at the same time with the cheapest request it supports (no tokens are used). New panels avoid AIs that are down or slow.',
+            'health_col_ai': 'AI',
+            'health_col_connect': 'Connect',
+            'health_col_ttfb': 'First byte',
+            'health_col_http': 'HTTP',
+            'health_col_error': 'Last error',
+            'health_col_checked': 'Checked',
+            'health_probe_all': 'Check All',
+            'health_probing': 'Checking…',
+            'health_interval': 'Re-check in background:',
+            'health_interval_off': 'Off',
+            'health_interval_minutes': 'Every {minutes} min',
+            'health_queue_title': 'Request queues (rate limits):',
+            'health_queue_line': '{provider}: {in_flight} running, {queued} waiting, average wait {wait}',
+            'health_queue_paused': 'paused for {seconds} s after HTTP 429',
+            'health_queue_empty': 'No requests yet.',
+            'health_status_ok': 'OK',
+            'health_status_slow': 'Slow',
+            'health_status_down': 'Down',
+            'health_status_unknown': 'Not checked',
+            'avoid_known_questions': ' Ask something different from these questions: {questions}',
+            'stat_usage_title': 'Token 用量',
+            'stat_usage_summary': '輸入 {input}（快取 {cached}）· 輸出 {output}（推理 {reasoning}）· {answers} 次回答',
+            'stat_usage_cost': '估算費用：{cost}',
+            'stat_usage_none': '本月冇提供商回報嘅 token 用量',
+            'stat_model_prices': '模型價格…',
+            'stat_model_prices_title': '模型價格',
+            'stat_model_prices_prompt': '每行一個模型："模型: 輸入, 快取輸入, 輸出"，單位係每百萬 token 嘅價格。快取輸入可以唔填。名稱都會配對以佢開頭嘅模型。',
+            'stat_model_prices_invalid': '以下幾行讀唔到，已經略過：{lines}',
+            'copy_performance_report': '複製效能報告',
             'library_updating': '更新緊...',
             'library_status': '狀態：有 {count} 本書，上次更新：{time}',
             'library_status_empty': '狀態：冇資料。請點擊「更新書庫資料」開始。',
@@ -583,6 +686,12 @@ class CantoneseTranslation(BaseTranslation):
             'stat_no_data_week': '暫時冇本週數據',
             'stat_no_data_month': '暫時冇本月數據',
             'stat_data_not_enough': '數據唔夠',
+            'stat_breakdown': '分類統計',
+            'stat_breakdown_subtitle': '本月 AI 詢問排行',
+            'stat_breakdown_ai': 'AI',
+            'stat_breakdown_provider': '服務商',
+            'stat_breakdown_mode': '模式',
+            'stat_breakdown_book': '書籍',
             
             # 統計用戶稱號（基於問詢次數）
             'stat_title_curious': '揭書人',
@@ -68,7 +68,7 @@ class SimplifiedChineseTranslation(BaseTranslation):
             'multi_book_placeholder_hint': '使用 {books_metadata} 表示书籍信息，{query} 表示用户问题',
             'dynamic_fields_title': '动态字段参考',
             'dynamic_fields_subtitle': '可用字段及示例值（以《弗兰肯斯坦》为例）',
-            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (无)<br><b>{query}</b> → 您的问题文本',
+            'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (无)<br><b>{passages}</b> → 与问题相关的书籍段落<br><b>{query}</b> → 您的问题文本',
             'reset_prompts': '重置提示词为默认值',
             'reset_prompts_confirm': '确定要将所有提示词模板重置为默认值吗？此操作无法撤销。',
             'unsaved_changes_title': '未保存的更改',
@@ -288,6 +288,9 @@ class SimplifiedChineseTranslation(BaseTranslation):
                 '您已启用自定义提示词长度限制。若请求超时，请在「插件配置 → General」中调低限制，'
                 '或减少选中书籍 / 提出更具体的问题。'
             ),
+            'question_too_long_detail_tokens': '提示词过长（约 {current} 个 token，{model} 的限制为 {limit} 个 token，超出 {over} 个）。您选中了 {book_count} 本书。',
+            'question_too_long_detail_library_tokens': '提示词过长（约 {current} 个 token，{model} 的限制为 {limit} 个 token，超出 {over} 个）。您的书库索引包含 {book_count} 本书。',
+            'question_too_long_hint_model': '该限制根据 {model} 的上下文窗口（{window} 个 token）计算。请选择上下文窗口更大的模型，或提出更具体的问题。',
             'large_selection_dialog_title': '选中书籍过多',
             'large_selection_dialog_message': (
                 '您选中了 {count} 本书。书库级问题更适合使用 AI Search，'
@@ -356,8 +359,6 @@ class SimplifiedChineseTranslation(BaseTranslation):
             
             # 流式响应处理
             'stream_response_code': '流式响应状态码：{code}',
-            'stream_continue_prompt': '请继续您的上一个回答，不要重复已提供的内容。',
-            'stream_continue_code_blocks': '您的上一个回答有未关闭的代码块。请继续并完成这些代码块。',
             'stream_continue_parentheses': '您的上一个回答有未关闭的括号。请继续并确保所有括号正确关闭。',
             'stream_continue_interrupted': '您的上一个回答似乎被中断了。请继续完成您的最后一个想法或解释。',
             'stream_timeout_error': '流式传输60秒没有收到新内容，可能是连接问题。',
@@ -553,6 +554,108 @@ class SimplifiedChineseTranslation(BaseTranslation):
             'library_enable_tooltip': '启用后，未选择书籍时可以使用AI搜索图书馆',
             'library_update': '更新图书馆数据',
             'library_update_tooltip': '为书库中全部书籍建立索引（书名与作者，紧凑格式，无数量上限）',
+            'library_dictionary_format': '用作者/系列代码压缩书目',
+            'library_dictionary_format_tooltip': '重复的作者和系列只列出一次并以短代码引用，让大型书库的更多书籍能放进每次 AI 搜索请求',
+            'library_semantic_search': '使用本地嵌入进行语义搜索（Ollama）',
+            'library_semantic_search_tooltip': '使用本地 Ollama 服务为每本书的书名、作者、标签和简介生成嵌入向量，只把最相关的书发送给 AI。点击“更新图书馆数据”时会更新索引。',
+            'book_passages_indexing': '正在读取书籍正文… {percent}%',
+            'book_passages_unavailable': '（没有可读取的书籍正文，需要 EPUB、AZW3 或 TXT 格式。）',
+            'batch_ask_menu': '逐书提问',
+            'batch_ask_title': '逐书提问',
+            'batch_ask_question_placeholder': '要对每本选中书籍提出的问题',
+            'batch_ask_ai': 'AI:',
+            'batch_ask_concurrency': '并行请求数：',
+            'batch_ask_col_book': '书籍',
+            'batch_ask_col_status': '状态',
+            'batch_ask_col_latency': '耗时',
+            'batch_ask_col_answer': '回答',
+            'batch_ask_start': '开始',
+            'batch_ask_resume': '继续',
+            'batch_ask_status_pending': '等待中',
+            'batch_ask_status_running': '进行中…',
+            'batch_ask_status_done': '完成',
+            'batch_ask_status_failed': '失败',
+            'batch_ask_summary': '完成 {done}，失败 {failed}，剩余 {pending}',
+            'batch_ask_no_selection': '请先选择要提问的书籍。',
+            'batch_ask_confirm_close': '批量提问仍在进行。要停止吗？之后可以继续。',
+            'jobs_menu': '后台任务',
+            'jobs_title': '后台任务',
+            'jobs_new': '新建任务…',
+            'jobs_new_title': '新建后台任务',
+            'jobs_name': '名称：',
+            'jobs_column': '写入列：',
+            'jobs_scope': '书籍：',
+            'jobs_scope_selected': '选中的书籍（{count}）',
+            'jobs_scope_library': '整个书库（{count}）',
+            'jobs_question_placeholder': '例如：“列出这本书最多三个类型，用逗号分隔，只回复类型。”',
+            'jobs_no_columns': '请先在 calibre 中创建文本或注释类型的自定义列（首选项 → 添加自定义列）。',
+            'jobs_pause': '暂停',
+            'jobs_retry_failed': '重试失败项',
+            'jobs_delete': '删除',
+            'jobs_delete_confirm': '删除此任务？已写入列中的值会保留。',
+            'jobs_col_name': '任务',
+            'jobs_col_column': '列',
+            'jobs_col_progress': '进度',
+            'jobs_col_throughput': '本/分钟',
+            'jobs_col_eta': '预计剩余',
+            'jobs_failed_count': '（失败 {count}）',
+            'jobs_status_paused': '已暂停',
+            'jobs_status_cancelled': '已取消',
+            'jobs_use_batch': '使用提供商的批量接口',
+            'jobs_use_batch_tooltip': '把所有请求作为一个离线批量提交。通常价格减半且不占用速率限制，但结果可能需要最多 24 小时。',
+            'circuit_open_error': '{provider} 连续失败 {failures} 次，已暂停向其发送请求。将在 {seconds} 秒后自动重试。',
+            'ollama_num_ctx_label': '上下文窗口 (num_ctx)',
+            'ollama_num_ctx_placeholder': '自动（按提示词长度调整）',
+            'ollama_keep_alive_label': '模型常驻时间',
+            'ollama_tuning_desc': '上下文窗口留空时按每次提示词的长度自动调整（不超过模型上限）。常驻时间可填写 30m、2h 等；-1 表示一直常驻。',
+            'fallback_ai_menu': '响应慢时的备用 AI',
+            'fallback_ai_tooltip': '如果回答迟迟没有开始，同一个问题会发给这个 AI，先开始回答的一方会被显示。',
+            'fallback_ai_none': '无',
+            'answered_by_fallback': '由 {ai} 回答（备用）',
+            'rate_limit_label': '客户端限流',
+            'rate_limit_rpm_placeholder': '每分钟请求数',
+            'rate_limit_tpm_placeholder': '每分钟 token 数',
+            'rate_limit_concurrent_placeholder': '最大并发数',
+            'rate_limit_desc': '超出限额的请求会排队等待，而不是因限流错误而失败。提问面板优先于后台任务。留空表示不限制。',
+            'rate_limit_queued': '等待 {provider} 限流（前面 {ahead} 个，已等 {seconds} 秒）',
+            'refresh_all_model_lists': '刷新所有模型列表',
+            'refresh_all_model_lists_tooltip': '同时检查所有已配置 AI 的模型列表是否有变化',
+            'refreshing_model_lists': '正在刷新...',
+            'model_lists_updated': '已更新：{names}',
+            'model_lists_unchanged': '无变化：{names}',
+            'model_lists_failed': '失败：',
+            'health_button': 'AI 健康状态…',
+            'health_title': 'AI 健康状态',
+            'health_desc': '使用每个 AI 最轻量的请求同时检查所有已配置的 AI（不消耗 token）。新面板会避开不可用或响应慢的 AI。',
+            'health_col_ai': 'AI',
+            'health_col_connect': '连接',
+            'health_col_ttfb': '首字节',
+            'health_col_http': 'HTTP',
+            'health_col_error': '最近的错误',
+            'health_col_checked': '检查时间',
+            'health_probe_all': '全部检查',
+            'health_probing': '正在检查…',
+            'health_interval': '后台定期检查：',
+            'health_interval_off': '关闭',
+            'health_interval_minutes': '每 {minutes} 分钟',
+            'health_queue_title': '请求队列（限流）：',
+            'health_queue_line': '{provider}：{in_flight} 个进行中，{queued} 个排队，平均等待 {wait}',
+            'health_queue_paused': '收到 HTTP 429，暂停 {seconds} 秒',
+            'health_queue_empty': '还没有请求。',
+            'health_status_ok': '正常',
+            'health_status_slow': '慢',
+            'health_status_down': '不可用',
+            'health_status_unknown': '未检查',
+            'avoid_known_questions': ' 请提出与以下问题不同的问题：{questions}',
+            'stat_usage_title': 'Token 用量',
+            'stat_usage_summary': '输入 {input}（缓存 {cached}）· 输出 {output}（推理 {reasoning}）· {answers} 次回答',
+            'stat_usage_cost': '估算费用：{cost}',
+            'stat_usage_none': '本月没有提供商报告的 token 用量',
+            'stat_model_prices': '模型价格…',
+            'stat_model_prices_title': '模型价格',
+            'stat_model_prices_prompt': '每行一个模型："模型: 输入, 缓存输入, 输出"，单位为每百万 token 的价格。缓存输入可以省略。名称也匹配以它开头的模型。',
+            'stat_model_prices_invalid': '以下行无法识别，已忽略：{lines}',
+            'copy_performance_report': '复制性能报告',
             'library_updating': '更新中...',
             'library_status': '状态：{count} 本书，最后更新：{time}',
             'library_status_empty': '状态：无数据。点击“更新图书馆数据”开始。',
@@ -614,6 +717,12 @@ class SimplifiedChineseTranslation(BaseTranslation):
             'stat_no_data_week': '暂无本周数据',
             'stat_no_data_month': '暂无本月数据',
             'stat_data_not_enough': '数据不足',
+            'stat_breakdown': '分类统计',
+            'stat_breakdown_subtitle': '本月 AI 询问排行',
+            'stat_breakdown_ai': 'AI',
+            'stat_breakdown_provider': '服务商',
+            'stat_breakdown_mode': '模式',
+            'stat_breakdown_book': '书籍',
             
             # 统计用户称号（基于问询次数）
             'stat_title_curious': '翻书人',
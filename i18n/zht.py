@@ -68,7 +68,7 @@ class TraditionalChineseTranslation(BaseTranslation):
         'multi_book_placeholder_hint': '使用 {books_metadata} 表示書籍資訊，{query} 表示使用者問題',
         'dynamic_fields_title': '動態欄位參考',
         'dynamic_fields_subtitle': '可用欄位及範例值（以《弗蘭肯斯坦》為例）',
-        'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (無)<br><b>{query}</b> → 您的問題文本',
+        'dynamic_fields_examples': '<b>{title}</b> → Frankenstein<br><b>{author}</b> → Mary Shelley<br><b>{publisher}</b> → Lackington, Hughes, Harding, Mavor & Jones<br><b>{pubyear}</b> → 1818<br><b>{language}</b> → English<br><b>{series}</b> → (無)<br><b>{passages}</b> → 與問題相關的書籍段落<br><b>{query}</b> → 您的問題文本',
         'reset_prompts': '重設為預設提示詞',
         'reset_prompts_confirm': '確定要將所有提示詞範本重設為預設值嗎？此操作無法撤銷。',
         'unsaved_changes_title': '未儲存的更改',
@@ -273,6 +273,9 @@ class TraditionalChineseTranslation(BaseTranslation):
             '您已啟用自訂提示詞長度限制。若請求逾時，請在「外掛程式配置 → General」中調低限制，'
             '或減少選取書籍 / 提出更具體的問題。'
         ),
+        'question_too_long_detail_tokens': '提示詞過長（約 {current} 個 token，{model} 的限制為 {limit} 個 token，超出 {over} 個）。您選中了 {book_count} 本書。',
+        'question_too_long_detail_library_tokens': '提示詞過長（約 {current} 個 token，{model} 的限制為 {limit} 個 token，超出 {over} 個）。您的書庫索引包含 {book_count} 本書。',
+        'question_too_long_hint_model': '該限制根據 {model} 的上下文視窗（{window} 個 token）計算。請選擇上下文視窗更大的模型，或提出更具體的問題。',
         'large_selection_dialog_title': '選取書籍過多',
         'large_selection_dialog_message': (
             '您選取了 {count} 本書。書庫級問題更適合使用 AI Search，'
@@ -375,8 +378,6 @@ class TraditionalChineseTranslation(BaseTranslation):
         
         # 流式響應處理
         'stream_response_code': '流式響應狀態碼：{code}',
-        'stream_continue_prompt': '請繼續您的上一個回答，不要重複已提供的內容。',
-        'stream_continue_code_blocks': '您的上一個回答有未關閉的程式碼塊。請繼續並完成這些程式碼塊。',
         'stream_continue_parentheses': '您的上一個回答有未關閉的括號。請繼續並確保所有括號正確關閉。',
         'stream_continue_interrupted': '您的上一個回答似乎被中斷了。請繼續完成您的最後一個想法或解釋。',
         'stream_timeout_error': '流式傳輸60秒沒有收到新內容，可能是連線問題。',
@@ -552,6 +553,108 @@ class TraditionalChineseTranslation(BaseTranslation):
         'library_enable_tooltip': '啟用後，在未選取書籍的情況下可以使用 AI 搜尋書庫',
         'library_update': '更新書庫資料',
         'library_update_tooltip': '從書庫中提取書名與作者',
+        'library_dictionary_format': '用作者/系列代碼壓縮書目',
+        'library_dictionary_format_tooltip': '重複的作者和系列只列出一次並以短代碼引用，讓大型書庫的更多書籍能放進每次 AI 搜尋請求',
+        'library_semantic_search': '使用本機嵌入進行語義搜尋（Ollama）',
+        'library_semantic_search_tooltip': '使用本機 Ollama 服務為每本書的書名、作者、標籤和簡介產生嵌入向量，只把最相關的書傳送給 AI。點擊「更新圖書館資料」時會更新索引。',
+        'book_passages_indexing': '正在讀取書籍內文… {percent}%',
+        'book_passages_unavailable': '（沒有可讀取的書籍內文，需要 EPUB、AZW3 或 TXT 格式。）',
+        'batch_ask_menu': '逐書提問',
+        'batch_ask_title': '逐書提問',
+        'batch_ask_question_placeholder': '要對每本選取書籍提出的問題',
+        'batch_ask_ai': 'AI:',
+        'batch_ask_concurrency': '並行請求數：',
+        'batch_ask_col_book': '書籍',
+        'batch_ask_col_status': '狀態',
+        'batch_ask_col_latency': '耗時',
+        'batch_ask_col_answer': '回答',
+        'batch_ask_start': '開始',
+        'batch_ask_resume': '繼續',
+        'batch_ask_status_pending': '等待中',
+        'batch_ask_status_running': '進行中…',
+        'batch_ask_status_done': '完成',
+        'batch_ask_status_failed': '失敗',
+        'batch_ask_summary': '完成 {done}，失敗 {failed}，剩餘 {pending}',
+        'batch_ask_no_selection': '請先選擇要提問的書籍。',
+        'batch_ask_confirm_close': '批次提問仍在進行。要停止嗎？之後可以繼續。',
+        'jobs_menu': '背景工作',
+        'jobs_title': '背景工作',
+        'jobs_new': '新增工作…',
+        'jobs_new_title': '新增背景工作',
+        'jobs_name': '名稱：',
+        'jobs_column': '寫入欄位：',
+        'jobs_scope': '書籍：',
+        'jobs_scope_selected': '選取的書籍（{count}）',
+        'jobs_scope_library': '整個書庫（{count}）',
+        'jobs_question_placeholder': '例如：「列出這本書最多三個類型，用逗號分隔，只回覆類型。」',
+        'jobs_no_columns': '請先在 calibre 中建立文字或註解類型的自訂欄位（偏好設定 → 新增自訂欄位）。',
+        'jobs_pause': '暫停',
+        'jobs_retry_failed': '重試失敗項目',
+        'jobs_delete': '刪除',
+        'jobs_delete_confirm': '刪除此工作？已寫入欄位的值會保留。',
+        'jobs_col_name': '工作',
+        'jobs_col_column': '欄位',
+        'jobs_col_progress': '進度',
+        'jobs_col_throughput': '本/分鐘',
+        'jobs_col_eta': '預計剩餘',
+        'jobs_failed_count': '（失敗 {count}）',
+        'jobs_status_paused': '已暫停',
+        'jobs_status_cancelled': '已取消',
+        'jobs_use_batch': '使用供應商的批次介面',
+        'jobs_use_batch_tooltip': '將所有請求作為一個離線批次提交。通常價格減半且不佔用速率限制，但結果可能需要最多 24 小時。',
+        'circuit_open_error': '{provider} 連續失敗 {failures} 次，已暫停向其發送請求。將在 {seconds} 秒後自動重試。',
+        'ollama_num_ctx_label': '上下文視窗 (num_ctx)',
+        'ollama_num_ctx_placeholder': '自動（依提示詞長度調整）',
+        'ollama_keep_alive_label': '模型常駐時間',
+        'ollama_tuning_desc': '上下文視窗留空時依每次提示詞的長度自動調整（不超過模型上限）。常駐時間可填寫 30m、2h 等；-1 表示一直常駐。',
+        'fallback_ai_menu': '回應慢時的備用 AI',
+        'fallback_ai_tooltip': '如果回答遲遲沒有開始，同一個問題會發給這個 AI，先開始回答的一方會被顯示。',
+        'fallback_ai_none': '無',
+        'answered_by_fallback': '由 {ai} 回答（備用）',
+        'rate_limit_label': '用戶端限流',
+        'rate_limit_rpm_placeholder': '每分鐘請求數',
+        'rate_limit_tpm_placeholder': '每分鐘 token 數',
+        'rate_limit_concurrent_placeholder': '最大並行數',
+        'rate_limit_desc': '超出限額的請求會排隊等待，而不是因限流錯誤而失敗。提問面板優先於背景任務。留空表示不限制。',
+        'rate_limit_queued': '等待 {provider} 限流（前面 {ahead} 個，已等 {seconds} 秒）',
+        'refresh_all_model_lists': '重新整理所有模型列表',
+        'refresh_all_model_lists_tooltip': '同時檢查所有已設定 AI 的模型列表是否有變化',
+        'refreshing_model_lists': '正在重新整理...',
+        'model_lists_updated': '已更新：{names}',
+        'model_lists_unchanged': '無變化：{names}',
+        'model_lists_failed': '失敗：',
+        'health_button': 'AI 健康狀態…',
+        'health_title': 'AI 健康狀態',
+        'health_desc': '使用每個 AI 最輕量的請求同時檢查所有已設定的 AI（不消耗 token）。新面板會避開無法使用或回應慢的 AI。',
+        'health_col_ai': 'AI',
+        'health_col_connect': '連線',
+        'health_col_ttfb': '首位元組',
+        'health_col_http': 'HTTP',
+        'health_col_error': '最近的錯誤',
+        'health_col_checked': '檢查時間',
+        'health_probe_all': '全部檢查',
+        'health_probing': '正在檢查…',
+        'health_interval': '背景定期檢查：',
+        'health_interval_off': '關閉',
+        'health_interval_minutes': '每 {minutes} 分鐘',
+        'health_queue_title': '請求佇列（限流）：',
+        'health_queue_line': '{provider}：{in_flight} 個進行中，{queued} 個排隊，平均等待 {wait}',
+        'health_queue_paused': '收到 HTTP 429，暫停 {seconds} 秒',
+        'health_queue_empty': '還沒有請求。',
+        'health_status_ok': '正常',
+        'health_status_slow': '慢',
+        'health_status_down': '無法使用',
+        'health_status_unknown': '未檢查',
+        'avoid_known_questions': ' 請提出與以下問題不同的問題：{questions}',
+        'stat_usage_title': 'Token 用量',
+        'stat_usage_summary': '輸入 {input}（快取 {cached}）· 輸出 {output}（推理 {reasoning}）· {answers} 次回答',
+        'stat_usage_cost': '估算費用：{cost}',
+        'stat_usage_none': '本月沒有提供商回報的 token 用量',
+        'stat_model_prices': '模型價格…',
+        'stat_model_prices_title': '模型價格',
+        'stat_model_prices_prompt': '每行一個模型："模型: 輸入, 快取輸入, 輸出"，單位為每百萬 token 的價格。快取輸入可以省略。名稱也會比對以它開頭的模型。',
+        'stat_model_prices_invalid': '以下行無法識別，已忽略：{lines}',
+        'copy_performance_report': '複製效能報告',
         'library_updating': '更新中...',
         'library_status': '狀態：共有 {count} 本書，上次更新時間：{time}',
         'library_status_empty': '狀態：尚無資料。請點擊「更新書庫資料」開始。',
@@ -613,6 +716,12 @@ class TraditionalChineseTranslation(BaseTranslation):
         'stat_no_data_week': '暫無本週資料',
         'stat_no_data_month': '暫無本月資料',
         'stat_data_not_enough': '資料不足',
+        'stat_breakdown': '分類統計',
+        'stat_breakdown_subtitle': '本月 AI 詢問排行',
+        'stat_breakdown_ai': 'AI',
+        'stat_breakdown_provider': '服務商',
+        'stat_breakdown_mode': '模式',
+        'stat_breakdown_book': '書籍',
         
         # 統計用戶稱號（基於問詢次數）
         'stat_title_curious': '翻書人',
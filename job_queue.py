@@ -0,0 +1,617 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Durable background job queue for library-wide AI tasks that write to custom columns."""
+
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .batch_ask import ProviderLimiter, provider_of
+    from .provider_batch import (BATCH_RUNNING, MAX_BATCH_REQUESTS, book_id_from_custom_id,
+                                 custom_id_for, poll_delay)
+except ImportError:
+    from batch_ask import ProviderLimiter, provider_of
+    from provider_batch import (BATCH_RUNNING, MAX_BATCH_REQUESTS, book_id_from_custom_id,
+                                custom_id_for, poll_delay)
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DIR_NAME = 'ask_ai_plugin_jobs'
+QUEUE_FILE_NAME = 'jobs.sqlite'
+
+# 任务状态
+JOB_ACTIVE = 'active'
+JOB_PAUSED = 'paused'
+JOB_DONE = 'done'
+JOB_CANCELLED = 'cancelled'
+
+# 子任务状态
+TASK_PENDING = 'pending'
+TASK_RUNNING = 'running'
+TASK_DONE = 'done'
+TASK_FAILED = 'failed'
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE = 5.0
+BACKOFF_CAP = 600.0
+# 吞吐量按最近多少秒内完成的子任务计算
+THROUGHPUT_WINDOW = 600.0
+# 空闲时轮询间隔（秒）
+POLL_INTERVAL = 2.0
+# 多值列（标签类）回答的最大条目数
+MAX_MULTIPLE_VALUES = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    library_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    template TEXT NOT NULL DEFAULT '',
+    ai_id TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    is_multiple INTEGER NOT NULL DEFAULT 0,
+    use_batch INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    error TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id INTEGER NOT NULL,
+    book_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    written INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    finished REAL,
+    batch_id TEXT,
+    PRIMARY KEY (job_id, book_id)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (job_id, status, next_attempt);
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    job_id INTEGER NOT NULL,
+    submitted REAL NOT NULL,
+    next_poll REAL NOT NULL,
+    polls INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# 旧版本数据库缺少的列：(表, 列, 定义)
+_MIGRATIONS = (
+    ('jobs', 'use_batch', 'INTEGER NOT NULL DEFAULT 0'),
+    ('tasks', 'batch_id', 'TEXT'),
+)
+
+
+def backoff_delay(attempts, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """第 attempts 次失败后的重试等待秒数：指数增长并加入随机抖动"""
+    delay = min(cap, base * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def coerce_value(answer, is_multiple):
+    """把 AI 回答转换为自定义列的值；多值列按逗号、分号或换行拆分"""
+    text = (answer or '').strip()
+    if not is_multiple:
+        return text
+    values = []
+    for part in text.replace(';', ',').replace('\n', ',').split(','):
+        value = part.strip().strip('-•*"\'').strip()
+        if value and value not in values:
+            values.append(value)
+    return values[:MAX_MULTIPLE_VALUES]
+
+
+class JobQueue:
+    """SQLite 任务队列；所有方法线程安全"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(_SCHEMA)
+            self._migrate()
+            self._conn.commit()
+
+    def _migrate(self):
+        for table, column, definition in _MIGRATIONS:
+            columns = {row['name'] for row in self._conn.execute(f'PRAGMA table_info({table})')}
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    # ----- 任务 -----
+
+    def create_job(self, name, library_id, question, ai_id, column_name, book_ids,
+                   template='', is_multiple=False, use_batch=False):
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO jobs (name, library_id, question, template, ai_id, column_name, is_multiple,'
+                ' use_batch, status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (name, library_id, question, template or '', ai_id, column_name, int(bool(is_multiple)),
+                 int(bool(use_batch)), JOB_ACTIVE, now, now),
+            )
+            job_id = cursor.lastrowid
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO tasks (job_id, book_id, status) VALUES (?, ?, ?)',
+                [(job_id, int(book_id), TASK_PENDING) for book_id in book_ids],
+            )
+        logger.info(f"创建后台任务 {job_id}: {name}, {len(book_ids)} 本书 -> {column_name}")
+        return job_id
+
+    def get_job(self, job_id):
+        rows = self._query('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        return rows[0] if rows else None
+
+    def list_jobs(self, library_id=None):
+        if library_id is None:
+            return self._query('SELECT * FROM jobs ORDER BY id DESC')
+        return self._query('SELECT * FROM jobs WHERE library_id = ? ORDER BY id DESC', (library_id,))
+
+    def set_job_status(self, job_id, status, error=''):
+        self._execute('UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?',
+                      (status, error, time.time(), job_id))
+        if status == JOB_ACTIVE:
+            # 暂停期间最后一个子任务已完成：没有子任务会再触发完成检查
+            self._finish_job_if_complete(job_id)
+
+    def set_job_batch(self, job_id, use_batch):
+        self._execute('UPDATE jobs SET use_batch = ?, updated = ? WHERE id = ?',
+                      (int(bool(use_batch)), time.time(), job_id))
+
+    def delete_job(self, job_id):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM batches WHERE job_id = ?', (job_id,))
+            self._conn.execute('DELETE FROM tasks WHERE job_id = ?', (job_id,))
+            self._conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def retry_failed(self, job_id):
+        """把最终失败的子任务重新排队"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE tasks SET status = ?, attempts = 0, next_attempt = 0, error = ? WHERE job_id = ? AND status = ?',
+                (TASK_PENDING, '', job_id, TASK_FAILED),
+            )
+            self._conn.execute('UPDATE jobs SET status = ?, updated = ? WHERE id = ?',
+                               (JOB_ACTIVE, time.time(), job_id))
+        # 没有失败的子任务时任务仍是已完成
+        self._finish_job_if_complete(job_id)
+
+    # ----- 子任务 -----
+
+    def recover(self):
+        """
+        启动时调用：上次退出时仍在运行的子任务重新排队（检查点恢复）；
+        已提交到提供商批量接口的子任务保持运行中，由执行器继续轮询该批量
+        """
+        cursor = self._execute('UPDATE tasks SET status = ? WHERE status = ? AND batch_id IS NULL',
+                               (TASK_PENDING, TASK_RUNNING))
+        if cursor.rowcount:
+            logger.info(f"恢复 {cursor.rowcount} 个中断的后台子任务")
+        return cursor.rowcount
+
+    def claim_tasks(self, library_id, limit, now=None, batch=False):
+        """
+        领取最多 limit 个到期的待处理子任务并标记为运行中
+
+        :param batch: True 时只领取批量模式任务的子任务，否则只领取逐条请求的子任务
+        """
+        if limit <= 0:
+            return []
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                'SELECT t.job_id, t.book_id, t.attempts, j.ai_id FROM tasks t JOIN jobs j ON j.id = t.job_id'
+                ' WHERE j.library_id = ? AND j.status = ? AND j.use_batch = ? AND t.status = ? AND t.next_attempt <= ?'
+                ' ORDER BY j.id, t.book_id LIMIT ?',
+                (library_id, JOB_ACTIVE, int(bool(batch)), TASK_PENDING, now, limit),
+            ).fetchall()
+            tasks = [dict(row) for row in rows]
+            self._conn.executemany(
+                'UPDATE tasks SET status = ? WHERE job_id = ? AND book_id = ?',
+                [(TASK_RUNNING, task['job_id'], task['book_id']) for task in tasks],
+            )
+        return tasks
+
+    def complete_task(self, job_id, book_id, result):
+        self._execute(
+            'UPDATE tasks SET status = ?, result = ?, written = 0, error = ?, finished = ? WHERE job_id = ? AND book_id = ?',
+            (TASK_DONE, result, '', time.time(), job_id, book_id),
+        )
+        self._finish_job_if_complete(job_id)
+
+    def fail_task(self, job_id, book_id, error, max_attempts=DEFAULT_MAX_ATTEMPTS, now=None):
+        """记录失败；未达到最大次数时按退避时间重新排队，返回是否还会重试"""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            row = self._conn.execute('SELECT attempts FROM tasks WHERE job_id = ? AND book_id = ?',
+                                     (job_id, book_id)).fetchone()
+            attempts = (row['attempts'] if row else 0) + 1
+            will_retry = attempts < max_attempts
+            self._conn.execute(
+                'UPDATE tasks SET status = ?, attempts = ?, next_attempt = ?, error = ?, finished = ?, batch_id = NULL'
+                ' WHERE job_id = ? AND book_id = ?',
+                (TASK_PENDING if will_retry else TASK_FAILED, attempts,
+                 now + backoff_delay(attempts) if will_retry else 0, str(error),
+                 None if will_retry else now, job_id, book_id),
+            )
+        if not will_retry:
+            self._finish_job_if_complete(job_id)
+        return will_retry
+
+    def requeue_task(self, job_id, book_id):
+        """放回队列而不计入失败次数（例如执行器停止时）"""
+        self._execute('UPDATE tasks SET status = ?, batch_id = NULL WHERE job_id = ? AND book_id = ? AND status = ?',
+                      (TASK_PENDING, job_id, book_id, TASK_RUNNING))
+
+    def _finish_job_if_complete(self, job_id):
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT COUNT(*) FROM tasks WHERE job_id = ? AND status IN (?, ?)',
+                (job_id, TASK_PENDING, TASK_RUNNING),
+            ).fetchone()
+            if row[0] == 0:
+                self._conn.execute('UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?',
+                                   (JOB_DONE, time.time(), job_id, JOB_ACTIVE))
+
+    # ----- 提供商批量 -----
+
+    def record_batch(self, job_id, batch_id, book_ids, next_poll, now=None):
+        """记录已提交的批量；其子任务保持运行中直到批量结束"""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO batches (batch_id, job_id, submitted, next_poll, polls)'
+                               ' VALUES (?, ?, ?, ?, 0)', (batch_id, job_id, now, next_poll))
+            self._conn.executemany('UPDATE tasks SET batch_id = ? WHERE job_id = ? AND book_id = ?',
+                                   [(batch_id, job_id, book_id) for book_id in book_ids])
+
+    def due_batches(self, library_id, now=None):
+        now = time.time() if now is None else now
+        return self._query(
+            'SELECT b.*, j.ai_id FROM batches b JOIN jobs j ON j.id = b.job_id'
+            ' WHERE j.library_id = ? AND j.status != ? AND b.next_poll <= ? ORDER BY b.next_poll',
+            (library_id, JOB_CANCELLED, now),
+        )
+
+    def schedule_poll(self, batch_id, next_poll):
+        self._execute('UPDATE batches SET next_poll = ?, polls = polls + 1 WHERE batch_id = ?', (next_poll, batch_id))
+
+    def batch_book_ids(self, batch_id):
+        """批量中仍在等待结果的书籍"""
+        rows = self._query('SELECT book_id FROM tasks WHERE batch_id = ? AND status = ?', (batch_id, TASK_RUNNING))
+        return [row['book_id'] for row in rows]
+
+    def close_batch(self, batch_id):
+        self._execute('DELETE FROM batches WHERE batch_id = ?', (batch_id,))
+
+    # ----- 写入自定义列 -----
+
+    def take_unwritten(self, library_id, limit=200):
+        """已完成但尚未写入 calibre 的结果：{job_id: (job, [(book_id, result)])}"""
+        rows = self._query(
+            'SELECT t.job_id, t.book_id, t.result FROM tasks t JOIN jobs j ON j.id = t.job_id'
+            ' WHERE j.library_id = ? AND j.status != ? AND t.status = ? AND t.written = 0'
+            ' ORDER BY t.job_id, t.finished LIMIT ?',
+            (library_id, JOB_CANCELLED, TASK_DONE, limit),
+        )
+        batches = {}
+        for row in rows:
+            if row['job_id'] not in batches:
+                batches[row['job_id']] = (self.get_job(row['job_id']), [])
+            batches[row['job_id']][1].append((row['book_id'], row['result']))
+        return batches
+
+    def mark_written(self, job_id, book_ids):
+        with self._lock, self._conn:
+            self._conn.executemany('UPDATE tasks SET written = 1 WHERE job_id = ? AND book_id = ?',
+                                   [(job_id, book_id) for book_id in book_ids])
+
+    # ----- 统计 -----
+
+    def job_stats(self, job_id, now=None, window=THROUGHPUT_WINDOW):
+        """
+        :return: {'total', 'done', 'failed', 'pending', 'running', 'written',
+                  'per_minute', 'eta_seconds'}；吞吐量不足以估算时 eta_seconds 为 None
+        """
+        now = time.time() if now is None else now
+        stats = {'total': 0, TASK_DONE: 0, TASK_FAILED: 0, TASK_PENDING: 0, TASK_RUNNING: 0}
+        for row in self._query('SELECT status, COUNT(*) AS n FROM tasks WHERE job_id = ? GROUP BY status', (job_id,)):
+            stats[row['status']] = row['n']
+            stats['total'] += row['n']
+        written = self._query('SELECT COUNT(*) AS n FROM tasks WHERE job_id = ? AND written = 1', (job_id,))
+        stats['written'] = written[0]['n']
+
+        recent = self._query(
+            'SELECT COUNT(*) AS n, MIN(finished) AS first FROM tasks'
+            ' WHERE job_id = ? AND status = ? AND finished >= ?',
+            (job_id, TASK_DONE, now - window),
+        )[0]
+        per_minute = 0.0
+        if recent['n']:
+            elapsed = max(60.0, now - recent['first'])
+            per_minute = recent['n'] * 60.0 / elapsed
+        stats['per_minute'] = per_minute
+        remaining = stats[TASK_PENDING] + stats[TASK_RUNNING]
+        stats['eta_seconds'] = remaining * 60.0 / per_minute if per_minute and remaining else None
+        return stats
+
+
+class JobExecutor:
+    """后台执行器：领取子任务，在线程池中调用 AI，并把结果写回队列"""
+
+    def __init__(self, queue, library_id, ask_fn, build_prompt_fn, max_workers=DEFAULT_MAX_WORKERS,
+                 limiter=None, max_attempts=DEFAULT_MAX_ATTEMPTS, on_change=None, batch_api_fn=None,
+                 batch_size=MAX_BATCH_REQUESTS):
+        """
+        :param ask_fn: (prompt, ai_id) -> 回答文本；在工作线程中调用
+        :param build_prompt_fn: (book_id, job) -> 提示词
+        :param on_change: 无参数，子任务状态变化后调用（工作线程）
+        :param batch_api_fn: ai_id -> ProviderBatchAPI 或 None（提供商不支持批量接口）
+        """
+        self.queue = queue
+        self.library_id = library_id
+        self.ask_fn = ask_fn
+        self.build_prompt_fn = build_prompt_fn
+        self.max_workers = max(1, int(max_workers))
+        self.limiter = limiter or ProviderLimiter()
+        self.max_attempts = max_attempts
+        self.on_change = on_change
+        self.batch_api_fn = batch_api_fn
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._thread = None
+        self._batch_thread = None
+        self._pool = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='AskAIJobWorker')
+        self._thread = threading.Thread(target=self._loop, name='AskAIJobQueue', daemon=True)
+        self._thread.start()
+        if self.batch_api_fn is not None:
+            self._batch_thread = threading.Thread(target=self._batch_loop, name='AskAIJobBatches', daemon=True)
+            self._batch_thread.start()
+
+    def wake(self):
+        """有新任务或任务恢复时立即领取，不等待轮询"""
+        self._wake_event.set()
+
+    def stop(self, wait=False):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+        if wait:
+            for thread in (self._thread, self._batch_thread):
+                if thread is not None:
+                    thread.join()
+
+    def _loop(self):
+        logger.info(f"后台任务执行器启动: library={self.library_id}, 并发 {self.max_workers}")
+        while not self._stop_event.is_set():
+            self._wake_event.clear()
+            free = 0
+            while self._slots.acquire(blocking=False):
+                free += 1
+            try:
+                tasks = self.queue.claim_tasks(self.library_id, free)
+            except Exception as e:
+                logger.error(f"领取后台子任务失败: {str(e)}")
+                tasks = []
+            for _ in range(free - len(tasks)):
+                self._slots.release()
+            for task in tasks:
+                try:
+                    self._pool.submit(self._run_task, task)
+                except RuntimeError:
+                    # 执行器已停止，线程池不再接受任务
+                    self.queue.requeue_task(task['job_id'], task['book_id'])
+                    self._slots.release()
+            if not tasks:
+                self._wake_event.wait(POLL_INTERVAL)
+        logger.info("后台任务执行器停止")
+
+    def _notify_change(self):
+        if self.on_change:
+            try:
+                self.on_change()
+            except Exception:
+                pass
+
+    # ----- 提供商批量 -----
+
+    def _batch_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.submit_batches()
+                self.poll_batches()
+            except Exception as e:
+                logger.error(f"处理提供商批量失败: {str(e)}", exc_info=True)
+            self._stop_event.wait(POLL_INTERVAL)
+
+    def _batch_api(self, ai_id):
+        try:
+            return self.batch_api_fn(ai_id)
+        except Exception as e:
+            logger.warning(f"创建批量接口失败 ({ai_id}): {str(e)}")
+            return None
+
+    def submit_batches(self, now=None):
+        """把批量模式任务的待处理子任务提交为提供商批量"""
+        tasks = self.queue.claim_tasks(self.library_id, self.batch_size, now=now, batch=True)
+        by_job = {}
+        for task in tasks:
+            by_job.setdefault(task['job_id'], []).append(task['book_id'])
+        for job_id, book_ids in by_job.items():
+            job = self.queue.get_job(job_id)
+            api = self._batch_api(job['ai_id'])
+            if api is None:
+                # 提供商不支持批量接口：改为逐条并发请求
+                logger.info(f"后台任务 {job_id} 的 AI 不支持批量接口，改为逐条请求")
+                self.queue.set_job_batch(job_id, False)
+                for book_id in book_ids:
+                    self.queue.requeue_task(job_id, book_id)
+                self.wake()
+                continue
+            items = []
+            for book_id in book_ids:
+                try:
+                    items.append((custom_id_for(book_id), self.build_prompt_fn(book_id, job)))
+                except Exception as e:
+                    self.queue.fail_task(job_id, book_id, e, self.max_attempts)
+            if not items:
+                continue
+            try:
+                batch_id = api.submit(items)
+            except Exception as e:
+                logger.warning(f"提交批量失败 (job={job_id}): {str(e)}")
+                for custom_id, _ in items:
+                    self.queue.fail_task(job_id, book_id_from_custom_id(custom_id), e, self.max_attempts)
+                continue
+            submitted = [book_id_from_custom_id(custom_id) for custom_id, _ in items]
+            current = time.time() if now is None else now
+            self.queue.record_batch(job_id, batch_id, submitted, current + poll_delay(0), now=current)
+            self._notify_change()
+
+    def poll_batches(self, now=None):
+        """轮询到期的批量；结束后逐条读取结果写回队列"""
+        for batch in self.queue.due_batches(self.library_id, now):
+            if self._stop_event.is_set():
+                return
+            batch_id, job_id = batch['batch_id'], batch['job_id']
+            current = time.time() if now is None else now
+            api = self._batch_api(batch['ai_id'])
+            if api is None:
+                self.queue.schedule_poll(batch_id, current + poll_delay(batch['polls'] + 1))
+                continue
+            try:
+                status = api.status(batch_id)
+            except Exception as e:
+                logger.warning(f"查询批量状态失败 ({batch_id}): {str(e)}")
+                self.queue.schedule_poll(batch_id, current + poll_delay(batch['polls'] + 1))
+                continue
+            if status['state'] == BATCH_RUNNING:
+                self.queue.schedule_poll(batch_id, current + poll_delay(batch['polls'] + 1))
+                continue
+            try:
+                for custom_id, text, error in api.iter_results(batch_id):
+                    book_id = book_id_from_custom_id(custom_id)
+                    if book_id is None:
+                        continue
+                    if text and text.strip():
+                        self.queue.complete_task(job_id, book_id, text)
+                    else:
+                        self.queue.fail_task(job_id, book_id, error or 'empty answer', self.max_attempts)
+            except Exception as e:
+                # 下载结果失败：保留批量，稍后重新读取（已写入的结果不会重复计数）
+                logger.warning(f"读取批量结果失败 ({batch_id}): {str(e)}")
+                self.queue.schedule_poll(batch_id, current + poll_delay(batch['polls'] + 1))
+                continue
+            for book_id in self.queue.batch_book_ids(batch_id):
+                self.queue.fail_task(job_id, book_id, 'missing from batch results', self.max_attempts)
+            self.queue.close_batch(batch_id)
+            logger.info(f"批量 {batch_id} 已结束: {status}")
+            self._notify_change()
+
+    # ----- 逐条请求 -----
+
+    def _run_task(self, task):
+        job_id, book_id = task['job_id'], task['book_id']
+        try:
+            if self._stop_event.is_set():
+                self.queue.requeue_task(job_id, book_id)
+                return
+            job = self.queue.get_job(job_id)
+            if job is None:
+                return
+            with self.limiter.slot(provider_of(job['ai_id']), self._stop_event):
+                if self._stop_event.is_set():
+                    self.queue.requeue_task(job_id, book_id)
+                    return
+                try:
+                    prompt = self.build_prompt_fn(book_id, job)
+                    answer = self.ask_fn(prompt, job['ai_id'])
+                    if not (answer or '').strip():
+                        raise ValueError('empty answer')
+                except Exception as e:
+                    will_retry = self.queue.fail_task(job_id, book_id, e, self.max_attempts)
+                    logger.warning(f"后台子任务失败 (job={job_id}, book_id={book_id}, "
+                                   f"{'稍后重试' if will_retry else '不再重试'}): {str(e)}")
+                    return
+            self.queue.complete_task(job_id, book_id, answer)
+        except Exception as e:
+            logger.error(f"后台子任务异常 (job={job_id}, book_id={book_id}): {str(e)}", exc_info=True)
+        finally:
+            self._slots.release()
+            self._wake_event.set()
+            self._notify_change()
+
+
+_queue = None
+
+
+def _queue_path(base_dir=None):
+    if base_dir is None:
+        from calibre.utils.config import config_dir
+        base_dir = os.path.join(config_dir, 'plugins', QUEUE_DIR_NAME)
+    return os.path.join(base_dir, QUEUE_FILE_NAME)
+
+
+def get_job_queue(base_dir=None):
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(_queue_path(base_dir))
+    return _queue
+
+
+def has_active_jobs(base_dir=None):
+    """是否有未完成的任务（任意书库）；从未创建过任务时不创建目录和数据库文件"""
+    if _queue is not None:
+        return bool(_queue._query('SELECT 1 FROM jobs WHERE status = ? LIMIT 1', (JOB_ACTIVE,)))
+    path = _queue_path(base_dir)
+    if not os.path.exists(path):
+        return False
+    try:
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=30)
+        try:
+            return conn.execute('SELECT 1 FROM jobs WHERE status = ? LIMIT 1', (JOB_ACTIVE,)).fetchone() is not None
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"读取后台任务数据库失败: {str(e)}")
+        return False
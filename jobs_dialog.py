@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Background jobs panel, new-job dialog and the service that runs the job queue in calibre."""
+
+import logging
+import threading
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QLineEdit,
+                             QTextEdit, QComboBox, QCheckBox, QPushButton, QTableWidget, QTableWidgetItem,
+                             QHeaderView, QAbstractItemView, QDialogButtonBox, QMessageBox)
+
+from .api import create_model
+from .plugin_prefs import get_prefs, build_configured_ai_entries
+from .i18n import get_translation
+from .batch_ask import ProviderLimiter, DEFAULT_PROVIDER_CONCURRENCY
+from .job_queue import (JobExecutor, get_job_queue, coerce_value,
+                        JOB_ACTIVE, JOB_PAUSED, JOB_DONE, JOB_CANCELLED,
+                        DEFAULT_MAX_WORKERS, DEFAULT_MAX_ATTEMPTS)
+from .widgets import apply_button_style
+from .ui_constants import SPACING_SMALL, SPACING_MEDIUM, MARGIN_MEDIUM
+
+logger = logging.getLogger(__name__)
+
+# 结果写入 calibre 的间隔（毫秒）和每批数量
+FLUSH_INTERVAL_MS = 5000
+FLUSH_BATCH_SIZE = 200
+REFRESH_INTERVAL_MS = 2000
+# 可写入的自定义列类型
+WRITABLE_DATATYPES = ('text', 'comments')
+
+
+def _library_id(db):
+    api = getattr(db, 'new_api', db)
+    return str(getattr(api, 'library_id', '') or getattr(db, 'library_id', '') or '')
+
+
+def writable_columns(db):
+    """[(lookup_name, 显示名称, is_multiple)]：可写入 AI 结果的自定义列"""
+    field_metadata = getattr(db, 'field_metadata', None) or db.new_api.field_metadata
+    columns = []
+    for key in sorted(field_metadata.custom_field_keys()):
+        meta = field_metadata[key]
+        if meta.get('datatype') not in WRITABLE_DATATYPES:
+            continue
+        columns.append((key, f"{meta.get('name') or key} ({key})", bool(meta.get('is_multiple'))))
+    return columns
+
+
+class JobService(QObject):
+    """在 calibre 中运行后台任务队列；结果由界面线程批量写入自定义列"""
+
+    changed = pyqtSignal()
+
+    def __init__(self, gui):
+        super().__init__(gui)
+        self.gui = gui
+        self.queue = get_job_queue()
+        self.queue.recover()
+        self.executor = None
+        self._local = threading.local()
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush_results)
+
+    @property
+    def library_id(self):
+        return _library_id(self.gui.current_db)
+
+    def has_active_jobs(self):
+        return any(job['status'] == JOB_ACTIVE for job in self.queue.list_jobs(self.library_id))
+
+    def start(self):
+        """启动执行器（已在运行且仍是当前书库时不做任何事）"""
+        library_id = self.library_id
+        if self.executor is not None and self.executor.running and self.executor.library_id == library_id:
+            self.executor.wake()
+            return
+        self.stop()
+        prefs = get_prefs()
+        self.executor = JobExecutor(
+            self.queue, library_id, self._ask, self._build_prompt,
+            max_workers=prefs.get('job_queue_max_workers', DEFAULT_MAX_WORKERS),
+            limiter=ProviderLimiter(prefs.get('job_queue_provider_concurrency', DEFAULT_PROVIDER_CONCURRENCY)),
+            max_attempts=prefs.get('job_queue_max_attempts', DEFAULT_MAX_ATTEMPTS),
+            batch_api_fn=self._batch_api,
+        )
+        self.executor.start()
+        self._flush_timer.start()
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.stop()
+            self.executor = None
+        self._flush_timer.stop()
+
+    def library_changed(self):
+        """切换书库：停止旧书库的执行器，新书库有未完成任务时继续执行"""
+        self.stop()
+        if self.has_active_jobs():
+            self.start()
+
+    def shutdown(self):
+        self.stop()
+        try:
+            self.flush_results()
+        except Exception as e:
+            logger.warning(f"退出时写入后台任务结果失败: {str(e)}")
+
+    # ----- 工作线程 -----
+
+    def _ask(self, prompt, ai_id):
+        # APIClient 在切换模型时会修改自身状态，每个工作线程使用独立实例
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            from .api import APIClient
+            from .rate_limiter import PRIORITY_BACKGROUND
+            api = APIClient(priority=PRIORITY_BACKGROUND)
+            self._local.api = api
+        return api.ask(prompt, lang_code=get_prefs().get('language', 'en'), model_id=ai_id)
+
+    def _batch_api(self, ai_id):
+        model = create_model(ai_id)
+        if model is None or not model.supports_batch():
+            return None
+        return model.create_batch_api()
+
+    def _build_prompt(self, book_id, job):
+        from .book_metadata import load_books
+        from .utils import build_single_book_prompt
+        from .prompts_widget import apply_prompt_enhancements
+        from .ui import AskDialog
+        books, _ = load_books(self.gui.current_db, [book_id])
+        if not books:
+            raise ValueError(f'book {book_id} not found')
+        language_map = AskDialog.LANGUAGE_MAP
+        prompt = build_single_book_prompt(
+            books[0], job['question'], job['template'],
+            get_translation(get_prefs().get('language', 'en')),
+            language_name_fn=lambda code: language_map.get(code.lower().strip(), code),
+        )
+        return apply_prompt_enhancements(prompt)
+
+    # ----- 界面线程 -----
+
+    def flush_results(self):
+        """把已完成的结果批量写入自定义列"""
+        from .book_metadata import book_exists
+        db = self.gui.current_db
+        api = db.new_api
+        columns = {key: is_multiple for key, _, is_multiple in writable_columns(db)}
+        refreshed = set()
+        for job_id, (job, items) in self.queue.take_unwritten(self.library_id, FLUSH_BATCH_SIZE).items():
+            column = job['column_name']
+            if column not in columns:
+                logger.error(f"后台任务 {job_id} 的目标列 {column} 不存在，任务已停止")
+                self.queue.set_job_status(job_id, JOB_PAUSED, error=f'column {column} not found')
+                continue
+            values = {book_id: coerce_value(result, columns[column])
+                      for book_id, result in items if book_exists(db, book_id)}
+            if values:
+                api.set_field(column, values)
+                refreshed.update(values)
+            self.queue.mark_written(job_id, [book_id for book_id, _ in items])
+            logger.info(f"后台任务 {job_id}: 写入 {len(values)} 本书到 {column}")
+        if refreshed:
+            try:
+                self.gui.library_view.model().refresh_ids(list(refreshed))
+            except Exception as e:
+                logger.warning(f"刷新书库视图失败: {str(e)}")
+        if self.executor is not None and not self.has_active_jobs():
+            # 所有任务已完成：最后一批结果写入后停止执行器
+            if not self.queue.take_unwritten(self.library_id, 1):
+                self.stop()
+        self.changed.emit()
+
+
+_service = None
+
+
+def get_job_service(gui):
+    global _service
+    if _service is None:
+        _service = JobService(gui)
+    return _service
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return '—'
+    seconds = int(seconds)
+    if seconds < 3600:
+        return f'{seconds // 60}:{seconds % 60:02d}'
+    return f'{seconds // 3600}h {seconds % 3600 // 60:02d}m'
+
+
+class NewJobDialog(QDialog):
+    """新建后台任务：问题、AI、目标自定义列和范围"""
+
+    def __init__(self, gui, selected_ids, parent=None):
+        super().__init__(parent or gui)
+        self.gui = gui
+        self.prefs = get_prefs()
+        self.i18n = get_translation(self.prefs.get('language', 'en'))
+        self.selected_ids = list(selected_ids)
+        self.setWindowTitle(self.i18n.get('jobs_new_title', 'New Background Job'))
+        self.setMinimumWidth(520)
+
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.name_edit = QLineEdit(self)
+        form.addRow(self.i18n.get('jobs_name', 'Name:'), self.name_edit)
+
+        self.column_combo = QComboBox(self)
+        for key, label, is_multiple in writable_columns(gui.current_db):
+            self.column_combo.addItem(label, (key, is_multiple))
+        form.addRow(self.i18n.get('jobs_column', 'Write to column:'), self.column_combo)
+
+        self.ai_combo = QComboBox(self)
+        for ai_id, display_text, _, is_default in build_configured_ai_entries(
+                self.prefs.get('models', {}), selected_model=self.prefs.get('selected_model', ''), i18n=self.i18n):
+            self.ai_combo.addItem(display_text, ai_id)
+            if is_default:
+                self.ai_combo.setCurrentIndex(self.ai_combo.count() - 1)
+        form.addRow(self.i18n.get('batch_ask_ai', 'AI:'), self.ai_combo)
+
+        self.batch_checkbox = QCheckBox(self.i18n.get('jobs_use_batch', 'Use the provider batch API'), self)
+        self.batch_checkbox.setToolTip(self.i18n.get('jobs_use_batch_tooltip',
+            'Submit all requests as one offline batch. Usually half the price and no rate-limit pressure, '
+            'but results can take up to 24 hours.'))
+        self.ai_combo.currentIndexChanged.connect(self._update_batch_checkbox)
+        self._update_batch_checkbox()
+        form.addRow('', self.batch_checkbox)
+
+        self.scope_combo = QComboBox(self)
+        if self.selected_ids:
+            self.scope_combo.addItem(self.i18n.get('jobs_scope_selected', 'Selected books ({count})').format(
+                count=len(self.selected_ids)), 'selected')
+        self.scope_combo.addItem(self.i18n.get('jobs_scope_library', 'Whole library ({count})').format(
+            count=len(gui.current_db.new_api.all_book_ids())), 'library')
+        form.addRow(self.i18n.get('jobs_scope', 'Books:'), self.scope_combo)
+        layout.addLayout(form)
+
+        self.question_edit = QTextEdit(self)
+        self.question_edit.setAcceptRichText(False)
+        self.question_edit.setPlaceholderText(self.i18n.get('jobs_question_placeholder',
+            'e.g. "List up to three genres for this book, separated by commas. Reply with the genres only."'))
+        layout.addWidget(self.question_edit, 1)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, self)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def _update_batch_checkbox(self):
+        model = create_model(self.ai_combo.currentData()) if self.ai_combo.currentData() else None
+        supported = bool(model is not None and model.supports_batch())
+        self.batch_checkbox.setEnabled(supported)
+        if not supported:
+            self.batch_checkbox.setChecked(False)
+
+    def accept(self):
+        question = self.question_edit.toPlainText().strip()
+        if not question or self.column_combo.currentData() is None or not self.ai_combo.currentData():
+            return
+        column, is_multiple = self.column_combo.currentData()
+        if self.scope_combo.currentData() == 'selected':
+            book_ids = self.selected_ids
+        else:
+            book_ids = sorted(self.gui.current_db.new_api.all_book_ids())
+        name = self.name_edit.text().strip() or question.splitlines()[0][:60]
+        get_job_queue().create_job(
+            name, _library_id(self.gui.current_db), question, self.ai_combo.currentData(), column, book_ids,
+            template=self.prefs.get('template', ''), is_multiple=is_multiple,
+            use_batch=self.batch_checkbox.isChecked(),
+        )
+        super().accept()
+
+
+class JobsDialog(QDialog):
+    """后台任务面板：进度、吞吐量和预计剩余时间"""
+
+    COLUMNS = ('name', 'column', 'progress', 'throughput', 'eta', 'status')
+
+    def __init__(self, gui, selected_ids=()):
+        super().__init__(gui)
+        self.gui = gui
+        self.selected_ids = list(selected_ids)
+        self.service = get_job_service(gui)
+        self.queue = self.service.queue
+        self.i18n = get_translation(get_prefs().get('language', 'en'))
+        self.setWindowTitle(self.i18n.get('jobs_title', 'Background Jobs'))
+        self.setMinimumSize(720, 360)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(SPACING_MEDIUM)
+        layout.setContentsMargins(MARGIN_MEDIUM, MARGIN_MEDIUM, MARGIN_MEDIUM, MARGIN_MEDIUM)
+
+        self.table = QTableWidget(0, len(self.COLUMNS), self)
+        self.table.setHorizontalHeaderLabels([
+            self.i18n.get('jobs_col_name', 'Job'),
+            self.i18n.get('jobs_col_column', 'Column'),
+            self.i18n.get('jobs_col_progress', 'Progress'),
+            self.i18n.get('jobs_col_throughput', 'Books/min'),
+            self.i18n.get('jobs_col_eta', 'ETA'),
+            self.i18n.get('batch_ask_col_status', 'Status'),
+        ])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.itemSelectionChanged.connect(self._update_buttons)
+        layout.addWidget(self.table, 1)
+
+        buttons = QHBoxLayout()
+        buttons.setSpacing(SPACING_SMALL)
+        self.new_button = QPushButton(self.i18n.get('jobs_new', 'New Job…'), self)
+        self.new_button.clicked.connect(self.new_job)
+        self.pause_button = QPushButton(self.i18n.get('jobs_pause', 'Pause'), self)
+        self.pause_button.clicked.connect(lambda: self._set_status(JOB_PAUSED))
+        self.resume_button = QPushButton(self.i18n.get('batch_ask_resume', 'Resume'), self)
+        self.resume_button.clicked.connect(lambda: self._set_status(JOB_ACTIVE))
+        self.retry_button = QPushButton(self.i18n.get('jobs_retry_failed', 'Retry Failed'), self)
+        self.retry_button.clicked.connect(self.retry_failed)
+        self.delete_button = QPushButton(self.i18n.get('jobs_delete', 'Delete'), self)
+        self.delete_button.clicked.connect(self.delete_job)
+        for button in (self.new_button, self.pause_button, self.resume_button, self.retry_button, self.delete_button):
+            apply_button_style(button, min_width=80)
+            buttons.addWidget(button)
+        buttons.addStretch(1)
+        layout.addLayout(buttons)
+
+        self._jobs = []
+        self._failed = {}
+        self.refresh()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start(REFRESH_INTERVAL_MS)
+
+    def _status_text(self, job):
+        text = {
+            JOB_ACTIVE: self.i18n.get('batch_ask_status_running', 'Running…'),
+            JOB_PAUSED: self.i18n.get('jobs_status_paused', 'Paused'),
+            JOB_DONE: self.i18n.get('batch_ask_status_done', 'Done'),
+            JOB_CANCELLED: self.i18n.get('jobs_status_cancelled', 'Cancelled'),
+        }.get(job['status'], job['status'])
+        if job.get('error'):
+            text = f"{text} ({job['error']})"
+        return text
+
+    def refresh(self):
+        selected = self._selected_job_id()
+        self._jobs = self.queue.list_jobs(self.service.library_id)
+        self._failed = {}
+        self.table.setRowCount(len(self._jobs))
+        for row, job in enumerate(self._jobs):
+            stats = self.queue.job_stats(job['id'])
+            self._failed[job['id']] = stats['failed']
+            progress = f"{stats['done'] + stats['failed']} / {stats['total']}"
+            if stats['failed']:
+                progress += ' ' + self.i18n.get('jobs_failed_count', '({count} failed)').format(count=stats['failed'])
+            cells = (
+                job['name'], job['column_name'], progress,
+                f"{stats['per_minute']:.1f}" if job['status'] == JOB_ACTIVE else '',
+                _format_duration(stats['eta_seconds']) if job['status'] == JOB_ACTIVE else '',
+                self._status_text(job),
+            )
+            for col, text in enumerate(cells):
+                self.table.setItem(row, col, QTableWidgetItem(text))
+            if job['id'] == selected:
+                self.table.selectRow(row)
+        self._update_buttons()
+
+    def _selected_job_id(self):
+        rows = self.table.selectionModel().selectedRows() if self.table.selectionModel() else []
+        if rows and rows[0].row() < len(self._jobs):
+            return self._jobs[rows[0].row()]['id']
+        return None
+
+    def _selected_job(self):
+        job_id = self._selected_job_id()
+        return next((job for job in self._jobs if job['id'] == job_id), None)
+
+    def _update_buttons(self):
+        job = self._selected_job()
+        status = job['status'] if job else None
+        self.pause_button.setEnabled(status == JOB_ACTIVE)
+        self.resume_button.setEnabled(status == JOB_PAUSED)
+        self.retry_button.setEnabled(job is not None and status != JOB_CANCELLED
+                                     and self._failed.get(job['id'], 0) > 0)
+        self.delete_button.setEnabled(job is not None)
+
+    def new_job(self):
+        d = NewJobDialog(self.gui, self.selected_ids, parent=self)
+        if not d.column_combo.count():
+            QMessageBox.information(self, self.i18n.get('jobs_title', 'Background Jobs'), self.i18n.get(
+                'jobs_no_columns', 'Create a text or comments custom column in calibre first (Preferences → Add your own columns).'))
+            return
+        if d.exec_() == QDialog.Accepted:
+            self.service.start()
+            self.refresh()
+
+    def _set_status(self, status):
+        job = self._selected_job()
+        if job is None:
+            return
+        self.queue.set_job_status(job['id'], status)
+        if status == JOB_ACTIVE:
+            self.service.start()
+        self.refresh()
+
+    def retry_failed(self):
+        job = self._selected_job()
+        if job is None:
+            return
+        self.queue.retry_failed(job['id'])
+        self.service.start()
+        self.refresh()
+
+    def delete_job(self):
+        job = self._selected_job()
+        if job is None:
+            return
+        reply = QMessageBox.question(
+            self, self.i18n.get('jobs_title', 'Background Jobs'),
+            self.i18n.get('jobs_delete_confirm',
+                          'Delete this job? Values already written to the column are kept.'),
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return
+        self.queue.set_job_status(job['id'], JOB_CANCELLED)
+        self.service.flush_results()
+        self.queue.delete_job(job['id'])
+        self.refresh()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Atomic JSON file writes and versioned JSON loading for the plugin's on-disk stores."""
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_text(path, text):
+    """先写临时文件再替换，读取方不会看到写了一半的文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, **dump_kwargs))
+
+
+def load_versioned_json(path, version):
+    """
+    读取 ``{'version': version, ...}`` 格式的文件
+
+    :return: 文件内容；文件不存在、损坏或版本不一致时返回 None
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.error(f"读取 {os.path.basename(path)} 失败: {e}")
+        return None
+    if not isinstance(data, dict) or data.get('version') != version:
+        logger.warning(f"{os.path.basename(path)} 的版本不一致，重新开始")
+        return None
+    return data
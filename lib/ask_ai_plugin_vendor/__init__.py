@@ -29,16 +29,14 @@ _vendor_dir = os.path.dirname(os.path.abspath(__file__))
 if _vendor_dir not in sys.path:
     sys.path.insert(0, _vendor_dir)
 
-# 导入所有 vendor 库，确保它们被加载到正确的命名空间
-from . import requests
-from . import urllib3
-from . import certifi
-from . import charset_normalizer
-from . import idna
-from . import bleach
-from . import markdown2
-
-# 移除临时路径（可选，但为了完全隔离，我们保留它）
-# sys.path.remove(_vendor_dir)
-
+# 各 vendor 库按需导入（PEP 562）：只用到 requests 时不会连带加载
+# bleach（html5lib、tinycss2）和 markdown2。
+# ``from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import bleach`` 会直接导入子模块。
 __all__ = ['requests', 'urllib3', 'certifi', 'charset_normalizer', 'idna', 'bleach', 'markdown2']
+
+
+def __getattr__(name):
+    if name in __all__:
+        import importlib
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""On-disk model list cache with per-provider TTL and conditional revalidation."""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .json_store import atomic_write_text, load_versioned_json
+except ImportError:
+    from json_store import atomic_write_text, load_versioned_json
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE_NAME = 'ask_ai_plugin_model_catalog.json'
+_CATALOG_VERSION = 1
+
+DEFAULT_TTL = 24 * 3600
+# 列表变化较快或在本地的提供商使用更短的有效期
+PROVIDER_TTLS = {
+    'openrouter': 6 * 3600,
+    'ollama': 5 * 60,
+    'custom': 3600,
+}
+MAX_REFRESH_WORKERS = 6
+
+STATUS_FRESH = 'fresh'
+STATUS_NOT_MODIFIED = 'not_modified'
+STATUS_UPDATED = 'updated'
+
+# 条件请求的结果：models 为 None 表示服务端返回 304（未变化）
+FetchResult = namedtuple('FetchResult', ['models', 'etag', 'last_modified'])
+
+
+def catalog_key(provider_id, api_base_url='', credential=''):
+    """缓存键：提供商加上 API 地址和 Key 的指纹（Key 不以明文保存）"""
+    fingerprint_source = f'{api_base_url or ""}\n{credential or ""}'
+    if not fingerprint_source.strip():
+        return provider_id
+    digest = hashlib.sha256(fingerprint_source.encode('utf-8')).hexdigest()[:12]
+    return f'{provider_id}:{digest}'
+
+
+def provider_ttl(provider_id):
+    return PROVIDER_TTLS.get(provider_id, DEFAULT_TTL)
+
+
+class ModelCatalog:
+    """模型列表缓存（线程安全；每次更新后原子写入磁盘）"""
+
+    def __init__(self, path=None, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._entries = self._load()
+
+    # ----- persistence -----
+
+    def _load(self):
+        data = load_versioned_json(self.path, _CATALOG_VERSION)
+        return data.get('entries', {}) if data else {}
+
+    def flush(self):
+        if not self.path:
+            return
+        with self._lock:
+            payload = json.dumps({'version': _CATALOG_VERSION, 'entries': self._entries}, ensure_ascii=False)
+        try:
+            atomic_write_text(self.path, payload)
+        except Exception as e:
+            logger.error(f"保存模型列表缓存失败: {e}")
+
+    # ----- entries -----
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return dict(entry) if entry else None
+
+    def models(self, key):
+        """缓存的模型列表（无论是否过期）；没有缓存时返回 None"""
+        entry = self.get(key)
+        return list(entry['models']) if entry else None
+
+    def is_fresh(self, key):
+        entry = self.get(key)
+        if not entry:
+            return False
+        return self._clock() - entry.get('validated_at', 0) < entry.get('ttl', DEFAULT_TTL)
+
+    def put(self, key, models, etag=None, last_modified=None):
+        provider_id = key.split(':', 1)[0]
+        now = self._clock()
+        with self._lock:
+            self._entries[key] = {
+                'models': list(models),
+                'fetched_at': now,
+                'validated_at': now,
+                'ttl': provider_ttl(provider_id),
+                'etag': etag,
+                'last_modified': last_modified,
+            }
+        self.flush()
+
+    def mark_validated(self, key, etag=None, last_modified=None):
+        """服务端确认列表未变化（304）：延长有效期"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry['validated_at'] = self._clock()
+            entry['etag'] = etag or entry.get('etag')
+            entry['last_modified'] = last_modified or entry.get('last_modified')
+        self.flush()
+
+    def invalidate_provider(self, provider_id):
+        """删除某个提供商的所有缓存条目"""
+        with self._lock:
+            keys = [key for key in self._entries if key == provider_id or key.startswith(provider_id + ':')]
+            for key in keys:
+                del self._entries[key]
+        if keys:
+            self.flush()
+
+    # ----- refresh -----
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def refresh(self, key, fetch_fn, force=False):
+        """
+        按需刷新一个条目（同一个键同时只有一个刷新请求）
+
+        :param fetch_fn: (etag, last_modified) -> FetchResult
+        :param force: True 时忽略有效期，仍然使用条件请求
+        :return: (models, status)，status 为 STATUS_FRESH / STATUS_NOT_MODIFIED / STATUS_UPDATED
+        :raises: fetch_fn 的异常
+        """
+        with self._key_lock(key):
+            entry = self.get(key)
+            if entry and not force and self.is_fresh(key):
+                return list(entry['models']), STATUS_FRESH
+            etag = entry.get('etag') if entry else None
+            last_modified = entry.get('last_modified') if entry else None
+            result = fetch_fn(etag, last_modified)
+            if result.models is None and entry:
+                self.mark_validated(key, result.etag, result.last_modified)
+                logger.info(f"[模型列表] {key.split(':', 1)[0]}: 未变化（304），继续使用缓存")
+                return list(entry['models']), STATUS_NOT_MODIFIED
+            if result.models is None:
+                # 没有缓存却收到 304（没有发送校验头时不应发生）
+                raise ValueError('model list not modified but nothing cached')
+            self.put(key, result.models, result.etag, result.last_modified)
+            return list(result.models), STATUS_UPDATED
+
+    def refresh_many(self, fetchers, force=False, max_workers=MAX_REFRESH_WORKERS, on_result=None):
+        """
+        并行刷新多个条目
+
+        :param fetchers: {key: fetch_fn}
+        :param on_result: (key, ok, models 或错误信息, status) 每个条目完成时调用（在工作线程中）
+        :return: {key: (ok, models 或错误信息, status)}
+        """
+        results = {}
+
+        def run(key, fetch_fn):
+            try:
+                models, status = self.refresh(key, fetch_fn, force=force)
+                outcome = (True, models, status)
+            except Exception as e:
+                logger.warning(f"[模型列表] {key.split(':', 1)[0]} 刷新失败: {str(e)[:200]}")
+                outcome = (False, str(e), None)
+            results[key] = outcome
+            if on_result is not None:
+                on_result(key, *outcome)
+
+        if not fetchers:
+            return results
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(fetchers))),
+                                thread_name_prefix='AskAIModelList') as executor:
+            for key, fetch_fn in fetchers.items():
+                executor.submit(run, key, fetch_fn)
+        return results
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_model_catalog(base_dir=None):
+    """进程内共享的模型列表缓存"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            if base_dir is None:
+                from calibre.utils.config import config_dir
+                base_dir = os.path.join(config_dir, 'plugins')
+            _catalog = ModelCatalog(os.path.join(base_dir, CATALOG_FILE_NAME))
+        return _catalog
@@ -2,33 +2,53 @@
 AI 模型模块初始化文件
 
 此包包含所有 AI 模型的实现，包括基础模型抽象类和具体模型实现。
+
+i18n 导入 models.base 时会执行本文件，而插件随 calibre 启动时就会加载 i18n。
+各提供商模块会导入 requests，因此按需加载：通过 AIModelFactory 创建某个提供商的模型，
+或访问 ``models.GrokModel`` 等名称时才导入对应的模块。
 """
 
+import importlib
+
 from .base import BaseAIModel, AIModelFactory
-from .grok import GrokModel
-from .gemini import GeminiModel
-from .deepseek import DeepseekModel
-from .custom import CustomModel
-from .openai import OpenAIModel
-from .anthropic import AnthropicModel
-from .nvidia import NvidiaModel
-from .nvidia_free import NvidiaFreeModel
-from .openrouter import OpenRouterModel
-from .perplexity import PerplexityModel
-from .ollama import OllamaModel
-
-# 注册模型到工厂类
-AIModelFactory.register_model('grok', GrokModel)
-AIModelFactory.register_model('gemini', GeminiModel)
-AIModelFactory.register_model('deepseek', DeepseekModel)
-AIModelFactory.register_model('custom', CustomModel)
-AIModelFactory.register_model('openai', OpenAIModel)
-AIModelFactory.register_model('anthropic', AnthropicModel)
-AIModelFactory.register_model('nvidia', NvidiaModel)
-AIModelFactory.register_model('nvidia_free', NvidiaFreeModel)
-AIModelFactory.register_model('openrouter', OpenRouterModel)
-AIModelFactory.register_model('perplexity', PerplexityModel)
-AIModelFactory.register_model('ollama', OllamaModel)
+
+# 模型名称 -> (模块, 类名)
+PROVIDER_MODELS = {
+    'grok': ('grok', 'GrokModel'),
+    'gemini': ('gemini', 'GeminiModel'),
+    'deepseek': ('deepseek', 'DeepseekModel'),
+    'custom': ('custom', 'CustomModel'),
+    'openai': ('openai', 'OpenAIModel'),
+    'anthropic': ('anthropic', 'AnthropicModel'),
+    'nvidia': ('nvidia', 'NvidiaModel'),
+    'nvidia_free': ('nvidia_free', 'NvidiaFreeModel'),
+    'openrouter': ('openrouter', 'OpenRouterModel'),
+    'perplexity': ('perplexity', 'PerplexityModel'),
+    'ollama': ('ollama', 'OllamaModel'),
+}
+
+
+def _load_model_class(module_name, class_name):
+    return getattr(importlib.import_module(f'.{module_name}', __name__), class_name)
+
+
+def _register_models(model_name=None):
+    """注册模型到工厂类；给出已知的 model_name 时只导入该提供商"""
+    names = [model_name] if model_name in PROVIDER_MODELS else PROVIDER_MODELS
+    for name in names:
+        module_name, class_name = PROVIDER_MODELS[name]
+        AIModelFactory.register_model(name, _load_model_class(module_name, class_name))
+
+
+AIModelFactory.set_loader(_register_models)
+
+
+def __getattr__(name):
+    for module_name, class_name in PROVIDER_MODELS.values():
+        if class_name == name:
+            return _load_model_class(module_name, class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # 导出公共接口
 __all__ = ['BaseAIModel', 'AIModelFactory', 'GrokModel', 'GeminiModel', 'DeepseekModel', 'CustomModel', 'OpenAIModel', 'AnthropicModel', 'NvidiaModel', 'NvidiaFreeModel', 'OpenRouterModel', 'PerplexityModel', 'OllamaModel']
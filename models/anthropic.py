@@ -10,7 +10,9 @@ from typing import Dict, Any, Optional
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 
 from .base import BaseAIModel
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_anthropic
 
 
 class AnthropicModel(BaseAIModel):
@@ -97,12 +99,7 @@ class AnthropicModel(BaseAIModel):
         data = {
             "model": self.config.get('model', self.DEFAULT_MODEL),
             "max_tokens": kwargs.get('max_tokens', 4096),  # Required field for Anthropic
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            "messages": self.build_chat_messages(prompt, history=kwargs.get('history')),
             "temperature": kwargs.get('temperature', 0.7)
         }
         
@@ -110,6 +107,16 @@ class AnthropicModel(BaseAIModel):
         if system_message:
             data['system'] = system_message
         
+        # Multi-turn: mark the end of the stable prefix (system + previous turns)
+        # so follow-up questions are served from Anthropic's prompt cache
+        if kwargs.get('history'):
+            last_turn = data['messages'][-2]
+            last_turn['content'] = [{
+                "type": "text",
+                "text": last_turn['content'],
+                "cache_control": {"type": "ephemeral"}
+            }]
+        
         # Add streaming support (only add if explicitly set to True)
         if kwargs.get('stream', False):
             data['stream'] = True
@@ -132,6 +139,7 @@ class AnthropicModel(BaseAIModel):
         # Check if using streaming
         use_stream = kwargs.get('stream', self.config.get('enable_streaming', True))
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
         
         try:
             # If using streaming
@@ -144,7 +152,7 @@ class AnthropicModel(BaseAIModel):
                 api_url = self.build_api_url(self.config['api_base_url'], '/messages')
                 
                 try:
-                    with requests.post(
+                    with get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -170,6 +178,9 @@ class AnthropicModel(BaseAIModel):
                                                     stream_callback(chunk_text)
                                                     chunk_count += 1
                                                     last_chunk_time = time.time()
+                                        elif line_data.get('type') in ('message_start', 'message_delta'):
+                                            # Input tokens arrive in message_start, the output count in message_delta
+                                            self._record_usage(from_anthropic(line_data))
                                         elif line_data.get('type') == 'message_stop':
                                             break
                                     except json.JSONDecodeError as je:
@@ -198,7 +209,7 @@ class AnthropicModel(BaseAIModel):
             # Non-streaming mode
             else:
                 api_url = self.build_api_url(self.config['api_base_url'], '/messages')
-                response = requests.post(
+                response = get_session().post(
                     api_url,
                     headers=headers,
                     json=data,
@@ -207,6 +218,7 @@ class AnthropicModel(BaseAIModel):
                 response.raise_for_status()
                 
                 result = response.json()
+                self._record_usage(from_anthropic(result))
                 if 'content' in result and result['content']:
                     # Anthropic returns content as array of content blocks
                     return result['content'][0]['text']
@@ -241,6 +253,28 @@ class AnthropicModel(BaseAIModel):
         """
         pass
     
+    def supports_batch(self) -> bool:
+        """
+        Anthropic Message Batches is available for bulk background jobs
+        
+        :return: True
+        """
+        return True
+    
+    def create_batch_api(self):
+        """
+        Create the Message Batches client used by background jobs
+        
+        :return: AnthropicBatchAPI instance
+        """
+        from ..provider_batch import AnthropicBatchAPI
+        return AnthropicBatchAPI(
+            self.config['api_base_url'],
+            self.prepare_headers(),
+            lambda prompt: self.prepare_request_data(prompt, stream=False),
+            get_session(),
+        )
+    
     def get_model_name(self) -> str:
         """
         Get current model name
@@ -306,7 +340,7 @@ class AnthropicModel(BaseAIModel):
             
             # 在线模型超时时间（15秒）
             timeout_seconds = 15
-            response = requests.post(
+            response = get_session().post(
                 test_url,
                 headers=headers,
                 json=test_data,
@@ -3,6 +3,7 @@
 
 定义了所有 AI 模型需要实现的接口和基础功能。
 """
+import threading
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, Union, List
 from enum import Enum, auto
@@ -321,6 +322,9 @@ class BaseAIModel(ABC):
     AI 模型抽象基类，定义所有 AI 模型需要实现的接口
     """
     
+    # 最近一次回答的用量（usage.make_usage 格式）；提供商没有报告时为 None
+    last_usage = None
+    
     def __init__(self, config: Dict[str, Any]):
         """
         初始化 AI 模型
@@ -400,7 +404,28 @@ class BaseAIModel(ABC):
         :return: 请求数据字典
         """
         raise NotImplementedError("子类必须实现 prepare_request_data 方法")
-    
+
+    def build_chat_messages(self, prompt: str, system_message: Optional[str] = None,
+                            history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+        """
+        构建 OpenAI 格式的消息列表：系统消息 + 之前的对话轮次 + 当前问题
+
+        历史消息放在当前问题之前且顺序不变，前缀在追问之间保持稳定，
+        便于服务端的提示词缓存命中。
+
+        :param prompt: 当前问题（提示文本）
+        :param system_message: 系统消息（可选）
+        :param history: 之前的对话 [{'role': 'user'|'assistant', 'content': str}]（可选）
+        :return: 消息列表
+        """
+        messages = []
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        for message in history or []:
+            messages.append({"role": message['role'], "content": message['content']})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
     @abstractmethod
     def ask(self, prompt: str, **kwargs) -> str:
         """
@@ -412,6 +437,15 @@ class BaseAIModel(ABC):
         :raises Exception: 当请求失败时抛出异常
         """
         pass
+    
+    def _record_usage(self, usage) -> None:
+        """
+        记录提供商报告的用量（子类在 ask 中解析响应时调用，流式片段可多次调用，取累计值）
+        
+        :param usage: usage.py 中 from_* 函数的返回值；None 时忽略
+        """
+        from ..usage import merge_usage
+        self.last_usage = merge_usage(self.last_usage, usage)
         
     def supports_streaming(self) -> bool:
         """
@@ -421,6 +455,58 @@ class BaseAIModel(ABC):
         """
         return False
     
+    # 是否使用环境变量中的代理设置（本地服务应设为 False）
+    HTTP_TRUST_ENV = True
+    
+    # 报告的输入 token 数是否包含服务端缓存命中的前缀（不包含时不能用于校准 token 估算）
+    REPORTS_FULL_INPUT_TOKENS = True
+    
+    def get_prewarm_url(self) -> str:
+        """
+        预热连接时使用的 URL（只使用其主机部分）
+        
+        :return: API 基础 URL；未配置时返回默认值
+        """
+        return self.config.get('api_base_url') or getattr(self, 'DEFAULT_API_BASE_URL', '')
+    
+    def get_health_probe(self):
+        """
+        健康检查使用的最轻量请求（不消耗 token），默认请求模型列表端点
+        子类可以重写此方法使用专门的健康检查端点
+        
+        :return: health.HealthProbe
+        """
+        from ..health import HealthProbe
+        
+        api_base_url = self.config.get('api_base_url', getattr(self, 'DEFAULT_API_BASE_URL', ''))
+        url = self.prepare_models_request_url(api_base_url, self.get_models_endpoint())
+        return HealthProbe(url, self.prepare_models_request_headers())
+    
+    def preload(self) -> bool:
+        """
+        提前加载模型（本地模型冷启动需要数秒），在后台线程中调用
+        
+        :return: 执行了预加载并成功时返回 True；默认不需要预加载，返回 False
+        """
+        return False
+    
+    def supports_batch(self) -> bool:
+        """
+        检查提供商是否支持批量接口（离线批量提交，价格更低且不占实时速率限制）
+        
+        :return: 支持时返回 True，默认为 False；不支持的提供商由后台任务逐条并发请求
+        """
+        return False
+    
+    def create_batch_api(self):
+        """
+        创建批量接口客户端（见 provider_batch.py）
+        子类在 supports_batch() 返回 True 时必须重写此方法
+        
+        :return: ProviderBatchAPI 实例
+        """
+        raise NotImplementedError("不支持批量接口的模型没有 create_batch_api 方法")
+    
     def get_models_endpoint(self) -> str:
         """
         获取模型列表的 API 端点
@@ -504,7 +590,18 @@ class BaseAIModel(ABC):
     
     def fetch_available_models(self, skip_verification: bool = False) -> List[str]:
         """
-        通用的获取模型列表实现
+        获取模型列表（无条件请求），见 fetch_models_if_changed()
+        
+        :return: 模型名称列表
+        :raises NotImplementedError: 如果提供商不支持模型列表 API
+        :raises Exception: 当 API 请求失败时抛出异常
+        """
+        return self.fetch_models_if_changed(skip_verification=skip_verification).models
+    
+    def fetch_models_if_changed(self, etag: str = None, last_modified: str = None,
+                                skip_verification: bool = False):
+        """
+        通用的获取模型列表实现，支持条件请求
         
         此方法提供了一个标准的实现流程：
         1. 准备 URL 和请求头
@@ -520,12 +617,21 @@ class BaseAIModel(ABC):
         
         如果提供商完全不支持模型列表 API，子类应该抛出 NotImplementedError
         
-        :return: 模型名称列表
+        传入上次响应的 etag / last_modified 时发送 If-None-Match / If-Modified-Since，
+        服务端返回 304 时结果中的 models 为 None。重写了 fetch_available_models() 的子类
+        （如 Ollama）不支持条件请求，总是返回完整列表。
+        
+        :return: FetchResult(models, etag, last_modified)
         :raises NotImplementedError: 如果提供商不支持模型列表 API
         :raises Exception: 当 API 请求失败时抛出异常
         """
         import logging
         from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
+        from ..http_pool import get_session
+        from ..model_catalog import FetchResult
+        
+        if type(self).fetch_available_models is not BaseAIModel.fetch_available_models:
+            return FetchResult(self.fetch_available_models(skip_verification=skip_verification), None, None)
         
         logger = logging.getLogger(self.get_logger_name())
         
@@ -542,10 +648,18 @@ class BaseAIModel(ABC):
             # 准备请求
             endpoint = self.get_models_endpoint()
             url = self.prepare_models_request_url(api_base_url, endpoint)
-            headers = self.prepare_models_request_headers()
+            headers = dict(self.prepare_models_request_headers())
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
             
             # 发送请求
-            response = requests.get(url, headers=headers, timeout=15)
+            response = get_session().get(url, headers=headers, timeout=15)
+            if response.status_code == 304 and (etag or last_modified):
+                logger.info(f"[{self.get_provider_name()}] 模型列表未变化（304）")
+                return FetchResult(None, response.headers.get('ETag') or etag,
+                                   response.headers.get('Last-Modified') or last_modified)
             response.raise_for_status()
             
             # 解析响应
@@ -561,7 +675,7 @@ class BaseAIModel(ABC):
                     logger.error(f"[{self.get_provider_name()}] API Key 验证失败: {str(verify_error)}")
                     raise
             
-            return sorted(models)
+            return FetchResult(sorted(models), response.headers.get('ETag'), response.headers.get('Last-Modified'))
             
         except requests.exceptions.HTTPError as e:
             # HTTP 错误 - 根据状态码提供友好提示
@@ -656,6 +770,7 @@ class BaseAIModel(ABC):
         import logging
         from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
         from ..i18n import get_translation
+        from ..http_pool import get_session
         
         logger = logging.getLogger(self.get_logger_name())
         provider_name = self.get_provider_name()
@@ -673,7 +788,7 @@ class BaseAIModel(ABC):
             
             # 在线模型超时时间较长（15秒）
             timeout_seconds = 15
-            response = requests.post(
+            response = get_session().post(
                 test_url,
                 headers=headers,
                 json=test_data,
@@ -739,6 +854,35 @@ class AIModelFactory:
     AI 模型工厂类，用于创建不同类型的 AI 模型实例
     """
     _model_classes = {}
+    # 按需注册各提供商的模型类（见 models/__init__.py）
+    _loader = None
+    
+    @classmethod
+    def set_loader(cls, loader):
+        """
+        设置按需注册模型类的函数
+        
+        :param loader: loader(model_name)；只注册该提供商的模型类，model_name 为 None 或未知时注册全部
+        """
+        cls._loader = loader
+    
+    _loader_lock = threading.Lock()
+    
+    @classmethod
+    def _ensure_loaded(cls, model_name=None):
+        """注册模型类；给出 model_name 时只导入该提供商的模块"""
+        if cls._loader is None or model_name in cls._model_classes:
+            return
+        with cls._loader_lock:
+            loader = cls._loader
+            if loader is None or model_name in cls._model_classes:
+                return
+            if model_name is not None:
+                loader(model_name)
+                if model_name in cls._model_classes:
+                    return
+            loader(None)
+            cls._loader = None
     
     @classmethod
     def register_model(cls, model_name: str, model_class):
@@ -762,6 +906,7 @@ class AIModelFactory:
         :return: AI 模型实例
         :raises ValueError: 当指定的模型未注册时抛出异常
         """
+        cls._ensure_loaded(model_name)
         model_class = cls._model_classes.get(model_name)
         if model_class is None:
             raise ValueError(f"Unknown model: {model_name}. Available models: {list(cls._model_classes.keys())}")
@@ -774,6 +919,7 @@ class AIModelFactory:
         
         :return: 已注册的模型名称列表
         """
+        cls._ensure_loaded()
         return list(cls._model_classes.keys())
     
     @classmethod
@@ -785,6 +931,7 @@ class AIModelFactory:
         :return: 默认配置字典
         :raises ValueError: 当指定的模型未注册时抛出异常
         """
+        cls._ensure_loaded(model_name)
         model_class = cls._model_classes.get(model_name)
         if model_class is None:
             # 使用i18n翻译字符串
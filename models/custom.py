@@ -10,7 +10,9 @@ from typing import Dict, Any, Optional
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 
 from .base import BaseAIModel
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_openai
 
 
 class CustomModel(BaseAIModel):
@@ -22,6 +24,8 @@ class CustomModel(BaseAIModel):
     DEFAULT_MODEL = "minimax-m3"
     # 默认 API 基础 URL (Ollama默认地址)
     DEFAULT_API_BASE_URL = "http://localhost:11434"
+    # 多为本地服务：不使用环境变量中的代理设置（健康探测和预热也按此选择连接池）
+    HTTP_TRUST_ENV = False
     
     def _validate_config(self):
         """
@@ -111,16 +115,7 @@ class CustomModel(BaseAIModel):
         
         data = {
             "model": self.config.get('model', self.DEFAULT_MODEL),
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            "messages": self.build_chat_messages(prompt, system_message, kwargs.get('history')),
             "temperature": kwargs.get('temperature', 0.7)
         }
         
@@ -146,6 +141,7 @@ class CustomModel(BaseAIModel):
         # 检查是否使用流式传输
         use_stream = kwargs.get('stream', self.config.get('enable_streaming', True))
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
         
         try:
             # 构建API URL - 使用基类的智能 URL 构建方法
@@ -164,11 +160,8 @@ class CustomModel(BaseAIModel):
                 
                 # 发送流式请求
                 # 对于本地请求，完全禁用代理
-                # 创建新的会话对象，确保不使用任何代理
-                session = requests.Session()
-                session.trust_env = False  # 不使用环境变量中的代理设置
+                session = get_session(trust_env=self.HTTP_TRUST_ENV)  # 共享的无代理连接池
                 
-                # 使用session发送请求，而不是直接使用requests.post
                 with session.post(
                     api_url,
                     headers=headers,
@@ -196,6 +189,7 @@ class CustomModel(BaseAIModel):
                         try:
                             # 解析JSON响应
                             chunk = json.loads(line_str)
+                            self._record_usage(from_openai(chunk))
                             
                             # 尝试 OpenAI 格式：提取 choices[0].delta.content
                             if 'choices' in chunk and len(chunk['choices']) > 0:
@@ -239,11 +233,8 @@ class CustomModel(BaseAIModel):
                     data['stream'] = False
                     
                     # 对于本地请求，完全禁用代理
-                    # 创建新的会话对象，确保不使用任何代理
-                    session = requests.Session()
-                    session.trust_env = False  # 不使用环境变量中的代理设置
+                    session = get_session(trust_env=self.HTTP_TRUST_ENV)  # 共享的无代理连接池
                     
-                    # 使用session发送请求，而不是直接使用requests.post
                     response = session.post(
                         api_url,
                         headers=headers,
@@ -255,6 +246,7 @@ class CustomModel(BaseAIModel):
                     logger.debug(f"响应状态: {response.status_code}, 响应长度: {len(response.text)}")
                     
                     result = response.json()
+                    self._record_usage(from_openai(result))
                     
                     # 尝试 OpenAI 格式
                     if 'choices' in result and len(result['choices']) > 0:
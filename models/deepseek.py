@@ -2,7 +2,6 @@
 Deepseek AI 模型实现
 """
 import json
-import time
 import logging
 from typing import Dict, Any, Optional
 
@@ -10,7 +9,9 @@ from typing import Dict, Any, Optional
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 
 from .base import BaseAIModel
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_openai
 
 # 获取日志记录器
 logger = logging.getLogger('calibre_plugins.ask_ai_plugin.models.deepseek')
@@ -100,16 +101,7 @@ class DeepseekModel(BaseAIModel):
         system_message = kwargs.get('system_message', translations.get('default_system_message', 'You are an expert in book analysis. Your task is to help users understand books better by providing insightful questions and analysis.'))
         
         data = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            "messages": self.build_chat_messages(prompt, system_message, kwargs.get('history')),
             "model": self.config.get('model', self.DEFAULT_MODEL),
             "temperature": kwargs.get('temperature', 0.7),
             "max_tokens": kwargs.get('max_tokens', 8192)
@@ -118,6 +110,8 @@ class DeepseekModel(BaseAIModel):
         # 添加流式传输支持（只有明确指定 stream=True 才添加）
         if kwargs.get('stream', False):
             data['stream'] = True
+            # 最后一个片段附带用量（choices 为空）
+            data['stream_options'] = {'include_usage': True}
         
         return data
     
@@ -133,180 +127,176 @@ class DeepseekModel(BaseAIModel):
         # 准备请求头和数据
         headers = self.prepare_headers()
         data = self.prepare_request_data(prompt, **kwargs)
+        self.last_usage = None
         
         # 添加流式处理选项，可以减少超时问题
         use_stream = kwargs.get('stream', True)
         if use_stream:
             data['stream'] = True
+            data['stream_options'] = {'include_usage': True}
         
-        # 重试设置
-        max_retries = 3
-        retry_delay = 2  # 秒
-        
-        for attempt in range(max_retries):
-            try:
-                if use_stream:
-                    # 使用流式处理
-                    full_content = ""
-                    stream_callback = kwargs.get('stream_callback')
-                    logger.info(f"开始流式请求, 回调函数存在: {stream_callback is not None}")
-                    
-                    # 初始化日志计数器
-                    chunk_count = 0
-                    last_log_length = 0
-                    
-                    # 累积推理内容
-                    reasoning_buffer = ""
-                    is_reasoning = False
-                    
-                    try:
-                        with requests.post(
-                            f"{self.config['api_base_url']}/chat/completions",
-                            headers=headers,
-                            json=data,
-                            timeout=kwargs.get('timeout', 300),
-                            verify=True,
-                            stream=True
-                        ) as response:
-                            response.raise_for_status()
-                            logger.debug(f"流式响应状态码: {response.status_code}")
-                            
-                            for line in response.iter_lines():
-                                if line:
-                                    line = line.decode('utf-8')
+        try:
+            if use_stream:
+                # 使用流式处理
+                full_content = ""
+                stream_callback = kwargs.get('stream_callback')
+                logger.info(f"开始流式请求, 回调函数存在: {stream_callback is not None}")
+                
+                # 初始化日志计数器
+                chunk_count = 0
+                last_log_length = 0
+                
+                # 累积推理内容
+                reasoning_buffer = ""
+                is_reasoning = False
+                
+                try:
+                    with get_session().post(
+                        f"{self.config['api_base_url']}/chat/completions",
+                        headers=headers,
+                        json=data,
+                        timeout=kwargs.get('timeout', 300),
+                        verify=True,
+                        stream=True
+                    ) as response:
+                        response.raise_for_status()
+                        logger.debug(f"流式响应状态码: {response.status_code}")
+                        
+                        for line in response.iter_lines():
+                            if line:
+                                line = line.decode('utf-8')
+                                
+                                if line.startswith('data: '):
+                                    line = line[6:]
+                                    if line.strip() == '[DONE]':
+                                        logger.info("收到流式响应结束标记 [DONE]")
+                                        break
                                     
-                                    if line.startswith('data: '):
-                                        line = line[6:]
-                                        if line.strip() == '[DONE]':
-                                            logger.info("收到流式响应结束标记 [DONE]")
-                                            break
+                                    try:
+                                        chunk = json.loads(line)
+                                        self._record_usage(from_openai(chunk))
+                                        if not chunk.get('choices'):
+                                            # 用量片段没有 choices
+                                            continue
+                                        delta = chunk['choices'][0].get('delta', {})
                                         
-                                        try:
-                                            chunk = json.loads(line)
-                                            delta = chunk.get('choices', [{}])[0].get('delta', {})
-                                            
-                                            # 获取常规内容
-                                            content = delta.get('content', '')
-                                            
-                                            # 获取推理内容（deepseek-reasoner 特有）
-                                            reasoning_content = delta.get('reasoning_content', '')
+                                        # 获取常规内容
+                                        content = delta.get('content', '')
+                                        
+                                        # 获取推理内容（deepseek-reasoner 特有）
+                                        reasoning_content = delta.get('reasoning_content', '')
+                                        
+                                        # 处理推理内容
+                                        if reasoning_content:
+                                            # 累积推理内容
+                                            reasoning_buffer += reasoning_content
                                             
-                                            # 处理推理内容
-                                            if reasoning_content:
-                                                # 累积推理内容
-                                                reasoning_buffer += reasoning_content
-                                                
-                                                # 流式发送推理内容（使用特殊标记）
-                                                if not is_reasoning:
-                                                    # 第一次接收推理内容，发送开始标记
-                                                    if stream_callback and callable(stream_callback):
-                                                        stream_callback("<think>")
-                                                    is_reasoning = True
-                                                
-                                                # 发送推理内容片段
-                                                if stream_callback and callable(stream_callback):
-                                                    stream_callback(reasoning_content)
-                                                    
-                                            elif is_reasoning and content:
-                                                # 推理结束，常规内容开始
-                                                # 发送推理结束标记
+                                            # 流式发送推理内容（使用特殊标记）
+                                            if not is_reasoning:
+                                                # 第一次接收推理内容，发送开始标记
                                                 if stream_callback and callable(stream_callback):
-                                                    stream_callback("</think>\n\n")
-                                                
-                                                # 将累积的推理内容添加到完整内容
-                                                if reasoning_buffer:
-                                                    think_chunk = f"<think>{reasoning_buffer}</think>\n\n"
-                                                    full_content += think_chunk
-                                                    reasoning_buffer = ""
-                                                is_reasoning = False
+                                                    stream_callback("<think>")
+                                                is_reasoning = True
                                             
-                                            if content:
-                                                full_content += content
-                                                chunk_count += 1
+                                            # 发送推理内容片段
+                                            if stream_callback and callable(stream_callback):
+                                                stream_callback(reasoning_content)
                                                 
-                                                # 检测并记录特殊标签（用于调试推理内容）
-                                                if '<' in content and any(tag in content for tag in ['think', 'reasoning', 'ds-think']):
-                                                    logger.warning(f"[Deepseek Debug] 检测到可能的推理标签，内容片段: {repr(content[:200])}")
-                                                
-                                                # 每1000字符记录一次日志
-                                                if len(full_content) - last_log_length >= 1000:
-                                                    logger.info(f"[Deepseek Stream] 已接收 {chunk_count} 个片段，累计 {len(full_content)} 字符 (~{len(full_content)//4} tokens)")
-                                                    last_log_length = len(full_content)
-                                                
-                                                # 如果提供了回调函数，则调用它
-                                                if stream_callback and callable(stream_callback):
-                                                    stream_callback(content)
-                                        except json.JSONDecodeError as e:
-                                            logger.error(f"JSON解析错误: {str(e)}, 行内容: {line[:50]}...")
-                                            continue
-                    except Exception as e:
-                        logger.error(f"流式请求处理异常: {str(e)}")
-                        raise
-                    
-                    # 处理流结束时可能还有未发送的推理内容
-                    if reasoning_buffer:
-                        # 发送推理结束标记
-                        if stream_callback and callable(stream_callback):
-                            stream_callback("</think>\n\n")
-                        
-                        think_chunk = f"<think>{reasoning_buffer}</think>\n\n"
-                        full_content += think_chunk
-                        logger.info(f"[Deepseek Stream] 流结束时发送剩余推理内容，长度: {len(reasoning_buffer)} 字符")
-                        
-                    # 统计推理内容和常规内容
-                    think_count = full_content.count('<think>')
-                    think_close_count = full_content.count('</think>')
-                    
-                    logger.info(f"[Deepseek Stream] 流式请求完成")
-                    logger.info(f"[Deepseek Stream] 总内容长度: {len(full_content)} 字符 (~{len(full_content)//4} tokens)")
-                    logger.info(f"[Deepseek Stream] 推理块数量: {think_count} 个（完整: {think_close_count}）")
-                    
-                    return full_content
-                else:
-                    # 使用普通请求
-                    response = requests.post(
-                        f"{self.config['api_base_url']}/chat/completions",
-                        headers=headers,
-                        json=data,
-                        timeout=kwargs.get('timeout', 300),
-                        verify=True
-                    )
-                    response.raise_for_status()
-                    
-                    result = response.json()
-                    message = result['choices'][0]['message']
-                    
-                    # 获取常规内容
-                    content = message.get('content', '')
-                    
-                    # 获取推理内容（deepseek-reasoner 特有）
-                    reasoning_content = message.get('reasoning_content', '')
+                                        elif is_reasoning and content:
+                                            # 推理结束，常规内容开始
+                                            # 发送推理结束标记
+                                            if stream_callback and callable(stream_callback):
+                                                stream_callback("</think>\n\n")
+                                            
+                                            # 将累积的推理内容添加到完整内容
+                                            if reasoning_buffer:
+                                                think_chunk = f"<think>{reasoning_buffer}</think>\n\n"
+                                                full_content += think_chunk
+                                                reasoning_buffer = ""
+                                            is_reasoning = False
+                                        
+                                        if content:
+                                            full_content += content
+                                            chunk_count += 1
+                                            
+                                            # 检测并记录特殊标签（用于调试推理内容）
+                                            if '<' in content and any(tag in content for tag in ['think', 'reasoning', 'ds-think']):
+                                                logger.warning(f"[Deepseek Debug] 检测到可能的推理标签，内容片段: {repr(content[:200])}")
+                                            
+                                            # 每1000字符记录一次日志
+                                            if len(full_content) - last_log_length >= 1000:
+                                                logger.info(f"[Deepseek Stream] 已接收 {chunk_count} 个片段，累计 {len(full_content)} 字符 (~{len(full_content)//4} tokens)")
+                                                last_log_length = len(full_content)
+                                            
+                                            # 如果提供了回调函数，则调用它
+                                            if stream_callback and callable(stream_callback):
+                                                stream_callback(content)
+                                    except json.JSONDecodeError as e:
+                                        logger.error(f"JSON解析错误: {str(e)}, 行内容: {line[:50]}...")
+                                        continue
+                except Exception as e:
+                    logger.error(f"流式请求处理异常: {str(e)}")
+                    raise
+                
+                # 处理流结束时可能还有未发送的推理内容
+                if reasoning_buffer:
+                    # 发送推理结束标记
+                    if stream_callback and callable(stream_callback):
+                        stream_callback("</think>\n\n")
                     
-                    # 如果有推理内容，用 <think> 标签包裹并放在前面
-                    if reasoning_content:
-                        logger.warning(f"[Deepseek Debug] 非流式响应中检测到推理内容，长度: {len(reasoning_content)}")
-                        return f"<think>{reasoning_content}</think>\n\n{content}"
+                    think_chunk = f"<think>{reasoning_buffer}</think>\n\n"
+                    full_content += think_chunk
+                    logger.info(f"[Deepseek Stream] 流结束时发送剩余推理内容，长度: {len(reasoning_buffer)} 字符")
                     
-                    return content
-            
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    # 如果不是最后一次尝试，则等待后重试
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # 指数退避
-                    continue
+                # 统计推理内容和常规内容
+                think_count = full_content.count('<think>')
+                think_close_count = full_content.count('</think>')
                 
-                # 最后一次尝试失败，抛出异常
-                translations = get_translation(self.config.get('language', 'en'))
-                error_msg = translations.get('api_request_failed', 'API request failed: {error}').format(error=str(e))
-                if hasattr(e, 'response') and e.response is not None:
-                    try:
-                        error_detail = e.response.json()
-                        error_msg += f" | {json.dumps(error_detail, ensure_ascii=False)}"
-                    except Exception:
-                        error_msg += f" | {e.response.text}"
-                raise Exception(error_msg) from e
-    
+                logger.info(f"[Deepseek Stream] 流式请求完成")
+                logger.info(f"[Deepseek Stream] 总内容长度: {len(full_content)} 字符 (~{len(full_content)//4} tokens)")
+                logger.info(f"[Deepseek Stream] 推理块数量: {think_count} 个（完整: {think_close_count}）")
+                
+                return full_content
+            else:
+                # 使用普通请求
+                response = get_session().post(
+                    f"{self.config['api_base_url']}/chat/completions",
+                    headers=headers,
+                    json=data,
+                    timeout=kwargs.get('timeout', 300),
+                    verify=True
+                )
+                response.raise_for_status()
+                
+                result = response.json()
+                self._record_usage(from_openai(result))
+                message = result['choices'][0]['message']
+                
+                # 获取常规内容
+                content = message.get('content', '')
+                
+                # 获取推理内容（deepseek-reasoner 特有）
+                reasoning_content = message.get('reasoning_content', '')
+                
+                # 如果有推理内容，用 <think> 标签包裹并放在前面
+                if reasoning_content:
+                    logger.warning(f"[Deepseek Debug] 非流式响应中检测到推理内容，长度: {len(reasoning_content)}")
+                    return f"<think>{reasoning_content}</think>\n\n{content}"
+                
+                return content
+        
+        except requests.exceptions.RequestException as e:
+            # 重试由 APIClient 统一处理，这里只转换错误信息
+            translations = get_translation(self.config.get('language', 'en'))
+            error_msg = translations.get('api_request_failed', 'API request failed: {error}').format(error=str(e))
+            if hasattr(e, 'response') and e.response is not None:
+                try:
+                    error_detail = e.response.json()
+                    error_msg += f" | {json.dumps(error_detail, ensure_ascii=False)}"
+                except Exception:
+                    error_msg += f" | {e.response.text}"
+            raise Exception(error_msg) from e
+
     def supports_streaming(self) -> bool:
         """
         检查 Deepseek 模型是否支持流式传输
@@ -11,7 +11,9 @@ import logging
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 
 from .base import BaseAIModel
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_gemini
 
 # 获取日志记录器
 logger = logging.getLogger('calibre_plugins.ask_ai_plugin.models.gemini')
@@ -114,6 +116,15 @@ class GeminiModel(BaseAIModel):
                 ]
             })
         
+        # 之前的对话轮次（Gemini 使用 model 表示助手角色）
+        for message in kwargs.get('history') or []:
+            data["contents"].append({
+                "role": "model" if message['role'] == 'assistant' else "user",
+                "parts": [
+                    {"text": message['content']}
+                ]
+            })
+        
         # 添加用户提示
         data["contents"].append({
             "role": "user",  # 明确指定角色
@@ -191,6 +202,7 @@ class GeminiModel(BaseAIModel):
         # 获取流式传输设置（只有明确指定才使用流式）
         use_stream = kwargs.get('stream', False)
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
         
         # 根据是否使用流式传输构建不同的URL
         params = {}
@@ -202,237 +214,152 @@ class GeminiModel(BaseAIModel):
             params = {}
         
         
-        # 重试设置
-        max_retries = 3
-        retry_delay = 2  # 秒
-        
-        for attempt in range(max_retries):
-            try:
-                if use_stream and stream_callback:
-                    # 流式请求处理
-                    full_content = ""
-                    chunk_count = 0
-                    last_chunk_time = time.time()
+        try:
+            if use_stream and stream_callback:
+                # 流式请求处理
+                full_content = ""
+                chunk_count = 0
+                last_chunk_time = time.time()
+                
+                # 增加超时时间到 300 秒，避免长回复时请求超时
+                with get_session().post(
+                    url,
+                    headers=headers,
+                    json=data,
+                    params=params,
+                    timeout=kwargs.get('timeout', 300),  # 增加默认超时时间到 300 秒
+                    stream=True
+                ) as response:
+                    response.raise_for_status()
                     
-                    # 增加超时时间到 300 秒，避免长回复时请求超时
-                    with requests.post(
-                        url,
-                        headers=headers,
-                        json=data,
-                        params=params,
-                        timeout=kwargs.get('timeout', 300),  # 增加默认超时时间到 300 秒
-                        stream=True
-                    ) as response:
-                        response.raise_for_status()
-                        
-                        try:
-                            for line in response.iter_lines():
-                                if line:
-                                    line = line.decode('utf-8')
-                                    
-                                    # 处理 SSE 格式，必须以 'data: ' 开头
-                                    if line.startswith('data: '):
-                                        line = line[6:]  # 去除 'data: ' 前缀
-                                        
-                                        # 特殊情况处理：如果是 [DONE] 标记
-                                        if line.strip() == "[DONE]":
-                                            break
-                                        
-                                        try:
-                                            chunk_data = json.loads(line)
-                                            
-                                            # 解析 Gemini 流式响应格式
-                                            if 'candidates' in chunk_data and chunk_data['candidates']:
-                                                candidate = chunk_data['candidates'][0]
-                                                if 'content' in candidate:
-                                                    content = candidate['content']
-                                                    if 'parts' in content and content['parts']:
-                                                        for part in content['parts']:
-                                                            if 'text' in part and part['text']:
-                                                                chunk_text = part['text']
-                                                                full_content += chunk_text
-                                                                stream_callback(chunk_text)
-                                                                chunk_count += 1
-                                                                last_chunk_time = time.time()
-                                        except json.JSONDecodeError as je:
-                                            logger.error(f"JSON解析错误: {str(je)}, 行内容: {line[:50]}...")
-                                            continue
-                                
-                                # 检查是否超过5秒没有收到新数据
-                                current_time = time.time()
-                                if current_time - last_chunk_time > 15:
-                                    logger.warning(f"已经 {current_time - last_chunk_time:.1f} 秒没有收到新数据")
-                                
-                                # 如果超过15秒没有收到新数据，尝试恢复连接
-                                if current_time - last_chunk_time > 60 and full_content:  # 只有在已有内容的情况下才触发
-                                    logger.warning("超过15秒无响应，主动触发恢复机制")
-                                    raise requests.exceptions.ReadTimeout("流式传输超过15秒没有新内容，可能是连接问题")
+                    try:
+                        for line in response.iter_lines():
+                            if line:
+                                line = line.decode('utf-8')
                                 
-                                last_chunk_time = current_time  # 重置计时器避免重复日志
-                        except Exception as e:
-                            logger.error(f"流式处理异常: {str(e)}")
-                            # 记录异常时的状态
-                            logger.warning(f"异常发生时状态: 已接收 {chunk_count} 块, 总长度: {len(full_content)}")
-                            
-                            # 如果已经有内容，尝试恢复连接
-                            if full_content:
-                                try:
-                                    # 保存当前已接收的内容
-                                    current_content = full_content
+                                # 处理 SSE 格式，必须以 'data: ' 开头
+                                if line.startswith('data: '):
+                                    line = line[6:]  # 去除 'data: ' 前缀
                                     
-                                    # 重新构建请求，添加标记表示这是恢复请求
-                                    recovery_data = self.prepare_request_data(prompt, **kwargs)
+                                    # 特殊情况处理：如果是 [DONE] 标记
+                                    if line.strip() == "[DONE]":
+                                        break
                                     
-                                    # 检查响应是否可能不完整（例如缺少结束标点或代码块未闭合）
-                                    unclosed_code_blocks = full_content.count('```') % 2
-                                    
-                                    # 添加恢复标记，让模型知道这是继续之前的对话
-                                    if 'contents' in recovery_data and len(recovery_data['contents']) > 0:
-                                        # 如果最后一个内容是用户消息，添加一个系统消息表示继续
-                                        translations = get_translation(self.config.get('language', 'en'))
-                                        recovery_prompt = translations.get('stream_continue_prompt', 'Please continue your previous answer without repeating content already provided.')
-                                        
-                                        # 根据不同的不完整情况生成不同的恢复提示
-                                        if unclosed_code_blocks:
-                                            recovery_prompt += translations.get('stream_continue_code_blocks', 'Your previous answer had unclosed code blocks. Please continue and complete these code blocks.')
+                                    try:
+                                        chunk_data = json.loads(line)
+                                        # 每个片段的 usageMetadata 都是累计值
+                                        self._record_usage(from_gemini(chunk_data))
                                         
-                                        recovery_data['contents'].append({
-                                            "role": "user",
-                                            "parts": [{"text": recovery_prompt}]
-                                        })
-                                    
-                                    # 设置更长的超时时间
-                                    recovery_timeout = kwargs.get('timeout', 300) + 60
-                                    
-                                    
-                                    # 发起恢复请求
-                                    with requests.post(
-                                        url,
-                                        headers=headers,
-                                        json=recovery_data,
-                                        params=params,
-                                        timeout=recovery_timeout,
-                                        stream=True
-                                    ) as recovery_response:
-                                        recovery_response.raise_for_status()
-                                        
-                                        # 处理恢复响应
-                                        for line in recovery_response.iter_lines():
-                                            if line:
-                                                line = line.decode('utf-8')
-                                                
-                                                if line.startswith('data: '):
-                                                    line = line[6:]
-                                                    
-                                                    if line.strip() == "[DONE]":
-                                                        break
-                                                    
-                                                    try:
-                                                        chunk_data = json.loads(line)
-                                                        
-                                                        if 'candidates' in chunk_data and chunk_data['candidates']:
-                                                            candidate = chunk_data['candidates'][0]
-                                                            if 'content' in candidate:
-                                                                content = candidate['content']
-                                                                if 'parts' in content and content['parts']:
-                                                                    for part in content['parts']:
-                                                                        if 'text' in part and part['text']:
-                                                                            chunk_text = part['text']
-                                                                            full_content += chunk_text
-                                                                            stream_callback(chunk_text)
-                                                                            chunk_count += 1
-                                                                            last_chunk_time = time.time()
-                                                    except json.JSONDecodeError as je:
-                                                        logger.error(f"恢复请求JSON解析错误: {str(je)}")
-                                                        continue
-                                        
-                                except Exception as recovery_e:
-                                    logger.error(f"恢复连接失败: {str(recovery_e)}")
-                                    logger.warning(f"将返回已接收的 {len(full_content)} 字符内容")
-                            else:
-                                raise  # 如果没有内容，抛出异常
+                                        # 解析 Gemini 流式响应格式
+                                        if 'candidates' in chunk_data and chunk_data['candidates']:
+                                            candidate = chunk_data['candidates'][0]
+                                            if 'content' in candidate:
+                                                content = candidate['content']
+                                                if 'parts' in content and content['parts']:
+                                                    for part in content['parts']:
+                                                        if 'text' in part and part['text']:
+                                                            chunk_text = part['text']
+                                                            full_content += chunk_text
+                                                            stream_callback(chunk_text)
+                                                            chunk_count += 1
+                                                            last_chunk_time = time.time()
+                                    except json.JSONDecodeError as je:
+                                        logger.error(f"JSON解析错误: {str(je)}, 行内容: {line[:50]}...")
+                                        continue
+                            
+                            # 检查是否超过5秒没有收到新数据
+                            current_time = time.time()
+                            if current_time - last_chunk_time > 15:
+                                logger.warning(f"已经 {current_time - last_chunk_time:.1f} 秒没有收到新数据")
+                            
+                            # 如果超过15秒没有收到新数据，尝试恢复连接
+                            if current_time - last_chunk_time > 60 and full_content:  # 只有在已有内容的情况下才触发
+                                logger.warning("超过15秒无响应，主动触发恢复机制")
+                                raise requests.exceptions.ReadTimeout("流式传输超过15秒没有新内容，可能是连接问题")
+                            
+                            last_chunk_time = current_time  # 重置计时器避免重复日志
+                    except Exception as e:
+                        logger.error(f"流式处理异常: {str(e)}")
+                        logger.warning(f"异常发生时状态: 已接收 {chunk_count} 块, 总长度: {len(full_content)}")
+                        # 重试由 APIClient 统一处理（已输出部分内容时不会重放请求）
+                        raise
+                
+                
+                return full_content
+            else:
+                # 普通请求处理
+                try:
                     
+                    response = get_session().post(
+                        url,
+                        headers=headers,
+                        json=data,
+                        params=params,
+                        timeout=kwargs.get('timeout', 300)  # 增加超时时间
+                    )
+                    response.raise_for_status()
                     
-                    return full_content
-                else:
-                    # 普通请求处理
-                    try:
-                        
-                        response = requests.post(
-                            url,
-                            headers=headers,
-                            json=data,
-                            params=params,
-                            timeout=kwargs.get('timeout', 300)  # 增加超时时间
+                    result = response.json()
+                    self._record_usage(from_gemini(result))
+                    
+                    # 解析 Gemini API 响应
+                    if 'candidates' in result and result['candidates']:
+                        candidate = result['candidates'][0]
+                        if 'content' in candidate and 'parts' in candidate['content']:
+                            text_parts = [part['text'] for part in candidate['content']['parts'] if 'text' in part]
+                            content = ''.join(text_parts)
+                            return content
+                    
+                    # 如果无法获取响应内容，返回错误信息
+                    translations = get_translation(self.config.get('language', 'en'))
+                    error_msg = translations.get('api_invalid_response', 'Unable to get valid API response')
+                    if 'error' in result:
+                        error_msg = f"{error_msg}: {result['error'].get('message', translations.get('unknown_error', 'Unknown error'))}"
+                    logger.error(f"Gemini API 响应解析失败: {error_msg}")
+                    raise Exception(error_msg)
+                except requests.exceptions.RequestException as req_e:
+                    logger.error(f"Gemini API 请求异常: {str(req_e)}")
+                    if hasattr(req_e, 'response') and req_e.response is not None:
+                        try:
+                            error_detail = req_e.response.json()
+                            logger.error(f"错误详情: {json.dumps(error_detail, ensure_ascii=False)}")
+                        except Exception:
+                            logger.error(f"响应内容: {req_e.response.text[:500]}")
+                    raise
+        
+        except requests.exceptions.RequestException as e:
+            logger.error(f"请求异常: {str(e)}")
+            
+            # 提供详细错误信息（重试由 APIClient 统一处理）
+            translations = get_translation(self.config.get('language', 'en'))
+            error_msg = translations.get('api_request_failed', 'API request failed: {error}').format(error=str(e))
+            
+            if hasattr(e, 'response') and e.response is not None:
+                try:
+                    error_detail = e.response.json()
+                    
+                    # 根据错误类型提供更具体的错误信息
+                    if e.response.status_code == 404:
+                        error_msg = translations.get('api_version_model_error', 'API version or model name error: {message}\n\nPlease update API Base URL to "{base_url}" and model to "{model}" or other available model in settings.').format(
+                            message=error_detail.get('error', {}).get('message', ''),
+                            base_url=self.DEFAULT_API_BASE_URL,
+                            model=self.DEFAULT_MODEL
                         )
-                        response.raise_for_status()
-                        
-                        result = response.json()
-                        
-                        # 解析 Gemini API 响应
-                        if 'candidates' in result and result['candidates']:
-                            candidate = result['candidates'][0]
-                            if 'content' in candidate and 'parts' in candidate['content']:
-                                text_parts = [part['text'] for part in candidate['content']['parts'] if 'text' in part]
-                                content = ''.join(text_parts)
-                                return content
-                        
-                        # 如果无法获取响应内容，返回错误信息
-                        translations = get_translation(self.config.get('language', 'en'))
-                        error_msg = translations.get('api_invalid_response', 'Unable to get valid API response')
-                        if 'error' in result:
-                            error_msg = f"{error_msg}: {result['error'].get('message', translations.get('unknown_error', 'Unknown error'))}"
-                        logger.error(f"Gemini API 响应解析失败: {error_msg}")
-                        raise Exception(error_msg)
-                    except requests.exceptions.RequestException as req_e:
-                        logger.error(f"Gemini API 请求异常: {str(req_e)}")
-                        if hasattr(req_e, 'response') and req_e.response is not None:
-                            try:
-                                error_detail = req_e.response.json()
-                                logger.error(f"错误详情: {json.dumps(error_detail, ensure_ascii=False)}")
-                            except Exception:
-                                logger.error(f"响应内容: {req_e.response.text[:500]}")
-                        raise
+                    elif e.response.status_code == 400:
+                        error_msg = translations.get('api_format_error', 'API request format error: {message}').format(
+                            message=error_detail.get('error', {}).get('message', '')
+                        )
+                    elif e.response.status_code == 401:
+                        error_msg = translations.get('api_key_invalid', 'API Key invalid or unauthorized: {message}\n\nPlease check your API Key and ensure API access is enabled.').format(
+                            message=error_detail.get('error', {}).get('message', '')
+                        )
+                    elif e.response.status_code == 429:
+                        error_msg = translations.get('api_rate_limit', 'Request rate limit exceeded, please try again later\n\nYou may have exceeded the free usage quota. This could be due to:\n1. Too many requests per minute\n2. Too many requests per day\n3. Too many input tokens per minute')
+                except Exception:
+                    error_msg += f" | 响应内容: {e.response.text[:200] if hasattr(e.response, 'text') else '无法解析响应'}"
             
-            except requests.exceptions.RequestException as e:
-                logger.error(f"请求异常: {str(e)}")
-                
-                if attempt < max_retries - 1:
-                    # 如果不是最后一次尝试，则等待后重试
-                    retry_wait = retry_delay * (2 ** attempt)  # 指数退避
-                    time.sleep(retry_wait)
-                    continue
-                
-                # 最后一次尝试失败，提供详细错误信息
-                translations = get_translation(self.config.get('language', 'en'))
-                error_msg = translations.get('api_request_failed', 'API request failed: {error}').format(error=str(e))
-                
-                if hasattr(e, 'response') and e.response is not None:
-                    try:
-                        error_detail = e.response.json()
-                        
-                        # 根据错误类型提供更具体的错误信息
-                        if e.response.status_code == 404:
-                            error_msg = translations.get('api_version_model_error', 'API version or model name error: {message}\n\nPlease update API Base URL to "{base_url}" and model to "{model}" or other available model in settings.').format(
-                                message=error_detail.get('error', {}).get('message', ''),
-                                base_url=self.DEFAULT_API_BASE_URL,
-                                model=self.DEFAULT_MODEL
-                            )
-                        elif e.response.status_code == 400:
-                            error_msg = translations.get('api_format_error', 'API request format error: {message}').format(
-                                message=error_detail.get('error', {}).get('message', '')
-                            )
-                        elif e.response.status_code == 401:
-                            error_msg = translations.get('api_key_invalid', 'API Key invalid or unauthorized: {message}\n\nPlease check your API Key and ensure API access is enabled.').format(
-                                message=error_detail.get('error', {}).get('message', '')
-                            )
-                        elif e.response.status_code == 429:
-                            error_msg = translations.get('api_rate_limit', 'Request rate limit exceeded, please try again later\n\nYou may have exceeded the free usage quota. This could be due to:\n1. Too many requests per minute\n2. Too many requests per day\n3. Too many input tokens per minute')
-                    except Exception:
-                        error_msg += f" | 响应内容: {e.response.text[:200] if hasattr(e.response, 'text') else '无法解析响应'}"
-                
-                raise Exception(error_msg) from e
-    
+            raise Exception(error_msg) from e
+
     def get_model_name(self) -> str:
         """
         获取当前模型名称
@@ -548,7 +475,7 @@ class GeminiModel(BaseAIModel):
             
             # 在线模型超时时间（15秒）
             timeout_seconds = 15
-            response = requests.post(
+            response = get_session().post(
                 url,
                 headers=headers,
                 json=test_data,
@@ -10,7 +10,9 @@ from typing import Dict, Any, Optional
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 
 from .base import BaseAIModel
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_openai
 
 
 class GrokModel(BaseAIModel):
@@ -96,16 +98,7 @@ class GrokModel(BaseAIModel):
         
         data = {
             "model": self.config.get('model', self.DEFAULT_MODEL),
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            "messages": self.build_chat_messages(prompt, system_message, kwargs.get('history')),
             "temperature": kwargs.get('temperature', 0.7),
             "max_tokens": kwargs.get('max_tokens', 128000)
         }
@@ -113,6 +106,8 @@ class GrokModel(BaseAIModel):
         # 添加流式传输支持（只有明确指定 stream=True 才添加）
         if kwargs.get('stream', False):
             data['stream'] = True
+            # 最后一个片段附带用量
+            data['stream_options'] = {'include_usage': True}
             
         return data
     
@@ -132,6 +127,7 @@ class GrokModel(BaseAIModel):
         # 检查是否使用流式传输
         use_stream = kwargs.get('stream', self.config.get('enable_streaming', True))
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
         
         try:
             # 如果使用流式传输
@@ -144,7 +140,7 @@ class GrokModel(BaseAIModel):
                 api_url = f"{self.config['api_base_url']}/chat/completions"
                 
                 try:
-                    with requests.post(
+                    with get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -160,6 +156,7 @@ class GrokModel(BaseAIModel):
                                     # 处理数据行
                                     try:
                                         line_data = json.loads(line_str[6:])  # 去除 'data: ' 前缀
+                                        self._record_usage(from_openai(line_data))
                                         if 'choices' in line_data and line_data['choices']:
                                             choice = line_data['choices'][0]
                                             if 'delta' in choice and 'content' in choice['delta']:
@@ -188,84 +185,9 @@ class GrokModel(BaseAIModel):
                 
                 except Exception as e:
                     logger.error(f"流式处理异常: {str(e)}")
-                    # 记录异常时的状态
                     logger.warning(f"异常发生时状态: 已接收 {chunk_count} 块, 总长度: {len(full_content)}")
-                    
-                    # 如果已经有内容，尝试恢复连接
-                    if full_content:
-                        logger.info("尝试恢复连接以获取完整响应...")
-                        try:
-                            # 保存当前已接收的内容
-                            current_content = full_content
-                            
-                            # 重新构建请求，添加标记表示这是恢复请求
-                            recovery_data = self.prepare_request_data(prompt, **kwargs)
-                            
-                            # 检查响应是否可能不完整（例如缺少结束标点或代码块未闭合）
-                            unclosed_code_blocks = full_content.count('```') % 2
-                            
-                            # 添加恢复标记，让模型知道这是继续之前的对话
-                            translations = get_translation(self.config.get('language', 'en'))
-                            recovery_prompt = translations.get('stream_continue_prompt', 'Please continue your previous answer without repeating content already provided.')
-                            
-                            # 根据不同的不完整情况生成不同的恢复提示
-                            if unclosed_code_blocks:
-                                recovery_prompt += " " + translations.get('stream_continue_code_blocks', 'Your previous answer had unclosed code blocks. Please continue and complete these code blocks.')
-                            
-                            # 为恢复请求添加用户消息
-                            recovery_data['messages'].append({
-                                "role": "user",
-                                "content": recovery_prompt
-                            })
-                            
-                            # 设置更长的超时时间
-                            recovery_timeout = kwargs.get('timeout', 300) + 60
-                            
-                            logger.info(f"发起恢复请求，超时时间: {recovery_timeout}秒")
-                            
-                            # 发起恢复请求
-                            with requests.post(
-                                api_url,
-                                headers=headers,
-                                json=recovery_data,
-                                timeout=recovery_timeout,
-                                stream=True,
-                            ) as recovery_response:
-                                recovery_response.raise_for_status()
-                                logger.info(f"恢复连接成功，状态码: {recovery_response.status_code}")
-                                
-                                # 处理恢复响应
-                                for line in recovery_response.iter_lines():
-                                    if line:
-                                        line_str = line.decode('utf-8')
-                                        if line_str.startswith('data: '):
-                                            line_data_str = line_str[6:]
-                                            
-                                            if line_data_str.strip() == "[DONE]":
-                                                logger.info("恢复请求收到结束标记 [DONE]")
-                                                break
-                                            
-                                            try:
-                                                line_data = json.loads(line_data_str)
-                                                if 'choices' in line_data and line_data['choices']:
-                                                    choice = line_data['choices'][0]
-                                                    if 'delta' in choice and 'content' in choice['delta']:
-                                                        chunk_text = choice['delta']['content']
-                                                        if chunk_text:
-                                                            full_content += chunk_text
-                                                            stream_callback(chunk_text)
-                                                            chunk_count += 1
-                                                            last_chunk_time = time.time()
-                                            except json.JSONDecodeError as je:
-                                                logger.error(f"恢复请求JSON解析错误: {str(je)}")
-                                                continue
-                                
-                                logger.info(f"恢复请求完成，新增内容长度: {len(full_content) - len(current_content)}")
-                        except Exception as recovery_e:
-                            logger.error(f"恢复连接失败: {str(recovery_e)}")
-                            logger.warning(f"将返回已接收的 {len(full_content)} 字符内容")
-                    else:
-                        raise  # 如果没有内容，抛出异常
+                    # 重试由 APIClient 统一处理（已输出部分内容时不会重放请求）
+                    raise
                 
                 logger.debug(f"流式请求完成, 总内容长度: {len(full_content)}字符")
                 return full_content
@@ -286,7 +208,7 @@ class GrokModel(BaseAIModel):
                     # 记录请求数据
                     logger.debug(f"请求数据: {json.dumps(data, ensure_ascii=False)[:500]}...")
                     
-                    response = requests.post(
+                    response = get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -297,6 +219,7 @@ class GrokModel(BaseAIModel):
                     logger.debug(f"Grok响应状态: {response.status_code}, 响应长度: {len(response.text)}")
                     
                     result = response.json()
+                    self._record_usage(from_openai(result))
                     
                     if 'choices' in result and result['choices'] and len(result['choices']) > 0:
                         if 'message' in result['choices'][0] and 'content' in result['choices'][0]['message']:
@@ -10,7 +10,9 @@ from typing import Dict, Any, Optional
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 
 from .base import BaseAIModel, format_http_error
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_openai
 
 
 class NvidiaModel(BaseAIModel):
@@ -109,16 +111,7 @@ class NvidiaModel(BaseAIModel):
         
         data = {
             "model": self.config.get('model', self.DEFAULT_MODEL),
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            "messages": self.build_chat_messages(prompt, system_message, kwargs.get('history')),
             "temperature": kwargs.get('temperature', 0.7),
             "max_tokens": kwargs.get('max_tokens', 4096)
         }
@@ -127,6 +120,8 @@ class NvidiaModel(BaseAIModel):
         # The stream parameter should already be set by ask() method
         if kwargs.get('stream', False):
             data['stream'] = True
+            # Usage arrives in the final chunk
+            data['stream_options'] = {'include_usage': True}
             
         return data
     
@@ -146,6 +141,7 @@ class NvidiaModel(BaseAIModel):
         
         use_stream = kwargs['stream']
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
         
         # Prepare request headers and data
         headers = self.prepare_headers()
@@ -162,7 +158,7 @@ class NvidiaModel(BaseAIModel):
                 api_url = f"{self.config['api_base_url']}/chat/completions"
                 
                 try:
-                    with requests.post(
+                    with get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -180,6 +176,7 @@ class NvidiaModel(BaseAIModel):
                                         if line_str == 'data: [DONE]':
                                             break
                                         line_data = json.loads(line_str[6:])  # Remove 'data: ' prefix
+                                        self._record_usage(from_openai(line_data))
                                         if 'choices' in line_data and line_data['choices']:
                                             choice = line_data['choices'][0]
                                             if 'delta' in choice and 'content' in choice['delta']:
@@ -219,7 +216,7 @@ class NvidiaModel(BaseAIModel):
                 logger.debug(f"Non-streaming request to: {api_url}")
                 logger.debug(f"Request data: {json.dumps({k: v for k, v in data.items() if k != 'messages'}, ensure_ascii=False)}")
                 
-                response = requests.post(
+                response = get_session().post(
                     api_url,
                     headers=headers,
                     json=data,
@@ -232,6 +229,7 @@ class NvidiaModel(BaseAIModel):
                 
                 try:
                     result = response.json()
+                    self._record_usage(from_openai(result))
                     logger.debug(f"Response JSON parsed successfully")
                     
                     if 'choices' in result and result['choices']:
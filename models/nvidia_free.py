@@ -10,7 +10,9 @@ from typing import Dict, Any, Optional
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 from .nvidia import NvidiaModel
 from .base import format_http_error
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_openai
 from ..device_fingerprint import DeviceFingerprint
 from ..env_config import EnvironmentConfig
 
@@ -106,6 +108,7 @@ class NvidiaFreeModel(NvidiaModel):
         
         use_stream = kwargs['stream']
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
         
         headers = self.prepare_headers()
         data = self.prepare_request_data(prompt, **kwargs)
@@ -121,7 +124,7 @@ class NvidiaFreeModel(NvidiaModel):
                 last_chunk_time = time.time()
                 
                 try:
-                    with requests.post(
+                    with get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -139,6 +142,7 @@ class NvidiaFreeModel(NvidiaModel):
                                         if line_str == 'data: [DONE]':
                                             break
                                         line_data = json.loads(line_str[6:])
+                                        self._record_usage(from_openai(line_data))
                                         if 'choices' in line_data and line_data['choices']:
                                             choice = line_data['choices'][0]
                                             if 'delta' in choice and 'content' in choice['delta']:
@@ -168,7 +172,7 @@ class NvidiaFreeModel(NvidiaModel):
                     raise Exception(error_msg)
             
             else:
-                response = requests.post(
+                response = get_session().post(
                     api_url,
                     headers=headers,
                     json=data,
@@ -180,6 +184,7 @@ class NvidiaFreeModel(NvidiaModel):
                 
                 try:
                     result = response.json()
+                    self._record_usage(from_openai(result))
                     
                     if 'choices' in result and result['choices']:
                         content = result['choices'][0]['message']['content']
@@ -270,7 +275,7 @@ class NvidiaFreeModel(NvidiaModel):
             if has_proxy:
                 self.logger.info(f"Detected proxy environment, disabling SSL verification for model list fetch")
             
-            response = requests.get(api_url, headers=headers, timeout=15, verify=verify_ssl)
+            response = get_session().get(api_url, headers=headers, timeout=15, verify=verify_ssl)
             response.raise_for_status()
             
             data = response.json()
@@ -307,6 +312,13 @@ class NvidiaFreeModel(NvidiaModel):
             "deepseek-ai/deepseek-r1",
         ]
     
+    def get_health_probe(self):
+        """免费代理服务器使用 /api/health"""
+        from ..health import HealthProbe
+        import os
+        has_proxy = any(os.environ.get(name) for name in ('HTTP_PROXY', 'http_proxy', 'HTTPS_PROXY', 'https_proxy'))
+        return HealthProbe(f"{self.config['api_base_url']}/api/health", {}, verify=not has_proxy)
+    
     def verify_api_key_with_test_request(self):
         """
         Test free proxy server availability using /api/health endpoint
@@ -331,7 +343,7 @@ class NvidiaFreeModel(NvidiaModel):
             if has_proxy:
                 self.logger.info(f"Detected proxy environment, disabling SSL verification for health check")
             
-            response = requests.get(api_url, timeout=10, verify=verify_ssl)
+            response = get_session().get(api_url, timeout=10, verify=verify_ssl)
             
             if response.status_code == 200:
                 try:
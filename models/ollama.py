@@ -6,16 +6,29 @@ Ollama 使用自定义 API 格式，与 OpenAI 不兼容
 import json
 import time
 import logging
+import threading
 from typing import Dict, Any, List, Optional
 
 # 从 vendor 命名空间导入第三方库
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 
 from .base import BaseAIModel
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..token_estimator import estimate_tokens, local_context_size
+from ..usage import from_ollama
 
 logger = logging.getLogger('calibre_plugins.ask_ai_plugin.models.ollama')
 
+# (api_base_url, model) -> (/api/show 报告的最大上下文, 过期时间)
+# 查询失败时缓存 None，过期前不再请求，避免每次提问都等待超时
+_context_length_cache = {}
+CONTEXT_LOOKUP_RETRY_SECONDS = 300
+# (api_base_url, model) -> 本次会话已使用的最大 num_ctx
+# num_ctx 变化会让 Ollama 重新加载模型，因此只增不减
+_num_ctx_in_use = {}
+_cache_lock = threading.Lock()
+
 
 class OllamaModel(BaseAIModel):
     """
@@ -27,6 +40,14 @@ class OllamaModel(BaseAIModel):
     DEFAULT_MODEL = "minimax-m3"
     # 默认 API 基础 URL
     DEFAULT_API_BASE_URL = "http://localhost:11434"
+    # 默认嵌入模型（语义 AI 搜索）
+    DEFAULT_EMBEDDING_MODEL = "nomic-embed-text"
+    # 默认模型常驻时间（Ollama 默认 5 分钟后卸载）
+    DEFAULT_KEEP_ALIVE = "30m"
+    # 估算 num_ctx 时为回答预留的 token 数
+    DEFAULT_OUTPUT_TOKENS = 2048
+    # prompt_eval_count 不含 KV 缓存中复用的前缀，多轮对话时偏小
+    REPORTS_FULL_INPUT_TOKENS = False
     
     def _validate_config(self):
         """
@@ -107,21 +128,17 @@ class OllamaModel(BaseAIModel):
         # Ollama 格式
         data = {
             "model": self.config.get('model', self.DEFAULT_MODEL),
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
+            "messages": self.build_chat_messages(prompt, system_message, kwargs.get('history'))
         }
         
-        # 添加可选参数
+        # 采样参数放在 options 中（放在顶层会被 Ollama 忽略）
+        options = {'num_ctx': self.get_num_ctx(data['messages'], kwargs.get('max_tokens'))}
         if 'temperature' in kwargs:
-            data['temperature'] = kwargs['temperature']
+            options['temperature'] = kwargs['temperature']
+        if kwargs.get('max_tokens'):
+            options['num_predict'] = kwargs['max_tokens']
+        data['options'] = options
+        data['keep_alive'] = self.get_keep_alive()
         
         # 添加流式传输支持
         if kwargs.get('stream', False):
@@ -131,6 +148,125 @@ class OllamaModel(BaseAIModel):
         
         return data
     
+    def get_keep_alive(self):
+        """
+        模型在 Ollama 中的常驻时间（如 "30m"、"2h"；"-1" 表示一直常驻，"0" 表示用完即卸载）
+        
+        :return: 时长字符串或秒数
+        """
+        value = str(self.config.get('keep_alive') or self.DEFAULT_KEEP_ALIVE).strip()
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    
+    def _cache_key(self):
+        return (self.config.get('api_base_url', '').rstrip('/'), self.config.get('model', self.DEFAULT_MODEL))
+    
+    def get_context_length(self) -> Optional[int]:
+        """
+        通过 /api/show 获取模型支持的最大上下文（结果按模型缓存，失败结果缓存
+        CONTEXT_LOOKUP_RETRY_SECONDS 秒）
+        
+        :return: token 数；获取失败时返回 None
+        """
+        key = self._cache_key()
+        with _cache_lock:
+            cached = _context_length_cache.get(key)
+            if cached is not None and (cached[1] is None or time.monotonic() < cached[1]):
+                return cached[0]
+        try:
+            response = get_session().post(
+                f"{key[0]}/api/show",
+                headers=self.prepare_headers(),
+                json={"model": key[1]},
+                timeout=10,
+                verify=False
+            )
+            response.raise_for_status()
+            model_info = response.json().get('model_info') or {}
+        except Exception as e:
+            logger.warning(f"[Ollama] 无法获取模型 {key[1]} 的上下文长度: {str(e)}")
+            with _cache_lock:
+                _context_length_cache[key] = (None, time.monotonic() + CONTEXT_LOOKUP_RETRY_SECONDS)
+            return None
+        length = None
+        for name, value in model_info.items():
+            if name.endswith('.context_length') and isinstance(value, int) and value > 0:
+                length = value
+                break
+        with _cache_lock:
+            _context_length_cache[key] = (length, None)
+        logger.info(f"[Ollama] 模型 {key[1]} 最大上下文: {length}")
+        return length
+    
+    def get_num_ctx(self, messages: Optional[List[Dict[str, str]]] = None, max_tokens: Optional[int] = None) -> int:
+        """
+        计算请求的 num_ctx
+        
+        配置了固定值时直接使用；否则按消息的估算 token 数取整到 2 的幂，
+        不超过模型支持的最大上下文。同一模型在会话中只增不减，避免反复重新加载。
+        
+        :param messages: 将要发送的消息（为空时只返回当前使用的大小）
+        :param max_tokens: 回答的 token 上限
+        :return: num_ctx
+        """
+        configured = self.config.get('num_ctx')
+        if configured not in (None, ''):
+            try:
+                if int(configured) > 0:
+                    return int(configured)
+            except (TypeError, ValueError):
+                logger.warning(f"[Ollama] 忽略无效的 num_ctx 配置: {configured}")
+        
+        prompt_tokens = sum(estimate_tokens(message.get('content', '')) for message in messages or [])
+        output_tokens = int(max_tokens) if max_tokens else self.DEFAULT_OUTPUT_TOKENS
+        model_max = self.get_context_length()
+        key = self._cache_key()
+        with _cache_lock:
+            size = local_context_size(prompt_tokens, output_tokens, model_max)
+            size = max(size, _num_ctx_in_use.get(key, 0))
+            _num_ctx_in_use[key] = size
+        if prompt_tokens + output_tokens > size:
+            logger.warning(f"[Ollama] 提示词约 {prompt_tokens} tokens，超过模型上下文 {size}，Ollama 会截断较早的内容")
+        return size
+    
+    def get_health_probe(self):
+        """Ollama 使用 /api/tags（本地服务，跳过证书校验）"""
+        from ..health import HealthProbe
+        return HealthProbe(f"{self.config['api_base_url']}/api/tags", self.prepare_headers(), verify=False)
+    
+    def preload(self) -> bool:
+        """
+        让 Ollama 在后台加载模型（不带 prompt 的 generate 请求只加载模型，不生成内容）
+        
+        使用该模型当前的 num_ctx（首次为最小值 LOCAL_CONTEXT_MIN）和 keep_alive。
+        提问时 num_ctx 只增不减，放得下的问题直接使用已加载的模型；
+        提示词超过这个大小时 Ollama 会按更大的 num_ctx 重新加载一次。
+        
+        :return: 加载成功返回 True
+        """
+        key = self._cache_key()
+        started = time.time()
+        try:
+            response = get_session().post(
+                f"{key[0]}/api/generate",
+                headers=self.prepare_headers(),
+                json={
+                    "model": key[1],
+                    "keep_alive": self.get_keep_alive(),
+                    "options": {"num_ctx": self.get_num_ctx()},
+                },
+                timeout=self.config.get('preload_timeout', 300),
+                verify=False
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"[Ollama] 预加载模型 {key[1]} 失败: {str(e)}")
+            return False
+        logger.info(f"[Ollama] 已预加载模型 {key[1]}，耗时 {time.time() - started:.1f} 秒")
+        return True
+    
     def ask(self, prompt: str, **kwargs) -> str:
         """
         向 Ollama API 发送提示并获取响应
@@ -146,6 +282,7 @@ class OllamaModel(BaseAIModel):
         
         use_stream = kwargs['stream']
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
         
         # 准备请求头和数据
         headers = self.prepare_headers()
@@ -164,7 +301,7 @@ class OllamaModel(BaseAIModel):
                 logger.debug(f"Request data: {json.dumps(data, ensure_ascii=False)[:200]}...")
                 
                 try:
-                    with requests.post(
+                    with get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -191,6 +328,8 @@ class OllamaModel(BaseAIModel):
                                     
                                     # 检查是否完成
                                     if line_data.get('done', False):
+                                        # 最后一行带有 prompt_eval_count / eval_count
+                                        self._record_usage(from_ollama(line_data))
                                         logger.info(f"Ollama streaming completed, received {chunk_count} chunks, total length: {len(full_content)}")
                                         break
                                         
@@ -212,7 +351,7 @@ class OllamaModel(BaseAIModel):
                 logger.debug(f"Ollama non-streaming request to: {api_url}")
                 logger.debug(f"Request data: {json.dumps(data, ensure_ascii=False)[:200]}...")
                 
-                response = requests.post(
+                response = get_session().post(
                     api_url,
                     headers=headers,
                     json=data,
@@ -223,6 +362,7 @@ class OllamaModel(BaseAIModel):
                 
                 result = response.json()
                 logger.debug(f"Ollama response status: {response.status_code}, response length: {len(response.text)}")
+                self._record_usage(from_ollama(result))
                 
                 # Ollama 非流式响应格式：{"message": {"role": "assistant", "content": "..."}}
                 if 'message' in result and 'content' in result['message']:
@@ -283,7 +423,7 @@ class OllamaModel(BaseAIModel):
             timeout_seconds = prefs.get('request_timeout', 30)
             logger.info(f"[Ollama] 获取模型列表超时时间: {timeout_seconds} 秒")
             
-            response = requests.get(
+            response = get_session().get(
                 api_url,
                 headers=headers,
                 timeout=timeout_seconds,
@@ -390,6 +530,51 @@ class OllamaModel(BaseAIModel):
             logger.error(f"Ollama request error: {str(e)}")
             raise Exception(error_msg)
     
+    def embed(self, texts: List[str], model: Optional[str] = None, timeout: float = 120) -> List[List[float]]:
+        """
+        调用 Ollama 嵌入端点批量生成向量
+        
+        优先使用 /api/embed（批量），旧版 Ollama 返回 404 时回退到 /api/embeddings（逐条）
+        
+        :param texts: 文本列表
+        :param model: 嵌入模型名称，默认 embedding_model 配置或 DEFAULT_EMBEDDING_MODEL
+        :param timeout: 请求超时时间（秒）
+        :return: 与 texts 等长的向量列表
+        """
+        if not texts:
+            return []
+        model = model or self.config.get('embedding_model') or self.DEFAULT_EMBEDDING_MODEL
+        headers = self.prepare_headers()
+        base_url = self.config.get('api_base_url', self.DEFAULT_API_BASE_URL).rstrip('/')
+        
+        response = get_session().post(
+            f"{base_url}/api/embed",
+            headers=headers,
+            json={"model": model, "input": list(texts)},
+            timeout=timeout,
+            verify=False
+        )
+        if response.status_code != 404:
+            response.raise_for_status()
+            embeddings = response.json().get('embeddings') or []
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Ollama returned {len(embeddings)} embeddings for {len(texts)} inputs")
+            return embeddings
+        
+        logger.info("Ollama /api/embed 不可用，回退到 /api/embeddings")
+        embeddings = []
+        for text in texts:
+            response = get_session().post(
+                f"{base_url}/api/embeddings",
+                headers=headers,
+                json={"model": model, "prompt": text},
+                timeout=timeout,
+                verify=False
+            )
+            response.raise_for_status()
+            embeddings.append(response.json().get('embedding') or [])
+        return embeddings
+    
     def supports_streaming(self) -> bool:
         """
         检查 Ollama 模型是否支持流式传输
@@ -468,7 +653,7 @@ class OllamaModel(BaseAIModel):
             timeout_seconds = prefs.get('request_timeout', 30)
             logger.info(f"[{provider_name}] 使用超时时间: {timeout_seconds} 秒")
             
-            response = requests.post(
+            response = get_session().post(
                 test_url,
                 json=test_data,
                 timeout=timeout_seconds,
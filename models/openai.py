@@ -10,7 +10,9 @@ from typing import Dict, Any, Optional
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 
 from .base import BaseAIModel
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_openai
 
 
 class OpenAIModel(BaseAIModel):
@@ -97,16 +99,7 @@ class OpenAIModel(BaseAIModel):
         
         data = {
             "model": self.config.get('model', self.DEFAULT_MODEL),
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            "messages": self.build_chat_messages(prompt, system_message, kwargs.get('history')),
             "temperature": kwargs.get('temperature', 0.7),
             "max_tokens": kwargs.get('max_tokens', 4096)
         }
@@ -114,6 +107,8 @@ class OpenAIModel(BaseAIModel):
         # Add streaming support (only add if explicitly set to True)
         if kwargs.get('stream', False):
             data['stream'] = True
+            # 最后一个片段附带用量
+            data['stream_options'] = {'include_usage': True}
             
         return data
     
@@ -133,6 +128,7 @@ class OpenAIModel(BaseAIModel):
         # Check if using streaming
         use_stream = kwargs.get('stream', self.config.get('enable_streaming', True))
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
         
         try:
             # If using streaming
@@ -145,7 +141,7 @@ class OpenAIModel(BaseAIModel):
                 api_url = f"{self.config['api_base_url']}/chat/completions"
                 
                 try:
-                    with requests.post(
+                    with get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -163,6 +159,7 @@ class OpenAIModel(BaseAIModel):
                                         if line_str == 'data: [DONE]':
                                             break
                                         line_data = json.loads(line_str[6:])  # Remove 'data: ' prefix
+                                        self._record_usage(from_openai(line_data))
                                         if 'choices' in line_data and line_data['choices']:
                                             choice = line_data['choices'][0]
                                             if 'delta' in choice and 'content' in choice['delta']:
@@ -198,7 +195,7 @@ class OpenAIModel(BaseAIModel):
             # Non-streaming mode
             else:
                 api_url = f"{self.config['api_base_url']}/chat/completions"
-                response = requests.post(
+                response = get_session().post(
                     api_url,
                     headers=headers,
                     json=data,
@@ -207,6 +204,7 @@ class OpenAIModel(BaseAIModel):
                 response.raise_for_status()
                 
                 result = response.json()
+                self._record_usage(from_openai(result))
                 if 'choices' in result and result['choices']:
                     return result['choices'][0]['message']['content']
                 else:
@@ -240,6 +238,28 @@ class OpenAIModel(BaseAIModel):
         """
         pass
     
+    def supports_batch(self) -> bool:
+        """
+        OpenAI Batch API is available for bulk background jobs
+        
+        :return: True
+        """
+        return True
+    
+    def create_batch_api(self):
+        """
+        Create the OpenAI Batch API client used by background jobs
+        
+        :return: OpenAIBatchAPI instance
+        """
+        from ..provider_batch import OpenAIBatchAPI
+        return OpenAIBatchAPI(
+            self.config['api_base_url'],
+            self.prepare_headers(),
+            lambda prompt: self.prepare_request_data(prompt, stream=False),
+            get_session(),
+        )
+    
     def get_model_name(self) -> str:
         """
         Get current model name
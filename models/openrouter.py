@@ -7,7 +7,9 @@ import logging
 from typing import Dict, Any
 
 from .base import BaseAIModel
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_openai
 
 logger = logging.getLogger('calibre_plugins.ask_ai_plugin.models.openrouter')
 
@@ -152,16 +154,7 @@ class OpenRouterModel(BaseAIModel):
         
         data = {
             "model": self.config.get('model', self.DEFAULT_MODEL),
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            "messages": self.build_chat_messages(prompt, system_message, kwargs.get('history')),
             "temperature": kwargs.get('temperature', 0.7),
             "max_tokens": kwargs.get('max_tokens', 4096)
         }
@@ -169,6 +162,8 @@ class OpenRouterModel(BaseAIModel):
         # 添加流式传输支持（只有明确指定 stream=True 才添加）
         if kwargs.get('stream', False):
             data['stream'] = True
+            # 最后一个片段附带用量
+            data['usage'] = {'include': True}
             
         return data
     
@@ -188,6 +183,7 @@ class OpenRouterModel(BaseAIModel):
         # 检查是否启用流式传输
         use_streaming = kwargs.get('stream', False)
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
         
         # 准备请求头和数据
         headers = self.prepare_headers()
@@ -207,7 +203,7 @@ class OpenRouterModel(BaseAIModel):
                 last_chunk_time = time.time()
                 
                 try:
-                    with requests.post(
+                    with get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -225,6 +221,7 @@ class OpenRouterModel(BaseAIModel):
                                         if line_str == 'data: [DONE]':
                                             break
                                         line_data = json.loads(line_str[6:])  # 去除 'data: ' 前缀
+                                        self._record_usage(from_openai(line_data))
                                         if 'choices' in line_data and line_data['choices']:
                                             choice = line_data['choices'][0]
                                             if 'delta' in choice and 'content' in choice['delta']:
@@ -258,7 +255,7 @@ class OpenRouterModel(BaseAIModel):
                 logger.debug("Using non-streaming mode, expecting standard JSON response")
                 
                 try:
-                    response = requests.post(
+                    response = get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -269,6 +266,7 @@ class OpenRouterModel(BaseAIModel):
                     
                     # 解析标准 JSON 响应
                     result = response.json()
+                    self._record_usage(from_openai(result))
                     logger.debug(f"Received JSON response: {json.dumps(result)[:200]}...")
                     
                     # 提取内容
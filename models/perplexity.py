@@ -16,7 +16,9 @@ from typing import Dict, Any
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import requests
 
 from .base import BaseAIModel
+from ..http_pool import get_session
 from ..i18n import get_translation
+from ..usage import from_openai
 
 
 logger = logging.getLogger('calibre_plugins.ask_ai_plugin.models.perplexity')
@@ -88,6 +90,11 @@ class PerplexityModel(BaseAIModel):
             "Authorization": token,
         }
 
+    def get_health_probe(self):
+        """模型列表端点不稳定，只检查可以连接且 Key 没有被拒绝"""
+        probe = super().get_health_probe()
+        return probe._replace(reachability_only=True)
+    
     def supports_streaming(self) -> bool:
         return True
 
@@ -118,10 +125,7 @@ class PerplexityModel(BaseAIModel):
 
         data: Dict[str, Any] = {
             "model": self.config.get('model', self.DEFAULT_MODEL),
-            "messages": [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt},
-            ],
+            "messages": self.build_chat_messages(prompt, system_message, kwargs.get('history')),
             "temperature": kwargs.get('temperature', 0.7),
             "max_tokens": kwargs.get('max_tokens', 4096),
         }
@@ -153,6 +157,7 @@ class PerplexityModel(BaseAIModel):
 
         use_stream = kwargs.get('stream', self.config.get('enable_streaming', True))
         stream_callback = kwargs.get('stream_callback', None)
+        self.last_usage = None
 
         api_url = f"{self.config['api_base_url'].rstrip('/')}/chat/completions"
         try:
@@ -165,7 +170,7 @@ class PerplexityModel(BaseAIModel):
                 latest_snapshot = ""
 
                 try:
-                    with requests.post(
+                    with get_session().post(
                         api_url,
                         headers=headers,
                         json=data,
@@ -202,6 +207,8 @@ class PerplexityModel(BaseAIModel):
                             if not isinstance(chunk, dict):
                                 return True
 
+                            self._record_usage(from_openai(chunk))
+
                             if isinstance(chunk.get('citations'), list):
                                 citations = chunk.get('citations') or citations
                             if isinstance(chunk.get('search_results'), list):
@@ -315,7 +322,7 @@ class PerplexityModel(BaseAIModel):
                     )
 
             # Non-streaming mode
-            response = requests.post(
+            response = get_session().post(
                 api_url,
                 headers=headers,
                 json=data,
@@ -324,6 +331,7 @@ class PerplexityModel(BaseAIModel):
             response.raise_for_status()
 
             result = response.json()
+            self._record_usage(from_openai(result))
             if 'choices' in result and result['choices']:
                 content = result['choices'][0]['message']['content']
                 if is_random_question:
@@ -0,0 +1,551 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Plugin preferences, their defaults and migrations (re-exported by config.py)."""
+
+import logging
+
+from calibre.utils.config import JSONConfig
+from .env_config import EnvironmentConfig
+from .i18n import get_default_template, get_translation, get_multi_book_template, get_all_languages
+from .models.base import AIProvider, ModelConfig, DEFAULT_MODELS
+from .prompt_limits import DEFAULT_CUSTOM_LIMIT
+
+# 初始化日志
+logger = logging.getLogger(__name__)
+
+# 创建配置对象
+prefs = JSONConfig('plugins/ask_ai_plugin')
+
+# 从i18n模块获取支持的语言列表
+# 将字典转换为列表格式 [(code, name), ...]
+_languages_dict = get_all_languages()
+SUPPORTED_LANGUAGES = [(code, name) for code, name in _languages_dict.items()]
+# 确保英语作为默认语言排在第一位
+SUPPORTED_LANGUAGES.sort(key=lambda x: 0 if x[0] == 'en' else 1)
+
+# 获取AI服务商配置的函数
+def get_current_model_config(provider: AIProvider) -> ModelConfig:
+    """获取指定AI服务商的模型配置"""
+    return DEFAULT_MODELS.get(provider)
+
+# 获取AI服务商配置
+GROK_CONFIG = get_current_model_config(AIProvider.AI_GROK)
+GEMINI_CONFIG = get_current_model_config(AIProvider.AI_GEMINI)
+DEEPSEEK_CONFIG = get_current_model_config(AIProvider.AI_DEEPSEEK)
+CUSTOM_CONFIG = get_current_model_config(AIProvider.AI_CUSTOM)
+OPENAI_CONFIG = get_current_model_config(AIProvider.AI_OPENAI)
+ANTHROPIC_CONFIG = get_current_model_config(AIProvider.AI_ANTHROPIC)
+NVIDIA_CONFIG = get_current_model_config(AIProvider.AI_NVIDIA)
+NVIDIA_FREE_CONFIG = get_current_model_config(AIProvider.AI_NVIDIA_FREE)
+OPENROUTER_CONFIG = get_current_model_config(AIProvider.AI_OPENROUTER)
+PERPLEXITY_CONFIG = get_current_model_config(AIProvider.AI_PERPLEXITY)
+OLLAMA_CONFIG = get_current_model_config(AIProvider.AI_OLLAMA)
+
+AI_PROVIDER_ORDER = [
+    'openai', 'anthropic', 'gemini', 'grok', 'deepseek',
+    'nvidia', 'nvidia_free', 'perplexity', 'openrouter', 'ollama', 'custom',
+]
+
+
+def extract_provider_id(config_id, config):
+    """从配置中提取 provider_id（兼容旧数据）。"""
+    provider_id = (config or {}).get('provider_id')
+    if provider_id:
+        return provider_id
+    if '_' in config_id:
+        return config_id.split('_', 1)[0]
+    return config_id
+
+
+def is_ai_config_complete(provider_id, model_config):
+    """统一判断 AI 配置是否完整。"""
+    provider_id = (provider_id or '').strip()
+    config = model_config or {}
+
+    if provider_id in ['ollama', 'custom', 'nvidia_free']:
+        has_auth = True
+    else:
+        api_key_field = 'auth_token' if provider_id == 'grok' else 'api_key'
+        has_auth = bool((config.get(api_key_field) or '').strip())
+
+    has_model = bool((config.get('model') or '').strip())
+    return has_auth and has_model
+
+
+def get_provider_display_name(provider_id, config, i18n=None):
+    """获取服务商显示名，确保不为空。"""
+    if provider_id == 'nvidia_free':
+        free_text = (i18n or {}).get('free', 'Free')
+        return f"Nvidia AI ({free_text})"
+
+    provider_name = (config or {}).get('display_name')
+    if provider_name and str(provider_name).strip():
+        return str(provider_name).strip()
+
+    fallback = provider_id.replace('_', ' ').strip().title() if provider_id else ''
+    return fallback or 'AI'
+
+
+def build_ai_display_text(config_id, config, i18n=None, include_model_placeholder=False):
+    """构建 AI 显示文本，避免空白项。"""
+    provider_id = extract_provider_id(config_id, config or {})
+    provider_name = get_provider_display_name(provider_id, config or {}, i18n=i18n)
+    model_name = ((config or {}).get('model') or '').strip()
+
+    if model_name:
+        return f"{provider_name} - {model_name}"
+    if include_model_placeholder:
+        unspecified_text = (i18n or {}).get('unspecified_model', 'Unspecified model')
+        return f"{provider_name} - {unspecified_text}"
+    return provider_name
+
+
+def _stable_number_duplicate_labels(configured_items):
+    """为重复显示名添加稳定序号，输出顺序稳定。"""
+    grouped = {}
+    for item in configured_items:
+        grouped.setdefault(item['base_text'], []).append(item)
+
+    normalized = []
+    for base_text, items in grouped.items():
+        if len(items) == 1:
+            normalized.append((items[0]['config_id'], base_text, items[0]['sort_key'], items[0]['is_default']))
+            continue
+
+        items_sorted = sorted(items, key=lambda x: x['config_id'])
+        for idx, entry in enumerate(items_sorted, start=1):
+            normalized.append((
+                entry['config_id'],
+                f"{base_text} ({idx})",
+                entry['sort_key'],
+                entry['is_default'],
+            ))
+
+    normalized.sort(key=lambda x: (x[2], x[1].lower(), x[0]))
+    return normalized
+
+
+def build_configured_ai_entries(models_config, selected_model='', i18n=None, include_model_placeholder=False):
+    """构建已配置 AI 条目：统一过滤、显示与排序。"""
+    configured_items = []
+    for config_id, config in (models_config or {}).items():
+        provider_id = extract_provider_id(config_id, config or {})
+        if not is_ai_config_complete(provider_id, config or {}):
+            continue
+
+        base_text = build_ai_display_text(
+            config_id,
+            config or {},
+            i18n=i18n,
+            include_model_placeholder=include_model_placeholder,
+        )
+        sort_key = AI_PROVIDER_ORDER.index(provider_id) if provider_id in AI_PROVIDER_ORDER else 999
+        configured_items.append({
+            'config_id': config_id,
+            'base_text': base_text.strip() or 'AI',
+            'sort_key': sort_key,
+            'is_default': (config_id == selected_model),
+        })
+
+    configured_items.sort(key=lambda x: (x['sort_key'], x['base_text'].lower(), x['config_id']))
+    return _stable_number_duplicate_labels(configured_items)
+
+# 默认配置
+prefs.defaults['selected_model'] = 'nvidia_free'  # 当前选中的模型（默认使用免费通道）
+prefs.defaults['force_default_ai_on_next_open'] = False  # 配置页改默认AI后，下次打开 Ask 强制应用一次
+prefs.defaults['models'] = {
+    'grok': {
+        'auth_token': '',
+        'api_base_url': GROK_CONFIG.default_api_base_url,
+        'model': GROK_CONFIG.default_model_name,
+        'display_name': GROK_CONFIG.display_name,
+        'enabled': True
+    },
+    'gemini': {
+        'api_key': '',
+        'api_base_url': GEMINI_CONFIG.default_api_base_url,
+        'model': GEMINI_CONFIG.default_model_name,
+        'display_name': GEMINI_CONFIG.display_name,
+        'enabled': False  # 默认不启用，需要用户配置
+    },
+    'deepseek': {
+        'api_key': '',
+        'api_base_url': DEEPSEEK_CONFIG.default_api_base_url,
+        'model': DEEPSEEK_CONFIG.default_model_name,
+        'display_name': DEEPSEEK_CONFIG.display_name,        
+        'enabled': False  # 默认不启用，需要用户配置
+    },
+    'custom': {
+        'api_key': '',
+        'api_base_url': CUSTOM_CONFIG.default_api_base_url,
+        'model': CUSTOM_CONFIG.default_model_name,
+        'display_name': CUSTOM_CONFIG.display_name,
+        'enable_streaming': True,
+        'enabled': False  # 默认不启用，需要用户配置
+    },
+    'openai': {
+        'api_key': '',
+        'api_base_url': OPENAI_CONFIG.default_api_base_url,
+        'model': OPENAI_CONFIG.default_model_name,
+        'display_name': OPENAI_CONFIG.display_name,
+        'enable_streaming': True,
+        'enabled': False  # 默认不启用，需要用户配置
+    },
+    'anthropic': {
+        'api_key': '',
+        'api_base_url': ANTHROPIC_CONFIG.default_api_base_url,
+        'model': ANTHROPIC_CONFIG.default_model_name,
+        'display_name': ANTHROPIC_CONFIG.display_name,
+        'enable_streaming': True,
+        'enabled': False  # 默认不启用，需要用户配置
+    },
+    'nvidia': {
+        'api_key': '',
+        'api_base_url': NVIDIA_CONFIG.default_api_base_url,
+        'model': NVIDIA_CONFIG.default_model_name,
+        'display_name': NVIDIA_CONFIG.display_name,
+        'enable_streaming': True,
+        'enabled': False  # 默认不启用，需要用户配置
+    },
+    'openrouter': {
+        'api_key': '',
+        'api_base_url': OPENROUTER_CONFIG.default_api_base_url,
+        'model': OPENROUTER_CONFIG.default_model_name,
+        'display_name': OPENROUTER_CONFIG.display_name,
+        'enable_streaming': True,
+        'http_referer': '',  # Optional: for ranking on OpenRouter
+        'x_title': 'Ask AI Plugin',  # Optional: app name
+        'enabled': False  # 默认不启用，需要用户配置
+    },
+    'perplexity': {
+        'api_key': '',
+        'api_base_url': PERPLEXITY_CONFIG.default_api_base_url,
+        'model': PERPLEXITY_CONFIG.default_model_name,
+        'display_name': PERPLEXITY_CONFIG.display_name,
+        'enable_streaming': True,
+        'enabled': False  # 默认不启用，需要用户配置
+    },
+    'ollama': {
+        'api_key': '',  # Optional for Ollama (local service)
+        'api_base_url': OLLAMA_CONFIG.default_api_base_url,
+        'model': OLLAMA_CONFIG.default_model_name,
+        'display_name': OLLAMA_CONFIG.display_name,
+        'enable_streaming': True,
+        'num_ctx': '',  # 空值表示按提示词长度自动调整
+        'keep_alive': '30m',  # 模型在 Ollama 中的常驻时间
+        'enabled': False  # 默认不启用，需要用户配置
+    },
+    'nvidia_free': {
+        'api_key': 'free-tier',  # 免费通道不需要真实 API Key
+        'proxy_url': EnvironmentConfig.get_nvidia_free_proxy_url(),
+        'api_base_url': EnvironmentConfig.get_nvidia_free_proxy_url(),
+        'model': NVIDIA_FREE_CONFIG.default_model_name,
+        'display_name': NVIDIA_FREE_CONFIG.display_name,
+        'enable_streaming': True,
+        'enabled': True,  # 默认启用免费通道
+        'provider_id': 'nvidia_free'
+    }
+}
+prefs.defaults['template'] = get_default_template('en')
+prefs.defaults['multi_book_template'] = get_multi_book_template('en')
+prefs.defaults['language'] = 'en'
+prefs.defaults['language_user_set'] = False
+prefs.defaults['ask_dialog_width'] = 800
+prefs.defaults['ask_dialog_height'] = 600
+prefs.defaults['random_questions'] = ''  # v1.3.9: Changed from dict to string (prompt template)
+prefs.defaults['request_timeout'] = 120  # Default timeout in seconds
+prefs.defaults['parallel_ai_count'] = 1  # Number of parallel AI requests (1-4)
+prefs.defaults['cached_models'] = {}  # Cached model lists for each AI provider
+prefs.defaults['nvidia_free_first_use_shown'] = False  # Track if first use reminder has been shown
+
+# Export settings
+prefs.defaults['enable_default_export_folder'] = False  # Whether to export to default folder
+prefs.defaults['default_export_folder'] = ''  # Default export folder path
+prefs.defaults['copy_mode'] = 'response'  # Copy mode: 'response' or 'qa'
+prefs.defaults['export_mode'] = 'current'  # Export mode: 'current' or 'history'
+
+# Persona settings
+prefs.defaults['use_persona'] = True  # Whether to use persona in prompts
+prefs.defaults['persona'] = 'As a researcher, I want to research through book data.'  # User's persona text
+
+# Language preference settings (v1.3.9)
+prefs.defaults['use_interface_language'] = False  # Whether to ask AI to respond in interface language
+
+# Library Chat settings (v1.4.2 MVP)
+prefs.defaults['library_chat_enabled'] = False  # Enable library chat feature
+prefs.defaults['library_cached_metadata'] = ''  # Cached library metadata (JSON string)
+prefs.defaults['library_last_update'] = ''  # Last update timestamp (ISO format)
+prefs.defaults['library_prompt_format'] = 'tsv'  # Compact book list format: 'tsv' or 'dictionary' (author/series codes)
+prefs.defaults['ai_search_semantic_enabled'] = False  # Prefilter AI Search books with the local embedding index
+prefs.defaults['ai_search_semantic_top_k'] = 200  # Number of most relevant books sent to the AI in semantic mode
+prefs.defaults['ai_search_embedding_model'] = 'nomic-embed-text'  # Ollama embedding model for the semantic index
+prefs.defaults['book_passages_max_chars'] = 8000  # Size cap for book text injected through the {passages} template variable
+prefs.defaults['book_passages_use_embeddings'] = False  # Rerank {passages} candidates with the Ollama embedding model
+prefs.defaults['conversation_context_enabled'] = True  # Send earlier turns as native messages with follow-up questions
+prefs.defaults['conversation_context_tokens'] = 8000  # Token budget for earlier turns before they are compacted
+prefs.defaults['conversation_summary_ai'] = ''  # Optional AI id used to summarise compacted turns (empty: drop them)
+prefs.defaults['batch_max_concurrency'] = 4  # Parallel requests for Ask Each Book batches
+prefs.defaults['batch_provider_concurrency'] = 2  # Max simultaneous batch requests to one AI provider
+prefs.defaults['job_queue_max_workers'] = 4  # Parallel requests for background column jobs
+prefs.defaults['job_queue_provider_concurrency'] = 2  # Max simultaneous background job requests to one AI provider
+prefs.defaults['job_queue_max_attempts'] = 5  # Attempts per book before a background job gives up on it
+prefs.defaults['request_max_attempts'] = 3  # Attempts per AI request for rate limits, 5xx errors and dropped connections
+prefs.defaults['circuit_breaker_threshold'] = 5  # Consecutive failures before requests to a provider fail fast
+prefs.defaults['circuit_breaker_reset_seconds'] = 30  # Pause before a failing provider is probed again (doubles up to 5 minutes)
+prefs.defaults['prewarm_connections'] = True  # Warm provider connections and load local models when the Ask dialog opens
+prefs.defaults['panel_fallback_ais'] = {}  # Per-panel fallback AI used when the first token is slow ({'panel_0': ai_id})
+prefs.defaults['hedge_delay_seconds'] = ''  # Seconds without a first token before the fallback AI is asked (empty = adaptive p90)
+prefs.defaults['health_probe_interval_minutes'] = 0  # Re-check AI health in the background every N minutes (0 = off)
+prefs.defaults['prefetch_random_questions'] = True  # Pre-generate random questions in the background so the button answers instantly
+prefs.defaults['model_prices'] = {}  # Optional price table {model name or prefix: {'input', 'cached_input', 'output'}} per 1M tokens, used to estimate answer cost
+prefs.defaults['profiling_mode'] = 'off'  # 'off', 'timers' or 'cprofile'; the ASK_AI_PROFILE environment variable overrides it
+prefs.defaults['ai_search_first_time'] = True  # Show welcome dialog only on first use
+prefs.defaults['ai_search_last_history_uid'] = None  # Last AI Search conversation UID for history persistence
+
+# Prompt length settings
+prefs.defaults['enable_custom_prompt_limit'] = False
+prefs.defaults['max_prompt_length'] = DEFAULT_CUSTOM_LIMIT  # Used when enable_custom_prompt_limit is True
+
+# Rendered HTML cache for history answers
+prefs.defaults['history_html_cache_size'] = 200  # Max cached rendered answers (LRU)
+prefs.defaults['history_html_cache_persist'] = False  # Persist rendered HTML next to the history file
+
+# History archival and retention
+prefs.defaults['history_archive_after_days'] = 90  # Compress answers older than N days into archive segments (0 = never)
+prefs.defaults['history_max_records'] = 0  # Keep at most N history records (0 = unlimited)
+prefs.defaults['history_max_bytes_per_book'] = 0  # Max stored bytes (UTF-8) of history per book (0 = unlimited)
+
+def get_prefs(force_reload=False):
+    """获取配置
+    
+    Args:
+        force_reload: 是否强制重新加载配置文件
+    """
+    # 如果需要强制重新加载
+    if force_reload and isinstance(prefs, JSONConfig):
+        prefs.refresh()
+    
+    # 确保语言键存在，如果不存在则使用默认值 'en'
+    if 'language' not in prefs:
+        prefs['language'] = 'en'
+
+    # 如果用户没有在插件内明确选择过语言，则默认跟随 calibre 的界面语言（若插件支持）
+    # calibre 语言来自 Preferences -> Look & Feel -> Choose language
+    try:
+        if not prefs.get('language_user_set', False):
+            from calibre.utils.localization import get_lang
+
+            calibre_lang = (get_lang() or 'en').replace('-', '_')
+            base = calibre_lang.split('_')[0].lower()
+
+            # Map calibre language codes to plugin language codes
+            # 支持的语言映射表
+            lang_mapping = {
+                'zh': 'zh',      # Chinese Simplified
+                'en': 'en',      # English
+                'ja': 'ja',      # Japanese
+                'fr': 'fr',      # French
+                'de': 'de',      # German
+                'es': 'es',      # Spanish
+                'ru': 'ru',      # Russian
+                'pt': 'pt',      # Portuguese
+                'nl': 'nl',      # Dutch
+                'sv': 'sv',      # Swedish
+                'no': 'no',      # Norwegian
+                'fi': 'fi',      # Finnish
+                'da': 'da',      # Danish
+                'yue': 'yue',    # Cantonese
+            }
+            
+            plugin_lang = lang_mapping.get(base)
+            
+            # Special handling for Chinese variants
+            if base == 'zh':
+                upper = calibre_lang.upper()
+                if '_TW' in upper or '_HK' in upper or '_MO' in upper:
+                    plugin_lang = 'zht'  # Traditional Chinese
+                else:
+                    plugin_lang = 'zh'   # Simplified Chinese
+
+            supported = {code for code, _ in SUPPORTED_LANGUAGES}
+            if plugin_lang and plugin_lang in supported and prefs.get('language', 'en') != plugin_lang:
+                prefs['language'] = plugin_lang
+                # 同时更新模板为对应语言的默认模板
+                prefs['template'] = get_default_template(plugin_lang)
+                prefs['multi_book_template'] = get_multi_book_template(plugin_lang)
+                prefs.commit()
+    except Exception as e:
+        logger.warning(f"Failed to inherit Calibre language: {e}")
+    
+    # 确保模板不为空，如果为空则使用当前语言的默认模板
+    # 注意：这个检查必须在语言确定之后执行
+    if not prefs['template']:
+        prefs['template'] = get_default_template(prefs.get('language', 'en'))
+    
+    # 确保多书模板不为空
+    if not prefs.get('multi_book_template'):
+        prefs['multi_book_template'] = get_multi_book_template(prefs.get('language', 'en'))
+    
+    # 确保 models 键存在
+    if 'models' not in prefs:
+        prefs['models'] = {}
+    
+    # 确保 nvidia_free 配置存在（首次安装时的默认 AI）
+    if 'nvidia_free' not in prefs['models']:
+        prefs['models']['nvidia_free'] = {
+            'api_key': 'free-tier',
+            'proxy_url': EnvironmentConfig.get_nvidia_free_proxy_url(),
+            'api_base_url': EnvironmentConfig.get_nvidia_free_proxy_url(),
+            'model': NVIDIA_FREE_CONFIG.default_model_name,
+            'display_name': NVIDIA_FREE_CONFIG.display_name,
+            'enable_streaming': True,
+            'enabled': True,
+            'provider_id': 'nvidia_free',
+            'is_configured': True  # Nvidia Free 默认已配置
+        }
+    
+    # 确保 selected_model 键存在（默认使用 nvidia_free）
+    if 'selected_model' not in prefs:
+        prefs['selected_model'] = 'nvidia_free'
+    
+    # 确保 request_timeout 键存在
+    if 'request_timeout' not in prefs:
+        prefs['request_timeout'] = 120
+    
+    # 确保 parallel_ai_count 键存在
+    if 'parallel_ai_count' not in prefs:
+        prefs['parallel_ai_count'] = 1
+
+    # 确保提示词长度限制键存在
+    if 'enable_custom_prompt_limit' not in prefs:
+        prefs['enable_custom_prompt_limit'] = False
+    if 'max_prompt_length' not in prefs:
+        prefs['max_prompt_length'] = DEFAULT_CUSTOM_LIMIT
+    
+    # 配置迁移：强制更新 nvidia_free 的 proxy_url 为当前环境配置
+    # 这确保环境切换后配置能正确更新
+    if 'nvidia_free' in prefs['models']:
+        current_env_url = EnvironmentConfig.get_nvidia_free_proxy_url()
+        if prefs['models']['nvidia_free'].get('proxy_url') != current_env_url:
+            prefs['models']['nvidia_free']['proxy_url'] = current_env_url
+            prefs['models']['nvidia_free']['api_base_url'] = current_env_url
+            prefs.commit()
+        # 将仍为旧默认模型的免费通道升级到当前默认（用户若从未改过模型）
+        nf = prefs['models']['nvidia_free']
+        if nf.get('model') == 'meta/llama-3.3-70b-instruct':
+            nf['model'] = NVIDIA_FREE_CONFIG.default_model_name
+            prefs.commit()
+    
+    # 付费 Nvidia：仍为旧默认模型时升级到当前默认
+    if 'nvidia' in prefs['models']:
+        nv = prefs['models']['nvidia']
+        if isinstance(nv, dict) and nv.get('model') == 'meta/llama-3.3-70b-instruct':
+            nv['model'] = NVIDIA_CONFIG.default_model_name
+            prefs.commit()
+    
+    # 配置迁移：删除已废弃的 openrouter_free 配置（旧版本遗留数据）
+    # 同时删除任何包含 'openrouter' 且 model 为 ':free' 或包含 'free' 的旧配置
+    models_to_remove = []
+    for config_id, config in prefs['models'].items():
+        if not isinstance(config, dict):
+            continue
+        # 检查是否是废弃的 openrouter free 配置
+        if 'openrouter_free' in config_id:
+            models_to_remove.append(config_id)
+        elif config_id.startswith('openrouter') and config.get('model', '').lower().endswith(':free'):
+            models_to_remove.append(config_id)
+        elif config.get('provider_id') == 'openrouter_free':
+            models_to_remove.append(config_id)
+    
+    for config_id in models_to_remove:
+        del prefs['models'][config_id]
+        # 如果当前选中的是被删除的模型，切换到 nvidia_free
+        if prefs.get('selected_model') == config_id:
+            prefs['selected_model'] = 'nvidia_free'
+    
+    if models_to_remove:
+        prefs.commit()
+    
+    # 确保默认模型配置存在
+    if 'grok' not in prefs['models']:
+        prefs['models']['grok'] = {
+            'auth_token': '',
+            'api_base_url': GROK_CONFIG.default_api_base_url,
+            'model': GROK_CONFIG.default_model_name,
+            'display_name': GROK_CONFIG.display_name  # 设置固定的显示名称
+        }
+
+    # 清理历史配置中误保存的占位符模型名称（例如“-- 切换Model --”）
+    # 目的：避免占位符被当作真实 model 写入配置，进而在 UI 中被复制到自定义模型输入框。
+    try:
+        # 收集所有语言下的 select_model / request_model_list 文本，用于识别占位符
+        placeholder_texts = set()
+        for code, _name in SUPPORTED_LANGUAGES:
+            try:
+                t = get_translation(code)
+                placeholder_texts.add(t.get('select_model', ''))
+                placeholder_texts.add(t.get('request_model_list', ''))
+            except Exception:
+                pass
+
+        changed = False
+        for _model_id, cfg in (prefs.get('models') or {}).items():
+            if not isinstance(cfg, dict):
+                continue
+
+            # 默认情况下不启用“Use custom model name”
+            if 'use_custom_model_name' not in cfg:
+                cfg['use_custom_model_name'] = False
+                changed = True
+
+            model_val = (cfg.get('model') or '').strip()
+            if model_val and model_val in placeholder_texts:
+                logger.warning(
+                    f"[prefs_sanitize] Detected placeholder model stored in prefs. model_id={_model_id}, model='{model_val}'. Clearing it and disabling use_custom_model_name."
+                )
+                cfg['model'] = ''
+                cfg['use_custom_model_name'] = False
+                changed = True
+            elif not model_val and cfg.get('use_custom_model_name'):
+                # 没有有效 model 时，确保不处于自定义模式
+                logger.warning(
+                    f"[prefs_sanitize] use_custom_model_name=True but model is empty. model_id={_model_id}. Forcing use_custom_model_name=False."
+                )
+                cfg['use_custom_model_name'] = False
+                changed = True
+
+        if changed:
+            prefs.commit()
+    except Exception:
+        pass
+    
+    # 不再强制更新模型名称，保留用户的自定义设置
+    # 只有当模型名称不存在时，才使用默认值
+    
+    # 自动判断并设置 is_configured 字段（用于已有配置的兼容性）
+    for model_id, model_config in prefs['models'].items():
+        if 'is_configured' not in model_config:
+            provider_id = extract_provider_id(model_id, model_config)
+            model_config['is_configured'] = is_ai_config_complete(provider_id, model_config)
+    
+    # ========== v1.3.9 兼容性迁移 ==========
+    
+    # 1. 迁移 random_questions (dict -> string)
+    # v1.3.8 使用 dict 格式: {"en": [...], "zh": [...]}
+    # v1.3.9 使用 string 格式: 提示词模板
+    random_questions = prefs.get('random_questions', '')
+    if isinstance(random_questions, dict):
+        # 旧版本格式，重置为空字符串（将使用默认模板）
+        prefs['random_questions'] = ''
+        logger.info("[Migration v1.3.9] random_questions: dict -> string (reset to default template)")
+        prefs.commit()
+    
+    # 2. 确保 use_interface_language 存在
+    if 'use_interface_language' not in prefs:
+        prefs['use_interface_language'] = False
+        logger.info("[Migration v1.3.9] Added use_interface_language = False")
+    
+    # ========== 迁移结束 ==========
+    
+    return prefs
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Opt-in stage timers and cProfile capture for the request and render pipeline."""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    from .json_store import atomic_write_text
+except ImportError:
+    from json_store import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = 'ASK_AI_PROFILE'
+
+MODE_OFF = 'off'
+MODE_TIMERS = 'timers'
+MODE_CPROFILE = 'cprofile'
+
+PROFILE_DIR_NAME = 'ask_ai_plugin_profile'
+HISTOGRAM_FILE_NAME = 'histograms.json'
+_HISTOGRAM_VERSION = 1
+# 最多保留的 pstats 文件数
+MAX_PROFILE_DUMPS = 20
+
+# 直方图桶的上界（毫秒），最后一个桶收集更慢的调用
+BUCKET_BOUNDS_MS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+_NULL_CONTEXT = nullcontext()
+
+
+def parse_mode(value):
+    """环境变量或设置值 -> 模式；无法识别的非空值按 timers 处理"""
+    value = str(value or '').strip().lower()
+    if value in ('', '0', 'off', 'false', 'no'):
+        return MODE_OFF
+    if value in (MODE_CPROFILE, '2'):
+        return MODE_CPROFILE
+    return MODE_TIMERS
+
+
+def bucket_label(index):
+    if index == 0:
+        return f'<{BUCKET_BOUNDS_MS[0]}'
+    if index >= len(BUCKET_BOUNDS_MS):
+        return f'>={BUCKET_BOUNDS_MS[-1]}'
+    return f'{BUCKET_BOUNDS_MS[index - 1]}-{BUCKET_BOUNDS_MS[index]}'
+
+
+class StageHistogram:
+    """一个阶段的耗时分布（毫秒，对数分桶）"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        for index, bound in enumerate(BUCKET_BOUNDS_MS):
+            if ms < bound:
+                break
+        else:
+            index = len(BUCKET_BOUNDS_MS)
+        self.buckets[index] += 1
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile_ms(self, q):
+        """近似分位数：所在桶的上界（最后一个桶用最大值）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                if index >= len(BUCKET_BOUNDS_MS):
+                    return self.max_ms
+                return min(float(BUCKET_BOUNDS_MS[index]), self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        return {'count': self.count, 'total_ms': round(self.total_ms, 3), 'max_ms': round(self.max_ms, 3),
+                'buckets': {bucket_label(index): count for index, count in enumerate(self.buckets) if count}}
+
+
+class Profiler:
+    """按阶段名汇总耗时（线程安全）"""
+
+    def __init__(self, mode=MODE_OFF, output_dir=None, max_dumps=MAX_PROFILE_DUMPS, clock=time.perf_counter):
+        self.mode = parse_mode(mode)
+        self.output_dir = output_dir
+        self.max_dumps = max_dumps
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._local = threading.local()
+        self._dump_counter = 0
+
+    @property
+    def enabled(self):
+        return self.mode != MODE_OFF
+
+    def set_mode(self, mode):
+        self.mode = parse_mode(mode)
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self._stages.get(name)
+            if histogram is None:
+                histogram = self._stages[name] = StageHistogram()
+            histogram.add(seconds)
+
+    @contextmanager
+    def _timed(self, name):
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, self._clock() - started)
+
+    def stage(self, name):
+        """计时上下文；未开启时返回共享的空上下文"""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timed(name)
+
+    @contextmanager
+    def _profiled_request(self, name):
+        profile = None
+        # cProfile 只能分析当前线程，且同一线程内不能嵌套启用
+        if self.mode == MODE_CPROFILE and self.output_dir and not getattr(self._local, 'profiling', False):
+            import cProfile
+            profile = cProfile.Profile()
+            self._local.profiling = True
+            profile.enable()
+        try:
+            with self._timed(name):
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._local.profiling = False
+                self._dump(profile, name)
+
+    def request(self, name):
+        """一次完整的请求：记录总耗时，cprofile 模式下保存 pstats（直方图在 flush 时写出）"""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._profiled_request(name)
+
+    def _dump(self, profile, name):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with self._lock:
+                self._dump_counter += 1
+                counter = self._dump_counter
+            safe_name = ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in name)
+            path = os.path.join(self.output_dir,
+                                f"{time.strftime('%Y%m%d-%H%M%S')}-{counter:04d}-{safe_name}.pstats")
+            profile.dump_stats(path)
+            logger.info(f"[性能分析] 已保存 {path}")
+            self._prune_dumps()
+        except Exception as e:
+            logger.warning(f"[性能分析] 保存 pstats 失败: {e}")
+
+    def _prune_dumps(self):
+        dumps = sorted(name for name in os.listdir(self.output_dir) if name.endswith('.pstats'))
+        for name in dumps[:max(0, len(dumps) - self.max_dumps)]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError:
+                pass
+
+    def snapshot(self):
+        """{阶段名: StageHistogram.to_dict()}"""
+        with self._lock:
+            return {name: histogram.to_dict() for name, histogram in sorted(self._stages.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def flush(self):
+        """写出 histograms.json（复制报告和关闭对话框时调用）"""
+        if not self.output_dir or not self.enabled:
+            return
+        payload = json.dumps({'version': _HISTOGRAM_VERSION, 'mode': self.mode, 'stages': self.snapshot()},
+                             ensure_ascii=False, indent=1)
+        try:
+            atomic_write_text(os.path.join(self.output_dir, HISTOGRAM_FILE_NAME), payload)
+        except Exception as e:
+            logger.warning(f"[性能分析] 保存直方图失败: {e}")
+
+    def format_report(self):
+        """纯文本报告（用于复制到问题反馈中）"""
+        lines = [f'Ask AI performance report (mode: {self.mode})']
+        if self.output_dir:
+            lines.append(f'Output: {self.output_dir}')
+        with self._lock:
+            stages = sorted(self._stages.items())
+            if not stages:
+                lines.append('No samples recorded yet.')
+                return '\n'.join(lines)
+            width = max(len(name) for name, _ in stages)
+            lines.append(f"{'stage'.ljust(width)}  {'count':>6} {'total ms':>10} {'mean':>8} "
+                         f"{'p50':>7} {'p95':>7} {'max':>8}")
+            for name, histogram in stages:
+                lines.append(
+                    f'{name.ljust(width)}  {histogram.count:>6} {histogram.total_ms:>10.1f} '
+                    f'{histogram.mean_ms:>8.2f} {histogram.percentile_ms(0.5):>7.0f} '
+                    f'{histogram.percentile_ms(0.95):>7.0f} {histogram.max_ms:>8.1f}')
+            lines.append('')
+            lines.append('Histograms (ms: count)')
+            for name, histogram in stages:
+                buckets = ' '.join(f'{bucket_label(index)}:{count}'
+                                   for index, count in enumerate(histogram.buckets) if count)
+                lines.append(f'{name.ljust(width)}  {buckets}')
+        return '\n'.join(lines)
+
+
+def profiled(name):
+    """装饰器：把函数调用计入阶段 name（未开启时直接调用）"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = get_profiler()
+            if not profiler.enabled:
+                return fn(*args, **kwargs)
+            with profiler.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profiled_request(name):
+    """装饰器：把函数调用作为一次完整请求（见 Profiler.request）"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = get_profiler()
+            if not profiler.enabled:
+                return fn(*args, **kwargs)
+            with profiler.request(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _configured_mode():
+    """
+    环境变量优先，其次是插件设置中的 profiling_mode（off / timers / cprofile，没有设置界面，
+    见 README 的 Performance Profiling）
+
+    例如 ``ASK_AI_PROFILE=1 calibre-debug -g`` 只记录阶段耗时，``ASK_AI_PROFILE=cprofile``
+    同时保存每次提问的 pstats
+    """
+    env_value = os.environ.get(ENV_VAR)
+    if env_value is not None:
+        return parse_mode(env_value)
+    try:
+        from .plugin_prefs import prefs
+    except ImportError:
+        return MODE_OFF
+    return parse_mode(prefs.get('profiling_mode', MODE_OFF))
+
+
+def _default_output_dir():
+    try:
+        from calibre.utils.config import config_dir
+    except ImportError:
+        return None
+    return os.path.join(config_dir, 'plugins', PROFILE_DIR_NAME)
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """进程内共享的 Profiler（首次使用时按环境变量和设置决定是否开启）"""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                profiler = Profiler(_configured_mode(), _default_output_dir())
+                if profiler.enabled:
+                    logger.info(f"[性能分析] 已开启（{profiler.mode}），输出目录: {profiler.output_dir}")
+                _profiler = profiler
+    return _profiler
@@ -7,6 +7,13 @@ import json
 import logging
 import math
 
+try:
+    from .token_estimator import (SAFETY_MARGIN, context_window, estimate_tokens,
+                                  estimate_tokens_raw, tokenizer_family)
+except ImportError:
+    from token_estimator import (SAFETY_MARGIN, context_window, estimate_tokens,
+                                 estimate_tokens_raw, tokenizer_family)
+
 logger = logging.getLogger(__name__)
 
 # Selection thresholds
@@ -32,6 +39,15 @@ DEFAULT_CUSTOM_LIMIT = 524_288
 MIN_CUSTOM_LIMIT = 1000
 MAX_CUSTOM_LIMIT = 2_000_000
 
+# Token budgets (used when the target model's context window is known).
+# Output tokens and the system message are reserved out of the window, and
+# the remainder is scaled down so estimator error never reaches the provider.
+UNIT_CHARS = 'characters'
+UNIT_TOKENS = 'tokens'
+DEFAULT_OUTPUT_RESERVE = 8192
+SYSTEM_PROMPT_RESERVE = 1000
+CONTEXT_SAFETY_RATIO = 0.9
+
 
 def parse_prompt_limit_value(raw, default=DEFAULT_CUSTOM_LIMIT):
     """Parse prompt limit from prefs or input, stripping separators; clamp to range."""
@@ -91,6 +107,143 @@ def get_max_prompt_length(is_multi_book, prefs):
     return DEFAULT_MULTI_LIMIT if is_multi_book else DEFAULT_SINGLE_LIMIT
 
 
+class PromptBudget:
+    """Prompt size limit in characters or (estimated) tokens."""
+
+    def __init__(self, limit, unit=UNIT_CHARS, family=None, model=None, context_window=None, scale=1.0):
+        self.limit = limit
+        self.unit = unit
+        self.family = family
+        self.model = model
+        self.context_window = context_window
+        # Calibration factor from reported usage (actual / estimated input tokens)
+        self.scale = scale
+
+    @property
+    def is_tokens(self):
+        return self.unit == UNIT_TOKENS
+
+    def measure(self, text):
+        """Size of text in this budget's unit."""
+        if not text:
+            return 0
+        if self.is_tokens:
+            if self.scale == 1.0:
+                return estimate_tokens(text, self.family)
+            return int(math.ceil(estimate_tokens_raw(text, self.family) * self.scale * SAFETY_MARGIN))
+        return len(text)
+
+    def fit_lines(self, lines, overhead_text='', reserve=200):
+        """Return the leading lines that fit together with overhead_text.
+
+        ``reserve`` is in characters; it is converted for token budgets.
+        """
+        return [group[0] for group in self.fit_groups(([line] for line in lines), overhead_text, reserve)]
+
+    def fit_groups(self, groups, overhead_text='', reserve=200):
+        """Like fit_lines, but each group of lines is kept or dropped as a whole."""
+        if self.is_tokens:
+            available = self.limit - self.measure(overhead_text) - math.ceil(reserve / 4)
+            newline_cost = estimate_tokens_raw('\n', self.family)
+
+            def line_cost(line):
+                return estimate_tokens_raw(line, self.family) + newline_cost
+
+            def over(used):
+                # Sum unrounded estimates, then apply the margin once
+                return used * self.scale * SAFETY_MARGIN > available
+        else:
+            available = self.limit - len(overhead_text) - reserve
+
+            def line_cost(line):
+                return len(line) + 1
+
+            def over(used):
+                return used > available
+
+        used = 0
+        included = []
+        for group in groups:
+            cost = sum(line_cost(line) for line in group)
+            if included and over(used + cost):
+                break
+            included.append(group)
+            used += cost
+        return included
+
+
+def _calibration_factor(model_name):
+    """Estimator correction learned from the provider's reported input tokens (1.0 if unknown)."""
+    try:
+        try:
+            from .usage import get_token_calibration
+        except ImportError:
+            from usage import get_token_calibration
+        return get_token_calibration().factor(model_name)
+    except Exception as e:
+        logger.debug('Token calibration unavailable: %s', e)
+        return 1.0
+
+
+def _model_token_budget(ai_id, model_config):
+    """Token budget for one configured model, or None when its window is unknown."""
+    model_config = model_config or {}
+    model_name = model_config.get('model', '')
+    provider_id = model_config.get('provider_id') or (ai_id or '').split('_')[0]
+
+    window = None
+    configured = model_config.get('context_window')
+    if configured not in (None, ''):
+        try:
+            window = int(configured)
+        except (TypeError, ValueError):
+            logger.warning('Ignoring invalid context_window for %s: %r', ai_id, configured)
+    if not window:
+        window = context_window(model_name)
+    if not window or window <= 0:
+        return None
+
+    output_reserve = DEFAULT_OUTPUT_RESERVE
+    configured_output = model_config.get('max_tokens')
+    if configured_output not in (None, ''):
+        try:
+            output_reserve = max(0, int(configured_output))
+        except (TypeError, ValueError):
+            pass
+    output_reserve = min(output_reserve, window // 4)
+
+    limit = int((window - output_reserve - SYSTEM_PROMPT_RESERVE) * CONTEXT_SAFETY_RATIO)
+    if limit <= 0:
+        return None
+    return PromptBudget(
+        limit, UNIT_TOKENS,
+        family=tokenizer_family(provider_id, model_name),
+        model=model_name or ai_id,
+        context_window=window,
+        scale=_calibration_factor(model_name),
+    )
+
+
+def get_prompt_budget(is_multi_book, prefs, models=None):
+    """
+    Return the PromptBudget for a request.
+
+    :param models: iterable of (ai_id, model_config) the prompt will be sent to.
+    A custom limit set by the user is always honoured in characters. Otherwise
+    the prompt is budgeted in tokens against the smallest known context window
+    of the target models, falling back to the character defaults when no
+    target model has a known window.
+    """
+    if prefs.get('enable_custom_prompt_limit') or not models:
+        return PromptBudget(get_max_prompt_length(is_multi_book, prefs), UNIT_CHARS)
+
+    budgets = [_model_token_budget(ai_id, config) for ai_id, config in models]
+    budgets = [budget for budget in budgets if budget is not None]
+    if not budgets:
+        return PromptBudget(get_max_prompt_length(is_multi_book, prefs), UNIT_CHARS)
+    return min(budgets, key=lambda budget: budget.limit)
+
+
 def count_books_in_library_metadata(prefs):
     """Count books in cached library metadata JSON."""
     cached = prefs.get('library_cached_metadata', '')
@@ -113,11 +266,16 @@ def _estimate_reduce_books(current, limit, book_count):
 
 
 def format_prompt_too_long_error(i18n, current, limit, book_count, prefs, is_multi_book,
-                                 is_library_search=False):
+                                 is_library_search=False, budget=None):
     """Build a detailed prompt-too-long error message with actionable guidance."""
     over = max(0, current - limit)
     reduce_count = _estimate_reduce_books(current, limit, book_count) if book_count > 1 else 0
 
+    if budget is not None and budget.is_tokens:
+        return _format_token_budget_error(
+            i18n, current, limit, over, book_count, reduce_count, budget, is_library_search,
+        )
+
     if is_library_search:
         detail = i18n.get(
             'question_too_long_detail_library',
@@ -170,26 +328,66 @@ def format_prompt_too_long_error(i18n, current, limit, book_count, prefs, is_mul
     return '\n\n'.join(parts)
 
 
+def _format_token_budget_error(i18n, current, limit, over, book_count, reduce_count, budget,
+                               is_library_search):
+    """Prompt-too-long message for budgets derived from a model's context window."""
+    if is_library_search:
+        detail = i18n.get(
+            'question_too_long_detail_library_tokens',
+            'Prompt is too long (about {current} tokens, limit {limit} tokens for {model}, '
+            'over by {over}). Your library index contains {book_count} book(s).'
+        )
+    else:
+        detail = i18n.get(
+            'question_too_long_detail_tokens',
+            'Prompt is too long (about {current} tokens, limit {limit} tokens for {model}, '
+            'over by {over}). You selected {book_count} book(s).'
+        )
+    parts = [detail.format(current=current, limit=limit, over=over,
+                           book_count=book_count, model=budget.model)]
+
+    if not is_library_search and book_count > 1:
+        parts.append(i18n.get(
+            'question_too_long_hint_ai_search',
+            'For library-wide searches, use AI Search (ask without selecting books, '
+            'or use the AI Search menu) instead of selecting many books.'
+        ))
+        if reduce_count > 0:
+            parts.append(i18n.get(
+                'question_too_long_reduce_books',
+                'To compare a smaller set in depth, try deselecting about {count} book(s).'
+            ).format(count=reduce_count))
+
+    parts.append(i18n.get(
+        'question_too_long_hint_model',
+        'The limit is derived from the context window of {model} ({window} tokens). '
+        'Choose a model with a larger context window, or ask a more specific question.'
+    ).format(model=budget.model, window=budget.context_window))
+    return '\n\n'.join(parts)
+
+
 def validate_prompt_length(prompt, is_multi_book, prefs, i18n, book_count=0,
-                           is_library_search=False):
+                           is_library_search=False, models=None):
     """
     Validate prompt length against configured limits.
 
+    :param models: optional (ai_id, model_config) pairs; see get_prompt_budget.
     :return: None if valid, otherwise an error message string.
     """
     if not prompt:
         return None
 
-    limit = get_max_prompt_length(is_multi_book, prefs)
-    current = len(prompt)
+    budget = get_prompt_budget(is_multi_book, prefs, models)
+    limit = budget.limit
+    current = budget.measure(prompt)
 
     if current <= limit:
         return None
 
     logger.warning(
-        'Prompt too long: %s chars (limit %s, books %s, multi=%s)',
-        current, limit, book_count, is_multi_book,
+        'Prompt too long: %s %s (limit %s, books %s, multi=%s)',
+        current, budget.unit, limit, book_count, is_multi_book,
     )
     return format_prompt_too_long_error(
-        i18n, current, limit, book_count, prefs, is_multi_book, is_library_search,
+        i18n, current, limit, book_count, prefs, is_multi_book, is_library_search, budget,
     )
@@ -258,6 +258,7 @@ class PromptsWidget(QWidget):
             '<b>{pubyear}</b> → 1818<br>'
             '<b>{language}</b> → English<br>'
             '<b>{series}</b> → (none)<br>'
+            '<b>{passages}</b> → Book passages relevant to the question<br>'
             '<b>{query}</b> → Your question text')
         
         examples_label = QLabel(example_text)
@@ -759,6 +760,7 @@ class PromptsWidget(QWidget):
                 '<b>{pubyear}</b> → 1818<br>'
                 '<b>{language}</b> → English<br>'
                 '<b>{series}</b> → (none)<br>'
+                '<b>{passages}</b> → Book passages relevant to the question<br>'
                 '<b>{query}</b> → Your question text'),
         }
         
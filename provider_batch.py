@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Provider batch endpoints (OpenAI Batch API, Anthropic Message Batches) for bulk jobs."""
+
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# 批量状态
+BATCH_RUNNING = 'running'
+BATCH_ENDED = 'ended'
+BATCH_FAILED = 'failed'
+
+POLL_INITIAL = 15.0
+POLL_FACTOR = 1.5
+POLL_MAX = 600.0
+
+MAX_BATCH_REQUESTS = 10000
+_CUSTOM_ID_RE = re.compile(r'^book-(\d+)$')
+
+
+class BatchAPIError(Exception):
+    pass
+
+
+def custom_id_for(book_id):
+    """custom_id 需满足 ^[a-zA-Z0-9_-]{1,64}$（Anthropic 的要求）"""
+    return f'book-{int(book_id)}'
+
+
+def book_id_from_custom_id(custom_id):
+    match = _CUSTOM_ID_RE.match(custom_id or '')
+    return int(match.group(1)) if match else None
+
+
+def poll_delay(polls, initial=POLL_INITIAL, factor=POLL_FACTOR, maximum=POLL_MAX):
+    """第 polls 次轮询之后的等待秒数"""
+    return min(maximum, initial * (factor ** max(0, polls)))
+
+
+class ProviderBatchAPI:
+    """批量接口基类；子类实现 submit / status / iter_results / cancel"""
+
+    def __init__(self, base_url, headers, build_body, http, timeout=60):
+        """
+        :param base_url: API 基础 URL（如 https://api.openai.com/v1）
+        :param headers: 请求头（含认证）
+        :param build_body: prompt -> 单条请求的 JSON body（与实时请求相同，但不使用流式）
+        :param http: requests 兼容的模块或 Session
+        """
+        self.base_url = base_url.rstrip('/')
+        self.headers = dict(headers)
+        self.build_body = build_body
+        self.http = http
+        self.timeout = timeout
+
+    def _url(self, path):
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def _check(self, response, action):
+        if response.status_code >= 400:
+            raise BatchAPIError(f'{action} failed: HTTP {response.status_code} {response.text[:300]}')
+        return response
+
+    def _get_json(self, path, action):
+        response = self.http.get(self._url(path), headers=self.headers, timeout=self.timeout)
+        return self._check(response, action).json()
+
+    def _iter_jsonl(self, url, headers):
+        with self.http.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            self._check(response, 'download results')
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"无法解析批量结果行: {line[:100]!r}")
+
+    def submit(self, items):
+        """
+        :param items: [(custom_id, prompt)]
+        :return: 提供商的批量 ID
+        """
+        raise NotImplementedError
+
+    def status(self, batch_id):
+        """:return: {'state': BATCH_*, 'total': int, 'completed': int, 'failed': int}"""
+        raise NotImplementedError
+
+    def iter_results(self, batch_id):
+        """逐条产出 (custom_id, 回答文本或 None, 错误信息或 None)"""
+        raise NotImplementedError
+
+    def cancel(self, batch_id):
+        raise NotImplementedError
+
+
+class OpenAIBatchAPI(ProviderBatchAPI):
+    """OpenAI Batch API：上传 JSONL 文件 -> 创建批量 -> 下载输出文件"""
+
+    ENDPOINT = '/v1/chat/completions'
+    COMPLETION_WINDOW = '24h'
+    _RUNNING = ('validating', 'in_progress', 'finalizing', 'cancelling')
+    _FAILED = ('failed',)
+
+    def submit(self, items):
+        lines = []
+        for custom_id, prompt in items:
+            lines.append(json.dumps({
+                'custom_id': custom_id, 'method': 'POST', 'url': self.ENDPOINT, 'body': self.build_body(prompt),
+            }, ensure_ascii=False))
+        payload = ('\n'.join(lines) + '\n').encode('utf-8')
+        # 上传文件使用 multipart，不能带 JSON 的 Content-Type
+        upload_headers = {k: v for k, v in self.headers.items() if k.lower() != 'content-type'}
+        response = self.http.post(
+            self._url('files'), headers=upload_headers, timeout=self.timeout,
+            data={'purpose': 'batch'}, files={'file': ('batch.jsonl', payload, 'application/jsonl')},
+        )
+        file_id = self._check(response, 'upload batch file').json()['id']
+        response = self.http.post(
+            self._url('batches'), headers=self.headers, timeout=self.timeout,
+            json={'input_file_id': file_id, 'endpoint': self.ENDPOINT, 'completion_window': self.COMPLETION_WINDOW},
+        )
+        batch_id = self._check(response, 'create batch').json()['id']
+        logger.info(f"已提交 OpenAI 批量 {batch_id}: {len(items)} 条请求")
+        return batch_id
+
+    def status(self, batch_id):
+        data = self._get_json(f'batches/{batch_id}', 'get batch')
+        counts = data.get('request_counts') or {}
+        state = data.get('status', '')
+        if state in self._RUNNING:
+            state = BATCH_RUNNING
+        elif state in self._FAILED:
+            state = BATCH_FAILED
+        else:
+            # completed / expired / cancelled：已结束，输出文件包含已完成的部分
+            state = BATCH_ENDED
+        return {'state': state, 'total': counts.get('total', 0),
+                'completed': counts.get('completed', 0), 'failed': counts.get('failed', 0)}
+
+    def iter_results(self, batch_id):
+        data = self._get_json(f'batches/{batch_id}', 'get batch')
+        for file_id in (data.get('output_file_id'), data.get('error_file_id')):
+            if not file_id:
+                continue
+            for row in self._iter_jsonl(self._url(f'files/{file_id}/content'), self.headers):
+                yield self._parse_row(row)
+
+    @staticmethod
+    def _parse_row(row):
+        custom_id = row.get('custom_id')
+        response = row.get('response') or {}
+        body = response.get('body') or {}
+        if row.get('error') or response.get('status_code', 200) >= 400:
+            error = row.get('error') or body.get('error') or {}
+            return custom_id, None, (error.get('message') if isinstance(error, dict) else str(error)) or 'error'
+        try:
+            return custom_id, body['choices'][0]['message']['content'], None
+        except (KeyError, IndexError, TypeError):
+            return custom_id, None, 'invalid response'
+
+    def cancel(self, batch_id):
+        response = self.http.post(self._url(f'batches/{batch_id}/cancel'), headers=self.headers, timeout=self.timeout)
+        self._check(response, 'cancel batch')
+
+
+class AnthropicBatchAPI(ProviderBatchAPI):
+    """Anthropic Message Batches：一次 POST 提交所有请求，结果通过 results_url 下载"""
+
+    def submit(self, items):
+        requests_ = []
+        for custom_id, prompt in items:
+            params = self.build_body(prompt)
+            params.pop('stream', None)
+            requests_.append({'custom_id': custom_id, 'params': params})
+        response = self.http.post(self._url('messages/batches'), headers=self.headers,
+                                  timeout=self.timeout, json={'requests': requests_})
+        batch_id = self._check(response, 'create batch').json()['id']
+        logger.info(f"已提交 Anthropic 批量 {batch_id}: {len(items)} 条请求")
+        return batch_id
+
+    def status(self, batch_id):
+        data = self._get_json(f'messages/batches/{batch_id}', 'get batch')
+        counts = data.get('request_counts') or {}
+        state = BATCH_ENDED if data.get('processing_status') == 'ended' else BATCH_RUNNING
+        failed = counts.get('errored', 0) + counts.get('canceled', 0) + counts.get('expired', 0)
+        total = failed + counts.get('succeeded', 0) + counts.get('processing', 0)
+        return {'state': state, 'total': total, 'completed': counts.get('succeeded', 0), 'failed': failed}
+
+    def iter_results(self, batch_id):
+        data = self._get_json(f'messages/batches/{batch_id}', 'get batch')
+        results_url = data.get('results_url')
+        if not results_url:
+            return
+        for row in self._iter_jsonl(results_url, self.headers):
+            yield self._parse_row(row)
+
+    @staticmethod
+    def _parse_row(row):
+        custom_id = row.get('custom_id')
+        result = row.get('result') or {}
+        if result.get('type') != 'succeeded':
+            error = (result.get('error') or {}).get('error') or result.get('error') or {}
+            message = error.get('message') if isinstance(error, dict) else None
+            return custom_id, None, message or result.get('type') or 'error'
+        content = (result.get('message') or {}).get('content') or []
+        text = ''.join(block.get('text', '') for block in content if block.get('type') == 'text')
+        return custom_id, text, None
+
+    def cancel(self, batch_id):
+        response = self.http.post(self._url(f'messages/batches/{batch_id}/cancel'),
+                                  headers=self.headers, timeout=self.timeout)
+        self._check(response, 'cancel batch')
+
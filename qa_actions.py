@@ -12,7 +12,7 @@ from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox, QToolTip
 from PyQt5.QtGui import QCursor, QTextDocument
 from PyQt5.QtPrintSupport import QPrinter
 
-from calibre_plugins.ask_ai_plugin.config import get_prefs
+from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
 
 logger = logging.getLogger(__name__)
 
@@ -151,6 +151,15 @@ def copy_qa(panel):
     show_action_feedback(panel.response_area, panel.i18n.get('copied', 'Copied!'))
 
 
+def copy_performance_report(panel):
+    """复制性能分析报告（各阶段耗时直方图，见 profiling.py）"""
+    from calibre_plugins.ask_ai_plugin.profiling import get_profiler
+    profiler = get_profiler()
+    profiler.flush()
+    QApplication.clipboard().setText(profiler.format_report())
+    show_action_feedback(panel.response_area, panel.i18n.get('copied', 'Copied!'))
+
+
 def _resolve_export_path(panel, default_filename, dialog_title_key):
     prefs = get_prefs()
     if hasattr(prefs, 'refresh'):
@@ -312,7 +321,10 @@ def export_history_pdf(panel):
         return
     history_manager = dialog.response_handler.history_manager
     book_ids = [book.id for book in dialog.books_info]
-    all_histories = history_manager.get_related_histories(book_ids)
+    # 索引条目不含回答正文，导出时展开为完整记录
+    all_histories = history_manager.get_full_histories(
+        history_manager.get_related_histories(book_ids)
+    )
     if not all_histories:
         QMessageBox.information(
             panel,
@@ -431,6 +443,36 @@ def has_exportable_history(panel):
     return len(histories) >= 1
 
 
+def _add_fallback_menu(menu, panel):
+    """备用 AI 子菜单：主 AI 首 token 太慢时把问题改发给所选 AI。"""
+    dialog = panel.parent_dialog
+    if not hasattr(dialog, '_get_configured_ais'):
+        return
+    i18n = panel.i18n
+    primary_ai = panel.get_selected_ai()
+    current = panel.get_fallback_ai(primary_ai)
+    candidates = [(ai_id, name) for ai_id, name in dialog._get_configured_ais() if ai_id != primary_ai]
+
+    menu.addSeparator()
+    submenu = menu.addMenu(i18n.get('fallback_ai_menu', 'Fallback AI on Slow Response'))
+    submenu.setToolTip(i18n.get(
+        'fallback_ai_tooltip',
+        'If the first words of an answer take too long, the same question is sent to this AI '
+        'and whichever answers first is shown.'))
+    submenu.setToolTipsVisible(True)
+    none_action = submenu.addAction(i18n.get('fallback_ai_none', 'None'))
+    none_action.setCheckable(True)
+    none_action.setChecked(current is None)
+    none_action.triggered.connect(lambda: panel.set_fallback_ai(None))
+    if candidates:
+        submenu.addSeparator()
+    for ai_id, name in candidates:
+        action = submenu.addAction(name)
+        action.setCheckable(True)
+        action.setChecked(ai_id == current)
+        action.triggered.connect(lambda checked=False, ai_id=ai_id: panel.set_fallback_ai(ai_id))
+
+
 def build_response_context_menu(panel):
     """构建回答区右键菜单。"""
     from PyQt5.QtWidgets import QMenu
@@ -445,6 +487,14 @@ def build_response_context_menu(panel):
     copy_qa_action = menu.addAction(i18n.get('copy_qa_btn', 'Copy Q&A'))
     copy_qa_action.triggered.connect(lambda: copy_qa(panel))
 
+    # 只在开启性能分析（ASK_AI_PROFILE 或 profiling_mode）时显示
+    from calibre_plugins.ask_ai_plugin.profiling import get_profiler
+    if get_profiler().enabled:
+        report_action = menu.addAction(i18n.get('copy_performance_report', 'Copy Performance Report'))
+        report_action.triggered.connect(lambda: copy_performance_report(panel))
+
+    _add_fallback_menu(menu, panel)
+
     if is_ai_search:
         return menu
 
@@ -4,12 +4,89 @@
 from PyQt5.QtCore import QObject, QTimer, QThread, pyqtSignal, Qt
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from PyQt5.QtGui import QTextCursor
-from .config import get_prefs, ConfigDialog
+from .plugin_prefs import get_prefs
 from .i18n import get_translation, get_suggestion_template
+from .suggestion_pool import get_suggestion_prefetcher, pool_key
 import logging
 
 logger = logging.getLogger(__name__)
 
+def build_suggestion_prompt(api, book_info, i18n=None, current_question=None, avoid_questions=()):
+    """
+    构建随机问题提示词（用户自定义模板或默认模板，加上 persona 和语言指令）
+    
+    :param current_question: 输入框中当前的问题，要求 AI 换一个问题
+    :param avoid_questions: 已经生成过的问题（预生成时使用），要求 AI 避开
+    :raises Exception: 读取书籍信息、语言配置或模板失败
+    """
+    i18n = i18n or {}
+    
+    # 准备书籍信息，使用 getattr 安全获取属性
+    try:
+        title = str(getattr(book_info, 'title', 'Unknown'))
+        authors = getattr(book_info, 'authors', [])
+        author_str = ', '.join(map(str, authors)) if authors and isinstance(authors, (list, tuple)) else 'Unknown'
+        language = str(getattr(book_info, 'language', 'Unknown'))
+    except Exception as e:
+        raise Exception(f"获取书籍信息时出错: {str(e)}")
+    
+    # 记录书籍信息
+    logger.info(f"书籍信息 - 标题: {title}, 作者: {author_str}, 语言: {language}")
+    
+    # 准备提示词 - 从配置中获取用户自定义的随机问题提示词
+    try:
+        lang_code = get_prefs()['language']
+        logger.info(f"获取到语言代码: {lang_code}")
+    except Exception as e:
+        raise Exception(f"获取语言配置时出错: {str(e)}")
+    
+    try:
+        template = api.get_random_question_prompt(lang_code)
+        logger.info(f"获取随机问题模板: {'有配置' if template else '无配置'}")
+    except Exception as e:
+        raise Exception(f"获取随机问题模板时出错: {str(e)}")
+    
+    # 如果用户没有配置，则使用默认模板
+    if not template:
+        template = get_suggestion_template(lang_code)
+        logger.info("用户未配置随机问题提示词，使用默认模板")
+    else:
+        logger.info("使用用户配置的随机问题提示词")
+    
+    # 记录使用的模板
+    logger.info(f"使用的问题随机问题模板: {template[:200]}...")
+    
+    # 格式化提示词，包含完整的书籍信息
+    prompt = template.format(
+        title=title,
+        author=author_str,
+        language=language,
+    )
+    
+    # 如果存在当前问题，添加到提示词中以避免重复
+    if current_question and current_question.strip():
+        avoid_repeat = i18n.get("avoid_repeat_question", " Also, please make sure the new question is different from this one:").format(current_question.strip())
+        prompt += avoid_repeat
+    
+    # 预生成多个问题时，要求与已有的问题不同
+    avoid_questions = [question.strip() for question in avoid_questions if question and question.strip()]
+    if avoid_questions:
+        prompt += i18n.get('avoid_known_questions',
+                           ' Ask something different from these questions: {questions}').format(
+                               questions=' / '.join(avoid_questions))
+    
+    # 应用 persona 和语言指令
+    try:
+        from calibre_plugins.ask_ai_plugin.prompts_widget import apply_prompt_enhancements
+        prompt = apply_prompt_enhancements(prompt)
+        logger.info("已应用 persona 和语言指令到随机问题提示词")
+    except Exception as e:
+        logger.warning(f"应用 persona 和语言指令时出错: {str(e)}")
+    
+    # 记录最终生成的提示词
+    logger.info(f"生成的完整提示词: {prompt}")
+    return prompt
+
 class SuggestionWorker(QThread):
     """生成随机问题的工作线程"""
     result = pyqtSignal(str)
@@ -37,73 +114,14 @@ class SuggestionWorker(QThread):
             # 记录开始生成随机问题
             logger.info("开始生成随机问题...")
             
-            # 准备书籍信息，使用 getattr 安全获取属性
-            try:
-                title = str(getattr(self.book_info, 'title', 'Unknown'))
-                authors = getattr(self.book_info, 'authors', [])
-                author_str = ', '.join(map(str, authors)) if authors and isinstance(authors, (list, tuple)) else 'Unknown'
-                language = str(getattr(self.book_info, 'language', 'Unknown'))
-            except Exception as e:
-                error_msg = f"获取书籍信息时出错: {str(e)}"
-                logger.error(error_msg)
-                self.error_occurred.emit(error_msg)
-                return
-            
-            # 记录书籍信息
-            logger.info(f"书籍信息 - 标题: {title}, 作者: {author_str}, 语言: {language}")
-            
-            # 准备提示词 - 从配置中获取用户自定义的随机问题提示词
-            try:
-                lang_code = get_prefs()['language']
-                logger.info(f"获取到语言代码: {lang_code}")
-            except Exception as e:
-                error_msg = f"获取语言配置时出错: {str(e)}"
-                logger.error(error_msg, exc_info=True)
-                self.error_occurred.emit(error_msg)
-                return
-            
             try:
-                template = self.api.get_random_question_prompt(lang_code)
-                logger.info(f"获取随机问题模板: {'有配置' if template else '无配置'}")
+                prompt = build_suggestion_prompt(self.api, self.book_info, self.i18n,
+                                                 current_question=self.current_question)
             except Exception as e:
-                error_msg = f"获取随机问题模板时出错: {str(e)}"
-                logger.error(error_msg, exc_info=True)
-                self.error_occurred.emit(error_msg)
+                logger.error(str(e), exc_info=True)
+                self.error_occurred.emit(str(e))
                 return
             
-            # 如果用户没有配置，则使用默认模板
-            if not template:
-                template = get_suggestion_template(lang_code)
-                logger.info("用户未配置随机问题提示词，使用默认模板")
-            else:
-                logger.info("使用用户配置的随机问题提示词")
-            
-            # 记录使用的模板
-            logger.info(f"使用的问题随机问题模板: {template[:200]}...")
-            
-            # 格式化提示词，包含完整的书籍信息
-            prompt = template.format(
-                title=title,
-                author=author_str,
-                language=language,
-            )
-            
-            # 如果存在当前问题，添加到提示词中以避免重复
-            if self.current_question and self.current_question.strip():
-                avoid_repeat = self.i18n.get("avoid_repeat_question", " Also, please make sure the new question is different from this one:").format(self.current_question.strip())
-                prompt += avoid_repeat
-            
-            # 应用 persona 和语言指令
-            try:
-                from calibre_plugins.ask_ai_plugin.prompts_widget import apply_prompt_enhancements
-                prompt = apply_prompt_enhancements(prompt)
-                logger.info("已应用 persona 和语言指令到随机问题提示词")
-            except Exception as e:
-                logger.warning(f"应用 persona 和语言指令时出错: {str(e)}")
-            
-            # 记录最终生成的提示词
-            logger.info(f"生成的完整提示词: {prompt}")
-            
             # 记录当前使用的 AI 模型
             try:
                 model_name = self.api.model_display_name
@@ -163,6 +181,9 @@ class SuggestionHandler(QObject):
         self._loading_timer = None  # 响应区域的加载动画定时器
         self._animation_dots = ['', '.', '..', '...']
         self._animation_dot_index = 0
+        # 当前请求对应的随机问题缓存池（书籍, AI, 语言）和补充参数
+        self._pool_key = None
+        self._prefetch_args = None
 
     def setup(self, response_area, input_area, suggest_button, api, i18n, stop_button=None):
         """设置处理器需要的UI组件和国际化文本"""
@@ -193,6 +214,32 @@ class SuggestionHandler(QObject):
         self._response_text = ''
         self._cleanup_timer = None
 
+    @staticmethod
+    def _suggestion_pool_key(book_ids, model_id):
+        if not book_ids or not model_id:
+            return None
+        return pool_key(book_ids, model_id, get_prefs().get('language', 'en'))
+    
+    def prefetch(self, book_info, book_ids, model_id):
+        """在后台以低优先级为书籍预先生成随机问题，放入缓存池"""
+        if not get_prefs().get('prefetch_random_questions', True):
+            return
+        key = self._suggestion_pool_key(book_ids, model_id)
+        if key is None or not book_info:
+            return
+        i18n = dict(self.i18n)
+        
+        def generate(avoid_questions):
+            # 独立的客户端：后台优先级，不影响对话框正在使用的模型
+            from .api import APIClient
+            from .rate_limiter import PRIORITY_BACKGROUND
+            api = APIClient(i18n=i18n, priority=PRIORITY_BACKGROUND)
+            prompt = build_suggestion_prompt(api, book_info, i18n, avoid_questions=avoid_questions)
+            return api.random_question(prompt, lang_code=get_prefs().get('language', 'en'), model_id=model_id)
+        
+        if get_suggestion_prefetcher().fill(key, generate):
+            logger.info(f"[随机问题缓存] 开始后台预生成: {model_id}")
+    
     def update_i18n(self, i18n):
         """更新国际化文本对象"""
         self.i18n = i18n
@@ -316,6 +363,12 @@ class SuggestionHandler(QObject):
             else:
                 # 这是一个有效的建议
                 
+                # 直接生成的问题记入缓存池的最近使用列表（避免预生成重复），并补充缓存池
+                if self._pool_key and self._worker is not None:
+                    get_suggestion_prefetcher().pool.remember(self._pool_key, suggestion)
+                if self._prefetch_args:
+                    self.prefetch(*self._prefetch_args)
+                
                 # 将随机问题暂存到父对话框的临时变量中
                 parent_dialog = self.suggest_button.window() if self.suggest_button else None
                 if parent_dialog and hasattr(parent_dialog, '_pending_random_question'):
@@ -417,8 +470,8 @@ class SuggestionHandler(QObject):
             self._stop_loading_animation()
             self._stop_cleanup_timer()
 
-    def generate(self, book_info, model_id=None):
-        """生成随机问题"""
+    def generate(self, book_info, model_id=None, book_ids=None):
+        """生成随机问题（缓存池中有预生成的问题时立即返回，并在后台补充）"""
         if not self.api:
             logger.error("API信息没有成功初始化，随机问题生成失败。")
             return
@@ -433,7 +486,7 @@ class SuggestionHandler(QObject):
         
         # 使用统一的 auth_validator 模块进行验证
         from calibre_plugins.ask_ai_plugin.auth_validator import validate_single_model
-        from calibre_plugins.ask_ai_plugin.config import get_prefs
+        from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
         
         prefs = get_prefs()
         selected_model = model_id or prefs.get('selected_model', 'grok')
@@ -455,6 +508,18 @@ class SuggestionHandler(QObject):
         # 重置状态
         self._request_cancelled = False
         self._response_text = ''
+        self._pool_key = self._suggestion_pool_key(book_ids, selected_model)
+        self._prefetch_args = (book_info, book_ids, selected_model)
+        
+        # 缓存池中有与当前问题不同的预生成问题时直接使用
+        if self._pool_key:
+            suggestion = get_suggestion_prefetcher().pool.take(
+                self._pool_key, exclude=[self.input_area.toPlainText().strip()])
+            if suggestion:
+                logger.info(f"[随机问题缓存] 使用预生成的随机问题: {suggestion[:50]}...")
+                self._request_cancelled = True
+                self._on_suggestion_received(suggestion)
+                return
         
         # 更新UI状态：隐藏随机问题按钮，显示停止按钮
         self.suggest_button.setVisible(False)
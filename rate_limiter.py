@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Client-side rate limiting and request queueing per provider and API key."""
+
+import hashlib
+import logging
+import threading
+import time
+from itertools import count
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# 收到 429 但没有 Retry-After 时暂停放行的秒数
+DEFAULT_RATE_LIMIT_PAUSE = 5.0
+# 等待中的请求最长多久重新检查一次（取消、配置变化）
+POLL_INTERVAL = 0.5
+
+
+class RateLimitCancelled(Exception):
+    """排队期间请求被取消"""
+
+
+class _TokenBucket:
+    """每分钟 per_minute 个令牌，容量为一分钟的额度（允许突发）"""
+
+    def __init__(self, per_minute, now):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now):
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount):
+        # 超过容量的请求在桶满时放行，避免永远等待
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class Permit:
+    """放行凭证；请求结束后调用 release()（也可用作上下文管理器）"""
+
+    def __init__(self, limiter, tokens, waited):
+        self._limiter = limiter
+        self.tokens = tokens
+        self.waited = waited
+        self._released = False
+
+    def release(self, actual_tokens=None):
+        """
+        :param actual_tokens: 可选，实际消耗的 token 数，用于修正按估算扣除的额度
+        """
+        if self._released:
+            return
+        self._released = True
+        self._limiter._release(self, actual_tokens)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+        return False
+
+
+class RateLimiter:
+    """单个（提供商, API Key）的限流器（线程安全）"""
+
+    def __init__(self, key, rpm=0, tpm=0, max_concurrent=0, clock=time.monotonic):
+        self.key = key
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._sequence = count()
+        self._waiting = []
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._admitted = 0
+        self._total_wait = 0.0
+        self._last_wait = 0.0
+        self._max_wait = 0.0
+        self.rpm = self.tpm = self.max_concurrent = 0
+        self._requests = self._tokens = None
+        self.configure(rpm, tpm, max_concurrent)
+
+    def configure(self, rpm=0, tpm=0, max_concurrent=0):
+        """更新限额（0 或空表示不限制）；未变化的桶保留当前余量"""
+        rpm, tpm, max_concurrent = (_positive_int(value) for value in (rpm, tpm, max_concurrent))
+        with self._cond:
+            now = self._clock()
+            if rpm != self.rpm:
+                self._requests = _TokenBucket(rpm, now) if rpm else None
+            if tpm != self.tpm:
+                self._tokens = _TokenBucket(tpm, now) if tpm else None
+            self.rpm, self.tpm, self.max_concurrent = rpm, tpm, max_concurrent
+            self._cond.notify_all()
+
+    def acquire(self, tokens=0, priority=PRIORITY_INTERACTIVE, cancel_event=None, on_wait=None):
+        """
+        排队直到可以发送请求
+
+        :param tokens: 本次请求预计消耗的 token 数（提示词加输出上限）
+        :param priority: PRIORITY_INTERACTIVE 或 PRIORITY_BACKGROUND
+        :param on_wait: 需要等待时调用 (status)，status 含 position（前面还有几个请求）和 waited（已等待秒数）
+        :return: Permit
+        :raises RateLimitCancelled: cancel_event 在排队期间被设置
+        """
+        tokens = max(0, int(tokens or 0))
+        with self._cond:
+            ticket = (priority, next(self._sequence))
+            self._waiting.append(ticket)
+            self._waiting.sort()
+            enqueued_at = self._clock()
+            try:
+                while True:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise RateLimitCancelled(self.key)
+                    now = self._clock()
+                    position = self._waiting.index(ticket)
+                    delay = self._admission_delay(tokens, now) if position == 0 else None
+                    if delay == 0:
+                        return self._admit(tokens, now - enqueued_at, now)
+                    if on_wait is not None:
+                        on_wait({'key': self.key, 'position': position, 'queued': len(self._waiting),
+                                 'waited': now - enqueued_at, 'retry_in': delay})
+                    self._cond.wait(POLL_INTERVAL if delay is None else min(delay, POLL_INTERVAL))
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+    def _admission_delay(self, tokens, now):
+        """可以放行返回 0；需要等待时返回秒数；等待并发名额时返回 None"""
+        if self.max_concurrent and self._in_flight >= self.max_concurrent:
+            return None
+        delays = [max(0.0, self._paused_until - now)]
+        if self._requests is not None:
+            self._requests.refill(now)
+            delays.append(self._requests.delay_for(1))
+        if self._tokens is not None and tokens:
+            self._tokens.refill(now)
+            delays.append(self._tokens.delay_for(tokens))
+        return max(delays)
+
+    def _admit(self, tokens, waited, now):
+        if self._requests is not None:
+            self._requests.level -= 1
+        if self._tokens is not None and tokens:
+            self._tokens.level -= min(tokens, self._tokens.capacity)
+        self._in_flight += 1
+        self._admitted += 1
+        self._total_wait += waited
+        self._last_wait = waited
+        self._max_wait = max(self._max_wait, waited)
+        if waited >= 1:
+            logger.info(f"[限流] {self.key}: 排队 {waited:.1f} 秒后放行")
+        return Permit(self, tokens, waited)
+
+    def _release(self, permit, actual_tokens):
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            if actual_tokens is not None and self._tokens is not None:
+                estimated = min(permit.tokens, self._tokens.capacity)
+                self._tokens.level = min(self._tokens.capacity, self._tokens.level + estimated - actual_tokens)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """服务端返回 429 时调用：seconds 秒内不再放行新请求"""
+        seconds = DEFAULT_RATE_LIMIT_PAUSE if seconds is None else max(0.0, float(seconds))
+        with self._cond:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+        logger.info(f"[限流] {self.key}: 收到 429，暂停放行 {seconds:.1f} 秒")
+
+    def snapshot(self):
+        with self._cond:
+            queued = [priority for priority, _ in self._waiting]
+            return {
+                'key': self.key,
+                'queued': len(queued),
+                'queued_interactive': queued.count(PRIORITY_INTERACTIVE),
+                'queued_background': queued.count(PRIORITY_BACKGROUND),
+                'in_flight': self._in_flight,
+                'admitted': self._admitted,
+                'avg_wait': self._total_wait / self._admitted if self._admitted else 0.0,
+                'last_wait': self._last_wait,
+                'max_wait': self._max_wait,
+                'paused_for': max(0.0, self._paused_until - self._clock()),
+                'limits': {'rpm': self.rpm, 'tpm': self.tpm, 'max_concurrent': self.max_concurrent},
+            }
+
+
+def _positive_int(value):
+    try:
+        return max(0, int(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def limiter_key(provider_id, credential=None):
+    """按提供商和 API Key 区分限流器；Key 只以哈希形式出现"""
+    if not credential:
+        return provider_id
+    digest = hashlib.sha256(str(credential).encode('utf-8')).hexdigest()[:12]
+    return f'{provider_id}:{digest}'
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(key, rpm=0, tpm=0, max_concurrent=0):
+    """获取共享的限流器，并应用最新的限额配置"""
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(key, rpm, tpm, max_concurrent)
+            return limiter
+    limiter.configure(rpm, tpm, max_concurrent)
+    return limiter
+
+
+def limiter_snapshots():
+    """所有限流器的状态（键为限流器 key）"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.key: limiter.snapshot() for limiter in limiters}
+
+
+def reset_limiters():
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Frame budget scheduling for multi-panel streaming renders."""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 面板优先级（数值越小越优先）
+PRIORITY_FOCUSED = 0
+PRIORITY_VISIBLE = 1
+PRIORITY_BACKGROUND = 2
+
+# 帧定时器间隔与每帧可用于渲染的时间预算（毫秒）
+DEFAULT_FRAME_INTERVAL_MS = 50
+DEFAULT_FRAME_BUDGET_MS = 16.0
+
+# 后台（不可见/最小化）面板的最小刷新间隔；用户滚动中的面板同样按此间隔降频
+BACKGROUND_MIN_INTERVAL = 1.0
+# 用户正在输入或滚动时，预算缩减到该比例，把 GUI 线程留给交互
+INTERACTION_BUDGET_RATIO = 0.5
+INTERACTION_WINDOW = 0.3
+# 任何有待刷新内容的面板最长等待时间，超过后无视预算强制渲染一次，避免饿死
+MAX_STARVATION = 2.0
+
+# 渲染耗时的指数滑动平均系数
+_COST_EMA_ALPHA = 0.3
+_FRAME_HISTORY_SIZE = 120
+
+
+class _ClientState:
+    """单个面板在调度器中的状态"""
+
+    __slots__ = (
+        'key', 'priority', 'pending', 'requested_at', 'last_render',
+        'cost_ema', 'last_cost', 'renders', 'deferrals',
+    )
+
+    def __init__(self, key):
+        self.key = key
+        self.priority = PRIORITY_VISIBLE
+        self.pending = False
+        self.requested_at = 0.0
+        self.last_render = 0.0
+        self.cost_ema = None
+        self.last_cost = 0.0
+        self.renders = 0
+        self.deferrals = 0
+
+
+class FrameScheduler:
+    """按帧分配渲染预算的调度核心（不依赖 Qt，便于测试）
+
+    使用方式：
+    - 面板有新内容时调用 request(key)
+    - 帧定时器每次触发时调用 plan(now) 得到本帧要渲染的面板列表
+    - 渲染完成后调用 record(key, cost_seconds) 上报实测耗时
+    """
+
+    def __init__(self, frame_budget_ms=DEFAULT_FRAME_BUDGET_MS,
+                 frame_interval_ms=DEFAULT_FRAME_INTERVAL_MS, clock=time.monotonic):
+        self.frame_budget = max(1.0, float(frame_budget_ms)) / 1000.0
+        self.frame_interval_ms = max(1, int(frame_interval_ms))
+        self._clock = clock
+        self._clients = {}
+        self._last_interaction = 0.0
+        self._frames = 0
+        self._frame_costs = []
+        self._max_frame_cost = 0.0
+        self._over_budget_frames = 0
+
+    # ----- 面板注册与状态 -----
+
+    def register(self, key, priority=PRIORITY_VISIBLE):
+        state = self._clients.get(key)
+        if state is None:
+            state = _ClientState(key)
+            self._clients[key] = state
+        state.priority = priority
+        return state
+
+    def unregister(self, key):
+        self._clients.pop(key, None)
+
+    def set_priority(self, key, priority):
+        state = self._clients.get(key)
+        if state is not None:
+            state.priority = priority
+
+    def request(self, key):
+        """标记面板有待渲染的新内容（重复调用会合并为一次）"""
+        state = self._clients.get(key) or self.register(key)
+        if not state.pending:
+            state.pending = True
+            state.requested_at = self._clock()
+
+    def cancel(self, key):
+        """丢弃面板的待渲染请求（例如最终渲染已接管）"""
+        state = self._clients.get(key)
+        if state is not None:
+            state.pending = False
+
+    def has_pending(self):
+        return any(state.pending for state in self._clients.values())
+
+    def note_interaction(self, now=None):
+        """记录用户输入/滚动，随后一小段时间内缩减渲染预算"""
+        self._last_interaction = self._clock() if now is None else now
+
+    def estimated_cost(self, key):
+        state = self._clients.get(key)
+        if state is None or state.cost_ema is None:
+            return 0.0
+        return state.cost_ema
+
+    # ----- 帧规划 -----
+
+    def plan(self, now=None):
+        """返回本帧需要渲染的面板 key 列表
+
+        规则：
+        1. 待渲染面板按（优先级，等待时长）排序，聚焦面板最先
+        2. 后台面板受最小刷新间隔限制
+        3. 按渲染耗时估计累计，超出本帧预算的面板顺延到下一帧
+        4. 每帧至少渲染一个面板；等待超过 MAX_STARVATION 的面板无视预算
+        """
+        if now is None:
+            now = self._clock()
+        self._frames += 1
+
+        budget = self.frame_budget
+        if now - self._last_interaction < INTERACTION_WINDOW:
+            budget *= INTERACTION_BUDGET_RATIO
+
+        candidates = []
+        for state in self._clients.values():
+            if not state.pending:
+                continue
+            if (state.priority >= PRIORITY_BACKGROUND and
+                    now - state.last_render < BACKGROUND_MIN_INTERVAL and
+                    now - state.requested_at < MAX_STARVATION):
+                state.deferrals += 1
+                continue
+            candidates.append(state)
+
+        candidates.sort(key=lambda s: (s.priority, s.requested_at))
+
+        selected = []
+        spent = 0.0
+        for state in candidates:
+            cost = state.cost_ema or 0.0
+            starving = now - state.requested_at >= MAX_STARVATION
+            if selected and spent + cost > budget and not starving:
+                state.deferrals += 1
+                continue
+            selected.append(state.key)
+            spent += cost
+            state.pending = False
+        return selected
+
+    def record(self, key, cost, now=None):
+        """上报一次渲染的实测耗时（秒）"""
+        state = self._clients.get(key)
+        if state is None:
+            return
+        if now is None:
+            now = self._clock()
+        cost = max(0.0, float(cost))
+        state.last_cost = cost
+        if state.cost_ema is None:
+            state.cost_ema = cost
+        else:
+            state.cost_ema = _COST_EMA_ALPHA * cost + (1 - _COST_EMA_ALPHA) * state.cost_ema
+        state.last_render = now
+        state.renders += 1
+
+    def record_frame(self, cost):
+        """上报整帧耗时（秒），用于统计"""
+        self._frame_costs.append(cost)
+        if len(self._frame_costs) > _FRAME_HISTORY_SIZE:
+            del self._frame_costs[0]
+        self._max_frame_cost = max(self._max_frame_cost, cost)
+        if cost > self.frame_budget:
+            self._over_budget_frames += 1
+
+    # ----- 调试统计 -----
+
+    def stats(self):
+        """返回帧统计信息（毫秒），用于调试与性能报告"""
+        recent = self._frame_costs
+        avg = (sum(recent) / len(recent)) if recent else 0.0
+        return {
+            'frames': self._frames,
+            'frame_interval_ms': self.frame_interval_ms,
+            'frame_budget_ms': round(self.frame_budget * 1000, 2),
+            'avg_frame_ms': round(avg * 1000, 2),
+            'max_frame_ms': round(self._max_frame_cost * 1000, 2),
+            'over_budget_frames': self._over_budget_frames,
+            'panels': {
+                str(key): {
+                    'priority': state.priority,
+                    'pending': state.pending,
+                    'renders': state.renders,
+                    'deferrals': state.deferrals,
+                    'last_cost_ms': round(state.last_cost * 1000, 2),
+                    'avg_cost_ms': round((state.cost_ema or 0.0) * 1000, 2),
+                }
+                for key, state in self._clients.items()
+            },
+        }
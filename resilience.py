@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Shared retry policy and per-provider circuit breakers for AI requests."""
+
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+# 服务端要求等待更久时不在面板里干等，直接报错
+MAX_RETRY_AFTER = 60.0
+
+# 可重试的 HTTP 状态码（529 为 Anthropic 的 overloaded）
+RETRYABLE_STATUS = frozenset((408, 409, 425, 429, 500, 502, 503, 504, 529))
+# 可重试的 requests 异常类名（连接失败、超时、流被中断）
+RETRYABLE_EXCEPTIONS = frozenset((
+    'ConnectionError', 'Timeout', 'ChunkedEncodingError', 'ProtocolError', 'IncompleteRead',
+))
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+MAX_RESET_TIMEOUT = 300.0
+
+_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+class CircuitOpenError(Exception):
+    """熔断期间直接失败，不发送请求"""
+
+    def __init__(self, key, retry_in, failures):
+        super().__init__(f'circuit open for {key}: {failures} consecutive failures, retry in {retry_in:.0f}s')
+        self.key = key
+        self.retry_in = retry_in
+        self.failures = failures
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP, rng=random.random):
+    """第 attempt 次重试前的等待秒数（从 0 开始）：full jitter 指数退避"""
+    return rng() * min(cap, base * (2 ** max(0, attempt)))
+
+
+def parse_duration(value):
+    """解析 OpenAI 风格的时长（如 '1s'、'6m0s'、'250ms'），失败返回 None"""
+    text = (value or '').strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(text)
+    if not parts or ''.join(number + unit for number, unit in parts) != text:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _parse_timestamp(value, now):
+    """解析 HTTP 日期或 RFC 3339 时间，返回距离 now 的秒数"""
+    text = (value or '').strip()
+    if not text:
+        return None
+    try:
+        moment = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        try:
+            moment = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp() - now
+
+
+def parse_retry_after(headers, now=None):
+    """
+    从响应头得到服务端要求的等待秒数
+
+    依次识别 retry-after-ms、Retry-After（秒数或 HTTP 日期）、OpenAI 的 x-ratelimit-reset-*
+    和 Anthropic 的 anthropic-ratelimit-*-reset（只取剩余额度为 0 的那一项）。
+    :return: 秒数（不小于 0）；没有相关头时返回 None
+    """
+    if not headers:
+        return None
+    headers = {str(key).lower(): str(value) for key, value in headers.items()}
+    now = time.time() if now is None else now
+
+    if 'retry-after-ms' in headers:
+        try:
+            return max(0.0, float(headers['retry-after-ms']) / 1000.0)
+        except ValueError:
+            pass
+    if 'retry-after' in headers:
+        value = headers['retry-after'].strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            seconds = _parse_timestamp(value, now)
+            if seconds is not None:
+                return max(0.0, seconds)
+
+    waits = []
+    for key, value in headers.items():
+        if key.startswith('x-ratelimit-reset-'):
+            remaining = headers.get('x-ratelimit-remaining-' + key[len('x-ratelimit-reset-'):])
+            if remaining is not None and remaining.strip() == '0':
+                waits.append(parse_duration(value))
+        elif key.startswith('anthropic-ratelimit-') and key.endswith('-reset'):
+            remaining = headers.get(key[:-len('-reset')] + '-remaining')
+            if remaining is not None and remaining.strip() == '0':
+                waits.append(_parse_timestamp(value, now))
+    waits = [wait for wait in waits if wait is not None]
+    return max(0.0, max(waits)) if waits else None
+
+
+def _exception_chain(exc):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def classify_error(exc):
+    """
+    判断异常是否值得重试
+
+    模型实现通常把 requests 异常包装成普通 Exception 再抛出，因此沿 __cause__ / __context__
+    链查找原始异常和 HTTP 响应。
+    :return: (retryable, retry_after 秒数或 None, HTTP 状态码或 None)
+    """
+    if isinstance(exc, CircuitOpenError):
+        return False, None, None
+    for error in _exception_chain(exc):
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        if isinstance(status, int):
+            retry_after = parse_retry_after(getattr(response, 'headers', None))
+            return status in RETRYABLE_STATUS, retry_after, status
+        names = {cls.__name__ for cls in type(error).__mro__}
+        if names & RETRYABLE_EXCEPTIONS:
+            return True, None, None
+    return False, None, None
+
+
+class CircuitBreaker:
+    """单个提供商的熔断器（线程安全）"""
+
+    def __init__(self, key, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, max_reset_timeout=MAX_RESET_TIMEOUT, clock=time.monotonic):
+        self.key = key
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.max_reset_timeout = float(max_reset_timeout)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._cooldown = self.reset_timeout
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    @property
+    def failures(self):
+        with self._lock:
+            return self._failures
+
+    def before_call(self):
+        """请求前调用；熔断期间抛出 CircuitOpenError"""
+        with self._lock:
+            if self._state == CIRCUIT_CLOSED:
+                return
+            remaining = self._opened_at + self._cooldown - self._clock()
+            if self._state == CIRCUIT_OPEN and remaining <= 0:
+                self._state = CIRCUIT_HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == CIRCUIT_HALF_OPEN and not self._probe_in_flight:
+                # 只放行一个探测请求，其余请求继续快速失败
+                self._probe_in_flight = True
+                logger.info(f"[熔断] {self.key}: 冷却结束，发送探测请求")
+                return
+            raise CircuitOpenError(self.key, max(0.0, remaining), self._failures)
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CIRCUIT_CLOSED:
+                logger.info(f"[熔断] {self.key}: 探测成功，恢复正常")
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+            self._cooldown = self.reset_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._cooldown = min(self.max_reset_timeout, self._cooldown * 2)
+                self._open()
+            elif self._state == CIRCUIT_CLOSED and self._failures >= self.failure_threshold:
+                self._cooldown = self.reset_timeout
+                self._open()
+
+    def release_probe(self):
+        """探测请求因与提供商无关的原因失败时调用，允许下一次请求继续探测"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self):
+        self._state = CIRCUIT_OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        logger.warning(f"[熔断] {self.key}: 连续失败 {self._failures} 次，{self._cooldown:.0f} 秒内直接失败")
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = 0.0
+            if self._state == CIRCUIT_OPEN:
+                retry_in = max(0.0, self._opened_at + self._cooldown - self._clock())
+            return {'state': self._state, 'failures': self._failures, 'retry_in': retry_in}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(key, **kwargs):
+    """按提供商（AI 配置 ID）获取共享的熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, **kwargs)
+            _breakers[key] = breaker
+        return breaker
+
+
+def reset_circuit_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+class CombinedEvent:
+    """任意一个事件被设置即视为已设置（只读；提供 is_set / wait，供取消检查使用）"""
+
+    def __init__(self, *events):
+        self._events = [event for event in events if event is not None]
+
+    def is_set(self):
+        return any(event.is_set() for event in self._events)
+
+    def wait(self, timeout=None, poll_interval=0.1):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            time.sleep(poll_interval if remaining is None else min(poll_interval, remaining))
+        return True
+
+
+def call_with_retry(fn, breaker=None, max_attempts=DEFAULT_MAX_ATTEMPTS, is_replay_safe=None,
+                    on_retry=None, sleep=time.sleep, max_retry_after=MAX_RETRY_AFTER,
+                    base_delay=BACKOFF_BASE, max_delay=BACKOFF_CAP, max_elapsed=None, clock=time.monotonic):
+    """
+    调用 fn()，失败时按策略重试
+
+    :param breaker: 可选的 CircuitBreaker；可恢复错误计为一次失败，HTTP 4xx 等说明服务在线的错误不计入
+    :param is_replay_safe: 返回 False 时不再重试（例如流式回答已经显示了部分内容、请求已被取消）；
+                           退避等待之后会再检查一次
+    :param on_retry: (attempt, delay, exc) 每次重试前调用
+    :param sleep: 退避等待；传入 cancel_event.wait 可在取消时提前结束等待
+    :param max_elapsed: 可选，总耗时上限（秒）；退避后会超过上限时不再重试
+    :raises: 最后一次的异常；熔断期间抛出 CircuitOpenError
+    """
+    started = clock()
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = fn()
+        except Exception as e:
+            retryable, retry_after, status = classify_error(e)
+            if breaker is not None:
+                if retryable:
+                    breaker.record_failure()
+                elif status is not None:
+                    breaker.record_success()
+                else:
+                    breaker.release_probe()
+            if not retryable or attempt + 1 >= max_attempts:
+                raise
+            if is_replay_safe is not None and not is_replay_safe():
+                logger.info("已有部分回答显示给用户，不再重试以免重复输出")
+                raise
+            if retry_after is not None and retry_after > max_retry_after:
+                logger.warning(f"服务端要求等待 {retry_after:.0f} 秒，超过上限 {max_retry_after:.0f} 秒，不再重试")
+                raise
+            delay = retry_after if retry_after is not None else backoff_delay(attempt, base_delay, max_delay)
+            if max_elapsed is not None and clock() - started + delay >= max_elapsed:
+                logger.warning(f"已用时 {clock() - started:.0f} 秒，重试会超过上限 {max_elapsed:.0f} 秒，不再重试")
+                raise
+            if on_retry is not None:
+                on_retry(attempt + 1, delay, e)
+            sleep(delay)
+            if is_replay_safe is not None and not is_replay_safe():
+                logger.info("请求已取消，不再重试")
+                raise
+            attempt += 1
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
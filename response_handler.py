@@ -8,7 +8,7 @@ import os
 import sys
 import time
 from datetime import datetime
-from threading import Thread
+from threading import Event, Thread
 
 # 从 vendor 命名空间导入第三方库
 from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import markdown2
@@ -22,12 +22,26 @@ from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor.bleach.css_sanitizer
 # 导入历史记录管理器
 from .history_manager import HistoryManager
 
+# 渲染结果缓存（历史记录回答不变，无需重复 markdown2 + bleach）
+from .html_cache import RenderedHTMLCache, renderer_fingerprint
+
+# 对话框级帧调度核心
+from .render_scheduler import (
+    FrameScheduler,
+    PRIORITY_FOCUSED,
+    PRIORITY_VISIBLE,
+    PRIORITY_BACKGROUND,
+)
+
 # 插件偏好（与 api.py 中 request_timeout 一致）
-from .config import get_prefs
+from .plugin_prefs import get_prefs
 
 # 导入UI常量
 from .ui_constants import get_reasoning_process_html
 
+# 可选的性能分析埋点（默认关闭）
+from .profiling import get_profiler, profiled
+
 logger = logging.getLogger(__name__)
 
 # markdown2：与流式/非流式渲染共用；cuddled-lists 减少「段落后紧贴 * 列表」未被识别为列表的情况
@@ -77,6 +91,7 @@ _RESPONSE_BLEACH_ATTRS = {
 _RESPONSE_BLEACH_PROTOCOLS = ['http', 'https', 'mailto', 'calibre']
 
 
+@profiled('render.sanitize')
 def _sanitize_response_html(fragment: str) -> str:
     return bleach.clean(
         fragment,
@@ -88,13 +103,57 @@ def _sanitize_response_html(fragment: str) -> str:
     )
 
 
+# 渲染配置变化（库版本、extras、白名单）时自动使旧缓存失效
+_RENDERER_VERSION = renderer_fingerprint(
+    getattr(markdown2, '__version__', ''),
+    getattr(bleach, '__version__', ''),
+    _MARKDOWN2_EXTRAS,
+    _RESPONSE_BLEACH_TAGS,
+    _RESPONSE_BLEACH_ATTRS,
+    _RESPONSE_BLEACH_PROTOCOLS,
+    get_reasoning_process_html('[推理过程]', ''),
+)
+
+_rendered_html_cache = None
+
+
+def get_rendered_html_cache():
+    """获取全局渲染结果缓存（首次使用时创建）"""
+    global _rendered_html_cache
+    if _rendered_html_cache is None:
+        prefs = get_prefs()
+        cache_file = None
+        if prefs.get('history_html_cache_persist', False):
+            from calibre.utils.config import config_dir
+            cache_file = os.path.join(config_dir, 'plugins', 'ask_ai_plugin_html_cache.json')
+        try:
+            max_entries = int(prefs.get('history_html_cache_size', 200))
+        except (TypeError, ValueError):
+            max_entries = 200
+        _rendered_html_cache = RenderedHTMLCache(
+            _RENDERER_VERSION, max_entries=max_entries, cache_file=cache_file,
+        )
+    return _rendered_html_cache
+
+
+def _current_theme():
+    """当前界面主题（参与缓存键）"""
+    try:
+        from calibre.gui2 import is_dark_theme
+        return 'dark' if is_dark_theme() else 'light'
+    except Exception:
+        return 'default'
+
+
 class MarkdownWorker(QThread):
     result = pyqtSignal(str)
 
-    def __init__(self, text, parent=None):
+    def __init__(self, text, parent=None, cache=None, theme=None):
         super().__init__(None)  # 不设置父对象，避免随父对象一起销毁
         self.text = text
         self._is_cancelled = False
+        self._cache = cache
+        self._theme = theme
     
     def _process_think_tags(self, text):
         """处理推理模型的 think 标签，将其转换为特殊样式的 HTML
@@ -130,10 +189,11 @@ class MarkdownWorker(QThread):
             
             # 使用markdown2转换markdown为HTML
             # 注意：markdown-in-html 允许在markdown中使用HTML标签（如<a>链接）
-            html = markdown2.markdown(
-                text_to_convert,
-                extras=_MARKDOWN2_EXTRAS,
-            )
+            with get_profiler().stage('render.markdown'):
+                html = markdown2.markdown(
+                    text_to_convert,
+                    extras=_MARKDOWN2_EXTRAS,
+                )
             
             # 将占位符替换回 think 块的 HTML
             for i, think_content in enumerate(think_blocks):
@@ -145,6 +205,9 @@ class MarkdownWorker(QThread):
                 return
                 
             safe_html = _sanitize_response_html(html)
+
+            if self._cache is not None:
+                self._cache.put(self.text, safe_html, self._theme)
             
             if not self._is_cancelled:
                 self.result.emit(safe_html)
@@ -165,6 +228,96 @@ class ResponseSignals(QObject):
     request_finished = pyqtSignal()
     # 新增流式响应的信号
     stream_update = pyqtSignal(str)
+    # 实际回答的 AI（对冲请求中可能是备用 AI）
+    answered_by = pyqtSignal(str)
+
+
+class RenderScheduler(QObject):
+    """对话框级渲染调度器
+
+    所有面板共享一个帧定时器：每帧根据面板可见性/焦点确定优先级，
+    按各面板实测渲染耗时分配帧预算，取代每个 ResponseHandler 各自的节流定时器。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._core = FrameScheduler()
+        self._handlers = {}
+        self._timer = QTimer(self)
+        self._timer.setInterval(self._core.frame_interval_ms)
+        self._timer.timeout.connect(self._on_frame)
+
+    def register(self, handler):
+        key = id(handler)
+        self._handlers[key] = handler
+        self._core.register(key)
+
+    def unregister(self, handler):
+        key = id(handler)
+        self._handlers.pop(key, None)
+        self._core.unregister(key)
+
+    def request(self, handler):
+        """面板有新的流式内容，等待下一帧渲染"""
+        key = id(handler)
+        if key not in self._handlers:
+            self.register(handler)
+        self._core.request(key)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def cancel(self, handler):
+        self._core.cancel(id(handler))
+
+    def note_interaction(self, *args):
+        """用户输入或滚动时调用，短时间内压缩渲染预算以保持交互流畅"""
+        self._core.note_interaction()
+
+    def stats(self):
+        """返回帧统计信息（用于调试）"""
+        return self._core.stats()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _panel_priority(self, handler):
+        area = handler.response_area
+        try:
+            if area is None or not area.isVisible():
+                return PRIORITY_BACKGROUND
+            window = area.window()
+            if window is not None and window.isMinimized():
+                return PRIORITY_BACKGROUND
+            # 用户正在回看内容时降频，保持阅读稳定
+            if handler._user_is_scrolling:
+                return PRIORITY_BACKGROUND
+            if area.hasFocus() or area.underMouse():
+                return PRIORITY_FOCUSED
+        except RuntimeError:
+            # 底层 C++ 对象已销毁
+            return PRIORITY_BACKGROUND
+        return PRIORITY_VISIBLE
+
+    def _on_frame(self):
+        frame_start = time.perf_counter()
+        for key, handler in list(self._handlers.items()):
+            self._core.set_priority(key, self._panel_priority(handler))
+
+        for key in self._core.plan():
+            handler = self._handlers.get(key)
+            if handler is None:
+                continue
+            render_start = time.perf_counter()
+            try:
+                handler._process_stream_buffer(scheduled=True)
+            except Exception as e:
+                logger.error(f"[Render Scheduler] 面板渲染出错: {str(e)}")
+            self._core.record(key, time.perf_counter() - render_start)
+
+        self._core.record_frame(time.perf_counter() - frame_start)
+        if not self._core.has_pending():
+            self._timer.stop()
+
 
 class ResponseHandler(QObject):
     stop_time_signal = pyqtSignal()
@@ -180,12 +333,19 @@ class ResponseHandler(QObject):
         self.i18n = None
         self._response_text = ''
         self._request_cancelled = False
+        # 当前请求的取消事件：停止或超时时设置，API 客户端据此不再排队和重试
+        self._cancel_event = None
         self._loading_timer = None
         self.api = None
         self._markdown_worker = None
         self.signal = ResponseSignals()
         self.history_manager = HistoryManager()
         self.current_metadata = None  # 存储当前书籍的元数据
+        self._last_prompt = None  # 本次请求实际发送的提示词（多轮对话的稳定前缀）
+        self._conversation_parent_uid = None  # 追问时上一轮对话的 UID
+        self.fallback_ai = None  # 首 token 太慢时改用的备用 AI（由面板在发送前设置）
+        self._answered_by = None  # 本次请求实际回答的 AI
+        self._answer_usage = None  # 本次回答的 token 用量（提供商报告）
         
         # 智能滚动控制变量
         self._user_is_scrolling = False  # 用户是否正在主动滚动
@@ -195,6 +355,15 @@ class ResponseHandler(QObject):
         self._pending_html = None  # 节流期间待刷新的HTML
         self._pending_html_timer = None  # 节流重试定时器
         self._force_next_html_update = False  # 下一次 HTML 更新是否强制不节流
+        self._render_scheduler = None  # 对话框级渲染调度器（未设置时使用自身节流）
+
+    def set_render_scheduler(self, scheduler):
+        """接入对话框级渲染调度器，流式渲染交由其统一分配帧预算"""
+        if self._render_scheduler is not None:
+            self._render_scheduler.unregister(self)
+        self._render_scheduler = scheduler
+        if scheduler is not None:
+            scheduler.register(self)
     
     def _process_think_tags_for_stream(self, text):
         """处理流式响应中的 think 标签
@@ -283,6 +452,8 @@ class ResponseHandler(QObject):
         
         # 设置取消标志
         self._request_cancelled = True
+        if self._cancel_event is not None:
+            self._cancel_event.set()
         
         # 停止加载动画
         self._stop_loading_timer()
@@ -388,16 +559,23 @@ class ResponseHandler(QObject):
             # 恢复按钮状态 - 通过信号在主线程中更新
             self.signal.request_finished.emit()
 
-    def start_async_request(self, prompt, model_id=None, use_library_chat=False):
+    def start_async_request(self, prompt, model_id=None, use_library_chat=False, conversation_parent_uid=None):
         """开始异步请求 API，可以处理普通请求和流式请求
         
         Args:
             prompt: 提示词
             model_id: 可选，指定使用的模型ID。如果为None，使用当前选中的模型
             use_library_chat: 是否使用Library Chat功能（仅在未选择书籍时使用）
+            conversation_parent_uid: 可选，追问时上一轮对话的 UID，之前的轮次作为上下文发送
         """
         # 清理之前的请求状态
         self.cleanup()
+        
+        self._last_prompt = prompt
+        self._conversation_parent_uid = conversation_parent_uid
+        self._answered_by = None
+        self._answer_usage = None
+        fallback_ai = self.fallback_ai
 
         # 从新请求开始时刻计时（与下方 UI 守护超时一致）
         self._request_start_time = time.time()
@@ -412,10 +590,14 @@ class ResponseHandler(QObject):
         self._current_signals.request_finished.connect(self._cleanup_request)
         # 连接流式响应信号
         self._current_signals.stream_update.connect(self._handle_stream_update)
+        self._current_signals.answered_by.connect(self._on_answered_by)
         
         # 初始化流式响应相关变量
         self._init_stream_variables()
         
+        cancel_event = Event()
+        self._cancel_event = cancel_event
+        
         def run_request():
             try:
                 # 记录当前使用的 AI 模型
@@ -441,13 +623,20 @@ class ResponseHandler(QObject):
                 
                 model_supports_streaming = hasattr(self.api._ai_model, 'supports_streaming') and self.api._ai_model.supports_streaming()
                 streaming_enabled = self.api._ai_model.config.get('enable_streaming', True)  # 默认启用
-                
+                target_ai_id = self.api._model_name
+                target_model = self.api._ai_model.config.get('model', '')
                 
                 # 恢复原始模型（如果切换了的话）
                 if original_model is not None:
                     self.api._ai_model = original_model
                     self.api._model_name = original_model_name
                 
+                # 多轮对话：读取并压缩之前的轮次
+                history = None
+                if conversation_parent_uid:
+                    history = self._build_conversation_history(
+                        conversation_parent_uid, target_ai_id, target_model)
+                
                 if model_supports_streaming and streaming_enabled:
                     # 使用流式请求
                     
@@ -464,14 +653,20 @@ class ResponseHandler(QObject):
                             self._current_signals.stream_update.emit(chunk)
                     
                     # 调用API时传入回调函数、model_id和use_library_chat
-                    response = self.api.ask(prompt, stream=True, stream_callback=stream_callback, model_id=model_id, use_library_chat=use_library_chat)
+                    response = self.api.ask(prompt, stream=True, stream_callback=stream_callback, model_id=model_id, use_library_chat=use_library_chat, history=history,
+                                            fallback_ai=fallback_ai, on_answered_by=self._current_signals.answered_by.emit,
+                                            cancel_event=cancel_event)
+                    self._answer_usage = self.api.last_usage
                     
                     # 在流式请求完成后，发送完整响应
                     if not self._request_cancelled:
                         self._current_signals.update_ui.emit(self._stream_response, True)
                 else:
                     # 使用普通请求
-                    response = self.api.ask(prompt, stream=False, model_id=model_id, use_library_chat=use_library_chat)  # 明确指定不使用流式，并传递model_id和use_library_chat
+                    response = self.api.ask(prompt, stream=False, model_id=model_id, use_library_chat=use_library_chat, history=history,
+                                            fallback_ai=fallback_ai, on_answered_by=self._current_signals.answered_by.emit,
+                                            cancel_event=cancel_event)  # 明确指定不使用流式，并传递model_id和use_library_chat
+                    self._answer_usage = self.api.last_usage
                     if not self._request_cancelled:
                         self._current_signals.update_ui.emit(response, True)
                 
@@ -515,6 +710,45 @@ class ResponseHandler(QObject):
         self._timeout_timer.timeout.connect(self._check_request_timeout)
         self._timeout_timer.start(guard_sec * 1000)
     
+    def _on_answered_by(self, ai_id):
+        """记录实际回答的 AI，并在面板标题栏中标出备用 AI"""
+        self._answered_by = ai_id or None
+        panel = self._find_panel()
+        if panel is not None and hasattr(panel, 'show_answered_by'):
+            panel.show_answered_by(ai_id)
+    
+    def _find_panel(self):
+        parent_dialog = self.parent()
+        for panel in getattr(parent_dialog, 'response_panels', None) or []:
+            if getattr(panel, 'response_handler', None) is self:
+                return panel
+        return None
+    
+    def _build_conversation_history(self, parent_uid, ai_id, model_name):
+        """读取之前的对话轮次并按 token 预算压缩（在请求线程中调用）"""
+        from .plugin_prefs import get_prefs
+        from .conversation import DEFAULT_CONTEXT_TOKENS, build_history_messages, load_turns
+        from .token_estimator import tokenizer_family
+        
+        prefs = get_prefs()
+        try:
+            turns = load_turns(self.history_manager, parent_uid)
+            summarize_fn = None
+            summary_ai = prefs.get('conversation_summary_ai', '')
+            if summary_ai and summary_ai in prefs.get('models', {}):
+                summarize_fn = lambda text: self.api.ask(text, stream=False, model_id=summary_ai)
+            history = build_history_messages(
+                turns, ai_id,
+                budget_tokens=int(prefs.get('conversation_context_tokens', DEFAULT_CONTEXT_TOKENS)),
+                family=tokenizer_family(ai_id.split('_')[0] if ai_id else '', model_name),
+                summarize_fn=summarize_fn,
+            )
+            logger.info(f"[Conversation] 上下文: {len(turns)} 轮 -> {len(history)} 条消息, parent={parent_uid}")
+            return history
+        except Exception as e:
+            logger.warning(f"[Conversation] 读取对话上下文失败，按单轮发送: {str(e)}")
+            return None
+    
     # 初始化流式响应相关变量
     def _init_stream_variables(self):
         """初始化流式响应相关变量"""
@@ -545,6 +779,11 @@ class ResponseHandler(QObject):
         
         # 停止加载动画，因为我们已经开始收到响应
         self._stop_loading_timer()
+
+        # 有对话框级调度器时，由其按帧预算统一安排渲染
+        if self._render_scheduler is not None:
+            self._render_scheduler.request(self)
+            return
         
         # 控制更新频率，避免闪烁
         current_time = time.time()
@@ -557,8 +796,12 @@ class ResponseHandler(QObject):
                 remaining_time = int((self._last_update_time + self._update_interval - current_time) * 1000)
                 self._update_timer.start(max(10, remaining_time))  # 至少10ms
     
-    def _process_stream_buffer(self):
-        """处理累积的流式响应缓冲区"""
+    @profiled('render.stream_update')
+    def _process_stream_buffer(self, scheduled=False):
+        """处理累积的流式响应缓冲区
+
+        :param scheduled: 是否由 RenderScheduler 调度（已按帧预算节流，不再二次节流）
+        """
         if not self._stream_buffer or self._request_cancelled:
             return
         
@@ -586,10 +829,11 @@ class ResponseHandler(QObject):
             
             # 使用markdown2转换完整的累积响应为HTML
             # 注意：markdown-in-html 允许在markdown中使用HTML标签（如<a>链接）
-            html = markdown2.markdown(
-                text_to_convert,
-                extras=_MARKDOWN2_EXTRAS,
-            )
+            with get_profiler().stage('render.markdown'):
+                html = markdown2.markdown(
+                    text_to_convert,
+                    extras=_MARKDOWN2_EXTRAS,
+                )
             
             # 将占位符替换回 think 块的 HTML
             import re
@@ -613,7 +857,7 @@ class ResponseHandler(QObject):
             safe_html = _sanitize_response_html(html)
             
             # 更新UI
-            self._set_html_response(safe_html)
+            self._set_html_response(safe_html, force=scheduled)
             
             # 停止加载动画，因为我们已经开始收到响应
             self._stop_loading_timer()
@@ -632,6 +876,8 @@ class ResponseHandler(QObject):
             return
 
         self._request_cancelled = True
+        if self._cancel_event is not None:
+            self._cancel_event.set()
         self._stop_loading_timer()
         msg = self.i18n.get(
             'request_timeout_error',
@@ -692,6 +938,8 @@ class ResponseHandler(QObject):
         """停止所有定时器"""
         # self._stop_loading_timer()
         self.stop_time_signal.emit()
+        if self._render_scheduler is not None:
+            self._render_scheduler.cancel(self)
         if self._pending_html_timer:
             self._pending_html_timer.stop()
         self._pending_html = None
@@ -712,6 +960,13 @@ class ResponseHandler(QObject):
         def update_loading():
             if not self._request_cancelled:
                 base_text = self._loading_texts[self._animation_mode]
+                # 请求在客户端限流器中排队时显示排队位置和已等待时间
+                queue_status = getattr(self.api, 'queue_status', None) if self._animation_mode == 'requesting' else None
+                if queue_status:
+                    base_text = self.i18n.get(
+                        'rate_limit_queued', 'Waiting for {provider} rate limit ({ahead} ahead, {seconds}s)'
+                    ).format(provider=queue_status['key'].split(':')[0], ahead=queue_status['position'],
+                             seconds=int(queue_status['waited']))
                 self.response_area.setHtml(f"""
                     <div style="
                         text-align: left;
@@ -850,7 +1105,16 @@ class ResponseHandler(QObject):
             
         # 最终渲染阶段必须确保落盘到 UI，避免被节流吞掉最后一帧
         self._force_next_html_update = True
-        self._markdown_worker = MarkdownWorker(text)  # 不设置父对象
+
+        # 命中渲染缓存（历史记录切换、同一回答重复显示）时直接显示
+        cache = get_rendered_html_cache()
+        theme = _current_theme()
+        cached_html = cache.get(text, theme)
+        if cached_html is not None:
+            self._set_html_response(cached_html, force=True)
+            return
+
+        self._markdown_worker = MarkdownWorker(text, cache=cache, theme=theme)  # 不设置父对象
         self._markdown_worker.result.connect(self._set_html_response)
         self._markdown_worker.finished.connect(self._on_markdown_finished)
         self._markdown_worker.start()
@@ -872,6 +1136,9 @@ class ResponseHandler(QObject):
         if value != self._last_scroll_value:
             is_at_bottom = value >= scrollbar.maximum() - 5
             
+            if self._render_scheduler is not None:
+                self._render_scheduler.note_interaction()
+
             # 如果用户离开底部，标记为正在滚动
             if not is_at_bottom and not self._user_is_scrolling:
                 self._user_is_scrolling = True
@@ -921,6 +1188,7 @@ class ResponseHandler(QObject):
         if pending_html:
             self._set_html_response(pending_html, force=True)
     
+    @profiled('render.set_html_response')
     def _set_html_response(self, html, force=False):
         """设置HTML响应并确保正确的样式"""
         import time
@@ -977,8 +1245,9 @@ class ResponseHandler(QObject):
             # 临时断开滚动条信号，避免setHtml触发valueChanged导致误判
             scrollbar.valueChanged.disconnect(self._on_scroll_value_changed)
             
-            # 设置HTML内容
-            self.response_area.setHtml(html)
+            # 设置HTML内容（不含被节流推迟的调用，单独计时）
+            with get_profiler().stage('render.setHtml'):
+                self.response_area.setHtml(html)
             self.response_area.setAlignment(Qt.AlignLeft)
             
             # 决定滚动行为
@@ -1112,6 +1381,31 @@ class ResponseHandler(QObject):
                             }
                             logger.info(f"[保存历史] AI={ai_id}, Provider={model_info['provider_name']}, Model={model_info['model']}")
                         
+                        # 对冲请求由备用 AI 回答：记录实际回答的提供商和模型
+                        if self._answered_by and self._answered_by != ai_id:
+                            from calibre_plugins.ask_ai_plugin.api import create_model
+                            answered_model = create_model(self._answered_by)
+                            if answered_model is not None:
+                                model_info = {
+                                    'provider_name': answered_model.get_provider_name(),
+                                    'model': answered_model.config.get('model', ''),
+                                    'api_base': answered_model.config.get('api_base_url', ''),
+                                    'answered_by': self._answered_by,
+                                    'fallback_for': ai_id,
+                                }
+                                logger.info(f"[保存历史] 由备用 AI {self._answered_by} 回答（面板 AI: {ai_id}）")
+                        
+                        # 提供商报告的 token 用量和按价格表估算的费用
+                        usage, cost = self._answer_usage, None
+                        if usage:
+                            from .usage import estimate_cost, find_price
+                            model_info = dict(model_info or {})
+                            model_info['usage'] = usage
+                            cost = estimate_cost(usage, find_price(model_info.get('model'),
+                                                                   get_prefs().get('model_prices') or {}))
+                            if cost is not None:
+                                model_info['cost'] = round(cost, 6)
+                        
                         self.history_manager.save_history(
                             parent_dialog.current_uid,
                             mode,
@@ -1119,15 +1413,24 @@ class ResponseHandler(QObject):
                             question,
                             text,
                             ai_id=ai_id,
-                            model_info=model_info
+                            model_info=model_info,
+                            parent_uid=self._conversation_parent_uid,
+                            prompt=self._last_prompt
                         )
                         
                         # 增加AI回复统计计数
                         try:
                             from .statistics_widget import increment_ai_reply_count
-                            from .config import get_prefs
+                            from .plugin_prefs import get_prefs
                             prefs = get_prefs()
-                            increment_ai_reply_count(prefs)
+                            increment_ai_reply_count(
+                                prefs,
+                                ai_id=ai_id,
+                                mode=mode,
+                                book_ids=[b.get('id') for b in books_metadata_to_save if b.get('id') != 'ai_search'],
+                                usage=usage,
+                                cost=cost
+                            )
                         except Exception as stat_error:
                             logger.warning(f"Failed to increment AI reply count: {stat_error}")
                         
@@ -7,8 +7,9 @@
 """
 
 import logging
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextBrowser, QSizePolicy
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextBrowser, QSizePolicy, QLabel
 from PyQt5.QtCore import Qt, pyqtSignal
+from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
 from calibre_plugins.ask_ai_plugin.widgets import NoScrollComboBox
 from calibre_plugins.ask_ai_plugin.ui_constants import (
     SPACING_SMALL, PADDING_MEDIUM, ASK_COMBO_MIN_WIDTH, ASK_RESPONSE_PANEL_MIN_HEIGHT,
@@ -25,7 +26,7 @@ class ResponsePanel(QWidget):
     """单个AI响应面板组件
     
     包含：
-    - Header: AI切换器（多AI模式）
+    - Header: AI切换器（多AI模式）、备用 AI 回答提示
     - Response Area: 响应文本显示区域（右键复制/导出）
     """
     
@@ -70,6 +71,11 @@ class ResponsePanel(QWidget):
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.setSpacing(SPACING_SMALL)
         
+        # 备用 AI 回答时的提示（平时隐藏）
+        self.answered_by_label = QLabel()
+        self.answered_by_label.setStyleSheet("color: palette(mid); font-style: italic;")
+        self.answered_by_label.hide()
+        
         # === Header 区域（横向） ===
         # 只有当 show_ai_switcher 为 True 时才显示 header
         if self.show_ai_switcher:
@@ -82,6 +88,7 @@ class ResponsePanel(QWidget):
             style_ask_toolbar_widget(self.ai_switcher)
             self.ai_switcher.currentIndexChanged.connect(self.on_ai_switched)
             header_layout.addWidget(self.ai_switcher)
+            header_layout.addWidget(self.answered_by_label)
             header_layout.addStretch()
             
             main_layout.addLayout(header_layout)
@@ -91,6 +98,7 @@ class ResponsePanel(QWidget):
             self.ai_switcher = NoScrollComboBox()
             style_ask_toolbar_widget(self.ai_switcher)
             self.ai_switcher.currentIndexChanged.connect(self.on_ai_switched)
+            main_layout.addWidget(self.answered_by_label)
         
         # === Response Area（占据主要空间） ===
         self.response_area = QTextBrowser()
@@ -240,7 +248,7 @@ class ResponsePanel(QWidget):
             bool: True表示继续切换AI，False表示用户取消切换
         """
         from PyQt5.QtWidgets import QMessageBox, QPushButton
-        from calibre_plugins.ask_ai_plugin.config import prefs
+        from calibre_plugins.ask_ai_plugin.plugin_prefs import prefs
         
         # 如果正在初始化，跳过提示（避免在恢复上次选择时弹出确认框）
         if self._is_initializing:
@@ -315,13 +323,14 @@ class ResponsePanel(QWidget):
             
             return False
     
-    def send_request(self, prompt, model_id=None, use_library_chat=False):
+    def send_request(self, prompt, model_id=None, use_library_chat=False, conversation_parent_uid=None):
         """发送请求到选中的AI
         
         Args:
             prompt: 提示词
             model_id: 可选，指定使用的模型ID。如果为None，使用当前选中的AI
             use_library_chat: 是否使用Library Chat功能
+            conversation_parent_uid: 可选，追问时上一轮对话的 UID
         """
         if not self.response_handler:
             logger.error(f"面板 {self.panel_index} 的 ResponseHandler 未初始化")
@@ -339,12 +348,50 @@ class ResponsePanel(QWidget):
         
         # 更新响应处理器的AI标识符（用于历史记录）
         self.response_handler.ai_id = target_model_id
+        self.response_handler.fallback_ai = self.get_fallback_ai(target_model_id)
+        self.show_answered_by(None)
         logger.info(f"[面板 {self.panel_index}] 已设置 ai_id={target_model_id} 用于历史记录")
         
         # 调用响应处理器发送请求，传递model_id和use_library_chat参数
-        self.response_handler.start_async_request(prompt, model_id=target_model_id, use_library_chat=use_library_chat)
+        self.response_handler.start_async_request(
+            prompt, model_id=target_model_id, use_library_chat=use_library_chat,
+            conversation_parent_uid=conversation_parent_uid,
+        )
         logger.info(f"[面板 {self.panel_index}] 异步请求已启动")
     
+    def get_fallback_ai(self, primary_ai=None):
+        """本面板配置的备用 AI（首 token 太慢时改用）；未配置或与主 AI 相同时返回 None"""
+        fallbacks = get_prefs().get('panel_fallback_ais', {}) or {}
+        fallback_ai = fallbacks.get(f'panel_{self.panel_index}')
+        primary_ai = primary_ai or self.get_selected_ai()
+        if not fallback_ai or fallback_ai == primary_ai:
+            return None
+        if fallback_ai not in (get_prefs().get('models', {}) or {}):
+            return None
+        return fallback_ai
+    
+    def set_fallback_ai(self, ai_id):
+        """保存本面板的备用 AI（None 表示关闭对冲）"""
+        prefs = get_prefs()
+        fallbacks = dict(prefs.get('panel_fallback_ais', {}) or {})
+        if ai_id:
+            fallbacks[f'panel_{self.panel_index}'] = ai_id
+        else:
+            fallbacks.pop(f'panel_{self.panel_index}', None)
+        prefs['panel_fallback_ais'] = fallbacks
+        logger.info(f"[面板 {self.panel_index}] 备用 AI: {ai_id}")
+    
+    def show_answered_by(self, ai_id):
+        """备用 AI 回答时在标题栏标出；主 AI 回答或新请求开始时隐藏"""
+        if not ai_id or ai_id == self.response_handler.ai_id:
+            self.answered_by_label.hide()
+            return
+        names = dict(self.parent_dialog._get_configured_ais()) if hasattr(self.parent_dialog, '_get_configured_ais') else {}
+        self.answered_by_label.setText(
+            self.i18n.get('answered_by_fallback', 'Answered by {ai} (fallback)').format(ai=names.get(ai_id, ai_id))
+        )
+        self.answered_by_label.show()
+    
     def get_response_text(self):
         """获取响应文本
         
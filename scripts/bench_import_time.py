@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark plugin import cost with ``python -X importtime``.
+
+calibre imports ``ui`` (the toolbar action) at every start, even if the plugin is
+never opened. This imports a plugin module in a fresh interpreter (the plugin
+directory is mapped to ``calibre_plugins.ask_ai_plugin`` the way calibre's plugin
+loader does), reports its cumulative import time, the slowest modules it pulled in
+and which of the deferred modules (HTML renderer/sanitiser, settings UI, API
+client) were loaded. ``--check`` exits with status 1 if any of them were.
+
+``--startup`` also runs the ``initialization_complete`` hook (with no GUI; it only
+checks the job database) and ``--client`` constructs an ``APIClient`` for the
+selected AI, which must not load the settings UI or any other provider module.
+``genesis`` needs calibre's main window and is covered by tests/test_import_cost.py.
+
+The interpreter needs calibre and PyQt importable, e.g. calibre's bundled Python
+or a source checkout of calibre on PYTHONPATH.
+
+Usage: python scripts/bench_import_time.py [--module ui] [--repeat 5] [--top 15] [--check]
+       [--startup] [--client] [--python /path/to/python]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = 'calibre_plugins.ask_ai_plugin'
+
+# 工具栏动作加载时不应导入的模块（首次使用时才导入）
+DEFERRED_MODULES = (
+    'lib.ask_ai_plugin_vendor.markdown2',
+    'lib.ask_ai_plugin_vendor.bleach',
+    'lib.ask_ai_plugin_vendor.tinycss2',
+    'config',
+    'prompts_widget',
+    'shortcuts_widget',
+    'response_handler',
+    'jobs_dialog',
+    'api',
+)
+
+# 在子进程中模拟 calibre 的插件加载器：只建立包，不执行插件的 __init__.py
+_BOOTSTRAP = '''
+import sys, types
+root = {root!r}
+for name, path in (('calibre_plugins', []), ({package!r}, [root])):
+    module = types.ModuleType(name)
+    module.__path__ = path
+    sys.modules[name] = module
+sys.modules['calibre_plugins'].ask_ai_plugin = sys.modules[{package!r}]
+import importlib
+importlib.import_module({target!r})
+{extra}
+'''
+
+# --startup：以无界面的替身调用启动钩子（没有未完成的后台任务时只读取任务数据库）
+_STARTUP = '''
+ui = importlib.import_module({package!r} + '.ui')
+ui.AskAIPluginUI.initialization_complete(types.SimpleNamespace(gui=None))
+'''
+
+# --client：为当前选择的 AI 创建 API 客户端
+_CLIENT = '''
+importlib.import_module({package!r} + '.api').APIClient()
+'''
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def parse_importtime(stderr):
+    """-X importtime 输出 -> [(模块名, 自身微秒, 累计微秒, 嵌套深度)]，按导入完成顺序"""
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def run_once(python, target, extra=''):
+    code = _BOOTSTRAP.format(root=str(ROOT), package=PACKAGE, target=target, extra=extra.format(package=PACKAGE))
+    result = subprocess.run([python, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=str(ROOT))
+    entries = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise SystemExit(f'importing {target} failed:\n' + '\n'.join(errors[-15:]))
+    return entries
+
+
+def short_name(name):
+    return name[len(PACKAGE) + 1:] if name.startswith(PACKAGE + '.') else name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--module', default='ui', help='plugin module to import (default: ui)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs after one warm-up run')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest modules to list')
+    parser.add_argument('--python', default=sys.executable, help='interpreter with calibre and PyQt')
+    parser.add_argument('--check', action='store_true', help='fail if deferred modules are imported')
+    parser.add_argument('--startup', action='store_true', help='also run the initialization_complete hook')
+    parser.add_argument('--client', action='store_true', help='also construct an APIClient for the selected AI')
+    args = parser.parse_args()
+
+    target = f'{PACKAGE}.{args.module}'
+    extra = (_STARTUP if args.startup else '') + (_CLIENT if args.client else '')
+    run_once(args.python, target, extra)  # 预热：编译 .pyc
+    runs = [run_once(args.python, target, extra) for _ in range(max(1, args.repeat))]
+
+    totals_ms = [sum(cumulative for _, _, cumulative, depth in entries if depth == 0) / 1000
+                 for entries in runs]
+    self_ms = {}
+    for entries in runs:
+        for name, self_us, _, _ in entries:
+            self_ms.setdefault(name, []).append(self_us / 1000)
+    plugin_ms = sum(statistics.median(times) for name, times in self_ms.items()
+                    if name.startswith(PACKAGE + '.'))
+
+    print(f'{target}: {len(runs[-1])} modules, median {statistics.median(totals_ms):.1f} ms '
+          f'(min {min(totals_ms):.1f}, max {max(totals_ms):.1f}) over {len(runs)} runs')
+    print(f'plugin modules (self time): {plugin_ms:.1f} ms')
+    print()
+    print(f"{'self ms':>8}  module")
+    slowest = sorted(self_ms.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, times in slowest[:args.top]:
+        print(f'{statistics.median(times):>8.2f}  {short_name(name)}')
+
+    loaded = {short_name(name) for name in self_ms}
+    deferred = [name for name in DEFERRED_MODULES if name in loaded]
+    if args.client:
+        # 客户端需要 api 和当前 AI 的提供商模块，其余提供商和设置界面仍应延迟加载
+        deferred.remove('api')
+        providers = sorted(name for name in loaded if name.startswith('models.') and name != 'models.base')
+        print(f"provider modules imported: {', '.join(providers) or 'none'}")
+        if len(providers) > 1:
+            deferred.extend(providers)
+    print()
+    if deferred:
+        print('deferred modules imported: ' + ', '.join(deferred))
+    else:
+        print('deferred modules imported: none')
+    if args.check and deferred:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
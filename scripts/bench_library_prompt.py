@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark compact library prompt formats (TSV vs dictionary-encoded).
+
+Builds a synthetic library, encodes it in both formats and reports size in
+characters and estimated tokens, how many books fit into a model's prompt
+budget, and retrieval accuracy: sampled "books by author" / "book titled"
+lookups answered by a literal reader of the (budget-truncated) prompt text.
+
+Usage: python scripts/bench_library_prompt.py [--books 50000] [--model gpt-4o]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import utils  # noqa: E402
+from prompt_limits import get_prompt_budget  # noqa: E402
+from token_estimator import FAMILY_CL100K, FAMILY_O200K, estimate_tokens  # noqa: E402
+
+FORMATS = (utils.LIBRARY_FORMAT_TSV, utils.LIBRARY_FORMAT_DICTIONARY)
+
+_FIRST = ['Isaac', 'Ursula', 'Terry', 'Agatha', 'Arthur', 'Margaret', 'Neil', 'Octavia',
+          'Haruki', 'Jane', 'Fyodor', 'Gabriel', 'Toni', 'Stephen', 'Virginia', 'Kazuo']
+_LAST = ['Asimov', 'Le Guin', 'Pratchett', 'Christie', 'Clarke', 'Atwood', 'Gaiman', 'Butler',
+         'Murakami', 'Austen', 'Dostoevsky', 'Garcia Marquez', 'Morrison', 'King', 'Woolf', 'Ishiguro']
+_WORDS = ['Night', 'Empire', 'Garden', 'River', 'Shadow', 'Machine', 'Winter', 'House', 'Stars',
+          'Memory', 'Silence', 'Kingdom', 'Light', 'Ocean', 'Glass', 'Fire', 'City', 'Dream']
+
+
+def make_library(count, seed=42):
+    """Synthetic library with a long-tailed author distribution and ~30% series books."""
+    rng = random.Random(seed)
+    authors = [f'{first} {last}' for first in _FIRST for last in _LAST]
+    authors += [f'{rng.choice(_FIRST)} {rng.choice(_LAST)}-{i}' for i in range(count // 8)]
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(authors))]
+    series_by_author = {}
+    books = []
+    for book_id in range(1, count + 1):
+        author = rng.choices(authors, weights)[0]
+        title = ' '.join(rng.sample(_WORDS, rng.randint(2, 4)))
+        book = {'id': book_id, 'title': f'The {title}', 'authors': author}
+        if rng.random() < 0.3:
+            series = series_by_author.setdefault(author, f'{rng.choice(_WORDS)} Chronicles of {author}')
+            book['series'] = series
+        books.append(book)
+    return books
+
+
+def read_prompt(text, encoding):
+    """Literal reader of a compact book list: {book_id: (title, authors)}."""
+    books = {}
+    if encoding == utils.LIBRARY_FORMAT_TSV:
+        for line in text.splitlines():
+            parts = line.split('|')
+            if len(parts) >= 3 and parts[0].isdigit():
+                books[int(parts[0])] = (parts[1], parts[2])
+        return books
+
+    codes = {}
+    section = None
+    authors = ''
+    for line in text.splitlines():
+        if line in ('SERIES', 'BOOKS'):
+            section = line
+        elif section == 'SERIES' and '=' in line:
+            code, name = line.split('=', 1)
+            codes[code] = name
+        elif section == 'BOOKS' and line.startswith('@'):
+            authors = line[1:]
+        elif section == 'BOOKS':
+            parts = line.split('|')
+            if len(parts) >= 2 and parts[0].isdigit():
+                books[int(parts[0])] = (parts[1], authors)
+    return books
+
+
+def retrieval_accuracy(library, read_books, queries=500, seed=7):
+    """Share of sampled author/title lookups answered exactly from the prompt."""
+    rng = random.Random(seed)
+    by_author = {}
+    for book in library:
+        by_author.setdefault(book['authors'], set()).add(book['id'])
+    seen_by_author = {}
+    for book_id, (_, authors) in read_books.items():
+        seen_by_author.setdefault(authors, set()).add(book_id)
+    seen_titles = {(title, book_id) for book_id, (title, _) in read_books.items()}
+
+    correct = 0
+    for _ in range(queries):
+        book = rng.choice(library)
+        if rng.random() < 0.5:
+            correct += seen_by_author.get(book['authors'], set()) == by_author[book['authors']]
+        else:
+            correct += (book['title'], book['id']) in seen_titles
+    return correct / queries
+
+
+def run(book_count, model):
+    library = make_library(book_count)
+    models = [(model.split('-')[0], {'model': model})]
+    budget = get_prompt_budget(True, {}, models)
+    overhead = utils.build_library_prompt('', {'library_cached_metadata': '[]'})
+
+    print(f'Synthetic library: {book_count} books; budget: {budget.limit} {budget.unit} ({budget.model})')
+    header = f"{'format':<11}{'chars':>11}{'o200k tok':>11}{'cl100k tok':>11}{'tok/book':>10}" \
+             f"{'fit books':>11}{'accuracy':>10}{'encode ms':>11}"
+    print(header)
+    print('-' * len(header))
+    for encoding in FORMATS:
+        start = time.perf_counter()
+        full_text = utils.format_books_compact(library, encoding)
+        encode_ms = (time.perf_counter() - start) * 1000
+        o200k = estimate_tokens(full_text, FAMILY_O200K)
+        cl100k = estimate_tokens(full_text, FAMILY_CL100K)
+
+        fitted_text, fitted = utils.fit_books_compact(library, budget, overhead, encoding)
+        decoded = read_prompt(full_text, encoding)
+        assert len(decoded) == book_count, f'{encoding}: lossy encoding'
+        accuracy = retrieval_accuracy(library, read_prompt(fitted_text, encoding))
+        print(f'{encoding:<11}{len(full_text):>11}{o200k:>11}{cl100k:>11}{o200k / book_count:>10.2f}'
+              f'{fitted:>11}{accuracy:>10.1%}{encode_ms:>11.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=50_000)
+    parser.add_argument('--model', default='gpt-4o', help='model whose context window sets the budget')
+    args = parser.parse_args()
+    run(args.books, args.model)
+
+
+if __name__ == '__main__':
+    main()
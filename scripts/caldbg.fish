@@ -3,6 +3,9 @@
 #   source scripts/caldbg.fish
 #   soufish                    # 若已在 ~/.config/fish/config.fish 中 source 本文件
 #   ~/ask_grok/bin/caldbg-ag   # 任意 shell 可直接运行
+# 性能分析（见 profiling.py）：
+#   ASK_AI_PROFILE=1 bin/caldbg          # 记录各阶段耗时直方图
+#   ASK_AI_PROFILE=cprofile bin/caldbg   # 同时保存每次提问的 pstats
 
 if not type -q calibre-customize
     if test -d /Applications/calibre.app/Contents/MacOS
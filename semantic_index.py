@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Local embedding index for semantic AI Search."""
+
+import hashlib
+import heapq
+import logging
+import math
+import mmap
+import operator
+import os
+import re
+import threading
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from .json_store import atomic_write_json, load_versioned_json
+except ImportError:
+    from json_store import atomic_write_json, load_versioned_json
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR_NAME = 'ask_ai_plugin_semantic'
+VECTORS_FILE = 'vectors.f32'
+META_FILE = 'meta.json'
+_INDEX_VERSION = 1
+
+DEFAULT_TOP_K = 200
+EMBED_BATCH_SIZE = 32
+# 索引覆盖率低于该比例时不使用语义检索（回退到完整书目）
+MIN_COVERAGE = 0.9
+# 简介截断长度（字符），嵌入模型上下文有限
+MAX_COMMENT_CHARS = 1500
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+_ITEM_SIZE = array('f').itemsize
+
+
+def build_book_document(record):
+    """把书籍元数据拼成用于嵌入的文本"""
+    title = record.get('title') or ''
+    authors = record.get('authors') or []
+    if isinstance(authors, (list, tuple)):
+        authors = ', '.join(authors)
+    parts = [f"{title} by {authors}" if authors else title]
+    series = record.get('series')
+    if series:
+        parts.append(f"Series: {series}")
+    tags = record.get('tags') or []
+    if tags:
+        parts.append("Tags: " + ', '.join(tags))
+    comments = record.get('comments') or ''
+    if comments:
+        comments = _SPACE_RE.sub(' ', _TAG_RE.sub(' ', comments)).strip()
+        parts.append(comments[:MAX_COMMENT_CHARS])
+    return '\n'.join(parts)
+
+
+def document_fingerprint(text):
+    return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector))
+    if not norm:
+        return [0.0] * len(vector)
+    return [x / norm for x in vector]
+
+
+class SemanticIndex:
+    """按书籍 ID 存储归一化嵌入向量的矩阵文件 + JSON 元数据"""
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.vectors_path = os.path.join(base_dir, VECTORS_FILE)
+        self.meta_path = os.path.join(base_dir, META_FILE)
+        self._lock = threading.RLock()
+        self._load_meta()
+
+    # ----- 元数据 -----
+
+    def _reset_meta(self, model=None, dim=0):
+        self.model = model
+        self.dim = dim
+        self.row_count = 0
+        self.rows = {}
+        self.fingerprints = {}
+        self.free_rows = []
+
+    def _load_meta(self):
+        self._reset_meta()
+        meta = load_versioned_json(self.meta_path, _INDEX_VERSION)
+        if meta is None:
+            return
+        self.model = meta.get('model')
+        self.dim = meta.get('dim', 0)
+        self.row_count = meta.get('row_count', 0)
+        self.rows = {int(book_id): row for book_id, row in meta.get('rows', {}).items()}
+        self.fingerprints = {int(book_id): fp for book_id, fp in meta.get('fingerprints', {}).items()}
+        self.free_rows = list(meta.get('free_rows', []))
+
+    def _save_meta(self):
+        meta = {
+            'version': _INDEX_VERSION,
+            'model': self.model,
+            'dim': self.dim,
+            'row_count': self.row_count,
+            'rows': {str(book_id): row for book_id, row in self.rows.items()},
+            'fingerprints': {str(book_id): fp for book_id, fp in self.fingerprints.items()},
+            'free_rows': self.free_rows,
+        }
+        atomic_write_json(self.meta_path, meta)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def reset(self, model=None, dim=0):
+        """清空索引（嵌入模型变化时调用）"""
+        with self._lock:
+            self._reset_meta(model, dim)
+            os.makedirs(self.base_dir, exist_ok=True)
+            open(self.vectors_path, 'wb').close()
+            self._save_meta()
+
+    # ----- 增量更新 -----
+
+    def pending(self, documents):
+        """
+        比较当前书目与索引
+
+        :param documents: {book_id: 嵌入文本}
+        :return: (需要（重新）嵌入的 [(book_id, text, fingerprint)], 已删除的书籍 ID 列表)
+        """
+        to_embed = []
+        for book_id, text in documents.items():
+            fingerprint = document_fingerprint(text)
+            if self.fingerprints.get(book_id) != fingerprint:
+                to_embed.append((book_id, text, fingerprint))
+        removed = [book_id for book_id in self.rows if book_id not in documents]
+        return to_embed, removed
+
+    def remove(self, book_ids):
+        with self._lock:
+            for book_id in book_ids:
+                row = self.rows.pop(book_id, None)
+                self.fingerprints.pop(book_id, None)
+                if row is not None:
+                    self.free_rows.append(row)
+            self._save_meta()
+
+    def add(self, items):
+        """写入 [(book_id, fingerprint, vector)]；已有书籍原位覆盖，新书优先复用空闲行"""
+        if not items:
+            return
+        with self._lock:
+            if not self.dim:
+                self.dim = len(items[0][2])
+            os.makedirs(self.base_dir, exist_ok=True)
+            mode = 'r+b' if os.path.exists(self.vectors_path) else 'w+b'
+            with open(self.vectors_path, mode) as f:
+                for book_id, fingerprint, vector in items:
+                    if len(vector) != self.dim:
+                        raise ValueError(f'Embedding dimension {len(vector)} != index dimension {self.dim}')
+                    row = self.rows.get(book_id)
+                    if row is None:
+                        row = self.free_rows.pop() if self.free_rows else self.row_count
+                        if row == self.row_count:
+                            self.row_count += 1
+                    f.seek(row * self.dim * _ITEM_SIZE)
+                    f.write(array('f', _normalize(vector)).tobytes())
+                    self.rows[book_id] = row
+                    self.fingerprints[book_id] = fingerprint
+            self._save_meta()
+
+    def update(self, documents, embed_fn, model=None, batch_size=EMBED_BATCH_SIZE,
+               cancel_event=None, progress=None):
+        """
+        增量同步索引
+
+        :param documents: {book_id: 嵌入文本}
+        :param embed_fn: 文本列表 -> 向量列表
+        :param model: 嵌入模型名称；与索引记录不一致时重建
+        :param progress: 可选回调 progress(done, total)
+        :return: 本次嵌入的书籍数
+        """
+        if model is not None and model != self.model:
+            logger.info(f"嵌入模型变化 ({self.model} -> {model})，重建语义索引")
+            self.reset(model)
+        to_embed, removed = self.pending(documents)
+        if removed:
+            self.remove(removed)
+        total = len(to_embed)
+        done = 0
+        for start in range(0, total, batch_size):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            batch = to_embed[start:start + batch_size]
+            vectors = embed_fn([text for _, text, _ in batch])
+            self.add([(book_id, fingerprint, vector)
+                      for (book_id, _, fingerprint), vector in zip(batch, vectors)])
+            done += len(batch)
+            if progress:
+                progress(done, total)
+        return done
+
+    # ----- 检索 -----
+
+    def search(self, query_vector, k=DEFAULT_TOP_K):
+        """返回与查询向量最相似的 [(book_id, score)]，按相似度降序"""
+        with self._lock:
+            if not self.rows or not self.dim or len(query_vector) != self.dim:
+                return []
+            query = _normalize(query_vector)
+            if numpy is not None:
+                return self._search_numpy(query, k)
+            return self._search_python(query, k)
+
+    def _search_numpy(self, query, k):
+        book_ids = numpy.fromiter(self.rows.keys(), dtype=numpy.int64, count=len(self.rows))
+        row_index = numpy.fromiter(self.rows.values(), dtype=numpy.int64, count=len(self.rows))
+        matrix = numpy.memmap(self.vectors_path, dtype=numpy.float32, mode='r',
+                              shape=(self.row_count, self.dim))
+        scores = matrix[row_index] @ numpy.asarray(query, dtype=numpy.float32)
+        k = min(k, len(scores))
+        top = numpy.argpartition(-scores, k - 1)[:k]
+        top = top[numpy.argsort(-scores[top])]
+        return [(int(book_ids[i]), float(scores[i])) for i in top]
+
+    def _search_python(self, query, k):
+        # 每次检索都重新映射并在结束时关闭，不长期占用文件（Windows 上会锁住文件，无法改写）
+        dim = self.dim
+        with open(self.vectors_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped).cast('f')
+            try:
+                scored = (
+                    (sum(map(operator.mul, query, view[row * dim:(row + 1) * dim])), book_id)
+                    for book_id, row in self.rows.items()
+                )
+                return [(book_id, score) for score, book_id in heapq.nlargest(k, scored)]
+            finally:
+                view.release()
+
+
+# ----- 插件集成 -----
+
+_index = None
+_update_lock = threading.Lock()
+
+
+def get_semantic_index(base_dir=None):
+    """返回进程内共享的语义索引"""
+    global _index
+    if _index is None:
+        if base_dir is None:
+            from calibre.utils.config import config_dir
+            base_dir = os.path.join(config_dir, 'plugins', INDEX_DIR_NAME)
+        _index = SemanticIndex(base_dir)
+    return _index
+
+
+def get_embedder(prefs):
+    """
+    根据已配置的 Ollama 服务创建嵌入函数
+
+    :return: (embed_fn, 嵌入模型名称)；未配置 Ollama 时返回 (None, None)
+    """
+    models_config = prefs.get('models', {})
+    ollama_ids = sorted(ai_id for ai_id in models_config if ai_id.split('_')[0] == 'ollama')
+    if not ollama_ids:
+        return None, None
+    config = dict(models_config[ollama_ids[0]])
+    try:
+        from .models.ollama import OllamaModel
+    except ImportError:
+        from models.ollama import OllamaModel
+    model = prefs.get('ai_search_embedding_model') or OllamaModel.DEFAULT_EMBEDDING_MODEL
+    config.setdefault('api_base_url', OllamaModel.DEFAULT_API_BASE_URL)
+    ollama = OllamaModel(config)
+    return (lambda texts: ollama.embed(texts, model=model)), model
+
+
+def start_index_update(db, prefs):
+    """
+    在后台线程中增量更新语义索引
+
+    书目在调用线程中批量读取（很快），嵌入请求在后台执行。
+    已有更新在进行时直接返回 False。
+    """
+    if not prefs.get('ai_search_semantic_enabled'):
+        return False
+    embed_fn, model = get_embedder(prefs)
+    if embed_fn is None:
+        logger.warning("语义 AI 搜索已开启，但未配置 Ollama")
+        return False
+    if not _update_lock.acquire(blocking=False):
+        return False
+    try:
+        try:
+            from .book_metadata import load_books
+        except ImportError:
+            from book_metadata import load_books
+        book_ids = list(db.new_api.all_book_ids())
+        records, _ = load_books(db, book_ids, fields=('title', 'authors', 'series', 'tags', 'comments'))
+        documents = {record.id: build_book_document(record) for record in records}
+    except Exception as e:
+        _update_lock.release()
+        logger.error(f"读取语义索引书目失败: {str(e)}")
+        return False
+
+    def run():
+        try:
+            count = get_semantic_index().update(documents, embed_fn, model=model)
+            logger.info(f"语义索引已更新: 嵌入 {count} 本书，共 {len(get_semantic_index())} 本")
+        except Exception as e:
+            logger.error(f"更新语义索引失败: {str(e)}")
+        finally:
+            _update_lock.release()
+
+    threading.Thread(target=run, name='AskAISemanticIndex', daemon=True).start()
+    return True
+
+
+def rank_books(query, books, prefs, index=None, embed_fn=None):
+    """
+    用语义索引挑选与问题最相关的书籍
+
+    :param books: 图书馆缓存书目（dict 列表）
+    :return: 按相关度排序的前 K 本书；语义检索不可用时返回 None
+    """
+    if not query or not books or not prefs.get('ai_search_semantic_enabled'):
+        return None
+    try:
+        index = index or get_semantic_index()
+        if len(index) < len(books) * MIN_COVERAGE:
+            logger.info(f"语义索引未就绪 ({len(index)}/{len(books)})，使用完整书目")
+            return None
+        if embed_fn is None:
+            embed_fn, model = get_embedder(prefs)
+            if embed_fn is None or model != index.model:
+                return None
+        top_k = int(prefs.get('ai_search_semantic_top_k', DEFAULT_TOP_K) or DEFAULT_TOP_K)
+        query_vector = embed_fn([query])[0]
+        books_by_id = {book.get('id'): book for book in books}
+        ranked = [books_by_id[book_id] for book_id, _ in index.search(query_vector, top_k)
+                  if book_id in books_by_id]
+        return ranked or None
+    except Exception as e:
+        logger.warning(f"语义检索失败，使用完整书目: {str(e)}")
+        return None
@@ -10,15 +10,19 @@ weekly trends bar chart, and monthly heatmap.
 import logging
 import json
 import random
+import threading
 from datetime import datetime, timedelta
 import calendar
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QFrame, QSizePolicy, QScrollArea, QGridLayout)
+                             QFrame, QSizePolicy, QScrollArea, QGridLayout,
+                             QPushButton, QInputDialog, QMessageBox)
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QFont, QPainter, QColor, QPen, QBrush, QPainterPath
 
-from .config import get_prefs
+from .plugin_prefs import get_prefs
 from .models.base import get_translation
+from .stats_store import get_stats_store
+from .usage import format_price_table, parse_price_table
 from .ui_constants import (TEXT_COLOR_PRIMARY, 
                            SPACING_SMALL, SPACING_MEDIUM, SPACING_LARGE,
                            get_section_title_style, get_subtitle_style)
@@ -30,6 +34,10 @@ CHART_WIDTH_PERCENT = 0.85  # 85% of container width
 CHART_MAX_WIDTH = 800  # Maximum width in pixels
 CHART_MIN_WIDTH = 500  # Minimum width in pixels
 
+# Breakdown section (current month)
+BREAKDOWN_DIMENSIONS = ('ai', 'provider', 'mode', 'book')
+BREAKDOWN_TOP_N = 5
+
 
 def get_user_title(reply_count, i18n=None):
     """Get user title based on AI reply count."""
@@ -92,24 +100,24 @@ def format_number_display(number):
 def init_statistics(prefs):
     """Initialize statistics if not present."""
     changed = False
-    
-    # Check if we need to sync from history (first time or not yet synced)
-    stats_synced_from_history = prefs.get('stat_synced_from_history', False)
-    
-    if not stats_synced_from_history:
-        # Sync statistics from history records for old users
-        changed = sync_stats_from_history(prefs) or changed
-        prefs['stat_synced_from_history'] = True
+    store = get_stats_store()
+    
+    if not store.exists:
+        # First run with the aggregate store: rebuild it from history in the
+        # background and fold in the legacy prefs counters so nothing is lost
+        try:
+            legacy_daily = json.loads(prefs.get('stat_daily_counts') or '{}')
+        except (json.JSONDecodeError, TypeError):
+            legacy_daily = {}
+        start_stats_rebuild(legacy_daily, prefs.get('stat_ai_reply_count', 0) or 0)
+    elif 'stat_daily_counts' in prefs:
+        # Migration finished on a previous run; drop the legacy blob from prefs
+        del prefs['stat_daily_counts']
         changed = True
     
     # Initialize first use date (fallback if no history)
     if not prefs.get('stat_first_use_date'):
-        prefs['stat_first_use_date'] = datetime.now().strftime('%Y-%m-%d')
-        changed = True
-    
-    # Initialize AI reply count (fallback if no history)
-    if prefs.get('stat_ai_reply_count') is None:
-        prefs['stat_ai_reply_count'] = 0
+        prefs['stat_first_use_date'] = store.first_date or datetime.now().strftime('%Y-%m-%d')
         changed = True
     
     # Initialize book count (will be updated when AI Search updates library)
@@ -117,113 +125,42 @@ def init_statistics(prefs):
         prefs['stat_book_count'] = 0
         changed = True
     
-    # Initialize daily stats (for weekly trends and monthly heatmap)
-    if prefs.get('stat_daily_counts') is None:
-        prefs['stat_daily_counts'] = '{}'
-        changed = True
-    
     return changed
 
 
-def sync_stats_from_history(prefs):
-    """Sync statistics from history records for old users.
+def rebuild_stats_from_history(legacy_daily=None, legacy_total=0):
+    """Rebuild the statistics aggregate store from history records.
     
-    This function:
-    1. Finds the oldest history record date and uses it as first use date
-    2. Counts all history records as request count
-    3. Syncs daily counts from history timestamps
-    
-    Returns:
-        bool: True if any changes were made
+    Only the history index is read (no answer bodies), so this is cheap enough
+    to run as a background pass. Legacy per-day totals from prefs are merged
+    in, keeping the larger count for each day.
     """
-    changed = False
-    
     try:
         from .history_manager import HistoryManager
-        history_manager = HistoryManager()
-        histories = history_manager.histories
-        
-        if not histories:
-            logger.info("No history records found for stats sync")
-            return False
-        
-        # Find oldest date and count records
-        oldest_date = None
-        daily_counts = {}
-        
-        for uid, history in histories.items():
-            timestamp_str = history.get('timestamp', '')
-            if not timestamp_str:
-                continue
-            
-            try:
-                # Parse timestamp (format: '%Y-%m-%d %H:%M:%S')
-                timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                date_str = timestamp.strftime('%Y-%m-%d')
-                
-                # Track oldest date
-                if oldest_date is None or timestamp < oldest_date:
-                    oldest_date = timestamp
-                
-                # Count daily requests
-                daily_counts[date_str] = daily_counts.get(date_str, 0) + 1
-                
-            except Exception as e:
-                logger.warning(f"Failed to parse history timestamp: {timestamp_str}, error: {e}")
-                continue
-        
-        # Update first use date if we found an older date
-        if oldest_date:
-            oldest_date_str = oldest_date.strftime('%Y-%m-%d')
-            current_first_use = prefs.get('stat_first_use_date')
-            
-            if not current_first_use:
-                prefs['stat_first_use_date'] = oldest_date_str
-                changed = True
-                logger.info(f"Set first use date from history: {oldest_date_str}")
-            else:
-                # Compare and use the older one
-                try:
-                    current_date = datetime.strptime(current_first_use, '%Y-%m-%d')
-                    if oldest_date < current_date:
-                        prefs['stat_first_use_date'] = oldest_date_str
-                        changed = True
-                        logger.info(f"Updated first use date from history: {oldest_date_str} (was {current_first_use})")
-                except ValueError:
-                    pass
-        
-        # Update request count
-        history_count = len(histories)
-        current_count = prefs.get('stat_ai_reply_count', 0)
-        if history_count > current_count:
-            prefs['stat_ai_reply_count'] = history_count
-            changed = True
-            logger.info(f"Updated request count from history: {history_count} (was {current_count})")
-        
-        # Merge daily counts with existing data
-        if daily_counts:
-            try:
-                existing_daily = json.loads(prefs.get('stat_daily_counts', '{}'))
-            except (json.JSONDecodeError, TypeError):
-                existing_daily = {}
-            
-            # Merge: use max of existing and history counts for each day
-            for date_str, count in daily_counts.items():
-                existing_count = existing_daily.get(date_str, 0)
-                if count > existing_count:
-                    existing_daily[date_str] = count
-            
-            prefs['stat_daily_counts'] = json.dumps(existing_daily)
-            changed = True
-            logger.info(f"Synced daily counts from history: {len(daily_counts)} days")
-        
-        return changed
-        
+        store = get_stats_store()
+        store.rebuild_from_history(HistoryManager().histories.values())
+        store.merge_daily_totals(legacy_daily)
+        store.set_total_at_least(legacy_total)
+        store.flush()
+        logger.info(f"Statistics rebuilt from history: {store.total} replies")
+        return True
     except Exception as e:
-        logger.error(f"Failed to sync stats from history: {e}")
+        logger.error(f"Failed to rebuild stats from history: {e}")
         return False
 
 
+def start_stats_rebuild(legacy_daily=None, legacy_total=0):
+    """Run rebuild_stats_from_history in a background thread."""
+    thread = threading.Thread(
+        target=rebuild_stats_from_history,
+        args=(legacy_daily, legacy_total),
+        name='AskAIStatsRebuild',
+    )
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
 def refresh_stats_on_dialog_open(prefs):
     """Refresh statistics when config dialog opens.
     
@@ -239,22 +176,17 @@ def refresh_stats_on_dialog_open(prefs):
     pass
 
 
-def increment_ai_reply_count(prefs):
-    """Increment AI reply count by 1 and record daily count."""
-    current = prefs.get('stat_ai_reply_count', 0)
-    prefs['stat_ai_reply_count'] = current + 1
-    
-    # Record daily count
-    today = datetime.now().strftime('%Y-%m-%d')
-    try:
-        daily_counts = json.loads(prefs.get('stat_daily_counts', '{}'))
-    except (json.JSONDecodeError, TypeError):
-        daily_counts = {}
-    
-    daily_counts[today] = daily_counts.get(today, 0) + 1
-    prefs['stat_daily_counts'] = json.dumps(daily_counts)
+def increment_ai_reply_count(prefs=None, ai_id=None, provider=None, mode=None, book_ids=None,
+                             usage=None, cost=None):
+    """Record one AI reply in the statistics aggregate store.
     
-    logger.info(f"AI reply count incremented to {current + 1}, today: {daily_counts[today]}")
+    This is an in-memory update; the store persists itself in the background,
+    so prefs are no longer rewritten after every answer. ``usage`` / ``cost``
+    are the token usage reported by the provider and its estimated price.
+    """
+    store = get_stats_store()
+    store.record(ai_id=ai_id, provider=provider, mode=mode, book_ids=book_ids, usage=usage, cost=cost)
+    logger.info(f"AI reply count incremented to {store.total}")
 
 
 def update_book_count(prefs, count):
@@ -263,45 +195,23 @@ def update_book_count(prefs, count):
     logger.info(f"Book count updated to {count}")
 
 
-def get_weekly_data(prefs):
+def get_weekly_data(prefs=None):
     """Get request counts for each day of the current week (Mon-Sun)."""
-    try:
-        daily_counts = json.loads(prefs.get('stat_daily_counts', '{}'))
-    except (json.JSONDecodeError, TypeError):
-        daily_counts = {}
-    
     today = datetime.now()
     # Get Monday of current week
     monday = today - timedelta(days=today.weekday())
-    
-    weekly_data = []
-    for i in range(7):
-        day = monday + timedelta(days=i)
-        day_str = day.strftime('%Y-%m-%d')
-        count = daily_counts.get(day_str, 0)
-        weekly_data.append(count)
-    
-    return weekly_data
+    return get_stats_store().week_totals(monday)
 
 
-def get_monthly_data(prefs):
+def get_monthly_data(prefs=None):
     """Get request counts for each day of the current month."""
-    try:
-        daily_counts = json.loads(prefs.get('stat_daily_counts', '{}'))
-    except (json.JSONDecodeError, TypeError):
-        daily_counts = {}
-    
     today = datetime.now()
     year, month = today.year, today.month
     
     # Get number of days in current month
     _, num_days = calendar.monthrange(year, month)
     
-    monthly_data = {}
-    for day in range(1, num_days + 1):
-        day_str = f"{year}-{month:02d}-{day:02d}"
-        monthly_data[day] = daily_counts.get(day_str, 0)
-    
+    monthly_data = get_stats_store().month_totals(year, month, num_days)
     return monthly_data, year, month, today.day
 
 
@@ -822,6 +732,58 @@ class StatisticsWidget(QWidget):
         heatmap_container_wrapper.addStretch()
         content_layout.addLayout(heatmap_container_wrapper)
         
+        content_layout.addSpacing(SPACING_MEDIUM)
+        
+        # ========== Section 4: Breakdown (this month by AI / provider / mode / book) ==========
+        breakdown_header = QVBoxLayout()
+        breakdown_header.setSpacing(2)
+        
+        self.breakdown_title = QLabel(self.i18n.get('stat_breakdown', 'Breakdown'))
+        self.breakdown_title.setStyleSheet(get_section_title_style())
+        breakdown_header.addWidget(self.breakdown_title)
+        
+        self.breakdown_subtitle = QLabel(self.i18n.get('stat_breakdown_subtitle', 'Top AI inquiries this month'))
+        self.breakdown_subtitle.setStyleSheet(f"color: {TEXT_COLOR_PRIMARY}; font-size: 0.85em; opacity: 0.8;")
+        breakdown_header.addWidget(self.breakdown_subtitle)
+        
+        content_layout.addLayout(breakdown_header)
+        
+        breakdown_container_wrapper = QHBoxLayout()
+        breakdown_container_wrapper.addStretch()
+        
+        self.breakdown_container = SectionContainer()
+        self.breakdown_container.setMinimumWidth(CHART_MIN_WIDTH)
+        self.breakdown_container.setMaximumWidth(CHART_MAX_WIDTH)
+        breakdown_inner = QGridLayout(self.breakdown_container)
+        breakdown_inner.setContentsMargins(12, 12, 12, 12)
+        breakdown_inner.setHorizontalSpacing(SPACING_LARGE)
+        
+        self.breakdown_labels = {}
+        for column, dimension in enumerate(BREAKDOWN_DIMENSIONS):
+            title_label = QLabel()
+            title_label.setStyleSheet("font-weight: bold;")
+            value_label = QLabel()
+            value_label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+            value_label.setWordWrap(True)
+            breakdown_inner.addWidget(title_label, 0, column)
+            breakdown_inner.addWidget(value_label, 1, column)
+            self.breakdown_labels[dimension] = (title_label, value_label)
+        
+        # Token usage reported by providers this month (and estimated cost)
+        self.usage_title_label = QLabel()
+        self.usage_title_label.setStyleSheet("font-weight: bold;")
+        breakdown_inner.addWidget(self.usage_title_label, 2, 0, 1, len(BREAKDOWN_DIMENSIONS))
+        self.usage_label = QLabel()
+        self.usage_label.setWordWrap(True)
+        breakdown_inner.addWidget(self.usage_label, 3, 0, 1, len(BREAKDOWN_DIMENSIONS))
+        self.prices_button = QPushButton()
+        self.prices_button.clicked.connect(self._edit_model_prices)
+        breakdown_inner.addWidget(self.prices_button, 4, len(BREAKDOWN_DIMENSIONS) - 1, Qt.AlignRight)
+        
+        breakdown_container_wrapper.addWidget(self.breakdown_container)
+        breakdown_container_wrapper.addStretch()
+        content_layout.addLayout(breakdown_container_wrapper)
+        
         content_layout.addStretch()
         
         scroll.setWidget(content)
@@ -860,7 +822,7 @@ class StatisticsWidget(QWidget):
             self.days_card.set_data(1, self.i18n.get('stat_days_unit', 'days'), '', days_label)
         
         # Card 2: AI Reply count
-        reply_count = prefs.get('stat_ai_reply_count', 0)
+        reply_count = max(get_stats_store().total, prefs.get('stat_ai_reply_count', 0) or 0)
         reply_display = format_number_display(reply_count) if reply_count > 200 else str(reply_count)
         replies_unit = self.i18n.get('stat_replies_unit', 'times')
         user_title = get_user_title(reply_count, self.i18n)
@@ -884,7 +846,7 @@ class StatisticsWidget(QWidget):
             day_labels = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
         
         # Check if we need sample data (threshold is 20 total requests)
-        total_reply_count = prefs.get('stat_ai_reply_count', 0)
+        total_reply_count = reply_count
         is_sample_week = total_reply_count < 20
         
         # Update trends subtitle with sample data note if needed
@@ -935,6 +897,115 @@ class StatisticsWidget(QWidget):
             self.monthly_heatmap.set_data(monthly_data, year, month, today, is_sample=False)
             self.heatmap_comment.setText('')
     
+        
+        # ========== Breakdown ==========
+        self._refresh_breakdown()
+    
+    def _breakdown_display_name(self, dimension, value, book_titles):
+        """Human readable label for a breakdown row."""
+        if dimension == 'mode':
+            mode_names = {
+                'single': self.i18n.get('single_book', 'Single Book'),
+                'multi': self.i18n.get('multi_book', 'Multi-Book'),
+                'ai_search': self.i18n.get('library_search', 'AI Search'),
+            }
+            return mode_names.get(value, value)
+        if dimension == 'book':
+            return book_titles.get(value, f"#{value}")
+        if dimension in ('ai', 'provider'):
+            models_config = get_prefs().get('models', {})
+            config = models_config.get(value) or {}
+            return config.get('display_name') or value
+        return value
+    
+    def _refresh_breakdown(self):
+        """Fill the per-dimension breakdown for the current month."""
+        store = get_stats_store()
+        book_titles = {}
+        rows_by_dimension = {
+            dimension: store.breakdown(dimension, 'months', limit=BREAKDOWN_TOP_N)
+            for dimension in BREAKDOWN_DIMENSIONS
+        }
+        if rows_by_dimension.get('book'):
+            try:
+                from .history_manager import HistoryManager
+                wanted = {value for value, _ in rows_by_dimension['book']}
+                for entry in HistoryManager().histories.values():
+                    for book in entry.get('books', []):
+                        book_id = str(book.get('id'))
+                        if book_id in wanted and book_id not in book_titles:
+                            book_titles[book_id] = book.get('title') or f"#{book_id}"
+            except Exception as e:
+                logger.warning(f"Failed to resolve book titles for statistics: {e}")
+        
+        titles = {
+            'ai': self.i18n.get('stat_breakdown_ai', 'AI'),
+            'provider': self.i18n.get('stat_breakdown_provider', 'Provider'),
+            'mode': self.i18n.get('stat_breakdown_mode', 'Mode'),
+            'book': self.i18n.get('stat_breakdown_book', 'Books'),
+        }
+        no_data = self.i18n.get('stat_no_data_month', 'No data this month')
+        for dimension, (title_label, value_label) in self.breakdown_labels.items():
+            title_label.setText(titles[dimension])
+            rows = rows_by_dimension.get(dimension) or []
+            if not rows:
+                value_label.setText(no_data)
+                continue
+            lines = [
+                f"{self._breakdown_display_name(dimension, value, book_titles)}: {count}"
+                for value, count in rows
+            ]
+            value_label.setText('\n'.join(lines))
+        self._refresh_usage()
+    
+    def _refresh_usage(self):
+        """Show the token usage and estimated cost for the current month."""
+        totals = get_stats_store().usage_totals('months')
+        self.usage_title_label.setText(self.i18n.get('stat_usage_title', 'Tokens'))
+        self.prices_button.setText(self.i18n.get('stat_model_prices', 'Model Prices…'))
+        if not totals['answers']:
+            self.usage_label.setText(self.i18n.get('stat_usage_none', 'No token usage reported this month'))
+            return
+        tokens = totals['tokens']
+        lines = [self.i18n.get(
+            'stat_usage_summary',
+            '{input} in ({cached} cached) · {output} out ({reasoning} reasoning) · {answers} answers'
+        ).format(input=f"{tokens['input']:,}", cached=f"{tokens['cached_input']:,}",
+                 output=f"{tokens['output']:,}", reasoning=f"{tokens['reasoning']:,}",
+                 answers=totals['answers'])]
+        if totals['cost'] is not None:
+            lines.append(self.i18n.get('stat_usage_cost', 'Estimated cost: {cost}').format(
+                cost=f"{totals['cost']:.2f}"))
+        if totals['ai']:
+            lines.append(', '.join(
+                f"{self._breakdown_display_name('ai', ai_id, {})}: {count:,}"
+                for ai_id, count in totals['ai'][:BREAKDOWN_TOP_N]))
+        self.usage_label.setText('\n'.join(lines))
+    
+    def _edit_model_prices(self):
+        """Edit the optional per-model price table used for cost estimates."""
+        prefs = get_prefs()
+        text, ok = QInputDialog.getMultiLineText(
+            self,
+            self.i18n.get('stat_model_prices_title', 'Model Prices'),
+            self.i18n.get('stat_model_prices_prompt',
+                          'One model per line: "model: input, cached input, output" in price per 1M tokens. '
+                          'Cached input is optional. A name also matches models that start with it.'),
+            format_price_table(prefs.get('model_prices') or {}),
+        )
+        if not ok:
+            return
+        prices, bad_lines = parse_price_table(text)
+        prefs['model_prices'] = prices
+        if bad_lines:
+            QMessageBox.warning(
+                self,
+                self.i18n.get('stat_model_prices_title', 'Model Prices'),
+                self.i18n.get('stat_model_prices_invalid',
+                              'These lines could not be read and were ignored: {lines}').format(
+                    lines=', '.join(str(number) for number in bad_lines)),
+            )
+    
     def update_language(self, language):
         """Update the widget language."""
         self.language = language
@@ -945,6 +1016,8 @@ class StatisticsWidget(QWidget):
         self.overview_subtitle.setText(self.i18n.get('stat_overview_subtitle', 'Statistics of AI inquiry calls'))
         self.trends_title.setText(self.i18n.get('stat_trends', 'Trends'))
         self.heatmap_title.setText(self.i18n.get('stat_heatmap', 'Heatmap'))
+        self.breakdown_title.setText(self.i18n.get('stat_breakdown', 'Breakdown'))
+        self.breakdown_subtitle.setText(self.i18n.get('stat_breakdown_subtitle', 'Top AI inquiries this month'))
         
         # Refresh stats data (this updates cards, chart labels, subtitles, etc.)
         self.refresh_stats()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Usage statistics aggregate store for Ask AI Plugin."""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+try:
+    from .json_store import atomic_write_text, load_versioned_json
+except ImportError:
+    from json_store import atomic_write_text, load_versioned_json
+
+logger = logging.getLogger(__name__)
+
+STATS_FILE_NAME = 'ask_ai_plugin_stats.json'
+_STORE_VERSION = 1
+
+# Breakdown dimensions kept in every bucket
+DIMENSIONS = ('ai', 'provider', 'mode', 'book')
+
+# Token usage fields summed in every bucket (see usage.USAGE_FIELDS)
+TOKEN_FIELDS = ('input', 'cached_input', 'output', 'reasoning')
+
+# Debounce for write-behind persistence (seconds)
+FLUSH_DELAY = 2.0
+
+
+def _empty_bucket():
+    return {'total': 0, 'ai': {}, 'provider': {}, 'mode': {}, 'book': {}}
+
+
+def period_keys(when):
+    """Return (day, week, month) bucket keys for a datetime."""
+    iso_year, iso_week, _ = when.isocalendar()
+    return (
+        when.strftime('%Y-%m-%d'),
+        f'{iso_year}-W{iso_week:02d}',
+        when.strftime('%Y-%m'),
+    )
+
+
+def provider_from_ai_id(ai_id):
+    """Derive provider id from an AI id (same rule as APIClient._switch_to_model)."""
+    if not ai_id:
+        return 'unknown'
+    return ai_id.split('_')[0] if '_' in ai_id else ai_id
+
+
+class StatsStore:
+    """Aggregated usage counters persisted outside prefs."""
+
+    def __init__(self, path=None, flush_delay=FLUSH_DELAY):
+        self.path = path
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._flush_timer = None
+        self._dirty = False
+        # One list per running rebuild_from_history: answers recorded meanwhile
+        self._rebuild_buffers = []
+        self.exists = bool(path) and os.path.exists(path)
+        self._data = self._load()
+
+    # ----- persistence -----
+
+    def _new_data(self):
+        return {
+            'version': _STORE_VERSION,
+            'total': 0,
+            'first_date': None,
+            'days': {},
+            'weeks': {},
+            'months': {},
+        }
+
+    def _load(self):
+        if not self.exists:
+            return self._new_data()
+        data = load_versioned_json(self.path, _STORE_VERSION)
+        if data is not None:
+            return data
+        self.exists = False
+        return self._new_data()
+
+    def flush(self):
+        """Write pending changes to disk."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty or not self.path:
+                return
+            payload = json.dumps(self._data, ensure_ascii=False)
+            self._dirty = False
+        try:
+            atomic_write_text(self.path, payload)
+            self.exists = True
+        except Exception as e:
+            logger.error(f"Failed to save stats store: {e}")
+
+    def _schedule_flush(self):
+        self._dirty = True
+        if not self.path or self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    # ----- updates -----
+
+    @staticmethod
+    def _add_usage(bucket, ai_id, usage, cost):
+        # Buckets written before token accounting have no usage keys
+        tokens = bucket.setdefault('tokens', {})
+        for field in TOKEN_FIELDS:
+            tokens[field] = tokens.get(field, 0) + int(usage.get(field, 0) or 0)
+        bucket['usage_count'] = bucket.get('usage_count', 0) + 1
+        if ai_id:
+            ai_tokens = bucket.setdefault('ai_tokens', {})
+            ai_tokens[ai_id] = ai_tokens.get(ai_id, 0) + int(usage.get('input', 0) or 0) \
+                + int(usage.get('output', 0) or 0)
+        if cost is not None:
+            bucket['cost'] = bucket.get('cost', 0.0) + cost
+
+    @staticmethod
+    def _bump(bucket, ai_id, provider, mode, book_ids, count):
+        bucket['total'] = bucket.get('total', 0) + count
+        for dim, value in (('ai', ai_id), ('provider', provider), ('mode', mode)):
+            if value:
+                counts = bucket.setdefault(dim, {})
+                counts[value] = counts.get(value, 0) + count
+        books = bucket.setdefault('book', {})
+        for book_id in book_ids or ():
+            key = str(book_id)
+            books[key] = books.get(key, 0) + count
+
+    def record(self, ai_id=None, provider=None, mode=None, book_ids=None, when=None, count=1,
+               usage=None, cost=None):
+        """Record answered request(s); persistence happens later in the background.
+
+        ``usage`` is the normalised token usage of the answer (None when the
+        provider did not report it) and ``cost`` its estimated price.
+        """
+        when = when or datetime.now()
+        provider = provider or provider_from_ai_id(ai_id)
+        day, week, month = period_keys(when)
+        with self._lock:
+            for buffer in self._rebuild_buffers:
+                buffer.append(dict(ai_id=ai_id, provider=provider, mode=mode, book_ids=book_ids, when=when,
+                                   count=count, usage=usage, cost=cost))
+            data = self._data
+            data['total'] = data.get('total', 0) + count
+            if not data.get('first_date') or day < data['first_date']:
+                data['first_date'] = day
+            for section, key in (('days', day), ('weeks', week), ('months', month)):
+                bucket = data[section].setdefault(key, _empty_bucket())
+                self._bump(bucket, ai_id, provider, mode, book_ids, count)
+                if usage:
+                    self._add_usage(bucket, ai_id, usage, cost)
+            self._schedule_flush()
+
+    def merge_daily_totals(self, daily_counts):
+        """Merge legacy per-day totals (prefs['stat_daily_counts']), keeping the larger value."""
+        with self._lock:
+            for day, count in (daily_counts or {}).items():
+                try:
+                    when = datetime.strptime(day, '%Y-%m-%d')
+                except (TypeError, ValueError):
+                    continue
+                bucket = self._data['days'].get(day)
+                missing = count - (bucket['total'] if bucket else 0)
+                if missing <= 0:
+                    continue
+                _, week, month = period_keys(when)
+                for section, key in (('days', day), ('weeks', week), ('months', month)):
+                    self._data[section].setdefault(key, _empty_bucket())['total'] += missing
+                self._data['total'] += missing
+                if not self._data.get('first_date') or day < self._data['first_date']:
+                    self._data['first_date'] = day
+            self._schedule_flush()
+
+    def set_total_at_least(self, total):
+        with self._lock:
+            if total > self._data.get('total', 0):
+                self._data['total'] = total
+                self._schedule_flush()
+
+    def rebuild_from_history(self, histories):
+        """Rebuild all buckets from history index entries (one count per AI answer).
+
+        Buckets are built off to the side and swapped in at the end, so it is safe
+        to run in a background thread while answers keep being recorded: answers
+        recorded after the history snapshot is taken are buffered and replayed onto
+        the rebuilt buckets before the swap.
+        """
+        scratch = StatsStore(path=None)
+        buffer = []
+        with self._lock:
+            self._rebuild_buffers.append(buffer)
+        try:
+            self._build_from_history(scratch, list(histories))
+            with self._lock:
+                for kwargs in buffer:
+                    scratch.record(**kwargs)
+                self._data = scratch._data
+                self._schedule_flush()
+        finally:
+            with self._lock:
+                self._rebuild_buffers.remove(buffer)
+
+    @staticmethod
+    def _build_from_history(scratch, histories):
+        for entry in histories:
+            try:
+                when = datetime.strptime(entry.get('timestamp', ''), '%Y-%m-%d %H:%M:%S')
+            except (TypeError, ValueError):
+                continue
+            book_ids = [
+                book.get('id') for book in entry.get('books', [])
+                if book.get('id') not in (None, 'ai_search')
+            ]
+            for ai_id in entry.get('ai_ids') or ['default']:
+                scratch.record(ai_id=ai_id, mode=entry.get('mode'), book_ids=book_ids, when=when)
+
+    # ----- queries -----
+
+    @property
+    def total(self):
+        return self._data.get('total', 0)
+
+    @property
+    def first_date(self):
+        return self._data.get('first_date')
+
+    def day_total(self, day):
+        bucket = self._data['days'].get(day)
+        return bucket['total'] if bucket else 0
+
+    def week_totals(self, monday):
+        """Per-day totals for the 7 days starting at ``monday``."""
+        return [self.day_total((monday + timedelta(days=i)).strftime('%Y-%m-%d')) for i in range(7)]
+
+    def month_totals(self, year, month, num_days):
+        """{day_of_month: total} for a month."""
+        return {day: self.day_total(f'{year}-{month:02d}-{day:02d}') for day in range(1, num_days + 1)}
+
+    def breakdown(self, dimension, period='months', key=None, limit=None):
+        """Return [(value, count), ...] sorted by count for a bucket.
+
+        Args:
+            dimension: one of DIMENSIONS
+            period: 'days', 'weeks' or 'months'
+            key: bucket key (defaults to the current period)
+            limit: max number of rows
+        """
+        if dimension not in DIMENSIONS:
+            raise ValueError(f'Unknown statistics dimension: {dimension}')
+        if key is None:
+            day, week, month = period_keys(datetime.now())
+            key = {'days': day, 'weeks': week, 'months': month}[period]
+        with self._lock:
+            counts = dict(self._data.get(period, {}).get(key, {}).get(dimension, {}))
+        rows = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return rows[:limit] if limit else rows
+
+
+    def usage_totals(self, period='months', key=None):
+        """Token usage summed over a bucket.
+
+        Returns:
+            dict with ``tokens`` ({field: count}), ``answers`` (answers that
+            reported usage), ``cost`` (None when no answer had a price) and
+            ``ai`` ([(ai_id, input + output tokens), ...] sorted by tokens).
+        """
+        if key is None:
+            day, week, month = period_keys(datetime.now())
+            key = {'days': day, 'weeks': week, 'months': month}[period]
+        with self._lock:
+            bucket = self._data.get(period, {}).get(key, {})
+            tokens = {field: bucket.get('tokens', {}).get(field, 0) for field in TOKEN_FIELDS}
+            ai_tokens = dict(bucket.get('ai_tokens', {}))
+            return {
+                'tokens': tokens,
+                'answers': bucket.get('usage_count', 0),
+                'cost': bucket.get('cost'),
+                'ai': sorted(ai_tokens.items(), key=lambda item: (-item[1], item[0])),
+            }
+
+
+_store = None
+
+
+def get_stats_store(base_dir=None):
+    """Return the process-wide statistics store."""
+    global _store
+    if _store is None:
+        if base_dir is None:
+            from calibre.utils.config import config_dir
+            base_dir = os.path.join(config_dir, 'plugins')
+        _store = StatsStore(os.path.join(base_dir, STATS_FILE_NAME))
+    return _store
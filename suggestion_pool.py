@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Per-book pool of pre-generated random-question suggestions."""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from .json_store import atomic_write_text, load_versioned_json
+except ImportError:
+    from json_store import atomic_write_text, load_versioned_json
+
+logger = logging.getLogger(__name__)
+
+POOL_FILE_NAME = 'ask_ai_plugin_suggestion_pool.json'
+_POOL_VERSION = 1
+
+# 每本书预先生成的问题数
+DEFAULT_POOL_SIZE = 2
+# 问题的有效期（秒）；过期后不再使用
+DEFAULT_SUGGESTION_TTL = 7 * 24 * 3600
+# 最多保留多少个（书籍, AI, 语言）的缓存池
+MAX_POOL_KEYS = 200
+# 每个缓存池记住最近用过的问题数，避免重复出现
+RECENT_LIMIT = 10
+
+_NORMALIZE_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize_question(text):
+    """去重用：忽略大小写、空白和标点"""
+    return _NORMALIZE_RE.sub('', (text or '').casefold())
+
+
+def pool_key(book_ids, ai_id, lang_code):
+    """缓存池的键：书籍 ID 集合、AI 和界面语言"""
+    ids = ','.join(str(book_id) for book_id in sorted(book_ids))
+    return f'{ids}|{ai_id or ""}|{lang_code or ""}'
+
+
+class SuggestionPool:
+    """按书籍缓存的预生成问题（线程安全）"""
+
+    def __init__(self, path=None, size=DEFAULT_POOL_SIZE, ttl=DEFAULT_SUGGESTION_TTL,
+                 max_keys=MAX_POOL_KEYS, clock=time.time):
+        self.path = path
+        self.size = size
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pools = self._load()
+
+    # ----- persistence -----
+
+    def _load(self):
+        pools = OrderedDict()
+        data = load_versioned_json(self.path, _POOL_VERSION)
+        for key, pool in (data or {}).get('pools', []):
+            pools[key] = pool
+        return pools
+
+    def flush(self):
+        if not self.path:
+            return
+        with self._lock:
+            payload = json.dumps({'version': _POOL_VERSION, 'pools': list(self._pools.items())},
+                                 ensure_ascii=False)
+        try:
+            atomic_write_text(self.path, payload)
+        except Exception as e:
+            logger.error(f"保存随机问题缓存失败: {e}")
+
+    # ----- pool -----
+
+    def _pool(self, key, create=False):
+        # 调用方持有锁
+        pool = self._pools.get(key)
+        if pool is None:
+            if not create:
+                return None
+            pool = self._pools[key] = {'items': [], 'recent': []}
+            while len(self._pools) > self.max_keys:
+                self._pools.popitem(last=False)
+        self._pools.move_to_end(key)
+        now = self._clock()
+        pool['items'] = [item for item in pool['items'] if now - item['created'] < self.ttl]
+        return pool
+
+    def count(self, key):
+        with self._lock:
+            pool = self._pool(key)
+            return len(pool['items']) if pool else 0
+
+    def missing(self, key):
+        """还需要生成多少个问题才能填满缓存池"""
+        return max(0, self.size - self.count(key))
+
+    def known_questions(self, key):
+        """池中和最近用过的问题（生成新问题时要求 AI 避开）"""
+        with self._lock:
+            pool = self._pool(key)
+            if not pool:
+                return []
+            return [item['text'] for item in pool['items']] + list(pool['recent'])
+
+    def add(self, key, text):
+        """加入一个问题；与池中或最近用过的问题重复时忽略，返回是否加入"""
+        text = (text or '').strip()
+        normalized = normalize_question(text)
+        if not normalized:
+            return False
+        with self._lock:
+            pool = self._pool(key, create=True)
+            seen = {normalize_question(item['text']) for item in pool['items']}
+            seen.update(normalize_question(recent) for recent in pool['recent'])
+            if normalized in seen:
+                logger.debug(f"[随机问题缓存] 忽略重复的问题: {text[:50]}")
+                return False
+            pool['items'].append({'text': text, 'created': self._clock()})
+        self.flush()
+        return True
+
+    def take(self, key, exclude=()):
+        """
+        取出一个问题（先生成的先用）
+
+        :param exclude: 不能返回的问题（如输入框中当前的问题），按去重规则比较
+        :return: 问题文本；池中没有可用的问题时返回 None
+        """
+        excluded = {normalize_question(text) for text in exclude if text}
+        with self._lock:
+            pool = self._pool(key)
+            if not pool:
+                return None
+            for index, item in enumerate(pool['items']):
+                if normalize_question(item['text']) in excluded:
+                    continue
+                del pool['items'][index]
+                pool['recent'] = (pool['recent'] + [item['text']])[-RECENT_LIMIT:]
+                break
+            else:
+                return None
+        self.flush()
+        return item['text']
+
+    def remember(self, key, text):
+        """记录直接生成（没有经过缓存池）并显示给用户的问题"""
+        if not text:
+            return
+        with self._lock:
+            pool = self._pool(key, create=True)
+            pool['recent'] = (pool['recent'] + [text])[-RECENT_LIMIT:]
+        self.flush()
+
+    def clear(self):
+        with self._lock:
+            self._pools.clear()
+        self.flush()
+
+
+class SuggestionPrefetcher:
+    """在后台补充缓存池；同一个键同时只有一个补充任务"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._running = set()
+        self._cancel_event = threading.Event()
+
+    def is_filling(self, key):
+        with self._lock:
+            return key in self._running
+
+    def fill(self, key, generate_fn, on_added=None):
+        """
+        在守护线程中补充缓存池
+
+        :param generate_fn: (avoid_questions) -> 问题文本；异常只记录日志
+        :param on_added: (key, text) 每加入一个问题时调用（在工作线程中）
+        :return: 启动了补充任务时返回线程，否则返回 None（已满或正在补充）
+        """
+        if self.pool.missing(key) <= 0:
+            return None
+        with self._lock:
+            if key in self._running:
+                return None
+            self._running.add(key)
+        cancel_event = self._cancel_event
+
+        def run():
+            try:
+                # 重复的问题不计入，最多尝试两倍次数
+                attempts = self.pool.missing(key) * 2
+                while attempts > 0 and self.pool.missing(key) > 0 and not cancel_event.is_set():
+                    attempts -= 1
+                    try:
+                        text = generate_fn(self.pool.known_questions(key))
+                    except Exception as e:
+                        logger.warning(f"[随机问题缓存] 预生成失败: {str(e)[:200]}")
+                        return
+                    if cancel_event.is_set():
+                        return
+                    if self.pool.add(key, text) and on_added is not None:
+                        on_added(key, text)
+            finally:
+                with self._lock:
+                    self._running.discard(key)
+
+        thread = threading.Thread(target=run, name='AskAISuggestionPrefetch', daemon=True)
+        thread.start()
+        return thread
+
+    def cancel(self):
+        """取消所有补充任务（正在进行的请求完成后结果被丢弃）"""
+        self._cancel_event.set()
+        self._cancel_event = threading.Event()
+
+
+_pool = None
+_prefetcher = None
+_pool_lock = threading.Lock()
+
+
+def get_suggestion_prefetcher(base_dir=None):
+    """进程内共享的随机问题缓存池和补充器"""
+    global _pool, _prefetcher
+    with _pool_lock:
+        if _prefetcher is None:
+            if base_dir is None:
+                from calibre.utils.config import config_dir
+                base_dir = os.path.join(config_dir, 'plugins')
+            _pool = SuggestionPool(os.path.join(base_dir, POOL_FILE_NAME))
+            _prefetcher = SuggestionPrefetcher(_pool)
+        return _prefetcher
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for "Ask each book" batches: runner, provider limiter, persistence and resume."""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import batch_ask
+from batch_ask import (BatchJob, BatchRunner, BatchStore, ProviderLimiter,
+                       STATUS_DONE, STATUS_FAILED, STATUS_PENDING, STATUS_RUNNING)
+from book_metadata import BookRecord
+from utils import build_single_book_prompt
+
+BOOKS = [(1, 'Moby-Dick'), (2, 'Emma'), (3, 'Ulysses'), (4, 'Dracula'), (5, 'Middlemarch')]
+
+
+class _ConcurrencyProbe:
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, ai_id):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.calls.append(prompt)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return f'answer to {prompt}'
+
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = BatchStore(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_runs_every_book_and_reports_answers(self):
+        job = self.store.create('Who is the narrator?', 'openai', BOOKS)
+        answers, updates = {}, []
+        runner = BatchRunner(
+            job, _ConcurrencyProbe(0), lambda book_id: f'book {book_id}',
+            limiter=ProviderLimiter(4, 0),
+            on_update=lambda book_id, item: updates.append((book_id, item['status'])),
+            on_answer=lambda book_id, prompt, answer: answers.__setitem__(book_id, answer),
+        )
+        runner.run()
+        self.assertTrue(job.is_finished)
+        self.assertEqual(answers[3], 'answer to book 3')
+        self.assertIn((3, STATUS_RUNNING), updates)
+        self.assertIn((3, STATUS_DONE), updates)
+        self.assertIsNotNone(job.item(3)['latency'])
+
+    def test_provider_limit_bounds_concurrency(self):
+        job = self.store.create('Q', 'openai_2', BOOKS)
+        probe = _ConcurrencyProbe()
+        BatchRunner(job, probe, str, max_workers=5, limiter=ProviderLimiter(2, 0)).run()
+        self.assertEqual(len(probe.calls), len(BOOKS))
+        self.assertLessEqual(probe.peak, 2)
+
+    def test_limiter_spaces_request_starts(self):
+        limiter = ProviderLimiter(4, 0.05)
+        starts = []
+
+        def enter():
+            with limiter.slot('gemini'):
+                starts.append(time.monotonic())
+
+        threads = [threading.Thread(target=enter) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        starts.sort()
+        self.assertGreaterEqual(starts[-1] - starts[0], 0.09)
+
+    def test_failures_are_recorded_and_retried_on_resume(self):
+        job = self.store.create('Q', 'openai', BOOKS)
+
+        def flaky(prompt, ai_id):
+            if prompt == '2':
+                raise RuntimeError('rate limited')
+            return 'ok'
+
+        BatchRunner(job, flaky, str, limiter=ProviderLimiter(4, 0)).run()
+        self.assertEqual(job.item(2)['status'], STATUS_FAILED)
+        self.assertEqual(job.item(2)['error'], 'rate limited')
+        self.assertEqual(job.pending_ids(), [2])
+
+        probe = _ConcurrencyProbe(0)
+        resumed = BatchJob.load(job.path)
+        BatchRunner(resumed, probe, str, limiter=ProviderLimiter(4, 0)).run()
+        self.assertEqual(probe.calls, ['2'])
+        self.assertTrue(BatchJob.load(job.path).is_finished)
+
+    def test_cancel_leaves_remaining_books_resumable(self):
+        job = self.store.create('Q', 'openai', BOOKS)
+        runner = BatchRunner(job, None, str, max_workers=1, limiter=ProviderLimiter(1, 0))
+
+        def ask(prompt, ai_id):
+            runner.cancel()
+            return 'first'
+
+        runner.ask_fn = ask
+        finished = []
+        runner.on_finished = finished.append
+        runner.run()
+        self.assertEqual(finished, [True])
+        reloaded = BatchJob.load(job.path)
+        self.assertEqual(reloaded.counts()[STATUS_DONE], 1)
+        self.assertEqual(len(reloaded.pending_ids()), len(BOOKS) - 1)
+
+
+class TestBatchStore(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = BatchStore(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_latest_unfinished_matches_book_selection(self):
+        job = self.store.create('Q', 'openai', BOOKS[:2])
+        self.assertEqual(self.store.latest_unfinished([2, 1]).batch_id, job.batch_id)
+        self.assertIsNone(self.store.latest_unfinished([1]))
+
+        for book_id, _ in BOOKS[:2]:
+            job.update_item(book_id, status=STATUS_DONE, answer='a')
+        job.save()
+        self.assertIsNone(self.store.latest_unfinished([1, 2]))
+
+    def test_interrupted_running_items_are_pending_again(self):
+        job = self.store.create('Q', 'openai', BOOKS[:2])
+        job.update_item(1, status=STATUS_RUNNING)
+        job.save()
+        self.assertEqual(BatchJob.load(job.path).pending_ids(), [1, 2])
+
+    def test_old_batches_are_pruned(self):
+        old_max = batch_ask.MAX_SAVED_BATCHES
+        batch_ask.MAX_SAVED_BATCHES = 2
+        try:
+            for _ in range(4):
+                self.store.create('Q', 'openai', BOOKS[:1])
+        finally:
+            batch_ask.MAX_SAVED_BATCHES = old_max
+        self.assertEqual(len(self.store._paths()), 2)
+
+
+class TestSingleBookPrompt(unittest.TestCase):
+    def test_fills_template_from_book_record(self):
+        book = BookRecord(7, title='Emma', authors=['Jane Austen'], languages=['eng'])
+        prompt = build_single_book_prompt(book, 'Who is Knightley?', '{title} by {author} [{language}] {series}: {question}',
+                                          language_name_fn=lambda code: 'English')
+        self.assertEqual(prompt, 'Emma by Jane Austen [English] Unknown: Who is Knightley?')
+
+    def test_default_template_and_unknown_variable(self):
+        book = BookRecord(7, title='Emma')
+        self.assertIn('Book title: Emma', build_single_book_prompt(book, 'Q', ''))
+        with self.assertRaises(KeyError):
+            build_single_book_prompt(book, 'Q', '{nope}')
+
+
+if __name__ == '__main__':
+    unittest.main()
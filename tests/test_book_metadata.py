@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the bulk book metadata loader."""
+
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from book_metadata import BookRecord, book_exists, load_books
+
+
+class _FakeCache:
+    """Minimal stand-in for calibre's db.new_api."""
+
+    def __init__(self, books):
+        self.books = books
+        self.field_calls = []
+
+    def has_id(self, book_id):
+        return book_id in self.books
+
+    def all_field_for(self, field, book_ids, default_value=None):
+        self.field_calls.append((field, tuple(book_ids)))
+        return {book_id: self.books[book_id].get(field, default_value) for book_id in book_ids}
+
+
+class _FakeDB:
+    def __init__(self, books):
+        self.new_api = _FakeCache(books)
+
+    def get_metadata(self, book_id, index_is_id=False):
+        raise AssertionError('get_metadata must not be used when new_api is available')
+
+
+class _Metadata:
+    def __init__(self, title, authors):
+        self.title = title
+        self.authors = authors
+
+
+class _LegacyDB:
+    def __init__(self, books):
+        self.books = books
+
+    def get_metadata(self, book_id, index_is_id=False):
+        if book_id not in self.books:
+            raise OSError('missing')
+        return self.books[book_id]
+
+
+class TestBookMetadata(unittest.TestCase):
+    def setUp(self):
+        self.db = _FakeDB({
+            1: {'title': 'Dune', 'authors': ('Frank Herbert',), 'languages': ('eng',),
+                'pubdate': datetime(1965, 8, 1), 'series': 'Dune', 'series_index': 1.0},
+            2: {'title': 'Emma', 'authors': ('Jane Austen',), 'publisher': 'Murray'},
+        })
+
+    def test_load_books_one_call_per_field(self):
+        records, failed = load_books(self.db, [2, 3, 1])
+        self.assertEqual([r.id for r in records], [2, 1])
+        self.assertEqual(failed, [3])
+        fields = [field for field, _ in self.db.new_api.field_calls]
+        self.assertEqual(len(fields), len(set(fields)))
+        self.assertTrue(all(ids == (2, 1) for _, ids in self.db.new_api.field_calls))
+
+    def test_record_behaves_like_metadata(self):
+        records, _ = load_books(self.db, [1, 2])
+        dune, emma = records
+        self.assertEqual(dune.authors, ['Frank Herbert'])
+        self.assertEqual(dune.language, 'eng')
+        self.assertEqual(dune.pubdate.year, 1965)
+        self.assertEqual(dune.get('series'), 'Dune')
+        self.assertEqual(emma.get('languages', []), [])
+        self.assertIsNone(emma.language)
+        self.assertEqual(emma.get('publisher'), 'Murray')
+        self.assertEqual(emma.get('pubdate', ''), '')
+        self.assertEqual(emma.get('cover', 'none'), 'none')
+        with self.assertRaises(AttributeError):
+            emma.cover = b''
+
+    def test_book_exists_uses_has_id(self):
+        self.assertTrue(book_exists(self.db, 1))
+        self.assertFalse(book_exists(self.db, 99))
+
+    def test_legacy_db_falls_back_to_get_metadata(self):
+        db = _LegacyDB({5: _Metadata('Ulysses', ['James Joyce'])})
+        records, failed = load_books(db, [5, 6], fields=('title', 'authors'))
+        self.assertEqual(failed, [6])
+        self.assertIsInstance(records[0], BookRecord)
+        self.assertEqual(records[0].title, 'Ulysses')
+        self.assertFalse(book_exists(db, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for full-book text extraction, chunking and passage retrieval."""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import types
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import book_passages
+from book_passages import (
+    ExtractionCancelled,
+    PassageIndex,
+    PassageStore,
+    chunk_text,
+    html_to_text,
+    iter_book_text,
+    tokenize,
+)
+
+CHAPTERS = [
+    '<p>The whale surfaced near the ship at dawn.</p>' * 20,
+    '<p>Captain Ahab paced the deck, thinking about the white whale.</p>' * 20,
+    '<p>Queequeg carved his coffin from ship timber.</p><script>ignored()</script>' * 20,
+]
+
+
+def write_epub(path, chapters=CHAPTERS):
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('mimetype', 'application/epub+zip')
+        zf.writestr('META-INF/container.xml',
+                    '<container><rootfiles><rootfile full-path="OEBPS/content.opf"/></rootfiles></container>')
+        manifest = ''.join(f'<item id="c{i}" href="text/ch{i}.xhtml" media-type="application/xhtml+xml"/>'
+                           for i in range(len(chapters)))
+        # spine order differs from manifest order
+        spine = ''.join(f'<itemref idref="c{i}"/>' for i in reversed(range(len(chapters))))
+        zf.writestr('OEBPS/content.opf',
+                    f'<package><manifest>{manifest}</manifest><spine>{spine}</spine></package>')
+        for i, body in enumerate(chapters):
+            zf.writestr(f'OEBPS/text/ch{i}.xhtml',
+                        f'<html><head><title>Chapter {i}</title></head><body>{body}</body></html>')
+
+
+class TestExtraction(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_html_to_text_drops_markup_and_scripts(self):
+        text = html_to_text('<html><head><title>T</title></head><body><p>One &amp; two</p>'
+                            '<script>x()</script><p>Three</p></body></html>')
+        self.assertEqual(text, 'One & two\nThree')
+
+    def test_epub_follows_spine_order(self):
+        path = os.path.join(self.tmp, 'book.epub')
+        write_epub(path)
+        segments = list(iter_book_text(path, 'EPUB'))
+        self.assertEqual(len(segments), 3)
+        self.assertTrue(segments[0].startswith('Queequeg'))
+        self.assertNotIn('ignored', segments[0])
+        self.assertNotIn('Chapter', segments[0])
+
+    def test_txt_is_streamed(self):
+        path = os.path.join(self.tmp, 'book.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('第一章 鲸鱼\n' * 1000)
+        text = ''.join(book_passages._iter_txt_text(path, block_size=1001))
+        self.assertEqual(text, '第一章 鲸鱼\n' * 1000)
+
+
+class TestChunking(unittest.TestCase):
+    def test_chunks_overlap_and_cover_text(self):
+        text = ' '.join(f'word{i}' for i in range(2000))
+        chunks = list(chunk_text([text[:5000], text[5000:]], chunk_chars=500, overlap=100))
+        self.assertGreater(len(chunks), 10)
+        self.assertTrue(all(len(chunk) <= 500 for chunk in chunks))
+        for first, second in zip(chunks, chunks[1:]):
+            self.assertIn(second[:20], first)
+        self.assertIn('word1999', chunks[-1])
+
+    def test_cancel_stops_chunking(self):
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(ExtractionCancelled):
+            list(chunk_text(['text'], cancel_event=cancel))
+
+    def test_cjk_tokenized_as_bigrams(self):
+        self.assertEqual(tokenize('白鲸记'), ['白鲸', '鲸记'])
+        self.assertEqual(tokenize('The Whale'), ['whale'])
+
+
+class TestPassageIndex(unittest.TestCase):
+    def setUp(self):
+        self.chunks = [
+            'The ship left Nantucket in winter.',
+            'Ahab swore revenge on the white whale that took his leg.',
+            'Queequeg and Ishmael shared a bed at the Spouter Inn.',
+            'The crew hunted sperm whales for oil.',
+        ]
+        self.index = PassageIndex(self.chunks)
+
+    def test_bm25_ranks_relevant_chunk_first(self):
+        results = self.index.search('Why does Ahab want revenge?', k=2)
+        self.assertEqual(results[0][0], 1)
+
+    def test_no_overlap_samples_whole_book(self):
+        results = self.index.search('Summarize it', k=2)
+        self.assertEqual([idx for idx, _ in results], [0, 2])
+
+    def test_select_passages_respects_budget_and_book_order(self):
+        selected = self.index.select_passages('whale Queequeg', max_chars=120)
+        self.assertLessEqual(sum(len(self.chunks[i]) for i in selected), 120)
+        self.assertEqual(selected, sorted(selected))
+        self.assertIn('[Passage 2/4', self.index.format_passages([1]))
+
+    def test_embedding_rerank(self):
+        def embed(texts):
+            return [[1.0, 0.0] if 'Spouter' in text or 'bed' in text else [0.0, 1.0] for text in texts]
+
+        results = self.index.search('whale bed', k=1, embed_fn=embed)
+        self.assertEqual(results[0][0], 2)
+
+
+class TestPassageStore(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.book = os.path.join(self.tmp, 'book.epub')
+        write_epub(self.book)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_build_is_cached_on_disk(self):
+        store = PassageStore(os.path.join(self.tmp, 'cache'))
+        progress = []
+        index = store.build(1, self.book, 'EPUB', progress=progress.append)
+        self.assertGreater(len(index), 1)
+        self.assertEqual(progress[-1], 100)
+
+        reloaded = PassageStore(os.path.join(self.tmp, 'cache'))
+        with mock.patch.object(book_passages, 'iter_book_text') as extract:
+            cached = reloaded.build(1, self.book, 'EPUB')
+        extract.assert_not_called()
+        self.assertEqual(cached.chunks, index.chunks)
+        self.assertEqual(cached.search('coffin', k=1), index.search('coffin', k=1))
+
+    def test_modified_book_is_reindexed(self):
+        store = PassageStore(os.path.join(self.tmp, 'cache'))
+        store.build(1, self.book, 'EPUB')
+        write_epub(self.book, ['<p>An entirely different book about gardens.</p>'])
+        stat = os.stat(self.book)
+        os.utime(self.book, (stat.st_atime, stat.st_mtime + 10))
+        self.assertIsNone(store.get_cached(1, self.book, 'EPUB'))
+        index = store.build(1, self.book, 'EPUB')
+        self.assertIn('gardens', index.chunks[0])
+
+    def test_cancelled_build_is_not_cached(self):
+        store = PassageStore(os.path.join(self.tmp, 'cache'))
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(ExtractionCancelled):
+            store.build(1, self.book, 'EPUB', cancel_event=cancel)
+        self.assertIsNone(store.get_cached(1, self.book, 'EPUB'))
+
+
+    def test_container_formats_remove_their_conversion_directory(self):
+        tdirs = []
+
+        def get_container(path, tdir=None, tweak_mode=False):
+            tdirs.append(tdir)
+            with open(os.path.join(tdir, 'ch0.xhtml'), 'w', encoding='utf-8') as f:
+                f.write(CHAPTERS[0])
+            return types.SimpleNamespace(spine_names=[('ch0.xhtml', True)],
+                                         raw_data=lambda name, decode=True: CHAPTERS[0])
+
+        container_module = types.ModuleType('calibre.ebooks.oeb.polish.container')
+        container_module.get_container = get_container
+        fake_calibre = {name: types.ModuleType(name) for name in
+                        ('calibre', 'calibre.ebooks', 'calibre.ebooks.oeb', 'calibre.ebooks.oeb.polish')}
+        fake_calibre[container_module.__name__] = container_module
+        store = PassageStore(os.path.join(self.tmp, 'cache'))
+        cancel = threading.Event()
+        cancel.set()
+        with mock.patch.dict(sys.modules, fake_calibre):
+            self.assertIn('whale', ''.join(iter_book_text(self.book, 'AZW3')))
+            with self.assertRaises(ExtractionCancelled):
+                store.build(1, self.book, 'AZW3', cancel_event=cancel)
+        self.assertEqual(len(tdirs), 2)
+        self.assertFalse(any(os.path.exists(tdir) for tdir in tdirs))
+
+
+if __name__ == '__main__':
+    unittest.main()
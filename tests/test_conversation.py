@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for multi-turn conversation context and compaction."""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import conversation
+from conversation import build_history_messages, follow_up_prompt, load_turns
+from history_manager import HistoryManager
+
+BOOKS = [{'id': 1, 'title': 'Moby-Dick', 'authors': ['Herman Melville']}]
+
+
+def _turn(uid, question, answer, prompt=''):
+    return {'uid': uid, 'question': question, 'prompt': prompt, 'answers': {'openai': answer}}
+
+
+class TestLoadTurns(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.manager = HistoryManager(base_dir=self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_follows_parent_chain_oldest_first(self):
+        self.manager.save_history('u1', 'single', BOOKS, 'Who is Ahab?', 'The captain.',
+                                  ai_id='openai', prompt='Book: Moby-Dick\nWho is Ahab?')
+        self.manager.save_history('u2', 'single', BOOKS, 'Why is he angry?', 'The whale.',
+                                  ai_id='openai', parent_uid='u1', prompt='Why is he angry?')
+        self.manager.save_history('u2', 'single', BOOKS, 'Why is he angry?', 'Revenge.', ai_id='gemini')
+
+        turns = load_turns(self.manager, 'u2')
+        self.assertEqual([turn['uid'] for turn in turns], ['u1', 'u2'])
+        self.assertEqual(turns[0]['prompt'], 'Book: Moby-Dick\nWho is Ahab?')
+        # 追问的提示词与问题相同，不重复保存
+        self.assertEqual(turns[1]['prompt'], '')
+        self.assertEqual(turns[1]['answers'], {'openai': 'The whale.', 'gemini': 'Revenge.'})
+
+    def test_parent_link_survives_reload(self):
+        self.manager.save_history('u1', 'single', BOOKS, 'Q1', 'A1', ai_id='openai')
+        self.manager.save_history('u2', 'single', BOOKS, 'Q2', 'A2', ai_id='openai', parent_uid='u1')
+        reloaded = HistoryManager(base_dir=self._tmp.name)
+        self.assertEqual(reloaded.get_history_by_uid('u2')['parent_uid'], 'u1')
+        self.assertEqual(len(load_turns(reloaded, 'u2')), 2)
+
+    def test_missing_parent_ends_chain(self):
+        self.manager.save_history('u2', 'single', BOOKS, 'Q2', 'A2', ai_id='openai', parent_uid='gone')
+        self.assertEqual([turn['uid'] for turn in load_turns(self.manager, 'u2')], ['u2'])
+
+
+class TestBuildHistoryMessages(unittest.TestCase):
+    def test_alternating_messages_with_root_prompt(self):
+        turns = [
+            _turn('u1', 'Who is Ahab?', 'The captain.', prompt='Book: Moby-Dick\nWho is Ahab?'),
+            _turn('u2', 'Why is he angry?', 'The whale took his leg.'),
+        ]
+        messages = build_history_messages(turns, 'openai')
+        self.assertEqual([m['role'] for m in messages], ['user', 'assistant', 'user', 'assistant'])
+        self.assertEqual(messages[0]['content'], 'Book: Moby-Dick\nWho is Ahab?')
+        self.assertEqual(messages[2]['content'], 'Why is he angry?')
+
+    def test_prefers_own_answer_and_skips_unanswered_turns(self):
+        turns = [
+            {'uid': 'u1', 'question': 'Q1', 'prompt': '', 'answers': {'openai': 'A', 'gemini': 'B'}},
+            {'uid': 'u2', 'question': 'Q2', 'prompt': '', 'answers': {}},
+        ]
+        self.assertEqual(build_history_messages(turns, 'gemini')[1]['content'], 'B')
+        self.assertEqual(len(build_history_messages(turns, 'gemini')), 2)
+        self.assertEqual(build_history_messages(turns, 'claude')[1]['content'], 'A')
+
+    def test_old_answers_are_clipped(self):
+        long_answer = 'word ' * 2000
+        turns = [_turn(f'u{i}', f'Q{i}', long_answer) for i in range(5)]
+        messages = build_history_messages(turns, 'openai', budget_tokens=100_000)
+        answers = [m['content'] for m in messages if m['role'] == 'assistant']
+        self.assertTrue(answers[1].endswith(conversation.TRUNCATED_MARKER))
+        self.assertEqual(answers[-1], long_answer)
+        self.assertEqual(answers[-2], long_answer)
+
+    def test_over_budget_drops_oldest_turns_in_blocks(self):
+        turns = [_turn('root', 'Q0', 'A0', prompt='Book context')]
+        turns += [_turn(f'u{i}', f'Question {i}', 'answer ' * 300) for i in range(1, 10)]
+        messages = build_history_messages(turns, 'openai', budget_tokens=1500)
+        self.assertEqual(messages[0]['content'], 'Book context')
+        kept = [m['content'] for m in messages if m['role'] == 'user'][1:]
+        dropped = 9 - len(kept)
+        self.assertEqual(dropped % conversation.COMPACT_BLOCK_TURNS, 0)
+        self.assertEqual(kept[-1], 'Question 9')
+
+    def test_prefix_stable_between_compactions(self):
+        turns = [_turn('root', 'Q0', 'A0', prompt='Book context')]
+        turns += [_turn(f'u{i}', f'Question {i}', 'answer ' * 100) for i in range(1, 12)]
+        budget = 2500
+        before = build_history_messages(turns[:-1], 'openai', budget_tokens=budget)
+        after = build_history_messages(turns, 'openai', budget_tokens=budget)
+        # 追加一轮后，之前的消息（除了刚变为“较早轮次”而被截断的那一条）保持不变
+        self.assertEqual(after[:len(before) - 4], before[:len(before) - 4])
+
+    def test_dropped_turns_are_summarized_once(self):
+        calls = []
+
+        def summarize(prompt):
+            calls.append(prompt)
+            return 'They discussed whales.'
+
+        conversation._summary_cache.clear()
+        turns = [_turn('root', 'Q0', 'A0', prompt='Book context')]
+        turns += [_turn(f's{i}', f'Question {i}', 'answer ' * 300) for i in range(1, 10)]
+        messages = build_history_messages(turns, 'openai', budget_tokens=1500, summarize_fn=summarize)
+        self.assertIn('They discussed whales.', messages[2]['content'])
+        self.assertEqual(messages[3]['role'], 'assistant')
+        build_history_messages(turns, 'openai', budget_tokens=1500, summarize_fn=summarize)
+        self.assertEqual(len(calls), 1)
+
+    def test_follow_up_prompt(self):
+        self.assertEqual(follow_up_prompt('Why?'), 'Why?')
+        self.assertIn('[Passage 1/3', follow_up_prompt('Why?', '[Passage 1/3, ~0%]\ntext'))
+
+
+if __name__ == '__main__':
+    unittest.main()
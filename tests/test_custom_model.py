@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests that the custom provider talks to local servers without the environment proxy."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import types
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+PACKAGE = 'calibre_plugins.ask_ai_plugin'
+
+# 按 calibre 插件加载器的方式建立包（不执行插件的 __init__.py）
+if PACKAGE not in sys.modules:
+    for _name, _path in (('calibre_plugins', []), (PACKAGE, [str(ROOT)])):
+        _module = types.ModuleType(_name)
+        _module.__path__ = _path
+        sys.modules.setdefault(_name, _module)
+
+from calibre_plugins.ask_ai_plugin.http_pool import get_session  # noqa: E402
+from calibre_plugins.ask_ai_plugin.models.custom import CustomModel  # noqa: E402
+
+# 不存在的代理：经由它的请求都会失败
+_DEAD_PROXY = 'http://127.0.0.1:9'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        body = json.dumps({'choices': [{'message': {'content': 'local answer'}}],
+                           'usage': {'prompt_tokens': 3, 'completion_tokens': 2}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestCustomModelProxy(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        proxy_env = {key: _DEAD_PROXY for key in ('HTTP_PROXY', 'http_proxy', 'HTTPS_PROXY', 'https_proxy')}
+        proxy_env.update(NO_PROXY='', no_proxy='')
+        self.env = mock.patch.dict(os.environ, proxy_env)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(3)
+
+    def test_uses_the_no_proxy_session(self):
+        self.assertFalse(CustomModel.HTTP_TRUST_ENV)
+        self.assertFalse(get_session(CustomModel.HTTP_TRUST_ENV).trust_env)
+
+    def test_local_server_is_reached_despite_proxy_environment(self):
+        model = CustomModel({'api_base_url': self.base_url, 'model': 'local-model'})
+        self.assertEqual(model.ask('hi', stream=False, timeout=5), 'local answer')
+        # 同一请求经由读取环境代理的连接池会失败
+        with self.assertRaises(Exception):
+            get_session(True).post(f'{self.base_url}/v1/chat/completions', json={}, timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for concurrent provider health probes and health-based AI ranking."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+VENDOR = ROOT / 'lib' / 'ask_ai_plugin_vendor'
+if str(VENDOR) not in sys.path:
+    sys.path.insert(0, str(VENDOR))
+
+import requests
+
+from health import (HEALTH_DOWN, HEALTH_OK, HEALTH_SLOW, HEALTH_UNKNOWN, HealthMonitor, HealthProbe,
+                    HealthRegistry, ProbeResult, classify_response, probe_all, probe_url)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        status = {'/api/tags': 200, '/v1/models': 401, '/slow': 200}.get(self.path, 404)
+        if self.path == '/slow':
+            time.sleep(0.3)
+        body = b'{"models": []}'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestProbeUrl(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.session = requests.Session()
+        self.session.trust_env = False
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_healthy_endpoint_reports_connect_time_and_ttfb(self):
+        result = probe_url(self.session, HealthProbe(f'{self.base_url}/api/tags'))
+        self.assertEqual((result.status, result.http_status, result.error), (HEALTH_OK, 200, None))
+        self.assertIsNotNone(result.connect_time)
+        self.assertGreaterEqual(result.ttfb, 0)
+
+    def test_rejected_key_and_slow_first_byte(self):
+        self.assertEqual(probe_url(self.session, HealthProbe(f'{self.base_url}/v1/models')).status, HEALTH_DOWN)
+        slow = probe_url(self.session, HealthProbe(f'{self.base_url}/slow'), slow_threshold=0.2)
+        self.assertEqual(slow.status, HEALTH_SLOW)
+        self.assertGreaterEqual(slow.ttfb, 0.2)
+
+    def test_reachability_only_accepts_any_response(self):
+        probe = HealthProbe(f'{self.base_url}/missing', reachability_only=True)
+        self.assertEqual(probe_url(self.session, probe).status, HEALTH_OK)
+        self.assertEqual(probe_url(self.session, probe._replace(reachability_only=False)).status, HEALTH_DOWN)
+
+    def test_unreachable_host_is_down(self):
+        closed = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        url = f'http://127.0.0.1:{closed.server_address[1]}/api/tags'
+        closed.server_close()
+        result = probe_url(self.session, HealthProbe(url), timeout=2)
+        self.assertEqual(result.status, HEALTH_DOWN)
+        self.assertIsNone(result.connect_time)
+        self.assertIn('ConnectionError', result.error)
+
+    def test_throttled_is_slow_not_down(self):
+        self.assertEqual(classify_response(429, 0.1), (HEALTH_SLOW, 'HTTP 429'))
+        self.assertEqual(classify_response(503, 0.1), (HEALTH_DOWN, 'HTTP 503'))
+
+
+class TestRegistry(unittest.TestCase):
+    def test_probe_all_runs_concurrently_and_ranks(self):
+        clock = _Clock()
+        registry = HealthRegistry(clock=clock)
+        barrier = threading.Barrier(3, timeout=3)
+
+        def probe(status, error=None):
+            def fn():
+                barrier.wait()
+                return ProbeResult(status, 200, 0.01, 0.1, error, clock())
+            return fn
+
+        def broken():
+            barrier.wait()
+            raise ValueError('not configured')
+
+        results = probe_all({'dead': broken, 'slow': probe(HEALTH_SLOW), 'fast': probe(HEALTH_OK)},
+                            registry=registry, clock=clock)
+        self.assertEqual(results['dead'].status, HEALTH_DOWN)
+        self.assertEqual(registry.rank(['dead', 'slow', 'new', 'fast']), ['fast', 'new', 'slow', 'dead'])
+        self.assertIn('not configured', registry.last_error('dead')[0])
+
+        # 过期的结果不再影响排序
+        clock.now += 3600
+        self.assertEqual(registry.status_of('dead'), HEALTH_UNKNOWN)
+        self.assertEqual(registry.rank(['dead', 'fast']), ['dead', 'fast'])
+
+    def test_last_error_survives_recovery(self):
+        registry = HealthRegistry()
+        registry.record('a', ProbeResult(HEALTH_DOWN, 503, None, 0.1, 'HTTP 503', 1.0))
+        registry.record('a', ProbeResult(HEALTH_OK, 200, None, 0.1, None, 2.0))
+        self.assertEqual(registry.get('a').status, HEALTH_OK)
+        self.assertEqual(registry.last_error('a'), ('HTTP 503', 1.0))
+
+
+class TestHealthMonitor(unittest.TestCase):
+    def test_periodic_probe_until_stopped(self):
+        monitor = HealthMonitor()
+        calls = []
+        monitor.start(0.02, lambda: calls.append(1))
+        deadline = time.monotonic() + 3
+        while len(calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(len(calls), 2)
+        monitor.stop()
+        self.assertFalse(monitor.running)
+        count = len(calls)
+        time.sleep(0.1)
+        self.assertLessEqual(len(calls), count + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
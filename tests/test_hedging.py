@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for hedged requests and the adaptive first-token threshold."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from hedging import (DEFAULT_HEDGE_DELAY, MAX_HEDGE_DELAY, MIN_HEDGE_DELAY, FirstTokenStats, HedgeCancelled,
+                     hedge_delay, run_hedged)
+
+
+def _streamer(chunks, first_delay=0.0, gap=0.0, aborted=None):
+    """模拟流式模型：first_delay 秒后开始逐个输出片段"""
+    def fn(chunk_callback, cancel_event):
+        time.sleep(first_delay)
+        text = ''
+        for chunk in chunks:
+            try:
+                chunk_callback(chunk)
+            except HedgeCancelled:
+                if aborted is not None:
+                    aborted.set()
+                raise
+            text += chunk
+            time.sleep(gap)
+        return text
+    return fn
+
+
+def _failing(message, delay=0.0):
+    def fn(chunk_callback, cancel_event):
+        time.sleep(delay)
+        raise RuntimeError(message)
+    return fn
+
+
+class TestRunHedged(unittest.TestCase):
+    def setUp(self):
+        self.chunks = []
+        self.winners = []
+
+    def _run(self, primary, fallback, delay):
+        return run_hedged(primary, fallback, delay, stream_callback=self.chunks.append,
+                          on_winner=self.winners.append)
+
+    def test_fast_primary_never_starts_fallback(self):
+        fallback_calls = []
+        winner, text = self._run(('slow_free', _streamer(['a', 'b'])),
+                                 ('backup', lambda cb, ev: fallback_calls.append(1)), delay=1.0)
+        self.assertEqual((winner, text), ('slow_free', 'ab'))
+        self.assertEqual(self.chunks, ['a', 'b'])
+        self.assertEqual((self.winners, fallback_calls), (['slow_free'], []))
+
+    def test_slow_first_token_fails_over_and_drops_the_loser(self):
+        aborted = threading.Event()
+        started = time.monotonic()
+        winner, text = self._run(('slow_free', _streamer(['late'], first_delay=0.5, aborted=aborted)),
+                                 ('backup', _streamer(['x', 'y', 'z'], gap=0.01)), delay=0.05)
+        self.assertEqual((winner, text), ('backup', 'xyz'))
+        self.assertLess(time.monotonic() - started, 0.45)
+        self.assertEqual(self.chunks, ['x', 'y', 'z'])
+        self.assertEqual(self.winners, ['backup'])
+        # 落后一方在首个片段到达时被中止
+        self.assertTrue(aborted.wait(2))
+        self.assertEqual(self.chunks, ['x', 'y', 'z'])
+
+    def test_early_primary_failure_starts_fallback_immediately(self):
+        started = time.monotonic()
+        winner, text = self._run(('slow_free', _failing('503')), ('backup', _streamer(['ok'])), delay=5.0)
+        self.assertEqual((winner, text), ('backup', 'ok'))
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_both_failing_raises_primary_error(self):
+        with self.assertRaisesRegex(RuntimeError, 'primary down'):
+            self._run(('slow_free', _failing('primary down')), ('backup', _failing('backup down')), delay=0.01)
+        self.assertEqual(self.winners, [])
+
+    def test_winner_error_after_first_token_is_raised(self):
+        def broken(chunk_callback, cancel_event):
+            chunk_callback('partial')
+            raise RuntimeError('stream cut')
+
+        with self.assertRaisesRegex(RuntimeError, 'stream cut'):
+            self._run(('slow_free', broken), ('backup', _streamer(['never'], first_delay=0.2)), delay=1.0)
+        self.assertEqual(self.chunks, ['partial'])
+
+    def test_non_streaming_result_counts_as_first_output(self):
+        winner, text = self._run(('slow_free', lambda cb, ev: (time.sleep(0.5), 'slow')[1]),
+                                 ('backup', lambda cb, ev: 'fast'), delay=0.05)
+        self.assertEqual((winner, text), ('backup', 'fast'))
+        self.assertEqual(self.chunks, [])
+
+
+class TestHedgeDelay(unittest.TestCase):
+    def test_configured_threshold_wins(self):
+        self.assertEqual(hedge_delay('a', configured='4.5', stats=FirstTokenStats()), 4.5)
+
+    def test_adaptive_p90_is_clamped(self):
+        stats = FirstTokenStats()
+        self.assertEqual(hedge_delay('a', configured='', stats=stats), DEFAULT_HEDGE_DELAY)
+        for seconds in (1, 2, 3, 4, 5, 6, 7, 8, 9, 30):
+            stats.record('a', seconds)
+        self.assertEqual(stats.percentile('a'), 9)
+        self.assertEqual(hedge_delay('a', configured=None, stats=stats), 9)
+
+        for _ in range(10):
+            stats.record('fast', 0.2)
+            stats.record('slow', 500)
+        self.assertEqual(hedge_delay('fast', stats=stats), MIN_HEDGE_DELAY)
+        self.assertEqual(hedge_delay('slow', stats=stats), MAX_HEDGE_DELAY)
+
+    def test_window_keeps_recent_samples(self):
+        stats = FirstTokenStats(window=5)
+        for seconds in range(100):
+            stats.record('a', seconds)
+        self.assertEqual(stats.count('a'), 5)
+        self.assertEqual(stats.percentile('a', q=0.0), 95)
+
+
+if __name__ == '__main__':
+    unittest.main()
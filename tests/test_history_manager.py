@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the two-tier (index + bodies) history store."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import history_manager
+from history_manager import HistoryManager
+
+
+def _books(*ids):
+    return [{'id': book_id, 'title': f'Book {book_id}', 'deleted': False} for book_id in ids]
+
+
+class TestHistoryManager(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base_dir = self._tmp.name
+        history_manager._INDEX_CACHE.clear()
+
+    def tearDown(self):
+        history_manager._INDEX_CACHE.clear()
+        self._tmp.cleanup()
+
+    def test_index_excludes_answer_bodies(self):
+        manager = HistoryManager(self.base_dir)
+        manager.save_history('u1', 'single', _books(1), 'Q' * 500, 'long answer', ai_id='openai')
+        with open(manager.index_file, encoding='utf-8') as f:
+            index = json.load(f)
+        self.assertNotIn('answers', index['u1'])
+        self.assertEqual(index['u1']['ai_ids'], ['openai'])
+        self.assertEqual(len(index['u1']['question']), history_manager.QUESTION_PREVIEW_CHARS)
+
+    def test_full_record_loaded_on_demand(self):
+        manager = HistoryManager(self.base_dir)
+        manager.save_history('u1', 'single', _books(1), 'question', 'answer A', ai_id='openai')
+        manager.save_history('u1', 'single', _books(1), 'question', 'answer B', ai_id='gemini')
+        record = HistoryManager(self.base_dir).get_history_by_uid('u1')
+        self.assertEqual(record['question'], 'question')
+        self.assertEqual(record['answers']['openai']['answer'], 'answer A')
+        self.assertEqual(record['answers']['gemini']['answer'], 'answer B')
+
+    def test_instances_share_index(self):
+        first = HistoryManager(self.base_dir)
+        second = HistoryManager(self.base_dir)
+        first.save_history('u1', 'single', _books(1), 'q', 'a', ai_id='openai')
+        second.save_history('u1', 'single', _books(1), 'q', 'b', ai_id='gemini')
+        answers = first.get_history_by_uid('u1')['answers']
+        self.assertEqual(set(answers), {'openai', 'gemini'})
+
+    def test_related_histories_sorted_newest_first(self):
+        manager = HistoryManager(self.base_dir)
+        manager.save_history('u1', 'single', _books(1), 'q1', 'a1')
+        manager.save_history('u2', 'multi', _books(1, 2), 'q2', 'a2')
+        manager.histories['u1']['timestamp'] = '2000-01-01 00:00:00'
+        related = manager.get_related_histories([2])
+        self.assertEqual([h['uid'] for h in related], ['u2'])
+        related = manager.get_related_histories([1])
+        self.assertEqual([h['uid'] for h in related], ['u2', 'u1'])
+
+    def test_delete_removes_body(self):
+        manager = HistoryManager(self.base_dir)
+        manager.save_history('u1', 'single', _books(1), 'q', 'a')
+        body_path = manager._body_path('u1')
+        self.assertTrue(os.path.exists(body_path))
+        self.assertTrue(manager.delete_history('u1'))
+        self.assertFalse(os.path.exists(body_path))
+        self.assertIsNone(manager.get_history_by_uid('u1'))
+
+    def test_migrates_v2_single_file(self):
+        legacy = {
+            'u1': {
+                'uid': 'u1', 'timestamp': '2024-01-01 10:00:00', 'mode': 'single',
+                'books': _books(7), 'question': 'old q', 'answer': 'old answer',
+            },
+        }
+        legacy_path = os.path.join(self.base_dir, 'ask_ai_plugin_history_v2.json')
+        with open(legacy_path, 'w', encoding='utf-8') as f:
+            json.dump(legacy, f)
+        manager = HistoryManager(self.base_dir)
+        self.assertFalse(os.path.exists(legacy_path))
+        self.assertTrue(os.path.exists(legacy_path + '.migrated'))
+        record = manager.get_history_by_uid('u1')
+        self.assertEqual(record['answers']['default']['answer'], 'old answer')
+
+    def test_clear_removes_all_copies_and_stale_instances_cannot_restore(self):
+        legacy_path = os.path.join(self.base_dir, 'ask_ai_plugin_history_v2.json')
+        with open(legacy_path, 'w', encoding='utf-8') as f:
+            json.dump({'u1': {'uid': 'u1', 'books': _books(7), 'question': 'q', 'answer': 'a'}}, f)
+        stale = HistoryManager(self.base_dir)
+        stale.save_history('u2', 'single', _books(8), 'q2', 'a2')
+
+        self.assertTrue(HistoryManager(self.base_dir).clear_history())
+        self.assertEqual(os.listdir(self.base_dir), [])
+        # 清空前创建的实例再次保存时只写入新记录
+        stale.save_history('u3', 'single', _books(9), 'q3', 'a3')
+        self.assertEqual(sorted(HistoryManager(self.base_dir).histories), ['u3'])
+
+
+class TestHistoryArchive(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        history_manager._INDEX_CACHE.clear()
+        self.manager = HistoryManager(self._tmp.name)
+        for i in range(5):
+            uid = f'u{i}'
+            self.manager.save_history(uid, 'single', _books(i % 2), f'question {i}', f'answer {i} ' * 50)
+            self.manager.histories[uid]['timestamp'] = f'2020-01-0{i + 1} 00:00:00'
+        self.manager._save_index()
+
+    def tearDown(self):
+        history_manager._INDEX_CACHE.clear()
+        self._tmp.cleanup()
+
+    def test_archived_bodies_are_read_back(self):
+        self.assertEqual(self.manager.archive_old_histories(30), 5)
+        self.assertFalse(os.path.exists(self.manager._body_path('u0')))
+        history_manager._INDEX_CACHE.clear()
+        record = HistoryManager(self._tmp.name).get_history_by_uid('u3')
+        self.assertEqual(record['answers']['default']['answer'], 'answer 3 ' * 50)
+
+    def test_resaving_archived_record_moves_it_back_to_bodies(self):
+        self.manager.archive_old_histories(30)
+        self.manager.save_history('u1', 'single', _books(1), 'question 1', 'new', ai_id='gemini')
+        record = self.manager.get_history_by_uid('u1')
+        self.assertEqual(set(record['answers']), {'default', 'gemini'})
+        self.assertNotIn('archive', self.manager.histories['u1'])
+
+    def test_compaction_drops_deleted_records(self):
+        self.manager.archive_old_histories(30)
+        for uid in ('u0', 'u1', 'u2', 'u3'):
+            self.manager.delete_history(uid)
+        self.assertTrue(self.manager.compact_archive())
+        self.assertEqual(len(os.listdir(self.manager.archive_dir)), 1)
+        self.assertIn('answer 4', self.manager.get_history_by_uid('u4')['answers']['default']['answer'])
+
+    def test_retention_max_records_keeps_newest(self):
+        self.assertEqual(self.manager.apply_retention(max_records=2), 3)
+        self.assertEqual(sorted(self.manager.histories), ['u3', 'u4'])
+
+    def test_retention_bytes_per_book(self):
+        size = self.manager.histories['u4']['bytes']
+        self.manager.apply_retention(max_bytes_per_book=size * 2)
+        self.assertEqual(sorted(self.manager.histories), ['u1', 'u2', 'u3', 'u4'])
+
+    def test_retention_measures_utf8_bytes(self):
+        self.manager.save_history('cjk', 'single', _books(5), '问题', '回答' * 10)
+        self.assertEqual(self.manager.histories['cjk']['bytes'], 3 * 22)
+        self.manager.apply_retention(max_bytes_per_book=50)
+        self.assertNotIn('cjk', self.manager.histories)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the rendered history HTML cache."""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from html_cache import RenderedHTMLCache, renderer_fingerprint
+
+
+class TestRenderedHTMLCache(unittest.TestCase):
+    def test_hit_requires_same_theme(self):
+        cache = RenderedHTMLCache('v1')
+        cache.put('# Title', '<h1>Title</h1>', 'dark')
+        self.assertEqual(cache.get('# Title', 'dark'), '<h1>Title</h1>')
+        self.assertIsNone(cache.get('# Title', 'light'))
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_lru_eviction_by_entries(self):
+        cache = RenderedHTMLCache('v1', max_entries=2)
+        cache.put('a', '<p>a</p>')
+        cache.put('b', '<p>b</p>')
+        cache.get('a')
+        cache.put('c', '<p>c</p>')
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_eviction_by_total_chars(self):
+        cache = RenderedHTMLCache('v1', max_chars=25)
+        cache.put('a', 'x' * 10)
+        cache.put('b', 'y' * 10)
+        cache.put('c', 'z' * 10)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['chars'], 20)
+
+    def test_persisted_entries_survive_reload_for_same_renderer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / 'cache.json')
+            cache = RenderedHTMLCache('v1', cache_file=path)
+            cache.put('answer', '<p>answer</p>')
+            cache.save()
+            self.assertEqual(RenderedHTMLCache('v1', cache_file=path).get('answer'), '<p>answer</p>')
+            self.assertIsNone(RenderedHTMLCache('v2', cache_file=path).get('answer'))
+
+    def test_renderer_fingerprint_changes_with_config(self):
+        self.assertNotEqual(
+            renderer_fingerprint('2.5', {'tables': None}),
+            renderer_fingerprint('2.5', {'tables': None, 'strike': None}),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the shared HTTP connection pool and connection pre-warming."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+VENDOR = ROOT / 'lib' / 'ask_ai_plugin_vendor'
+if str(VENDOR) not in sys.path:
+    sys.path.insert(0, str(VENDOR))
+
+from http_pool import Prewarmer, close_sessions, get_session, origin_of, prewarm_connection
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = []
+    requests_seen = []
+
+    def setup(self):
+        super().setup()
+        _Handler.connections.append(self.client_address)
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b''):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        _Handler.requests_seen.append(('HEAD', self.path))
+        self._reply(404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        _Handler.requests_seen.append(('POST', self.path))
+        self._reply(200, b'{"ok": true}')
+
+
+class TestPrewarmConnection(unittest.TestCase):
+    def setUp(self):
+        _Handler.connections = []
+        _Handler.requests_seen = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        close_sessions()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_warmed_connection_is_reused_by_the_request(self):
+        self.assertTrue(prewarm_connection(f'{self.base_url}/v1/chat/completions'))
+        response = get_session().post(f'{self.base_url}/v1/chat/completions', json={'x': 1}, timeout=5)
+
+        self.assertEqual(response.json(), {'ok': True})
+        self.assertEqual(_Handler.requests_seen, [('HEAD', '/'), ('POST', '/v1/chat/completions')])
+        self.assertEqual(len(_Handler.connections), 1)
+
+    def test_recently_warmed_host_is_skipped(self):
+        self.assertTrue(prewarm_connection(self.base_url, now=100.0))
+        self.assertFalse(prewarm_connection(self.base_url + '/v1', now=130.0))
+        self.assertTrue(prewarm_connection(self.base_url, now=200.0))
+        self.assertEqual(len(_Handler.requests_seen), 2)
+
+    def test_sessions_are_shared_per_proxy_setting(self):
+        self.assertIs(get_session(), get_session())
+        self.assertIsNot(get_session(), get_session(trust_env=False))
+        self.assertFalse(get_session(trust_env=False).trust_env)
+
+    def test_unreachable_or_invalid_urls_fail_quietly(self):
+        self.assertFalse(prewarm_connection('not a url'))
+        self.assertIsNone(origin_of('file:///tmp/x'))
+        self.assertEqual(origin_of('https://api.example.com:8443/v1/x?q=1'), 'https://api.example.com:8443')
+
+
+class TestPrewarmer(unittest.TestCase):
+    def test_cancel_stops_remaining_work(self):
+        started = threading.Event()
+        release = threading.Event()
+        progress = []
+
+        def task(cancel_event):
+            progress.append('connect')
+            started.set()
+            release.wait(5)
+            if cancel_event.is_set():
+                return
+            progress.append('preload')
+
+        prewarmer = Prewarmer()
+        prewarmer.start([task])
+        self.assertTrue(started.wait(5))
+        prewarmer.cancel()
+        release.set()
+        prewarmer.wait(5)
+
+        self.assertTrue(prewarmer.cancelled)
+        self.assertEqual(progress, ['connect'])
+
+    def test_task_errors_do_not_stop_other_tasks(self):
+        done = []
+
+        def failing(cancel_event):
+            raise RuntimeError('boom')
+
+        prewarmer = Prewarmer()
+        prewarmer.start([failing, lambda cancel_event: done.append(True)])
+        prewarmer.wait(5)
+        self.assertEqual(done, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
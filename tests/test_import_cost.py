@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests that plugin start-up and the API client do not import the renderer, sanitiser, settings UI or providers."""
+
+from __future__ import annotations
+
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PACKAGE = 'calibre_plugins.ask_ai_plugin'
+
+# ui.py 在 calibre 启动时加载，模块级不能导入这些模块（见 scripts/bench_import_time.py）
+DEFERRED_FROM_UI = {'config', 'api', 'prompts_widget', 'shortcuts_widget', 'ui_constants',
+                    'response_handler', 'random_question', 'markdown2', 'bleach'}
+
+# 启动时（genesis、initialization_complete）无条件执行的代码不能导入的模块
+DEFERRED_FROM_STARTUP = DEFERRED_FROM_UI | {'jobs_dialog', 'batch_dialog', 'health_dialog', 'statistics_widget'}
+
+# 在子进程中模拟 calibre 的插件加载器，导入模块（并执行 run）后输出已加载的插件模块
+_PROBE = '''
+import importlib, json, sys, types
+for name, path in (('calibre_plugins', []), ({package!r}, [{root!r}])):
+    module = types.ModuleType(name)
+    module.__path__ = path
+    sys.modules[name] = module
+{setup}
+modules = [importlib.import_module({package!r} + '.' + target) for target in {targets!r}]
+{run}
+print(json.dumps(sorted(name[len({package!r}) + 1:] for name in sys.modules if name.startswith({package!r} + '.'))))
+'''
+
+# calibre.utils.config 的内存替身：插件设置为 {prefs}，配置目录为 {config_dir}
+_CALIBRE_CONFIG = '''
+for name in ('calibre', 'calibre.utils'):
+    module = types.ModuleType(name)
+    module.__path__ = []
+    sys.modules[name] = module
+config = sys.modules['calibre.utils.config'] = types.ModuleType('calibre.utils.config')
+class JSONConfig(dict):
+    def __init__(self, name):
+        super().__init__({prefs!r})
+        self.defaults = {{}}
+    def get(self, key, default=None):
+        return super().get(key, self.defaults.get(key, default))
+    def __getitem__(self, key):
+        return self.get(key)
+config.JSONConfig = JSONConfig
+config.config_dir = {config_dir!r}
+'''
+
+
+def _loaded_after_import(*targets, setup='', run=''):
+    code = _PROBE.format(package=PACKAGE, root=str(ROOT), targets=list(targets), setup=setup, run=run)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr[-2000:])
+    return set(json.loads(result.stdout))
+
+
+def _unconditional_imports(function):
+    """函数每次调用都会执行的导入（进入 try/with，不进入条件分支和嵌套函数）"""
+    imported = set()
+    pending = list(function.body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, ast.ImportFrom):
+            imported.add((node.module or '').rsplit('.', 1)[-1])
+            imported.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.Import):
+            imported.update(alias.name.rsplit('.', 1)[-1] for alias in node.names)
+        elif isinstance(node, (ast.Try, ast.With)):
+            pending.extend(node.body)
+    return imported
+
+
+class TestStartupImports(unittest.TestCase):
+    def test_ui_defers_heavy_modules_to_first_use(self):
+        tree = ast.parse((ROOT / 'ui.py').read_text(encoding='utf-8'))
+        imported = set()
+        for node in tree.body:
+            if isinstance(node, ast.ImportFrom):
+                module = (node.module or '').rsplit('.', 1)[-1]
+                imported.add(module)
+                imported.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.Import):
+                imported.update(alias.name.rsplit('.', 1)[-1] for alias in node.names)
+        self.assertEqual(imported & DEFERRED_FROM_UI, set())
+
+    def test_startup_hooks_defer_dialogs_and_api(self):
+        tree = ast.parse((ROOT / 'ui.py').read_text(encoding='utf-8'))
+        hooks = {node.name: node for node in ast.walk(tree)
+                 if isinstance(node, ast.FunctionDef) and node.name in ('genesis', 'initialization_complete')}
+        self.assertEqual(set(hooks), {'genesis', 'initialization_complete'})
+        for name, hook in hooks.items():
+            with self.subTest(hook=name):
+                self.assertEqual(_unconditional_imports(hook) & DEFERRED_FROM_STARTUP, set())
+
+    def test_startup_job_check_does_not_create_the_queue(self):
+        with tempfile.TemporaryDirectory() as config_dir:
+            setup = _CALIBRE_CONFIG.format(prefs={}, config_dir=config_dir)
+            loaded = _loaded_after_import('job_queue', setup=setup,
+                                          run='assert modules[0].has_active_jobs() is False')
+            self.assertEqual(os.listdir(config_dir), [])
+        self.assertEqual(loaded & {'jobs_dialog', 'api', 'config'}, set())
+
+    def test_api_client_loads_only_the_selected_provider(self):
+        grok = {'auth_token': 'key', 'api_base_url': 'https://api.x.ai', 'model': 'grok-4'}
+        prefs = {'selected_model': 'grok', 'models': {'grok': grok}}
+        with tempfile.TemporaryDirectory() as config_dir:
+            setup = _CALIBRE_CONFIG.format(prefs=prefs, config_dir=config_dir)
+            loaded = _loaded_after_import('api', setup=setup,
+                                          run='assert modules[0].APIClient()._ai_model is not None')
+        self.assertNotIn('config', loaded)
+        self.assertEqual({name for name in loaded if name.startswith('models.')}, {'models.base', 'models.grok'})
+
+    def test_i18n_does_not_load_providers_or_vendored_libraries(self):
+        loaded = _loaded_after_import('i18n')
+        self.assertIn('models.base', loaded)
+        self.assertEqual({name for name in loaded if name.startswith('lib.') or name.startswith('models.')},
+                         {'models.base'})
+
+    def test_vendored_requests_does_not_load_the_sanitiser(self):
+        for target in ('lib.ask_ai_plugin_vendor.requests', 'models.grok'):
+            loaded = _loaded_after_import(target)
+            self.assertIn('lib.ask_ai_plugin_vendor.requests', loaded)
+            self.assertNotIn('lib.ask_ai_plugin_vendor.bleach', loaded)
+            self.assertNotIn('lib.ask_ai_plugin_vendor.markdown2', loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
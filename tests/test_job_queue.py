@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the durable background job queue (checkpointing, retry, throughput)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from batch_ask import ProviderLimiter
+from job_queue import (JobExecutor, JobQueue, backoff_delay, coerce_value, has_active_jobs,
+                       JOB_ACTIVE, JOB_DONE, JOB_PAUSED, TASK_DONE, TASK_FAILED, TASK_PENDING, TASK_RUNNING)
+from provider_batch import BATCH_ENDED, BATCH_RUNNING
+
+LIB = 'library-1'
+
+
+class _QueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'jobs', 'jobs.sqlite')
+        self.queue = JobQueue(self.path)
+
+    def tearDown(self):
+        self.queue.close()
+        self._tmp.cleanup()
+
+
+class TestJobQueue(_QueueTestCase):
+    def test_claim_complete_and_finish_job(self):
+        job_id = self.queue.create_job('genres', LIB, 'Genres?', 'openai', '#genre', [1, 2], is_multiple=True)
+        tasks = self.queue.claim_tasks(LIB, 10)
+        self.assertEqual([task['book_id'] for task in tasks], [1, 2])
+        self.assertEqual(self.queue.claim_tasks(LIB, 10), [])
+        self.queue.complete_task(job_id, 1, 'Fantasy')
+        self.assertEqual(self.queue.get_job(job_id)['status'], JOB_ACTIVE)
+        self.queue.complete_task(job_id, 2, 'Horror')
+        self.assertEqual(self.queue.get_job(job_id)['status'], JOB_DONE)
+
+    def test_claim_is_scoped_to_library_and_active_jobs(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', [1])
+        self.queue.create_job('b', 'other', 'Q', 'openai', '#a', [1])
+        self.queue.set_job_status(job_id, JOB_PAUSED)
+        self.assertEqual(self.queue.claim_tasks(LIB, 10), [])
+        self.queue.set_job_status(job_id, JOB_ACTIVE)
+        self.assertEqual(len(self.queue.claim_tasks(LIB, 10)), 1)
+
+    def test_has_active_jobs_does_not_create_the_database(self):
+        empty_dir = os.path.join(self._tmp.name, 'never-used')
+        self.assertFalse(has_active_jobs(empty_dir))
+        self.assertFalse(os.path.exists(empty_dir))
+
+        base_dir = os.path.dirname(self.path)
+        self.assertFalse(has_active_jobs(base_dir))
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', [1])
+        self.assertTrue(has_active_jobs(base_dir))
+        self.queue.set_job_status(job_id, JOB_PAUSED)
+        self.assertFalse(has_active_jobs(base_dir))
+
+    def test_restart_recovers_running_and_unwritten_results(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#summary', [1, 2, 3])
+        self.queue.claim_tasks(LIB, 3)
+        self.queue.complete_task(job_id, 1, 'A summary.')
+        self.queue.close()
+
+        # 模拟 calibre 重启
+        self.queue = JobQueue(self.path)
+        self.assertEqual(self.queue.recover(), 2)
+        self.assertEqual([task['book_id'] for task in self.queue.claim_tasks(LIB, 10)], [2, 3])
+        job, items = self.queue.take_unwritten(LIB)[job_id]
+        self.assertEqual(job['column_name'], '#summary')
+        self.assertEqual(items, [(1, 'A summary.')])
+        self.queue.mark_written(job_id, [1])
+        self.assertEqual(self.queue.take_unwritten(LIB), {})
+
+    def test_failures_back_off_then_give_up(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', [1])
+        now = time.time()
+        self.queue.claim_tasks(LIB, 1, now=now)
+        self.assertTrue(self.queue.fail_task(job_id, 1, 'HTTP 429', max_attempts=2, now=now))
+        # 退避期间不会被领取
+        self.assertEqual(self.queue.claim_tasks(LIB, 1, now=now), [])
+        self.assertEqual(len(self.queue.claim_tasks(LIB, 1, now=now + 3600)), 1)
+        self.assertFalse(self.queue.fail_task(job_id, 1, 'HTTP 429', max_attempts=2))
+        self.assertEqual(self.queue.job_stats(job_id)[TASK_FAILED], 1)
+        self.assertEqual(self.queue.get_job(job_id)['status'], JOB_DONE)
+
+        self.queue.retry_failed(job_id)
+        self.assertEqual(self.queue.job_stats(job_id)[TASK_PENDING], 1)
+        self.assertEqual(self.queue.get_job(job_id)['status'], JOB_ACTIVE)
+
+    def test_retry_without_failures_keeps_the_job_done(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', [1])
+        self.queue.claim_tasks(LIB, 1)
+        self.queue.complete_task(job_id, 1, 'answer')
+        self.queue.retry_failed(job_id)
+        self.assertEqual(self.queue.get_job(job_id)['status'], JOB_DONE)
+        self.assertFalse(has_active_jobs(os.path.dirname(self.path)))
+
+    def test_resume_after_last_task_finished_while_paused(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', [1])
+        self.queue.claim_tasks(LIB, 1)
+        self.queue.set_job_status(job_id, JOB_PAUSED)
+        self.queue.complete_task(job_id, 1, 'answer')
+        self.assertEqual(self.queue.get_job(job_id)['status'], JOB_PAUSED)
+        self.queue.set_job_status(job_id, JOB_ACTIVE)
+        self.assertEqual(self.queue.get_job(job_id)['status'], JOB_DONE)
+
+    def test_throughput_and_eta(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', range(1, 11))
+        self.queue.claim_tasks(LIB, 5)
+        for book_id in range(1, 6):
+            self.queue.complete_task(job_id, book_id, 'x')
+        stats = self.queue.job_stats(job_id, now=time.time() + 60)
+        self.assertEqual(stats[TASK_DONE], 5)
+        self.assertAlmostEqual(stats['per_minute'], 5.0, delta=0.5)
+        self.assertAlmostEqual(stats['eta_seconds'], 60.0, delta=10)
+
+    def test_backoff_grows_and_is_capped(self):
+        self.assertLessEqual(backoff_delay(1, base=5), 5)
+        self.assertGreaterEqual(backoff_delay(4, base=5), 20)
+        self.assertLessEqual(backoff_delay(30, base=5, cap=60), 60)
+
+
+class TestCoerceValue(unittest.TestCase):
+    def test_single_and_multiple_values(self):
+        self.assertEqual(coerce_value('  A summary.\n', False), 'A summary.')
+        self.assertEqual(coerce_value('Fantasy, Horror; fantasy\n- Gothic', True), ['Fantasy', 'Horror', 'fantasy', 'Gothic'])
+        self.assertEqual(coerce_value('Fantasy, Fantasy', True), ['Fantasy'])
+
+
+class TestJobExecutor(_QueueTestCase):
+    def _run_until_done(self, executor, job_id, timeout=5):
+        executor.start()
+        deadline = time.time() + timeout
+        while time.time() < deadline and self.queue.get_job(job_id)['status'] != JOB_DONE:
+            time.sleep(0.01)
+        executor.stop(wait=True)
+
+    def test_executes_all_tasks_with_bounded_concurrency(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', range(1, 9))
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def ask(prompt, ai_id):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.02)
+            with lock:
+                state['active'] -= 1
+            return f'answer {prompt}'
+
+        executor = JobExecutor(self.queue, LIB, ask, lambda book_id, job: str(book_id),
+                               max_workers=4, limiter=ProviderLimiter(2, 0))
+        self._run_until_done(executor, job_id)
+        self.assertEqual(self.queue.job_stats(job_id)[TASK_DONE], 8)
+        self.assertLessEqual(state['peak'], 2)
+        _, items = self.queue.take_unwritten(LIB)[job_id]
+        self.assertIn((3, 'answer 3'), items)
+
+    def test_failed_task_is_retried(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', [1])
+        calls = []
+
+        def ask(prompt, ai_id):
+            calls.append(prompt)
+            if len(calls) == 1:
+                raise RuntimeError('timeout')
+            return 'ok'
+
+        import job_queue
+        original = job_queue.backoff_delay
+        job_queue.backoff_delay = lambda attempts: 0
+        try:
+            executor = JobExecutor(self.queue, LIB, ask, lambda book_id, job: 'p', limiter=ProviderLimiter(1, 0))
+            self._run_until_done(executor, job_id)
+        finally:
+            job_queue.backoff_delay = original
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.queue.job_stats(job_id)[TASK_DONE], 1)
+
+
+class _FakeBatchAPI:
+    def __init__(self):
+        self.submitted = []
+        self.state = BATCH_RUNNING
+
+    def submit(self, items):
+        self.submitted.append(list(items))
+        return f'batch-{len(self.submitted)}'
+
+    def status(self, batch_id):
+        return {'state': self.state, 'total': 0, 'completed': 0, 'failed': 0}
+
+    def iter_results(self, batch_id):
+        # 第一条成功，第二条出错，其余缺失
+        items = self.submitted[int(batch_id.split('-')[1]) - 1]
+        yield items[0][0], f'answer {items[0][1]}', None
+        yield items[1][0], None, 'overloaded'
+
+
+class TestBatchMode(_QueueTestCase):
+    def _executor(self, api):
+        return JobExecutor(self.queue, LIB, lambda prompt, ai_id: 'live', lambda book_id, job: f'p{book_id}',
+                           limiter=ProviderLimiter(1, 0), batch_api_fn=lambda ai_id: api)
+
+    def test_submit_poll_and_collect_results(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', [1, 2, 3], use_batch=True)
+        # 批量模式的子任务不会被逐条领取
+        self.assertEqual(self.queue.claim_tasks(LIB, 10), [])
+        api = _FakeBatchAPI()
+        executor = self._executor(api)
+        now = time.time()
+        executor.submit_batches(now=now)
+        self.assertEqual(api.submitted, [[('book-1', 'p1'), ('book-2', 'p2'), ('book-3', 'p3')]])
+        self.assertEqual(self.queue.job_stats(job_id)[TASK_RUNNING], 3)
+
+        # 未到轮询时间 / 仍在运行：不读取结果
+        executor.poll_batches(now=now)
+        executor.poll_batches(now=now + 3600)
+        self.assertEqual(self.queue.job_stats(job_id)[TASK_RUNNING], 3)
+
+        api.state = BATCH_ENDED
+        executor.poll_batches(now=now + 7200)
+        stats = self.queue.job_stats(job_id)
+        self.assertEqual(stats[TASK_DONE], 1)
+        self.assertEqual(stats[TASK_PENDING], 2)
+        self.assertEqual(self.queue.due_batches(LIB, now=now + 10 ** 6), [])
+        _, items = self.queue.take_unwritten(LIB)[job_id]
+        self.assertEqual(items, [(1, 'answer p1')])
+
+    def test_batch_tasks_survive_restart(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'openai', '#a', [1, 2], use_batch=True)
+        self._executor(_FakeBatchAPI()).submit_batches()
+        self.queue.close()
+
+        self.queue = JobQueue(self.path)
+        self.assertEqual(self.queue.recover(), 0)
+        self.assertEqual(self.queue.job_stats(job_id)[TASK_RUNNING], 2)
+        self.assertEqual(len(self.queue.due_batches(LIB, now=time.time() + 3600)), 1)
+
+    def test_falls_back_to_live_requests_without_batch_api(self):
+        job_id = self.queue.create_job('a', LIB, 'Q', 'ollama', '#a', [1, 2], use_batch=True)
+        self._executor(None).submit_batches()
+        self.assertFalse(self.queue.get_job(job_id)['use_batch'])
+        self.assertEqual([task['book_id'] for task in self.queue.claim_tasks(LIB, 10)], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the TTL model-list catalogue and conditional revalidation."""
+
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from model_catalog import (DEFAULT_TTL, PROVIDER_TTLS, STATUS_FRESH, STATUS_NOT_MODIFIED, STATUS_UPDATED,
+                           FetchResult, ModelCatalog, catalog_key)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Server:
+    """模拟支持 ETag 的模型列表端点"""
+
+    def __init__(self, models, etag='"v1"'):
+        self.models = list(models)
+        self.etag = etag
+        self.calls = []
+
+    def __call__(self, etag, last_modified):
+        self.calls.append(etag)
+        if etag == self.etag:
+            return FetchResult(None, self.etag, None)
+        return FetchResult(list(self.models), self.etag, 'Mon, 19 Oct 2026 00:00:00 GMT')
+
+
+class TestModelCatalog(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / 'catalog.json')
+        self.catalog = ModelCatalog(self.path, clock=self.clock)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fresh_entries_are_served_without_a_request(self):
+        server = _Server(['gpt-4o', 'gpt-4o-mini'])
+        key = catalog_key('openai', 'https://api.openai.com/v1', 'sk-1')
+        self.assertEqual(self.catalog.refresh(key, server), (['gpt-4o', 'gpt-4o-mini'], STATUS_UPDATED))
+        self.clock.now += DEFAULT_TTL - 1
+        self.assertEqual(self.catalog.refresh(key, server), (['gpt-4o', 'gpt-4o-mini'], STATUS_FRESH))
+        self.assertEqual(server.calls, [None])
+
+    def test_stale_entry_revalidates_with_etag(self):
+        server = _Server(['a', 'b'])
+        key = catalog_key('openrouter', '', 'sk-or')
+        self.catalog.refresh(key, server)
+        self.clock.now += PROVIDER_TTLS['openrouter'] + 1
+        self.assertFalse(self.catalog.is_fresh(key))
+
+        self.assertEqual(self.catalog.refresh(key, server), (['a', 'b'], STATUS_NOT_MODIFIED))
+        self.assertEqual(server.calls, [None, '"v1"'])
+        self.assertTrue(self.catalog.is_fresh(key))
+
+        server.models, server.etag = ['a', 'b', 'c'], '"v2"'
+        self.assertEqual(self.catalog.refresh(key, server, force=True), (['a', 'b', 'c'], STATUS_UPDATED))
+        self.assertEqual(self.catalog.get(key)['etag'], '"v2"')
+
+    def test_failed_refresh_keeps_the_cached_list(self):
+        key = catalog_key('gemini', '', 'key')
+        self.catalog.put(key, ['gemini-pro'])
+
+        def down(etag, last_modified):
+            raise RuntimeError('503')
+
+        with self.assertRaisesRegex(RuntimeError, '503'):
+            self.catalog.refresh(key, down, force=True)
+        self.assertEqual(self.catalog.models(key), ['gemini-pro'])
+
+    def test_refresh_many_runs_providers_in_parallel(self):
+        barrier = threading.Barrier(3, timeout=3)
+
+        def provider(models):
+            def fetch(etag, last_modified):
+                barrier.wait()
+                return FetchResult(models, None, None)
+            return fetch
+
+        def broken(etag, last_modified):
+            barrier.wait()
+            raise RuntimeError('401 unauthorized')
+
+        reported = []
+        results = self.catalog.refresh_many({'openai': provider(['gpt']), 'anthropic': provider(['claude']),
+                                             'grok': broken},
+                                            on_result=lambda key, ok, payload, status: reported.append(key))
+        self.assertEqual(results['openai'], (True, ['gpt'], STATUS_UPDATED))
+        self.assertEqual(results['anthropic'], (True, ['claude'], STATUS_UPDATED))
+        self.assertEqual(results['grok'], (False, '401 unauthorized', None))
+        self.assertEqual(sorted(reported), ['anthropic', 'grok', 'openai'])
+
+    def test_catalogue_persists_across_instances(self):
+        key = catalog_key('ollama', 'http://localhost:11434')
+        self.catalog.put(key, ['llama3'], etag='"x"')
+        reloaded = ModelCatalog(self.path, clock=self.clock)
+        self.assertEqual(reloaded.models(key), ['llama3'])
+        self.assertEqual(reloaded.get(key)['ttl'], PROVIDER_TTLS['ollama'])
+
+        Path(self.path).write_text(json.dumps({'version': 0, 'entries': {key: {}}}), encoding='utf-8')
+        self.assertIsNone(ModelCatalog(self.path, clock=self.clock).models(key))
+
+    def test_keys_hide_credentials_and_invalidate_per_provider(self):
+        key = catalog_key('openai', 'https://api.openai.com/v1', 'sk-secret')
+        self.assertTrue(key.startswith('openai:'))
+        self.assertNotIn('secret', key)
+        self.assertNotEqual(key, catalog_key('openai', 'https://api.openai.com/v1', 'sk-other'))
+
+        self.catalog.put(key, ['gpt'])
+        self.catalog.put(catalog_key('openrouter', '', 'sk-or'), ['x'])
+        self.catalog.invalidate_provider('openai')
+        self.assertIsNone(self.catalog.models(key))
+        self.assertEqual(self.catalog.models(catalog_key('openrouter', '', 'sk-or')), ['x'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the opt-in stage timers and per-request cProfile dumps."""
+
+from __future__ import annotations
+
+import json
+import os
+import pstats
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from profiling import (HISTOGRAM_FILE_NAME, MODE_CPROFILE, MODE_OFF, MODE_TIMERS, Profiler, StageHistogram,
+                       parse_mode)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStageHistogram(unittest.TestCase):
+    def test_log_buckets_and_percentiles(self):
+        histogram = StageHistogram()
+        for ms in (0.5, 3, 3, 3, 5000):
+            histogram.add(ms / 1000)
+        self.assertEqual(histogram.to_dict()['buckets'], {'<1': 1, '2-4': 3, '>=4096': 1})
+        self.assertEqual(histogram.percentile_ms(0.5), 4.0)
+        self.assertEqual(histogram.percentile_ms(0.95), 5000)
+        self.assertAlmostEqual(histogram.mean_ms, 5009.5 / 5)
+
+    def test_parse_mode(self):
+        self.assertEqual([parse_mode(v) for v in ('', '0', 'off', '1', 'yes', 'cprofile', 'CPROFILE')],
+                         [MODE_OFF, MODE_OFF, MODE_OFF, MODE_TIMERS, MODE_TIMERS, MODE_CPROFILE, MODE_CPROFILE])
+
+
+class TestProfiler(unittest.TestCase):
+    def test_disabled_profiler_records_nothing(self):
+        profiler = Profiler(MODE_OFF)
+        with profiler.stage('render.markdown'):
+            pass
+        with profiler.request('api.ask'):
+            pass
+        self.assertEqual(profiler.snapshot(), {})
+
+    def test_stages_are_timed_and_reported(self):
+        clock = _Clock()
+        profiler = Profiler(MODE_TIMERS, clock=clock)
+        for _ in range(3):
+            with profiler.stage('render.setHtml'):
+                clock.now += 0.02
+        with self.assertRaises(ValueError):
+            with profiler.stage('render.sanitize'):
+                clock.now += 0.001
+                raise ValueError('bad html')
+        snapshot = profiler.snapshot()
+        self.assertEqual(snapshot['render.setHtml']['count'], 3)
+        self.assertEqual(snapshot['render.setHtml']['buckets'], {'16-32': 3})
+        self.assertEqual(snapshot['render.sanitize']['count'], 1)
+        report = profiler.format_report()
+        self.assertIn('render.setHtml', report)
+        self.assertIn('16-32:3', report)
+
+    def test_request_writes_pstats_and_flush_writes_histograms(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = Profiler(MODE_CPROFILE, output_dir=tmp, max_dumps=2)
+            for _ in range(3):
+                with profiler.request('api.ask'):
+                    with profiler.request('nested'):
+                        sum(range(1000))
+            self.assertFalse(os.path.exists(os.path.join(tmp, HISTOGRAM_FILE_NAME)))
+            profiler.flush()
+            dumps = sorted(name for name in os.listdir(tmp) if name.endswith('.pstats'))
+            # 同一线程内嵌套的请求不再启用 cProfile；旧文件按上限清理
+            self.assertEqual(len(dumps), 2)
+            self.assertTrue(all('api.ask' in name for name in dumps))
+            pstats.Stats(os.path.join(tmp, dumps[-1]))
+            with open(os.path.join(tmp, HISTOGRAM_FILE_NAME), encoding='utf-8') as f:
+                stages = json.load(f)['stages']
+            self.assertEqual((stages['api.ask']['count'], stages['nested']['count']), (3, 3))
+
+    def test_decorator_uses_the_shared_profiler(self):
+        import profiling
+
+        @profiling.profiled('history.save_index')
+        def save():
+            return 'saved'
+
+        previous = profiling._profiler
+        try:
+            profiling._profiler = Profiler(MODE_OFF)
+            self.assertEqual(save(), 'saved')
+            self.assertEqual(profiling._profiler.snapshot(), {})
+            profiling._profiler.set_mode(MODE_TIMERS)
+            self.assertEqual(save(), 'saved')
+            self.assertEqual(profiling._profiler.snapshot()['history.save_index']['count'], 1)
+        finally:
+            profiling._profiler = previous
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -82,13 +82,17 @@ class TestCompactMetadata(unittest.TestCase):
         db = MagicMock()
         db.new_api.all_book_ids.return_value = book_ids
 
-        def fake_metadata(book_id, index_is_id=True):
-            mi = MagicMock()
-            mi.title = f'Book {book_id}'
-            mi.authors = ['Author']
-            return mi
+        db.new_api.has_id.side_effect = lambda book_id: True
 
-        db.get_metadata.side_effect = fake_metadata
+        def fake_field(field, ids, default_value=None):
+            if field == 'title':
+                return {book_id: f'Book {book_id}' for book_id in ids}
+            if field == 'series':
+                return {book_id: 'Saga' if book_id == 2 else None for book_id in ids}
+            return {book_id: ('Author',) for book_id in ids}
+
+        db.new_api.all_field_for.side_effect = fake_field
+        db.get_metadata.side_effect = AssertionError('per-book get_metadata should not be used')
         prefs = {}
 
         ok, count, err = utils.update_library_metadata(db, prefs)
@@ -96,6 +100,63 @@ class TestCompactMetadata(unittest.TestCase):
         self.assertEqual(count, 250)
         stored = json.loads(prefs['library_cached_metadata'])
         self.assertEqual(len(stored), 250)
+        self.assertEqual(stored[0], {'id': 1, 'title': 'Book 1', 'authors': 'Author'})
+        self.assertEqual(stored[1]['series'], 'Saga')
+        self.assertEqual(db.new_api.all_field_for.call_count, 3)
+
+
+class TestDictionaryFormat(unittest.TestCase):
+    def _books(self):
+        books = _make_books(40)
+        for book in books[:10]:
+            book['series'] = 'Long Running Saga'
+        books.append({'id': 99, 'title': 'Solo', 'authors': 'Lone Writer', 'series': 'One-off'})
+        return books
+
+    def test_groups_authors_and_codes_repeated_series(self):
+        text = utils.format_books_compact(self._books(), utils.LIBRARY_FORMAT_DICTIONARY)
+        self.assertIn(utils.DICTIONARY_FORMAT_INSTRUCTIONS, text)
+        self.assertEqual(text.count('@Author 3\n'), 1)
+        self.assertEqual(text.count('Long Running Saga'), 1)
+        self.assertIn('s1=Long Running Saga', text)
+        self.assertIn('99|Solo|One-off', text)
+        books_section = text.split('BOOKS\n', 1)[1]
+        self.assertEqual(len([line for line in books_section.splitlines() if line[0].isdigit()]), 41)
+
+    def test_dictionary_is_smaller_than_tsv(self):
+        books = _make_books(2000)
+        tsv = utils.format_books_compact(books)
+        encoded = utils.format_books_compact(books, utils.LIBRARY_FORMAT_DICTIONARY)
+        self.assertLess(len(encoded), len(tsv))
+
+    def test_truncation_keeps_definitions_for_included_rows_only(self):
+        budget = prompt_limits.PromptBudget(900)
+        text, included = utils.fit_books_compact(
+            self._books(), budget, 'Question', utils.LIBRARY_FORMAT_DICTIONARY)
+        self.assertLess(included, 41)
+        self.assertLessEqual(len(text) + len('Question'), 900)
+        for line in text.split('SERIES\n', 1)[-1].split('\n\n', 1)[0].splitlines():
+            code = line.split('=', 1)[0]
+            self.assertIn(f'|{code}', text)
+
+    def test_truncation_keeps_the_highest_ranked_books(self):
+        # 排名靠前的书作者排序靠后，按作者排序后再截断会先丢掉它们
+        ranked = [{'id': i, 'title': f'Book {i}', 'authors': f'Writer {chr(ord("Z") - i % 26)}'}
+                  for i in range(1, 201)]
+        text, included = utils.fit_books_compact(
+            ranked, prompt_limits.PromptBudget(2000), 'Question', utils.LIBRARY_FORMAT_DICTIONARY)
+        self.assertLess(included, 200)
+        ids = {int(line.split('|', 1)[0]) for line in text.split('BOOKS\n', 1)[1].splitlines() if '|' in line}
+        self.assertEqual(ids, set(range(1, included + 1)))
+
+    def test_build_library_prompt_uses_configured_format(self):
+        prefs = {
+            'library_cached_metadata': json.dumps(_make_books(500), ensure_ascii=False),
+            'library_prompt_format': utils.LIBRARY_FORMAT_DICTIONARY,
+        }
+        prompt = utils.build_library_prompt('Find Python books', prefs)
+        self.assertIn('@Author 0', prompt)
+        self.assertIn('calibre://book/ID', prompt)
 
 
 class TestPromptLimits(unittest.TestCase):
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for provider batch endpoints against a local stand-in HTTP server."""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import unittest
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+VENDOR = ROOT / 'lib' / 'ask_ai_plugin_vendor'
+if str(VENDOR) not in sys.path:
+    sys.path.insert(0, str(VENDOR))
+
+import requests
+
+from provider_batch import (AnthropicBatchAPI, OpenAIBatchAPI, BATCH_ENDED, BATCH_RUNNING,
+                            book_id_from_custom_id, custom_id_for, poll_delay)
+
+
+class _FakeProvider:
+    """同时模拟 OpenAI 与 Anthropic 批量接口；每次查询状态推进一步，第二次查询时结束"""
+
+    def __init__(self):
+        self.files = {}
+        self.batches = {}
+        self.requests_seen = []
+        self.base_url = ''
+
+    @staticmethod
+    def answer(prompt):
+        return f'answer to {prompt}'
+
+
+def _make_handler(provider):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, content_type='application/json'):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length)
+
+        def do_POST(self):
+            provider.requests_seen.append(('POST', self.path, dict(self.headers)))
+            if self.path == '/v1/files':
+                head = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('ascii')
+                message = BytesParser(policy=HTTP).parsebytes(head + self._body())
+                fields = {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+                          for part in message.iter_parts()}
+                file_id = f'file-{len(provider.files) + 1}'
+                provider.files[file_id] = fields['file']
+                return self._send(200, {'id': file_id, 'purpose': fields['purpose'].decode('utf-8')})
+            if self.path == '/v1/batches':
+                payload = json.loads(self._body())
+                batch_id = f'batch_{len(provider.batches) + 1}'
+                lines = provider.files[payload['input_file_id']].decode('utf-8').splitlines()
+                provider.batches[batch_id] = {'kind': 'openai', 'polls': 0,
+                                              'requests': [json.loads(line) for line in lines if line]}
+                return self._send(200, {'id': batch_id, 'status': 'validating'})
+            if self.path == '/anthropic/messages/batches':
+                payload = json.loads(self._body())
+                batch_id = f'msgbatch_{len(provider.batches) + 1}'
+                provider.batches[batch_id] = {'kind': 'anthropic', 'polls': 0, 'requests': payload['requests']}
+                return self._send(200, {'id': batch_id, 'processing_status': 'in_progress'})
+            self._send(404, {'error': {'message': 'not found'}})
+
+        def do_GET(self):
+            provider.requests_seen.append(('GET', self.path, dict(self.headers)))
+            parts = self.path.strip('/').split('/')
+            if parts[:2] == ['v1', 'batches']:
+                batch = provider.batches[parts[2]]
+                batch['polls'] += 1
+                ended = batch['polls'] >= 2
+                total = len(batch['requests'])
+                return self._send(200, {
+                    'id': parts[2], 'status': 'completed' if ended else 'in_progress',
+                    'output_file_id': f'out-{parts[2]}' if ended else None,
+                    'error_file_id': f'err-{parts[2]}' if ended else None,
+                    'request_counts': {'total': total, 'completed': total - 1 if ended else 0,
+                                       'failed': 1 if ended else 0},
+                })
+            if parts[:2] == ['v1', 'files'] and parts[3] == 'content':
+                file_id = parts[2]
+                batch = provider.batches[file_id.split('-', 1)[1]]
+                # 最后一条请求放进错误文件
+                rows = batch['requests'][:-1] if file_id.startswith('out-') else batch['requests'][-1:]
+                lines = []
+                for row in rows:
+                    if file_id.startswith('out-'):
+                        content = provider.answer(row['body']['messages'][-1]['content'])
+                        response = {'status_code': 200, 'body': {'choices': [{'message': {'content': content}}]}}
+                    else:
+                        response = {'status_code': 500, 'body': {'error': {'message': 'server error'}}}
+                    lines.append(json.dumps({'custom_id': row['custom_id'], 'response': response, 'error': None}))
+                return self._send(200, ('\n'.join(lines) + '\n').encode('utf-8'), 'application/jsonl')
+            if parts[:3] == ['anthropic', 'messages', 'batches'] and len(parts) == 4:
+                batch = provider.batches[parts[3]]
+                batch['polls'] += 1
+                ended = batch['polls'] >= 2
+                total = len(batch['requests'])
+                return self._send(200, {
+                    'id': parts[3], 'processing_status': 'ended' if ended else 'in_progress',
+                    'results_url': f'{provider.base_url}/anthropic/results/{parts[3]}' if ended else None,
+                    'request_counts': {'processing': 0 if ended else total,
+                                       'succeeded': total - 1 if ended else 0,
+                                       'errored': 1 if ended else 0, 'canceled': 0, 'expired': 0},
+                })
+            if parts[:2] == ['anthropic', 'results']:
+                batch = provider.batches[parts[2]]
+                lines = []
+                for index, row in enumerate(batch['requests']):
+                    if index == len(batch['requests']) - 1:
+                        result = {'type': 'errored', 'error': {'type': 'error',
+                                                               'error': {'type': 'overloaded_error',
+                                                                         'message': 'Overloaded'}}}
+                    else:
+                        text = provider.answer(row['params']['messages'][-1]['content'])
+                        result = {'type': 'succeeded',
+                                  'message': {'content': [{'type': 'text', 'text': text}]}}
+                    lines.append(json.dumps({'custom_id': row['custom_id'], 'result': result}))
+                return self._send(200, ('\n'.join(lines) + '\n').encode('utf-8'), 'application/jsonl')
+            self._send(404, {'error': {'message': 'not found'}})
+
+    return Handler
+
+
+def _body(prompt):
+    return {'model': 'm', 'messages': [{'role': 'user', 'content': prompt}], 'stream': False}
+
+
+class _ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.provider = _FakeProvider()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self.provider))
+        self.provider.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        self.http = requests.Session()
+
+    def tearDown(self):
+        self.http.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _run(self, api, prompts):
+        # 与 JobExecutor 相同的顺序：提交、轮询到结束、流式读取结果
+        items = [(custom_id_for(book_id), prompt) for book_id, prompt in prompts.items()]
+        batch_id = api.submit(items)
+        statuses = [api.status(batch_id)]
+        while statuses[-1]['state'] == BATCH_RUNNING and len(statuses) < 10:
+            statuses.append(api.status(batch_id))
+        results = {cid: (text, error) for cid, text, error in api.iter_results(batch_id)}
+        missing = {cid for cid, _ in items} - set(results)
+        return batch_id, missing, results, statuses
+
+
+class TestOpenAIBatchAPI(_ServerTestCase):
+    def test_submit_poll_and_stream_results(self):
+        api = OpenAIBatchAPI(f'{self.provider.base_url}/v1',
+                             {'Authorization': 'Bearer k', 'Content-Type': 'application/json'}, _body, self.http)
+        batch_id, missing, results, statuses = self._run(api, {1: 'Dune', 2: 'Emma', 3: 'Ulysses'})
+
+        self.assertEqual(missing, set())
+        self.assertEqual([status['state'] for status in statuses], [BATCH_RUNNING, BATCH_ENDED])
+        self.assertEqual(results['book-1'], ('answer to Dune', None))
+        self.assertEqual(results['book-2'], ('answer to Emma', None))
+        self.assertEqual(results['book-3'], (None, 'server error'))
+
+        submitted = self.provider.batches[batch_id]['requests']
+        self.assertEqual(submitted[0]['url'], '/v1/chat/completions')
+        self.assertEqual(submitted[0]['body']['messages'][0]['content'], 'Dune')
+        upload = next(headers for method, path, headers in self.provider.requests_seen if path == '/v1/files')
+        self.assertTrue(upload['Content-Type'].startswith('multipart/form-data'))
+        self.assertEqual(upload['Authorization'], 'Bearer k')
+
+
+class TestAnthropicBatchAPI(_ServerTestCase):
+    def test_submit_poll_and_stream_results(self):
+        api = AnthropicBatchAPI(f'{self.provider.base_url}/anthropic',
+                                {'x-api-key': 'k', 'Content-Type': 'application/json'}, _body, self.http)
+        batch_id, missing, results, statuses = self._run(api, {7: 'Dune', 8: 'Emma'})
+
+        self.assertEqual(missing, set())
+        self.assertEqual(statuses[-1], {'state': BATCH_ENDED, 'total': 2, 'completed': 1, 'failed': 1})
+        self.assertEqual(results['book-7'], ('answer to Dune', None))
+        self.assertEqual(results['book-8'], (None, 'Overloaded'))
+        # 批量请求中不允许 stream 参数
+        self.assertNotIn('stream', self.provider.batches[batch_id]['requests'][0]['params'])
+
+
+class TestHelpers(unittest.TestCase):
+    def test_custom_id_round_trip(self):
+        self.assertEqual(book_id_from_custom_id(custom_id_for(42)), 42)
+        self.assertIsNone(book_id_from_custom_id('other-1'))
+
+    def test_poll_delay_grows_and_is_capped(self):
+        self.assertLess(poll_delay(0), poll_delay(3))
+        self.assertEqual(poll_delay(100, maximum=600), 600)
+
+
+if __name__ == '__main__':
+    unittest.main()
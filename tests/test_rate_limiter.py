@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the per-provider token-bucket rate limiter and admission queue."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from rate_limiter import (PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimitCancelled, RateLimiter,
+                          get_limiter, limiter_key, limiter_snapshots, reset_limiters)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _wait_until(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+
+    def _acquire_in_thread(self, limiter, results, name, **kwargs):
+        def run():
+            try:
+                permit = limiter.acquire(**kwargs)
+            except RateLimitCancelled:
+                results.append((name, 'cancelled'))
+                return
+            results.append(name)
+            permit.release()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def test_requests_per_minute_bucket_queues_the_excess(self):
+        limiter = RateLimiter('openai', rpm=2, clock=self.clock)
+        limiter.acquire().release()
+        limiter.acquire().release()
+
+        statuses = []
+        results = []
+        thread = self._acquire_in_thread(limiter, results, 'third', on_wait=statuses.append)
+        self.assertTrue(_wait_until(lambda: statuses))
+        self.assertEqual(results, [])
+        self.assertAlmostEqual(statuses[0]['retry_in'], 30.0)
+        self.assertEqual(limiter.snapshot()['queued'], 1)
+
+        self.clock.now += 30
+        thread.join(3)
+        self.assertEqual(results, ['third'])
+        self.assertEqual(limiter.snapshot()['admitted'], 3)
+
+    def test_concurrency_limit_admits_on_release(self):
+        limiter = RateLimiter('anthropic', max_concurrent=1, clock=self.clock)
+        held = limiter.acquire()
+        results = []
+        thread = self._acquire_in_thread(limiter, results, 'second')
+        self.assertTrue(_wait_until(lambda: limiter.snapshot()['queued'] == 1))
+        self.assertEqual(limiter.snapshot()['in_flight'], 1)
+
+        self.clock.now += 4
+        held.release()
+        thread.join(3)
+        self.assertEqual(results, ['second'])
+        self.assertAlmostEqual(limiter.snapshot()['max_wait'], 4.0)
+
+    def test_interactive_requests_go_ahead_of_background_work(self):
+        limiter = RateLimiter('openai', max_concurrent=1, clock=self.clock)
+        held = limiter.acquire()
+        order = []
+        threads = [self._acquire_in_thread(limiter, order, 'job-1', priority=PRIORITY_BACKGROUND)]
+        self.assertTrue(_wait_until(lambda: limiter.snapshot()['queued'] == 1))
+        threads.append(self._acquire_in_thread(limiter, order, 'job-2', priority=PRIORITY_BACKGROUND))
+        self.assertTrue(_wait_until(lambda: limiter.snapshot()['queued'] == 2))
+        threads.append(self._acquire_in_thread(limiter, order, 'panel', priority=PRIORITY_INTERACTIVE))
+        self.assertTrue(_wait_until(lambda: limiter.snapshot()['queued'] == 3))
+        self.assertEqual(limiter.snapshot()['queued_background'], 2)
+
+        held.release()
+        for thread in threads:
+            thread.join(3)
+        self.assertEqual(order, ['panel', 'job-1', 'job-2'])
+
+    def test_rate_limit_response_pauses_admission(self):
+        limiter = RateLimiter('openai', clock=self.clock)
+        limiter.pause(12)
+        statuses = []
+        results = []
+        thread = self._acquire_in_thread(limiter, results, 'after-429', on_wait=statuses.append)
+        self.assertTrue(_wait_until(lambda: statuses))
+        self.assertAlmostEqual(statuses[0]['retry_in'], 12.0)
+        self.clock.now += 12
+        thread.join(3)
+        self.assertEqual(results, ['after-429'])
+
+    def test_cancel_while_queued(self):
+        limiter = RateLimiter('openai', max_concurrent=1, clock=self.clock)
+        held = limiter.acquire()
+        cancel_event = threading.Event()
+        results = []
+        thread = self._acquire_in_thread(limiter, results, 'hedge', cancel_event=cancel_event)
+        self.assertTrue(_wait_until(lambda: limiter.snapshot()['queued'] == 1))
+        cancel_event.set()
+        thread.join(3)
+        self.assertEqual(results, [('hedge', 'cancelled')])
+        self.assertEqual(limiter.snapshot()['queued'], 0)
+        held.release()
+
+    def test_token_budget_is_corrected_by_actual_usage(self):
+        limiter = RateLimiter('openai', tpm=1000, clock=self.clock)
+        limiter.acquire(tokens=800).release(actual_tokens=100)
+        statuses = []
+        limiter.acquire(tokens=800, on_wait=statuses.append).release()
+        self.assertEqual(statuses, [])
+        # 超过整个桶容量的请求在桶满时放行，而不是永远等待
+        self.clock.now += 60
+        limiter.acquire(tokens=5000).release()
+
+
+class TestRegistry(unittest.TestCase):
+    def tearDown(self):
+        reset_limiters()
+
+    def test_limiters_are_shared_per_provider_and_key(self):
+        key = limiter_key('openai', 'sk-secret')
+        self.assertTrue(key.startswith('openai:'))
+        self.assertNotIn('secret', key)
+        self.assertNotEqual(key, limiter_key('openai', 'sk-other'))
+
+        limiter = get_limiter(key, rpm=60)
+        self.assertIs(get_limiter(key, rpm=30), limiter)
+        self.assertEqual(limiter.rpm, 30)
+        self.assertEqual(limiter_snapshots()[key]['limits'], {'rpm': 30, 'tpm': 0, 'max_concurrent': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
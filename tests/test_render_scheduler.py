@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the dialog-level frame render scheduler core."""
+
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import render_scheduler
+from render_scheduler import (
+    FrameScheduler,
+    PRIORITY_BACKGROUND,
+    PRIORITY_FOCUSED,
+    PRIORITY_VISIBLE,
+)
+
+
+class _Clock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestFrameScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.scheduler = FrameScheduler(frame_budget_ms=20, clock=self.clock)
+
+    def test_focused_panel_rendered_first(self):
+        self.scheduler.register('a', PRIORITY_VISIBLE)
+        self.scheduler.register('b', PRIORITY_FOCUSED)
+        self.scheduler.request('a')
+        self.scheduler.request('b')
+        self.assertEqual(self.scheduler.plan()[0], 'b')
+
+    def test_budget_defers_expensive_panels(self):
+        for key in ('a', 'b', 'c'):
+            self.scheduler.register(key, PRIORITY_VISIBLE)
+            self.scheduler.record(key, 0.015)
+        for key in ('a', 'b', 'c'):
+            self.scheduler.request(key)
+        first = self.scheduler.plan()
+        self.assertEqual(len(first), 1)
+        self.clock.now += 0.05
+        second = self.scheduler.plan()
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first, second)
+        self.assertTrue(self.scheduler.has_pending())
+
+    def test_cheap_panels_share_one_frame(self):
+        for key in ('a', 'b'):
+            self.scheduler.register(key)
+            self.scheduler.record(key, 0.002)
+            self.scheduler.request(key)
+        self.assertEqual(sorted(self.scheduler.plan()), ['a', 'b'])
+        self.assertFalse(self.scheduler.has_pending())
+
+    def test_background_panel_is_rate_limited(self):
+        self.scheduler.register('bg', PRIORITY_BACKGROUND)
+        self.scheduler.record('bg', 0.001)
+        self.scheduler.request('bg')
+        self.assertEqual(self.scheduler.plan(), [])
+        self.clock.now += render_scheduler.BACKGROUND_MIN_INTERVAL
+        self.assertEqual(self.scheduler.plan(), ['bg'])
+
+    def test_starving_panel_ignores_budget(self):
+        self.scheduler.register('a', PRIORITY_FOCUSED)
+        self.scheduler.register('b', PRIORITY_VISIBLE)
+        for key in ('a', 'b'):
+            self.scheduler.record(key, 0.05)
+        self.scheduler.request('b')
+        self.scheduler.request('a')
+        self.assertEqual(self.scheduler.plan(), ['a'])
+        self.clock.now += render_scheduler.MAX_STARVATION
+        self.scheduler.request('a')
+        self.assertEqual(self.scheduler.plan(), ['a', 'b'])
+
+    def test_cancel_drops_pending_request(self):
+        self.scheduler.request('a')
+        self.scheduler.cancel('a')
+        self.assertEqual(self.scheduler.plan(), [])
+
+    def test_stats_report_panels_and_frames(self):
+        self.scheduler.request('a')
+        self.scheduler.plan()
+        self.scheduler.record('a', 0.004)
+        self.scheduler.record_frame(0.005)
+        stats = self.scheduler.stats()
+        self.assertEqual(stats['frames'], 1)
+        self.assertEqual(stats['panels']['a']['renders'], 1)
+        self.assertAlmostEqual(stats['avg_frame_ms'], 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
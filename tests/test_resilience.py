@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the shared retry policy and per-provider circuit breaker."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+VENDOR = ROOT / 'lib' / 'ask_ai_plugin_vendor'
+if str(VENDOR) not in sys.path:
+    sys.path.insert(0, str(VENDOR))
+
+import requests
+
+from resilience import (CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, CircuitBreaker, CircuitOpenError,
+                        CombinedEvent, backoff_delay, call_with_retry, classify_error, parse_duration, parse_retry_after)
+
+NOW = 1_700_000_000.0
+
+
+def _http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.exceptions.HTTPError(f'HTTP {status}', response=response)
+
+
+def _wrapped(error):
+    # 模型实现把 requests 异常包装成普通 Exception 抛出
+    try:
+        raise error
+    except Exception as e:
+        try:
+            raise Exception(f'API request failed: {e}') from e
+        except Exception as wrapped:
+            return wrapped
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_seconds_date_and_milliseconds(self):
+        self.assertEqual(parse_retry_after({'Retry-After': '7'}, now=NOW), 7.0)
+        self.assertEqual(parse_retry_after({'retry-after-ms': '1500', 'Retry-After': '9'}, now=NOW), 1.5)
+        self.assertAlmostEqual(parse_retry_after({'Retry-After': 'Tue, 14 Nov 2023 22:13:40 GMT'}, now=NOW), 20.0)
+        self.assertIsNone(parse_retry_after({'Content-Type': 'application/json'}, now=NOW))
+
+    def test_rate_limit_reset_headers(self):
+        headers = {
+            'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': '6m0s',
+            'x-ratelimit-remaining-tokens': '500', 'x-ratelimit-reset-tokens': '1h',
+        }
+        self.assertEqual(parse_retry_after(headers, now=NOW), 360.0)
+        headers = {'anthropic-ratelimit-tokens-remaining': '0',
+                   'anthropic-ratelimit-tokens-reset': '2023-11-14T22:13:50Z'}
+        self.assertAlmostEqual(parse_retry_after(headers, now=NOW), 30.0)
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration('250ms'), 0.25)
+        self.assertEqual(parse_duration('1m30.5s'), 90.5)
+        self.assertIsNone(parse_duration('soon'))
+
+
+class TestClassifyError(unittest.TestCase):
+    def test_status_codes_through_wrapped_exceptions(self):
+        self.assertEqual(classify_error(_wrapped(_http_error(429, {'Retry-After': '3'}))), (True, 3.0, 429))
+        self.assertEqual(classify_error(_wrapped(_http_error(503))), (True, None, 503))
+        self.assertEqual(classify_error(_wrapped(_http_error(401))), (False, None, 401))
+
+    def test_connection_errors_and_unrelated_errors(self):
+        self.assertTrue(classify_error(_wrapped(requests.exceptions.ConnectTimeout('slow')))[0])
+        self.assertTrue(classify_error(requests.exceptions.ChunkedEncodingError('cut'))[0])
+        self.assertFalse(classify_error(ValueError('bad config'))[0])
+
+    def test_backoff_has_jitter_and_cap(self):
+        self.assertEqual(backoff_delay(3, base=1, cap=30, rng=lambda: 1.0), 8.0)
+        self.assertEqual(backoff_delay(10, base=1, cap=30, rng=lambda: 1.0), 30.0)
+        self.assertEqual(backoff_delay(3, base=1, cap=30, rng=lambda: 0.0), 0.0)
+
+
+class TestCallWithRetry(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+
+    def _call(self, errors, **kwargs):
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if errors:
+                raise errors.pop(0)
+            return 'ok'
+
+        kwargs.setdefault('sleep', self.sleeps.append)
+        return calls, lambda: call_with_retry(fn, **kwargs)
+
+    def test_retries_transient_errors_honouring_retry_after(self):
+        calls, run = self._call([_wrapped(_http_error(429, {'Retry-After': '2'})), _wrapped(_http_error(502))],
+                                base_delay=0.5, max_delay=0.5)
+        self.assertEqual(run(), 'ok')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.sleeps[0], 2.0)
+        self.assertLessEqual(self.sleeps[1], 0.5)
+
+    def test_fatal_errors_are_not_retried(self):
+        calls, run = self._call([_wrapped(_http_error(400))])
+        self.assertRaises(Exception, run)
+        self.assertEqual(len(calls), 1)
+
+    def test_no_replay_after_partial_output(self):
+        calls, run = self._call([_wrapped(requests.exceptions.ReadTimeout('stalled'))],
+                                is_replay_safe=lambda: False)
+        self.assertRaises(Exception, run)
+        self.assertEqual(len(calls), 1)
+
+    def test_long_retry_after_fails_immediately(self):
+        calls, run = self._call([_wrapped(_http_error(429, {'Retry-After': '3600'}))])
+        self.assertRaises(Exception, run)
+        self.assertEqual((len(calls), self.sleeps), (1, []))
+
+    def test_cancel_during_backoff_stops_retrying(self):
+        cancel_event = threading.Event()
+
+        def sleep(delay):
+            self.sleeps.append(delay)
+            cancel_event.set()
+
+        calls, run = self._call([_wrapped(_http_error(503))], sleep=sleep,
+                                is_replay_safe=lambda: not cancel_event.is_set())
+        self.assertRaises(Exception, run)
+        self.assertEqual((len(calls), len(self.sleeps)), (1, 1))
+
+    def test_retries_stop_at_the_elapsed_limit(self):
+        clock = _Clock()
+        errors = [_wrapped(requests.exceptions.ReadTimeout('stalled')) for _ in range(3)]
+
+        def fn():
+            clock.now += 30  # 每次尝试都等到读取超时
+            raise errors.pop(0)
+
+        with self.assertRaises(Exception):
+            call_with_retry(fn, max_attempts=3, sleep=self.sleeps.append, max_elapsed=60, clock=clock,
+                            base_delay=1, max_delay=1)
+        # 第二次失败时已用满 60 秒，不再重试
+        self.assertEqual((len(errors), len(self.sleeps)), (1, 1))
+
+    def test_combined_event_is_set_by_any_event(self):
+        first, second = threading.Event(), threading.Event()
+        combined = CombinedEvent(first, None, second)
+        self.assertFalse(combined.is_set())
+        self.assertFalse(combined.wait(0.01))
+        second.set()
+        self.assertTrue(combined.is_set())
+        self.assertTrue(combined.wait(5))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_fails_fast_then_probes(self):
+        clock = _Clock()
+        breaker = CircuitBreaker('openai', failure_threshold=2, reset_timeout=10, clock=clock)
+        failing = lambda: (_ for _ in ()).throw(_wrapped(_http_error(503)))
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                call_with_retry(failing, breaker=breaker, max_attempts=1)
+        self.assertEqual(breaker.state, CIRCUIT_OPEN)
+
+        calls = []
+        with self.assertRaises(CircuitOpenError) as context:
+            call_with_retry(lambda: calls.append(1), breaker=breaker)
+        self.assertEqual(calls, [])
+        self.assertAlmostEqual(context.exception.retry_in, 10)
+
+        # 冷却结束：只放行一个探测请求
+        clock.now = 11
+        breaker.before_call()
+        self.assertEqual(breaker.state, CIRCUIT_HALF_OPEN)
+        self.assertRaises(CircuitOpenError, breaker.before_call)
+        breaker.record_failure()
+        self.assertEqual(breaker.snapshot()['retry_in'], 20)
+
+        clock.now = 40
+        self.assertEqual(call_with_retry(lambda: 'ok', breaker=breaker), 'ok')
+        self.assertEqual((breaker.state, breaker.failures), (CIRCUIT_CLOSED, 0))
+
+    def test_client_errors_do_not_trip_the_breaker(self):
+        breaker = CircuitBreaker('openai', failure_threshold=1)
+        with self.assertRaises(Exception):
+            call_with_retry(lambda: (_ for _ in ()).throw(_wrapped(_http_error(401))), breaker=breaker)
+        self.assertEqual(breaker.state, CIRCUIT_CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
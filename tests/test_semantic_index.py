@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the local embedding index used by semantic AI Search."""
+
+from __future__ import annotations
+
+import gc
+import sys
+import tempfile
+import unittest
+import warnings
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import semantic_index
+from book_metadata import BookRecord
+from semantic_index import SemanticIndex, build_book_document, rank_books
+
+_VOCABULARY = ('python', 'space', 'cooking', 'history', 'poetry', 'robot')
+
+
+def fake_embed(texts):
+    """Bag-of-words over a tiny vocabulary; enough for deterministic ranking."""
+    vectors = []
+    for text in texts:
+        lower = text.lower()
+        vectors.append([float(lower.count(word)) + 0.01 for word in _VOCABULARY])
+    return vectors
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        return fake_embed(texts)
+
+
+DOCUMENTS = {
+    1: 'Learning Python by Mark Lutz\nTags: python, programming',
+    2: 'The Martian by Andy Weir\nTags: space, robot',
+    3: 'Salt Fat Acid Heat\nTags: cooking',
+    4: 'SPQR by Mary Beard\nTags: history',
+}
+
+
+class TestSemanticIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_search_ranks_by_similarity(self):
+        index = SemanticIndex(self.base_dir)
+        index.update(DOCUMENTS, fake_embed, model='fake')
+        results = index.search(fake_embed(['books about space robots'])[0], k=2)
+        self.assertEqual(results[0][0], 2)
+        self.assertEqual(len(results), 2)
+        self.assertGreaterEqual(results[0][1], results[1][1])
+
+    def test_update_only_embeds_changed_books(self):
+        index = SemanticIndex(self.base_dir)
+        embedder = CountingEmbedder()
+        self.assertEqual(index.update(DOCUMENTS, embedder, model='fake'), 4)
+        self.assertEqual(index.update(DOCUMENTS, embedder, model='fake'), 0)
+
+        changed = dict(DOCUMENTS)
+        changed[3] = 'Salt Fat Acid Heat\nTags: cooking, history'
+        self.assertEqual(index.update(changed, embedder, model='fake'), 1)
+        self.assertEqual(embedder.texts, 5)
+
+    def test_removed_books_free_their_rows(self):
+        index = SemanticIndex(self.base_dir)
+        index.update(DOCUMENTS, fake_embed, model='fake')
+        remaining = {k: v for k, v in DOCUMENTS.items() if k != 2}
+        index.update(remaining, fake_embed, model='fake')
+        self.assertEqual(len(index), 3)
+        self.assertNotIn(2, [book_id for book_id, _ in index.search(fake_embed(['space'])[0], k=10)])
+
+        remaining[5] = 'Rocket science for space robots'
+        index.update(remaining, fake_embed, model='fake')
+        # 新书复用被删除书籍的行，矩阵不增长
+        self.assertEqual(index.row_count, 4)
+        self.assertEqual(index.search(fake_embed(['space robot'])[0], k=1)[0][0], 5)
+
+    def test_index_persists_across_instances(self):
+        SemanticIndex(self.base_dir).update(DOCUMENTS, fake_embed, model='fake')
+        reloaded = SemanticIndex(self.base_dir)
+        self.assertEqual(len(reloaded), 4)
+        self.assertEqual(reloaded.search(fake_embed(['python'])[0], k=1)[0][0], 1)
+        embedder = CountingEmbedder()
+        self.assertEqual(reloaded.update(DOCUMENTS, embedder, model='fake'), 0)
+
+    def test_model_change_rebuilds_index(self):
+        index = SemanticIndex(self.base_dir)
+        index.update(DOCUMENTS, fake_embed, model='fake')
+        embedder = CountingEmbedder()
+        self.assertEqual(index.update(DOCUMENTS, embedder, model='other'), 4)
+        self.assertEqual(index.model, 'other')
+
+    def test_pure_python_search_matches_numpy_path(self):
+        index = SemanticIndex(self.base_dir)
+        index.update(DOCUMENTS, fake_embed, model='fake')
+        query = fake_embed(['history of cooking'])[0]
+        with mock.patch.object(semantic_index, 'numpy', None):
+            expected = index.search(query, k=4)
+        self.assertEqual([book_id for book_id, _ in index.search(query, k=4)],
+                         [book_id for book_id, _ in expected])
+
+    def test_pure_python_search_closes_the_vector_file(self):
+        index = SemanticIndex(self.base_dir)
+        index.update(DOCUMENTS, fake_embed, model='fake')
+        query = fake_embed(['space robot'])[0]
+        with mock.patch.object(semantic_index, 'numpy', None), warnings.catch_warnings():
+            warnings.simplefilter('error', ResourceWarning)
+            self.assertEqual(index.search(query, k=1)[0][0], 2)
+            gc.collect()
+        # 检索之间可以改写向量文件
+        index.update({**DOCUMENTS, 5: 'Robots in space\nTags: robot, space'}, fake_embed, model='fake')
+        self.assertEqual(len(index), 5)
+
+    def test_rank_books_requires_ready_index(self):
+        index = SemanticIndex(self.base_dir)
+        books = [{'id': book_id, 'title': text.split('\n')[0], 'authors': ''} for book_id, text in DOCUMENTS.items()]
+        prefs = {'ai_search_semantic_enabled': True, 'ai_search_semantic_top_k': 2}
+        self.assertIsNone(rank_books('space', books, prefs, index=index, embed_fn=fake_embed))
+
+        index.update(DOCUMENTS, fake_embed, model='fake')
+        ranked = rank_books('space robot', books, prefs, index=index, embed_fn=fake_embed)
+        self.assertEqual(len(ranked), 2)
+        self.assertEqual(ranked[0]['id'], 2)
+        self.assertIsNone(rank_books('space', books, {}, index=index, embed_fn=fake_embed))
+
+
+class TestBookDocument(unittest.TestCase):
+    def test_document_includes_tags_and_plain_comments(self):
+        record = BookRecord(7, title='Dune', authors=['Frank Herbert'], tags=['sci-fi'],
+                            comments='<p>Desert   <b>planet</b></p>' + 'x' * 5000)
+        text = build_book_document(record)
+        self.assertTrue(text.startswith('Dune by Frank Herbert'))
+        self.assertIn('Tags: sci-fi', text)
+        self.assertIn('Desert planet', text)
+        self.assertNotIn('<', text)
+        self.assertLess(len(text), semantic_index.MAX_COMMENT_CHARS + 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
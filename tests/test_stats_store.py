@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the usage statistics aggregate store."""
+
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from stats_store import StatsStore, period_keys, provider_from_ai_id
+
+
+class TestStatsStore(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self._tmp.name) / 'stats.json')
+        self.store = StatsStore(self.path, flush_delay=60)
+
+    def tearDown(self):
+        self.store.flush()
+        self._tmp.cleanup()
+
+    def test_period_keys_use_iso_week(self):
+        self.assertEqual(period_keys(datetime(2021, 1, 3)), ('2021-01-03', '2020-W53', '2021-01'))
+
+    def test_provider_from_ai_id(self):
+        self.assertEqual(provider_from_ai_id('openai_2'), 'openai')
+        self.assertEqual(provider_from_ai_id('grok'), 'grok')
+        self.assertEqual(provider_from_ai_id(None), 'unknown')
+
+    def test_record_updates_all_buckets(self):
+        when = datetime(2024, 5, 6, 10, 0)
+        self.store.record(ai_id='grok', mode='single', book_ids=[1], when=when)
+        self.store.record(ai_id='openai_2', mode='multi', book_ids=[1, 2], when=when)
+        self.assertEqual(self.store.total, 2)
+        self.assertEqual(self.store.first_date, '2024-05-06')
+        self.assertEqual(self.store.day_total('2024-05-06'), 2)
+        monday = datetime(2024, 5, 6)
+        self.assertEqual(self.store.week_totals(monday), [2, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(self.store.month_totals(2024, 5, 31)[6], 2)
+
+    def test_breakdown_sorted_by_count(self):
+        when = datetime(2024, 5, 6)
+        for ai_id in ('grok', 'openai', 'openai_2'):
+            self.store.record(ai_id=ai_id, mode='single', book_ids=[7], when=when)
+        self.assertEqual(
+            self.store.breakdown('provider', key='2024-05'),
+            [('openai', 2), ('grok', 1)])
+        self.assertEqual(self.store.breakdown('book', key='2024-05', limit=1), [('7', 3)])
+        self.assertEqual(self.store.breakdown('mode', 'weeks', key='2024-W19'), [('single', 3)])
+        with self.assertRaises(ValueError):
+            self.store.breakdown('colour')
+
+    def test_merge_daily_totals_keeps_larger_count(self):
+        self.store.record(ai_id='grok', when=datetime(2024, 5, 6))
+        self.store.merge_daily_totals({'2024-05-06': 3, '2024-04-01': 2, 'bad': 9})
+        self.assertEqual(self.store.day_total('2024-05-06'), 3)
+        self.assertEqual(self.store.day_total('2024-04-01'), 2)
+        self.assertEqual(self.store.total, 5)
+        self.assertEqual(self.store.first_date, '2024-04-01')
+
+    def test_rebuild_from_history_counts_each_answer(self):
+        self.store.record(ai_id='stale', when=datetime(2020, 1, 1))
+        entries = [
+            {'timestamp': '2024-05-06 10:00:00', 'mode': 'multi',
+             'books': [{'id': 1}, {'id': 2}], 'ai_ids': ['grok', 'openai']},
+            {'timestamp': '2024-05-07 10:00:00', 'mode': 'ai_search',
+             'books': [{'id': 'ai_search'}], 'ai_ids': []},
+            {'timestamp': 'broken'},
+        ]
+        self.store.rebuild_from_history(entries)
+        self.assertEqual(self.store.total, 3)
+        self.assertEqual(self.store.day_total('2020-01-01'), 0)
+        self.assertEqual(self.store.breakdown('book', key='2024-05'), [('1', 2), ('2', 2)])
+        self.assertEqual(self.store.breakdown('ai', key='2024-05')[0], ('default', 1))
+
+    def test_answers_recorded_during_rebuild_are_kept(self):
+        entries = [{'timestamp': '2024-05-06 10:00:00', 'mode': 'single', 'books': [], 'ai_ids': ['grok']}]
+
+        def history():
+            # 重建读取历史快照之后，又有新的回答被记录
+            yield from entries
+            self.store.record(ai_id='openai', mode='single', when=datetime(2024, 5, 7),
+                              usage={'input': 10, 'output': 5})
+
+        self.store.rebuild_from_history(history())
+        self.assertEqual(self.store.total, 2)
+        self.assertEqual(self.store.day_total('2024-05-07'), 1)
+        self.assertEqual(self.store.usage_totals(key='2024-05')['answers'], 1)
+        self.assertEqual(self.store._rebuild_buffers, [])
+
+    def test_flush_persists_and_reloads(self):
+        self.store.record(ai_id='grok', mode='single', book_ids=[3], when=datetime(2024, 5, 6))
+        self.assertFalse(Path(self.path).exists())
+        self.store.flush()
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['total'], 1)
+        reloaded = StatsStore(self.path)
+        self.assertTrue(reloaded.exists)
+        self.assertEqual(reloaded.day_total('2024-05-06'), 1)
+        self.assertEqual(reloaded.breakdown('ai', key='2024-05'), [('grok', 1)])
+
+    def test_usage_totals_sum_tokens_and_cost(self):
+        when = datetime(2024, 5, 6)
+        self.store.record(ai_id='openai', when=when, cost=0.5,
+                          usage={'input': 1000, 'cached_input': 800, 'output': 200, 'reasoning': 50})
+        self.store.record(ai_id='grok', when=when,
+                          usage={'input': 3000, 'cached_input': 0, 'output': 100, 'reasoning': 0})
+        self.store.record(ai_id='ollama', when=when)
+        totals = self.store.usage_totals(key='2024-05')
+        self.assertEqual(totals['tokens'], {'input': 4000, 'cached_input': 800, 'output': 300, 'reasoning': 50})
+        self.assertEqual(totals['answers'], 2)
+        self.assertEqual(totals['cost'], 0.5)
+        self.assertEqual(totals['ai'], [('grok', 3100), ('openai', 1200)])
+        self.assertEqual(self.store.usage_totals('days', key='2024-05-07')['answers'], 0)
+        self.assertIsNone(self.store.usage_totals('days', key='2024-05-07')['cost'])
+
+    def test_corrupt_file_starts_fresh(self):
+        Path(self.path).write_text('{not json', encoding='utf-8')
+        store = StatsStore(self.path)
+        self.assertFalse(store.exists)
+        self.assertEqual(store.total, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for the per-book random-question suggestion pool and its background refill."""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from suggestion_pool import SuggestionPool, SuggestionPrefetcher, normalize_question, pool_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSuggestionPool(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.key = pool_key([12, 3], 'openai', 'en')
+
+    def test_key_is_independent_of_book_order(self):
+        self.assertEqual(self.key, pool_key([3, 12], 'openai', 'en'))
+        self.assertNotEqual(self.key, pool_key([3, 12], 'openai', 'zh'))
+
+    def test_take_is_fifo_and_skips_the_current_question(self):
+        pool = SuggestionPool(size=3, clock=self.clock)
+        self.assertTrue(pool.add(self.key, 'Why does Ahab hunt the whale?'))
+        self.assertTrue(pool.add(self.key, 'What does Ishmael learn?'))
+        self.assertEqual(pool.missing(self.key), 1)
+
+        self.assertEqual(pool.take(self.key, exclude=['why does ahab hunt the whale']), 'What does Ishmael learn?')
+        self.assertEqual(pool.take(self.key), 'Why does Ahab hunt the whale?')
+        self.assertIsNone(pool.take(self.key))
+
+    def test_duplicates_of_pooled_or_recent_questions_are_rejected(self):
+        pool = SuggestionPool(clock=self.clock)
+        pool.add(self.key, 'Who is Queequeg?')
+        self.assertFalse(pool.add(self.key, '  who is queequeg  '))
+        pool.remember(self.key, 'What is the Pequod?')
+        self.assertFalse(pool.add(self.key, 'What is the Pequod'))
+        self.assertEqual(pool.known_questions(self.key), ['Who is Queequeg?', 'What is the Pequod?'])
+        self.assertEqual(normalize_question('Hello, World!'), 'helloworld')
+
+    def test_expired_entries_are_dropped(self):
+        pool = SuggestionPool(ttl=60, clock=self.clock)
+        pool.add(self.key, 'Old question?')
+        self.clock.now += 61
+        self.assertEqual(pool.count(self.key), 0)
+        self.assertIsNone(pool.take(self.key))
+
+    def test_least_recently_used_books_are_evicted(self):
+        pool = SuggestionPool(max_keys=2, clock=self.clock)
+        pool.add('a', 'A?')
+        pool.add('b', 'B?')
+        pool.count('a')
+        pool.add('c', 'C?')
+        self.assertEqual((pool.count('a'), pool.count('b'), pool.count('c')), (1, 0, 1))
+
+    def test_pool_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / 'pool.json')
+            SuggestionPool(path, clock=self.clock).add(self.key, 'Saved?')
+            self.assertEqual(SuggestionPool(path, clock=self.clock).take(self.key), 'Saved?')
+
+
+class TestSuggestionPrefetcher(unittest.TestCase):
+    def test_fill_tops_up_the_pool_with_distinct_questions(self):
+        pool = SuggestionPool(size=2)
+        prefetcher = SuggestionPrefetcher(pool)
+        answers = iter(['Q1?', 'q1', 'Q2?'])
+        avoid_lists = []
+
+        def generate(avoid):
+            avoid_lists.append(list(avoid))
+            return next(answers)
+
+        prefetcher.fill('k', generate).join(3)
+        self.assertEqual(pool.known_questions('k'), ['Q1?', 'Q2?'])
+        self.assertEqual(avoid_lists, [[], ['Q1?'], ['Q1?']])
+        # 已满时不再启动
+        self.assertIsNone(prefetcher.fill('k', generate))
+
+    def test_single_flight_per_key(self):
+        pool = SuggestionPool(size=1)
+        prefetcher = SuggestionPrefetcher(pool)
+        release = threading.Event()
+
+        def slow(avoid):
+            release.wait(3)
+            return 'Q?'
+
+        thread = prefetcher.fill('k', slow)
+        self.assertTrue(prefetcher.is_filling('k'))
+        self.assertIsNone(prefetcher.fill('k', slow))
+        release.set()
+        thread.join(3)
+        self.assertFalse(prefetcher.is_filling('k'))
+        self.assertEqual(pool.count('k'), 1)
+
+    def test_errors_and_cancellation_stop_the_refill(self):
+        pool = SuggestionPool(size=2)
+        prefetcher = SuggestionPrefetcher(pool)
+
+        def broken(avoid):
+            raise RuntimeError('429')
+
+        prefetcher.fill('k', broken).join(3)
+        self.assertEqual(pool.count('k'), 0)
+
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(avoid):
+            started.set()
+            release.wait(3)
+            return 'Late?'
+
+        thread = prefetcher.fill('k', slow)
+        self.assertTrue(started.wait(3))
+        prefetcher.cancel()
+        release.set()
+        thread.join(3)
+        self.assertEqual(pool.count('k'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for token estimation and token-aware prompt budgets."""
+
+from __future__ import annotations
+
+import json
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import prompt_limits
+import token_estimator
+import utils
+from token_estimator import (
+    FAMILY_CL100K,
+    FAMILY_CLAUDE,
+    FAMILY_GENERIC,
+    FAMILY_O200K,
+    FAMILY_SENTENCEPIECE,
+    estimate_tokens,
+)
+
+
+def _make_books(count: int) -> list:
+    return [{'id': i, 'title': f'Book Title {i}', 'authors': f'Author {i}'} for i in range(1, count + 1)]
+
+
+class TestTokenEstimator(unittest.TestCase):
+    def test_empty_text(self):
+        self.assertEqual(estimate_tokens(''), 0)
+
+    def test_english_close_to_four_chars_per_token(self):
+        text = 'The quick brown fox jumps over the lazy dog. ' * 100
+        tokens = estimate_tokens(text, FAMILY_CL100K)
+        self.assertGreater(tokens, len(text) / 5)
+        self.assertLess(tokens, len(text) / 3)
+
+    def test_cjk_costs_more_tokens_per_character(self):
+        english = 'machine learning ' * 100
+        chinese = '机器学习' * 100
+        self.assertGreater(
+            estimate_tokens(chinese, FAMILY_CL100K) / len(chinese),
+            estimate_tokens(english, FAMILY_CL100K) / len(english),
+        )
+        # o200k is much more efficient on CJK than cl100k
+        self.assertLess(estimate_tokens(chinese, FAMILY_O200K), estimate_tokens(chinese, FAMILY_CL100K))
+
+    def test_sentencepiece_splits_digits(self):
+        digits = '1234567890' * 50
+        self.assertGreater(
+            estimate_tokens(digits, FAMILY_SENTENCEPIECE),
+            estimate_tokens(digits, FAMILY_O200K),
+        )
+
+    def test_tokenizer_family_detection(self):
+        self.assertEqual(token_estimator.tokenizer_family('openai', 'gpt-5.4'), FAMILY_O200K)
+        self.assertEqual(token_estimator.tokenizer_family('openai', 'gpt-4-0613'), FAMILY_CL100K)
+        self.assertEqual(token_estimator.tokenizer_family('openrouter', 'google/gemini-3.5-flash'),
+                         FAMILY_SENTENCEPIECE)
+        self.assertEqual(token_estimator.tokenizer_family('anthropic', ''), FAMILY_CLAUDE)
+        self.assertEqual(token_estimator.tokenizer_family('ollama', 'phi3'), FAMILY_GENERIC)
+
+    def test_context_window_lookup(self):
+        self.assertEqual(token_estimator.context_window('gpt-4o-mini'), 128_000)
+        self.assertEqual(token_estimator.context_window('gpt-4.1-mini'), 1_047_576)
+        self.assertEqual(token_estimator.context_window('gpt-4-turbo-2024-04-09'), 128_000)
+        self.assertEqual(token_estimator.context_window('gpt-4-0125-preview'), 128_000)
+        self.assertEqual(token_estimator.context_window('gpt-4-0613'), 8_192)
+        self.assertEqual(token_estimator.context_window('x-ai/grok-4.3'), 256_000)
+        self.assertIsNone(token_estimator.context_window('my-local-model'))
+
+    def test_local_context_size_rounds_up_and_respects_model_max(self):
+        self.assertEqual(token_estimator.local_context_size(100), 8192)
+        self.assertEqual(token_estimator.local_context_size(9000, 2048), 16384)
+        self.assertEqual(token_estimator.local_context_size(90_000, model_max=131_072), 131_072)
+        self.assertEqual(token_estimator.local_context_size(200_000, model_max=131_072), 131_072)
+        # 模型最大上下文未知时使用保守上限
+        self.assertEqual(token_estimator.local_context_size(90_000), 32768)
+
+
+class TestTokenBudget(unittest.TestCase):
+    def test_unknown_model_falls_back_to_characters(self):
+        budget = prompt_limits.get_prompt_budget(True, {}, [('ollama', {'model': 'phi3'})])
+        self.assertEqual(budget.unit, prompt_limits.UNIT_CHARS)
+        self.assertEqual(budget.limit, prompt_limits.DEFAULT_MULTI_LIMIT)
+
+    def test_custom_limit_stays_in_characters(self):
+        prefs = {'enable_custom_prompt_limit': True, 'max_prompt_length': 5000}
+        budget = prompt_limits.get_prompt_budget(True, prefs, [('openai', {'model': 'gpt-5.4'})])
+        self.assertEqual(budget.unit, prompt_limits.UNIT_CHARS)
+        self.assertEqual(budget.limit, 5000)
+
+    def test_smallest_context_window_wins(self):
+        models = [
+            ('gemini', {'model': 'gemini-3.5-flash'}),
+            ('openai', {'model': 'gpt-4o', 'max_tokens': 4096}),
+        ]
+        budget = prompt_limits.get_prompt_budget(True, {}, models)
+        self.assertEqual(budget.unit, prompt_limits.UNIT_TOKENS)
+        self.assertEqual(budget.model, 'gpt-4o')
+        self.assertEqual(budget.limit, int((128_000 - 4096 - prompt_limits.SYSTEM_PROMPT_RESERVE)
+                                           * prompt_limits.CONTEXT_SAFETY_RATIO))
+
+    def test_configured_context_window_overrides_table(self):
+        budget = prompt_limits.get_prompt_budget(
+            False, {}, [('ollama', {'model': 'phi3', 'context_window': 32768})])
+        self.assertEqual(budget.unit, prompt_limits.UNIT_TOKENS)
+        self.assertEqual(budget.context_window, 32768)
+
+    def test_fit_lines_respects_token_limit(self):
+        budget = prompt_limits.PromptBudget(1000, prompt_limits.UNIT_TOKENS, family=FAMILY_CL100K)
+        lines = [f'{i}|Book Title {i}|Author {i}' for i in range(1, 501)]
+        included = budget.fit_lines(lines, 'Question: find books')
+        self.assertGreater(len(included), 10)
+        self.assertLess(len(included), 500)
+        self.assertLessEqual(budget.measure('Question: find books\n' + '\n'.join(included)), 1000)
+
+    def test_validate_reports_tokens_for_model(self):
+        err = prompt_limits.validate_prompt_length(
+            'word ' * 200_000, True, {}, {}, book_count=10,
+            models=[('openai', {'model': 'gpt-4o'})],
+        )
+        self.assertIsNotNone(err)
+        self.assertIn('tokens', err)
+        self.assertIn('gpt-4o', err)
+        self.assertIn('128000', err)
+
+    def test_library_prompt_fits_more_books_with_large_window(self):
+        prefs = {'library_cached_metadata': json.dumps(_make_books(30_000), ensure_ascii=False)}
+        by_chars = utils.build_library_prompt('Find Python books', prefs)
+        by_tokens = utils.build_library_prompt(
+            'Find Python books', prefs, models=[('gemini', {'model': 'gemini-3.5-flash'})])
+        self.assertGreater(len(by_tokens), len(by_chars))
+        self.assertIsNone(prompt_limits.validate_prompt_length(
+            by_tokens, True, prefs, {}, is_library_search=True,
+            models=[('gemini', {'model': 'gemini-3.5-flash'})],
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
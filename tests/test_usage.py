@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for normalised provider token usage, cost estimates and estimator calibration."""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import prompt_limits
+from usage import (TokenCalibration, add_usage, estimate_cost, find_price, format_price_table,
+                   from_anthropic, from_gemini, from_ollama, from_openai, make_usage, merge_usage,
+                   parse_price_table)
+
+
+class TestNormalisers(unittest.TestCase):
+    def test_openai_usage_chunk(self):
+        chunk = {'choices': [], 'usage': {
+            'prompt_tokens': 1200, 'completion_tokens': 300,
+            'prompt_tokens_details': {'cached_tokens': 1024},
+            'completion_tokens_details': {'reasoning_tokens': 128}}}
+        self.assertEqual(from_openai(chunk), make_usage(1200, 1024, 300, 128))
+        self.assertIsNone(from_openai({'choices': [{'delta': {'content': 'hi'}}]}))
+        self.assertIsNone(from_openai({'usage': None}))
+        # DeepSeek 报告缓存命中的字段名不同
+        deepseek = {'usage': {'prompt_tokens': 50, 'completion_tokens': 5, 'prompt_cache_hit_tokens': 40}}
+        self.assertEqual(from_openai(deepseek)['cached_input'], 40)
+
+    def test_anthropic_stream_events_merge(self):
+        start = {'type': 'message_start', 'message': {'usage': {
+            'input_tokens': 20, 'cache_read_input_tokens': 1000, 'cache_creation_input_tokens': 5,
+            'output_tokens': 1}}}
+        delta = {'type': 'message_delta', 'usage': {'output_tokens': 250}}
+        usage = merge_usage(from_anthropic(start), from_anthropic(delta))
+        self.assertEqual(usage, make_usage(1025, 1000, 250, 0))
+
+    def test_gemini_counts_thoughts_as_output(self):
+        chunk = {'usageMetadata': {'promptTokenCount': 900, 'cachedContentTokenCount': 100,
+                                   'candidatesTokenCount': 40, 'thoughtsTokenCount': 60}}
+        self.assertEqual(from_gemini(chunk), make_usage(900, 100, 100, 60))
+        self.assertIsNone(from_gemini({'candidates': []}))
+
+    def test_ollama_final_line(self):
+        self.assertEqual(from_ollama({'done': True, 'prompt_eval_count': 30, 'eval_count': 12}),
+                         make_usage(30, 0, 12))
+        self.assertIsNone(from_ollama({'done': False, 'message': {'content': 'x'}}))
+
+    def test_merge_and_add(self):
+        self.assertIsNone(merge_usage(None, None))
+        first = make_usage(10, 0, 1)
+        self.assertIs(merge_usage(first, None), first)
+        self.assertEqual(add_usage(add_usage(None, first), make_usage(5, 2, 3, 1)), make_usage(15, 2, 4, 1))
+
+
+class TestPrices(unittest.TestCase):
+    PRICES = {'gpt-4o': {'input': 2.5, 'cached_input': 1.25, 'output': 10},
+              'gpt-4o-mini': {'input': 0.15, 'output': 0.6},
+              'claude': {'input': 3, 'output': 15}}
+
+    def test_longest_prefix_and_vendor_prefix(self):
+        self.assertEqual(find_price('gpt-4o-mini-2024-07-18', self.PRICES)['input'], 0.15)
+        self.assertEqual(find_price('GPT-4o-2024-08-06', self.PRICES)['input'], 2.5)
+        self.assertEqual(find_price('anthropic/claude-sonnet-4', self.PRICES)['output'], 15)
+        self.assertIsNone(find_price('grok-4', self.PRICES))
+        self.assertIsNone(find_price('', self.PRICES))
+
+    def test_estimate_cost_prices_cached_input_separately(self):
+        usage = make_usage(1_000_000, 400_000, 100_000)
+        self.assertAlmostEqual(estimate_cost(usage, self.PRICES['gpt-4o']), 0.6 * 2.5 + 0.4 * 1.25 + 0.1 * 10)
+        # 没有缓存价格时按输入价格计算
+        self.assertAlmostEqual(estimate_cost(usage, self.PRICES['gpt-4o-mini']), 0.15 + 0.06)
+        self.assertIsNone(estimate_cost(usage, None))
+
+    def test_price_table_round_trip(self):
+        text = 'gpt-4o: 2.5, 1.25, 10\nclaude: 3, 15  # no cache price\n\nbroken line\nx: 1, -2, 3\n'
+        prices, bad_lines = parse_price_table(text)
+        self.assertEqual(prices, {'gpt-4o': self.PRICES['gpt-4o'], 'claude': self.PRICES['claude']})
+        self.assertEqual(bad_lines, [4, 5])
+        self.assertEqual(parse_price_table(format_price_table(prices)), (prices, []))
+
+
+class TestTokenCalibration(unittest.TestCase):
+    def test_factor_needs_enough_samples_and_is_clamped(self):
+        calibration = TokenCalibration(min_samples=2)
+        self.assertFalse(calibration.record('gpt-4o', 100.0, 120))  # 太短，不采用
+        self.assertTrue(calibration.record('GPT-4o', 1000.0, 1200, chars=4800))
+        self.assertEqual(calibration.factor('gpt-4o'), 1.0)
+        calibration.record('gpt-4o', 1000.0, 1200, chars=4800)
+        self.assertAlmostEqual(calibration.factor('gpt-4o'), 1.2)
+        self.assertAlmostEqual(calibration.chars_per_token('gpt-4o'), 4.0)
+
+        calibration.record('tiny', 1000.0, 5000)
+        calibration.record('tiny', 1000.0, 5000)
+        self.assertEqual(calibration.factor('tiny'), 2.0)
+        self.assertEqual(calibration.factor('unknown'), 1.0)
+
+    def test_calibration_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / 'calibration.json')
+            calibration = TokenCalibration(path, min_samples=1, flush_delay=60)
+            calibration.record('claude-sonnet-4', 2000.0, 2200)
+            self.assertFalse(Path(path).exists())
+            calibration.flush()
+            self.assertAlmostEqual(TokenCalibration(path, min_samples=1).factor('claude-sonnet-4'), 1.1)
+
+    def test_prompt_budget_applies_scale(self):
+        text = 'word ' * 2000
+        plain = prompt_limits.PromptBudget(100_000, prompt_limits.UNIT_TOKENS, family='o200k')
+        scaled = prompt_limits.PromptBudget(100_000, prompt_limits.UNIT_TOKENS, family='o200k', scale=1.5)
+        self.assertGreater(scaled.measure(text), plain.measure(text) * 1.4)
+        lines = ['word word word word'] * 100
+        small = dict(limit=plain.measure('\n'.join(lines)) // 2 + 50, unit=prompt_limits.UNIT_TOKENS, family='o200k')
+        self.assertLess(len(prompt_limits.PromptBudget(scale=1.5, **small).fit_lines(lines, reserve=0)),
+                        len(prompt_limits.PromptBudget(**small).fit_lines(lines, reserve=0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Fast table-driven token estimates for prompt budgeting."""
+
+import math
+import re
+
+# 按字符类别统计再乘以各分词器族的经验系数，不引入真正的分词器
+FAMILY_O200K = 'o200k'                  # GPT-4o / GPT-5 / o 系列
+FAMILY_CL100K = 'cl100k'                # GPT-4 / GPT-3.5 及沿用其词表的兼容模型
+FAMILY_SENTENCEPIECE = 'sentencepiece'  # Gemini 等（数字按单个字符切分）
+FAMILY_CLAUDE = 'claude'
+FAMILY_GENERIC = 'generic'              # 未知模型，偏保守
+
+# 每个字符类别平均每个字符对应的 token 数
+#   word:    每个英文单词至少 1 个 token
+#   newline: 每段连续换行计 1 个 token
+TOKENIZER_TABLES = {
+    FAMILY_O200K: {
+        'latin': 1 / 4.4, 'word': 1.0, 'digit': 1 / 3, 'punct': 0.6,
+        'space': 0.05, 'newline': 1.0, 'cjk': 0.85, 'other': 1 / 2.8,
+    },
+    FAMILY_CL100K: {
+        'latin': 1 / 4.0, 'word': 1.0, 'digit': 1 / 3, 'punct': 0.7,
+        'space': 0.05, 'newline': 1.0, 'cjk': 1.15, 'other': 1 / 2.0,
+    },
+    FAMILY_SENTENCEPIECE: {
+        'latin': 1 / 3.8, 'word': 1.0, 'digit': 1.0, 'punct': 0.8,
+        'space': 0.1, 'newline': 1.0, 'cjk': 0.7, 'other': 1 / 3.0,
+    },
+    FAMILY_CLAUDE: {
+        'latin': 1 / 3.6, 'word': 1.0, 'digit': 1 / 2, 'punct': 0.8,
+        'space': 0.05, 'newline': 1.0, 'cjk': 1.0, 'other': 1 / 2.4,
+    },
+    FAMILY_GENERIC: {
+        'latin': 1 / 3.5, 'word': 1.0, 'digit': 1 / 2, 'punct': 1.0,
+        'space': 0.1, 'newline': 1.0, 'cjk': 1.2, 'other': 1 / 2.0,
+    },
+}
+
+# 宁可略多估也不要触发服务端 400
+SAFETY_MARGIN = 1.1
+
+# 本地模型（Ollama）上下文大小：按 2 的幂取整，减少因 num_ctx 变化导致的模型重新加载
+LOCAL_CONTEXT_MIN = 8192
+# 无法得知模型最大上下文时的上限，避免显存/内存不足
+LOCAL_CONTEXT_FALLBACK_MAX = 32768
+
+_WORD_RE = re.compile(r'[A-Za-z]+')
+_DIGIT_RE = re.compile(r'[0-9]')
+_PUNCT_RE = re.compile(r'[!-/:-@\[-`{-~]')
+_SPACE_RE = re.compile(r'[ \t\r\f\v]')
+_NEWLINE_RUN_RE = re.compile(r'\n+')
+_NEWLINE_RE = re.compile(r'\n')
+# 中日韩统一表意文字、假名、谚文、全角标点
+_CJK_RE = re.compile(
+    '[\u2e80-\u2fff\u3000-\u303f\u3040-\u30ff\u3100-\u31ff\u3400-\u4dbf'
+    '\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]'
+)
+
+# 模型名（去掉 "vendor/" 前缀、小写）前缀 -> 分词器族，按顺序匹配
+_MODEL_FAMILY_PREFIXES = (
+    ('gpt-4o', FAMILY_O200K),
+    ('gpt-4.1', FAMILY_O200K),
+    ('gpt-4.5', FAMILY_O200K),
+    ('gpt-5', FAMILY_O200K),
+    ('gpt-oss', FAMILY_O200K),
+    ('o1', FAMILY_O200K),
+    ('o3', FAMILY_O200K),
+    ('o4', FAMILY_O200K),
+    ('gpt-4', FAMILY_CL100K),
+    ('gpt-3.5', FAMILY_CL100K),
+    ('gemini', FAMILY_SENTENCEPIECE),
+    ('gemma', FAMILY_SENTENCEPIECE),
+    ('claude', FAMILY_CLAUDE),
+)
+
+# 模型名未命中时按服务商推断
+_PROVIDER_FAMILIES = {
+    'openai': FAMILY_O200K,
+    'gemini': FAMILY_SENTENCEPIECE,
+    'anthropic': FAMILY_CLAUDE,
+}
+
+# 已知模型的上下文窗口（token），按前缀顺序匹配；未知模型返回 None
+_CONTEXT_WINDOWS = (
+    ('gpt-5', 400_000),
+    ('gpt-4.1', 1_047_576),
+    ('gpt-4o', 128_000),
+    ('gpt-4.5', 128_000),
+    ('gpt-4-turbo', 128_000),
+    ('gpt-4-1106', 128_000),
+    ('gpt-4-0125', 128_000),
+    ('gpt-4-32k', 32_768),
+    # 只剩最初的 gpt-4 / gpt-4-0613，必须排在上面的 gpt-4 系列之后
+    ('gpt-4', 8_192),
+    ('gpt-3.5', 16_385),
+    ('gpt-oss', 131_072),
+    ('o1', 200_000),
+    ('o3', 200_000),
+    ('o4', 200_000),
+    ('claude', 200_000),
+    ('gemini', 1_048_576),
+    ('deepseek', 128_000),
+    ('grok-4', 256_000),
+    ('grok', 131_072),
+    ('sonar', 127_072),
+    ('nemotron', 128_000),
+    ('llama', 128_000),
+    ('qwen', 128_000),
+    ('mistral', 128_000),
+)
+
+
+def _normalize_model_name(model_name):
+    name = (model_name or '').strip().lower()
+    return name.rsplit('/', 1)[-1]
+
+
+def _match_prefix(name, table):
+    for prefix, value in table:
+        if name.startswith(prefix):
+            return value
+    return None
+
+
+def tokenizer_family(provider_id=None, model_name=None):
+    """根据服务商和模型名推断分词器族"""
+    family = _match_prefix(_normalize_model_name(model_name), _MODEL_FAMILY_PREFIXES)
+    if family:
+        return family
+    return _PROVIDER_FAMILIES.get((provider_id or '').lower(), FAMILY_GENERIC)
+
+
+def context_window(model_name):
+    """已知模型的上下文窗口（token）；未知返回 None"""
+    return _match_prefix(_normalize_model_name(model_name), _CONTEXT_WINDOWS)
+
+
+def estimate_tokens_raw(text, family=FAMILY_GENERIC):
+    """未取整、未加安全系数的 token 估算值（可累加）"""
+    if not text:
+        return 0.0
+    table = TOKENIZER_TABLES.get(family) or TOKENIZER_TABLES[FAMILY_GENERIC]
+
+    words = _WORD_RE.findall(text)
+    letters = sum(len(word) for word in words)
+    digits = len(_DIGIT_RE.findall(text))
+    punct = len(_PUNCT_RE.findall(text))
+    spaces = len(_SPACE_RE.findall(text))
+    newline_runs = len(_NEWLINE_RUN_RE.findall(text))
+    newlines = len(_NEWLINE_RE.findall(text)) if newline_runs else 0
+
+    if text.isascii():
+        cjk = other = 0
+    else:
+        cjk = len(_CJK_RE.findall(text))
+        other = len(text) - letters - digits - punct - spaces - newlines - cjk
+
+    return (
+        max(len(words) * table['word'], letters * table['latin'])
+        + digits * table['digit']
+        + punct * table['punct']
+        + spaces * table['space']
+        + newline_runs * table['newline']
+        + cjk * table['cjk']
+        + max(0, other) * table['other']
+    )
+
+
+def estimate_tokens(text, family=FAMILY_GENERIC):
+    """估算文本的 token 数（含安全系数）"""
+    return int(math.ceil(estimate_tokens_raw(text, family) * SAFETY_MARGIN))
+
+
+def local_context_size(prompt_tokens, output_tokens=0, model_max=None,
+                       minimum=LOCAL_CONTEXT_MIN, fallback_max=LOCAL_CONTEXT_FALLBACK_MAX):
+    """
+    本地模型的 num_ctx：容纳提示词和回答所需的最小 2 的幂（不小于 minimum）
+
+    :param model_max: 模型支持的最大上下文（如 Ollama /api/show 报告的值）；未知时使用 fallback_max
+    """
+    needed = max(0, int(prompt_tokens)) + max(0, int(output_tokens))
+    size = max(1, int(minimum))
+    while size < needed:
+        size *= 2
+    cap = model_max if model_max and model_max > 0 else fallback_max
+    return min(size, int(cap)) if cap else size
@@ -13,31 +13,22 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QTextEdit, QPushButton,
                             QHBoxLayout, QLabel, QComboBox, QApplication, 
                             QMessageBox, QScrollArea, QWidget, QSizePolicy, 
                             QFrame, QSplitter, QStatusBar, QTextBrowser, QTabWidget, QDialogButtonBox, QToolButton, QMenu, QAction, QToolTip, QGroupBox)
-from PyQt5.QtCore import Qt, QTimer, QSize, pyqtSignal, QPoint, QRect, QEvent, QObject, QUrl
+from PyQt5.QtCore import Qt, QTimer, QSize, pyqtSignal, QPoint, QRect, QEvent, QObject, QUrl, QThread
 from calibre.gui2.actions import InterfaceAction
 from calibre.gui2 import info_dialog
 from calibre.gui2.keyboard import NameConflict
-from calibre_plugins.ask_ai_plugin.config import ConfigDialog, get_prefs
-from calibre_plugins.ask_ai_plugin.api import APIClient
+# 注意：本模块在 calibre 启动时随工具栏动作加载。设置界面（config.ConfigDialog、
+# prompts_widget、shortcuts_widget）、API 客户端以及渲染/清理 HTML 的 markdown2、bleach
+# （ResponseHandler）都在首次使用时才导入，见 scripts/bench_import_time.py
+from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
 from .i18n import get_translation, get_suggestion_template
-from calibre_plugins.ask_ai_plugin.shortcuts_widget import ShortcutsWidget
-from calibre_plugins.ask_ai_plugin.prompts_widget import PromptsWidget
 from calibre_plugins.ask_ai_plugin.version import VERSION_DISPLAY
 from calibre_plugins.ask_ai_plugin.widgets import apply_button_style
-from calibre_plugins.ask_ai_plugin.ui_constants import (
-    SPACING_SMALL, SPACING_MEDIUM, SPACING_LARGE,
-    MARGIN_MEDIUM, PADDING_MEDIUM,
-    FONT_SIZE_LARGE
-)
 from calibre.utils.resources import get_path as I
 import sys
 import os
 import time
 
-# 从 vendor 命名空间导入第三方库
-from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import markdown2
-from calibre_plugins.ask_ai_plugin.lib.ask_ai_plugin_vendor import bleach
-
 # 存储插件实例的全局变量
 # 注意：不要在这里导入自己，会导致循环导入
 plugin_instance = None
@@ -142,6 +133,16 @@ class AskAIPluginUI(InterfaceAction):
             persist_shortcut=True,
         )
 
+        # 添加 Ask Each Book 菜单项（对每本选中的书单独提问）
+        self.batch_action = QAction(self.i18n.get('batch_ask_menu', 'Ask Each Book'), self)
+        self.batch_action.triggered.connect(self.show_batch_dialog)
+        self.menu.addAction(self.batch_action)
+
+        # 添加 Background Jobs 菜单项（写入自定义列的长时间后台任务）
+        self.jobs_action = QAction(self.i18n.get('jobs_menu', 'Background Jobs'), self)
+        self.jobs_action.triggered.connect(self.show_jobs_dialog)
+        self.menu.addAction(self.jobs_action)
+
         # 添加分隔符
         self.menu.addSeparator()
 
@@ -292,6 +293,14 @@ class AskAIPluginUI(InterfaceAction):
         except Exception:
             self.library_action.setText(self.i18n.get('library_search', 'AI Search'))
         
+        # 未选书时 Ask Each Book 不可用
+        self.batch_action.setText(self.i18n.get('batch_ask_menu', 'Ask Each Book'))
+        try:
+            self.batch_action.setEnabled(bool(self.gui.library_view.selectionModel().selectedRows()))
+        except Exception:
+            self.batch_action.setEnabled(True)
+        self.jobs_action.setText(self.i18n.get('jobs_menu', 'Background Jobs'))
+        
     def initialize_api(self):
         try:
             # 初始化 API 客户端
@@ -301,6 +310,7 @@ class AskAIPluginUI(InterfaceAction):
             
             # 创建新的 API 客户端，不再需要传递 api_base、model 和 auth_token 参数
             # 因为这些参数现在由 AIModelFactory 根据配置动态创建
+            from calibre_plugins.ask_ai_plugin.api import APIClient
             self.api = APIClient(i18n=self.i18n)
             
             # 记录当前使用的模型
@@ -490,17 +500,10 @@ class AskAIPluginUI(InterfaceAction):
                 db = self.gui.current_db
                 logger.info("获取数据库实例成功")
                 
-                # 统一处理单书和多书模式，遇到错误时跳过该书籍
-                books_info = []
-                failed_books = []
-                for row in rows:
-                    book_id = self.gui.library_view.model().id(row)
-                    try:
-                        mi = db.get_metadata(book_id, index_is_id=True)
-                        books_info.append(mi)
-                    except (OSError, Exception) as e:
-                        logger.error(f"Failed to read book metadata (book_id={book_id}): {str(e)}")
-                        failed_books.append(book_id)
+                # 统一处理单书和多书模式：通过 new_api 批量读取所需字段，跳过读取失败的书籍
+                from .book_metadata import load_books
+                model = self.gui.library_view.model()
+                books_info, failed_books = load_books(db, [model.id(row) for row in rows])
                 
                 # 如果有失败的书籍，显示警告但继续处理成功的书籍
                 if failed_books:
@@ -598,6 +601,98 @@ class AskAIPluginUI(InterfaceAction):
         """打开 AI Search 对话框"""
         self.show_dialog(force_ai_search=True)
     
+    def show_batch_dialog(self):
+        """打开 Ask Each Book 对话框：对每本选中的书用单书模板单独提问"""
+        try:
+            rows = self.gui.library_view.selectionModel().selectedRows()
+            if not rows:
+                from PyQt5.QtWidgets import QMessageBox
+                QMessageBox.information(
+                    self.gui,
+                    self.i18n.get('batch_ask_title', 'Ask Each Book'),
+                    self.i18n.get('batch_ask_no_selection', 'Select the books you want to ask about first.')
+                )
+                return
+            
+            from .book_metadata import load_books
+            model = self.gui.library_view.model()
+            books_info, failed_books = load_books(self.gui.current_db, [model.id(row) for row in rows])
+            if failed_books:
+                logger.warning(f"Ask Each Book: skipped {len(failed_books)} books due to errors: {failed_books}")
+            if not books_info:
+                return
+            
+            from .batch_dialog import BatchAskDialog
+            language_map = AskDialog.LANGUAGE_MAP
+            d = BatchAskDialog(
+                self.gui, books_info,
+                language_name_fn=lambda code: language_map.get(code.lower().strip(), code),
+            )
+            self.batch_dialog = d
+            d.finished.connect(lambda result: setattr(self, 'batch_dialog', None))
+            d.show()
+        except Exception as e:
+            logger.error(f"show_batch_dialog() error: {str(e)}", exc_info=True)
+            from PyQt5.QtWidgets import QMessageBox
+            QMessageBox.critical(
+                self.gui,
+                self.i18n.get('error', 'Error'),
+                self.i18n.get('error_opening_dialog', 'Error opening dialog:') + f"\n{str(e)}"
+            )
+    
+    def show_jobs_dialog(self):
+        """打开后台任务面板"""
+        try:
+            from .jobs_dialog import JobsDialog
+            try:
+                model = self.gui.library_view.model()
+                selected_ids = [model.id(row) for row in self.gui.library_view.selectionModel().selectedRows()]
+            except Exception:
+                selected_ids = []
+            d = JobsDialog(self.gui, selected_ids)
+            self.jobs_dialog = d
+            d.finished.connect(lambda result: setattr(self, 'jobs_dialog', None))
+            d.show()
+        except Exception as e:
+            logger.error(f"show_jobs_dialog() error: {str(e)}", exc_info=True)
+            from PyQt5.QtWidgets import QMessageBox
+            QMessageBox.critical(
+                self.gui,
+                self.i18n.get('error', 'Error'),
+                self.i18n.get('error_opening_dialog', 'Error opening dialog:') + f"\n{str(e)}"
+            )
+    
+    def initialization_complete(self):
+        """calibre 启动完成：有未完成的后台任务时从检查点继续执行"""
+        try:
+            # 先只读检查数据库：没有未完成任务时不加载任务面板（及其依赖的 API 客户端）
+            from .job_queue import has_active_jobs
+            if has_active_jobs():
+                from .jobs_dialog import get_job_service
+                service = get_job_service(self.gui)
+                if service.has_active_jobs():
+                    logger.info("发现未完成的后台任务，继续执行")
+                    service.start()
+        except Exception as e:
+            logger.warning(f"恢复后台任务失败: {str(e)}")
+    
+    def library_changed(self, db):
+        try:
+            from . import jobs_dialog
+            if jobs_dialog._service is not None:
+                jobs_dialog._service.library_changed()
+        except Exception as e:
+            logger.warning(f"切换书库时处理后台任务失败: {str(e)}")
+    
+    def shutting_down(self):
+        try:
+            from . import jobs_dialog
+            if jobs_dialog._service is not None:
+                jobs_dialog._service.shutdown()
+        except Exception as e:
+            logger.warning(f"退出时停止后台任务失败: {str(e)}")
+        return True
+    
     def show_statistics(self):
         """显示 Statistics 统计对话框"""
         dlg = TabDialog(self.gui)
@@ -690,6 +785,7 @@ class AskGrokConfigWidget(QWidget):
         layout = setup_tab_widget_layout(self)
         
         # 复用现有的 ConfigDialog
+        from calibre_plugins.ask_ai_plugin.config import ConfigDialog
         self.config_dialog = ConfigDialog(self.gui)
         layout.addWidget(self.config_dialog)
         
@@ -1175,6 +1271,7 @@ class TabDialog(QDialog):
         self.library_widget.config_changed.connect(self.update_save_button_state)
 
         # 创建Prompts页面 (index 2)
+        from calibre_plugins.ask_ai_plugin.prompts_widget import PromptsWidget
         self.prompts_widget = PromptsWidget(self)
         self.tab_widget.addTab(self.prompts_widget, self.i18n.get('prompts_tab', 'Prompts'))
         
@@ -1186,6 +1283,7 @@ class TabDialog(QDialog):
         self.prompts_widget.load_initial_values(current_lang)
 
         # 创建快捷键页面 (index 3)
+        from calibre_plugins.ask_ai_plugin.shortcuts_widget import ShortcutsWidget
         self.shortcuts_widget = ShortcutsWidget(self)
         self.tab_widget.addTab(self.shortcuts_widget, self.i18n['shortcuts'])
 
@@ -1791,8 +1889,49 @@ class TabDialog(QDialog):
         return True
 
 
-from calibre_plugins.ask_ai_plugin.response_handler import ResponseHandler
-from calibre_plugins.ask_ai_plugin.random_question import SuggestionHandler
+class PassageWorker(QThread):
+    """后台提取书籍正文、建立段落索引，并（可选）为问题检索段落"""
+    progress = pyqtSignal(int)
+    result = pyqtSignal(object, str)  # (问题或 None, 段落文本)
+    error_occurred = pyqtSignal(object, str)  # (问题或 None, 错误信息)
+
+    def __init__(self, book_id, path, fmt, query=None, max_chars=None, embed_fn=None):
+        super().__init__(None)  # 不设置父对象，避免随对话框一起销毁
+        import threading
+        from .book_passages import DEFAULT_MAX_PASSAGE_CHARS
+        self.book_id = book_id
+        self.path = path
+        self.fmt = fmt
+        self.query = query
+        self.max_chars = max_chars or DEFAULT_MAX_PASSAGE_CHARS
+        self.embed_fn = embed_fn
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def run(self):
+        from .book_passages import ExtractionCancelled, get_passage_store
+        try:
+            index = get_passage_store().build(
+                self.book_id, self.path, self.fmt,
+                cancel_event=self._cancel_event, progress=self.progress.emit,
+            )
+            if self.query is None:
+                self.result.emit(None, '')
+                return
+            indices = index.select_passages(self.query, self.max_chars, embed_fn=self.embed_fn)
+            self.result.emit(self.query, index.format_passages(indices))
+        except ExtractionCancelled:
+            logger.info(f"段落提取已取消: book_id={self.book_id}")
+        except Exception as e:
+            logger.error(f"段落提取失败 (book_id={self.book_id}): {str(e)}", exc_info=True)
+            self.error_occurred.emit(self.query, str(e))
+
+
+# 正在后台预热的 AI（避免快速重复打开对话框时重复请求）
+_preloading_ais = set()
+
 
 class AskDialog(QDialog):
     LANGUAGE_MAP = {
@@ -1926,7 +2065,9 @@ class AskDialog(QDialog):
         else:
             self.current_uid = self._generate_uid()
         
-        # 初始化处理器
+        # 初始化处理器（首次打开对话框时才加载 markdown2/bleach）
+        from calibre_plugins.ask_ai_plugin.response_handler import ResponseHandler
+        from calibre_plugins.ask_ai_plugin.random_question import SuggestionHandler
         self.response_handler = ResponseHandler(self)
         # 确保 SuggestionHandler 正确初始化
         self.suggestion_handler = SuggestionHandler(parent=self)
@@ -1969,9 +2110,24 @@ class AskDialog(QDialog):
             Qt.WindowTitleHint  # 显示标题栏
         )
         
+        # 追问时上一轮对话的 UID（多轮上下文）
+        self._conversation_parent_uid = None
+        
+        # 全书段落检索状态（模板使用 {passages} 时）
+        self._passage_worker = None
+        self._pending_passage_query = None
+        self._prepared_passages = None
+        
+        # 后台连接/模型预热（关闭对话框时取消）
+        self._prewarmers = []
+        
         # 创建 UI
         self.setup_ui()
         
+        # 模板需要书籍正文时，提前在后台提取并建立索引
+        if self._passages_template_active():
+            self._start_passage_worker()
+        
         # 设置处理器
         self.response_handler.setup(
             response_area=self.response_area,
@@ -1982,6 +2138,7 @@ class AskDialog(QDialog):
             stop_button=self.stop_button  # 添加停止按钮
         )
         self.suggestion_handler.setup(self.response_area, self.input_area, self.suggest_button, self.api, self.i18n, self.stop_button)
+        self._start_suggestion_prefetch()
         
         # 添加事件过滤器
         self.input_area.installEventFilter(self)
@@ -2083,7 +2240,7 @@ class AskDialog(QDialog):
     
     def _update_history_button_context(self, ai_id, timestamp, model_info=None):
         """将历史上下文写入历史按钮文本（替代独立灰字标签）。"""
-        from .config import get_prefs
+        from .plugin_prefs import get_prefs
         from .api import APIClient
         from .models.base import DEFAULT_MODELS
         
@@ -2179,12 +2336,8 @@ class AskDialog(QDialog):
             pubdate = pubdate.split('T')[0]
         
         # 检查书籍是否仍存在于数据库
-        try:
-            db = self.gui.current_db
-            db.get_metadata(book_info.id, index_is_id=True)
-            deleted = False
-        except Exception:
-            deleted = True
+        from .book_metadata import book_exists
+        deleted = not book_exists(self.gui.current_db, book_info.id)
         
         return {
             'id': book_info.id,
@@ -2249,7 +2402,7 @@ class AskDialog(QDialog):
     def _prepare_ai_search_metadata(self):
         """Ensure library metadata is cached before AI Search routing."""
         import logging
-        from calibre_plugins.ask_ai_plugin.config import get_prefs
+        from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
         from calibre_plugins.ask_ai_plugin.utils import update_library_metadata, get_library_metadata
 
         logger = logging.getLogger(__name__)
@@ -2265,13 +2418,24 @@ class AskDialog(QDialog):
             logger.warning(f"Failed to update library metadata for AI Search routing: {e}")
             return False
 
+    def _target_models(self):
+        """本次请求将发送到的模型 [(ai_id, model_config)]，用于按上下文窗口计算 token 预算"""
+        from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
+        prefs = get_prefs()
+        models_config = prefs.get('models', {})
+        if getattr(self, 'response_panels', None):
+            ai_ids = [panel.get_selected_ai() for panel in self.response_panels]
+        else:
+            ai_ids = [prefs.get('selected_model')]
+        return [(ai_id, models_config.get(ai_id, {})) for ai_id in ai_ids if ai_id]
+
     def _build_multi_book_prompt(self, question):
         """构建多书提示词（超过阈值时自动使用 compact 格式）"""
-        from calibre_plugins.ask_ai_plugin.config import get_prefs
-        from calibre_plugins.ask_ai_plugin.utils import format_books_compact_tsv, split_compact_tsv_lines
+        from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
+        from calibre_plugins.ask_ai_plugin.utils import LIBRARY_FORMAT_TSV, fit_books_compact
         from calibre_plugins.ask_ai_plugin.prompt_limits import (
             COMPACT_METADATA_THRESHOLD,
-            get_max_prompt_length,
+            get_prompt_budget,
         )
 
         prefs = get_prefs()
@@ -2290,27 +2454,20 @@ User question: {query}
 Please answer the question based on the above book information.""")
 
         if use_compact:
-            compact_lines = split_compact_tsv_lines(format_books_compact_tsv(self.books_info))
-            max_length = get_max_prompt_length(True, prefs)
-            overhead = len(template.format(books_metadata='', query=question)) + 200
-
-            included_lines = []
-            current_len = 0
-            for line in compact_lines:
-                add_len = len(line) + (1 if included_lines else 0)
-                if included_lines and current_len + add_len > max_length - overhead:
-                    break
-                included_lines.append(line)
-                current_len += add_len
-
-            books_metadata = '\n'.join(included_lines)
-            if len(included_lines) < book_count:
+            budget = get_prompt_budget(True, prefs, self._target_models())
+            books_metadata, included_count = fit_books_compact(
+                self.books_info,
+                budget,
+                template.format(books_metadata='', query=question),
+                prefs.get('library_prompt_format', LIBRARY_FORMAT_TSV),
+            )
+            if included_count < book_count:
                 note = self.i18n.get(
                     'multi_book_truncation_note',
                     'Note: Only the first {included} of {total} selected books are included due to the '
                     'prompt limit. Use AI Search to query your entire library, or raise the custom limit '
                     'in Plugin Configuration → General.'
-                ).format(included=len(included_lines), total=book_count)
+                ).format(included=included_count, total=book_count)
                 books_metadata = f"{books_metadata}\n\n{note}"
         else:
             books_metadata_text = []
@@ -2466,6 +2623,7 @@ Please answer the question based on the above book information.""")
         
         # 生成新的UID，确保新对话不会覆盖旧的历史记录
         self.current_uid = self._generate_uid()
+        self._conversation_parent_uid = None
         logger.info(f"新对话已生成新的UID: {self.current_uid}")
         
         # 清空输入区域
@@ -2497,18 +2655,15 @@ Please answer the question based on the above book information.""")
         
         
         # 重建书籍列表
-        books_info = []
-        book_ids_to_select = []  # 用于反向选择
+        book_ids_to_select = [book_meta['id'] for book_meta in history['books']]  # 用于反向选择
         
-        for book_meta in history['books']:
-            book_ids_to_select.append(book_meta['id'])
-            if not book_meta['deleted']:
-                try:
-                    db = self.gui.current_db
-                    mi = db.get_metadata(book_meta['id'], index_is_id=True)
-                    books_info.append(mi)
-                except Exception as e:
-                    logger.warning(f"无法加载书籍 {book_meta['id']}: {str(e)}")
+        from .book_metadata import load_books
+        books_info, missing = load_books(
+            self.gui.current_db,
+            [book_meta['id'] for book_meta in history['books'] if not book_meta['deleted']]
+        )
+        if missing:
+            logger.warning(f"无法加载书籍 {missing}")
         
         # 更新当前状态
         if books_info:
@@ -3003,8 +3158,11 @@ Please answer the question based on the above book information.""")
                         # 保持当前 UID，只有发起新对话时才会创建新 UID
                         break
             
-            # 如果找到匹配的历史记录，加载它
+            # 如果找到匹配的历史记录，加载它（索引条目不含回答，按需读取正文）
             if matched_history:
+                matched_history = self.response_handler.history_manager.get_history_by_uid(matched_history['uid'])
+                if not matched_history:
+                    return False
                 return self._load_history_content(matched_history)
             else:
                 logger.info("没有找到匹配的历史记录（书籍组合不同），显示新对话")
@@ -3115,10 +3273,16 @@ Please answer the question based on the above book information.""")
             layout = QHBoxLayout(container)
         
         layout.setContentsMargins(0, 0, 0, 0)
+        from .ui_constants import SPACING_SMALL
         layout.setSpacing(SPACING_SMALL)
         
         # 创建响应面板列表
         self.response_panels = []
+
+        # 所有面板共享一个渲染调度器，统一分配每帧的渲染预算
+        from calibre_plugins.ask_ai_plugin.response_handler import RenderScheduler
+        if getattr(self, 'render_scheduler', None) is None:
+            self.render_scheduler = RenderScheduler(self)
         
         # 获取已配置的AI列表
         configured_ais = self._get_configured_ais()
@@ -3255,6 +3419,10 @@ Please answer the question based on the above book information.""")
             stop_button=self.stop_button
         )
         
+        # 流式渲染交由对话框级调度器统一安排
+        if getattr(self, 'render_scheduler', None) is not None:
+            handler.set_render_scheduler(self.render_scheduler)
+        
         # 将handler和api关联到面板
         panel.setup_response_handler(handler)
         panel.api = panel_api  # 更新面板的API引用
@@ -3311,6 +3479,10 @@ Please answer the question based on the above book information.""")
             panel.ai_switcher.blockSignals(False)
             return True
         
+        # 自动分配时优先选择健康检查中可用且不慢的 AI
+        from .health import get_health_registry
+        auto_candidates = get_health_registry().rank([ai_id for ai_id, _ in configured_ais])
+
         # 为每个面板设置默认AI
         for i, panel in enumerate(self.response_panels):
             panel_key = f"panel_{i}"
@@ -3326,8 +3498,8 @@ Please answer the question based on the above book information.""")
                     target_ai = saved_ai_id
             elif i == 0 and any(ai_id == default_ai for ai_id, _ in configured_ais):
                 target_ai = default_ai
-            elif i < len(configured_ais):
-                target_ai = configured_ais[i][0]
+            elif i < len(auto_candidates):
+                target_ai = auto_candidates[i]
 
             if target_ai and set_panel_ai(panel, target_ai):
                 saved_selections[panel_key] = target_ai
@@ -3351,6 +3523,42 @@ Please answer the question based on the above book information.""")
         # 初始化完成，允许后续用户切换时触发默认AI确认逻辑
         for panel in self.response_panels:
             panel._is_initializing = False
+
+        self._start_prewarm([panel.get_selected_ai() for panel in self.response_panels])
+
+        from .health_dialog import apply_health_monitor_setting
+        apply_health_monitor_setting()
+
+    def _start_prewarm(self, ai_ids):
+        """后台预热面板选中的 AI：建立到提供商的连接，本地模型（Ollama）提前加载到内存
+        
+        用户按下发送时首个 token 不再包含 DNS/TLS 握手和模型冷加载时间。
+        关闭对话框时取消。
+        """
+        from .api import create_model
+        from .http_pool import Prewarmer, get_session, prewarm_connection
+
+        if not get_prefs().get('prewarm_connections', True):
+            return
+        ai_ids = [ai_id for ai_id in dict.fromkeys(ai_ids) if ai_id and ai_id not in _preloading_ais]
+        if not ai_ids:
+            return
+
+        def prewarm(cancel_event, ai_id):
+            _preloading_ais.add(ai_id)
+            try:
+                model = create_model(ai_id)
+                if model is None or cancel_event.is_set():
+                    return
+                prewarm_connection(model.get_prewarm_url(), get_session(model.HTTP_TRUST_ENV))
+                if not cancel_event.is_set():
+                    model.preload()
+            finally:
+                _preloading_ais.discard(ai_id)
+
+        prewarmer = Prewarmer()
+        prewarmer.start([lambda cancel_event, ai_id=ai_id: prewarm(cancel_event, ai_id) for ai_id in ai_ids])
+        self._prewarmers.append(prewarmer)
     
     def _check_default_ai_mismatch(self):
         """检查配置中的默认 AI 是否与当前选中的 AI 一致
@@ -3580,6 +3788,7 @@ Please answer the question based on the above book information.""")
             # 切换面板的API到选中的AI
             panel.api._switch_to_model(new_ai_id)
             logger.info(f"[面板AI切换] 面板{panel_index}: {new_ai_id}")
+            self._start_prewarm([new_ai_id])
         
         # 如果是第一个面板切换 AI，同步更新 API 使用的模型和默认 AI 配置
         # 这样随机问题和发送请求都会使用面板选中的 AI
@@ -3709,6 +3918,9 @@ Please answer the question based on the above book information.""")
         if self.response_panels:
             self.response_area = self.response_panels[0].response_area
             self.response_handler = self.response_panels[0].response_handler
+
+        # 输入时压缩流式渲染预算，保证打字流畅
+        self.input_area.textChanged.connect(self.render_scheduler.note_interaction)
     
     def _update_button_focus(self):
         """根据输入框内容动态切换按钮的高光状态"""
@@ -3802,7 +4014,16 @@ Please answer the question based on the above book information.""")
         self._is_generating_random_question = True
         
         # 使用选中的模型生成随机问题
-        self.suggestion_handler.generate(self.book_info, model_id=model_id)
+        book_ids = [book.id for book in self.books_info] if self.books_info else None
+        self.suggestion_handler.generate(self.book_info, model_id=model_id, book_ids=book_ids)
+
+    def _start_suggestion_prefetch(self):
+        """后台为当前书籍预生成随机问题（第一个面板的 AI），点击随机问题时立即显示"""
+        if not self.books_info or not getattr(self, 'response_panels', None):
+            return
+        model_id = self.response_panels[0].get_selected_ai()
+        if model_id:
+            self.suggestion_handler.prefetch(self.book_info, [book.id for book in self.books_info], model_id)
 
     def _show_ai_service_required_dialog(self):
         """显示需要AI服务的提示对话框"""
@@ -3824,7 +4045,7 @@ Please answer the question based on the above book information.""")
     
     def _check_auth_token(self):
         """检查当前选择的模型是否设置了API Key"""
-        from calibre_plugins.ask_ai_plugin.config import get_prefs
+        from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
         
         prefs = get_prefs()
         selected_model = prefs.get('selected_model', 'grok')
@@ -3854,10 +4075,96 @@ Please answer the question based on the above book information.""")
         
         return True
     
+    def _passages_template_active(self, template=None):
+        """单书模式且模板包含 {passages} 变量"""
+        if self.is_multi_book or not self.books_info:
+            return False
+        from .book_passages import template_uses_passages
+        if template is None:
+            template = get_prefs().get('template', '')
+        return template_uses_passages(template)
+    
+    def _start_passage_worker(self, query=None):
+        """启动段落提取/检索线程；书籍没有可提取格式时返回 False"""
+        from .book_passages import find_book_format
+        fmt, path = find_book_format(self.gui.current_db, self.book_info.id)
+        if fmt is None:
+            logger.info(f"书籍没有可提取正文的格式: book_id={self.book_info.id}")
+            return False
+        prefs = get_prefs()
+        embed_fn = None
+        if query is not None and prefs.get('book_passages_use_embeddings', False):
+            from .semantic_index import get_embedder
+            embed_fn, _ = get_embedder(prefs)
+        worker = PassageWorker(
+            self.book_info.id, path, fmt, query=query,
+            max_chars=prefs.get('book_passages_max_chars'), embed_fn=embed_fn,
+        )
+        worker.progress.connect(self._on_passage_progress)
+        worker.result.connect(self._on_passages_ready)
+        worker.error_occurred.connect(self._on_passages_failed)
+        worker.finished.connect(worker.deleteLater)
+        self._passage_worker = worker
+        worker.start()
+        return True
+    
+    def _request_passages(self, question):
+        """为问题检索段落；完成后 send_question 会被再次调用"""
+        self._pending_passage_query = question
+        if self._passage_worker is not None:
+            # 预加载仍在进行，完成后再检索
+            return
+        if not self._start_passage_worker(question):
+            self._prepared_passages = (question, self._passages_unavailable_text())
+            self._pending_passage_query = None
+            self.send_question()
+    
+    def _take_prepared_passages(self, question):
+        prepared = self._prepared_passages
+        if prepared is not None and prepared[0] == question:
+            self._prepared_passages = None
+            return prepared[1]
+        return None
+    
+    def _passages_unavailable_text(self):
+        return self.i18n.get('book_passages_unavailable',
+            '(No readable book text is available; EPUB, AZW3 or TXT format is required.)')
+    
+    def _on_passage_progress(self, percent):
+        if hasattr(self, 'metadata_bar') and self.metadata_bar:
+            status = self.i18n.get('book_passages_indexing', 'Reading book text… {percent}%')
+            self.metadata_bar.set_status(status.format(percent=percent) if percent < 100 else '')
+    
+    def _on_passages_ready(self, query, passages):
+        self._passage_worker = None
+        if hasattr(self, 'metadata_bar') and self.metadata_bar:
+            self.metadata_bar.set_status('')
+        pending = self._pending_passage_query
+        if pending is None:
+            return
+        if query == pending:
+            self._pending_passage_query = None
+            self._prepared_passages = (query, passages)
+            self.send_question()
+        else:
+            # 预加载刚完成（索引已缓存），为排队的问题检索
+            self._start_passage_worker(pending)
+    
+    def _on_passages_failed(self, query, error):
+        self._passage_worker = None
+        if hasattr(self, 'metadata_bar') and self.metadata_bar:
+            self.metadata_bar.set_status('')
+        pending = self._pending_passage_query
+        if pending is None:
+            return
+        self._pending_passage_query = None
+        self._prepared_passages = (pending, self._passages_unavailable_text())
+        self.send_question()
+    
     def send_question(self):
         """发送问题"""
         import logging
-        from calibre_plugins.ask_ai_plugin.config import get_prefs
+        from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
         from calibre_plugins.ask_ai_plugin.prompt_limits import (
             LARGE_SELECTION_THRESHOLD,
             count_books_in_library_metadata,
@@ -3872,12 +4179,18 @@ Please answer the question based on the above book information.""")
         # 如果不是随机问题，检查当前UID是否已有历史记录
         if not is_random_question:
             if hasattr(self, 'response_handler') and hasattr(self.response_handler, 'history_manager'):
-                if self.current_uid in self.response_handler.history_manager.histories:
+                if self.response_handler.history_manager.has_history(self.current_uid):
                     old_uid = self.current_uid
                     self.current_uid = self._generate_uid()
                     logger.info(f"检测到已有历史记录，生成新UID: {old_uid} -> {self.current_uid}")
+                    # 追问：新记录链接到上一轮，之前的轮次作为多轮上下文发送（AI Search 除外）
+                    if self.books_info and get_prefs().get('conversation_context_enabled', True):
+                        self._conversation_parent_uid = old_uid
+                    else:
+                        self._conversation_parent_uid = None
         else:
             logger.info("随机问题请求，使用已创建的新会话UID")
+            self._conversation_parent_uid = None
             # 清除临时存储中的待发送随机问题（因为用户已经点击发送）
             book_ids = tuple(sorted([book.id for book in self.books_info]))
             prefs = get_prefs()
@@ -3906,6 +4219,8 @@ Please answer the question based on the above book information.""")
             use_library_chat = False
             book_count_for_validation = len(self.books_info)
             validation_is_multi = self.is_multi_book
+            is_follow_up = self._conversation_parent_uid is not None
+            follow_up_passages = None
 
             # 大规模选书：引导使用 AI Search 或 compact 多书模式
             if self.is_multi_book and len(self.books_info) > LARGE_SELECTION_THRESHOLD:
@@ -3927,76 +4242,34 @@ Please answer the question based on the above book information.""")
                     logger.info("大规模选书继续使用 compact 多书模式")
                     prompt = self._build_multi_book_prompt(question)
             elif self.is_multi_book:
-                # 多书模式：使用多书提示词
+                # 多书模式：使用多书提示词（追问时书籍信息已在首轮中，不再重复发送）
                 logger.info("使用多书模式构建提示词...")
-                prompt = self._build_multi_book_prompt(question)
+                prompt = question if is_follow_up else self._build_multi_book_prompt(question)
             else:
-                # 单书模式：使用原有逻辑
+                # 单书模式：使用单书模板
                 logger.info("使用单书模式构建提示词...")
+                from .utils import build_single_book_prompt
                 
-                # 安全地获取书籍的作者或作者列表
-                try:
-                    authors = self.book_info.authors if hasattr(self.book_info, 'authors') else []
-                    author_str = ', '.join(authors) if authors else self.i18n.get('unknown', 'Unknown')
-                except AttributeError:
-                    author_str = self.i18n.get('unknown', 'Unknown')
-                
-                # 安全地获取书籍的出版年份
-                try:
-                    pubyear = ''
-                    if hasattr(self.book_info, 'pubdate') and self.book_info.pubdate:
-                        if hasattr(self.book_info.pubdate, 'year'):
-                            pubyear = str(self.book_info.pubdate.year)
-                        else:
-                            pubyear = str(self.book_info.pubdate)
-                    else:
-                        pubyear = self.i18n.get('unknown', 'Unknown')
-                except Exception as e:
-                    logger.error(f"获取出版年份时出错: {str(e)}")
-                    pubyear = self.i18n.get('unknown', 'Unknown')
-                
-                # 安全地获取书籍的语言类别
-                try:
-                    language = self.book_info.language
-                    language_name = self.get_language_name(language) if language else self.i18n.get('unknown', 'Unknown')
-                except (AttributeError, KeyError) as e:
-                    language_name = self.i18n.get('unknown', 'Unknown')
-                
-                # 安全地获取书籍的系列名
-                try:
-                    series = self.book_info.series if hasattr(self.book_info, 'series') and self.book_info.series else self.i18n.get('unknown', 'Unknown')
-                except AttributeError:
-                    series = self.i18n.get('unknown', 'Unknown')
-                
-                # 准备模板变量
-                template_vars = {
-                    'query': question.replace('\u2028', '\n').replace('\u2029', '\n').encode('utf-8').decode('utf-8'),
-                    'title': getattr(self.book_info, 'title', self.i18n.get('unknown', 'Unknown')).replace('\u2028', '\n').replace('\u2029', '\n').encode('utf-8').decode('utf-8'),
-                    'author': author_str.replace('\u2028', '\n').replace('\u2029', '\n').encode('utf-8').decode('utf-8'),
-                    'publisher': (getattr(self.book_info, 'publisher', '') or '').replace('\u2028', '\n').replace('\u2029', '\n').encode('utf-8').decode('utf-8'),
-                    'pubyear': str(pubyear).replace('\u2028', '\n').replace('\u2029', '\n').encode('utf-8').decode('utf-8') if pubyear else '',
-                    'language': language_name.replace('\u2028', '\n').replace('\u2029', '\n').encode('utf-8').decode('utf-8') if language_name else '',
-                    'series': series.replace('\u2028', '\n').replace('\u2029', '\n').encode('utf-8').decode('utf-8') if series else ''
-                }
-                
-                # 获取配置的模板
+                # 获取配置的模板（为空时 build_single_book_prompt 使用默认模板）
                 prefs = get_prefs()
                 template = prefs.get('template', '')
-                
-                # 如果模板为空，使用默认模板
-                if not template:
-                    template = "User query: {query}\nBook title: {title}\nAuthor: {author}\nPublisher: {publisher}\nPublication year: {pubyear}\nLanguage: {language}\nSeries: {series}"
-                
                 logger.info(f"使用的模板: {template}")
                 
-                # 检查并替换模板中的变量名，确保用户输入能够正确插入
-                if '{query}' not in template and '{question}' in template:
-                    logger.info("检测到旧版模板变量 {question}，自动替换为 {query}")
-                    template = template.replace('{question}', '{query}')
+                # 全书段落：先在后台检索，完成后自动重新发送
+                passages = ''
+                if self._passages_template_active(template):
+                    passages = self._take_prepared_passages(question)
+                    if passages is None:
+                        self._request_passages(question)
+                        return
+                    follow_up_passages = passages
                 
                 # 格式化提示词
                 try:
-                    prompt = template.format(**template_vars)
+                    prompt = build_single_book_prompt(
+                        self.book_info, question, template, self.i18n,
+                        language_name_fn=self.get_language_name, passages=passages,
+                    )
                 except KeyError as e:
                     self.response_handler.handle_error(self.i18n.get('template_error', 'Template error: {error}').format(error=str(e)))
                     return
@@ -4005,6 +4278,12 @@ Please answer the question based on the above book information.""")
                 from calibre_plugins.ask_ai_plugin.prompts_widget import apply_prompt_enhancements
                 prompt = apply_prompt_enhancements(prompt)
             
+            # 追问只发送新问题，书籍信息和之前的回答通过多轮上下文发送
+            if is_follow_up and not use_library_chat:
+                from .conversation import follow_up_prompt
+                prompt = follow_up_prompt(question, follow_up_passages)
+                logger.info(f"追问模式，上一轮 UID: {self._conversation_parent_uid}")
+            
             logger.info(f"最终提示词长度: {len(prompt)}")
             
         except Exception as e:
@@ -4015,6 +4294,7 @@ Please answer the question based on the above book information.""")
         if not use_library_chat:
             length_error = validate_prompt_length(
                 prompt, validation_is_multi, prefs, self.i18n, book_count_for_validation,
+                models=self._target_models(),
             )
             if length_error:
                 self.response_handler.handle_error(length_error)
@@ -4039,6 +4319,8 @@ Please answer the question based on the above book information.""")
             else:
                 logger.warning("AI搜索模式但无元数据")
         
+        conversation_parent_uid = None if use_library_chat else self._conversation_parent_uid
+        
         # 开始异步请求 - 并行发送到所有面板
         parallel_start_time = time.time()
         try:
@@ -4052,14 +4334,20 @@ Please answer the question based on the above book information.""")
                     if selected_ai:
                         request_time = time.time()
                         elapsed_ms = (request_time - parallel_start_time) * 1000
-                        panel.send_request(prompt, model_id=selected_ai, use_library_chat=use_library_chat)
+                        panel.send_request(
+                            prompt, model_id=selected_ai, use_library_chat=use_library_chat,
+                            conversation_parent_uid=conversation_parent_uid,
+                        )
                     else:
                         logger.warning(f"面板 {panel.panel_index} 没有选中AI，跳过")
                 total_time = (time.time() - parallel_start_time) * 1000
                 logger.info(f"所有请求已发出，总耗时: {total_time:.2f}ms，面板数: {len(self.response_panels)}")
             else:
                 # 向后兼容：单面板模式
-                self.response_handler.start_async_request(prompt, use_library_chat=use_library_chat)
+                self.response_handler.start_async_request(
+                    prompt, use_library_chat=use_library_chat,
+                    conversation_parent_uid=conversation_parent_uid,
+                )
                 logger.info(f"异步请求已启动（单面板模式），use_library_chat={use_library_chat}")
         except Exception as e:
             logger.error(f"启动异步请求时出错: {str(e)}")
@@ -4126,7 +4414,7 @@ Please answer the question based on the above book information.""")
         
         # 如果没有指定语言，从配置中获取
         if not new_language:
-            from calibre_plugins.ask_ai_plugin.config import get_prefs
+            from calibre_plugins.ask_ai_plugin.plugin_prefs import get_prefs
             prefs = get_prefs()
             new_language = prefs.get('language', 'en')
         
@@ -4169,6 +4457,14 @@ Please answer the question based on the above book information.""")
         import logging
         logger = logging.getLogger(__name__)
 
+        if self._passage_worker is not None:
+            self._passage_worker.cancel()
+            self._pending_passage_query = None
+
+        for prewarmer in self._prewarmers:
+            prewarmer.cancel()
+        self._prewarmers = []
+
         from .ui_constants import reset_application_cursor
         reset_application_cursor()
 
@@ -4202,6 +4498,42 @@ Please answer the question based on the above book information.""")
             prefs['pending_random_questions'] = pending_questions
             logger.info(f"保存待发送的随机问题到临时存储: book_ids={book_ids}, uid={self.current_uid}")
         
+        # 历史记录维护：保留策略 + 归档旧回答（每次最多处理一批，避免关闭卡顿）
+        if hasattr(self, 'response_handler') and self.response_handler:
+            self.response_handler.history_manager.run_maintenance(prefs)
+
+        # 持久化历史回答的渲染缓存（未开启持久化时为空操作）
+        try:
+            from .response_handler import get_rendered_html_cache
+            get_rendered_html_cache().save()
+        except Exception as e:
+            logger.warning(f"[ASKDIALOG_CLOSE] 保存渲染缓存失败: {str(e)}")
+
+        # 写回统计数据（平时由后台定时写入）
+        try:
+            from .stats_store import get_stats_store
+            get_stats_store().flush()
+        except Exception as e:
+            logger.warning(f"[ASKDIALOG_CLOSE] 保存统计数据失败: {str(e)}")
+
+        # 写回 token 校准数据（平时由后台定时写入）
+        try:
+            from .usage import get_token_calibration
+            get_token_calibration().flush()
+        except Exception as e:
+            logger.warning(f"[ASKDIALOG_CLOSE] 保存 token 校准数据失败: {str(e)}")
+
+        # 写出性能分析直方图（未开启性能分析时为空操作）
+        try:
+            from .profiling import get_profiler
+            get_profiler().flush()
+        except Exception as e:
+            logger.warning(f"[ASKDIALOG_CLOSE] 保存性能分析数据失败: {str(e)}")
+
+        if getattr(self, 'render_scheduler', None) is not None:
+            self.render_scheduler.stop()
+            logger.debug(f"[ASKDIALOG_CLOSE] 渲染帧统计: {self.render_scheduler.stats()}")
+
         if hasattr(self, 'response_handler') and self.response_handler:
             self.response_handler.prepare_close()
             if hasattr(self.response_handler, 'cleanup'):
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Normalised provider token usage, cost estimates and token-estimator calibration."""
+
+import json
+import logging
+import os
+import threading
+
+try:
+    from .json_store import atomic_write_text, load_versioned_json
+except ImportError:
+    from json_store import atomic_write_text, load_versioned_json
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = ('input', 'cached_input', 'output', 'reasoning')
+
+# 价格表：{模型名或前缀: {'input': x, 'cached_input': y, 'output': z}}，单位为每百万 token 的价格
+PRICE_FIELDS = ('input', 'cached_input', 'output')
+PRICE_UNIT = 1_000_000
+
+CALIBRATION_FILE_NAME = 'ask_ai_plugin_token_calibration.json'
+_CALIBRATION_VERSION = 1
+# 输入太短时固定开销（系统消息、对话模板）占比大，不用于校准
+CALIBRATION_MIN_TOKENS = 1000
+# 至少有这么多样本才使用校准系数
+CALIBRATION_MIN_SAMPLES = 3
+# 校准数据在最近一次记录后延迟写入（秒）
+CALIBRATION_FLUSH_DELAY = 5.0
+# 指数滑动平均的权重
+CALIBRATION_ALPHA = 0.2
+# 校准系数的范围；下限避免估算值过小导致服务端 400
+CALIBRATION_MIN_FACTOR = 0.8
+CALIBRATION_MAX_FACTOR = 2.0
+
+
+def _count(value):
+    try:
+        return max(0, int(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def make_usage(input=0, cached_input=0, output=0, reasoning=0):
+    """统一的用量格式：input 含缓存命中部分（cached_input），output 含推理部分（reasoning）"""
+    return {'input': _count(input), 'cached_input': _count(cached_input),
+            'output': _count(output), 'reasoning': _count(reasoning)}
+
+
+def from_openai(data):
+    """
+    OpenAI 兼容接口的 usage（流式请求需要 stream_options.include_usage，用量在最后一个片段中）
+
+    :param data: 响应或片段 JSON
+    :return: 用量字典；没有 usage 时返回 None
+    """
+    usage = (data or {}).get('usage')
+    if not isinstance(usage, dict) or 'prompt_tokens' not in usage:
+        return None
+    prompt_details = usage.get('prompt_tokens_details') or {}
+    completion_details = usage.get('completion_tokens_details') or {}
+    # DeepSeek 使用 prompt_cache_hit_tokens
+    cached = prompt_details.get('cached_tokens') or usage.get('prompt_cache_hit_tokens')
+    return make_usage(usage.get('prompt_tokens'), cached, usage.get('completion_tokens'),
+                      completion_details.get('reasoning_tokens'))
+
+
+def from_anthropic(data):
+    """
+    Anthropic 的 usage：非流式响应、message_start（message.usage）或 message_delta（usage）
+
+    input_tokens 不含缓存读写部分，这里把它们加回输入总数。
+    """
+    data = data or {}
+    usage = data.get('usage')
+    if usage is None and isinstance(data.get('message'), dict):
+        usage = data['message'].get('usage')
+    if not isinstance(usage, dict):
+        return None
+    cache_read = _count(usage.get('cache_read_input_tokens'))
+    cache_write = _count(usage.get('cache_creation_input_tokens'))
+    return make_usage(_count(usage.get('input_tokens')) + cache_read + cache_write, cache_read,
+                      usage.get('output_tokens'))
+
+
+def from_gemini(data):
+    """Gemini 的 usageMetadata；candidatesTokenCount 不含思考部分，输出计入两者之和"""
+    metadata = (data or {}).get('usageMetadata')
+    if not isinstance(metadata, dict):
+        return None
+    thoughts = _count(metadata.get('thoughtsTokenCount'))
+    return make_usage(metadata.get('promptTokenCount'), metadata.get('cachedContentTokenCount'),
+                      _count(metadata.get('candidatesTokenCount')) + thoughts, thoughts)
+
+
+def from_ollama(data):
+    """Ollama 最后一个片段（done 为 true）中的 prompt_eval_count / eval_count"""
+    data = data or {}
+    if 'eval_count' not in data and 'prompt_eval_count' not in data:
+        return None
+    return make_usage(data.get('prompt_eval_count'), 0, data.get('eval_count'))
+
+
+def merge_usage(current, update):
+    """
+    合并同一次回答中多次报告的用量（流式片段中的数值是累计值，取较大者）
+
+    :return: 合并结果；两者都为 None 时返回 None
+    """
+    if not update:
+        return current
+    if not current:
+        return dict(update)
+    return {field: max(current.get(field, 0), update.get(field, 0)) for field in USAGE_FIELDS}
+
+
+def add_usage(total, usage):
+    """累加用量（汇总多次回答）"""
+    total = dict(total or make_usage())
+    for field in USAGE_FIELDS:
+        total[field] = total.get(field, 0) + _count((usage or {}).get(field))
+    return total
+
+
+def _normalize_model_name(model_name):
+    return (model_name or '').strip().lower()
+
+
+def find_price(model_name, prices):
+    """
+    在价格表中查找模型：先精确匹配，再取最长的前缀匹配（也匹配去掉 "vendor/" 前缀后的模型名）
+
+    :return: 价格字典；没有匹配时返回 None
+    """
+    name = _normalize_model_name(model_name)
+    if not name or not prices:
+        return None
+    candidates = (name, name.rsplit('/', 1)[-1])
+    best, best_length = None, -1
+    for pattern, price in prices.items():
+        pattern = _normalize_model_name(pattern)
+        if not pattern:
+            continue
+        for candidate in candidates:
+            if candidate == pattern:
+                return price
+            if candidate.startswith(pattern) and len(pattern) > best_length:
+                best, best_length = price, len(pattern)
+    return best
+
+
+def estimate_cost(usage, price):
+    """
+    按价格表估算一次回答的费用；缓存命中的输入没有单独价格时按输入价格计算
+
+    :return: 费用（与价格表同一货币）；缺少用量或价格时返回 None
+    """
+    if not usage or not price:
+        return None
+    input_price = float(price.get('input') or 0)
+    cached_price = price.get('cached_input')
+    cached_price = input_price if cached_price in (None, '') else float(cached_price)
+    cached = min(usage.get('cached_input', 0), usage.get('input', 0))
+    cost = ((usage.get('input', 0) - cached) * input_price
+            + cached * cached_price
+            + usage.get('output', 0) * float(price.get('output') or 0))
+    return cost / PRICE_UNIT
+
+
+def parse_price_table(text):
+    """
+    解析价格表文本，每行 ``模型: 输入, 缓存输入, 输出``（缓存输入可省略：``模型: 输入, 输出``）
+
+    :return: (价格表, 无法解析的行号列表)
+    """
+    prices, bad_lines = {}, []
+    for number, line in enumerate((text or '').splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        model, sep, values = line.rpartition(':')
+        try:
+            if not sep or not model.strip():
+                raise ValueError(line)
+            numbers = [float(value) for value in values.split(',')]
+            if len(numbers) == 2:
+                numbers.insert(1, None)
+            if len(numbers) != 3 or any(value is not None and value < 0 for value in numbers):
+                raise ValueError(line)
+        except ValueError:
+            bad_lines.append(number)
+            continue
+        prices[model.strip()] = {field: value for field, value in zip(PRICE_FIELDS, numbers)
+                                 if value is not None}
+    return prices, bad_lines
+
+
+def format_price_table(prices):
+    """把价格表格式化为 parse_price_table 接受的文本"""
+    def fmt(value):
+        return f'{value:g}'
+
+    lines = []
+    for model, price in sorted((prices or {}).items()):
+        values = [fmt(price.get('input', 0))]
+        if price.get('cached_input') is not None:
+            values.append(fmt(price['cached_input']))
+        values.append(fmt(price.get('output', 0)))
+        lines.append(f"{model}: {', '.join(values)}")
+    return '\n'.join(lines)
+
+
+class TokenCalibration:
+    """
+    按模型记录实际输入 token 数与 token_estimator 估算值（未加安全系数）之比
+
+    PromptBudget 用这个系数修正估算，使上下文预算接近真实分词结果。
+    """
+
+    def __init__(self, path=None, min_samples=CALIBRATION_MIN_SAMPLES, alpha=CALIBRATION_ALPHA,
+                 flush_delay=CALIBRATION_FLUSH_DELAY):
+        self.path = path
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._flush_timer = None
+        self._dirty = False
+        data = load_versioned_json(path, _CALIBRATION_VERSION)
+        self._entries = dict(data.get('entries', {})) if data else {}
+
+    def flush(self):
+        """写回有改动的校准数据（平时在记录后延迟写入，对话框关闭时立即写入）"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty or not self.path:
+                return
+            payload = json.dumps({'version': _CALIBRATION_VERSION, 'entries': self._entries},
+                                 ensure_ascii=False)
+            self._dirty = False
+        try:
+            atomic_write_text(self.path, payload)
+        except Exception as e:
+            logger.error(f"保存 token 校准数据失败: {e}")
+
+    def _schedule_flush(self):
+        # 调用方持有锁
+        self._dirty = True
+        if not self.path or self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def record(self, key, estimated, actual, chars=0):
+        """
+        记录一次请求
+
+        :param key: 模型名
+        :param estimated: estimate_tokens_raw 的估算值
+        :param actual: 提供商报告的输入 token 数
+        :param chars: 提示词字符数（用于显示每 token 字符数）
+        :return: 是否被采用（输入太短或数值无效时忽略）
+        """
+        key = _normalize_model_name(key)
+        if not key or not estimated or estimated <= 0 or actual < CALIBRATION_MIN_TOKENS:
+            return False
+        ratio = actual / estimated
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {'ratio': ratio, 'samples': 0, 'chars': 0, 'tokens': 0}
+            else:
+                entry['ratio'] += self.alpha * (ratio - entry['ratio'])
+            entry['samples'] += 1
+            entry['chars'] += max(0, int(chars))
+            entry['tokens'] += int(actual)
+            self._schedule_flush()
+        return True
+
+    def factor(self, key):
+        """估算值的修正系数；样本不足时返回 1.0"""
+        with self._lock:
+            entry = self._entries.get(_normalize_model_name(key))
+            if not entry or entry['samples'] < self.min_samples:
+                return 1.0
+            return min(CALIBRATION_MAX_FACTOR, max(CALIBRATION_MIN_FACTOR, entry['ratio']))
+
+    def chars_per_token(self, key):
+        """实测的每 token 字符数；没有数据时返回 None"""
+        with self._lock:
+            entry = self._entries.get(_normalize_model_name(key))
+            if not entry or not entry['tokens'] or not entry['chars']:
+                return None
+            return entry['chars'] / entry['tokens']
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+        self.flush()
+
+
+_calibration = None
+_calibration_lock = threading.Lock()
+
+
+def get_token_calibration(base_dir=None):
+    """进程内共享的 token 估算校准数据"""
+    global _calibration
+    with _calibration_lock:
+        if _calibration is None:
+            if base_dir is None:
+                from calibre.utils.config import config_dir
+                base_dir = os.path.join(config_dir, 'plugins')
+            _calibration = TokenCalibration(os.path.join(base_dir, CALIBRATION_FILE_NAME))
+        return _calibration
@@ -116,6 +116,158 @@ def format_books_compact_tsv(books):
     return '\n'.join(lines)
 
 
+# 紧凑书目格式：tsv（id|title|authors）或 dictionary（作者/系列字典 + 短代码）
+LIBRARY_FORMAT_TSV = 'tsv'
+LIBRARY_FORMAT_DICTIONARY = 'dictionary'
+
+# 字典格式的说明块：模型无需外部解码器即可还原作者/系列并生成 calibre://book/ID 链接
+DICTIONARY_FORMAT_INSTRUCTIONS = (
+    'Book list format: lines under SERIES define short codes (s1=Name). Under BOOKS, a line '
+    'starting with @ gives the author(s) of the books listed below it, one book per line as '
+    'id|title|series, where series is a code from SERIES or a literal name and may be omitted. '
+    'Expand codes to full names in your answer and always use the id column for calibre://book/ID links.'
+)
+
+# 只为出现多次、且比代码本身长的系列分配代码
+_DICTIONARY_MIN_COUNT = 2
+_DICTIONARY_MIN_LENGTH = 4
+_BASE36 = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def _short_code(prefix, index):
+    """s1, s2, ... sz, s10, ...（base36，尽量短）"""
+    digits = ''
+    index += 1
+    while index:
+        index, rem = divmod(index, 36)
+        digits = _BASE36[rem] + digits
+    return prefix + digits
+
+
+def _compact_book_fields(book):
+    """返回 (id, title, authors, series)，已清理为单行文本"""
+    if isinstance(book, dict):
+        book_id = book.get('id', '')
+        title = book.get('title', 'Unknown') or 'Unknown'
+        authors = book.get('authors', 'Unknown') or 'Unknown'
+        series = book.get('series') or ''
+    else:
+        book_id = getattr(book, 'id', '')
+        title = getattr(book, 'title', None) or 'Unknown'
+        author_list = getattr(book, 'authors', None) or ['Unknown']
+        authors = ', '.join(author_list) if author_list else 'Unknown'
+        series = getattr(book, 'series', None) or ''
+    return (
+        book_id,
+        _sanitize_metadata_field(title),
+        _sanitize_metadata_field(authors),
+        _sanitize_metadata_field(series) if series else '',
+    )
+
+
+def encode_books_dictionary(books):
+    """
+    字典编码书目：按作者分组排序，每组只写一次作者；重复的系列用短代码代替
+
+    每行都写作者代码并不省 token（短代码和常见人名的 token 数相当），
+    真正的节省来自分组后作者只出现一次，以及长系列名的去重。
+
+    :return: [(新定义的系列代码行, 书目行)]，每本书一组，可按组截断
+    """
+    rows = [_compact_book_fields(book) for book in books]
+    series_counts = {}
+    for _, _, _, series in rows:
+        if series:
+            series_counts[series] = series_counts.get(series, 0) + 1
+
+    rows.sort(key=lambda row: (row[2].casefold(), row[3].casefold(), row[1].casefold(), str(row[0])))
+
+    series_codes = {}
+    groups = []
+    current_authors = None
+    for book_id, title, authors, series in rows:
+        definitions = []
+        lines = []
+        if authors != current_authors:
+            current_authors = authors
+            lines.append(f"@{authors}")
+        series_ref = series
+        if series and series_counts[series] >= _DICTIONARY_MIN_COUNT and len(series) >= _DICTIONARY_MIN_LENGTH:
+            if series not in series_codes:
+                series_codes[series] = _short_code('s', len(series_codes))
+                definitions.append(f"{series_codes[series]}={series}")
+            series_ref = series_codes[series]
+        row = f"{book_id}|{title}"
+        if series_ref:
+            row += f"|{series_ref}"
+        lines.append(row)
+        groups.append((definitions, lines))
+    return groups
+
+
+def assemble_books_dictionary(groups):
+    """把（可能已截断的）编码结果拼成 SERIES / BOOKS 两段文本"""
+    series_lines = []
+    book_lines = []
+    for definitions, lines in groups:
+        series_lines.extend(definitions)
+        book_lines.extend(lines)
+    sections = [DICTIONARY_FORMAT_INSTRUCTIONS]
+    if series_lines:
+        sections.append('SERIES\n' + '\n'.join(series_lines))
+    sections.append('BOOKS\n' + '\n'.join(book_lines))
+    return '\n\n'.join(sections)
+
+
+def format_books_compact(books, encoding=LIBRARY_FORMAT_TSV):
+    """按指定紧凑格式输出书目（不截断）"""
+    if encoding == LIBRARY_FORMAT_DICTIONARY:
+        return assemble_books_dictionary(encode_books_dictionary(books))
+    return format_books_compact_tsv(books)
+
+
+def fit_books_compact(books, budget, overhead_text='', encoding=LIBRARY_FORMAT_TSV):
+    """
+    按提示词预算截断并输出紧凑书目
+
+    :param budget: prompt_limits.PromptBudget
+    :return: (书目文本, 实际包含的书籍数)
+    """
+    if encoding == LIBRARY_FORMAT_DICTIONARY:
+        # 说明块和段标题也计入开销
+        overhead = f"{overhead_text}\n{DICTIONARY_FORMAT_INSTRUCTIONS}\nSERIES\nBOOKS"
+
+        def fits(count):
+            groups = encode_books_dictionary(books[:count])
+            return len(budget.fit_groups([definitions + lines for definitions, lines in groups], overhead)) == count
+
+        # books 按相关度排序：先按排名截断（二分查找放得下的前 count 本），再按作者分组显示
+        count, high = min(1, len(books)), len(books)
+        while count < high:
+            middle = (count + high + 1) // 2
+            if fits(middle):
+                count = middle
+            else:
+                high = middle - 1
+        return assemble_books_dictionary(encode_books_dictionary(books[:count])), count
+    lines = split_compact_tsv_lines(format_books_compact_tsv(books))
+    included = budget.fit_lines(lines, overhead_text)
+    return '\n'.join(included), len(included)
+
+
+def load_cached_library_books(prefs):
+    """解析缓存的图书馆元数据，返回书籍列表；无缓存或格式不对时返回 None"""
+    cached_metadata = get_library_metadata(prefs)
+    if not cached_metadata:
+        return None
+    try:
+        import json
+        books = json.loads(cached_metadata)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    return books if isinstance(books, list) else None
+
+
 def format_library_metadata_for_prompt(prefs):
     """Convert cached library JSON metadata to compact TSV for prompts."""
     cached_metadata = get_library_metadata(prefs)
@@ -133,7 +285,7 @@ def format_library_metadata_for_prompt(prefs):
 
 def update_library_metadata(db, prefs):
     """
-    提取图书馆元数据（仅书名和作者名），索引全库
+    提取图书馆元数据（书名、作者名和系列），索引全库
     
     :param db: Calibre数据库对象
     :param prefs: 插件配置对象
@@ -150,22 +302,25 @@ def update_library_metadata(db, prefs):
             # 如果new_api不可用，尝试使用旧API
             book_ids = list(db.data.search_getting_ids('', db.FIELD_MAP['search']))
         
+        # 只批量读取书名、作者和系列，不为每本书构造完整 Metadata
+        try:
+            from .book_metadata import load_books
+        except ImportError:
+            from book_metadata import load_books
+        records, failed = load_books(db, book_ids, fields=('title', 'authors', 'series'))
+        if failed:
+            logger.warning(f"Failed to get metadata for {len(failed)} books: {failed[:20]}")
         books = []
-        for book_id in book_ids:
-            try:
-                # 使用 index_is_id=True 确保正确获取元数据
-                mi = db.get_metadata(book_id, index_is_id=True)
-                if mi:
-                    books.append({
-                        'id': book_id,
-                        'title': mi.title or 'Unknown',
-                        'authors': ', '.join(mi.authors or ['Unknown'])
-                    })
-                else:
-                    logger.warning(f"Book {book_id} metadata is None, skipping")
-            except Exception as e:
-                logger.warning(f"Failed to get metadata for book {book_id}: {e}")
-                continue
+        for record in records:
+            book = {
+                'id': record.id,
+                'title': record.title or 'Unknown',
+                'authors': ', '.join(record.authors or ['Unknown'])
+            }
+            # 系列仅在有值时保存（字典编码格式使用）
+            if record.series:
+                book['series'] = record.series
+            books.append(book)
         
         # 保存为JSON字符串
         prefs['library_cached_metadata'] = json.dumps(books, ensure_ascii=False)
@@ -178,6 +333,17 @@ def update_library_metadata(db, prefs):
         except Exception as stat_error:
             logger.warning(f"Failed to update book count in statistics: {stat_error}")
         
+        # 增量更新语义索引（后台嵌入，不阻塞）
+        if prefs.get('ai_search_semantic_enabled', False):
+            try:
+                try:
+                    from .semantic_index import start_index_update
+                except ImportError:
+                    from semantic_index import start_index_update
+                start_index_update(db, prefs)
+            except Exception as index_error:
+                logger.warning(f"Failed to start semantic index update: {index_error}")
+        
         logger.info(f"Successfully updated library metadata: {len(books)} books")
         return True, len(books), None
         
@@ -213,13 +379,14 @@ def is_library_chat_enabled(prefs):
     """
     return prefs.get('library_chat_enabled', False)
 
-def build_library_prompt(user_query, prefs, i18n=None):
+def build_library_prompt(user_query, prefs, i18n=None, models=None):
     """
     构建包含图书馆元数据的AI提示词
     
     :param user_query: 用户查询
     :param prefs: 插件配置对象
     :param i18n: i18n翻译字典（可选）
+    :param models: 目标模型 [(ai_id, model_config)]（可选），用于按 token 预算截断
     :return: 完整的提示词
     """
     cached_metadata = get_library_metadata(prefs)
@@ -245,44 +412,107 @@ def build_library_prompt(user_query, prefs, i18n=None):
     else:
         template = default_template
     
-    # 使用紧凑 TSV 格式填充模板（id|title|authors 每行一本）
-    compact_metadata = format_library_metadata_for_prompt(prefs)
-    if not compact_metadata:
-        compact_metadata = cached_metadata
-
     try:
-        from .prompt_limits import get_max_prompt_length
+        from .prompt_limits import get_prompt_budget
     except ImportError:
-        from prompt_limits import get_max_prompt_length
-
-    compact_lines = split_compact_tsv_lines(compact_metadata)
-    total_books = len(compact_lines)
-    max_length = get_max_prompt_length(True, prefs)
-    overhead = len(template.format(metadata='', query=user_query)) + 200
-
-    included_lines = []
-    current_len = 0
-    for line in compact_lines:
-        add_len = len(line) + (1 if included_lines else 0)
-        if included_lines and current_len + add_len > max_length - overhead:
-            break
-        included_lines.append(line)
-        current_len += add_len
-
-    metadata_for_prompt = '\n'.join(included_lines)
-    if total_books and len(included_lines) < total_books:
+        from prompt_limits import get_prompt_budget
+
+    budget = get_prompt_budget(True, prefs, models)
+    overhead_text = template.format(metadata='', query=user_query)
+
+    # 使用紧凑格式填充模板（tsv: id|title|authors 每行一本；dictionary: 作者/系列字典编码）
+    books = load_cached_library_books(prefs)
+    if books and prefs.get('ai_search_semantic_enabled', False):
+        # 语义检索：只把与问题最相关的前 K 本书放进提示词
+        try:
+            from .semantic_index import rank_books
+        except ImportError:
+            from semantic_index import rank_books
+        ranked = rank_books(user_query, books, prefs)
+        if ranked is not None:
+            logger.info(f"Semantic AI Search: {len(ranked)} of {len(books)} books selected")
+            books = ranked
+    if books is not None:
+        total_books = len(books)
+        encoding = prefs.get('library_prompt_format', LIBRARY_FORMAT_TSV)
+        metadata_for_prompt, included_count = fit_books_compact(books, budget, overhead_text, encoding)
+    else:
+        compact_lines = split_compact_tsv_lines(cached_metadata)
+        total_books = len(compact_lines)
+        included_lines = budget.fit_lines(compact_lines, overhead_text)
+        metadata_for_prompt = '\n'.join(included_lines)
+        included_count = len(included_lines)
+
+    if total_books and included_count < total_books:
         note = (
             'Note: Only the first {included} of {total} indexed books are included due to the prompt limit. '
             'Results may be incomplete for very large libraries.'
         )
         if i18n:
             note = i18n.get('library_metadata_truncation_note', note).format(
-                included=len(included_lines), total=total_books,
+                included=included_count, total=total_books,
             )
         else:
-            note = note.format(included=len(included_lines), total=total_books)
+            note = note.format(included=included_count, total=total_books)
         metadata_for_prompt = f"{metadata_for_prompt}\n\n{note}"
 
     prompt = template.format(metadata=metadata_for_prompt, query=user_query)
     
     return prompt
+
+DEFAULT_SINGLE_BOOK_TEMPLATE = (
+    "User query: {query}\nBook title: {title}\nAuthor: {author}\nPublisher: {publisher}\n"
+    "Publication year: {pubyear}\nLanguage: {language}\nSeries: {series}"
+)
+
+
+def _normalize_prompt_text(text):
+    """统一换行符（U+2028/U+2029 -> \\n）"""
+    return str(text).replace('\u2028', '\n').replace('\u2029', '\n')
+
+
+def build_single_book_prompt(book, question, template, i18n=None, language_name_fn=None, passages=''):
+    """
+    用单书模板构建提示词（Ask 对话框、逐书批量提问和后台任务共用）
+    
+    :param book: calibre Metadata 或 BookRecord
+    :param question: 用户问题
+    :param template: 单书模板，为空时使用默认模板；旧版 {question} 变量自动替换为 {query}
+    :param i18n: i18n翻译字典（可选），用于 "Unknown"
+    :param language_name_fn: 语言代码 -> 语言名称（可选）
+    :param passages: {passages} 变量的内容（可选）
+    :return: 提示词
+    :raises KeyError: 模板包含未知变量时
+    """
+    unknown = (i18n or {}).get('unknown', 'Unknown')
+    
+    authors = getattr(book, 'authors', None) or []
+    author_str = ', '.join(authors) if authors else unknown
+    
+    pubyear = unknown
+    pubdate = getattr(book, 'pubdate', None)
+    if pubdate:
+        pubyear = str(pubdate.year) if hasattr(pubdate, 'year') else str(pubdate)
+    
+    language = getattr(book, 'language', None)
+    language_name = unknown
+    if language:
+        language_name = language_name_fn(language) if language_name_fn else language
+    
+    series = getattr(book, 'series', None) or unknown
+    
+    template_vars = {
+        'query': _normalize_prompt_text(question),
+        'title': _normalize_prompt_text(getattr(book, 'title', None) or unknown),
+        'author': _normalize_prompt_text(author_str),
+        'publisher': _normalize_prompt_text(getattr(book, 'publisher', None) or ''),
+        'pubyear': _normalize_prompt_text(pubyear),
+        'language': _normalize_prompt_text(language_name or ''),
+        'series': _normalize_prompt_text(series),
+        'passages': passages or '',
+    }
+    
+    template = template or DEFAULT_SINGLE_BOOK_TEMPLATE
+    if '{query}' not in template and '{question}' in template:
+        template = template.replace('{question}', '{query}')
+    return template.format(**template_vars)